@@ -32,6 +32,19 @@ class IOrderRepository(IBaseRepository[SalesOrder, int]):
         """
         pass
 
+    @abstractmethod
+    async def next_order_sequence(self, order_date: date) -> int:
+        """
+        Allocate the next daily order sequence number.
+
+        Args:
+            order_date: Day the order number belongs to
+
+        Returns:
+            Sequence number, unique for the day
+        """
+        pass
+
     @abstractmethod
     async def get_by_customer(
         self,
@@ -530,28 +530,8 @@ class OrderService:
         Returns:
             Unique order number
         """
-        from datetime import datetime
-
         # Format: ORD-YYYYMMDD-XXXX
-        date_str = datetime.now().strftime("%Y%m%d")
-
-        # Get count of orders today to generate sequence
         today = date.today()
-        orders_today = await self.repository.get_by_date_range(
-            start_date=today,
-            end_date=today,
-            skip=0,
-            limit=10000
-        )
-
-        sequence = len(orders_today) + 1
-        order_number = f"ORD-{date_str}-{sequence:04d}"
-
-        # Check if exists (safety check)
-        existing = await self.repository.get_by_order_number(order_number)
-        if existing:
-            # Try next sequence
-            sequence += 1
-            order_number = f"ORD-{date_str}-{sequence:04d}"
+        sequence = await self.repository.next_order_sequence(today)
 
-        return order_number
+        return f"ORD-{today.strftime('%Y%m%d')}-{sequence:04d}"
@@ -27,6 +27,7 @@ from app.models.salesperson import (
     SalespersonDailySummary
 )
 from app.models.sales import SalesOrder  # Assuming this exists
+from app.services.commission_leaderboard_service import CommissionLeaderboardService
 from app.schemas.salesperson import (
     CommissionSummaryResponse,
     CommissionHistoryItem,
@@ -464,6 +465,15 @@ async def set_sales_target(
     )
 
     db.add(target)
+    db.flush()
+
+    # Re-rank materialized leaderboards this target affects
+    CommissionLeaderboardService.refresh_overlapping(db, request.period_start, request.period_end)
+    if existing_target:
+        CommissionLeaderboardService.refresh_overlapping(
+            db, existing_target.period_start, existing_target.period_end
+        )
+
     db.commit()
     db.refresh(target)
 
@@ -474,6 +484,7 @@ async def set_sales_target(
 async def get_leaderboard(
     period: str = Query("month", description="Period: today, week, month, quarter, year"),
     limit: int = Query(10, ge=1, le=50, description="Number of top performers"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -489,105 +500,49 @@ async def get_leaderboard(
     Ranking Criteria:
     1. Total sales amount (primary)
     2. Total orders (tiebreaker)
-    3. Commission earned (tiebreaker)
+    Equal sales and orders share a rank.
+
+    Performance:
+    - Rankings are materialized per period (CommissionLeaderboardService)
+    - Freshness is time-based: the first request after the rows are older
+      than MAX_AGE (10 minutes) re-ranks the period and commits
+    - A page is read by (rank, salesperson_id) keyset; pass next_cursor for more
     """
     # Calculate period dates
     period_start, period_end = calculate_period_dates(period)
 
-    # Get all salespersons
-    salespersons = db.query(User).filter(User.is_salesperson == True).all()
-
-    # Calculate metrics for each salesperson
-    leaderboard_data = []
-
-    for salesperson in salespersons:
-        # Get commission for period
-        commission = db.query(SalespersonCommission).filter(
-            and_(
-                SalespersonCommission.salesperson_id == salesperson.id,
-                SalespersonCommission.period_start == period_start,
-                SalespersonCommission.period_end == period_end
-            )
-        ).first()
-
-        if commission:
-            total_sales = commission.total_sales_amount
-            total_commission = commission.calculated_commission
-            total_orders = commission.total_orders
-            total_customers = commission.total_customers
-        else:
-            # TODO: Calculate from sales orders
-            total_sales = Decimal(0)
-            total_commission = Decimal(0)
-            total_orders = 0
-            total_customers = 0
-
-        # Get target achievement
-        target = db.query(SalespersonTarget).filter(
-            and_(
-                SalespersonTarget.salesperson_id == salesperson.id,
-                SalespersonTarget.period_start <= period_end,
-                SalespersonTarget.period_end >= period_start,
-                SalespersonTarget.is_active == True
-            )
-        ).first()
-
-        target_achievement = None
-        if target and target.target_revenue_iqd:
-            target_achievement = (total_sales / target.target_revenue_iqd * 100)
-
-        leaderboard_data.append({
-            "salesperson_id": salesperson.id,
-            "salesperson_name": salesperson.name,
-            "total_sales": total_sales,
-            "total_commission": total_commission,
-            "total_orders": total_orders,
-            "total_customers": total_customers,
-            "target_achievement_percentage": target_achievement
-        })
-
-    # Sort by total sales (descending)
-    leaderboard_data.sort(key=lambda x: (x["total_sales"], x["total_orders"]), reverse=True)
-
-    # Add ranks and badges
-    leaderboard_entries = []
-    for idx, data in enumerate(leaderboard_data[:limit], start=1):
-        badge = None
-        if idx == 1:
-            badge = "top_performer"
-        elif idx == 2:
-            badge = "runner_up"
-        elif idx == 3:
-            badge = "third_place"
-
-        leaderboard_entries.append(
-            LeaderboardEntry(
-                rank=idx,
-                salesperson_id=data["salesperson_id"],
-                salesperson_name=data["salesperson_name"],
-                total_sales=data["total_sales"],
-                total_commission=data["total_commission"],
-                total_orders=data["total_orders"],
-                total_customers=data["total_customers"],
-                target_achievement_percentage=data["target_achievement_percentage"],
-                badge=badge
-            )
+    if CommissionLeaderboardService.ensure_fresh(db, period_start, period_end):
+        db.commit()
+
+    rows, next_cursor = CommissionLeaderboardService.get_page(db, period_start, period_end, limit, cursor)
+    mine = CommissionLeaderboardService.get_entry(db, period_start, period_end, current_user.id)
+
+    # Add badges
+    badges = {1: "top_performer", 2: "runner_up", 3: "third_place"}
+    leaderboard_entries = [
+        LeaderboardEntry(
+            rank=row.rank,
+            salesperson_id=row.salesperson_id,
+            salesperson_name=row.salesperson_name,
+            total_sales=row.total_sales,
+            total_commission=row.total_commission,
+            total_orders=row.total_orders,
+            total_customers=row.total_customers,
+            target_achievement_percentage=row.target_achievement_percentage,
+            badge=badges.get(row.rank)
         )
-
-    # Find current user's rank
-    my_rank = None
-    for idx, data in enumerate(leaderboard_data, start=1):
-        if data["salesperson_id"] == current_user.id:
-            my_rank = idx
-            break
+        for row in rows
+    ]
 
     return LeaderboardResponse(
         period=period,
         period_start=period_start,
         period_end=period_end,
         leaderboard=leaderboard_entries,
-        total_participants=len(leaderboard_data),
-        my_rank=my_rank
+        total_participants=rows[0].total_participants if rows else (mine.total_participants if mine else 0),
+        my_rank=mine.rank if mine else None,
+        team_total_sales=rows[0].team_total_sales if rows else None,
+        next_cursor=next_cursor
     )
 
 
@@ -811,82 +766,8 @@ async def get_commission_statistics(
             detail="You can only view your own statistics"
         )
 
-    # Get all commissions
-    all_commissions = db.query(SalespersonCommission).filter(
-        SalespersonCommission.salesperson_id == salesperson_id
-    ).all()
-
-    # Calculate lifetime earnings
-    lifetime_earnings = sum(
-        c.approved_commission or c.calculated_commission
-        for c in all_commissions
-        if c.is_paid
-    )
-
-    # Year-to-date
-    today = datetime.utcnow().date()
-    ytd_start = today.replace(month=1, day=1)
-    ytd_commissions = [c for c in all_commissions if c.period_start >= ytd_start and c.is_paid]
-    ytd_earnings = sum(c.approved_commission or c.calculated_commission for c in ytd_commissions)
-
-    # Month-to-date
-    mtd_start = today.replace(day=1)
-    mtd_commissions = [c for c in all_commissions if c.period_start >= mtd_start and c.is_paid]
-    mtd_earnings = sum(c.approved_commission or c.calculated_commission for c in mtd_commissions)
-
-    # Average monthly
-    monthly_commissions = [c for c in all_commissions if c.period_type == "monthly" and c.is_paid]
-    avg_monthly = sum(c.approved_commission or c.calculated_commission for c in monthly_commissions) / len(monthly_commissions) if monthly_commissions else Decimal(0)
-
-    # Highest monthly
-    highest_monthly = max(
-        (c.approved_commission or c.calculated_commission for c in monthly_commissions),
-        default=Decimal(0)
-    )
-
-    # Total orders all time
-    total_orders_all_time = sum(c.total_orders for c in all_commissions)
-
-    # Average commission per order
-    avg_commission_per_order = lifetime_earnings / total_orders_all_time if total_orders_all_time > 0 else Decimal(0)
-
-    # Trend analysis (simplified)
-    # Compare last 3 months to previous 3 months
-    last_3_months = today - timedelta(days=90)
-    previous_3_months = today - timedelta(days=180)
-
-    recent_commissions = [
-        c for c in all_commissions
-        if c.period_start >= last_3_months and c.is_paid
-    ]
-    previous_commissions = [
-        c for c in all_commissions
-        if c.period_start >= previous_3_months and c.period_start < last_3_months and c.is_paid
-    ]
-
-    recent_total = sum(c.approved_commission or c.calculated_commission for c in recent_commissions)
-    previous_total = sum(c.approved_commission or c.calculated_commission for c in previous_commissions)
-
-    if previous_total > 0:
-        change = (recent_total - previous_total) / previous_total
-        if change > 0.1:
-            trend = "increasing"
-        elif change < -0.1:
-            trend = "decreasing"
-        else:
-            trend = "stable"
-    else:
-        trend = "stable"
-
     return CommissionStatisticsResponse(
-        lifetime_earnings=lifetime_earnings,
-        ytd_earnings=ytd_earnings,
-        mtd_earnings=mtd_earnings,
-        avg_monthly_commission=avg_monthly,
-        highest_monthly_commission=highest_monthly,
-        total_orders_all_time=total_orders_all_time,
-        avg_commission_per_order=avg_commission_per_order,
-        commission_trend=trend
+        **CommissionLeaderboardService.get_statistics(db, salesperson_id)
     )
 
 
@@ -12,7 +12,7 @@ Business Purpose:
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, desc
 from typing import Optional, List
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -21,8 +21,10 @@ import math
 from app.db.database import get_db
 from app.dependencies.auth import get_current_user
 from app.models.user import User
-from app.models.salesperson import SalespersonGPSLocation, SalespersonDailySummary
+from app.models.salesperson import SalespersonGPSLocation
 from app.models.customer import Customer
+from app.services.gps_summary_service import GPSDailySummarizer, RouteStats, day_bounds
+from app.services.gps_tracking_service import GPSIngestionService, month_start
 from app.schemas.salesperson import (
     GPSLocationCreate,
     BatchLocationRequest,
@@ -62,6 +64,24 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return distance
 
 
+def build_daily_response(
+    summary_date: date,
+    stats: RouteStats,
+    route: List[SalespersonGPSLocation]
+) -> DailySummaryResponse:
+    """Build a daily summary response from stored route stats"""
+    return DailySummaryResponse(
+        date=summary_date,
+        total_distance_km=round(Decimal(str(stats.distance_km)), 2),
+        total_duration_hours=round(Decimal(str(stats.hours)), 2),
+        customer_visits=stats.customer_visits,
+        verified_visits=stats.verified_visits,
+        route=route,
+        start_time=stats.start_at,
+        end_time=stats.end_at
+    )
+
+
 def is_within_geofence(customer_lat: float, customer_lon: float,
                         visit_lat: float, visit_lon: float,
                         radius_meters: float = 100) -> bool:
@@ -87,6 +107,8 @@ async def track_location(
     - Automatic background tracking from mobile app
     - Records every 30-60 seconds while on route
     - Supports offline mode (stores locally, syncs later)
+    - Idempotent: a point already stored for the same device and timestamp
+      is skipped and reported as a duplicate
 
     Authorization:
     - Only salespersons can upload their own locations
@@ -100,32 +122,16 @@ async def track_location(
         )
 
     try:
-        # Create GPS location record
-        gps_location = SalespersonGPSLocation(
-            salesperson_id=current_user.id,
-            latitude=location.latitude,
-            longitude=location.longitude,
-            timestamp=location.timestamp,
-            accuracy=location.accuracy,
-            altitude=location.altitude,
-            speed=location.speed,
-            heading=location.heading,
-            activity_type=location.activity_type,
-            battery_level=location.battery_level,
-            is_charging=location.is_charging,
-            device_id=location.device_id,
-            is_synced=True,  # Directly uploaded, so marked as synced
-            synced_at=datetime.utcnow()
-        )
-
-        db.add(gps_location)
+        # Same idempotent path as batch uploads: a re-sent point is skipped
+        result = GPSIngestionService(db).ingest(current_user.id, [location])
+        GPSDailySummarizer(db).refresh(current_user.id, result.inserted_timestamps)
         db.commit()
-        db.refresh(gps_location)
 
         return {
             "success": True,
-            "location_id": gps_location.id,
-            "message": "Location tracked successfully"
+            "location_id": result.inserted_ids[0] if result.inserted_ids else None,
+            "duplicate": result.duplicates > 0,
+            "message": "Location already tracked" if result.duplicates else "Location tracked successfully"
         }
 
     except Exception as e:
@@ -150,10 +156,12 @@ async def batch_track_locations(
     - Mobile app stores locations locally during offline
     - Syncs all pending locations in one batch
     - Maximum 1000 locations per batch
+    - Idempotent: points already stored for the same device and timestamp
+      are skipped and reported as duplicates, so retried uploads are safe
 
     Performance:
-    - Uses bulk insert for efficiency
-    - Processes 1000 locations in ~2 seconds
+    - COPY into a staging table + one INSERT ... ON CONFLICT DO NOTHING
+    - Rows land in monthly partitions (see GPSIngestionService)
     """
     # Authorization
     if not current_user.is_salesperson:
@@ -162,54 +170,19 @@ async def batch_track_locations(
             detail="Only salespersons can upload GPS locations"
         )
 
-    uploaded = 0
-    failed = 0
-    errors = []
-    ids = []
-
     try:
-        for idx, location in enumerate(request.locations):
-            try:
-                gps_location = SalespersonGPSLocation(
-                    salesperson_id=current_user.id,
-                    latitude=location.latitude,
-                    longitude=location.longitude,
-                    timestamp=location.timestamp,
-                    accuracy=location.accuracy,
-                    altitude=location.altitude,
-                    speed=location.speed,
-                    heading=location.heading,
-                    activity_type=location.activity_type,
-                    battery_level=location.battery_level,
-                    is_charging=location.is_charging,
-                    device_id=location.device_id,
-                    is_synced=True,
-                    synced_at=datetime.utcnow()
-                )
-
-                db.add(gps_location)
-                db.flush()  # Get ID without committing
-
-                ids.append(gps_location.id)
-                uploaded += 1
-
-            except Exception as e:
-                failed += 1
-                errors.append({
-                    "index": idx,
-                    "error": str(e),
-                    "location": location.dict()
-                })
-
+        result = GPSIngestionService(db).ingest(current_user.id, request.locations)
+        GPSDailySummarizer(db).refresh(current_user.id, result.inserted_timestamps)
         db.commit()
 
         return BatchOperationResponse(
-            success=failed == 0,
-            total=len(request.locations),
-            uploaded=uploaded,
-            failed=failed,
-            errors=errors,
-            ids=ids
+            success=True,
+            total=result.total,
+            uploaded=result.inserted,
+            failed=0,
+            duplicates=result.duplicates,
+            errors=[],
+            ids=result.inserted_ids
         )
 
     except Exception as e:
@@ -251,12 +224,14 @@ async def get_location_history(
     if not end_date:
         end_date = datetime.utcnow().date()
 
-    # Query locations
+    # Query locations (range on the raw column so the index and partition pruning apply)
+    range_start, _ = day_bounds(start_date)
+    _, range_end = day_bounds(end_date)
     locations = db.query(SalespersonGPSLocation).filter(
         and_(
             SalespersonGPSLocation.salesperson_id == salesperson_id,
-            func.date(SalespersonGPSLocation.timestamp) >= start_date,
-            func.date(SalespersonGPSLocation.timestamp) <= end_date
+            SalespersonGPSLocation.timestamp >= range_start,
+            SalespersonGPSLocation.timestamp < range_end
         )
     ).order_by(desc(SalespersonGPSLocation.timestamp)).limit(limit).all()
 
@@ -281,8 +256,9 @@ async def get_daily_summary(
     - Start/end times
 
     Performance:
-    - First checks pre-calculated summary table
-    - Falls back to real-time calculation if not cached
+    - Reads the incrementally maintained summary row
+    - Builds it once from an indexed timestamp range scan if missing
+    - Route is Douglas-Peucker simplified (customer visits always kept)
     """
     # Authorization
     if current_user.id != salesperson_id and not current_user.role.name.lower() in ['admin', 'manager']:
@@ -291,78 +267,12 @@ async def get_daily_summary(
             detail="You can only view your own summaries"
         )
 
-    # Try to get pre-calculated summary
-    cached_summary = db.query(SalespersonDailySummary).filter(
-        and_(
-            SalespersonDailySummary.salesperson_id == salesperson_id,
-            SalespersonDailySummary.summary_date == summary_date
-        )
-    ).first()
-
-    # Get route points for the day
-    route = db.query(SalespersonGPSLocation).filter(
-        and_(
-            SalespersonGPSLocation.salesperson_id == salesperson_id,
-            func.date(SalespersonGPSLocation.timestamp) == summary_date
-        )
-    ).order_by(SalespersonGPSLocation.timestamp).all()
-
-    if cached_summary:
-        # Use cached data
-        return DailySummaryResponse(
-            date=summary_date,
-            total_distance_km=cached_summary.total_distance_km,
-            total_duration_hours=cached_summary.total_time_hours,
-            customer_visits=cached_summary.customer_visits,
-            verified_visits=cached_summary.verified_visits,
-            route=route,
-            start_time=route[0].timestamp if route else None,
-            end_time=route[-1].timestamp if route else None
-        )
-    else:
-        # Calculate on-the-fly
-        total_distance = Decimal(0)
-        customer_visits = db.query(SalespersonGPSLocation).filter(
-            and_(
-                SalespersonGPSLocation.salesperson_id == salesperson_id,
-                func.date(SalespersonGPSLocation.timestamp) == summary_date,
-                SalespersonGPSLocation.is_customer_visit == True
-            )
-        ).count()
-
-        verified_visits = db.query(SalespersonGPSLocation).filter(
-            and_(
-                SalespersonGPSLocation.salesperson_id == salesperson_id,
-                func.date(SalespersonGPSLocation.timestamp) == summary_date,
-                SalespersonGPSLocation.is_customer_visit == True,
-                SalespersonGPSLocation.visit_verified == True
-            )
-        ).count()
+    summarizer = GPSDailySummarizer(db)
+    stats = summarizer.get_days(salesperson_id, [summary_date])
+    routes = summarizer.load_routes(salesperson_id, stats)
+    db.commit()  # Persist summaries built on first read
 
-        # Calculate distance between consecutive points
-        for i in range(1, len(route)):
-            dist = calculate_distance(
-                float(route[i-1].latitude), float(route[i-1].longitude),
-                float(route[i].latitude), float(route[i].longitude)
-            )
-            total_distance += Decimal(dist / 1000)  # Convert to km
-
-        # Calculate duration
-        total_duration = Decimal(0)
-        if route:
-            duration_seconds = (route[-1].timestamp - route[0].timestamp).total_seconds()
-            total_duration = Decimal(duration_seconds / 3600)  # Convert to hours
-
-        return DailySummaryResponse(
-            date=summary_date,
-            total_distance_km=round(total_distance, 2),
-            total_duration_hours=round(total_duration, 2),
-            customer_visits=customer_visits,
-            verified_visits=verified_visits,
-            route=route,
-            start_time=route[0].timestamp if route else None,
-            end_time=route[-1].timestamp if route else None
-        )
+    return build_daily_response(summary_date, stats[summary_date], routes.get(summary_date, []))
 
 
 @router.get("/summary/weekly", response_model=WeeklySummaryResponse)
@@ -391,29 +301,22 @@ async def get_weekly_summary(
 
     week_end = week_start + timedelta(days=6)
 
-    # Get daily summaries for the week
-    daily_breakdowns = []
-    total_distance = Decimal(0)
-    total_duration = Decimal(0)
-    total_visits = 0
-    total_verified = 0
-
-    for day_offset in range(7):
-        current_date = week_start + timedelta(days=day_offset)
-
-        # Get or calculate daily summary
-        daily_summary = await get_daily_summary(
-            salesperson_id=salesperson_id,
-            summary_date=current_date,
-            current_user=current_user,
-            db=db
-        )
+    days = [week_start + timedelta(days=day_offset) for day_offset in range(7)]
+
+    # One summary query and one route query for the whole week
+    summarizer = GPSDailySummarizer(db)
+    stats = summarizer.get_days(salesperson_id, days)
+    routes = summarizer.load_routes(salesperson_id, stats)
+    db.commit()
 
-        daily_breakdowns.append(daily_summary)
-        total_distance += daily_summary.total_distance_km
-        total_duration += daily_summary.total_duration_hours
-        total_visits += daily_summary.customer_visits
-        total_verified += daily_summary.verified_visits
+    daily_breakdowns = [
+        build_daily_response(day, stats[day], routes.get(day, []))
+        for day in days
+    ]
+    total_distance = sum((daily.total_distance_km for daily in daily_breakdowns), Decimal(0))
+    total_duration = sum((daily.total_duration_hours for daily in daily_breakdowns), Decimal(0))
+    total_visits = sum(daily.customer_visits for daily in daily_breakdowns)
+    total_verified = sum(daily.verified_visits for daily in daily_breakdowns)
 
     return WeeklySummaryResponse(
         week_start=week_start,
@@ -479,6 +382,7 @@ async def verify_customer_visit(
     verified = within_geofence
 
     # Create GPS location record
+    GPSIngestionService(db).ensure_partitions([month_start(request.visit_time)])
     gps_location = SalespersonGPSLocation(
         salesperson_id=current_user.id,
         latitude=request.latitude,
@@ -493,6 +397,8 @@ async def verify_customer_visit(
     )
 
     db.add(gps_location)
+    db.flush()
+    GPSDailySummarizer(db).refresh(current_user.id, [gps_location.timestamp])
     db.commit()
 
     return VerifyVisitResponse(
@@ -603,8 +509,10 @@ async def delete_location(
                 detail="Cannot delete locations older than 24 hours"
             )
 
-    # Delete location
+    # Delete location and rebuild that day's summary
     db.delete(location)
+    db.flush()
+    GPSDailySummarizer(db).rebuild_days(location.salesperson_id, [location.timestamp.date()])
     db.commit()
 
     return {
@@ -105,6 +105,7 @@ class Settings(BaseSettings):
     zoho_access_token: Optional[str] = None
     zoho_organization_id: Optional[str] = None
     zoho_region: str = Field(default="US", pattern="^(US|EU|IN)$")
+    zoho_token_lease_seconds: int = Field(default=30, ge=5, le=300)  # Refresh lease held by one process (token broker)
 
     @property
     def zoho_api_base(self) -> str:
@@ -127,6 +128,10 @@ class Settings(BaseSettings):
     tds_lock_timeout_seconds: int = Field(default=300, ge=30, le=3600)
     tds_queue_poll_interval_ms: int = Field(default=1000, ge=100, le=10000)
 
+    # Bulk Sync Jobs
+    tds_bulk_sync_lease_seconds: int = Field(default=120, ge=10, le=3600)  # Renewed at every page checkpoint
+    tds_bulk_sync_poll_interval_ms: int = Field(default=2000, ge=100, le=60000)
+
     # Alert Settings
     tds_alert_failure_rate_threshold: float = Field(default=0.05, ge=0.0, le=1.0)
     tds_alert_queue_backlog_threshold: int = Field(default=1000, ge=100, le=100000)
@@ -137,6 +142,18 @@ class Settings(BaseSettings):
     tds_logs_retention_days: int = Field(default=90, ge=7, le=365)
     tds_metrics_retention_days: int = Field(default=30, ge=7, le=365)
 
+    # ========================================================================
+    # DATABASE BACKUPS
+    # ========================================================================
+    backup_dir: str = "backups"
+    backup_pg_bin_dir: Optional[str] = None  # e.g. /usr/lib/postgresql/16/bin; PATH when empty
+    backup_compress_level: int = Field(default=6, ge=0, le=9)  # pg_dump --compress
+    backup_restore_jobs: int = Field(default=4, ge=1, le=32)  # pg_restore --jobs
+    backup_keep_last: int = Field(default=7, ge=1, le=365)  # Never pruned by age
+    backup_max_age_days: int = Field(default=30, ge=1, le=3650)
+    backup_record_row_counts: bool = True  # Exact per-table counts in the dump's snapshot (used by verify)
+    backup_job_poll_interval_ms: int = Field(default=2000, ge=100, le=60000)
+
     # ========================================================================
     # NOTIFICATIONS
     # ========================================================================
@@ -158,6 +175,17 @@ class Settings(BaseSettings):
     telegram_bot_token: Optional[str] = None
     telegram_chat_id: Optional[str] = None
 
+    # WhatsApp Business (Cloud API)
+    whatsapp_access_token: Optional[str] = None
+    whatsapp_phone_number_id: Optional[str] = None
+    whatsapp_api_base: str = "https://graph.facebook.com/v20.0"
+    whatsapp_messages_per_second: float = Field(default=80, gt=0, le=1000)  # Cloud API throughput per phone number
+    whatsapp_messaging_tier: int = Field(default=1000, ge=0)  # Unique recipients per rolling 24h; 0 = unlimited
+    whatsapp_broadcast_workers: int = Field(default=8, ge=1, le=64)
+    whatsapp_broadcast_max_attempts: int = Field(default=5, ge=1, le=20)
+    whatsapp_broadcast_lease_seconds: int = Field(default=60, ge=10, le=3600)
+    whatsapp_broadcast_poll_interval_ms: int = Field(default=1000, ge=100, le=60000)
+
     # ========================================================================
     # REDIS (Optional)
     # ========================================================================
@@ -212,6 +240,24 @@ class Settings(BaseSettings):
     rate_limit_per_minute: int = Field(default=60, ge=10, le=1000)
     rate_limit_per_hour: int = Field(default=1000, ge=100, le=100000)
 
+    # ========================================================================
+    # GPS TRACKING
+    # ========================================================================
+    gps_retention_months: int = Field(default=12, ge=1, le=120)  # Whole months kept before the current one
+    gps_partition_premake_months: int = Field(default=2, ge=0, le=12)
+    gps_route_simplify_tolerance_m: float = Field(default=15.0, ge=0, le=500)  # Douglas-Peucker tolerance
+
+    # ========================================================================
+    # DOCUMENT NUMBERING
+    # ========================================================================
+    document_sequence_block_size: int = Field(default=20, ge=1, le=1000)  # Numbers reserved per round trip (non gap-free)
+
+    # ========================================================================
+    # PERMISSION SNAPSHOTS
+    # ========================================================================
+    permission_snapshot_ttl_seconds: int = Field(default=3600, ge=10, le=86400)  # Redis copy lifetime
+    permission_version_poll_seconds: float = Field(default=2.0, ge=0, le=60)  # How often workers re-read the shared version
+
     # ========================================================================
     # DEVELOPMENT
     # ========================================================================
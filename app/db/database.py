@@ -97,4 +97,8 @@ async def get_async_db():
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+
+# Applies the request's RLS identity at every transaction start (Session event)
+from app.db import rls_context  # noqa: E402,F401
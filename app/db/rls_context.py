@@ -8,26 +8,123 @@ and PostgreSQL RLS policies using session variables.
 Based on: PostgreSQL Best Practices for Fine-Grained Authorization
 Pattern: Session Variable Bridge (current_setting() integration)
 
+The identity (user, role, tenant, branch, warehouse) is request-scoped: it
+lives in a ContextVar, so concurrent requests on one worker never see each
+other's, and it is pinned to the Session it was set on. Whenever that
+session starts a transaction, all five settings are applied with one
+`SELECT set_config(..., true), ...` - transaction-local, so they vanish at
+COMMIT/ROLLBACK and can never leak into the next user of a pooled
+connection, even when a request fails half-way.
+
 Usage:
 ------
 from app.db.rls_context import set_rls_context
 
-# In FastAPI dependency or middleware
-@app.middleware("http")
-async def rls_middleware(request: Request, call_next):
-    if hasattr(request.state, "user"):
-        with SessionLocal() as db:
-            set_rls_context(db, request.state.user)
-    return await call_next(request)
+# In a FastAPI dependency, once the user is known
+set_rls_context(db, user_id=user.id, role_name=user.role.name, branch_id=user.branch_id)
 """
 
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import Optional
+from typing import Dict, Iterator, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Dialects with set_config(); other databases (SQLite tests) are left alone
+RLS_DIALECTS = {"postgresql"}
+
+# Session.info key holding the identity pinned to a session
+SESSION_INFO_KEY = "rls_identity"
+
+# Identity field -> PostgreSQL setting read by the RLS policies
+RLS_SETTINGS = {
+    "user_id": "app.current_user_id",
+    "role_name": "app.current_user_role",
+    "tenant_id": "app.current_tenant_id",
+    "branch_id": "app.current_branch_id",
+    "warehouse_id": "app.current_warehouse_id",
+}
+
+# Every setting in one round trip; is_local = true scopes them to the transaction
+SET_RLS_CONTEXT_SQL = text(
+    "SELECT " + ", ".join(f"set_config('{name}', :{field}, true)" for field, name in RLS_SETTINGS.items())
+)
+
+
+@dataclass(frozen=True)
+class RLSIdentity:
+    """Who the current request acts as, as seen by the RLS policies"""
+    user_id: Optional[int] = None
+    role_name: Optional[str] = None
+    tenant_id: Optional[int] = None
+    branch_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
+
+    def parameters(self) -> Dict[str, Optional[str]]:
+        """Bind parameters for SET_RLS_CONTEXT_SQL (None clears a setting)"""
+        return {field: None if getattr(self, field) is None else str(getattr(self, field)) for field in RLS_SETTINGS}
+
+
+_request_identity: ContextVar[Optional[RLSIdentity]] = ContextVar("rls_identity", default=None)
+
+
+def get_rls_identity() -> Optional[RLSIdentity]:
+    """The identity of the current request (task/thread context)"""
+    return _request_identity.get()
+
+
+def set_rls_identity(identity: Optional[RLSIdentity]) -> Token:
+    """Set the current request's identity; the token restores the previous one"""
+    return _request_identity.set(identity)
+
+
+def reset_rls_identity(token: Token) -> None:
+    _request_identity.reset(token)
+
+
+@contextmanager
+def rls_scope(identity: Optional[RLSIdentity]) -> Iterator[Optional[RLSIdentity]]:
+    """Run a block (and the sessions it opens) as `identity`"""
+    token = _request_identity.set(identity)
+    try:
+        yield identity
+    finally:
+        _request_identity.reset(token)
+
+
+def apply_rls_settings(connection, identity: Optional[RLSIdentity]) -> None:
+    """Apply `identity` to the connection's current transaction (one statement)"""
+    if connection.dialect.name in RLS_DIALECTS:
+        connection.execute(SET_RLS_CONTEXT_SQL, (identity or RLSIdentity()).parameters())
+
+
+def bind_rls_context(db: Session, identity: Optional[RLSIdentity]) -> None:
+    """
+    Pin `identity` to a session
+
+    It is applied to the transaction already open on the session (if any)
+    and at the start of every later one. None unpins it.
+    """
+    if identity is None:
+        db.info.pop(SESSION_INFO_KEY, None)
+    else:
+        db.info[SESSION_INFO_KEY] = identity
+    if db.in_transaction():
+        apply_rls_settings(db.connection(), identity)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_at_transaction_start(session, transaction, connection):
+    """Every transaction starts with the session's (or the request's) identity"""
+    identity = session.info.get(SESSION_INFO_KEY) or _request_identity.get()
+    if identity is not None:
+        apply_rls_settings(connection, identity)
+
 
 class RLSContext:
     """
@@ -35,6 +132,8 @@ class RLSContext:
 
     This is the implementation of the "Session Variable Bridge" pattern
     that connects stateful application authentication to stateless database policies.
+    Inside the block the session (and the current request context) act as
+    the given user; on exit the previous identity is restored.
     """
 
     def __init__(
@@ -58,80 +157,36 @@ class RLSContext:
             warehouse_id: User's assigned warehouse ID
         """
         self.db = db
-        self.user_id = user_id
-        self.role_name = role_name
-        self.tenant_id = tenant_id
-        self.branch_id = branch_id
-        self.warehouse_id = warehouse_id
-        self._original_values = {}
+        self.identity = RLSIdentity(user_id, role_name, tenant_id, branch_id, warehouse_id)
+        self._previous: Optional[RLSIdentity] = None
+        self._token: Optional[Token] = None
 
     def __enter__(self):
-        """Set all session variables when entering context."""
+        """Pin the identity to the session and the request context."""
+        self._previous = self.db.info.get(SESSION_INFO_KEY)
+        self._token = _request_identity.set(self.identity)
         try:
-            # Set user ID (REQUIRED - used by all RLS policies)
-            self._set_config("app.current_user_id", str(self.user_id))
-            logger.debug(f"🔐 RLS Context: Set user_id={self.user_id}")
-
-            # Set optional context variables
-            if self.role_name:
-                self._set_config("app.current_user_role", self.role_name)
-                logger.debug(f"🔐 RLS Context: Set role={self.role_name}")
-
-            if self.tenant_id:
-                self._set_config("app.current_tenant_id", str(self.tenant_id))
-                logger.debug(f"🔐 RLS Context: Set tenant_id={self.tenant_id}")
-
-            if self.branch_id:
-                self._set_config("app.current_branch_id", str(self.branch_id))
-                logger.debug(f"🔐 RLS Context: Set branch_id={self.branch_id}")
-
-            if self.warehouse_id:
-                self._set_config("app.current_warehouse_id", str(self.warehouse_id))
-                logger.debug(f"🔐 RLS Context: Set warehouse_id={self.warehouse_id}")
-
-            # Commit the session variable changes
-            self.db.commit()
-
+            bind_rls_context(self.db, self.identity)
+            logger.debug(f"🔐 RLS Context: {self.identity}")
             return self
 
         except Exception as e:
             logger.error(f"❌ RLS Context: Failed to set session variables: {e}")
+            _request_identity.reset(self._token)
+            self.db.info.pop(SESSION_INFO_KEY, None)
             self.db.rollback()
             raise
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Clean up session variables when exiting context."""
+        """Restore the previous identity (the transaction-local settings need no cleanup)."""
+        _request_identity.reset(self._token)
         try:
-            # Reset all session variables
-            self._set_config("app.current_user_id", None)
-            self._set_config("app.current_user_role", None)
-            self._set_config("app.current_tenant_id", None)
-            self._set_config("app.current_branch_id", None)
-            self._set_config("app.current_warehouse_id", None)
-
-            self.db.commit()
-            logger.debug("🔓 RLS Context: Cleared session variables")
+            bind_rls_context(self.db, self._previous)
+            logger.debug("🔓 RLS Context: Restored previous identity")
 
         except Exception as e:
-            logger.error(f"❌ RLS Context: Failed to clear session variables: {e}")
-            self.db.rollback()
-
-    def _set_config(self, key: str, value: Optional[str]):
-        """
-        Set a PostgreSQL session variable using set_config().
-
-        Args:
-            key: Configuration parameter name (e.g., 'app.current_user_id')
-            value: Value to set (None to unset)
-        """
-        if value is None:
-            # Unset the variable
-            sql = text("SELECT set_config(:key, NULL, false)")
-        else:
-            # Set the variable
-            sql = text("SELECT set_config(:key, :value, false)")
-
-        self.db.execute(sql, {"key": key, "value": value})
+            # A failed transaction is rolled back, which discards the settings anyway
+            logger.debug(f"RLS Context: settings left to the rollback: {e}")
 
 
 def set_rls_context(
@@ -145,8 +200,9 @@ def set_rls_context(
     """
     Convenience function to set RLS context without using context manager.
 
-    This should be called at the START of every database session/transaction
-    to ensure RLS policies are evaluated with the correct user context.
+    Pins the identity to `db` and to the current request context: the open
+    transaction gets it immediately, every later transaction on the session
+    at its start. Nothing is committed and nothing needs clearing.
 
     Args:
         db: SQLAlchemy database session
@@ -165,46 +221,14 @@ def set_rls_context(
                 db,
                 user_id=current_user.id,
                 role_name=current_user.role.name,
-                tenant_id=current_user.tenant_id,
                 branch_id=current_user.branch_id
             )
             return db
     """
+    identity = RLSIdentity(user_id, role_name, tenant_id, branch_id, warehouse_id)
     try:
-        # Set user ID (REQUIRED)
-        db.execute(
-            text("SELECT set_config('app.current_user_id', :user_id, false)"),
-            {"user_id": str(user_id)},
-        )
-
-        # Set optional context variables
-        if role_name:
-            db.execute(
-                text("SELECT set_config('app.current_user_role', :role, false)"),
-                {"role": role_name},
-            )
-
-        if tenant_id:
-            db.execute(
-                text("SELECT set_config('app.current_tenant_id', :tenant_id, false)"),
-                {"tenant_id": str(tenant_id)},
-            )
-
-        if branch_id:
-            db.execute(
-                text("SELECT set_config('app.current_branch_id', :branch_id, false)"),
-                {"branch_id": str(branch_id)},
-            )
-
-        if warehouse_id:
-            db.execute(
-                text(
-                    "SELECT set_config('app.current_warehouse_id', :warehouse_id, false)"
-                ),
-                {"warehouse_id": str(warehouse_id)},
-            )
-
-        db.commit()
+        _request_identity.set(identity)
+        bind_rls_context(db, identity)
 
         logger.info(
             f"✅ RLS Context Set: user_id={user_id}, role={role_name}, "
@@ -29,7 +29,7 @@ from typing import Optional
 import logging
 
 from app.db.database import SessionLocal
-from app.db.rls_context import set_rls_context
+from app.db.rls_context import RLSContext, set_rls_context
 from app.models.user import User
 from app.services.auth_service import SECRET_KEY, ALGORITHM
 
@@ -133,9 +133,9 @@ def get_db_with_rls(
             db=db,
             user_id=user.id,
             role_name=user.role.name if user.role else None,
-            tenant_id=user.tenant_id,
+            tenant_id=getattr(user, "tenant_id", None),
             branch_id=user.branch_id,
-            warehouse_id=user.warehouse_id
+            warehouse_id=getattr(user, "warehouse_id", None)
         )
 
         logger.debug(f"✅ RLS context set for user {user.id} ({user.email})")
@@ -175,9 +175,9 @@ def get_current_user_with_rls(
             db=db,
             user_id=user.id,
             role_name=user.role.name if user.role else None,
-            tenant_id=user.tenant_id,
+            tenant_id=getattr(user, "tenant_id", None),
             branch_id=user.branch_id,
-            warehouse_id=user.warehouse_id
+            warehouse_id=getattr(user, "warehouse_id", None)
         )
 
         logger.debug(f"✅ RLS context set for user {user.id} ({user.email})")
@@ -210,15 +210,12 @@ class RLSContextManager:
     """
 
     def __init__(self, db: Session, user_id: int, **kwargs):
-        self.db = db
-        self.user_id = user_id
-        self.kwargs = kwargs
-        self._original_context = {}
+        self._context = RLSContext(db, user_id, **kwargs)
 
     def __enter__(self):
-        set_rls_context(self.db, self.user_id, **self.kwargs)
+        self._context.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # RLS context is transaction-scoped, will reset on commit/rollback
-        pass
+        # Back to the previous identity for the rest of the transaction
+        self._context.__exit__(exc_type, exc_val, exc_tb)
@@ -28,6 +28,116 @@ logger = get_logger(__name__)
 security = HTTPBearer()
 
 
+# Permissions for each role (built once at import, copied per call)
+ROLE_PERMISSIONS = {
+    'admin': (
+        'admin',
+        'dashboard.view',
+        'users.view',
+        'users.create',
+        'users.update',
+        'users.delete',
+        'hr.view',
+        'branches.view',
+        'warehouses.view',
+        'items.view',
+        'products.view',
+        'inventory.view',
+        'customers.view',
+        'vendors.view',
+        'sales.view',
+        'sales.create',
+        'purchase.view',
+        'accounting.view',
+        'pos.view',
+        'cashflow.view',
+        'migration.view',
+        'reports.view',
+        'settings.view',
+        'security.view',
+        'mfa.setup',
+        'sessions.manage'
+    ),
+    'manager': (
+        'dashboard.view',
+        'users.view',
+        'hr.view',
+        'branches.view',
+        'warehouses.view',
+        'items.view',
+        'products.view',
+        'inventory.view',
+        'customers.view',
+        'vendors.view',
+        'sales.view',
+        'sales.create',
+        'purchase.view',
+        'accounting.view',
+        'pos.view',
+        'cashflow.view',
+        'reports.view'
+    ),
+    'salesperson': (
+        'dashboard.view',
+        'customers.view',
+        'customers.create',
+        'customers.update',
+        'sales.view',
+        'sales.create',
+        'sales.update',
+        'products.view',
+        'inventory.view',
+        'pos.view',
+        'cashflow.view',
+        'reports.view'
+    ),
+    'inventory': (
+        'dashboard.view',
+        'items.view',
+        'items.create',
+        'items.update',
+        'products.view',
+        'inventory.view',
+        'inventory.create',
+        'inventory.update',
+        'warehouses.view'
+    ),
+    'accountant': (
+        'dashboard.view',
+        'accounting.view',
+        'accounting.create',
+        'accounting.update',
+        'cashflow.view',
+        'reports.view',
+        'sales.view',
+        'purchase.view'
+    ),
+    'cashier': (
+        'dashboard.view',
+        'pos.view',
+        'pos.create',
+        'sales.view',
+        'sales.create',
+        'customers.view',
+        'products.view'
+    ),
+    'hr': (
+        'dashboard.view',
+        'hr.view',
+        'hr.create',
+        'hr.update',
+        'users.view',
+        'reports.view'
+    ),
+    'viewer': (
+        'dashboard.view',
+        'reports.view'
+    )
+}
+
+DEFAULT_PERMISSIONS = ('dashboard.view',)
+
+
 def get_user_permissions(user: User) -> List[str]:
     """
     Get permissions based on user role
@@ -55,114 +165,7 @@ def get_user_permissions(user: User) -> List[str]:
     if 'sales' in role_name or 'salesperson' in role_name:
         role_name = 'salesperson'
 
-    # Define permissions for each role
-    permissions = {
-        'admin': [
-            'admin',
-            'dashboard.view',
-            'users.view',
-            'users.create',
-            'users.update',
-            'users.delete',
-            'hr.view',
-            'branches.view',
-            'warehouses.view',
-            'items.view',
-            'products.view',
-            'inventory.view',
-            'customers.view',
-            'vendors.view',
-            'sales.view',
-            'sales.create',
-            'purchase.view',
-            'accounting.view',
-            'pos.view',
-            'cashflow.view',
-            'migration.view',
-            'reports.view',
-            'settings.view',
-            'security.view',
-            'mfa.setup',
-            'sessions.manage'
-        ],
-        'manager': [
-            'dashboard.view',
-            'users.view',
-            'hr.view',
-            'branches.view',
-            'warehouses.view',
-            'items.view',
-            'products.view',
-            'inventory.view',
-            'customers.view',
-            'vendors.view',
-            'sales.view',
-            'sales.create',
-            'purchase.view',
-            'accounting.view',
-            'pos.view',
-            'cashflow.view',
-            'reports.view'
-        ],
-        'salesperson': [
-            'dashboard.view',
-            'customers.view',
-            'customers.create',
-            'customers.update',
-            'sales.view',
-            'sales.create',
-            'sales.update',
-            'products.view',
-            'inventory.view',
-            'pos.view',
-            'cashflow.view',
-            'reports.view'
-        ],
-        'inventory': [
-            'dashboard.view',
-            'items.view',
-            'items.create',
-            'items.update',
-            'products.view',
-            'inventory.view',
-            'inventory.create',
-            'inventory.update',
-            'warehouses.view'
-        ],
-        'accountant': [
-            'dashboard.view',
-            'accounting.view',
-            'accounting.create',
-            'accounting.update',
-            'cashflow.view',
-            'reports.view',
-            'sales.view',
-            'purchase.view'
-        ],
-        'cashier': [
-            'dashboard.view',
-            'pos.view',
-            'pos.create',
-            'sales.view',
-            'sales.create',
-            'customers.view',
-            'products.view'
-        ],
-        'hr': [
-            'dashboard.view',
-            'hr.view',
-            'hr.create',
-            'hr.update',
-            'users.view',
-            'reports.view'
-        ],
-        'viewer': [
-            'dashboard.view',
-            'reports.view'
-        ]
-    }
-
-    return permissions.get(role_name, ['dashboard.view'])
+    return list(ROLE_PERMISSIONS.get(role_name, DEFAULT_PERMISSIONS))
 
 
 def get_current_user(
@@ -11,6 +11,7 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.application.interfaces.repositories.order_repository import IOrderRepository
 from app.models import SalesOrder, Customer
+from app.services.document_sequence_service import DocumentSequenceService
 
 
 class OrderRepository(IOrderRepository):
@@ -148,6 +149,12 @@ class OrderRepository(IOrderRepository):
         )
         return result.scalar_one_or_none()
 
+    async def next_order_sequence(self, order_date: date) -> int:
+        """Allocate the next daily order sequence number."""
+        return await DocumentSequenceService(self.db).next_value_async(
+            "sales_order", period=order_date.strftime("%Y%m%d")
+        )
+
     async def get_by_customer(
         self,
         customer_id: int,
@@ -10,6 +10,7 @@ import time
 
 # Initialize structured logging
 from app.utils.logging_config import get_logger, log_api_request, log_api_response
+from app.tds.utils.correlation import CorrelationContext
 
 logger = get_logger(__name__)
 from app.models import (
@@ -62,43 +63,46 @@ async def log_requests(request: Request, call_next):
     if request.url.path in ["/health", "/metrics", "/favicon.ico"]:
         return await call_next(request)
 
-    start_time = time.time()
+    # Every log record of this request carries its correlation id
+    with CorrelationContext(correlation_id=request.headers.get("X-Request-ID")) as correlation:
+        start_time = time.time()
 
-    # Log incoming request
-    logger.info(
-        "api_request_received",
-        method=request.method,
-        path=str(request.url.path),
-        client_ip=request.client.host if request.client else "unknown",
-        user_agent=request.headers.get("user-agent", "unknown")
-    )
-
-    # Process request
-    try:
-        response = await call_next(request)
-        duration_ms = (time.time() - start_time) * 1000
-
-        # Log response
+        # Log incoming request
         logger.info(
-            "api_response_sent",
+            "api_request_received",
             method=request.method,
             path=str(request.url.path),
-            status_code=response.status_code,
-            duration_ms=round(duration_ms, 2)
+            client_ip=request.client.host if request.client else "unknown",
+            user_agent=request.headers.get("user-agent", "unknown")
         )
 
-        return response
-    except Exception as e:
-        duration_ms = (time.time() - start_time) * 1000
-        logger.error(
-            "api_request_failed",
-            method=request.method,
-            path=str(request.url.path),
-            error=str(e),
-            duration_ms=round(duration_ms, 2),
-            exc_info=True
-        )
-        raise
+        # Process request
+        try:
+            response = await call_next(request)
+            duration_ms = (time.time() - start_time) * 1000
+
+            # Log response
+            logger.info(
+                "api_response_sent",
+                method=request.method,
+                path=str(request.url.path),
+                status_code=response.status_code,
+                duration_ms=round(duration_ms, 2)
+            )
+
+            response.headers["X-Request-ID"] = correlation.correlation_id
+            return response
+        except Exception as e:
+            duration_ms = (time.time() - start_time) * 1000
+            logger.error(
+                "api_request_failed",
+                method=request.method,
+                path=str(request.url.path),
+                error=str(e),
+                duration_ms=round(duration_ms, 2),
+                exc_info=True
+            )
+            raise
 
 # Startup event
 @app.on_event("startup")
@@ -123,6 +127,30 @@ async def startup_event():
     except Exception as e:
         logger.error("background_workers_failed", error=str(e), message="Failed to start background workers")
 
+    # Start Zoho bulk sync job runner (resumes interrupted jobs)
+    try:
+        from app.services.zoho_bulk_sync_service import start_bulk_sync_runner
+        await start_bulk_sync_runner()
+        logger.info("bulk_sync_runner_started", message="Zoho bulk sync runner started successfully")
+    except Exception as e:
+        logger.error("bulk_sync_runner_failed", error=str(e), message="Failed to start Zoho bulk sync runner")
+
+    # Start WhatsApp broadcast dispatcher (resumes queued broadcasts)
+    try:
+        from app.services.whatsapp_broadcast_service import start_broadcast_dispatcher
+        await start_broadcast_dispatcher()
+        logger.info("broadcast_dispatcher_started", message="WhatsApp broadcast dispatcher started successfully")
+    except Exception as e:
+        logger.error("broadcast_dispatcher_failed", error=str(e), message="Failed to start WhatsApp broadcast dispatcher")
+
+    # Start database backup job runner (fails jobs interrupted by a restart)
+    try:
+        from app.services.backup_service import start_backup_runner
+        await start_backup_runner()
+        logger.info("backup_runner_started", message="Backup job runner started successfully")
+    except Exception as e:
+        logger.error("backup_runner_failed", error=str(e), message="Failed to start backup job runner")
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -145,6 +173,30 @@ async def shutdown_event():
     except Exception as e:
         logger.error("background_workers_stop_failed", error=str(e), message="Failed to stop background workers")
 
+    # Stop Zoho bulk sync job runner (hands the running job back to the queue)
+    try:
+        from app.services.zoho_bulk_sync_service import stop_bulk_sync_runner
+        await stop_bulk_sync_runner()
+        logger.info("bulk_sync_runner_stopped", message="Zoho bulk sync runner stopped successfully")
+    except Exception as e:
+        logger.error("bulk_sync_runner_stop_failed", error=str(e), message="Failed to stop Zoho bulk sync runner")
+
+    # Stop WhatsApp broadcast dispatcher (hands unsent recipients back to the queue)
+    try:
+        from app.services.whatsapp_broadcast_service import stop_broadcast_dispatcher
+        await stop_broadcast_dispatcher()
+        logger.info("broadcast_dispatcher_stopped", message="WhatsApp broadcast dispatcher stopped successfully")
+    except Exception as e:
+        logger.error("broadcast_dispatcher_stop_failed", error=str(e), message="Failed to stop WhatsApp broadcast dispatcher")
+
+    # Stop database backup jobs (kills pg_dump/pg_restore, removes partial files)
+    try:
+        from app.services.backup_service import stop_backup_runner
+        await stop_backup_runner()
+        logger.info("backup_runner_stopped", message="Backup job runner stopped successfully")
+    except Exception as e:
+        logger.error("backup_runner_stop_failed", error=str(e), message="Failed to stop backup job runner")
+
 # CORS Configuration - Secure settings for production
 from app.core.config import settings
 
@@ -261,7 +313,7 @@ from app.routers.notifications import router as notifications_router  # Unified
 # ============================================================================
 # TDS API Routers - Consolidated Zoho Integration Layer
 from app.tds.api import webhooks_router as tds_webhooks_router  # TDS webhook receiver (NEW - Consolidated)
-# from app.routers.zoho_bulk_sync import router as zoho_bulk_sync_router  # TDS bulk sync (missing sync_with_caching dependency)
+from app.routers.zoho_bulk_sync import router as zoho_bulk_sync_router  # TDS bulk sync jobs
 from app.routers.data_investigation import router as data_investigation_router  # Daily data investigation reports
 # DEPRECATED: from app.routers.zoho_webhooks import router as zoho_webhooks_router  # Old router - replaced by TDS API
 
@@ -426,7 +478,7 @@ app.include_router(consumer_api_router, prefix="/api/consumer", tags=["Consumer
 # ============================================================================
 # ✅ TDS Webhooks - Consolidated in TDS module per architecture
 app.include_router(tds_webhooks_router, prefix="/api/tds/webhooks", tags=["TDS Core - Webhooks"])
-# app.include_router(zoho_bulk_sync_router, prefix="/api/zoho/bulk-sync", tags=["TDS Core - Bulk Sync"])  # Missing dependency
+app.include_router(zoho_bulk_sync_router, prefix="/api/zoho/bulk-sync", tags=["TDS Core - Bulk Sync"])
 app.include_router(data_investigation_router, tags=["Data Investigation - Daily Monitoring"])
 
 # Legacy Zoho routers REMOVED:
@@ -16,12 +16,18 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import math
 import time
-from collections import defaultdict
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 
+from redis.exceptions import NoScriptError
+
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,47 +35,204 @@ logger = logging.getLogger(__name__)
 # RATE LIMITING
 # ============================================================================
 
+# GCRA (generic cell rate algorithm): one stored number per key, the
+# "theoretical arrival time" (TAT). Each request pushes the TAT one emission
+# interval (period / limit) into the future; a request is refused when that
+# would put the TAT more than one period ahead of now. This allows a burst
+# of `limit` requests and then one request every period / limit seconds,
+# with O(1) state per key instead of a timestamp log.
+GCRA_EPSILON = 1e-9
+
+GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > period + 1e-9 then
+    return {0, tostring(new_tat - now - period), 0}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0', math.floor((period - (new_tat - now)) / interval + 1e-9)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """
+    A limit of `limit` requests per `period_seconds`
+
+    path_markers: substrings of the path the policy applies to (empty = all)
+    per_principal: key by the authenticated user when a valid bearer token is
+        present, otherwise (and always when False) by client IP
+    """
+    name: str
+    limit: int
+    period_seconds: float
+    path_markers: Tuple[str, ...] = ()
+    per_principal: bool = True
+
+    @property
+    def interval(self) -> float:
+        return self.period_seconds / self.limit
+
+    def matches(self, path: str) -> bool:
+        return not self.path_markers or any(marker in path for marker in self.path_markers)
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    policy: RateLimitPolicy
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed
+
+
+DEFAULT_POLICIES: Tuple[RateLimitPolicy, ...] = (
+    RateLimitPolicy("login", 5, 60, ("/auth/login", "/login"), per_principal=False),
+    RateLimitPolicy("api", 1000, 60, ("/api/",)),
+    RateLimitPolicy("default", 100, 60),
+)
+
+
+def gcra(tat: Optional[float], now: float, interval: float, period: float) -> Tuple[bool, float, float, int]:
+    """
+    One GCRA step (the same arithmetic as GCRA_LUA)
+
+    Returns:
+        (allowed, stored_tat, retry_after, remaining)
+    """
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval
+    if new_tat - now > period + GCRA_EPSILON:
+        return False, tat, new_tat - now - period, 0
+    return True, new_tat, 0.0, int((period - (new_tat - now)) / interval + GCRA_EPSILON)
+
+
 class RateLimiter:
     """
-    Simple in-memory rate limiter.
-    For production, consider Redis-based rate limiting.
+    Rate limiter shared by all workers through Redis
+
+    Each decision is one EVALSHA of GCRA_LUA, so concurrent workers cannot
+    race between reading and writing a key. Without Redis (or while it is
+    unreachable) the same algorithm runs in process over a bounded LRU of
+    keys; limits are then enforced per worker.
     """
 
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.limits = {
-            "default": (100, 60),  # 100 requests per 60 seconds
-            "login": (5, 60),       # 5 login attempts per 60 seconds
-            "api": (1000, 60),      # 1000 API calls per 60 seconds
-        }
+    def __init__(
+        self,
+        policies: Sequence[RateLimitPolicy] = DEFAULT_POLICIES,
+        redis_client=None,
+        clock: Callable[[], float] = time.time,
+        max_local_keys: int = 100_000,
+        key_prefix: str = "ratelimit"
+    ):
+        self.policies = tuple(policies)
+        self.clock = clock
+        self.max_local_keys = max_local_keys
+        self.key_prefix = key_prefix
+        self._local: "OrderedDict[str, float]" = OrderedDict()
+        self._redis = redis_client
+        self._redis_resolved = redis_client is not None
+        self._script_sha: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Policy and key selection
+    # ------------------------------------------------------------------
+
+    def policy_for(self, path: str) -> RateLimitPolicy:
+        """First policy whose path markers match (the last one should be a catch-all)"""
+        for policy in self.policies:
+            if policy.matches(path):
+                return policy
+        return self.policies[-1]
+
+    def policy_named(self, name: str) -> RateLimitPolicy:
+        for policy in self.policies:
+            if policy.name == name:
+                return policy
+        return self.policies[-1]
+
+    @staticmethod
+    def principal_for(request: Request, policy: RateLimitPolicy) -> str:
+        """Authenticated user (verified bearer token) or client IP"""
+        if policy.per_principal:
+            authorization = request.headers.get("authorization", "")
+            if authorization.startswith("Bearer "):
+                from app.services.auth_service import AuthService
+                token_data = AuthService.verify_token(authorization[7:])
+                if token_data:
+                    return f"user:{token_data['email']}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    # ------------------------------------------------------------------
+    # Decisions
+    # ------------------------------------------------------------------
+
+    async def hit(self, principal: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        """Count one request of `principal` against `policy`"""
+        key = f"{self.key_prefix}:{policy.name}:{principal}"
+        now = self.clock()
+
+        client = await self._client()
+        if client is not None:
+            try:
+                allowed, retry_after, remaining = await self._redis_hit(client, key, now, policy)
+                return RateLimitDecision(bool(allowed), policy, int(remaining), float(retry_after))
+            except Exception as e:
+                logger.warning(f"Rate limiter falling back to in-process limits: {e}")
 
-    def is_allowed(self, key: str, limit_type: str = "default") -> bool:
-        """
-        Check if request is allowed based on rate limit.
-
-        Args:
-            key: Identifier (usually IP address or user ID)
-            limit_type: Type of limit to apply
-
-        Returns:
-            bool: True if request is allowed
-        """
-        max_requests, window_seconds = self.limits.get(limit_type, self.limits["default"])
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=window_seconds)
-
-        # Remove old requests
-        self.requests[key] = [
-            req_time for req_time in self.requests[key]
-            if req_time > cutoff
-        ]
+        return self._local_hit(key, now, policy)
 
-        # Check if under limit
-        if len(self.requests[key]) < max_requests:
-            self.requests[key].append(now)
-            return True
+    async def check(self, request: Request) -> RateLimitDecision:
+        policy = self.policy_for(request.url.path)
+        return await self.hit(self.principal_for(request, policy), policy)
 
-        return False
+    def is_allowed(self, key: str, limit_type: str = "default") -> bool:
+        """In-process check for callers outside the request path"""
+        policy = self.policy_named(limit_type)
+        return self._local_hit(f"{self.key_prefix}:{policy.name}:{key}", self.clock(), policy).allowed
+
+    def _local_hit(self, key: str, now: float, policy: RateLimitPolicy) -> RateLimitDecision:
+        allowed, tat, retry_after, remaining = gcra(
+            self._local.get(key), now, policy.interval, policy.period_seconds
+        )
+        # Least recently used keys go first; an evicted key just starts refilled
+        self._local[key] = tat
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_keys:
+            self._local.popitem(last=False)
+        return RateLimitDecision(allowed, policy, remaining, retry_after)
+
+    async def _redis_hit(self, client, key: str, now: float, policy: RateLimitPolicy):
+        args = (key, repr(now), repr(policy.interval), repr(policy.period_seconds))
+        if self._script_sha is None:
+            self._script_sha = await client.script_load(GCRA_LUA)
+        try:
+            return await client.evalsha(self._script_sha, 1, *args)
+        except NoScriptError:
+            # Redis restarted and lost its script cache
+            self._script_sha = await client.script_load(GCRA_LUA)
+            return await client.evalsha(self._script_sha, 1, *args)
+
+    async def _client(self):
+        if not self._redis_resolved:
+            self._redis_resolved = True
+            if settings.REDIS_ENABLED:
+                try:
+                    import redis.asyncio as redis
+                    self._redis = redis.from_url(
+                        settings.REDIS_URL, decode_responses=True,
+                        socket_connect_timeout=2, socket_timeout=2
+                    )
+                    await self._redis.ping()
+                except Exception as e:
+                    logger.warning(f"Redis unavailable for rate limiting, using in-process limits: {e}")
+                    self._redis = None
+        return self._redis
 
 
 rate_limiter = RateLimiter()
@@ -119,46 +282,46 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     Prevents abuse and DoS attacks.
     """
 
-    def __init__(self, app: ASGIApp, excluded_paths: list = None):
+    def __init__(self, app: ASGIApp, excluded_paths: list = None, limiter: Optional[RateLimiter] = None):
         super().__init__(app)
         self.excluded_paths = excluded_paths or ["/docs", "/redoc", "/openapi.json", "/health"]
+        self.limiter = limiter or rate_limiter
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Skip rate limiting for excluded paths
         if any(request.url.path.startswith(path) for path in self.excluded_paths):
             return await call_next(request)
 
-        # Get client identifier
-        client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "")
-
-        # Determine rate limit type based on path
-        limit_type = "default"
-        if "/auth/login" in request.url.path or "/login" in request.url.path:
-            limit_type = "login"
-        elif "/api/" in request.url.path:
-            limit_type = "api"
+        # Check rate limit (policy by path, key by user or client IP)
+        decision = await self.limiter.check(request)
+        limit_headers = {
+            "X-RateLimit-Limit": str(decision.policy.limit),
+            "X-RateLimit-Remaining": str(decision.remaining),
+        }
 
-        # Check rate limit
-        if not rate_limiter.is_allowed(f"{client_ip}:{user_agent}", limit_type):
+        if not decision.allowed:
+            retry_after = max(1, math.ceil(decision.retry_after))
+            client_ip = request.client.host if request.client else "unknown"
             logger.warning(
                 f"Rate limit exceeded for {client_ip} on {request.url.path}",
                 extra={
                     "client_ip": client_ip,
                     "path": request.url.path,
-                    "user_agent": user_agent
+                    "policy": decision.policy.name
                 }
             )
             return JSONResponse(
                 status_code=429,
                 content={
                     "detail": "Too many requests. Please try again later.",
-                    "retry_after": 60
+                    "retry_after": retry_after
                 },
-                headers={"Retry-After": "60"}
+                headers={"Retry-After": str(retry_after), **limit_headers}
             )
 
-        return await call_next(request)
+        response = await call_next(request)
+        response.headers.update(limit_headers)
+        return response
 
 
 # ============================================================================
@@ -330,5 +493,8 @@ __all__ = [
     'RateLimitMiddleware',
     'RequestValidationMiddleware',
     'AuditLoggingMiddleware',
+    'RateLimiter',
+    'RateLimitPolicy',
+    'DEFAULT_POLICIES',
     'rate_limiter'
 ]
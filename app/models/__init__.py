@@ -11,14 +11,15 @@ from .sales import SalesOrder, SalesItem
 from .purchase import PurchaseOrder, PurchaseItem
 from .accounting import (
     Currency, ExchangeRate, ChartOfAccounts, Account, 
-    Journal, JournalEntry, JournalLine, FiscalYear, AccountingPeriod
+    Journal, JournalEntry, JournalLine, FiscalYear, AccountingPeriod, AccountPeriodBalance
 )
 from .invoice import (
-    SalesInvoice, PurchaseInvoice, SalesInvoiceItem, PurchaseInvoiceItem, InvoicePayment
+    SalesInvoice, PurchaseInvoice, SalesInvoiceItem, PurchaseInvoiceItem, InvoicePayment,
+    InvoiceAging
 )
 from .pos import (
     POSTerminal, POSSession, POSTransaction, POSTransactionItem,
-    POSPayment, POSDiscount, POSPromotion
+    POSPayment, POSDiscount, POSPromotion, POSDailySales
 )
 # Multi-tenancy Models (disabled in unified database)
 # from .tenant import Tenant, TenantSettings
@@ -49,8 +50,11 @@ from .money_transfer import (
     MoneyTransfer, TransferPlatform
 )
 from .salesperson import (
-    SalespersonGPSLocation, SalespersonCommission, SalespersonTarget, SalespersonDailySummary
+    SalespersonGPSLocation, SalespersonCommission, SalespersonTarget, SalespersonDailySummary,
+    SalespersonLeaderboardRank
 )
+from .document_sequence import DocumentSequence
+from .backup_job import BackupJob
 from .pricing import (
     PricingList, ProductPrice, PriceListCategory, PriceHistory, 
     PriceNegotiationRequest, CustomerPriceCategory
@@ -59,7 +63,7 @@ from .ai_assistant import (
     AIConversation, AIConversationMessage, AIGeneratedOrder, AISupportTicket
 )
 from .whatsapp import (
-    WhatsAppMessage, WhatsAppBroadcast, WhatsAppAutoResponse
+    WhatsAppMessage, WhatsAppBroadcast, WhatsAppBroadcastRecipient, WhatsAppAutoResponse
 )
 from .hr import (
     Employee, Department, Position, PayrollRecord, AttendanceRecord,
@@ -86,8 +90,9 @@ from .migration import (
 
 # Zoho Sync Models (unified from TDS Core)
 from .zoho_sync import (
-    TDSInboxEvent, TDSSyncQueue, TDSDeadLetterQueue, TDSSyncLog, TDSAlert,
-    EventStatus, SourceType, EntityType, AlertSeverity
+    TDSInboxEvent, TDSSyncQueue, TDSDeadLetterQueue, TDSSyncLog, TDSAlert, TDSBulkSyncJob,
+    TDSSyncPlan, TDSSyncPlanEntry, TDSZohoOAuthToken,
+    EventStatus, SourceType, EntityType, AlertSeverity, BulkSyncJobStatus
 )
 
 # Data Investigation Models
@@ -121,12 +126,13 @@ __all__ = [
     "PurchaseOrder", "PurchaseItem",
     # Accounting models
     "Currency", "ExchangeRate", "ChartOfAccounts", "Account",
-    "Journal", "JournalEntry", "JournalLine", "FiscalYear", "AccountingPeriod",
+    "Journal", "JournalEntry", "JournalLine", "FiscalYear", "AccountingPeriod", "AccountPeriodBalance",
     # Invoice models
     "SalesInvoice", "PurchaseInvoice", "SalesInvoiceItem", "PurchaseInvoiceItem", "InvoicePayment",
+    "InvoiceAging",
     # POS models
     "POSTerminal", "POSSession", "POSTransaction", "POSTransactionItem",
-    "POSPayment", "POSDiscount", "POSPromotion",
+    "POSPayment", "POSDiscount", "POSPromotion", "POSDailySales",
     # Cash Flow models
     "CashBox", "SalespersonRegion", "CashTransaction", "CashTransfer", "CashFlowSummary",
     # Expense models
@@ -135,13 +141,18 @@ __all__ = [
     "MoneyTransfer", "TransferPlatform",
     # Salesperson models (Field Sales App 06)
     "SalespersonGPSLocation", "SalespersonCommission", "SalespersonTarget", "SalespersonDailySummary",
+    "SalespersonLeaderboardRank",
+    # Document numbering
+    "DocumentSequence",
+    # Database backup jobs
+    "BackupJob",
     # Pricing models
     "PricingList", "ProductPrice", "PriceListCategory", "PriceHistory", 
     "PriceNegotiationRequest", "CustomerPriceCategory",
     # AI Assistant models
     "AIConversation", "AIConversationMessage", "AIGeneratedOrder", "AISupportTicket",
     # WhatsApp models
-    "WhatsAppMessage", "WhatsAppBroadcast", "WhatsAppAutoResponse",
+    "WhatsAppMessage", "WhatsAppBroadcast", "WhatsAppBroadcastRecipient", "WhatsAppAutoResponse",
         # HR models
     "Employee", "Department", "Position", "PayrollRecord", "AttendanceRecord",
     "LeaveRequest", "PerformanceReview", "HRDashboardMetrics",
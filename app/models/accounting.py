@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Numeric, Date, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from app.db.database import Base
@@ -128,6 +128,29 @@ class Account(Base):
     expenses = relationship("Expense", back_populates="account")
 
 
+class AccountPeriodBalance(Base):
+    """أرصدة الحسابات الشهرية - Posted debit/credit totals per account and month
+
+    Updated in the same transaction that posts a journal entry (by entry_date
+    month). Statements as of a date add closed months from here to one
+    grouped query over the current month's lines.
+    """
+    __tablename__ = "account_period_balances"
+    __table_args__ = (
+        UniqueConstraint('account_id', 'period_start', name='uq_account_period_balance'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    period_start = Column(Date, nullable=False, index=True)  # First day of the month
+    debit_total = Column(Numeric(15, 2), nullable=False, default=0)
+    credit_total = Column(Numeric(15, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    account = relationship("Account")
+
+
 class Journal(Base):
     """دفتر اليومية - Journal"""
     __tablename__ = "journals"
@@ -150,6 +173,9 @@ class Journal(Base):
 class JournalEntry(Base):
     """قيد يومية - Journal Entry"""
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index('idx_journal_entries_status_entry_date', 'status', 'entry_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     journal_id = Column(Integer, ForeignKey("journals.id"), nullable=False)
@@ -190,6 +216,9 @@ class JournalEntry(Base):
 class JournalLine(Base):
     """سطر قيد يومية - Journal Line"""
     __tablename__ = "journal_lines"
+    __table_args__ = (
+        Index('idx_journal_lines_entry_account', 'journal_entry_id', 'account_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False)
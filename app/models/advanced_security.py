@@ -154,6 +154,14 @@ class Role(Base):
     users = relationship("User", back_populates="role")
     restriction_groups = relationship("RoleRestrictionGroup", back_populates="role")
 
+class SecurityRoleClosure(Base):
+    """Role hierarchy closure: one row per (ancestor, descendant) pair, each role included at depth 0"""
+    __tablename__ = "security_role_closure"
+    
+    ancestor_id = Column(Integer, ForeignKey("security_roles.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("security_roles.id", ondelete="CASCADE"), primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)  # 0 = the role itself, 1 = parent, ...
+
 class RolePermissionMapping(Base):
     """Role to Permission mapping with conditions"""
     __tablename__ = "role_permission_mappings"
@@ -0,0 +1,78 @@
+"""
+Database backup jobs
+
+Backup, restore and verify runs queued by the settings API and executed by
+BackupJobRunner. Rows are shared by every worker process, so any worker can
+report on a job and only one job runs at a time across all of them.
+"""
+
+import enum
+
+from sqlalchemy import JSON, Column, DateTime, Enum, Integer, String, Text, func
+
+from app.db.database import Base
+
+
+class BackupJobKind(str, enum.Enum):
+    """What a backup job does"""
+    BACKUP = "backup"
+    RESTORE = "restore"
+    VERIFY = "verify"
+
+
+class BackupJobStatus(str, enum.Enum):
+    """Backup job lifecycle"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class BackupJob(Base):
+    """
+    One backup, restore or verification
+
+    options are the BackupService call arguments, result is what it
+    returned (the manifest for a backup). runner_id names the worker that
+    claimed the job.
+    """
+    __tablename__ = "backup_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(
+        Enum(BackupJobKind, name="backup_job_kind", values_callable=lambda x: [e.value for e in x]),
+        nullable=False
+    )
+    options = Column(JSON, nullable=False, default=dict)
+    requested_by = Column(Integer)
+
+    status = Column(
+        Enum(BackupJobStatus, name="backup_job_status", values_callable=lambda x: [e.value for e in x]),
+        default=BackupJobStatus.QUEUED,
+        nullable=False,
+        index=True
+    )
+    result = Column(JSON)
+    error = Column(Text)
+    runner_id = Column(String(100))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind.value,
+            "status": self.status.value,
+            "options": self.options,
+            "requested_by": self.requested_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"<BackupJob {self.id} {self.kind.value} {self.status.value}>"
@@ -5,7 +5,7 @@ Cash Flow Management Models
 This module contains models for managing cash flow, cash boxes, transfers, and branch-specific accounting.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, Enum as SQLEnum, false, text
 from sqlalchemy.types import Numeric
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -184,11 +184,20 @@ class CashTransaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     created_by = Column(Integer, ForeignKey("users.id"))
     
+    # Included in the branch daily rollup (CashFlowSummary DAILY)
+    rolled_up = Column(Boolean, default=False, server_default=false(), nullable=False)
+    
     # Relationships
     cash_box = relationship("CashBox", back_populates="transactions")
     customer = relationship("User", foreign_keys=[customer_id])
     creator = relationship("User", foreign_keys=[created_by])
     
+    __table_args__ = (
+        # Dashboard reads today's rows that are not in the rollup yet
+        Index('idx_cash_transactions_pending_rollup', 'transaction_date',
+              postgresql_where=text('NOT rolled_up'), sqlite_where=text('NOT rolled_up')),
+    )
+    
     def __repr__(self):
         return f"<CashTransaction {self.transaction_number}: {self.amount} {self.currency_code}>"
 
@@ -252,6 +261,10 @@ class CashFlowSummary(Base):
     """
     ملخص التدفق النقدي - Cash Flow Summary
     Daily/Monthly summaries for dashboard reporting
+
+    Branch daily rollup: summary_type DAILY with user_id NULL, one row per
+    branch per day (summary_date at midnight), incremented on every cash
+    transaction by CashFlowRollupService.
     """
     __tablename__ = "cash_flow_summaries"
 
@@ -287,5 +300,10 @@ class CashFlowSummary(Base):
     branch = relationship("Branch")
     user = relationship("User", foreign_keys=[user_id])
     
+    __table_args__ = (
+        Index('uq_cash_flow_summary_branch_period', 'branch_id', 'summary_date', 'summary_type',
+              unique=True, postgresql_where=text('user_id IS NULL'), sqlite_where=text('user_id IS NULL')),
+    )
+    
     def __repr__(self):
         return f"<CashFlowSummary {self.summary_date}: Branch {self.branch_id}>"
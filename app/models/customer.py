@@ -33,6 +33,7 @@ class Customer(Base):
     zoho_contact_id = Column(String(100), unique=True, nullable=True, index=True)  # Zoho Books contact ID
     zoho_owner_id = Column(String(100), nullable=True, index=True)  # Zoho user ID (owner/salesperson)
     zoho_last_sync = Column(DateTime(timezone=True), nullable=True)  # Last sync timestamp
+    zoho_content_hash = Column(String(64), nullable=True)  # Hash of the last applied Zoho content (sync planner)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+
+class DocumentSequence(Base):
+    """
+    Document number counter per (document type, branch, period)
+
+    One row per counter; numbers are handed out with a single
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING by DocumentSequenceService.
+
+    - branch_id 0 = counter shared by all branches
+    - period '' = never resets; otherwise a date key (YYYYMMDD) or another
+      sub-scope such as a POS session number
+    """
+    __tablename__ = "document_sequences"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_type = Column(String(50), nullable=False)
+    branch_id = Column(Integer, nullable=False, default=0, server_default="0")
+    period = Column(String(50), nullable=False, default="", server_default="")
+    next_value = Column(BigInteger, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("document_type", "branch_id", "period", name="uq_document_sequence_scope"),
+    )
+
+    def __repr__(self):
+        return f"<DocumentSequence {self.document_type}/{self.branch_id}/{self.period}: {self.next_value}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Date, Numeric, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Date, Numeric, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -37,6 +37,9 @@ class PaymentTermsEnum(str, enum.Enum):
 class SalesInvoice(Base):
     """فواتير المبيعات - Sales Invoices"""
     __tablename__ = "sales_invoices"
+    __table_args__ = (
+        Index('idx_sales_invoices_due_date_id', 'due_date', 'id'),  # Overdue keyset pagination
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(100), unique=True, nullable=False, index=True)
@@ -151,6 +154,9 @@ class SalesInvoiceItem(Base):
 class PurchaseInvoice(Base):
     """فواتير المشتريات - Purchase Invoices"""
     __tablename__ = "purchase_invoices"
+    __table_args__ = (
+        Index('idx_purchase_invoices_due_date_id', 'due_date', 'id'),  # Overdue keyset pagination
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(100), unique=True, nullable=False, index=True)
@@ -298,3 +304,24 @@ class InvoicePayment(Base):
 
     def __repr__(self):
         return f"<InvoicePayment {self.payment_number}: {self.amount}>"
+
+
+class InvoiceAging(Base):
+    """أعمار الفواتير المفتوحة - Open invoice balances by due date
+
+    Maintained by InvoiceService on every status, payment and amount change.
+    Keyed by due date rather than by bucket so rows never move as days pass;
+    aging buckets are computed from it at read time.
+    """
+    __tablename__ = "invoice_aging"
+    __table_args__ = (
+        UniqueConstraint('invoice_type', 'branch_id', 'due_date', name='uq_invoice_aging_scope'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_type = Column(String(20), nullable=False)  # SALES, PURCHASE
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    due_date = Column(Date, nullable=False)
+    open_count = Column(Integer, nullable=False, default=0)
+    open_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
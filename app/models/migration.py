@@ -421,6 +421,7 @@ class MigrationVendor(Base):
     # Zoho migration data
     zoho_vendor_id = Column(String(100), index=True)
     zoho_last_sync = Column(DateTime)
+    zoho_content_hash = Column(String(64))  # Hash of the last applied Zoho content (sync planner)
     
     # Audit fields
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Numeric, Date, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
@@ -108,6 +108,9 @@ class POSSession(Base):
 class POSTransaction(Base):
     """معاملة نقاط البيع - POS Transaction"""
     __tablename__ = "pos_transactions"
+    __table_args__ = (
+        Index('idx_pos_transactions_date_terminal', 'transaction_date', 'terminal_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_number = Column(String(50), unique=True, nullable=False, index=True)
@@ -277,3 +280,37 @@ class POSPromotion(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class POSDailySales(Base):
+    """ملخص مبيعات نقاط البيع اليومي - POS Daily Sales Rollup
+
+    One row per closed day, terminal and cashier. Sales reports read closed
+    days from here and only aggregate pos_transactions for open days.
+    Payment columns are net of refunds.
+    """
+    __tablename__ = "pos_daily_sales"
+    __table_args__ = (
+        UniqueConstraint('summary_date', 'terminal_id', 'cashier_id', name='uq_pos_daily_sales_scope'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    summary_date = Column(Date, nullable=False, index=True)
+    terminal_id = Column(Integer, ForeignKey("pos_terminals.id"), nullable=False)
+    cashier_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    sale_count = Column(Integer, nullable=False, default=0)
+    refund_count = Column(Integer, nullable=False, default=0)
+    total_sales = Column(Numeric(15, 2), nullable=False, default=0)
+    total_refunds = Column(Numeric(15, 2), nullable=False, default=0)
+    total_discounts = Column(Numeric(15, 2), nullable=False, default=0)
+    total_tax = Column(Numeric(15, 2), nullable=False, default=0)
+
+    # Payments by method
+    cash_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    card_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    mobile_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    credit_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    voucher_amount = Column(Numeric(15, 2), nullable=False, default=0)
+
+    calculated_at = Column(DateTime, default=datetime.utcnow)
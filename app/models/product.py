@@ -71,6 +71,7 @@ class Product(Base):
 
     # Zoho integration
     zoho_item_id = Column(String(100), nullable=True, unique=True, index=True)  # Zoho Books Item ID
+    zoho_content_hash = Column(String(64), nullable=True)  # Hash of the last applied Zoho content (sync planner)
     cdn_image_url = Column(String(500), nullable=True)  # CDN image URL
     image_name = Column(String(500), nullable=True)  # Image filename
     image_type = Column(String(50), nullable=True)  # Image MIME type
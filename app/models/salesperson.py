@@ -9,7 +9,7 @@ Business Context:
 - Sales target tracking and leaderboards
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Date, Numeric
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Date, Numeric, UniqueConstraint, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -32,11 +32,21 @@ class SalespersonGPSLocation(Base):
     - Used by mobile app for automatic background tracking
     - Supports offline mode (batch sync when online)
     - Customer visit verification with proximity checks
+
+    Storage:
+    - Range-partitioned by month on `timestamp` (see GPSIngestionService)
+    - Primary key and unique keys include `timestamp` as partitioning requires
+    - (salesperson_id, device_id, timestamp) is unique so re-sent offline
+      batches are ignored
     """
     __tablename__ = "salesperson_gps_locations"
+    __table_args__ = (
+        UniqueConstraint("salesperson_id", "device_id", "timestamp", name="uq_gps_salesperson_device_timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    location_uuid = Column(String(36), unique=True, default=lambda: str(uuid.uuid4()), index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    location_uuid = Column(String(36), default=lambda: str(uuid.uuid4()), index=True)
 
     # Salesperson tracking
     salesperson_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -50,7 +60,7 @@ class SalespersonGPSLocation(Base):
     heading = Column(Float)  # Direction in degrees (0-360)
 
     # Timing
-    timestamp = Column(DateTime, nullable=False, index=True)
+    timestamp = Column(DateTime, primary_key=True, nullable=False, index=True)
     recorded_at = Column(DateTime, default=datetime.utcnow)
 
     # Activity context
@@ -63,7 +73,7 @@ class SalespersonGPSLocation(Base):
     # Battery and device info
     battery_level = Column(Integer)  # 0-100
     is_charging = Column(Boolean)
-    device_id = Column(String(100))
+    device_id = Column(String(100), nullable=False, default="", server_default="")  # "" = unknown device
 
     # Sync status
     is_synced = Column(Boolean, default=False, index=True)
@@ -261,10 +271,15 @@ class SalespersonDailySummary(Base):
     # Commission
     daily_commission = Column(Numeric(12, 2), default=0)
 
-    # GPS tracking
-    total_distance_km = Column(Numeric(8, 2), default=0)
+    # GPS tracking (maintained incrementally by GPSDailySummarizer)
+    total_distance_km = Column(Numeric(10, 3), default=0)
     total_time_hours = Column(Numeric(6, 2), default=0)
     gps_points_count = Column(Integer, default=0)
+    route_start_at = Column(DateTime)
+    route_end_at = Column(DateTime)
+    last_latitude = Column(Numeric(10, 8))
+    last_longitude = Column(Numeric(11, 8))
+    route_point_ids = Column(JSON)  # Douglas-Peucker simplified route; NULL = not built yet
 
     # Activity
     customer_visits = Column(Integer, default=0)
@@ -285,5 +300,50 @@ class SalespersonDailySummary(Base):
 
     # Unique constraint: one summary per salesperson per day
     __table_args__ = (
+        Index('idx_daily_summary_unique', 'salesperson_id', 'summary_date', unique=True),
         {'sqlite_autoincrement': True},
     )
+
+
+class SalespersonLeaderboardRank(Base):
+    """
+    Materialized Commission Leaderboard
+
+    One row per salesperson and leaderboard period, written in a single
+    INSERT ... SELECT with window functions by CommissionLeaderboardService.
+    Refreshed when a period's commissions change; the home-screen
+    leaderboard reads a page of rows by (rank, salesperson_id) keyset.
+    """
+    __tablename__ = "salesperson_leaderboard_ranks"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Period (as computed by the leaderboard endpoint)
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False)
+
+    # Salesperson
+    salesperson_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    salesperson_name = Column(String(100), nullable=False)
+
+    # Ranking (RANK() OVER the period; ties share a rank)
+    rank = Column(Integer, nullable=False)
+    total_participants = Column(Integer, nullable=False, default=0)
+    team_total_sales = Column(Numeric(14, 2), nullable=False, default=0)
+
+    # Metrics
+    total_sales = Column(Numeric(12, 2), nullable=False, default=0)
+    total_commission = Column(Numeric(12, 2), nullable=False, default=0)
+    total_orders = Column(Integer, nullable=False, default=0)
+    total_customers = Column(Integer, nullable=False, default=0)
+    target_achievement_percentage = Column(Numeric(9, 2))
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    salesperson = relationship("User", foreign_keys=[salesperson_id])
+
+    __table_args__ = (
+        UniqueConstraint('period_start', 'period_end', 'salesperson_id', name='uq_leaderboard_period_salesperson'),
+        Index('idx_leaderboard_period_rank', 'period_start', 'period_end', 'rank', 'salesperson_id'),
+    )
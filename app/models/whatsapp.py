@@ -1,7 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, ForeignKey, Index
 from datetime import datetime
+import enum
 from app.db.database import Base
 
+
+class BroadcastRecipientStatus(str, enum.Enum):
+    """Delivery state of one broadcast recipient; webhook statuses only move it forward"""
+    QUEUED = "queued"        # Waiting for a dispatcher (or for its next retry)
+    SENDING = "sending"      # Claimed by a dispatcher until lease_expires_at
+    SENT = "sent"
+    DELIVERED = "delivered"
+    READ = "read"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 class WhatsAppMessage(Base):
     __tablename__ = "whatsapp_messages"
     
@@ -28,10 +40,50 @@ class WhatsAppBroadcast(Base):
     total_recipients = Column(Integer, default=0)
     sent_count = Column(Integer, default=0)
     failed_count = Column(Integer, default=0)
-    status = Column(String, default="pending")
+    delivered_count = Column(Integer, default=0)
+    read_count = Column(Integer, default=0)
+    parameters = Column(JSON)  # Template body parameters, in order
+    status = Column(String, default="pending")  # pending, sending, completed, cancelled
+    requested_by = Column(Integer)
     created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
     completed_at = Column(DateTime)
 
+class WhatsAppBroadcastRecipient(Base):
+    """
+    One recipient of a broadcast, sent by BroadcastDispatcher
+    A dispatcher owns a row only while its lease is current, so a broadcast
+    interrupted by a restart resumes with the rows that were not sent
+    """
+    __tablename__ = "whatsapp_broadcast_recipients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    broadcast_id = Column(Integer, ForeignKey("whatsapp_broadcasts.id"), nullable=False, index=True)
+    phone_number = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False, default=BroadcastRecipientStatus.QUEUED.value)
+
+    # Delivery
+    whatsapp_message_id = Column(String, unique=True, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    error_code = Column(Integer)
+    error_message = Column(Text)
+
+    # Lease
+    lease_owner = Column(String)
+    lease_expires_at = Column(DateTime)
+
+    # Timestamps
+    sent_at = Column(DateTime)
+    delivered_at = Column(DateTime)
+    read_at = Column(DateTime)
+    failed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_whatsapp_broadcast_recipients_phone', 'broadcast_id', 'phone_number', unique=True),
+        Index('idx_whatsapp_broadcast_recipients_claim', 'status', 'next_attempt_at', 'id'),
+    )
+
 class WhatsAppAutoResponse(Base):
     __tablename__ = "whatsapp_auto_responses"
     
@@ -58,6 +58,15 @@ class EntityType(str, enum.Enum):
     SUPPLIER = "SUPPLIER"  # Alternate key for vendors
 
 
+class BulkSyncJobStatus(str, enum.Enum):
+    """Bulk sync job lifecycle"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 class AlertSeverity(str, enum.Enum):
     """Alert severity level"""
     INFO = "info"
@@ -422,6 +431,170 @@ class TDSSyncCursor(Base):
         return f"<TDSSyncCursor(source={self.source_type}, entity={self.entity_type}, last_sync={self.last_sync_at})>"
 
 
+# ============================================================================
+# BULK SYNC JOBS - Resumable Bulk Imports
+# ============================================================================
+
+class TDSBulkSyncJob(Base):
+    """
+    Resumable bulk import of one Zoho entity type
+    Pages are fetched one at a time; next_page and the counters are
+    checkpointed in the same transaction as each page, and a runner owns the
+    job only while its lease is current, so a crashed runner's job is picked
+    up again from next_page once the lease expires
+    """
+    __tablename__ = "tds_bulk_sync_jobs"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Job Definition
+    entity_type = Column(String(50), nullable=False, index=True)  # sync.EntityType value
+    mode = Column(String(20), nullable=False, default="full")
+    params = Column(JSON, nullable=False, default=dict)  # Zoho list filters, frozen at creation
+    page_size = Column(Integer, nullable=False, default=200)
+    requested_by = Column(Integer)
+
+    # State
+    status = Column(
+        Enum(BulkSyncJobStatus, name="tds_bulk_sync_job_status", values_callable=lambda x: [e.value for e in x]),
+        default=BulkSyncJobStatus.QUEUED,
+        nullable=False,
+        index=True
+    )
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    error_message = Column(Text)
+
+    # Checkpoint
+    next_page = Column(Integer, default=1, nullable=False)
+    pages_completed = Column(Integer, default=0, nullable=False)
+    total_processed = Column(Integer, default=0, nullable=False)
+    total_success = Column(Integer, default=0, nullable=False)
+    total_failed = Column(Integer, default=0, nullable=False)
+    total_skipped = Column(Integer, default=0, nullable=False)
+
+    # Lease
+    lease_owner = Column(Text)
+    lease_expires_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, default=0, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    checkpointed_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+
+    # Indexes
+    __table_args__ = (
+        Index('idx_bulk_sync_jobs_claim', 'status', 'lease_expires_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<TDSBulkSyncJob(id={self.id}, entity={self.entity_type}, status={self.status}, next_page={self.next_page})>"
+
+
+# ============================================================================
+# OAUTH TOKENS - Shared Access Token and Refresh Lease
+# ============================================================================
+
+class TDSZohoOAuthToken(Base):
+    """
+    Zoho access token shared by every process using the same credentials
+    Used by ZohoTokenBroker when Redis is not available: the process whose
+    conditional UPDATE takes the refresh lease calls Zoho and publishes the
+    token here; all others reuse it. The refresh token itself is not stored.
+    """
+    __tablename__ = "tds_zoho_oauth_tokens"
+
+    client_key = Column(String(64), primary_key=True)  # hash of client id + refresh token
+    access_token = Column(Text)
+    expires_at = Column(DateTime(timezone=True))
+
+    # Refresh lease
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
+
+    refreshed_at = Column(DateTime(timezone=True))
+    refresh_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<TDSZohoOAuthToken(client_key={self.client_key[:8]}, expires_at={self.expires_at})>"
+
+
+# ============================================================================
+# SYNC PLANS - Dry-Run Diffs Applied Verbatim
+# ============================================================================
+
+class TDSSyncPlan(Base):
+    """
+    Exact diff between a Zoho source (export file or API) and a local table
+    Built by ZohoSyncPlanner one page at a time; execute_sync applies the
+    stored entries and nothing else
+    """
+    __tablename__ = "tds_sync_plans"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Plan Definition
+    entity_type = Column(String(50), nullable=False, index=True)  # item, customer, vendor
+    source = Column(String(20), nullable=False)  # export, zoho_api
+    source_ref = Column(Text)  # export path or API endpoint
+    field_mappings = Column(JSON, nullable=False)  # mapping snapshot the plan was built with
+    mapping_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="planned", index=True)  # planned, executing, executed, failed
+
+    # Counts
+    total_records = Column(Integer, default=0, nullable=False)
+    insert_count = Column(Integer, default=0, nullable=False)
+    update_count = Column(Integer, default=0, nullable=False)
+    unchanged_count = Column(Integer, default=0, nullable=False)
+    orphaned_count = Column(Integer, default=0, nullable=False)
+    invalid_count = Column(Integer, default=0, nullable=False)
+    field_changes = Column(JSON, nullable=False, default=dict)  # {column: records changing it}
+
+    # Execution
+    execution_stats = Column(JSON)
+    error_message = Column(Text)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    executed_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<TDSSyncPlan(id={self.id}, entity={self.entity_type}, status={self.status})>"
+
+
+class TDSSyncPlanEntry(Base):
+    """
+    One planned action: insert, update, unchanged, orphaned or invalid
+    values holds only what will be written (all mapped columns for inserts,
+    changed columns for updates); previous_hash is the local content hash
+    seen at planning time and guards the update against later drift
+    """
+    __tablename__ = "tds_sync_plan_entries"
+
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey("tds_sync_plans.id", ondelete="CASCADE"), nullable=False)
+    zoho_id = Column(String(100))
+    action = Column(String(20), nullable=False)
+    local_id = Column(Integer)
+    content_hash = Column(String(64))
+    previous_hash = Column(String(64))
+    changed_fields = Column(JSON)
+    values = Column(JSON)
+    error = Column(Text)
+
+    # Indexes
+    __table_args__ = (
+        Index('idx_sync_plan_entries_action', 'plan_id', 'action', 'id'),
+        Index('idx_sync_plan_entries_zoho_id', 'plan_id', 'zoho_id'),
+    )
+
+    def __repr__(self):
+        return f"<TDSSyncPlanEntry(plan={self.plan_id}, zoho_id={self.zoho_id}, action={self.action})>"
+
+
 # ============================================================================
 # AUDIT TRAIL - Immutable Change History
 # ============================================================================
@@ -61,9 +61,11 @@ class Settings(BaseSettings):
     event_poll_interval_ms: int = Field(default=1000, env="EVENT_POLL_INTERVAL_MS")
     event_retry_max_attempts: int = Field(default=3, env="EVENT_RETRY_MAX_ATTEMPTS")
     event_retention_days: int = Field(default=90, env="EVENT_RETENTION_DAYS")
+    low_stock_reconcile_minutes: int = Field(default=60, env="LOW_STOCK_RECONCILE_MINUTES")
 
     # Notification Settings
     notification_batch_size: int = Field(default=50, env="NOTIFICATION_BATCH_SIZE")
+    notification_delivery_interval_seconds: int = Field(default=10, env="NOTIFICATION_DELIVERY_INTERVAL_SECONDS")
     notification_rate_limit_per_user_hour: int = Field(
         default=100,
         env="NOTIFICATION_RATE_LIMIT_PER_USER_HOUR"
@@ -90,6 +92,11 @@ class Settings(BaseSettings):
     smtp_port: int = Field(default=587, env="SMTP_PORT")
     smtp_user: Optional[str] = Field(default=None, env="SMTP_USER")
     smtp_password: Optional[str] = Field(default=None, env="SMTP_PASSWORD")
+    smtp_pool_size: int = Field(default=4, env="SMTP_POOL_SIZE")
+
+    # Push Delivery (FCM multicast runs on a thread pool)
+    firebase_credentials_path: Optional[str] = Field(default=None, env="FIREBASE_CREDENTIALS_PATH")
+    push_executor_workers: int = Field(default=8, env="PUSH_EXECUTOR_WORKERS")
 
     # NOTE: Twilio and Firebase have been removed from TSH ERP
     # TSH NeuroLink is the primary system for all notifications and communications:
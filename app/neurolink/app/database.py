@@ -9,18 +9,26 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker
 )
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.pool import NullPool
 from app.config import settings
 
+# Pooled in production (the async engine's default queue pool); elsewhere a
+# connection per session, and NullPool takes no sizing options
+if settings.environment == "production":
+    pool_options = dict(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+else:
+    pool_options = dict(poolclass=NullPool)
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
-    poolclass=QueuePool if settings.environment == "production" else NullPool,
-    pool_size=settings.db_pool_size,
-    max_overflow=settings.db_max_overflow,
-    pool_timeout=settings.db_pool_timeout,
     pool_pre_ping=True,  # Verify connections before using
     echo=settings.enable_query_logging,  # SQL logging for debugging
+    **pool_options
 )
 
 # Create async session factory
@@ -134,6 +134,7 @@ class NeurolinkNotification(Base):
     # Delivery
     status = Column(String(50), default="pending")
     channels = Column(ARRAY(Text), default=["in_app"])
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=True)  # Deferred (quiet hours) until then
 
     # Timestamps
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -163,6 +164,7 @@ class NeurolinkNotification(Base):
         Index("idx_neurolink_notifications_status", "status", "created_at"),
         Index("idx_neurolink_notifications_branch_id", "branch_id"),
         Index("idx_neurolink_notifications_event_id", "event_id"),
+        Index("idx_neurolink_notifications_rule_created", "rule_id", "created_at"),
         Index("idx_neurolink_notifications_group_key", "group_key"),
     )
 
@@ -325,3 +327,21 @@ class NeurolinkMetric(Base):
         Index("idx_neurolink_metrics_name", "metric_name", "recorded_at"),
         Index("idx_neurolink_metrics_recorded_at", "recorded_at"),
     )
+
+
+class NeurolinkAlertState(Base):
+    """Last-known alert state per monitored entity (for change-only scanners)"""
+
+    __tablename__ = "neurolink_alert_states"
+
+    # Alert Identification
+    alert_type = Column(String(100), primary_key=True)  # e.g. stock.low, invoice.overdue
+    entity_id = Column(Integer, primary_key=True)
+
+    # State
+    state = Column(String(50), nullable=False)  # e.g. low, 1-30, 31-60
+    snapshot = Column(JSONB, nullable=True)
+
+    # Timestamps
+    entered_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    last_seen_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
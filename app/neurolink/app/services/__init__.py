@@ -3,11 +3,9 @@ TSH NeuroLink - Services
 Business logic and background workers
 """
 from app.services.rule_engine import RuleEngineService
-from app.services.notification_generator import NotificationGeneratorService
-from app.services.delivery_service import DeliveryService
+from app.services.delivery_orchestrator import DeliveryOrchestrator
 
 __all__ = [
     "RuleEngineService",
-    "NotificationGeneratorService",
-    "DeliveryService"
+    "DeliveryOrchestrator"
 ]
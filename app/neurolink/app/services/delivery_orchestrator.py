@@ -3,13 +3,17 @@ TSH NeuroLink - Delivery Orchestrator
 Coordinates notification delivery across multiple channels
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
+from collections import defaultdict
+from typing import List, Dict, Optional, Iterable, Tuple
+from datetime import datetime, time, timedelta, timezone
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, text, func, or_
 
-from app.models import NeurolinkNotification, NeurolinkUserPreferences
+from app.models import NeurolinkNotification, NeurolinkUserPreferences, NeurolinkDeliveryLog
 from app.services.email_delivery import EmailDeliveryService
 from app.services.push_delivery import PushNotificationService
 from app.config import settings
@@ -138,6 +142,267 @@ class DeliveryOrchestrator:
 
         return results
 
+    async def deliver_pending_notifications(
+        self,
+        db: AsyncSession,
+        notification_ids: Optional[List[UUID]] = None,
+        bypass_preferences: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """
+        Deliver a batch of pending notifications
+
+        Steps:
+        1. Claim pending notifications that are due (SKIP LOCKED so workers
+           don't overlap); quiet-hours deferrals wait for their next_attempt_at
+        2. Bulk-load preferences and contact details for all recipients
+        3. Group push deliveries by content and send as 500-token multicasts
+        4. Send emails concurrently through the pooled email sender
+        5. Write delivery logs and notification statuses in bulk, one commit
+
+        Args:
+            db: Database session
+            notification_ids: Restrict the batch to these notifications
+            bypass_preferences: Bypass user preferences (for emergency broadcasts)
+            limit: Maximum notifications to claim (defaults to notification_batch_size)
+
+        Returns:
+            Dict with delivery statistics
+        """
+        stats = {
+            "claimed": 0,
+            "delivered": 0,
+            "failed": 0,
+            "deferred": 0,
+            "channels": defaultdict(lambda: {"sent": 0, "failed": 0})
+        }
+
+        stmt = (
+            select(NeurolinkNotification)
+            .where(
+                NeurolinkNotification.status == 'pending',
+                or_(
+                    NeurolinkNotification.next_attempt_at.is_(None),
+                    NeurolinkNotification.next_attempt_at <= func.now()
+                )
+            )
+            .order_by(NeurolinkNotification.created_at)
+            .limit(limit or settings.notification_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if notification_ids:
+            stmt = stmt.where(NeurolinkNotification.id.in_(notification_ids))
+
+        result = await db.execute(stmt)
+        notifications = result.scalars().all()
+        stats["claimed"] = len(notifications)
+
+        if not notifications:
+            return stats
+
+        user_ids = {notification.user_id for notification in notifications}
+        preferences = {} if bypass_preferences else await self._get_user_preferences_bulk(db, user_ids)
+        contacts = await self._get_recipient_contacts(db, user_ids)
+
+        # content key -> [(notification, token)]
+        push_groups: Dict[Tuple, List[Tuple[NeurolinkNotification, str]]] = defaultdict(list)
+        email_jobs: List[Tuple[NeurolinkNotification, str]] = []
+        succeeded: set = set()
+        attempted: set = set()
+        # resume time -> notifications deferred until then
+        deferred: Dict[datetime, List[UUID]] = defaultdict(list)
+
+        for notification in notifications:
+            user_prefs = preferences.get(notification.user_id)
+
+            if not bypass_preferences and self._is_in_quiet_hours(user_prefs):
+                stats["deferred"] += 1
+                deferred[self._quiet_hours_resume_at(user_prefs)].append(notification.id)
+                continue
+
+            contact = contacts.get(notification.user_id, {})
+            channels = notification.channels or []
+            attempted.add(notification.id)
+
+            if 'in_app' in channels:
+                # In-app is always delivered (already stored in database)
+                succeeded.add(notification.id)
+
+            if 'push' in channels and (bypass_preferences or self._can_use_push(user_prefs)):
+                for token in contact.get('fcm_tokens') or []:
+                    push_groups[self._content_key(notification)].append((notification, token))
+
+            if 'email' in channels and contact.get('email') and (
+                bypass_preferences or self._can_use_email(user_prefs)
+            ):
+                email_jobs.append((notification, contact['email']))
+
+        push_logs, email_logs = await asyncio.gather(
+            self._send_push_groups(push_groups),
+            self._send_email_jobs(email_jobs, contacts)
+        )
+
+        delivery_logs = push_logs + email_logs
+        for log in delivery_logs:
+            channel_stats = stats["channels"][log["channel"]]
+            if log["status"] == "sent":
+                channel_stats["sent"] += 1
+                succeeded.add(log["notification_id"])
+            else:
+                channel_stats["failed"] += 1
+
+        failed = attempted - succeeded
+        now = datetime.utcnow()
+
+        if delivery_logs:
+            await db.execute(insert(NeurolinkDeliveryLog), delivery_logs)
+
+        if succeeded:
+            await db.execute(
+                update(NeurolinkNotification)
+                .where(NeurolinkNotification.id.in_(succeeded))
+                .values(status='delivered', delivered_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        if failed:
+            await db.execute(
+                update(NeurolinkNotification)
+                .where(NeurolinkNotification.id.in_(failed))
+                .values(status='failed')
+                .execution_options(synchronize_session=False)
+            )
+
+        # Deferred rows stay pending but out of the claim until quiet hours end,
+        # so they cannot fill every batch ahead of newer notifications
+        for resume_at, notification_ids in deferred.items():
+            await db.execute(
+                update(NeurolinkNotification)
+                .where(NeurolinkNotification.id.in_(notification_ids))
+                .values(next_attempt_at=resume_at)
+                .execution_options(synchronize_session=False)
+            )
+
+        await db.commit()
+
+        stats["delivered"] = len(succeeded)
+        stats["failed"] = len(failed)
+        stats["channels"] = dict(stats["channels"])
+
+        logger.info(
+            f"Delivered batch of {stats['claimed']} notifications: "
+            f"{stats['delivered']} delivered, {stats['failed']} failed, "
+            f"{stats['deferred']} deferred"
+        )
+
+        return stats
+
+    @staticmethod
+    def _content_key(notification: NeurolinkNotification) -> Tuple:
+        """Notifications with the same key can share one multicast payload"""
+        return (
+            notification.title,
+            notification.body,
+            notification.severity,
+            notification.action_url or "",
+            str(notification.event_id)
+        )
+
+    async def _send_push_groups(
+        self,
+        push_groups: Dict[Tuple, List[Tuple[NeurolinkNotification, str]]]
+    ) -> List[Dict]:
+        """Send each content group as chunked multicasts, returning delivery log rows"""
+
+        async def send_group(key: Tuple, targets: List[Tuple[NeurolinkNotification, str]]) -> List[Dict]:
+            title, body, severity, action_url, event_id = key
+            responses = await self.push_service.send_multicast_chunks(
+                title=title,
+                body=body,
+                tokens=[token for _, token in targets],
+                data={
+                    "event_id": event_id,
+                    "severity": severity,
+                    "action_url": action_url
+                }
+            )
+            return [
+                self._delivery_log_row(
+                    notification_id=notification.id,
+                    channel="push",
+                    recipient=token,
+                    provider="fcm",
+                    success=response["success"],
+                    provider_message_id=response.get("message_id"),
+                    error_message=response.get("error")
+                )
+                for (notification, token), response in zip(targets, responses)
+            ]
+
+        group_logs = await asyncio.gather(*(
+            send_group(key, targets) for key, targets in push_groups.items()
+        ))
+        return [log for logs in group_logs for log in logs]
+
+    async def _send_email_jobs(
+        self,
+        email_jobs: List[Tuple[NeurolinkNotification, str]],
+        contacts: Dict[int, Dict]
+    ) -> List[Dict]:
+        """Send notification emails in bulk, returning delivery log rows"""
+        if not email_jobs:
+            return []
+
+        emails = [
+            (
+                email,
+                notification.title,
+                self.email_service._generate_email_html(
+                    notification=notification,
+                    recipient_name=contacts.get(notification.user_id, {}).get('full_name') or 'User'
+                )
+            )
+            for notification, email in email_jobs
+        ]
+
+        responses = await self.email_service.send_bulk_emails(emails)
+
+        return [
+            self._delivery_log_row(
+                notification_id=notification.id,
+                channel="email",
+                recipient=email,
+                provider=response["provider"],
+                success=response["success"],
+                provider_message_id=response.get("provider_message_id"),
+                error_message=response.get("error")
+            )
+            for (notification, email), response in zip(email_jobs, responses)
+        ]
+
+    @staticmethod
+    def _delivery_log_row(
+        notification_id: UUID,
+        channel: str,
+        recipient: str,
+        provider: str,
+        success: bool,
+        provider_message_id: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> Dict:
+        now = datetime.utcnow()
+        return {
+            "notification_id": notification_id,
+            "channel": channel,
+            "recipient": recipient,
+            "status": "sent" if success else "failed",
+            "provider": provider,
+            "provider_message_id": provider_message_id,
+            "error_message": error_message,
+            "sent_at": now if success else None,
+            "failed_at": None if success else now
+        }
+
     async def deliver_announcement(
         self,
         announcement: Dict,
@@ -200,6 +465,14 @@ class DeliveryOrchestrator:
         """
         Deliver emergency broadcast to all users via ALL channels
 
+        Push tokens for every user are fanned out as 500-token multicasts and
+        emails go through the pooled sender concurrently, so a broadcast to
+        the whole field team completes in a few provider round trips. A user
+        that cannot be prepared or whose every push/email attempt failed is
+        reported in failed_users without stopping the others. Users carrying
+        the id of their in-app notification (notification_id) get delivery
+        log rows, written in one insert.
+
         Args:
             broadcast: Emergency broadcast data
             users: List of user objects
@@ -220,62 +493,112 @@ class DeliveryOrchestrator:
             "failed_users": []
         }
 
-        for user in users:
-            user_delivered = False
+        title = f"🚨 URGENT: {broadcast['title']}"
+        push_targets: List[Tuple[Dict, str]] = []
+        email_jobs: List[Tuple[Dict, Tuple[str, str, str]]] = []
+        prepared: List[Dict] = []
 
+        for user in users:
             try:
-                # Email
-                if user.get('email'):
-                    email_result = await self.email_service.send_emergency_broadcast_email(
-                        broadcast=broadcast,
-                        recipient_email=user['email'],
-                        recipient_name=user['full_name'],
-                        db=db
-                    )
-                    if email_result.get("success"):
-                        results["deliveries"]["email"] += 1
-                        user_delivered = True
-
-                # Push notifications
-                if user.get('fcm_tokens'):
-                    push_result = await self.push_service.send_emergency_broadcast_push(
-                        broadcast=broadcast,
-                        fcm_tokens=user['fcm_tokens'],
-                        db=db
-                    )
-                    if push_result.get("success"):
-                        results["deliveries"]["push"] += 1
-                        user_delivered = True
-
-                # SMS (if enabled)
-                if settings.sms_enabled and user.get('phone'):
-                    # SMS delivery implementation
-                    results["deliveries"]["sms"] += 1
-                    user_delivered = True
-
-                # WhatsApp (if user has WhatsApp)
-                if user.get('whatsapp_phone'):
-                    # WhatsApp delivery implementation
-                    results["deliveries"]["whatsapp"] += 1
-                    user_delivered = True
-
-                # In-app (always)
-                results["deliveries"]["in_app"] += 1
-                user_delivered = True
-
-                if not user_delivered:
-                    results["failed_users"].append({
-                        "user_id": user['id'],
-                        "reason": "No valid delivery channels"
-                    })
-
+                user_push = [(user, token) for token in user.get('fcm_tokens') or []]
+                user_email = [
+                    (user, (
+                        user['email'],
+                        title,
+                        self.email_service._generate_emergency_email_html(
+                            broadcast=broadcast,
+                            recipient_name=user.get('full_name', 'User')
+                        )
+                    ))
+                ] if user.get('email') else []
             except Exception as e:
-                logger.error(f"Error delivering emergency broadcast to user {user['id']}: {str(e)}")
+                logger.error(f"Error preparing emergency broadcast for user {user.get('id')}: {str(e)}")
+                results["failed_users"].append({"user_id": user.get('id'), "reason": str(e)})
+                continue
+
+            push_targets.extend(user_push)
+            email_jobs.extend(user_email)
+            prepared.append(user)
+
+        push_responses, email_responses = await asyncio.gather(
+            self.push_service.send_multicast_chunks(
+                title=title,
+                body=broadcast['message'],
+                tokens=[token for _, token in push_targets],
+                data={
+                    "type": "emergency_broadcast",
+                    "broadcast_id": str(broadcast['id']),
+                    "requires_acknowledgment": "true"
+                }
+            ) if push_targets else asyncio.sleep(0, result=[]),
+            self.email_service.send_bulk_emails([email for _, email in email_jobs])
+        )
+
+        # user id -> {"push": [responses], "email": [responses]}
+        outcomes: Dict[int, Dict[str, List[Dict]]] = defaultdict(lambda: {"push": [], "email": []})
+        delivery_logs: List[Dict] = []
+
+        for (user, token), response in zip(push_targets, push_responses):
+            outcomes[user['id']]["push"].append(response)
+            if user.get('notification_id'):
+                delivery_logs.append(self._delivery_log_row(
+                    notification_id=user['notification_id'],
+                    channel="push",
+                    recipient=token,
+                    provider="fcm",
+                    success=response["success"],
+                    provider_message_id=response.get("message_id"),
+                    error_message=response.get("error")
+                ))
+
+        for (user, (email, _, _)), response in zip(email_jobs, email_responses):
+            outcomes[user['id']]["email"].append(response)
+            if user.get('notification_id'):
+                delivery_logs.append(self._delivery_log_row(
+                    notification_id=user['notification_id'],
+                    channel="email",
+                    recipient=email,
+                    provider=response["provider"],
+                    success=response["success"],
+                    provider_message_id=response.get("provider_message_id"),
+                    error_message=response.get("error")
+                ))
+
+        for user in prepared:
+            outcome = outcomes.get(user['id'], {"push": [], "email": []})
+            pushed = any(response["success"] for response in outcome["push"])
+            emailed = any(response["success"] for response in outcome["email"])
+            results["deliveries"]["push"] += int(pushed)
+            results["deliveries"]["email"] += int(emailed)
+
+            attempts = outcome["push"] + outcome["email"]
+            if attempts and not (pushed or emailed):
                 results["failed_users"].append({
                     "user_id": user['id'],
-                    "reason": str(e)
+                    "reason": "; ".join(sorted({str(response.get("error")) for response in attempts}))
                 })
 
+            # SMS (if enabled; Twilio settings are absent when SMS is not set up)
+            if getattr(settings, 'sms_enabled', False) and user.get('phone'):
+                # SMS delivery implementation
+                results["deliveries"]["sms"] += 1
+
+            # WhatsApp (if user has WhatsApp)
+            if user.get('whatsapp_phone'):
+                # WhatsApp delivery implementation
+                results["deliveries"]["whatsapp"] += 1
+
+            # In-app (always)
+            results["deliveries"]["in_app"] += 1
+
+        if delivery_logs:
+            try:
+                await db.execute(insert(NeurolinkDeliveryLog), delivery_logs)
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to log emergency broadcast deliveries: {str(e)}")
+                await db.rollback()
+
         return results
 
     async def _deliver_via_email(
@@ -346,14 +669,58 @@ class DeliveryOrchestrator:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def _get_user_preferences_bulk(
+        self,
+        db: AsyncSession,
+        user_ids: Iterable[int]
+    ) -> Dict[int, NeurolinkUserPreferences]:
+        """Get notification preferences for many users in one query"""
+        stmt = select(NeurolinkUserPreferences).where(
+            NeurolinkUserPreferences.user_id.in_(list(user_ids))
+        )
+        result = await db.execute(stmt)
+        return {prefs.user_id: prefs for prefs in result.scalars().all()}
+
+    async def _get_recipient_contacts(
+        self,
+        db: AsyncSession,
+        user_ids: Iterable[int]
+    ) -> Dict[int, Dict]:
+        """Get email, name and FCM tokens for many users in one query"""
+        def parse_tokens(value) -> List[str]:
+            # notification_preferences.fcm_tokens is a JSON (not JSONB) column
+            if isinstance(value, str):
+                value = json.loads(value)
+            return value or []
+
+        result = await db.execute(
+            text("""
+                SELECT u.id, u.email, u.name AS full_name, np.fcm_tokens
+                FROM users u
+                LEFT JOIN notification_preferences np ON np.user_id = u.id
+                WHERE u.id = ANY(:user_ids)
+                AND u.is_active = true
+            """),
+            {"user_ids": list(user_ids)}
+        )
+        return {
+            row.id: {
+                "id": row.id,
+                "email": row.email,
+                "full_name": row.full_name,
+                "fcm_tokens": parse_tokens(row.fcm_tokens)
+            }
+            for row in result.fetchall()
+        }
+
     def _is_in_quiet_hours(self, preferences: Optional[NeurolinkUserPreferences]) -> bool:
         """Check if current time is in user's quiet hours"""
         if not preferences or not preferences.quiet_hours_start or not preferences.quiet_hours_end:
             return False
 
         now = datetime.utcnow().time()
-        start = preferences.quiet_hours_start
-        end = preferences.quiet_hours_end
+        start = self._parse_hhmm(preferences.quiet_hours_start)
+        end = self._parse_hhmm(preferences.quiet_hours_end)
 
         # Handle overnight quiet hours (e.g., 10 PM to 7 AM)
         if start > end:
@@ -361,6 +728,22 @@ class DeliveryOrchestrator:
         else:
             return start <= now <= end
 
+    def _quiet_hours_resume_at(self, preferences: NeurolinkUserPreferences) -> datetime:
+        """The minute after the user's quiet hours next end (UTC, like _is_in_quiet_hours)"""
+        now = datetime.utcnow()
+        end = datetime.combine(now.date(), self._parse_hhmm(preferences.quiet_hours_end))
+        if end < now:
+            end += timedelta(days=1)
+        return (end + timedelta(minutes=1)).replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _parse_hhmm(value) -> time:
+        """Quiet hours are stored as HH:MM strings"""
+        if isinstance(value, time):
+            return value
+        hour, minute = str(value).split(':')[:2]
+        return time(int(hour), int(minute))
+
     def _can_use_email(self, preferences: Optional[NeurolinkUserPreferences]) -> bool:
         """Check if email delivery is allowed"""
         if not preferences:
@@ -4,7 +4,12 @@ Uses Resend API for reliable email delivery with tracking
 """
 
 import os
-from typing import List, Dict, Optional
+import asyncio
+import queue
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import logging
 import resend
@@ -18,17 +23,170 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 # Initialize Resend with API key
-resend.api_key = settings.RESEND_API_KEY
+resend.api_key = settings.resend_api_key
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP connections
+
+    Connections are opened lazily and reused across messages so a bulk send
+    pays the TCP/TLS/AUTH handshake once per connection instead of once per
+    email. Meant to be used from worker threads (smtplib is blocking).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: Optional[str],
+        password: Optional[str],
+        size: int
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self._slots: "queue.Queue[Optional[smtplib.SMTP]]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._slots.put(None)
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=30)
+        connection.ehlo()
+        if connection.has_extn("starttls"):
+            connection.starttls()
+            connection.ehlo()
+        if self.user and self.password:
+            connection.login(self.user, self.password)
+        return connection
+
+    def send(self, message: EmailMessage):
+        """Send one message on a pooled connection (blocking)"""
+        connection = self._slots.get()
+        try:
+            if connection is None:
+                connection = self._connect()
+            try:
+                connection.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connection was dropped by the server - reconnect once
+                connection = self._connect()
+                connection.send_message(message)
+        except Exception:
+            self._discard(connection)
+            connection = None
+            raise
+        finally:
+            self._slots.put(connection)
+
+    def _discard(self, connection: Optional[smtplib.SMTP]):
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                connection = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
 
 
 class EmailDeliveryService:
     """
     Handles email delivery for NeuroLink notifications using Resend API
+    (or pooled SMTP for bulk sends when SMTP is enabled)
     """
 
     def __init__(self):
-        self.from_email = settings.EMAIL_FROM_ADDRESS
-        self.from_name = settings.EMAIL_FROM_NAME
+        self.from_email = settings.email_from_address
+        self.from_name = settings.email_from_name
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.smtp_pool_size,
+            thread_name_prefix="neurolink-email"
+        )
+        self._smtp_pool: Optional[SMTPConnectionPool] = None
+
+    def _get_smtp_pool(self) -> SMTPConnectionPool:
+        if self._smtp_pool is None:
+            self._smtp_pool = SMTPConnectionPool(
+                host=settings.smtp_host,
+                port=settings.smtp_port,
+                user=settings.smtp_user,
+                password=settings.smtp_password,
+                size=settings.smtp_pool_size
+            )
+        return self._smtp_pool
+
+    def _send_one_blocking(self, recipient: str, subject: str, html: str) -> Optional[str]:
+        """Send a single email on the current thread, returning the provider id"""
+        if settings.smtp_enabled:
+            message = EmailMessage()
+            message["From"] = f"{self.from_name} <{self.from_email}>"
+            message["To"] = recipient
+            message["Subject"] = subject
+            message.set_content(html, subtype="html")
+            self._get_smtp_pool().send(message)
+            return None
+
+        response = resend.Emails.send({
+            "from": f"{self.from_name} <{self.from_email}>",
+            "to": recipient,
+            "subject": subject,
+            "html": html
+        })
+        return response.get('id')
+
+    async def send_bulk_emails(
+        self,
+        emails: List[Tuple[str, str, str]]
+    ) -> List[Dict]:
+        """
+        Send many emails concurrently on the email thread pool
+
+        Args:
+            emails: (recipient_email, subject, html) tuples
+
+        Returns:
+            One result dict per email, in input order. Delivery logging is
+            left to the caller so it can be written in bulk.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def send(recipient: str, subject: str, html: str) -> Dict:
+            try:
+                message_id = await loop.run_in_executor(
+                    self._executor, self._send_one_blocking, recipient, subject, html
+                )
+                return {
+                    "success": True,
+                    "provider_message_id": message_id,
+                    "provider": "smtp" if settings.smtp_enabled else "resend",
+                    "status": "sent"
+                }
+            except Exception as e:
+                logger.error(f"Failed to send email to {recipient}: {str(e)}")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "provider": "smtp" if settings.smtp_enabled else "resend",
+                    "status": "failed"
+                }
+
+        results = await asyncio.gather(*(send(*email) for email in emails))
+
+        logger.info(
+            f"Bulk email sent: {sum(1 for r in results if r['success'])} successful "
+            f"out of {len(emails)} total"
+        )
+
+        return list(results)
 
     async def send_notification_email(
         self,
@@ -291,7 +449,7 @@ class EmailDeliveryService:
             recipient_name=recipient_name,
             action_url=notification.action_url,
             action_label=notification.action_label,
-            base_url=settings.APP_BASE_URL
+            base_url=settings.app_base_url
         )
 
     def _generate_announcement_email_html(
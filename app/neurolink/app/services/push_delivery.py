@@ -4,6 +4,8 @@ Uses Firebase Cloud Messaging (FCM) for mobile push notifications
 """
 
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime
 import logging
@@ -19,12 +21,15 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# FCM accepts at most 500 tokens per multicast request
+FCM_MULTICAST_LIMIT = 500
+
 # Initialize Firebase Admin SDK
 try:
     if not firebase_admin._apps:
         # Load Firebase credentials from environment or file
-        if settings.FIREBASE_CREDENTIALS_PATH:
-            cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+        if settings.firebase_credentials_path:
+            cred = credentials.Certificate(settings.firebase_credentials_path)
             firebase_admin.initialize_app(cred)
             logger.info("Firebase Admin SDK initialized successfully")
         else:
@@ -38,6 +43,13 @@ class PushNotificationService:
     Handles push notification delivery using Firebase Cloud Messaging
     """
 
+    def __init__(self):
+        # firebase_admin.messaging is blocking; keep it off the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.push_executor_workers,
+            thread_name_prefix="neurolink-fcm"
+        )
+
     async def send_notification_push(
         self,
         notification: NeurolinkNotification,
@@ -218,6 +230,67 @@ class PushNotificationService:
                 "error": "No tokens provided"
             }
 
+        responses = await self.send_multicast_chunks(
+            title=title,
+            body=body,
+            tokens=tokens,
+            data=data
+        )
+
+        success_count = sum(1 for resp in responses if resp["success"])
+        failure_count = len(responses) - success_count
+
+        logger.info(
+            f"Multicast push sent: {success_count} successful, "
+            f"{failure_count} failed out of {len(tokens)} total"
+        )
+
+        return {
+            "success": success_count > 0,
+            "success_count": success_count,
+            "failure_count": failure_count,
+            "responses": responses
+        }
+
+    async def send_multicast_chunks(
+        self,
+        title: str,
+        body: str,
+        tokens: List[str],
+        data: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Send one push to any number of tokens
+
+        Tokens are split into 500-token multicast requests which are sent in
+        parallel on the push thread pool.
+
+        Returns:
+            One result dict per token, in input order
+        """
+        loop = asyncio.get_running_loop()
+        chunks = [
+            tokens[i:i + FCM_MULTICAST_LIMIT]
+            for i in range(0, len(tokens), FCM_MULTICAST_LIMIT)
+        ]
+
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(
+                self._executor, self._send_multicast_blocking, title, body, chunk, data
+            )
+            for chunk in chunks
+        ))
+
+        return [result for chunk_result in chunk_results for result in chunk_result]
+
+    def _send_multicast_blocking(
+        self,
+        title: str,
+        body: str,
+        tokens: List[str],
+        data: Optional[Dict]
+    ) -> List[Dict]:
+        """Send a single multicast request (<= 500 tokens) on a worker thread"""
         try:
             message = messaging.MulticastMessage(
                 notification=messaging.Notification(
@@ -248,36 +321,24 @@ class PushNotificationService:
                 )
             )
 
-            # Send multicast message
-            response = messaging.send_multicast(message)
+            response = messaging.send_each_for_multicast(message)
 
-            logger.info(
-                f"Multicast push sent: {response.success_count} successful, "
-                f"{response.failure_count} failed out of {len(tokens)} total"
-            )
-
-            return {
-                "success": response.success_count > 0,
-                "success_count": response.success_count,
-                "failure_count": response.failure_count,
-                "responses": [
-                    {
-                        "success": resp.success,
-                        "message_id": resp.message_id if resp.success else None,
-                        "error": str(resp.exception) if not resp.success else None
-                    }
-                    for resp in response.responses
-                ]
-            }
+            return [
+                {
+                    "token": token,
+                    "success": resp.success,
+                    "message_id": resp.message_id if resp.success else None,
+                    "error": str(resp.exception) if not resp.success else None
+                }
+                for token, resp in zip(tokens, response.responses)
+            ]
 
         except Exception as e:
             logger.error(f"Failed to send multicast push: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "success_count": 0,
-                "failure_count": len(tokens)
-            }
+            return [
+                {"token": token, "success": False, "message_id": None, "error": str(e)}
+                for token in tokens
+            ]
 
     async def send_announcement_push(
         self,
@@ -0,0 +1,243 @@
+"""
+TSH NeuroLink - Notification Rate Limit Store
+Sliding-window counters for rule cooldowns and hourly caps
+
+Each rule keeps one sliding-window log of the notifications it produced in the
+last hour (or the cooldown window, whichever is longer). A single read returns
+every user that is currently rate-limited for the rule, so the rule engine can
+exclude them from a set-based insert instead of running COUNT(*) queries per
+recipient.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import NeurolinkNotificationRule
+
+
+logger = logging.getLogger(__name__)
+
+HOUR_SECONDS = 3600
+
+
+def window_seconds(rule: NeurolinkNotificationRule) -> int:
+    """Length of the sliding window needed to evaluate a rule's limits"""
+    cooldown_seconds = (rule.cooldown_minutes or 0) * 60
+    hourly_seconds = HOUR_SECONDS if rule.max_per_hour else 0
+    return max(cooldown_seconds, hourly_seconds)
+
+
+def is_rate_limited_rule(rule: NeurolinkNotificationRule) -> bool:
+    """True if the rule defines a cooldown or an hourly cap"""
+    return bool(rule.cooldown_minutes or rule.max_per_hour)
+
+
+def limited_users_from_log(
+    rule: NeurolinkNotificationRule,
+    entries: Iterable[Tuple[int, float]],
+    now: float
+) -> Set[int]:
+    """
+    Compute rate-limited users from (user_id, sent_at) window entries
+
+    A user is limited when:
+    - they received this rule's notification within the cooldown, or
+    - they received max_per_hour or more in the last hour
+    """
+    cooldown_start = now - (rule.cooldown_minutes or 0) * 60
+    hour_start = now - HOUR_SECONDS
+
+    limited: Set[int] = set()
+    hourly_counts: Dict[int, int] = defaultdict(int)
+
+    for user_id, sent_at in entries:
+        if rule.cooldown_minutes and sent_at >= cooldown_start:
+            limited.add(user_id)
+        if rule.max_per_hour and sent_at >= hour_start:
+            hourly_counts[user_id] += 1
+
+    if rule.max_per_hour:
+        limited.update(
+            user_id for user_id, count in hourly_counts.items()
+            if count >= rule.max_per_hour
+        )
+
+    return limited
+
+
+async def load_window_from_db(
+    db: AsyncSession,
+    rule: NeurolinkNotificationRule,
+    now: float
+) -> List[Tuple[int, str, float]]:
+    """
+    Read a rule's recent notifications from the database
+
+    Used to seed an empty store (cold Redis, fresh worker) so a restart never
+    resets cooldowns. Returns (user_id, notification_id, sent_at) tuples.
+    """
+    since = datetime.fromtimestamp(now - window_seconds(rule), tz=timezone.utc)
+
+    result = await db.execute(
+        text("""
+            SELECT user_id, id, created_at
+            FROM neurolink_notifications
+            WHERE rule_id = :rule_id
+            AND created_at >= :since
+        """),
+        {"rule_id": rule.id, "since": since}
+    )
+
+    return [
+        (row.user_id, str(row.id), row.created_at.timestamp())
+        for row in result.fetchall()
+    ]
+
+
+class LocalRateLimitStore:
+    """
+    In-process sliding-window store
+
+    Stand-in for Redis in development and single-worker deployments. Limits
+    are only enforced per process.
+    """
+
+    def __init__(self):
+        self._windows: Dict[int, Deque[Tuple[float, int]]] = {}
+        self._lock = asyncio.Lock()
+
+    def _trim(self, rule: NeurolinkNotificationRule, now: float) -> Deque[Tuple[float, int]]:
+        window = self._windows[rule.id]
+        cutoff = now - window_seconds(rule)
+        while window and window[0][0] < cutoff:
+            window.popleft()
+        return window
+
+    async def get_limited_users(
+        self,
+        db: AsyncSession,
+        rule: NeurolinkNotificationRule,
+        now: Optional[float] = None
+    ) -> Set[int]:
+        """Return the users currently rate-limited for a rule"""
+        if not is_rate_limited_rule(rule):
+            return set()
+
+        now = now if now is not None else time.time()
+
+        async with self._lock:
+            if rule.id not in self._windows:
+                seeded = await load_window_from_db(db, rule, now)
+                self._windows[rule.id] = deque(
+                    sorted((sent_at, user_id) for user_id, _, sent_at in seeded)
+                )
+
+            window = self._trim(rule, now)
+            return limited_users_from_log(
+                rule,
+                ((user_id, sent_at) for sent_at, user_id in window),
+                now
+            )
+
+    async def record(
+        self,
+        rule: NeurolinkNotificationRule,
+        sent: List[Tuple[int, str]],
+        now: Optional[float] = None
+    ):
+        """Record (user_id, notification_id) pairs sent for a rule"""
+        if not sent or not is_rate_limited_rule(rule):
+            return
+
+        now = now if now is not None else time.time()
+
+        async with self._lock:
+            window = self._windows.setdefault(rule.id, deque())
+            window.extend((now, user_id) for user_id, _ in sent)
+            self._trim(rule, now)
+
+
+class RedisRateLimitStore:
+    """
+    Redis sorted-set sliding-window store shared by all rule engine workers
+
+    Keys:
+    - {prefix}ratelimit:rule:{id}         ZSET member "user_id:notification_id", score sent_at
+    - {prefix}ratelimit:rule:{id}:seeded  marker set after seeding from the database
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.prefix = f"{settings.redis_channel_prefix}ratelimit:rule:"
+
+    def _key(self, rule_id: int) -> str:
+        return f"{self.prefix}{rule_id}"
+
+    async def _seed(self, db: AsyncSession, rule: NeurolinkNotificationRule, now: float):
+        key = self._key(rule.id)
+        window = window_seconds(rule)
+
+        # Only one worker seeds; the others wait for the next event
+        if not await self.redis.set(f"{key}:seeded", "1", ex=window, nx=True):
+            return
+
+        seeded = await load_window_from_db(db, rule, now)
+        if seeded:
+            await self.redis.zadd(
+                key,
+                {f"{user_id}:{notification_id}": sent_at for user_id, notification_id, sent_at in seeded}
+            )
+            await self.redis.expire(key, window)
+
+    async def get_limited_users(
+        self,
+        db: AsyncSession,
+        rule: NeurolinkNotificationRule,
+        now: Optional[float] = None
+    ) -> Set[int]:
+        """Return the users currently rate-limited for a rule (one round trip)"""
+        if not is_rate_limited_rule(rule):
+            return set()
+
+        now = now if now is not None else time.time()
+        key = self._key(rule.id)
+
+        if not await self.redis.exists(f"{key}:seeded"):
+            await self._seed(db, rule, now)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(key, "-inf", now - window_seconds(rule))
+        pipe.zrangebyscore(key, now - window_seconds(rule), "+inf", withscores=True)
+        _, members = await pipe.execute()
+
+        return limited_users_from_log(
+            rule,
+            ((int(member.split(":", 1)[0]), score) for member, score in members),
+            now
+        )
+
+    async def record(
+        self,
+        rule: NeurolinkNotificationRule,
+        sent: List[Tuple[int, str]],
+        now: Optional[float] = None
+    ):
+        """Record (user_id, notification_id) pairs sent for a rule"""
+        if not sent or not is_rate_limited_rule(rule):
+            return
+
+        now = now if now is not None else time.time()
+        key = self._key(rule.id)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(key, {f"{user_id}:{notification_id}": now for user_id, notification_id in sent})
+        pipe.expire(key, window_seconds(rule))
+        await pipe.execute()
@@ -4,21 +4,18 @@ Evaluates events against notification rules and generates notifications
 """
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from uuid import UUID
 from jinja2 import Template, TemplateError
-from sqlalchemy import select, and_, or_, text
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 import redis.asyncio as redis
 import json
 
 from app.config import settings
-from app.models import (
-    NeurolinkEvent,
-    NeurolinkNotificationRule,
-    NeurolinkNotification
-)
+from app.models import NeurolinkEvent, NeurolinkNotificationRule
+from app.services.rate_limit_store import LocalRateLimitStore, RedisRateLimitStore
 
 
 logger = logging.getLogger(__name__)
@@ -34,11 +31,14 @@ class RuleEngineService:
     - Evaluate events against active rules
     - Generate notifications from matching rules
     - Handle template rendering with Jinja2
+    - Enforce rule cooldowns and hourly caps via a sliding-window store
     """
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
         self.running = False
+        # Replaced by the shared Redis store once connected
+        self.rate_limit_store = LocalRateLimitStore()
 
     async def start(self):
         """Start the rule engine worker"""
@@ -50,6 +50,7 @@ class RuleEngineService:
             encoding="utf-8",
             decode_responses=True
         )
+        self.rate_limit_store = RedisRateLimitStore(self.redis_client)
 
         self.running = True
 
@@ -325,9 +326,9 @@ class RuleEngineService:
 
         Steps:
         1. Render notification template with event data
-        2. Determine recipient users based on roles/branches
-        3. Check rate limits and cooldowns
-        4. Create notification records
+        2. Read the rule's rate-limited users from the counter store
+        3. Resolve recipients and insert their notifications in one statement
+        4. Record the new notifications in the counter store
         """
         template_config = rule.notification_template
 
@@ -338,50 +339,24 @@ class RuleEngineService:
             logger.error(f"❌ Error rendering template for rule {rule.id}: {e}")
             return 0
 
-        # Get recipient users
-        recipients = await self._get_recipients(db, event, template_config)
+        limited_user_ids = await self.rate_limit_store.get_limited_users(db, rule)
 
-        if not recipients:
-            logger.debug(f"ℹ️ No recipients found for rule {rule.id}")
-            return 0
-
-        # Create notifications
-        notifications_created = 0
-        for user_id in recipients:
-            try:
-                # Check rate limits
-                if await self._is_rate_limited(db, user_id, rule):
-                    logger.debug(f"⏳ User {user_id} is rate-limited for rule {rule.id}")
-                    continue
-
-                # Create notification
-                notification = NeurolinkNotification(
-                    event_id=event.id,
-                    rule_id=rule.id,
-                    user_id=user_id,
-                    branch_id=event.branch_id,
-                    title=rendered['title'],
-                    body=rendered['body'],
-                    severity=rendered.get('severity', 'info'),
-                    action_url=rendered.get('action_url'),
-                    action_label=rendered.get('action_label'),
-                    metadata=rendered.get('metadata', {}),
-                    channels=rendered.get('channels', ['in_app']),
-                    status='pending'
-                )
-
-                db.add(notification)
-                notifications_created += 1
+        sent = await self._insert_notifications(
+            db, event, rule, rendered, template_config, limited_user_ids
+        )
 
-            except Exception as e:
-                logger.error(f"❌ Error creating notification for user {user_id}: {e}")
+        if not sent:
+            logger.debug(f"ℹ️ No eligible recipients for rule {rule.id}")
+            return 0
 
         # Update rule last triggered time
         rule.last_triggered_at = datetime.utcnow()
 
         await db.commit()
 
-        return notifications_created
+        await self.rate_limit_store.record(rule, sent)
+
+        return len(sent)
 
     def _render_template(
         self,
@@ -423,101 +398,84 @@ class RuleEngineService:
 
         return rendered
 
-    async def _get_recipients(
+    async def _insert_notifications(
         self,
         db: AsyncSession,
         event: NeurolinkEvent,
-        template_config: Dict[str, Any]
-    ) -> List[int]:
+        rule: NeurolinkNotificationRule,
+        rendered: Dict[str, Any],
+        template_config: Dict[str, Any],
+        limited_user_ids: Set[int]
+    ) -> List[Tuple[int, str]]:
         """
-        Get list of user IDs who should receive this notification
+        Resolve recipients, skip rate-limited users and insert notifications
+        with a single INSERT ... SELECT
+
+        Recipients are based on:
+        - recipient_roles in template (active users in the event's branch)
+        - the event creator when no roles are configured
 
-        Based on:
-        - recipient_roles in template
-        - branch_id from event
-        - is_active status
+        Returns (user_id, notification_id) for every notification created.
         """
         recipient_roles = template_config.get('recipient_roles', [])
 
-        if not recipient_roles:
+        if recipient_roles:
+            recipients_sql = """
+                SELECT DISTINCT u.id AS user_id
+                FROM users u
+                LEFT JOIN roles r ON u.role_id = r.id
+                WHERE u.is_active = true
+                AND r.name = ANY(:roles)
+                AND (u.branch_id = CAST(:branch_id AS INTEGER) OR CAST(:branch_id AS INTEGER) IS NULL)
+            """
+        else:
             # No role filter - send to event creator only
-            if event.user_id:
-                return [event.user_id]
-            return []
-
-        # Query users by roles and branch
-        query = text("""
-            SELECT DISTINCT u.id
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.id
-            WHERE u.is_active = true
-            AND r.name = ANY(:roles)
-            AND (u.branch_id = :branch_id OR :branch_id IS NULL)
+            recipients_sql = """
+                SELECT CAST(:event_user_id AS INTEGER) AS user_id
+                WHERE CAST(:event_user_id AS INTEGER) IS NOT NULL
+            """
+
+        query = text(f"""
+            WITH recipients AS ({recipients_sql})
+            INSERT INTO neurolink_notifications (
+                id, event_id, rule_id, user_id, branch_id,
+                title, body, severity, action_url, action_label,
+                metadata, channels, status
+            )
+            SELECT
+                gen_random_uuid(), CAST(:event_id AS UUID), CAST(:rule_id AS INTEGER), recipients.user_id, CAST(:branch_id AS INTEGER),
+                :title, :body, :severity, :action_url, :action_label,
+                CAST(:metadata AS JSONB), CAST(:channels AS TEXT[]), 'pending'
+            FROM recipients
+            WHERE NOT (recipients.user_id = ANY(CAST(:limited_user_ids AS INTEGER[])))
+            RETURNING user_id, id
         """)
 
         result = await db.execute(
             query,
-            {"roles": recipient_roles, "branch_id": event.branch_id}
+            {
+                "roles": recipient_roles,
+                "event_user_id": event.user_id,
+                "event_id": event.id,
+                "rule_id": rule.id,
+                "branch_id": event.branch_id,
+                "title": rendered['title'],
+                "body": rendered['body'],
+                "severity": rendered.get('severity', 'info'),
+                "action_url": rendered.get('action_url'),
+                "action_label": rendered.get('action_label'),
+                "metadata": json.dumps(rendered.get('metadata', {})),
+                "channels": rendered.get('channels', ['in_app']),
+                "limited_user_ids": sorted(limited_user_ids),
+            }
         )
 
-        user_ids = [row[0] for row in result.fetchall()]
-
-        return user_ids
-
-    async def _is_rate_limited(
-        self,
-        db: AsyncSession,
-        user_id: int,
-        rule: NeurolinkNotificationRule
-    ) -> bool:
-        """
-        Check if user is rate-limited for this rule
-
-        Checks:
-        - Cooldown period (minimum time between same notification)
-        - Max per hour limit
-        """
-        if not rule.cooldown_minutes and not rule.max_per_hour:
-            return False  # No rate limiting
-
-        # Check cooldown
-        if rule.cooldown_minutes:
-            cooldown_threshold = datetime.utcnow() - timedelta(minutes=rule.cooldown_minutes)
-
-            cooldown_query = select(func.count(NeurolinkNotification.id)).where(
-                and_(
-                    NeurolinkNotification.user_id == user_id,
-                    NeurolinkNotification.rule_id == rule.id,
-                    NeurolinkNotification.created_at >= cooldown_threshold
-                )
-            )
-
-            result = await db.execute(cooldown_query)
-            count = result.scalar()
-
-            if count > 0:
-                return True  # Still in cooldown period
-
-        # Check max per hour
-        if rule.max_per_hour:
-            from datetime import timedelta
-            hour_ago = datetime.utcnow() - timedelta(hours=1)
-
-            hour_query = select(func.count(NeurolinkNotification.id)).where(
-                and_(
-                    NeurolinkNotification.user_id == user_id,
-                    NeurolinkNotification.rule_id == rule.id,
-                    NeurolinkNotification.created_at >= hour_ago
-                )
-            )
-
-            result = await db.execute(hour_query)
-            count = result.scalar()
+        sent = [(row.user_id, str(row.id)) for row in result.fetchall()]
 
-            if count >= rule.max_per_hour:
-                return True  # Exceeded hourly limit
+        if limited_user_ids:
+            logger.debug(f"⏳ {len(limited_user_ids)} users rate-limited for rule {rule.id}")
 
-        return False  # Not rate limited
+        return sent
 
 
 # Global instance
@@ -0,0 +1,263 @@
+"""
+TSH NeuroLink - Change-Only Alert Scanners
+Set-based low-stock and overdue-invoice scanners that remember the last-known
+alert state per entity and only emit events on threshold transitions
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import NeurolinkAlertState, NeurolinkEvent
+
+logger = logging.getLogger(__name__)
+
+
+def diff_alert_states(
+    current: Dict[int, str],
+    previous: Dict[int, str]
+) -> Tuple[Set[int], Set[int]]:
+    """
+    Compare current alert states with the last-known ones
+
+    Returns:
+        (entered, cleared) where entered are entities whose state is new or
+        changed (these emit events) and cleared are entities that are no
+        longer in alert (their state is forgotten so a later relapse alerts)
+    """
+    entered = {
+        entity_id for entity_id, state in current.items()
+        if previous.get(entity_id) != state
+    }
+    cleared = set(previous) - set(current)
+    return entered, cleared
+
+
+class AlertScanner:
+    """
+    Base class for stateful alert scanners
+
+    Subclasses provide the SQL that finds entities currently in alert (with
+    an optional entity_ids scope) and the event built for each transition.
+    """
+
+    alert_type: str = ""
+    current_query: str = ""
+
+    def state_for(self, row: Any) -> str:
+        """Alert state of a row returned by current_query"""
+        raise NotImplementedError
+
+    def build_event(self, row: Any, state: str, now: datetime) -> Dict[str, Any]:
+        """NeurolinkEvent column values for a transition into state"""
+        raise NotImplementedError
+
+    def snapshot_for(self, row: Any) -> Dict[str, Any]:
+        """JSON snapshot stored alongside the state"""
+        return {}
+
+    async def scan(
+        self,
+        db: AsyncSession,
+        entity_ids: Optional[List[int]] = None
+    ) -> int:
+        """
+        Run one scan and emit events for transitions
+
+        Args:
+            db: Database session (committed by this method)
+            entity_ids: Limit the scan to these entities (event-driven scans)
+
+        Returns:
+            Number of events emitted
+        """
+        result = await db.execute(
+            text(self.current_query),
+            {"entity_ids": entity_ids}
+        )
+        rows = {row.entity_id: row for row in result.fetchall()}
+        current = {entity_id: self.state_for(row) for entity_id, row in rows.items()}
+
+        previous_stmt = select(NeurolinkAlertState.entity_id, NeurolinkAlertState.state).where(
+            NeurolinkAlertState.alert_type == self.alert_type
+        )
+        if entity_ids is not None:
+            previous_stmt = previous_stmt.where(NeurolinkAlertState.entity_id.in_(entity_ids))
+        previous = dict((await db.execute(previous_stmt)).all())
+
+        entered, cleared = diff_alert_states(current, previous)
+
+        if not entered and not cleared:
+            return 0
+
+        now = datetime.utcnow()
+
+        if entered:
+            events = [
+                self.build_event(rows[entity_id], current[entity_id], now)
+                for entity_id in sorted(entered)
+            ]
+            await db.execute(
+                insert(NeurolinkEvent)
+                .values(events)
+                .on_conflict_do_nothing(index_elements=["producer_idempotency_key"])
+            )
+
+            upsert = insert(NeurolinkAlertState).values([
+                {
+                    "alert_type": self.alert_type,
+                    "entity_id": entity_id,
+                    "state": current[entity_id],
+                    "snapshot": self.snapshot_for(rows[entity_id]),
+                    "entered_at": now,
+                    "last_seen_at": now
+                }
+                for entity_id in sorted(entered)
+            ])
+            await db.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=["alert_type", "entity_id"],
+                    set_={
+                        "state": upsert.excluded.state,
+                        "snapshot": upsert.excluded.snapshot,
+                        "entered_at": upsert.excluded.entered_at,
+                        "last_seen_at": upsert.excluded.last_seen_at
+                    }
+                )
+            )
+
+        if cleared:
+            await db.execute(
+                delete(NeurolinkAlertState).where(
+                    NeurolinkAlertState.alert_type == self.alert_type,
+                    NeurolinkAlertState.entity_id.in_(cleared)
+                )
+            )
+
+        await db.commit()
+
+        logger.info(
+            f"{self.alert_type} scan: {len(entered)} transitions emitted, "
+            f"{len(cleared)} cleared"
+        )
+
+        return len(entered)
+
+
+class LowStockScanner(AlertScanner):
+    """Products whose available stock is at or below their minimum quantity"""
+
+    alert_type = "stock.low"
+    current_query = """
+        SELECT
+            p.id as entity_id,
+            p.name as product_name,
+            p.sku,
+            p.actual_available_stock as current_stock,
+            p.min_quantity,
+            w.id as warehouse_id,
+            w.name as warehouse_name
+        FROM products p
+        LEFT JOIN warehouses w ON p.warehouse_id = w.id
+        WHERE p.is_active = true
+        AND p.actual_available_stock <= p.min_quantity
+        AND p.actual_available_stock > 0  -- Not completely out of stock
+        AND p.min_quantity IS NOT NULL
+        AND p.min_quantity > 0
+        AND (CAST(:entity_ids AS INTEGER[]) IS NULL OR p.id = ANY(CAST(:entity_ids AS INTEGER[])))
+    """
+
+    def state_for(self, row: Any) -> str:
+        return "low"
+
+    def snapshot_for(self, row: Any) -> Dict[str, Any]:
+        return {
+            "current_stock": float(row.current_stock),
+            "min_quantity": float(row.min_quantity)
+        }
+
+    def build_event(self, row: Any, state: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "source_module": "inventory",
+            "event_type": "stock.low",
+            "severity": "warning",
+            "occurred_at": now,
+            "payload": {
+                "product_id": row.entity_id,
+                "product_name": row.product_name,
+                "sku": row.sku,
+                "current_stock": float(row.current_stock),
+                "min_quantity": float(row.min_quantity),
+                "warehouse_id": row.warehouse_id,
+                "warehouse_name": row.warehouse_name
+            },
+            "producer_idempotency_key": f"low_stock_{row.entity_id}_{now.isoformat()}"
+        }
+
+
+class OverdueInvoiceScanner(AlertScanner):
+    """
+    Unpaid invoices past their due date
+
+    The state is the aging bucket, so an invoice emits once when it becomes
+    overdue and again each time it ages into the next bucket.
+    """
+
+    alert_type = "invoice.overdue"
+    current_query = """
+        SELECT
+            i.id as entity_id,
+            i.invoice_number,
+            i.customer_id,
+            c.name as customer_name,
+            i.total_amount,
+            i.currency,
+            i.due_date,
+            EXTRACT(DAY FROM CURRENT_DATE - i.due_date) as days_overdue,
+            i.branch_id
+        FROM invoices i
+        LEFT JOIN customers c ON i.customer_id = c.id
+        WHERE i.status = 'unpaid'
+        AND i.due_date < CURRENT_DATE
+        AND i.is_active = true
+        AND (CAST(:entity_ids AS INTEGER[]) IS NULL OR i.id = ANY(CAST(:entity_ids AS INTEGER[])))
+    """
+
+    @staticmethod
+    def aging_bucket(days_overdue: int) -> str:
+        if days_overdue <= 30:
+            return "1-30"
+        if days_overdue <= 60:
+            return "31-60"
+        if days_overdue <= 90:
+            return "61-90"
+        return "90+"
+
+    def state_for(self, row: Any) -> str:
+        return self.aging_bucket(int(row.days_overdue))
+
+    def snapshot_for(self, row: Any) -> Dict[str, Any]:
+        return {"days_overdue": int(row.days_overdue)}
+
+    def build_event(self, row: Any, state: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "source_module": "invoicing",
+            "event_type": "invoice.overdue",
+            "severity": "warning" if state in ("1-30", "31-60") else "error",
+            "occurred_at": now,
+            "payload": {
+                "invoice_id": row.entity_id,
+                "invoice_number": row.invoice_number,
+                "customer_name": row.customer_name,
+                "amount": float(row.total_amount),
+                "currency": row.currency,
+                "days_overdue": int(row.days_overdue),
+                "aging_bucket": state
+            },
+            "branch_id": row.branch_id,
+            "producer_idempotency_key": f"invoice_overdue_{row.entity_id}_{state}_{now.date()}"
+        }
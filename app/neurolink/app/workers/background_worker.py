@@ -3,10 +3,14 @@ TSH NeuroLink - Background Worker
 Handles automated notification triggers, scheduled notifications, and monitoring
 """
 
+import ast
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
+from uuid import UUID
+
+import redis.asyncio as redis
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
@@ -22,11 +26,16 @@ from app.models import (
     NeurolinkAnnouncement,
     NeurolinkEmergencyBroadcast
 )
+from app.services.delivery_orchestrator import DeliveryOrchestrator
 from app.services.email_delivery import EmailDeliveryService
 from app.services.push_delivery import PushNotificationService
+from app.workers.alert_scanner import LowStockScanner, OverdueInvoiceScanner
 
 logger = logging.getLogger(__name__)
 
+# Coalesce stock change events arriving within this window into one scan
+STOCK_CHANGE_DEBOUNCE_SECONDS = 5
+
 
 class BackgroundWorker:
     """
@@ -37,6 +46,10 @@ class BackgroundWorker:
         self.scheduler = AsyncIOScheduler()
         self.email_service = EmailDeliveryService()
         self.push_service = PushNotificationService()
+        self.orchestrator = DeliveryOrchestrator()
+        self.low_stock_scanner = LowStockScanner()
+        self.overdue_invoice_scanner = OverdueInvoiceScanner()
+        self._stock_change_task: Optional[asyncio.Task] = None
 
         # Create async database engine
         self.engine = create_async_engine(
@@ -61,27 +74,41 @@ class BackgroundWorker:
 
         # Start scheduler
         self.scheduler.start()
+
+        # Low stock is driven by TDS stock changes; the periodic scan reconciles
+        self._stock_change_task = asyncio.create_task(self._subscribe_to_stock_changes())
         logger.info("Background Worker started successfully")
 
     async def stop(self):
         """Stop the background worker"""
         logger.info("Stopping Background Worker...")
         self.scheduler.shutdown()
+        if self._stock_change_task:
+            self._stock_change_task.cancel()
         await self.engine.dispose()
         logger.info("Background Worker stopped")
 
     def _schedule_tasks(self):
         """Schedule all periodic tasks"""
 
-        # Check for low stock every 5 minutes
+        # Reconcile low stock hourly (stock change events trigger targeted scans)
         self.scheduler.add_job(
             self.check_low_stock_alerts,
-            trigger=IntervalTrigger(minutes=5),
+            trigger=IntervalTrigger(minutes=settings.low_stock_reconcile_minutes),
             id='check_low_stock',
             name='Check Low Stock Alerts',
             replace_existing=True
         )
 
+        # Deliver pending notifications in batches
+        self.scheduler.add_job(
+            self.deliver_pending_notifications,
+            trigger=IntervalTrigger(seconds=settings.notification_delivery_interval_seconds),
+            id='deliver_pending_notifications',
+            name='Deliver Pending Notifications',
+            replace_existing=True
+        )
+
         # Check for overdue invoices every hour
         self.scheduler.add_job(
             self.check_overdue_invoices,
@@ -129,87 +156,119 @@ class BackgroundWorker:
 
         logger.info("All background tasks scheduled successfully")
 
-    async def check_low_stock_alerts(self):
+    async def check_low_stock_alerts(self, product_ids: Optional[List[int]] = None):
         """
         Check inventory for products below minimum stock levels
-        Create notifications for warehouse managers
+        Emits stock.low events only for products that newly crossed the
+        threshold since the last scan
+
+        Args:
+            product_ids: Limit the scan to these products (stock-change driven)
         """
         try:
             async with self.async_session() as db:
-                # Query for low stock products
-                # Assuming products table has: id, name, sku, actual_available_stock, min_quantity, warehouse_id
-                query = """
-                    SELECT
-                        p.id as product_id,
-                        p.name as product_name,
-                        p.sku,
-                        p.actual_available_stock as current_stock,
-                        p.min_quantity,
-                        w.id as warehouse_id,
-                        w.name as warehouse_name
-                    FROM products p
-                    LEFT JOIN warehouses w ON p.warehouse_id = w.id
-                    WHERE p.is_active = true
-                    AND p.actual_available_stock <= p.min_quantity
-                    AND p.actual_available_stock > 0  -- Not completely out of stock
-                    AND p.min_quantity IS NOT NULL
-                    AND p.min_quantity > 0
-                """
-
-                result = await db.execute(query)
-                low_stock_products = result.fetchall()
+                emitted = await self.low_stock_scanner.scan(db, product_ids)
 
-                if low_stock_products:
-                    logger.info(f"Found {len(low_stock_products)} low stock products")
+                if emitted:
+                    logger.info(f"Emitted {emitted} low stock events")
 
-                    # Create event for low stock
-                    for product in low_stock_products:
-                        await self._create_low_stock_event(db, product)
+        except Exception as e:
+            logger.error(f"Error checking low stock: {str(e)}")
 
-                    await db.commit()
+    async def deliver_pending_notifications(self):
+        """
+        Deliver pending notifications, one claimed batch at a time
+        Stops when a batch comes back short; deferred (quiet hours) rows are
+        not claimed again until their next_attempt_at, so every batch moves on
+        """
+        try:
+            async with self.async_session() as db:
+                while True:
+                    stats = await self.orchestrator.deliver_pending_notifications(db)
+                    if stats["claimed"] < settings.notification_batch_size:
+                        break
 
         except Exception as e:
-            logger.error(f"Error checking low stock: {str(e)}")
+            logger.error(f"Error delivering pending notifications: {str(e)}")
 
     async def check_overdue_invoices(self):
         """
         Check for overdue invoices
-        Create notifications for accountants and finance managers
+        Emits invoice.overdue events when an invoice becomes overdue or moves
+        into a later aging bucket
         """
         try:
             async with self.async_session() as db:
-                # Query for overdue invoices
-                query = """
-                    SELECT
-                        i.id as invoice_id,
-                        i.invoice_number,
-                        i.customer_id,
-                        c.name as customer_name,
-                        i.total_amount,
-                        i.currency,
-                        i.due_date,
-                        EXTRACT(DAY FROM CURRENT_DATE - i.due_date) as days_overdue,
-                        i.branch_id
-                    FROM invoices i
-                    LEFT JOIN customers c ON i.customer_id = c.id
-                    WHERE i.status = 'unpaid'
-                    AND i.due_date < CURRENT_DATE
-                    AND i.is_active = true
-                """
+                emitted = await self.overdue_invoice_scanner.scan(db)
+
+                if emitted:
+                    logger.info(f"Emitted {emitted} overdue invoice events")
+
+        except Exception as e:
+            logger.error(f"Error checking overdue invoices: {str(e)}")
 
-                result = await db.execute(query)
-                overdue_invoices = result.fetchall()
+    async def _subscribe_to_stock_changes(self):
+        """
+        Run targeted low-stock scans when TDS reports stock changes
 
-                if overdue_invoices:
-                    logger.info(f"Found {len(overdue_invoices)} overdue invoices")
+        Listens for inventory stock.changed events on the event bus and
+        coalesces product ids for a short window so a sync burst becomes a
+        single scan. Events without product ids trigger a full scan.
+        """
+        redis_client = redis.from_url(
+            settings.redis_url,
+            encoding="utf-8",
+            decode_responses=True
+        )
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(f"{settings.redis_channel_prefix}events:tds")
 
-                    for invoice in overdue_invoices:
-                        await self._create_overdue_invoice_event(db, invoice)
+        pending_ids: Set[int] = set()
+        full_scan = False
+        deadline: Optional[float] = None
+        loop = asyncio.get_running_loop()
 
-                    await db.commit()
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
 
-        except Exception as e:
-            logger.error(f"Error checking overdue invoices: {str(e)}")
+                if message and message['type'] == 'message':
+                    try:
+                        event_data = ast.literal_eval(message['data'])
+                        if event_data.get('event_type') == 'stock.changed':
+                            product_ids = await self._get_stock_changed_product_ids(
+                                event_data['event_id']
+                            )
+                            if product_ids:
+                                pending_ids.update(product_ids)
+                            else:
+                                full_scan = True
+                            if deadline is None:
+                                deadline = loop.time() + STOCK_CHANGE_DEBOUNCE_SECONDS
+                    except Exception as e:
+                        logger.error(f"Error reading stock change event: {str(e)}")
+
+                if deadline is not None and loop.time() >= deadline:
+                    scope = None if full_scan else sorted(pending_ids)
+                    pending_ids = set()
+                    full_scan = False
+                    deadline = None
+                    await self.check_low_stock_alerts(scope)
+
+        except asyncio.CancelledError:
+            logger.info("Stock change subscriber cancelled")
+        finally:
+            await pubsub.unsubscribe()
+            await redis_client.close()
+
+    async def _get_stock_changed_product_ids(self, event_id: str) -> List[int]:
+        """Read the product ids carried by a stock.changed event"""
+        async with self.async_session() as db:
+            result = await db.execute(
+                select(NeurolinkEvent.payload).where(NeurolinkEvent.id == UUID(event_id))
+            )
+            payload = result.scalar_one_or_none() or {}
+            return [int(product_id) for product_id in payload.get('product_ids') or []]
 
     async def process_scheduled_notifications(self):
         """
@@ -391,66 +450,6 @@ class BackgroundWorker:
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
 
-    async def _create_low_stock_event(self, db: AsyncSession, product: Dict):
-        """Create low stock event in database"""
-        try:
-            event_data = {
-                "source_module": "inventory",
-                "event_type": "stock.low",
-                "severity": "warning",
-                "occurred_at": datetime.utcnow(),
-                "payload": {
-                    "product_id": product.product_id,
-                    "product_name": product.product_name,
-                    "sku": product.sku,
-                    "current_stock": product.current_stock,
-                    "min_quantity": product.min_quantity,
-                    "warehouse_id": product.warehouse_id,
-                    "warehouse_name": product.warehouse_name
-                },
-                "producer_idempotency_key": f"low_stock_{product.product_id}_{datetime.utcnow().date()}"
-            }
-
-            # Insert event (will be processed by rule engine)
-            event = NeurolinkEvent(**event_data)
-            db.add(event)
-
-            logger.info(f"Created low stock event for product: {product.product_name}")
-
-        except Exception as e:
-            logger.error(f"Error creating low stock event: {str(e)}")
-
-    async def _create_overdue_invoice_event(self, db: AsyncSession, invoice: Dict):
-        """Create overdue invoice event"""
-        try:
-            event_data = {
-                "source_module": "invoicing",
-                "event_type": "invoice.overdue",
-                "severity": "warning",
-                "occurred_at": datetime.utcnow(),
-                "payload": {
-                    "invoice_id": invoice.invoice_id,
-                    "invoice_number": invoice.invoice_number,
-                    "customer_name": invoice.customer_name,
-                    "amount": float(invoice.total_amount),
-                    "currency": invoice.currency,
-                    "days_overdue": int(invoice.days_overdue)
-                },
-                "branch_id": invoice.branch_id,
-                "producer_idempotency_key": f"invoice_overdue_{invoice.invoice_id}_{datetime.utcnow().date()}"
-            }
-
-            event = NeurolinkEvent(**event_data)
-            db.add(event)
-
-            logger.info(
-                f"Created overdue invoice event: {invoice.invoice_number} "
-                f"({invoice.days_overdue} days overdue)"
-            )
-
-        except Exception as e:
-            logger.error(f"Error creating overdue invoice event: {str(e)}")
-
     async def _create_notifications_from_schedule(
         self,
         db: AsyncSession,
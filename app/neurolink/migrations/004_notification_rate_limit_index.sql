@@ -0,0 +1,12 @@
+-- ============================================================================
+-- TSH NeuroLink - Notification Rate Limit Index
+-- Version: 1.0.0
+-- Date: October 19, 2026
+--
+-- Supports seeding the rule engine's sliding-window rate limit store, which
+-- reads each rule's notifications from the last cooldown / hour window once
+-- per cold start instead of running COUNT(*) queries per recipient.
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_neurolink_notifications_rule_created
+    ON neurolink_notifications (rule_id, created_at);
@@ -0,0 +1,19 @@
+-- ============================================================================
+-- TSH NeuroLink - Alert States
+-- Version: 1.0.0
+-- Date: October 19, 2026
+--
+-- Stores the last-known alert state per product / invoice so the background
+-- worker's low-stock and overdue-invoice scanners only emit events when an
+-- entity crosses a threshold, instead of re-emitting on every scan.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS neurolink_alert_states (
+    alert_type VARCHAR(100) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    state VARCHAR(50) NOT NULL,
+    snapshot JSONB,
+    entered_at TIMESTAMPTZ DEFAULT NOW(),
+    last_seen_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (alert_type, entity_id)
+);
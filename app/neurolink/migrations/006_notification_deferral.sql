@@ -0,0 +1,13 @@
+-- ============================================================================
+-- TSH NeuroLink - Notification Deferral
+-- Version: 1.0.0
+-- Date: October 20, 2026
+--
+-- Notifications held back by a recipient's quiet hours stay pending with
+-- next_attempt_at set to when the quiet hours end. The delivery claim skips
+-- them until then, so a batch of deferred rows (claimed oldest first) can no
+-- longer crowd out every newer notification.
+-- ============================================================================
+
+ALTER TABLE neurolink_notifications
+    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
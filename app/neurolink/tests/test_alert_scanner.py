@@ -0,0 +1,144 @@
+"""
+Tests for the change-only alert scanners
+
+The session answers the scanner's two reads (entities currently in alert and
+their last-known states) and records the writes, so each test checks which
+transitions a scan emits: raise on entering, nothing while an alert holds,
+clear when it recovers, and again on relapse or a new aging bucket.
+"""
+
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.workers.alert_scanner import LowStockScanner, OverdueInvoiceScanner, diff_alert_states
+
+
+class Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+    def all(self):
+        return self.rows
+
+
+def bound(statement):
+    return statement.compile(dialect=postgresql.dialect()).params
+
+
+class AlertStore:
+    """Session keeping alert states between scans the way the table would"""
+
+    def __init__(self):
+        self.current = []
+        self.states = {}
+        self.events = []
+        self.deletes = 0
+        self.commits = 0
+        self.scopes = []
+
+    async def execute(self, statement, params=None):
+        if params is not None:
+            self.scopes.append(params["entity_ids"])
+            scope = params["entity_ids"]
+            return Rows([row for row in self.current if scope is None or row.entity_id in scope])
+        if statement.is_select:
+            scope = self.scopes[-1]
+            return Rows([(entity_id, state) for entity_id, state in self.states.items()
+                         if scope is None or entity_id in scope])
+        table = statement.table.name
+        if statement.is_insert and table == "neurolink_events":
+            values = bound(statement)
+            self.events.extend(value for key, value in values.items() if key.startswith("producer_idempotency_key"))
+        elif statement.is_insert:
+            values = bound(statement)
+            for index in range(len([key for key in values if key.startswith("entity_id")])):
+                self.states[values[f"entity_id_m{index}"]] = values[f"state_m{index}"]
+        elif statement.is_delete:
+            self.deletes += 1
+            cleared = next(value for key, value in bound(statement).items() if key.startswith("entity_id"))
+            for entity_id in cleared:
+                self.states.pop(entity_id, None)
+        return Rows([])
+
+    async def commit(self):
+        self.commits += 1
+
+
+def low_stock(product_id, stock, minimum=10):
+    return SimpleNamespace(entity_id=product_id, product_name=f"Product {product_id}", sku=f"SKU-{product_id}",
+                           current_stock=stock, min_quantity=minimum, warehouse_id=1, warehouse_name="Main")
+
+
+def overdue(invoice_id, days):
+    return SimpleNamespace(entity_id=invoice_id, invoice_number=f"INV-{invoice_id}", customer_id=1,
+                           customer_name="Customer", total_amount=250000, currency="IQD",
+                           due_date=date.today() - timedelta(days=days), days_overdue=days, branch_id=1)
+
+
+def test_diff_alert_states():
+    entered, cleared = diff_alert_states({1: "low", 2: "low", 3: "31-60"}, {2: "low", 3: "1-30", 4: "low"})
+    assert entered == {1, 3}
+    assert cleared == {4}
+
+
+@pytest.mark.asyncio
+async def test_low_stock_raises_holds_and_clears():
+    db, scanner = AlertStore(), LowStockScanner()
+
+    db.current = [low_stock(1, 4), low_stock(2, 8)]
+    assert await scanner.scan(db) == 2
+    assert db.states == {1: "low", 2: "low"} and len(db.events) == 2
+
+    # Still low (even lower): no new events, nothing written
+    db.current = [low_stock(1, 2), low_stock(2, 8)]
+    assert await scanner.scan(db) == 0
+    assert len(db.events) == 2 and db.commits == 1
+
+    # Product 2 restocked: its state is cleared without an event
+    db.current = [low_stock(1, 2)]
+    assert await scanner.scan(db) == 0
+    assert db.states == {1: "low"} and db.deletes == 1 and len(db.events) == 2
+
+    # Relapse alerts again
+    db.current = [low_stock(1, 2), low_stock(2, 3)]
+    assert await scanner.scan(db) == 1
+    assert db.states == {1: "low", 2: "low"} and len(db.events) == 3
+
+
+@pytest.mark.asyncio
+async def test_targeted_scan_leaves_other_products_alone():
+    db, scanner = AlertStore(), LowStockScanner()
+    db.current = [low_stock(1, 4), low_stock(2, 8)]
+    await scanner.scan(db)
+
+    # A stock change for product 3 only: products 1 and 2 are out of scope,
+    # so they are neither re-alerted nor cleared
+    db.current = [low_stock(3, 1)]
+    assert await scanner.scan(db, [3]) == 1
+    assert db.scopes[-1] == [3]
+    assert db.states == {1: "low", 2: "low", 3: "low"} and db.deletes == 0
+
+
+@pytest.mark.asyncio
+async def test_overdue_invoice_emits_once_per_aging_bucket():
+    db, scanner = AlertStore(), OverdueInvoiceScanner()
+
+    db.current = [overdue(7, 5)]
+    assert await scanner.scan(db) == 1
+    db.current = [overdue(7, 20)]
+    assert await scanner.scan(db) == 0
+    db.current = [overdue(7, 45)]
+    assert await scanner.scan(db) == 1
+    assert db.states == {7: "31-60"}
+
+    # Paid: cleared
+    db.current = []
+    assert await scanner.scan(db) == 0
+    assert db.states == {}
+    assert [key.split("_")[3] for key in db.events] == ["1-30", "31-60"]
@@ -0,0 +1,237 @@
+"""
+Tests for batched notification delivery (DeliveryOrchestrator)
+
+Push and email providers are replaced by recorders and the session by one
+that captures statements, so the tests check what the orchestrator sends and
+writes per batch: one multicast per content group, one bulk email call, one
+delivery-log insert and one status update per outcome, one commit.
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.delivery_orchestrator import DeliveryOrchestrator
+
+
+class RecordingPush:
+    def __init__(self, failing_tokens=()):
+        self.failing_tokens = set(failing_tokens)
+        self.calls = []
+
+    async def send_multicast_chunks(self, title, body, tokens, data=None):
+        self.calls.append({"title": title, "body": body, "tokens": list(tokens), "data": data})
+        return [
+            {"token": token, "success": token not in self.failing_tokens,
+             "message_id": None if token in self.failing_tokens else f"fcm-{token}",
+             "error": "Requested entity was not found" if token in self.failing_tokens else None}
+            for token in tokens
+        ]
+
+
+class RecordingEmail:
+    def __init__(self, failing=(), broken_names=()):
+        self.failing = set(failing)
+        self.broken_names = set(broken_names)
+        self.batches = []
+
+    async def send_bulk_emails(self, emails):
+        self.batches.append(list(emails))
+        return [
+            {"success": recipient not in self.failing, "provider": "smtp",
+             "provider_message_id": None if recipient in self.failing else f"smtp-{recipient}",
+             "error": "550 mailbox unavailable" if recipient in self.failing else None}
+            for recipient, _, _ in emails
+        ]
+
+    def _generate_email_html(self, notification, recipient_name):
+        return f"<p>{recipient_name}: {notification.body}</p>"
+
+    def _generate_emergency_email_html(self, broadcast, recipient_name):
+        if recipient_name in self.broken_names:
+            raise ValueError(f"cannot render email for {recipient_name}")
+        return f"<p>{recipient_name}: {broadcast['message']}</p>"
+
+
+class ScalarResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class RecordingSession:
+    def __init__(self, claimed=()):
+        self.claimed = list(claimed)
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        return ScalarResult(self.claimed if statement.is_select else [])
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    def inserts(self):
+        return [params for statement, params in self.statements if statement.is_insert]
+
+    def updates(self):
+        return [statement.compile().params for statement, _ in self.statements if statement.is_update]
+
+
+LOW_STOCK_EVENT = uuid4()
+
+
+def notification(user_id, title="Low stock", body="Product 12 is below minimum", channels=("in_app", "push"),
+                 event_id=LOW_STOCK_EVENT):
+    return SimpleNamespace(
+        id=uuid4(), user_id=user_id, title=title, body=body, severity="warning",
+        action_url=None, event_id=event_id, channels=list(channels)
+    )
+
+
+def orchestrator(push=None, email=None, contacts=None, preferences=None):
+    delivery = DeliveryOrchestrator()
+    delivery.push_service = push or RecordingPush()
+    delivery.email_service = email or RecordingEmail()
+
+    async def get_contacts(db, user_ids):
+        return {user_id: contact for user_id, contact in (contacts or {}).items() if user_id in set(user_ids)}
+
+    async def get_preferences(db, user_ids):
+        return preferences or {}
+
+    delivery._get_recipient_contacts = get_contacts
+    delivery._get_user_preferences_bulk = get_preferences
+    return delivery
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_shares_multicasts_and_writes_once():
+    shared_1, shared_2 = notification(1), notification(2)
+    overdue = notification(3, title="Invoice overdue", body="INV-7 is 30 days overdue",
+                           channels=("push", "email"), event_id=uuid4())
+    db = RecordingSession([shared_1, shared_2, overdue])
+    push = RecordingPush(failing_tokens={"tok-3"})
+    email = RecordingEmail()
+    delivery = orchestrator(push, email, contacts={
+        1: {"email": "a@tsh.sale", "full_name": "A", "fcm_tokens": ["tok-1a", "tok-1b"]},
+        2: {"email": "b@tsh.sale", "full_name": "B", "fcm_tokens": ["tok-2"]},
+        3: {"email": "c@tsh.sale", "full_name": "C", "fcm_tokens": ["tok-3"]},
+    })
+
+    stats = await delivery.deliver_pending_notifications(db)
+
+    assert sorted(len(call["tokens"]) for call in push.calls) == [1, 3]
+    assert [[recipient for recipient, _, _ in batch] for batch in email.batches] == [["c@tsh.sale"]]
+
+    (logs,) = db.inserts()
+    assert len(logs) == 5
+    assert {(log["recipient"], log["status"]) for log in logs if log["channel"] == "push"} == {
+        ("tok-1a", "sent"), ("tok-1b", "sent"), ("tok-2", "sent"), ("tok-3", "failed")
+    }
+    assert [statement_params["status"] for statement_params in db.updates()] == ["delivered"]
+    assert db.commits == 1
+    assert (stats["claimed"], stats["delivered"], stats["failed"], stats["deferred"]) == (3, 3, 0, 0)
+    assert stats["channels"] == {"push": {"sent": 3, "failed": 1}, "email": {"sent": 1, "failed": 0}}
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_marks_failed_and_defers_quiet_hours():
+    unreachable = notification(1, channels=("push",))
+    sleeping = notification(2)
+    db = RecordingSession([unreachable, sleeping])
+    quiet = SimpleNamespace(quiet_hours_start="00:00", quiet_hours_end="23:59",
+                            enabled_channels=["push"], email_enabled=True)
+    delivery = orchestrator(
+        RecordingPush(failing_tokens={"tok-1"}),
+        contacts={1: {"email": None, "full_name": "A", "fcm_tokens": ["tok-1"]}},
+        preferences={2: quiet}
+    )
+
+    stats = await delivery.deliver_pending_notifications(db)
+
+    assert (stats["delivered"], stats["failed"], stats["deferred"]) == (0, 1, 1)
+    failed_update, deferral = db.updates()
+    assert failed_update["status"] == "failed"
+    # Deferred until the minute after quiet hours end, not left for the next claim
+    assert "status" not in deferral
+    assert deferral["id_1"] == [sleeping.id]
+    resume_at = deferral["next_attempt_at"]
+    assert (resume_at.hour, resume_at.minute) == (0, 0) and resume_at.tzinfo is not None
+    assert timedelta(0) < resume_at - datetime.now(timezone.utc) <= timedelta(days=1, minutes=1)
+    assert db.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_claim_skips_notifications_deferred_for_quiet_hours():
+    """A full batch of deferred rows must not be claimed ahead of newer notifications"""
+    db = RecordingSession([])
+    await orchestrator().deliver_pending_notifications(db)
+
+    (claim, _), = db.statements
+    sql = str(claim.compile(dialect=postgresql.dialect()))
+    assert "neurolink_notifications.next_attempt_at IS NULL OR neurolink_notifications.next_attempt_at <= now()" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_without_notifications_writes_nothing():
+    db = RecordingSession([])
+    stats = await orchestrator().deliver_pending_notifications(db)
+    assert stats["claimed"] == 0
+    assert len(db.statements) == 1 and db.commits == 0
+
+
+@pytest.mark.asyncio
+async def test_emergency_broadcast_isolates_failing_users_and_logs_deliveries():
+    notification_ids = {user_id: uuid4() for user_id in (1, 2, 3, 4)}
+    users = [
+        {"id": 1, "full_name": "Ali", "email": "ali@tsh.sale", "fcm_tokens": ["tok-1"],
+         "notification_id": notification_ids[1]},
+        {"id": 2, "full_name": "Broken", "email": "broken@tsh.sale", "fcm_tokens": ["tok-2"],
+         "notification_id": notification_ids[2]},
+        {"id": 3, "full_name": "Sara", "email": "sara@tsh.sale", "fcm_tokens": ["tok-3"],
+         "notification_id": notification_ids[3]},
+        {"id": 4, "full_name": "Omar", "fcm_tokens": [], "whatsapp_phone": "9647700000004"},
+    ]
+    push = RecordingPush(failing_tokens={"tok-3"})
+    email = RecordingEmail(failing={"sara@tsh.sale"}, broken_names={"Broken"})
+    db = RecordingSession()
+    delivery = orchestrator(push, email)
+
+    results = await delivery.deliver_emergency_broadcast(
+        {"id": 9, "title": "Warehouse closed", "message": "Flooding at the Basra warehouse"}, users, db
+    )
+
+    # The user whose email could not be prepared does not stop the others
+    assert [call["tokens"] for call in push.calls] == [["tok-1", "tok-3"]]
+    assert push.calls[0]["data"]["broadcast_id"] == "9"
+    assert [[recipient for recipient, _, _ in batch] for batch in email.batches] == \
+        [["ali@tsh.sale", "sara@tsh.sale"]]
+
+    assert results["deliveries"] == {"email": 1, "push": 1, "sms": 0, "whatsapp": 1, "in_app": 3}
+    failed = {entry["user_id"]: entry["reason"] for entry in results["failed_users"]}
+    assert failed == {
+        2: "cannot render email for Broken",
+        3: "550 mailbox unavailable; Requested entity was not found",
+    }
+
+    (logs,) = db.inserts()
+    assert {(log["notification_id"], log["channel"], log["status"]) for log in logs} == {
+        (notification_ids[1], "push", "sent"), (notification_ids[1], "email", "sent"),
+        (notification_ids[3], "push", "failed"), (notification_ids[3], "email", "failed"),
+    }
+    assert db.commits == 1
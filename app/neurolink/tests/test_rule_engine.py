@@ -0,0 +1,213 @@
+"""
+Tests for set-based notification generation and the rule rate-limit stores
+
+The session answers the one INSERT ... SELECT the rule engine issues with the
+recipients the query would pick (minus the rate-limited users it was given),
+and an in-memory stand-in for Redis keeps the sorted sets, so each test checks
+what one rule firing writes and who the stores hold back afterwards.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services.rate_limit_store import LocalRateLimitStore, RedisRateLimitStore
+from app.services.rule_engine import RuleEngineService
+
+NOW = 1_760_900_000.0
+
+
+class Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class RecipientSession:
+    """Runs the recipient query against `recipients`; seeds the stores from `history`"""
+
+    def __init__(self, recipients=(), history=()):
+        self.recipients = list(recipients)
+        self.history = list(history)
+        self.inserts = []
+        self.seed_reads = 0
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if "INSERT INTO neurolink_notifications" in sql:
+            self.inserts.append(params)
+            limited = set(params["limited_user_ids"])
+            return Rows([SimpleNamespace(user_id=user_id, id=uuid4())
+                         for user_id in self.recipients if user_id not in limited])
+        self.seed_reads += 1
+        return Rows([SimpleNamespace(user_id=user_id, id=uuid4(),
+                                     created_at=datetime.fromtimestamp(sent_at, tz=timezone.utc))
+                     for user_id, sent_at in self.history])
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+        self.redis.round_trips += 1
+        return results
+
+
+class FakeRedis:
+    """The sorted-set and string commands RedisRateLimitStore uses"""
+
+    def __init__(self):
+        self.strings = {}
+        self.zsets = defaultdict(dict)
+        self.ttls = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def exists(self, key):
+        return int(key in self.strings or key in self.zsets)
+
+    async def zadd(self, key, mapping):
+        self.zsets[key].update(mapping)
+        return len(mapping)
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    @staticmethod
+    def _bound(value):
+        return {"-inf": float("-inf"), "+inf": float("inf")}.get(value, value)
+
+    async def zremrangebyscore(self, key, low, high):
+        low, high = self._bound(low), self._bound(high)
+        removed = [member for member, score in self.zsets[key].items() if low <= score <= high]
+        for member in removed:
+            del self.zsets[key][member]
+        return len(removed)
+
+    async def zrangebyscore(self, key, low, high, withscores=False):
+        low, high = self._bound(low), self._bound(high)
+        return sorted(((member, score) for member, score in self.zsets[key].items() if low <= score <= high),
+                      key=lambda item: item[1])
+
+
+def rule(rule_id=1, cooldown_minutes=None, max_per_hour=None, roles=("manager",)):
+    return SimpleNamespace(
+        id=rule_id, cooldown_minutes=cooldown_minutes, max_per_hour=max_per_hour, last_triggered_at=None,
+        notification_template={
+            "title": "Low stock: {{ product_name }}",
+            "body": "{{ current_stock }} left in {{ warehouse }}",
+            "severity": "warning",
+            "channels": ["in_app", "push"],
+            "recipient_roles": list(roles),
+        }
+    )
+
+
+def event(**payload):
+    return SimpleNamespace(
+        id=uuid4(), source_module="inventory", event_type="stock.low", severity="warning",
+        occurred_at=datetime(2026, 10, 19, 9, tzinfo=timezone.utc), branch_id=3, user_id=None,
+        payload={"product_name": "Cable", "current_stock": 4, "warehouse": "Main", **payload}
+    )
+
+
+def engine(store):
+    service = RuleEngineService()
+    service.rate_limit_store = store
+    return service
+
+
+@pytest.mark.asyncio
+async def test_rule_inserts_every_recipient_in_one_statement():
+    db = RecipientSession(recipients=[11, 12, 13])
+    low_stock = rule()
+
+    created = await engine(LocalRateLimitStore())._generate_notifications_from_rule(db, event(), low_stock)
+
+    assert created == 3
+    (params,) = db.inserts
+    assert (params["title"], params["body"]) == ("Low stock: Cable", "4 left in Main")
+    assert params["roles"] == ["manager"] and params["branch_id"] == 3
+    assert params["channels"] == ["in_app", "push"] and params["limited_user_ids"] == []
+    assert db.commits == 1 and low_stock.last_triggered_at is not None
+    assert db.seed_reads == 0  # A rule without limits never touches the store
+
+
+@pytest.mark.asyncio
+async def test_cooldown_excludes_recent_recipients_from_the_insert():
+    db = RecipientSession(recipients=[11, 12])
+    store = LocalRateLimitStore()
+    service, cooled = engine(store), rule(cooldown_minutes=30)
+
+    assert await service._generate_notifications_from_rule(db, event(), cooled) == 2
+    # Everyone is cooling down: nothing inserted, nothing committed
+    assert await service._generate_notifications_from_rule(db, event(), cooled) == 0
+    assert db.inserts[-1]["limited_user_ids"] == [11, 12]
+    assert db.commits == 1 and db.seed_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_store_seeds_once_then_reads_the_window_in_one_round_trip():
+    redis = FakeRedis()
+    store = RedisRateLimitStore(redis)
+    capped = rule(rule_id=7, max_per_hour=2)
+    db = RecipientSession(history=[(5, NOW - 600), (5, NOW - 300), (6, NOW - 120), (8, NOW - 5000)])
+
+    assert await store.get_limited_users(db, capped, now=NOW) == {5}
+    key = "neurolink:ratelimit:rule:7"
+    assert redis.strings[f"{key}:seeded"] == "1" and redis.ttls[key] == 3600
+    assert len(redis.zsets[key]) == 3  # The entry older than the window was dropped
+
+    # Already seeded: the database is not read again, one pipeline per lookup
+    trips = redis.round_trips
+    assert await store.get_limited_users(RecipientSession(), capped, now=NOW) == {5}
+    assert redis.round_trips == trips + 1 and db.seed_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_store_records_sends_and_expires_them_with_the_window():
+    redis = FakeRedis()
+    store = RedisRateLimitStore(redis)
+    cooled = rule(rule_id=9, cooldown_minutes=10)
+    db = RecipientSession()
+
+    assert await store.get_limited_users(db, cooled, now=NOW) == set()
+    await store.record(cooled, [(21, "n-1"), (22, "n-2")], now=NOW)
+    assert await store.get_limited_users(db, cooled, now=NOW + 60) == {21, 22}
+
+    # A second worker sharing the same Redis sees the same limits
+    other = RedisRateLimitStore(redis)
+    assert await other.get_limited_users(db, cooled, now=NOW + 599) == {21, 22}
+    assert await other.get_limited_users(db, cooled, now=NOW + 601) == set()
+    assert redis.zsets["neurolink:ratelimit:rule:9"] == {}
+
+    # Rules without limits are never written
+    await store.record(rule(rule_id=10), [(23, "n-3")], now=NOW)
+    assert "neurolink:ratelimit:rule:10" not in redis.zsets
@@ -194,16 +194,24 @@ def get_journal_entries(
 
 @router.post("/journal-entries", response_model=JournalEntry)
 @limiter.limit("30/minute")
-async def create_journal_entry(request: Request, entry: JournalEntryCreate, db: Session = Depends(get_db)):
-    """Create new journal entry - إنشاء قيد يومية جديد"""
+async def create_journal_entry(
+    request: Request,
+    entry: JournalEntryCreate,
+    db: Session = Depends(get_db),
+    user: dict = Depends(PermissionChecker(["accounting.create"]))
+):
+    """
+    Create new journal entry - إنشاء قيد يومية جديد
+    Required Permission: accounting.create
+    """
     service = AccountingService(db)
-    new_entry = service.create_journal_entry(entry)
+    new_entry = service.create_journal_entry(entry, user.get("user_id"))
 
     # Broadcast to all connected clients via WebSocket
     entry_dict = {
         "id": new_entry.id,
         "reference": new_entry.reference,
-        "date": new_entry.date.isoformat() if new_entry.date else None,
+        "date": new_entry.entry_date.isoformat() if new_entry.entry_date else None,
         "description_en": new_entry.description_en,
         "description_ar": new_entry.description_ar,
         "journal_id": new_entry.journal_id,
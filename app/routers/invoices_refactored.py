@@ -25,7 +25,7 @@ from app.schemas.invoice import (
     SalesInvoice, SalesInvoiceCreate, SalesInvoiceUpdate,
     PurchaseInvoice, PurchaseInvoiceCreate, PurchaseInvoiceUpdate,
     InvoicePayment, InvoicePaymentCreate, InvoicePaymentUpdate,
-    InvoiceSummary, InvoiceFilter
+    InvoiceSummary, InvoiceFilter, InvoiceAgingBucket
 )
 from app.models.invoice import InvoiceTypeEnum
 from app.dependencies.auth import get_current_user
@@ -340,14 +340,29 @@ def get_invoice_summary(
 @simple_require_permission("invoices.view")
 def get_overdue_invoices(
     branch_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    sales_cursor: Optional[str] = Query(None, description="sales_next_cursor of the previous page"),
+    purchase_cursor: Optional[str] = Query(None, description="purchase_next_cursor of the previous page"),
     service: InvoiceService = Depends(get_invoice_service),
     current_user: User = Depends(get_current_user)
 ):
-    """Get overdue invoices"""
-    overdue = service.get_overdue_invoices(branch_id)
+    """Get overdue invoices (keyset paginated by due date)"""
+    overdue = service.get_overdue_invoices(branch_id, limit, sales_cursor, purchase_cursor)
     return overdue
 
 
+@router.get("/aging", response_model=List[InvoiceAgingBucket], summary="Get Invoice Aging")
+@simple_require_permission("invoices.view")
+def get_invoice_aging(
+    invoice_type: str = Query("SALES", pattern="^(SALES|PURCHASE)$"),
+    branch_id: Optional[int] = None,
+    service: InvoiceService = Depends(get_invoice_service),
+    current_user: User = Depends(get_current_user)
+):
+    """Get open invoice balances by aging bucket"""
+    return service.get_aging_buckets(invoice_type, branch_id)
+
+
 # ============================================================================
 # MIGRATION NOTES
 # ============================================================================
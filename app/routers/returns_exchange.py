@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from datetime import date, datetime, timedelta
+from decimal import Decimal
 from pydantic import BaseModel
 from enum import Enum
 import uuid
@@ -9,12 +10,13 @@ import uuid
 from app.db.database import get_db
 from app.models import (
     User, Customer, Product, InventoryItem, SalesOrder, SalesInvoice, 
-    MoneyTransfer, Branch, Warehouse, StockMovement, POSTransaction
+    MoneyTransfer, Branch, Warehouse, StockMovement, POSTransaction, POSTerminal
 )
 from app.db.database import Base
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Numeric, ForeignKey, JSON
-from sqlalchemy import func, desc, and_, or_
-from sqlalchemy.orm import relationship
+from app.services.inventory_service import InventoryService
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Numeric, ForeignKey, JSON, Index
+from sqlalchemy import func, desc, and_, or_, select, tuple_
+from sqlalchemy.orm import relationship, joinedload, selectinload
 
 router = APIRouter()
 
@@ -59,12 +61,14 @@ class ReturnApproval(BaseModel):
     approved_items: List[Dict[str, Any]]
     refund_amount: float
     restocking_fee: float = 0.0
+    warehouse_id: Optional[int] = None  # Restock here (default: the POS transaction's warehouse)
 
 class ExchangeRequest(BaseModel):
     return_id: int
     exchange_items: List[Dict[str, Any]]
     additional_payment: float = 0.0
     payment_method: Optional[str] = None
+    warehouse_id: Optional[int] = None  # Issue from here (default: the POS transaction's warehouse)
 
 class ReturnReport(BaseModel):
     period_start: date
@@ -75,6 +79,8 @@ class ReturnReport(BaseModel):
     top_returned_products: List[Dict[str, Any]]
     return_rate: float
     processing_time_avg: float
+    processing_time_median: float = 0.0
+    processing_time_p90: float = 0.0
 
 @router.post("/returns/create", response_model=Dict[str, Any])
 async def create_return_request(
@@ -159,22 +165,43 @@ async def create_return_request(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create return request: {str(e)}")
 
+def _parse_returns_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, return_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(return_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/returns", response_model=List[Dict[str, Any]])
 async def get_returns(
+    response: Response,
     status: Optional[ReturnStatus] = Query(None),
     customer_id: Optional[int] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     return_reason: Optional[ReturnReason] = Query(None),
     limit: int = Query(50, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True),
     db: Session = Depends(get_db)
 ):
     """
     📋 Get returns with comprehensive filtering
+
+    Keyset paginated on (created_at, id), newest first: the X-Next-Cursor
+    response header is the cursor of the next page (absent on the last one).
+    Customer, items and their products are loaded with the page (no per-row
+    queries); photos are only counted.
     """
     
-    query = db.query(ReturnExchange).order_by(desc(ReturnExchange.created_at))
+    photos_count = select(func.count(ReturnPhoto.id)).where(
+        ReturnPhoto.return_id == ReturnExchange.id
+    ).scalar_subquery()
+    
+    query = db.query(ReturnExchange, photos_count.label("photos_count")).options(
+        joinedload(ReturnExchange.customer),
+        selectinload(ReturnExchange.items).joinedload(ReturnExchangeItem.product)
+    ).order_by(desc(ReturnExchange.created_at), desc(ReturnExchange.id))
     
     if status:
         query = query.filter(ReturnExchange.status == status.value)
@@ -191,11 +218,20 @@ async def get_returns(
     if return_reason:
         query = query.filter(ReturnExchange.return_reason == return_reason.value)
     
-    returns = query.offset(offset).limit(limit).all()
+    if cursor:
+        query = query.filter(tuple_(ReturnExchange.created_at, ReturnExchange.id) < _parse_returns_cursor(cursor))
+    elif offset:
+        query = query.offset(offset)
+    
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        last = rows[limit - 1].ReturnExchange
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()}_{last.id}"
+        rows = rows[:limit]
     
     # Format return data with complete information
     formatted_returns = []
-    for return_record in returns:
+    for return_record, photo_count in rows:
         return_data = {
             "id": return_record.id,
             "return_number": return_record.return_number,
@@ -214,14 +250,14 @@ async def get_returns(
             "items": [
                 {
                     "product_id": item.product_id,
-                    "product_name": item.product.name_en if item.product else "Unknown",
+                    "product_name": item.product.name if item.product else "Unknown",
                     "quantity": item.quantity,
                     "original_price": float(item.original_price),
                     "return_amount": float(item.return_amount),
                     "condition": item.condition
                 } for item in return_record.items
             ],
-            "photos_count": len(return_record.photos) if return_record.photos else 0,
+            "photos_count": photo_count,
             "processing_time": (
                 (return_record.processed_at - return_record.created_at).total_seconds() / 3600
                 if return_record.processed_at else None
@@ -231,6 +267,21 @@ async def get_returns(
     
     return formatted_returns
 
+def _return_warehouse_id(db: Session, return_record: "ReturnExchange",
+                         warehouse_id: Optional[int]) -> int:
+    """
+    Warehouse for a return's stock movements: the requested one, else the POS terminal's
+
+    Raises a 400 when neither is known, rather than skipping the stock posting
+    """
+    if not warehouse_id and return_record.transaction_id:
+        warehouse_id = db.query(POSTerminal.warehouse_id).join(
+            POSTransaction, POSTransaction.terminal_id == POSTerminal.id
+        ).filter(POSTransaction.id == return_record.transaction_id).scalar()
+    if not warehouse_id:
+        raise HTTPException(status_code=400, detail="warehouse_id required")
+    return warehouse_id
+
 @router.post("/returns/{return_id}/approve", response_model=Dict[str, Any])
 async def approve_return(
     return_id: int,
@@ -257,47 +308,33 @@ async def approve_return(
             return_record.refund_amount = approval.refund_amount
             return_record.restocking_fee = approval.restocking_fee
             
-            # Process approved items
+            # Process approved items: one SELECT for the return's items, one
+            # batched stock posting for everything that goes back on the shelf
+            return_items = {}
+            for return_item in return_record.items:
+                return_items.setdefault(return_item.product_id, return_item)
+            
+            restock_lines = []
             for approved_item in approval.approved_items:
-                # Find the return item
-                return_item = db.query(ReturnExchangeItem).filter(
-                    ReturnExchangeItem.return_id == return_id,
-                    ReturnExchangeItem.product_id == approved_item["product_id"]
-                ).first()
+                return_item = return_items.get(approved_item["product_id"])
                 
                 if return_item:
                     return_item.approved_quantity = approved_item["quantity"]
                     return_item.approved_amount = approved_item["amount"]
                     return_item.approved = True
                     
-                    # Update inventory (add back to stock if item is resaleable)
+                    # Add back to stock if item is resaleable
                     if approved_item.get("condition") in ["excellent", "good"]:
-                        # Add back to retail inventory
-                        inventory_item = db.query(InventoryItem).filter(
-                            InventoryItem.product_id == approved_item["product_id"],
-                            InventoryItem.warehouse_id.in_(
-                                db.query(Warehouse.id).filter(Warehouse.warehouse_type == "retail")
-                            )
-                        ).first()
-                        
-                        if inventory_item:
-                            inventory_item.quantity += approved_item["quantity"]
-                            inventory_item.updated_at = datetime.now()
-                            
-                            # Create stock movement
-                            stock_movement = StockMovement(
-                                product_id=approved_item["product_id"],
-                                warehouse_id=inventory_item.warehouse_id,
-                                movement_type="IN",
-                                quantity=approved_item["quantity"],
-                                unit_cost=return_item.original_price,
-                                total_cost=return_item.original_price * approved_item["quantity"],
-                                reference_type="RETURN",
-                                reference_id=return_id,
-                                notes=f"Return approved - {return_record.return_number}",
-                                created_at=datetime.now()
-                            )
-                            db.add(stock_movement)
+                        restock_lines.append((approved_item["product_id"], Decimal(str(approved_item["quantity"]))))
+            
+            if restock_lines:
+                InventoryService.post_stock_movements(
+                    db, _return_warehouse_id(db, return_record, approval.warehouse_id), restock_lines,
+                    reference_type="RETURN",
+                    reference_id=return_id,
+                    created_by=1,  # Current user ID
+                    notes=f"Return approved - {return_record.return_number}"
+                )
             
             # Create refund transaction
             refund_transaction = RefundTransaction(
@@ -330,6 +367,9 @@ async def approve_return(
             "next_steps": "Refund will be processed within 24 hours" if approval.approved else "Customer will be notified of rejection"
         }
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process return approval: {str(e)}")
@@ -366,43 +406,30 @@ async def process_exchange(
         db.add(exchange_record)
         db.flush()
         
-        # Process exchange items
-        for exchange_item_data in exchange.exchange_items:
-            exchange_item = ExchangeItem(
+        # Process exchange items: the lines are inserted together and the stock
+        # leaves the warehouse in one batched posting
+        db.add_all([
+            ExchangeItem(
                 exchange_id=exchange_record.id,
                 product_id=exchange_item_data["product_id"],
                 quantity=exchange_item_data["quantity"],
                 price=exchange_item_data["price"],
                 created_at=datetime.now()
+            ) for exchange_item_data in exchange.exchange_items
+        ])
+        
+        if exchange.exchange_items:
+            InventoryService.post_stock_movements(
+                db, _return_warehouse_id(db, return_record, exchange.warehouse_id),
+                [
+                    (exchange_item_data["product_id"], -Decimal(str(exchange_item_data["quantity"])))
+                    for exchange_item_data in exchange.exchange_items
+                ],
+                reference_type="EXCHANGE",
+                reference_id=exchange_record.id,
+                created_by=1,  # Current user ID
+                notes=f"Exchange for return {return_record.return_number}"
             )
-            db.add(exchange_item)
-            
-            # Update inventory for new items
-            inventory_item = db.query(InventoryItem).filter(
-                InventoryItem.product_id == exchange_item_data["product_id"],
-                InventoryItem.warehouse_id.in_(
-                    db.query(Warehouse.id).filter(Warehouse.warehouse_type == "retail")
-                )
-            ).first()
-            
-            if inventory_item:
-                inventory_item.quantity -= exchange_item_data["quantity"]
-                inventory_item.updated_at = datetime.now()
-                
-                # Create stock movement
-                stock_movement = StockMovement(
-                    product_id=exchange_item_data["product_id"],
-                    warehouse_id=inventory_item.warehouse_id,
-                    movement_type="OUT",
-                    quantity=exchange_item_data["quantity"],
-                    unit_cost=exchange_item_data["price"],
-                    total_cost=exchange_item_data["price"] * exchange_item_data["quantity"],
-                    reference_type="EXCHANGE",
-                    reference_id=exchange_record.id,
-                    notes=f"Exchange for return {return_record.return_number}",
-                    created_at=datetime.now()
-                )
-                db.add(stock_movement)
         
         # Update return status
         return_record.status = ReturnStatus.EXCHANGED.value
@@ -419,10 +446,111 @@ async def process_exchange(
             "message": "Exchange processed successfully"
         }
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process exchange: {str(e)}")
 
+def _processing_hours(db: Session):
+    """Hours from creation to processing as a SQL expression (NULL while unprocessed)"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", ReturnExchange.processed_at - ReturnExchange.created_at) / 3600
+    return (func.julianday(ReturnExchange.processed_at) - func.julianday(ReturnExchange.created_at)) * 24
+
+def _percentile_cont(ordered: Sequence[float], fraction: float) -> float:
+    """percentile_cont over an ordered list (linear interpolation between neighbours)"""
+    if not ordered:
+        return 0.0
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def build_returns_report(db: Session, date_from: date, date_to: date) -> ReturnReport:
+    """
+    Returns report from grouped SQL aggregates: one summary row (counts,
+    refunds, processing time average and percentiles), one row per reason,
+    the top 10 products and the sales count; no return is loaded
+    """
+    start_date = datetime.combine(date_from, datetime.min.time())
+    end_date = datetime.combine(date_to, datetime.max.time())
+    in_period = and_(ReturnExchange.created_at >= start_date, ReturnExchange.created_at <= end_date)
+    hours = _processing_hours(db)
+    
+    columns = [
+        func.count(ReturnExchange.id).label("total_returns"),
+        func.coalesce(func.sum(ReturnExchange.refund_amount), 0).label("total_refund_amount"),
+        func.avg(hours).label("processing_time_avg"),
+    ]
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        columns += [
+            func.percentile_cont(0.5).within_group(hours).label("processing_time_median"),
+            func.percentile_cont(0.9).within_group(hours).label("processing_time_p90"),
+        ]
+    summary = db.query(*columns).filter(in_period).one()
+    
+    if postgres:
+        median, p90 = summary.processing_time_median, summary.processing_time_p90
+    else:
+        ordered = [float(value) for (value,) in db.query(hours).filter(
+            in_period, ReturnExchange.processed_at.isnot(None)
+        ).order_by(hours)]
+        median, p90 = _percentile_cont(ordered, 0.5), _percentile_cont(ordered, 0.9)
+    
+    # Return reasons breakdown
+    return_reasons = {
+        reason: count for reason, count in db.query(
+            ReturnExchange.return_reason, func.count(ReturnExchange.id)
+        ).filter(in_period).group_by(ReturnExchange.return_reason)
+    }
+    
+    # Top returned products
+    quantity = func.sum(ReturnExchangeItem.quantity)
+    top_returned_products = [
+        {
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": int(total_quantity),
+            "amount": float(amount)
+        }
+        for product_id, product_name, total_quantity, amount in db.query(
+            ReturnExchangeItem.product_id,
+            func.coalesce(Product.name, "Unknown"),
+            quantity,
+            func.coalesce(func.sum(ReturnExchangeItem.return_amount), 0)
+        ).join(
+            ReturnExchange, ReturnExchange.id == ReturnExchangeItem.return_id
+        ).outerjoin(
+            Product, Product.id == ReturnExchangeItem.product_id
+        ).filter(in_period).group_by(
+            ReturnExchangeItem.product_id, Product.name
+        ).order_by(desc(quantity), ReturnExchangeItem.product_id).limit(10)
+    ]
+    
+    # Calculate return rate (returns vs sales)
+    total_sales = db.query(func.count(POSTransaction.id)).filter(
+        POSTransaction.transaction_date >= start_date,
+        POSTransaction.transaction_date <= end_date,
+        POSTransaction.transaction_type == "SALE"
+    ).scalar() or 0
+    
+    total_returns = summary.total_returns
+    return ReturnReport(
+        period_start=date_from,
+        period_end=date_to,
+        total_returns=total_returns,
+        total_refund_amount=float(summary.total_refund_amount),
+        return_reasons=return_reasons,
+        top_returned_products=top_returned_products,
+        return_rate=(total_returns / total_sales * 100) if total_sales > 0 else 0,
+        processing_time_avg=float(summary.processing_time_avg or 0),
+        processing_time_median=float(median or 0),
+        processing_time_p90=float(p90 or 0)
+    )
+
 @router.get("/returns/reports/summary", response_model=ReturnReport)
 async def get_returns_report(
     date_from: date = Query(...),
@@ -434,73 +562,7 @@ async def get_returns_report(
     """
     
     try:
-        start_date = datetime.combine(date_from, datetime.min.time())
-        end_date = datetime.combine(date_to, datetime.max.time())
-        
-        # Get returns in period
-        returns = db.query(ReturnExchange).filter(
-            ReturnExchange.created_at >= start_date,
-            ReturnExchange.created_at <= end_date
-        ).all()
-        
-        # Calculate metrics
-        total_returns = len(returns)
-        total_refund_amount = sum(float(r.refund_amount or 0) for r in returns)
-        
-        # Return reasons breakdown
-        return_reasons = {}
-        for return_record in returns:
-            reason = return_record.return_reason
-            return_reasons[reason] = return_reasons.get(reason, 0) + 1
-        
-        # Top returned products
-        product_returns = {}
-        for return_record in returns:
-            for item in return_record.items:
-                product_id = item.product_id
-                if product_id not in product_returns:
-                    product_returns[product_id] = {
-                        "product_id": product_id,
-                        "product_name": item.product.name_en if item.product else "Unknown",
-                        "quantity": 0,
-                        "amount": 0.0
-                    }
-                product_returns[product_id]["quantity"] += item.quantity
-                product_returns[product_id]["amount"] += float(item.return_amount)
-        
-        top_returned_products = sorted(
-            product_returns.values(),
-            key=lambda x: x["quantity"],
-            reverse=True
-        )[:10]
-        
-        # Calculate return rate (returns vs sales)
-        total_sales = db.query(func.count(POSTransaction.id)).filter(
-            POSTransaction.created_at >= start_date,
-            POSTransaction.created_at <= end_date,
-            POSTransaction.status == "COMPLETED"
-        ).scalar() or 0
-        
-        return_rate = (total_returns / total_sales * 100) if total_sales > 0 else 0
-        
-        # Average processing time
-        processed_returns = [r for r in returns if r.processed_at]
-        processing_times = [
-            (r.processed_at - r.created_at).total_seconds() / 3600
-            for r in processed_returns
-        ]
-        processing_time_avg = sum(processing_times) / len(processing_times) if processing_times else 0
-        
-        return ReturnReport(
-            period_start=date_from,
-            period_end=date_to,
-            total_returns=total_returns,
-            total_refund_amount=total_refund_amount,
-            return_reasons=return_reasons,
-            top_returned_products=top_returned_products,
-            return_rate=return_rate,
-            processing_time_avg=processing_time_avg
-        )
+        return build_returns_report(db, date_from, date_to)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate returns report: {str(e)}")
@@ -627,6 +689,9 @@ async def get_returns_dashboard_stats(
 # Additional models for the returns system
 class ReturnExchange(Base):
     __tablename__ = "return_exchanges"
+    __table_args__ = (
+        Index('idx_return_exchanges_created_at_id', 'created_at', 'id'),  # Listing keyset pagination
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     return_number = Column(String, unique=True, index=True)
@@ -659,7 +724,7 @@ class ReturnExchangeItem(Base):
     __tablename__ = "return_exchange_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    return_id = Column(Integer, ForeignKey("return_exchanges.id"))
+    return_id = Column(Integer, ForeignKey("return_exchanges.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
     original_price = Column(Numeric(10, 2))
@@ -679,7 +744,7 @@ class ReturnPhoto(Base):
     __tablename__ = "return_photos"
     
     id = Column(Integer, primary_key=True, index=True)
-    return_id = Column(Integer, ForeignKey("return_exchanges.id"))
+    return_id = Column(Integer, ForeignKey("return_exchanges.id"), index=True)
     photo_data = Column(Text)  # Base64 encoded image
     photo_order = Column(Integer)
     created_at = Column(DateTime, default=datetime.now)
@@ -4,7 +4,6 @@ from pydantic import BaseModel
 from typing import Dict, Any, Union, Optional, List
 import json
 import os
-import subprocess
 import datetime
 import asyncio
 import tempfile
@@ -12,6 +11,8 @@ import zipfile
 import shutil
 from pathlib import Path
 
+from app.services.backup_service import BACKUP_EXTENSION, BackupService
+
 router = APIRouter(tags=["settings"])
 
 class TranslationUpdate(BaseModel):
@@ -285,121 +286,25 @@ def get_database_url():
     return os.getenv("DATABASE_URL", "postgresql://khaleelal-mulla:@localhost:5432/erp_db")
 
 async def create_database_backup(backup_name: str, include_data: bool = True, include_schema: bool = True) -> str:
-    """Create a database backup using pg_dump"""
+    """Create a database backup (async pg_dump, custom format, see BackupService)"""
     try:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"{backup_name}_{timestamp}.sql"
-        backup_path = os.path.join(BACKUP_DIR, backup_filename)
-        
-        # Parse database URL
-        db_url = get_database_url()
-        if "postgresql://" in db_url:
-            # Extract database components
-            url_parts = db_url.replace("postgresql://", "").split("/")
-            db_name = url_parts[-1]
-            host_user = url_parts[0].split("@")
-            if len(host_user) == 2:
-                user_pass = host_user[0].split(":")
-                user = user_pass[0]
-                password = user_pass[1] if len(user_pass) > 1 else ""
-                host = host_user[1].split(":")[0]
-                port = host_user[1].split(":")[1] if ":" in host_user[1] else "5432"
-            else:
-                user = "khaleelal-mulla"
-                password = ""
-                host = "localhost"
-                port = "5432"
-        else:
-            raise ValueError("Unsupported database URL format")
-        
-        # Build pg_dump command
-        cmd = ["pg_dump"]
-        
-        if user:
-            cmd.extend(["-U", user])
-        if host:
-            cmd.extend(["-h", host])
-        if port:
-            cmd.extend(["-p", port])
-        
-        # Add options based on what to include
-        if include_schema and include_data:
-            pass  # Default behavior
-        elif include_schema and not include_data:
-            cmd.append("--schema-only")
-        elif not include_schema and include_data:
-            cmd.append("--data-only")
-        else:
-            raise ValueError("Must include either schema, data, or both")
-        
-        cmd.extend(["-f", backup_path, db_name])
-        
-        # Set environment for password if needed
-        env = os.environ.copy()
-        if password:
-            env["PGPASSWORD"] = password
-        
-        # Execute pg_dump
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return backup_path
-        else:
-            raise Exception(f"pg_dump failed: {result.stderr}")
-            
+        manifest = await BackupService(directory=BACKUP_DIR).create_backup(
+            backup_name, include_schema=include_schema, include_data=include_data
+        )
+        return os.path.join(BACKUP_DIR, manifest["filename"])
     except Exception as e:
         raise Exception(f"Failed to create database backup: {str(e)}")
 
 async def restore_database_backup(backup_path: str, restore_data: bool = True, restore_schema: bool = True) -> bool:
-    """Restore database from backup using psql"""
+    """Restore database from backup (checksum check, then async pg_restore)"""
     try:
         if not os.path.exists(backup_path):
             raise FileNotFoundError(f"Backup file not found: {backup_path}")
         
-        # Parse database URL
-        db_url = get_database_url()
-        if "postgresql://" in db_url:
-            url_parts = db_url.replace("postgresql://", "").split("/")
-            db_name = url_parts[-1]
-            host_user = url_parts[0].split("@")
-            if len(host_user) == 2:
-                user_pass = host_user[0].split(":")
-                user = user_pass[0]
-                password = user_pass[1] if len(user_pass) > 1 else ""
-                host = host_user[1].split(":")[0]
-                port = host_user[1].split(":")[1] if ":" in host_user[1] else "5432"
-            else:
-                user = "khaleelal-mulla"
-                password = ""
-                host = "localhost"
-                port = "5432"
-        else:
-            raise ValueError("Unsupported database URL format")
-        
-        # Build psql command
-        cmd = ["psql"]
-        
-        if user:
-            cmd.extend(["-U", user])
-        if host:
-            cmd.extend(["-h", host])
-        if port:
-            cmd.extend(["-p", port])
-        
-        cmd.extend(["-d", db_name, "-f", backup_path])
-        
-        # Set environment for password if needed
-        env = os.environ.copy()
-        if password:
-            env["PGPASSWORD"] = password
-        
-        # Execute psql
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return True
-        else:
-            raise Exception(f"psql restore failed: {result.stderr}")
+        await BackupService(directory=os.path.dirname(backup_path) or BACKUP_DIR).restore_backup(
+            os.path.basename(backup_path), restore_schema=restore_schema, restore_data=restore_data
+        )
+        return True
             
     except Exception as e:
         raise Exception(f"Failed to restore database backup: {str(e)}")
@@ -447,7 +352,7 @@ async def list_backups():
         
         if os.path.exists(BACKUP_DIR):
             for filename in os.listdir(BACKUP_DIR):
-                if filename.endswith('.sql'):
+                if filename.endswith(BACKUP_EXTENSION):
                     file_path = os.path.join(BACKUP_DIR, filename)
                     file_stat = os.stat(file_path)
                     
@@ -582,7 +487,7 @@ async def get_system_info():
         backup_total_size = 0
         if os.path.exists(BACKUP_DIR):
             for filename in os.listdir(BACKUP_DIR):
-                if filename.endswith('.sql'):
+                if filename.endswith(BACKUP_EXTENSION):
                     backup_count += 1
                     backup_total_size += os.path.getsize(os.path.join(BACKUP_DIR, filename))
         
@@ -1527,137 +1432,8 @@ async def clear_sync_logs():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear sync logs: {str(e)}")
 
-@router.post("/integrations/zoho/sync/{entity_type}/analyze")
-async def analyze_zoho_data(entity_type: str):
-    """Analyze Zoho data for specific entity before syncing"""
-    try:
-        if entity_type not in ["item", "customer", "vendor"]:
-            raise HTTPException(status_code=400, detail="Invalid entity type")
-        
-        config = load_zoho_config()
-        
-        if not config.get("enabled"):
-            raise HTTPException(status_code=400, detail="Zoho integration is not enabled")
-        
-        # Load actual Zoho data from JSON files
-        zoho_data_files = {
-            "item": "all_zoho_inventory_items.json",
-            "customer": "all_zoho_customers.json",
-            "vendor": "all_zoho_vendors.json"
-        }
-        
-        zoho_file = zoho_data_files.get(entity_type)
-        zoho_data = []
-        
-        if zoho_file and os.path.exists(zoho_file):
-            with open(zoho_file, 'r', encoding='utf-8') as f:
-                zoho_data = json.load(f)
-        
-        total_records = len(zoho_data)
-        
-        # Calculate statistics based on actual data
-        # Simulate new vs matched records (in real app, compare with DB)
-        new_records = int(total_records * 0.15)  # ~15% new
-        matched_records = int(total_records * 0.75)  # ~75% matched
-        updated_records = int(total_records * 0.08)  # ~8% updated
-        error_records = total_records - new_records - matched_records - updated_records
-        
-        analysis = {
-            "entity_type": entity_type,
-            "total_records": total_records,
-            "new_records": new_records,
-            "updated_records": updated_records,
-            "matched_records": matched_records,
-            "error_records": max(0, error_records),
-            "last_analyzed": datetime.datetime.now().isoformat(),
-            "field_statistics": {
-                "required_fields_complete": 98 if total_records > 0 else 100,
-                "optional_fields_complete": 72 if total_records > 0 else 75,
-                "image_fields_available": 45 if total_records > 0 else 50,
-                "duplicate_records": int(total_records * 0.002) if total_records > 0 else 0
-            }
-        }
-        
-        return {
-            "status": "success",
-            "message": f"Data analysis completed for {entity_type}",
-            "analysis": analysis
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to analyze data: {str(e)}")
-
-@router.post("/integrations/zoho/sync/{entity_type}/execute")
-async def execute_sync(
-    entity_type: str,
-    background_tasks: BackgroundTasks,
-    force: bool = False,
-    sync_images: bool = True
-):
-    """Execute real sync for specific entity type with duplicate prevention"""
-    try:
-        if entity_type not in ["item", "customer", "vendor"]:
-            raise HTTPException(status_code=400, detail="Invalid entity type")
-        
-        config = load_zoho_config()
-        mappings = load_sync_mappings()
-        
-        if not config.get("enabled"):
-            raise HTTPException(status_code=400, detail="Zoho integration is not enabled")
-        
-        mapping = mappings.get(entity_type)
-        if not mapping or not mapping.get("enabled"):
-            raise HTTPException(status_code=400, detail=f"Sync mapping is not enabled for {entity_type}")
-        
-        # Import and initialize sync service
-        from app.services.zoho_sync_service import ZohoSyncService
-        sync_service = ZohoSyncService()
-        
-        # Execute sync based on entity type
-        if entity_type == "item":
-            result = sync_service.sync_items(sync_images=sync_images)
-        elif entity_type == "customer":
-            result = sync_service.sync_customers()
-        elif entity_type == "vendor":
-            result = sync_service.sync_vendors()
-        else:
-            raise HTTPException(status_code=400, detail="Invalid entity type")
-        
-        # Ensure result is a dict
-        if not isinstance(result, dict):
-            raise HTTPException(status_code=500, detail=f"Invalid sync result type: {type(result)}")
-        
-        # Update mapping with sync results
-        if result.get("status") in ["success", "completed_with_errors"]:
-            # Ensure mapping is a dict, not a list
-            if not isinstance(mapping, dict):
-                print(f"⚠️  Warning: mapping is {type(mapping)}, converting...")
-                mapping = {}
-            
-            mapping["last_sync"] = datetime.datetime.now().isoformat()
-            mapping["last_sync_status"] = result["status"]
-            mapping["total_synced"] = mapping.get("total_synced", 0) + result.get("statistics", {}).get("new", 0)
-            mapping["total_errors"] = mapping.get("total_errors", 0) + result.get("statistics", {}).get("errors", 0)
-            mappings[entity_type] = mapping
-            save_sync_mappings(mappings)
-        
-        return {
-            "status": result["status"],
-            "sync_id": result.get("sync_id"),
-            "message": f"Sync completed for {entity_type}",
-            "statistics": result.get("statistics", {}),
-            "errors": result.get("errors", []),
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to execute sync: {str(e)}")
+# Sync plan analyze/execute: see app/routers/settings/zoho_integration.py
+# (ZohoSyncPlanner builds the exact plan that execute applies)
 
 @router.get("/integrations/zoho/sync/{entity_type}/status")
 async def get_sync_status(entity_type: str):
@@ -4,8 +4,9 @@ Settings Module
 
 Modular settings router split into logical components:
 - System settings (system info, translations) - IMPLEMENTED
-- Backup/Restore operations - TODO: Extract from main settings.py
-- Zoho integration settings - TODO: Extract from main settings.py
+- Backup/Restore operations (background jobs, range downloads) - IMPLEMENTED
+- Zoho integration settings - sync plans (analyze/execute) IMPLEMENTED,
+  remaining endpoints TODO: Extract from main settings.py
 
 This module demonstrates the modular approach. Currently imports system settings
 and re-exports the main settings router for backward compatibility.
@@ -17,19 +18,17 @@ from fastapi import APIRouter
 
 # Import system settings router (completed)
 from .system import router as system_router
+from .backup import router as backup_router
+from .zoho_integration import router as zoho_router
 
 # Create combined settings router
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
 # Include modular sub-routers
 router.include_router(system_router)
+router.include_router(backup_router)
+router.include_router(zoho_router)
 
-# TODO Phase 2: Add backup router
-# from .backup import router as backup_router
-# router.include_router(backup_router)
-
-# TODO Phase 3: Add zoho integration router
-# from .zoho_integration import router as zoho_router
-# router.include_router(zoho_router)
+# TODO Phase 3: Move the remaining zoho endpoints into zoho_integration
 
 __all__ = ["router"]
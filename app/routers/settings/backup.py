@@ -0,0 +1,188 @@
+"""
+Backup & Restore Settings Router
+================================
+
+Backups, restores and verifications are background jobs (BackupJobRunner):
+the request queues one in the backup_jobs table and returns 202 with the
+job to poll from any worker. Downloads
+honour Range / If-Range, so a large dump can be fetched in parts and
+resumed. Every route is admin-only: a dump is the whole database and a
+restore overwrites it.
+"""
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Iterator, Optional, Tuple
+import os
+
+from app.dependencies.rbac import RoleChecker
+from app.exceptions import ValidationError
+from app.schemas.settings.backup import BackupRequest, RestoreRequest
+from app.services.backup_service import CHUNK_SIZE, BackupJobKind, get_backup_runner
+
+require_admin = RoleChecker(["admin"])
+
+router = APIRouter(
+    prefix="/backups",
+    tags=["Backup Settings"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end)
+
+    Returns None when the header should be ignored (other units, several
+    ranges) and raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                raise ValueError(header)
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(header)
+    if start < 0 or start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def iter_file_range(path: str, start: int, length: int) -> Iterator[bytes]:
+    """File bytes [start, start + length) in chunks (run in the threadpool)"""
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _job_accepted(job) -> JSONResponse:
+    return JSONResponse(status_code=202, content={"status": "accepted", "job": job.to_dict()})
+
+
+@router.post("")
+async def create_backup(backup_request: BackupRequest, user: dict = Depends(require_admin)):
+    """Queue a database backup"""
+    if not (backup_request.include_schema or backup_request.include_data):
+        raise ValidationError("Must include either schema, data, or both")
+    name = "tsh_erp_backup"
+    if backup_request.description:
+        name = f"tsh_erp_{backup_request.description}"
+
+    job = get_backup_runner().submit(
+        BackupJobKind.BACKUP,
+        requested_by=user.get("user_id"),
+        name=name,
+        include_schema=backup_request.include_schema,
+        include_data=backup_request.include_data
+    )
+    return _job_accepted(job)
+
+
+@router.get("")
+async def list_backups():
+    """List complete backups (with their manifests), newest first"""
+    backups = get_backup_runner().service.list_backups()
+    return {
+        "status": "success",
+        "backups": backups,
+        "total_count": len(backups),
+        "total_size": sum(backup["size_bytes"] for backup in backups)
+    }
+
+
+@router.post("/restore")
+async def restore_backup(restore_request: RestoreRequest, user: dict = Depends(require_admin)):
+    """Queue a restore of the application database (checksum is checked first)"""
+    runner = get_backup_runner()
+    filename = os.path.basename(restore_request.backup_file)
+    runner.service.read_manifest(filename)
+    job = runner.submit(
+        BackupJobKind.RESTORE,
+        requested_by=user.get("user_id"),
+        filename=filename,
+        restore_schema=restore_request.restore_schema,
+        restore_data=restore_request.restore_data
+    )
+    return _job_accepted(job)
+
+
+@router.get("/jobs")
+async def list_backup_jobs():
+    """Backup, restore and verify jobs, newest first"""
+    return {"status": "success", "jobs": [job.to_dict() for job in get_backup_runner().list_jobs()]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_backup_job(job_id: int):
+    """Poll a backup job"""
+    return get_backup_runner().get_job(job_id).to_dict()
+
+
+@router.get("/{filename}/manifest")
+async def get_backup_manifest(filename: str):
+    """Checksum, options, row counts and last verification of a backup"""
+    return get_backup_runner().service.read_manifest(filename)
+
+
+@router.post("/{filename}/verify")
+async def verify_backup(filename: str, user: dict = Depends(require_admin)):
+    """Queue a verification: restore into a scratch database and compare row counts"""
+    runner = get_backup_runner()
+    runner.service.read_manifest(filename)
+    return _job_accepted(runner.submit(BackupJobKind.VERIFY, requested_by=user.get("user_id"), filename=filename))
+
+
+@router.get("/{filename}/download")
+async def download_backup(filename: str, request: Request):
+    """Download a backup; supports Range / If-Range for partial and resumed downloads"""
+    service = get_backup_runner().service
+    path = service.backup_path(filename)
+    manifest = service.read_manifest(filename)
+    size = path.stat().st_size
+    etag = f'"{manifest["sha256"]}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Checksum-SHA256": manifest["sha256"],
+    }
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    headers["Content-Length"] = str(length)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        iter_file_range(str(path), start, length),
+        status_code=206 if byte_range is not None else 200,
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+
+@router.delete("/{filename}")
+async def delete_backup(filename: str):
+    """Delete a backup and its manifest"""
+    get_backup_runner().service.delete_backup(filename)
+    return {"status": "success", "message": f"Backup {filename} deleted successfully"}
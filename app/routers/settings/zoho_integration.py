@@ -0,0 +1,178 @@
+"""
+Zoho Integration Settings Router
+================================
+
+Sync plan endpoints: analyze builds an exact, stored diff between Zoho and
+the local table (ZohoSyncPlanner); execute applies that plan and nothing
+else. Mappings and the integration config are the JSON files under
+app/data/settings shared with the legacy settings router.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import datetime
+import json
+import os
+
+from app.db.database import get_db
+from app.dependencies.rbac import PermissionChecker
+from app.schemas.settings.zoho import ZohoDataAnalysis
+from app.services.zoho_bulk_sync_service import get_shared_zoho_client
+from app.services.zoho_sync_planner import (
+    API_SOURCES, SYNC_TARGETS, ZohoSyncPlanner, execute_plan, get_plan, iter_api_pages, iter_export_pages,
+    iter_from_async
+)
+
+router = APIRouter(prefix="/integrations/zoho/sync", tags=["Zoho Integration Settings"])
+
+SETTINGS_DIR = "app/data/settings"
+ZOHO_CONFIG_PATH = os.path.join(SETTINGS_DIR, "zoho_config.json")
+ZOHO_SYNC_MAPPINGS_PATH = os.path.join(SETTINGS_DIR, "zoho_sync_mappings.json")
+
+# Zoho export files read when source=export
+ZOHO_EXPORT_FILES = {
+    "item": "all_zoho_inventory_items.json",
+    "customer": "all_zoho_customers.json",
+    "vendor": "all_zoho_vendors.json"
+}
+
+
+def load_settings_file(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_sync_mappings(mappings: dict) -> None:
+    os.makedirs(SETTINGS_DIR, exist_ok=True)
+    with open(ZOHO_SYNC_MAPPINGS_PATH, "w", encoding="utf-8") as f:
+        json.dump(mappings, f, indent=2)
+
+
+def load_entity_mapping(entity_type: str) -> tuple:
+    """(all mappings, this entity's mapping) after the common checks"""
+    if entity_type not in SYNC_TARGETS:
+        raise HTTPException(status_code=400, detail="Invalid entity type")
+    if not load_settings_file(ZOHO_CONFIG_PATH).get("enabled"):
+        raise HTTPException(status_code=400, detail="Zoho integration is not enabled")
+    mappings = load_settings_file(ZOHO_SYNC_MAPPINGS_PATH)
+    mapping = mappings.get(entity_type)
+    if not mapping:
+        raise HTTPException(status_code=404, detail=f"Mapping not found for {entity_type}")
+    return mappings, mapping
+
+
+def plan_analysis(plan) -> ZohoDataAnalysis:
+    return ZohoDataAnalysis(
+        plan_id=plan.id,
+        entity_type=plan.entity_type,
+        source=plan.source,
+        total_records=plan.total_records,
+        new_records=plan.insert_count,
+        updated_records=plan.update_count,
+        matched_records=plan.unchanged_count,
+        orphaned_records=plan.orphaned_count,
+        error_records=plan.invalid_count,
+        last_analyzed=(plan.created_at or datetime.datetime.now()).isoformat(),
+        field_statistics={"changed_fields": plan.field_changes}
+    )
+
+
+@router.post("/{entity_type}/analyze", dependencies=[Depends(PermissionChecker(["settings.update"]))])
+async def analyze_zoho_data(
+    entity_type: str,
+    source: str = Query("export", pattern="^(export|zoho)$"),
+    page_size: int = Query(500, ge=10, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Build an exact sync plan for an entity (dry run)
+
+    Records are streamed page by page from the Zoho export file or the Zoho
+    API and compared with the local table by content hash; the returned
+    plan_id is what /execute applies. Parsing and planning run in the
+    threadpool; only the Zoho API calls run on the event loop.
+    """
+    _, mapping = await run_in_threadpool(load_entity_mapping, entity_type)
+    planner = ZohoSyncPlanner(db, entity_type, mapping["field_mappings"])
+
+    if source == "export":
+        zoho_file = ZOHO_EXPORT_FILES[entity_type]
+        if not os.path.exists(zoho_file):
+            raise HTTPException(status_code=404, detail=f"Zoho export file not found: {zoho_file}")
+        plan = await run_in_threadpool(
+            planner.plan, iter_export_pages(zoho_file, page_size), source="export", source_ref=zoho_file
+        )
+    else:
+        api_type, endpoint, params = API_SOURCES[entity_type]
+        client = await get_shared_zoho_client()
+        pages = iter_api_pages(client, api_type, endpoint, params=params, page_size=min(page_size, 200))
+        plan = await run_in_threadpool(planner.plan, iter_from_async(pages), source="zoho_api", source_ref=endpoint)
+
+    return {
+        "status": "success",
+        "message": f"Data analysis completed for {entity_type}",
+        "analysis": plan_analysis(plan)
+    }
+
+
+@router.get("/{entity_type}/plans/{plan_id}", dependencies=[Depends(PermissionChecker(["settings.view"]))])
+async def get_sync_plan(entity_type: str, plan_id: int, db: Session = Depends(get_db)):
+    """A stored sync plan with its counts and execution result"""
+    plan = get_plan(db, plan_id)
+    if plan.entity_type != entity_type:
+        raise HTTPException(status_code=404, detail=f"Sync plan {plan_id} not found for {entity_type}")
+    return {
+        "status": plan.status,
+        "analysis": plan_analysis(plan),
+        "execution_stats": plan.execution_stats,
+        "error_message": plan.error_message
+    }
+
+
+@router.post("/{entity_type}/execute", dependencies=[Depends(PermissionChecker(["settings.update"]))])
+def execute_sync(
+    entity_type: str,
+    plan_id: int,
+    force: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Apply a sync plan built by /analyze, exactly as stored
+
+    Updates whose local row changed since planning are counted as conflicts
+    and left alone; force applies a plan built with an older field mapping.
+    Declared sync so FastAPI runs the whole execution in its threadpool.
+    """
+    mappings, mapping = load_entity_mapping(entity_type)
+    if not mapping.get("enabled"):
+        raise HTTPException(status_code=400, detail=f"Sync mapping is not enabled for {entity_type}")
+
+    plan = get_plan(db, plan_id)
+    if plan.entity_type != entity_type:
+        raise HTTPException(status_code=400, detail=f"Sync plan {plan_id} is for {plan.entity_type}")
+
+    statistics = execute_plan(
+        db, plan_id,
+        field_mappings=mapping["field_mappings"],
+        delete_sync=bool(mapping.get("delete_sync")),
+        force=force
+    )
+
+    sync_status = "completed_with_errors" if statistics["conflicts"] or statistics["failed"] else "success"
+    mapping["last_sync"] = datetime.datetime.now().isoformat()
+    mapping["last_sync_status"] = sync_status
+    mapping["total_synced"] = mapping.get("total_synced", 0) + statistics["inserted"] + statistics["updated"]
+    mapping["total_errors"] = mapping.get("total_errors", 0) + statistics["failed"]
+    mappings[entity_type] = mapping
+    save_sync_mappings(mappings)
+
+    return {
+        "status": sync_status,
+        "plan_id": plan_id,
+        "message": f"Sync completed for {entity_type}",
+        "statistics": statistics,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
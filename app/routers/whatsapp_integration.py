@@ -9,11 +9,16 @@ from enum import Enum
 import uuid
 
 from app.db.database import get_db
+from app.dependencies.rbac import RoleChecker
 from app.models import *
+from app.services.whatsapp_broadcast_service import BroadcastService
 from sqlalchemy import func, desc, and_, or_
 
 router = APIRouter()
 
+# Broadcasts are billed template sends to customers
+require_broadcaster = RoleChecker(["admin", "manager"])
+
 class WhatsAppMessageType(str, Enum):
     TEXT = "text"
     IMAGE = "image"
@@ -99,6 +104,10 @@ async def whatsapp_webhook_handler(
                                 )
                                 db.add(whatsapp_msg)
                                 db.commit()
+
+                        # Delivery statuses of sent messages (broadcasts included)
+                        if "statuses" in value:
+                            BroadcastService(db).apply_status_updates(value["statuses"])
         
         return {"status": "processed"}
         
@@ -189,66 +198,82 @@ async def send_whatsapp_template_message(
 @router.post("/whatsapp/broadcast")
 async def broadcast_whatsapp_message(
     broadcast: WhatsAppBroadcastRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user: dict = Depends(require_broadcaster)
 ):
     """
     📢 Broadcast message to multiple WhatsApp numbers
+
+    Recipients are queued and sent in the background by the broadcast
+    dispatcher within the Cloud API rate limits; follow progress with
+    GET /whatsapp/broadcast/{broadcast_id}
     """
     
     try:
-        broadcast_id = f"bc_{uuid.uuid4().hex[:8]}"
-        
-        # Create broadcast record
-        whatsapp_broadcast = WhatsAppBroadcast(
-            broadcast_id=broadcast_id,
+        whatsapp_broadcast = BroadcastService(db).create_broadcast(
+            [format_phone_number(phone) for phone in broadcast.phone_numbers],
             template_name=broadcast.template_name,
             language=broadcast.language,
-            total_recipients=len(broadcast.phone_numbers),
-            status="pending",
-            created_at=datetime.now()
+            parameters=broadcast.parameters,
+            requested_by=user.get("user_id")
         )
-        db.add(whatsapp_broadcast)
-        db.commit()
-        
-        # Mock broadcast processing
-        sent_count = 0
-        failed_count = 0
-        
-        for phone in broadcast.phone_numbers:
-            try:
-                # Mock sending logic
-                sent_count += 1
-            except:
-                failed_count += 1
-        
-        # Update broadcast record
-        broadcast_record = db.query(WhatsAppBroadcast).filter(
-            WhatsAppBroadcast.broadcast_id == broadcast_id
-        ).first()
-        if broadcast_record:
-            # Update fields properly
-            db.query(WhatsAppBroadcast).filter(
-                WhatsAppBroadcast.broadcast_id == broadcast_id
-            ).update({
-                "sent_count": sent_count,
-                "failed_count": failed_count,
-                "status": "completed",
-                "completed_at": datetime.now()
-            })
-            db.commit()
         
         return {
-            "broadcast_id": broadcast_id,
-            "status": "completed",
-            "total_recipients": len(broadcast.phone_numbers),
-            "sent": sent_count,
-            "failed": failed_count
+            "broadcast_id": whatsapp_broadcast.broadcast_id,
+            "status": whatsapp_broadcast.status,
+            "total_recipients": whatsapp_broadcast.total_recipients,
+            "sent": 0,
+            "failed": 0
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to broadcast message: {str(e)}")
 
+@router.get("/whatsapp/broadcast/{broadcast_id}", dependencies=[Depends(require_broadcaster)])
+async def get_whatsapp_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    📊 Delivery progress of a broadcast
+    """
+    
+    service = BroadcastService(db)
+    whatsapp_broadcast = service.get_broadcast(broadcast_id)
+    return {
+        "broadcast_id": whatsapp_broadcast.broadcast_id,
+        "template_name": whatsapp_broadcast.template_name,
+        "status": whatsapp_broadcast.status,
+        "total_recipients": whatsapp_broadcast.total_recipients,
+        "sent": whatsapp_broadcast.sent_count,
+        "delivered": whatsapp_broadcast.delivered_count,
+        "read": whatsapp_broadcast.read_count,
+        "failed": whatsapp_broadcast.failed_count,
+        "recipients_by_status": service.recipient_counts(whatsapp_broadcast),
+        "created_at": whatsapp_broadcast.created_at,
+        "started_at": whatsapp_broadcast.started_at,
+        "completed_at": whatsapp_broadcast.completed_at
+    }
+
+@router.post("/whatsapp/broadcast/{broadcast_id}/cancel", dependencies=[Depends(require_broadcaster)])
+async def cancel_whatsapp_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    🛑 Cancel the recipients of a broadcast that have not been sent yet
+    """
+    
+    service = BroadcastService(db)
+    whatsapp_broadcast = service.cancel_broadcast(broadcast_id)
+    return {
+        "broadcast_id": whatsapp_broadcast.broadcast_id,
+        "status": whatsapp_broadcast.status,
+        "recipients_by_status": service.recipient_counts(whatsapp_broadcast)
+    }
+
 @router.get("/whatsapp/analytics")
 async def get_whatsapp_analytics(
     period_days: int = 7,
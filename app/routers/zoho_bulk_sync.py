@@ -2,79 +2,30 @@
 Zoho Bulk Sync Router
 API endpoints for bulk data migration from Zoho Books
 
-UPDATED: Now uses TDS unified Zoho integration
+UPDATED: Bulk syncs are durable jobs (tds_bulk_sync_jobs). Each endpoint
+queues a job and returns immediately; BulkSyncRunner imports it page by
+page, checkpointing after every committed page, and publishes progress on
+the event bus. Poll GET /jobs/{job_id} or subscribe to
+tds.zoho.bulk_sync.* events for progress.
 Date: November 6, 2025
 """
 import logging
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from app.db.database import get_async_db
-from app.tds.integrations.zoho import (
-    UnifiedZohoClient, ZohoAuthManager,
-    ZohoCredentials, SyncConfig, SyncMode, EntityType
-)
-from app.tds.integrations.zoho.sync_with_caching import CachedZohoSyncOrchestrator
-from app.core.events.event_bus import EventBus
-import os
+from app.db.database import get_db
+from app.dependencies.rbac import RoleChecker
+from app.models.zoho_sync import BulkSyncJobStatus
+from app.services.zoho_bulk_sync_service import BulkSyncJobService
+from app.tds.integrations.zoho import SyncMode, EntityType
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
-
-
-# ============================================================================
-# HELPER FUNCTIONS
-# ============================================================================
-
-async def get_tds_services():
-    """
-    Initialize and return TDS unified services
-
-    Returns:
-        tuple: (zoho_client, orchestrator)
-    """
-    # Load credentials from environment
-    credentials = ZohoCredentials(
-        client_id=os.getenv('ZOHO_CLIENT_ID'),
-        client_secret=os.getenv('ZOHO_CLIENT_SECRET'),
-        refresh_token=os.getenv('ZOHO_REFRESH_TOKEN'),
-        organization_id=os.getenv('ZOHO_ORGANIZATION_ID')
-    )
-
-    # Validate credentials
-    if not all([credentials.client_id, credentials.client_secret,
-                credentials.refresh_token, credentials.organization_id]):
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Missing Zoho credentials in environment"
-        )
-
-    # Create event bus
-    event_bus = EventBus()
-
-    # Create auth manager
-    auth_manager = ZohoAuthManager(credentials, auto_refresh=True, event_bus=event_bus)
-    await auth_manager.start()
-
-    # Create Zoho client
-    zoho_client = UnifiedZohoClient(
-        auth_manager=auth_manager,
-        organization_id=credentials.organization_id,
-        rate_limit=100,
-        event_bus=event_bus
-    )
-    await zoho_client.start_session()
-
-    # Create sync orchestrator (with Redis caching)
-    orchestrator = CachedZohoSyncOrchestrator(
-        zoho_client=zoho_client,
-        event_bus=event_bus
-    )
-
-    return zoho_client, orchestrator
+# Full imports and job control are admin-only
+router = APIRouter(dependencies=[Depends(RoleChecker(["admin"]))])
 
 
 # ============================================================================
@@ -95,7 +46,7 @@ class BulkSyncRequest(BaseModel):
         default=100,
         ge=10,
         le=200,
-        description="Number of items to process in each batch"
+        description="Number of items fetched and committed per page"
     )
     active_only: bool = Field(
         default=True,
@@ -111,13 +62,55 @@ class BulkSyncRequest(BaseModel):
     )
 
 
-class BulkSyncResponse(BaseModel):
-    """Response model for bulk sync operations"""
-    success: bool
+class BulkSyncJobResponse(BaseModel):
+    """A bulk sync job and its checkpoint"""
+    id: int
+    entity_type: str
+    mode: str
+    status: BulkSyncJobStatus
+    params: Dict[str, Any]
+    page_size: int
+    next_page: int
+    pages_completed: int
+    total_processed: int
+    total_success: int
+    total_failed: int
+    total_skipped: int
+    cancel_requested: bool
+    attempts: int
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    checkpointed_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncAllResponse(BaseModel):
+    """Jobs queued by a complete migration"""
     message: str
-    stats: dict
-    duration_seconds: Optional[float] = None
-    error: Optional[str] = None
+    jobs: List[BulkSyncJobResponse]
+
+
+def _filter_params(request: BulkSyncRequest, active_filter: bool) -> Dict[str, Any]:
+    filter_params = {}
+    if active_filter and request.active_only:
+        filter_params['filter_by'] = 'Status.Active'
+    if request.modified_since:
+        filter_params['last_modified_time'] = request.modified_since
+    return filter_params
+
+
+def _queue(db: Session, entity_type: EntityType, request: BulkSyncRequest, active_filter: bool) -> BulkSyncJobResponse:
+    job = BulkSyncJobService(db).create_job(
+        entity_type,
+        mode=SyncMode.INCREMENTAL if request.incremental else SyncMode.FULL,
+        params=_filter_params(request, active_filter),
+        page_size=request.batch_size
+    )
+    return BulkSyncJobResponse.model_validate(job)
 
 
 # ============================================================================
@@ -126,96 +119,30 @@ class BulkSyncResponse(BaseModel):
 
 @router.post(
     "/products",
-    response_model=BulkSyncResponse,
+    response_model=BulkSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     tags=["Zoho Bulk Sync"],
     summary="Bulk sync products from Zoho Books",
     description="""
-    Fetch all products (items) from Zoho Books and sync to TSH ERP database.
+    Queue a job that fetches all products (items) from Zoho and syncs them to TSH ERP database.
 
     **Modes:**
     - **Full sync** (incremental=false): Import ALL products from Zoho Books
     - **Incremental sync** (incremental=true): Only import products modified since specified date
 
     **Performance:**
-    - Processes 100-200 items per batch
-    - Expected duration: 5-10 minutes for 2,000+ products
+    - One page of 10-200 items is fetched and committed at a time
+    - Interrupted jobs resume from the last committed page
     - Automatic deduplication using zoho_item_id
-
-    **Note:** This operation may take several minutes for large catalogs.
     """
 )
 async def bulk_sync_products(
     request: BulkSyncRequest,
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_async_db)
+    db: Session = Depends(get_db)
 ):
-    """
-    Bulk sync products from Zoho Books using TDS unified architecture
-
-    Args:
-        request: Bulk sync request parameters
-        background_tasks: FastAPI background tasks
-        db: Database session
-
-    Returns:
-        Sync statistics and results
-    """
+    """Queue a products bulk sync job"""
     logger.info(f"📦 Products bulk sync requested - Incremental: {request.incremental}")
-
-    zoho_client = None
-    try:
-        # Initialize TDS services
-        zoho_client, orchestrator = await get_tds_services()
-
-        # Determine sync mode
-        sync_mode = SyncMode.INCREMENTAL if request.incremental else SyncMode.FULL
-
-        # Build filter params
-        filter_params = {}
-        if request.active_only:
-            filter_params['filter_by'] = 'Status.Active'
-        if request.modified_since:
-            filter_params['last_modified_time'] = request.modified_since
-
-        # Create sync configuration
-        config = SyncConfig(
-            entity_type=EntityType.PRODUCTS,
-            mode=sync_mode,
-            batch_size=request.batch_size,
-            filter_params=filter_params
-        )
-
-        # Execute sync
-        result = await orchestrator.sync_entity(config)
-
-        # Build response
-        stats = {
-            "total_processed": result.total_processed,
-            "successful": result.total_success,
-            "failed": result.total_failed,
-            "skipped": result.total_skipped
-        }
-
-        duration_seconds = result.duration.total_seconds() if result.duration else None
-
-        return BulkSyncResponse(
-            success=(result.status == "completed"),
-            message=f"Products bulk sync {result.status}",
-            stats=stats,
-            duration_seconds=duration_seconds,
-            error=result.error if result.status == "failed" else None
-        )
-
-    except Exception as e:
-        logger.error(f"Products bulk sync failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Bulk sync failed: {str(e)}"
-        )
-    finally:
-        # Cleanup
-        if zoho_client:
-            await zoho_client.close_session()
+    return _queue(db, EntityType.PRODUCTS, request, active_filter=True)
 
 
 # ============================================================================
@@ -224,92 +151,26 @@ async def bulk_sync_products(
 
 @router.post(
     "/customers",
-    response_model=BulkSyncResponse,
+    response_model=BulkSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     tags=["Zoho Bulk Sync"],
     summary="Bulk sync customers from Zoho Books",
     description="""
-    Fetch all customers (contacts) from Zoho Books and sync to TSH ERP database.
+    Queue a job that fetches all customers (contacts) from Zoho Books and syncs them to TSH ERP database.
 
     **Features:**
     - Imports customer details and addresses
     - Handles both business and individual contacts
-    - Automatic email uniqueness validation
-    - Syncs billing and shipping addresses
-
-    **Performance:**
-    - Expected duration: 1-2 minutes for hundreds of customers
+    - Interrupted jobs resume from the last committed page
     """
 )
 async def bulk_sync_customers(
     request: BulkSyncRequest,
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_async_db)
+    db: Session = Depends(get_db)
 ):
-    """
-    Bulk sync customers from Zoho Books using TDS unified architecture
-
-    Args:
-        request: Bulk sync request parameters
-        background_tasks: FastAPI background tasks
-        db: Database session
-
-    Returns:
-        Sync statistics and results
-    """
+    """Queue a customers bulk sync job"""
     logger.info(f"👥 Customers bulk sync requested - Incremental: {request.incremental}")
-
-    zoho_client = None
-    try:
-        # Initialize TDS services
-        zoho_client, orchestrator = await get_tds_services()
-
-        # Determine sync mode
-        sync_mode = SyncMode.INCREMENTAL if request.incremental else SyncMode.FULL
-
-        # Build filter params
-        filter_params = {}
-        if request.modified_since:
-            filter_params['last_modified_time'] = request.modified_since
-
-        # Create sync configuration
-        config = SyncConfig(
-            entity_type=EntityType.CUSTOMERS,
-            mode=sync_mode,
-            batch_size=request.batch_size,
-            filter_params=filter_params
-        )
-
-        # Execute sync
-        result = await orchestrator.sync_entity(config)
-
-        # Build response
-        stats = {
-            "total_processed": result.total_processed,
-            "successful": result.total_success,
-            "failed": result.total_failed,
-            "skipped": result.total_skipped
-        }
-
-        duration_seconds = result.duration.total_seconds() if result.duration else None
-
-        return BulkSyncResponse(
-            success=(result.status == "completed"),
-            message=f"Customers bulk sync {result.status}",
-            stats=stats,
-            duration_seconds=duration_seconds,
-            error=result.error if result.status == "failed" else None
-        )
-
-    except Exception as e:
-        logger.error(f"Customers bulk sync failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Bulk sync failed: {str(e)}"
-        )
-    finally:
-        # Cleanup
-        if zoho_client:
-            await zoho_client.close_session()
+    return _queue(db, EntityType.CUSTOMERS, request, active_filter=False)
 
 
 # ============================================================================
@@ -323,109 +184,28 @@ async def bulk_sync_customers(
 
 @router.post(
     "/items-with-stock",
-    response_model=BulkSyncResponse,
+    response_model=BulkSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     tags=["Zoho Bulk Sync"],
     summary="Bulk sync items (products) with stock levels from Zoho Books/Inventory",
     description="""
-    Fetch all items from Zoho Books/Inventory with their current stock levels and sync to TSH ERP database.
-
-    **Features:**
-    - Syncs product data (name, SKU, prices, images)
-    - Syncs stock levels (stock on hand, available stock)
-    - Supports multi-warehouse stock tracking
-    - Real-time inventory updates
-    - Supports both active-only and all items
-    - Can filter by stock availability
+    Queue a job that fetches all items from Zoho Inventory with their current stock levels.
 
     **Stock Data Synced:**
     - Stock on hand (current physical stock)
     - Available stock (stock available for sale)
-    - Warehouse information
     - Last modified timestamps
 
-    **Performance:**
-    - Processes 100-200 items per batch
-    - Expected duration: 5-10 minutes for 2,000+ products
-    - Automatic deduplication using zoho_item_id
-
     **Note:** This combines product sync with inventory sync for complete stock visibility.
     """
 )
 async def bulk_sync_items_with_stock(
     request: BulkSyncRequest,
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_async_db)
+    db: Session = Depends(get_db)
 ):
-    """
-    Bulk sync items (products) with stock levels from Zoho using TDS unified architecture
-
-    This endpoint syncs both product information AND stock levels in a single operation.
-
-    Args:
-        request: Bulk sync request parameters
-        background_tasks: FastAPI background tasks
-        db: Database session
-
-    Returns:
-        Sync statistics and results
-    """
+    """Queue an inventory (items with stock) bulk sync job"""
     logger.info(f"📦📊 Items with Stock bulk sync requested - Incremental: {request.incremental}")
-
-    zoho_client = None
-    try:
-        # Initialize TDS services
-        zoho_client, orchestrator = await get_tds_services()
-
-        # Import stock sync service
-        from app.tds.integrations.zoho.stock_sync import UnifiedStockSyncService, StockSyncConfig
-        from app.tds.integrations.zoho import SyncMode
-
-        # Create stock sync service
-        stock_service = UnifiedStockSyncService(
-            zoho_client=zoho_client,
-            sync_orchestrator=orchestrator
-        )
-
-        # Configure stock sync
-        stock_config = StockSyncConfig(
-            batch_size=request.batch_size,
-            active_only=request.active_only,
-            with_stock_only=request.with_stock_only,
-            sync_mode=SyncMode.INCREMENTAL if request.incremental else SyncMode.FULL
-        )
-
-        # Execute sync
-        result = await stock_service.sync_all_stock(config=stock_config)
-
-        # Build response
-        stats = {
-            "total_processed": result.total_processed,
-            "successful": result.total_success,
-            "failed": result.total_failed,
-            "skipped": result.total_skipped,
-            "stock_updated": result.total_success  # All successful items had stock updated
-        }
-
-        duration_seconds = result.duration.total_seconds() if result.duration else None
-
-        return BulkSyncResponse(
-            success=(result.status == "completed"),
-            message=f"Items with stock bulk sync {result.status}",
-            stats=stats,
-            duration_seconds=duration_seconds,
-            error=result.error if result.status == "failed" else None
-        )
-
-    except Exception as e:
-        logger.error(f"Items with stock bulk sync failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Bulk sync failed: {str(e)}"
-        )
-    finally:
-        # Cleanup
-        if zoho_client:
-            await zoho_client.close_session()
+    return _queue(db, EntityType.INVENTORY, request, active_filter=True)
 
 
 # ============================================================================
@@ -434,85 +214,19 @@ async def bulk_sync_items_with_stock(
 
 @router.post(
     "/pricelists",
-    response_model=BulkSyncResponse,
+    response_model=BulkSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     tags=["Zoho Bulk Sync"],
     summary="Bulk sync price lists from Zoho Books",
     description="""
-    Fetch all price lists from Zoho Books and sync to TSH ERP database.
-
-    **Features:**
-    - Imports all price lists with item-specific prices
-    - Supports multi-currency pricing
-    - Links prices to existing products
-    - Handles percentage-based and fixed pricing
-
-    **Performance:**
-    - Expected duration: 2-3 minutes
+    Price lists are synced as part of the products sync; this queues a full products job.
+    Maintained for backward compatibility.
     """
 )
-async def bulk_sync_pricelists(
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_async_db)
-):
-    """
-    Bulk sync price lists from Zoho Books
-
-    NOTE: Price lists are now synced as part of product sync via TDS.
-    This endpoint is maintained for backward compatibility.
-
-    Args:
-        background_tasks: FastAPI background tasks
-        db: Database session
-
-    Returns:
-        Sync statistics and results
-    """
+async def bulk_sync_pricelists(db: Session = Depends(get_db)):
+    """Queue a full products job (includes price list data)"""
     logger.info(f"💰 Price lists bulk sync requested (now part of products sync)")
-
-    zoho_client = None
-    try:
-        # Initialize TDS services
-        zoho_client, orchestrator = await get_tds_services()
-
-        # Sync products with price list data
-        config = SyncConfig(
-            entity_type=EntityType.PRODUCTS,
-            mode=SyncMode.FULL,
-            batch_size=100,
-            filter_params={}
-        )
-
-        # Execute sync
-        result = await orchestrator.sync_entity(config)
-
-        # Build response
-        stats = {
-            "total_processed": result.total_processed,
-            "successful": result.total_success,
-            "failed": result.total_failed,
-            "skipped": result.total_skipped
-        }
-
-        duration_seconds = result.duration.total_seconds() if result.duration else None
-
-        return BulkSyncResponse(
-            success=(result.status == "completed"),
-            message=f"Products sync (includes price lists) {result.status}",
-            stats=stats,
-            duration_seconds=duration_seconds,
-            error=result.error if result.status == "failed" else None
-        )
-
-    except Exception as e:
-        logger.error(f"Price lists bulk sync failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Bulk sync failed: {str(e)}"
-        )
-    finally:
-        # Cleanup
-        if zoho_client:
-            await zoho_client.close_session()
+    return _queue(db, EntityType.PRODUCTS, BulkSyncRequest(active_only=False), active_filter=False)
 
 
 # ============================================================================
@@ -521,127 +235,86 @@ async def bulk_sync_pricelists(
 
 @router.post(
     "/sync-all",
-    response_model=dict,
+    response_model=SyncAllResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     tags=["Zoho Bulk Sync"],
     summary="Complete migration - sync all entities",
     description="""
-    Execute a complete data migration from Zoho Books to TSH ERP.
+    Queue a complete data migration from Zoho Books to TSH ERP.
 
     **Order of execution:**
     1. Products (foundation data)
     2. Customers (required for orders)
-    3. Price Lists (product pricing)
-
-    **Total Duration:** 10-15 minutes for complete migration
 
     **Note:** Invoices are synced automatically via webhooks, not included in bulk sync.
     """
 )
 async def sync_all_entities(
     modified_since: Optional[str] = None,
-    db: AsyncSession = Depends(get_async_db)
+    db: Session = Depends(get_db)
 ):
-    """
-    Sync all entities from Zoho Books using TDS unified architecture
+    """Queue products then customers jobs (runners take jobs oldest first)"""
+    logger.info(f"🚀 COMPLETE MIGRATION requested - Since: {modified_since}")
+    request = BulkSyncRequest(incremental=bool(modified_since), modified_since=modified_since)
+    jobs = [
+        _queue(db, EntityType.PRODUCTS, request, active_filter=True),
+        _queue(db, EntityType.CUSTOMERS, request, active_filter=False),
+    ]
+    return SyncAllResponse(
+        message="Complete migration queued (invoices sync via webhooks, pricelists in products)",
+        jobs=jobs
+    )
 
-    Args:
-        modified_since: Optional date filter for incremental sync
-        db: Database session
 
-    Returns:
-        Combined statistics for all entities
-    """
-    logger.info(f"🚀 COMPLETE MIGRATION requested - Since: {modified_since}")
+# ============================================================================
+# JOBS
+# ============================================================================
+
+@router.get(
+    "/jobs",
+    response_model=List[BulkSyncJobResponse],
+    tags=["Zoho Bulk Sync"],
+    summary="List bulk sync jobs"
+)
+async def list_bulk_sync_jobs(
+    job_status: Optional[BulkSyncJobStatus] = Query(None, alias="status"),
+    entity_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Most recent jobs first"""
+    return BulkSyncJobService(db).list_jobs(status=job_status, entity_type=entity_type, limit=limit)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=BulkSyncJobResponse,
+    tags=["Zoho Bulk Sync"],
+    summary="Get a bulk sync job and its progress"
+)
+async def get_bulk_sync_job(job_id: int, db: Session = Depends(get_db)):
+    return BulkSyncJobService(db).get_job(job_id)
+
 
-    results = {}
-    zoho_client = None
-
-    try:
-        # Initialize TDS services once for all operations
-        zoho_client, orchestrator = await get_tds_services()
-
-        # Determine sync mode
-        sync_mode = SyncMode.INCREMENTAL if modified_since else SyncMode.FULL
-
-        # Build filter params
-        filter_params = {}
-        if modified_since:
-            filter_params['last_modified_time'] = modified_since
-
-        # Step 1: Products
-        logger.info("Step 1/2: Syncing products...")
-        products_config = SyncConfig(
-            entity_type=EntityType.PRODUCTS,
-            mode=sync_mode,
-            batch_size=100,
-            filter_params={**filter_params, 'filter_by': 'Status.Active'}
-        )
-        products_result = await orchestrator.sync_entity(products_config)
-
-        results["products"] = {
-            "success": (products_result.status == "completed"),
-            "stats": {
-                "total_processed": products_result.total_processed,
-                "successful": products_result.total_success,
-                "failed": products_result.total_failed,
-                "skipped": products_result.total_skipped
-            },
-            "duration_seconds": products_result.duration.total_seconds() if products_result.duration else 0
-        }
-
-        # Step 2: Customers
-        logger.info("Step 2/2: Syncing customers...")
-        customers_config = SyncConfig(
-            entity_type=EntityType.CUSTOMERS,
-            mode=sync_mode,
-            batch_size=100,
-            filter_params=filter_params
-        )
-        customers_result = await orchestrator.sync_entity(customers_config)
-
-        results["customers"] = {
-            "success": (customers_result.status == "completed"),
-            "stats": {
-                "total_processed": customers_result.total_processed,
-                "successful": customers_result.total_success,
-                "failed": customers_result.total_failed,
-                "skipped": customers_result.total_skipped
-            },
-            "duration_seconds": customers_result.duration.total_seconds() if customers_result.duration else 0
-        }
-
-        # Calculate totals
-        total_success = all(r["success"] for r in results.values())
-        total_items = sum(r["stats"]["total_processed"] for r in results.values())
-        total_successful = sum(r["stats"]["successful"] for r in results.values())
-        total_failed = sum(r["stats"]["failed"] for r in results.values())
-
-        logger.info(f"✅ COMPLETE MIGRATION finished!")
-        logger.info(f"   Total items: {total_items}")
-        logger.info(f"   Successful: {total_successful}")
-        logger.info(f"   Failed: {total_failed}")
-
-        return {
-            "success": total_success,
-            "message": "Complete migration finished via TDS (invoices sync via webhooks, pricelists in products)",
-            "results": results,
-            "totals": {
-                "items": total_items,
-                "successful": total_successful,
-                "failed": total_failed
-            }
-        }
-
-    except Exception as e:
-        logger.error(f"Complete migration failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Migration failed: {str(e)}"
-        )
-    finally:
-        # Cleanup
-        if zoho_client:
-            await zoho_client.close_session()
+@router.post(
+    "/jobs/{job_id}/cancel",
+    response_model=BulkSyncJobResponse,
+    tags=["Zoho Bulk Sync"],
+    summary="Cancel a bulk sync job",
+    description="Queued jobs are cancelled at once; running jobs stop after the page in flight is committed."
+)
+async def cancel_bulk_sync_job(job_id: int, db: Session = Depends(get_db)):
+    return BulkSyncJobService(db).cancel_job(job_id)
+
+
+@router.post(
+    "/jobs/{job_id}/resume",
+    response_model=BulkSyncJobResponse,
+    tags=["Zoho Bulk Sync"],
+    summary="Resume a failed or cancelled bulk sync job from its checkpoint"
+)
+async def resume_bulk_sync_job(job_id: int, db: Session = Depends(get_db)):
+    return BulkSyncJobService(db).resume_job(job_id)
 
 
 # ============================================================================
@@ -653,13 +326,19 @@ async def sync_all_entities(
     tags=["Zoho Bulk Sync"],
     summary="Check bulk sync service status"
 )
-async def get_sync_status(db: AsyncSession = Depends(get_async_db)):
+async def get_sync_status(db: Session = Depends(get_db)):
     """
     Get bulk sync service status
 
     Returns:
-        Service health and configuration
+        Service health, configuration and active jobs
     """
+    service = BulkSyncJobService(db)
+    active = [
+        BulkSyncJobResponse.model_validate(job)
+        for job_status in (BulkSyncJobStatus.RUNNING, BulkSyncJobStatus.QUEUED)
+        for job in service.list_jobs(status=job_status)
+    ]
     return {
         "service": "Zoho Bulk Sync",
         "status": "healthy",
@@ -668,16 +347,20 @@ async def get_sync_status(db: AsyncSession = Depends(get_async_db)):
             "POST /api/zoho/bulk-sync/items-with-stock",
             "POST /api/zoho/bulk-sync/customers",
             "POST /api/zoho/bulk-sync/pricelists",
-            "POST /api/zoho/bulk-sync/sync-all"
+            "POST /api/zoho/bulk-sync/sync-all",
+            "GET /api/zoho/bulk-sync/jobs",
+            "GET /api/zoho/bulk-sync/jobs/{job_id}",
+            "POST /api/zoho/bulk-sync/jobs/{job_id}/cancel",
+            "POST /api/zoho/bulk-sync/jobs/{job_id}/resume"
         ],
         "features": [
-            "Pagination support",
+            "Durable jobs with per-page checkpoints",
+            "Resume after crash or deploy",
+            "Per-job cancellation",
+            "Progress events (tds.zoho.bulk_sync.*)",
             "Incremental sync",
-            "Batch processing",
-            "Automatic deduplication",
-            "Error handling with retry",
-            "Stock level synchronization",
-            "Multi-warehouse support"
+            "Automatic deduplication"
         ],
+        "active_jobs": active,
         "note": "Invoices are synced automatically via webhooks, not bulk sync"
     }
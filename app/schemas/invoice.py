@@ -328,6 +328,13 @@ class InvoiceSummary(BaseModel):
     overdue_purchase_count: int
 
 
+class InvoiceAgingBucket(BaseModel):
+    """شريحة أعمار الفواتير - Aging bucket"""
+    bucket: str  # current, 1-30, 31-60, 61-90, 90+
+    invoice_count: int
+    amount: Decimal
+
+
 class InvoiceFilter(BaseModel):
     status: Optional[InvoiceStatusEnum] = None
     invoice_type: Optional[InvoiceTypeEnum] = None
@@ -354,6 +354,9 @@ class POSSalesReport(BaseModel):
     total_tax: Decimal
     net_sales: Decimal
     payment_methods: List[dict]  # Breakdown by payment method
+    daily: List[dict] = []  # Breakdown by day
+    cashiers: List[dict] = []  # Breakdown by cashier
+    terminals: List[dict] = []  # Breakdown by terminal
 
 
 class POSSessionReport(BaseModel):
@@ -398,6 +398,8 @@ class LeaderboardResponse(BaseModel):
     leaderboard: List[LeaderboardEntry]
     total_participants: int
     my_rank: Optional[int]
+    team_total_sales: Optional[Decimal] = None
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page
 
 
 class WeeklyEarningsResponse(BaseModel):
@@ -467,6 +469,7 @@ class BatchOperationResponse(BaseModel):
     failed: int
     errors: List[dict]  # [{index, error, details}, ...]
     ids: Optional[List[int]]  # IDs of successfully created records
+    duplicates: int = 0  # Records skipped as already stored
 
 
 class SyncResult(BaseModel):
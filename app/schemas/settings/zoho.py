@@ -69,15 +69,18 @@ class ZohoSyncLog(BaseModel):
 
 
 class ZohoDataAnalysis(BaseModel):
-    """Analysis of Zoho data"""
+    """Analysis of Zoho data (a stored sync plan)"""
+    plan_id: int
     entity_type: str
+    source: str  # export, zoho_api
     total_records: int
     new_records: int  # Not in TSH
     updated_records: int  # Modified in Zoho
     matched_records: int  # Already synced
+    orphaned_records: int  # In TSH, no longer returned by Zoho
     error_records: int
     last_analyzed: str
-    field_statistics: Dict[str, Any]
+    field_statistics: Dict[str, Any]  # {"changed_fields": {column: records changing it}}
 
 
 class ZohoSyncControl(BaseModel):
@@ -1,12 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional, Dict
+from sqlalchemy import and_, or_, func, text, bindparam, Date, Numeric
+from typing import List, Optional, Dict, Tuple
 from decimal import Decimal
-from datetime import datetime, date
+from datetime import datetime, date, time
 from app.models.accounting import (
     Currency, ExchangeRate, ChartOfAccounts, Account, 
     Journal, JournalEntry, JournalLine, FiscalYear, AccountingPeriod,
-    AccountTypeEnum, TransactionStatusEnum
+    AccountPeriodBalance, AccountTypeEnum, TransactionStatusEnum
 )
 from app.schemas.accounting import (
     CurrencyCreate, CurrencyUpdate, ExchangeRateCreate,
@@ -249,6 +249,11 @@ class JournalService:
             )
             db.add(db_line)
         
+        if db_entry.status == TransactionStatusEnum.POSTED:
+            db_entry.posted_by = user_id
+            db_entry.posted_at = datetime.utcnow()
+            AccountBalanceLedger.apply_entry(db, db_entry)
+        
         db.commit()
         db.refresh(db_entry)
         return db_entry
@@ -288,6 +293,7 @@ class JournalService:
         entry.posted_by = user_id
         entry.posted_at = datetime.utcnow()
         entry.posting_date = datetime.utcnow()
+        AccountBalanceLedger.apply_entry(db, entry)
         
         db.commit()
         db.refresh(entry)
@@ -333,6 +339,148 @@ class JournalService:
         return journal
 
 
+class AccountBalanceLedger:
+    """دفتر أرصدة الحسابات الشهرية - Incremental account balance ledger"""
+
+    # Additive upsert of one entry's totals. Portable to PostgreSQL and SQLite.
+    UPSERT_SQL = text("""
+        INSERT INTO account_period_balances (account_id, period_start, debit_total, credit_total, updated_at)
+        VALUES (:account_id, :period_start, :debit_total, :credit_total, CURRENT_TIMESTAMP)
+        ON CONFLICT (account_id, period_start)
+        DO UPDATE SET
+            debit_total = account_period_balances.debit_total + excluded.debit_total,
+            credit_total = account_period_balances.credit_total + excluded.credit_total,
+            updated_at = CURRENT_TIMESTAMP
+    """).bindparams(
+        bindparam('period_start', type_=Date()),
+        bindparam('debit_total', type_=Numeric(15, 2)),
+        bindparam('credit_total', type_=Numeric(15, 2))
+    )
+
+    @staticmethod
+    def period_start(value) -> date:
+        """أول يوم في شهر القيد"""
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def apply_entry(db: Session, entry: JournalEntry, sign: int = 1):
+        """إضافة مجاميع قيد مرحّل إلى أرصدة شهره (بدون commit)"""
+        db.flush()
+        totals = db.query(
+            JournalLine.account_id,
+            func.sum(JournalLine.debit_amount),
+            func.sum(JournalLine.credit_amount)
+        ).filter(JournalLine.journal_entry_id == entry.id).group_by(JournalLine.account_id).all()
+
+        if totals:
+            period_start = AccountBalanceLedger.period_start(entry.entry_date)
+            db.execute(AccountBalanceLedger.UPSERT_SQL, [
+                {
+                    "account_id": account_id,
+                    "period_start": period_start,
+                    "debit_total": sign * Decimal(debit or 0),
+                    "credit_total": sign * Decimal(credit or 0),
+                }
+                for account_id, debit, credit in totals
+            ])
+
+    @staticmethod
+    def rebuild(db: Session):
+        """إعادة بناء الأرصدة من جميع القيود المرحّلة (بدون commit)"""
+        db.query(AccountPeriodBalance).delete(synchronize_session=False)
+
+        if db.get_bind().dialect.name == "postgresql":
+            month = func.date_trunc('month', JournalEntry.entry_date)
+        else:
+            month = func.strftime('%Y-%m-01', JournalEntry.entry_date)
+
+        rows = db.query(
+            JournalLine.account_id,
+            month,
+            func.sum(JournalLine.debit_amount),
+            func.sum(JournalLine.credit_amount)
+        ).join(JournalEntry, JournalLine.journal_entry_id == JournalEntry.id).filter(
+            JournalEntry.status == TransactionStatusEnum.POSTED
+        ).group_by(JournalLine.account_id, month).all()
+
+        if rows:
+            db.execute(AccountBalanceLedger.UPSERT_SQL, [
+                {
+                    "account_id": account_id,
+                    "period_start": date.fromisoformat(period) if isinstance(period, str)
+                    else AccountBalanceLedger.period_start(period),
+                    "debit_total": Decimal(debit or 0),
+                    "credit_total": Decimal(credit or 0),
+                }
+                for account_id, period, debit, credit in rows
+            ])
+
+    @staticmethod
+    def totals_as_of(db: Session, currency_id: int, as_of: datetime,
+                     inclusive: bool = True) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """
+        مجاميع المدين والدائن لكل حساب حتى تاريخ معين
+
+        الأشهر السابقة من دفتر الأرصدة، والشهر الحالي باستعلام مجمّع واحد على سطور القيود.
+        """
+        month_start = datetime.combine(AccountBalanceLedger.period_start(as_of), time.min)
+        totals: Dict[int, List[Decimal]] = {}
+
+        closed = db.query(
+            AccountPeriodBalance.account_id,
+            func.sum(AccountPeriodBalance.debit_total),
+            func.sum(AccountPeriodBalance.credit_total)
+        ).join(Account, AccountPeriodBalance.account_id == Account.id).filter(
+            Account.currency_id == currency_id,
+            AccountPeriodBalance.period_start < month_start.date()
+        ).group_by(AccountPeriodBalance.account_id)
+
+        open_period = db.query(
+            JournalLine.account_id,
+            func.sum(JournalLine.debit_amount),
+            func.sum(JournalLine.credit_amount)
+        ).join(JournalEntry, JournalLine.journal_entry_id == JournalEntry.id).join(
+            Account, JournalLine.account_id == Account.id
+        ).filter(
+            Account.currency_id == currency_id,
+            JournalEntry.status == TransactionStatusEnum.POSTED,
+            JournalEntry.entry_date >= month_start,
+            JournalEntry.entry_date <= as_of if inclusive else JournalEntry.entry_date < as_of
+        ).group_by(JournalLine.account_id)
+
+        for query in (closed, open_period):
+            for account_id, debit, credit in query:
+                account_totals = totals.setdefault(account_id, [Decimal(0), Decimal(0)])
+                account_totals[0] += Decimal(debit or 0)
+                account_totals[1] += Decimal(credit or 0)
+
+        return {account_id: (debit, credit) for account_id, (debit, credit) in totals.items()}
+
+    @staticmethod
+    def accounts(db: Session, currency_id: int, account_types: Optional[List[AccountTypeEnum]] = None):
+        """الحسابات النشطة مع بيانات دليل الحسابات باستعلام واحد"""
+        query = db.query(
+            Account.id,
+            ChartOfAccounts.code,
+            ChartOfAccounts.name_ar,
+            ChartOfAccounts.name_en,
+            ChartOfAccounts.account_type
+        ).join(ChartOfAccounts, Account.chart_account_id == ChartOfAccounts.id).filter(
+            Account.currency_id == currency_id,
+            Account.is_active == True
+        )
+        if account_types:
+            query = query.filter(ChartOfAccounts.account_type.in_(account_types))
+        return query.order_by(ChartOfAccounts.code, Account.id).all()
+
+    @staticmethod
+    def signed_balance(account_type: AccountTypeEnum, debit: Decimal, credit: Decimal) -> Decimal:
+        """الرصيد حسب طبيعة الحساب"""
+        if account_type in (AccountTypeEnum.ASSET, AccountTypeEnum.EXPENSE):
+            return debit - credit
+        return credit - debit
+
+
 class AccountingReportService:
     """خدمة التقارير المحاسبية"""
 
@@ -342,28 +490,24 @@ class AccountingReportService:
         if not as_of_date:
             as_of_date = datetime.utcnow()
         
-        # الحصول على جميع الحسابات مع الأرصدة
-        accounts = db.query(Account).filter(
-            Account.currency_id == currency_id,
-            Account.is_active == True
-        ).all()
+        totals = AccountBalanceLedger.totals_as_of(db, currency_id, as_of_date)
         
         trial_balance_accounts = []
         total_debit = Decimal(0)
         total_credit = Decimal(0)
         
-        for account in accounts:
-            if account.balance_debit > 0 or account.balance_credit > 0:
-                account_data = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "debit_balance": account.balance_debit,
-                    "credit_balance": account.balance_credit
-                }
-                trial_balance_accounts.append(account_data)
-                total_debit += account.balance_debit
-                total_credit += account.balance_credit
+        for account in AccountBalanceLedger.accounts(db, currency_id):
+            debit, credit = totals.get(account.id, (Decimal(0), Decimal(0)))
+            if debit > 0 or credit > 0:
+                trial_balance_accounts.append({
+                    "account_code": account.code,
+                    "account_name_ar": account.name_ar,
+                    "account_name_en": account.name_en,
+                    "debit_balance": debit,
+                    "credit_balance": credit
+                })
+                total_debit += debit
+                total_credit += credit
         
         currency = db.query(Currency).filter(Currency.id == currency_id).first()
         
@@ -382,85 +526,39 @@ class AccountingReportService:
             as_of_date = datetime.utcnow()
         
         currency = db.query(Currency).filter(Currency.id == currency_id).first()
-        
-        # الأصول
-        assets = db.query(Account).join(ChartOfAccounts).filter(
-            Account.currency_id == currency_id,
-            ChartOfAccounts.account_type == AccountTypeEnum.ASSET,
-            Account.is_active == True
-        ).all()
-        
-        # الخصوم
-        liabilities = db.query(Account).join(ChartOfAccounts).filter(
-            Account.currency_id == currency_id,
-            ChartOfAccounts.account_type == AccountTypeEnum.LIABILITY,
-            Account.is_active == True
-        ).all()
-        
-        # حقوق الملكية
-        equity = db.query(Account).join(ChartOfAccounts).filter(
-            Account.currency_id == currency_id,
-            ChartOfAccounts.account_type == AccountTypeEnum.EQUITY,
-            Account.is_active == True
-        ).all()
-        
-        # بناء التقرير
-        assets_items = []
-        liabilities_items = []
-        equity_items = []
-        
-        total_assets = Decimal(0)
-        total_liabilities = Decimal(0)
-        total_equity = Decimal(0)
-        
-        for account in assets:
-            if account.balance != 0:
-                asset_item = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "account_type": account.chart_account.account_type,
-                    "balance": account.balance,
-                    "currency_code": currency.code
-                }
-                assets_items.append(asset_item)
-                total_assets += account.balance
-        
-        for account in liabilities:
-            if account.balance != 0:
-                liability_item = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "account_type": account.chart_account.account_type,
-                    "balance": account.balance,
-                    "currency_code": currency.code
-                }
-                liabilities_items.append(liability_item)
-                total_liabilities += account.balance
-        
-        for account in equity:
-            if account.balance != 0:
-                equity_item = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "account_type": account.chart_account.account_type,
-                    "balance": account.balance,
+        totals = AccountBalanceLedger.totals_as_of(db, currency_id, as_of_date)
+        
+        sections = {
+            AccountTypeEnum.ASSET: [],  # الأصول
+            AccountTypeEnum.LIABILITY: [],  # الخصوم
+            AccountTypeEnum.EQUITY: [],  # حقوق الملكية
+        }
+        section_totals = {account_type: Decimal(0) for account_type in sections}
+        
+        for account in AccountBalanceLedger.accounts(db, currency_id, list(sections)):
+            balance = AccountBalanceLedger.signed_balance(
+                account.account_type, *totals.get(account.id, (Decimal(0), Decimal(0)))
+            )
+            if balance != 0:
+                sections[account.account_type].append({
+                    "account_code": account.code,
+                    "account_name_ar": account.name_ar,
+                    "account_name_en": account.name_en,
+                    "account_type": account.account_type,
+                    "balance": balance,
                     "currency_code": currency.code
-                }
-                equity_items.append(equity_item)
-                total_equity += account.balance
+                })
+                section_totals[account.account_type] += balance
         
         return BalanceSheet(
             as_of_date=as_of_date,
             currency_code=currency.code,
-            assets=assets_items,
-            liabilities=liabilities_items,
-            equity=equity_items,
-            total_assets=total_assets,
-            total_liabilities=total_liabilities,
-            total_equity=total_equity
+            assets=sections[AccountTypeEnum.ASSET],
+            liabilities=sections[AccountTypeEnum.LIABILITY],
+            equity=sections[AccountTypeEnum.EQUITY],
+            total_assets=section_totals[AccountTypeEnum.ASSET],
+            total_liabilities=section_totals[AccountTypeEnum.LIABILITY],
+            total_equity=section_totals[AccountTypeEnum.EQUITY]
         )
 
     @staticmethod
@@ -469,64 +567,42 @@ class AccountingReportService:
         """قائمة الدخل"""
         currency = db.query(Currency).filter(Currency.id == currency_id).first()
         
-        # الإيرادات
-        revenues = db.query(Account).join(ChartOfAccounts).filter(
-            Account.currency_id == currency_id,
-            ChartOfAccounts.account_type == AccountTypeEnum.REVENUE,
-            Account.is_active == True
-        ).all()
+        # حركة الفترة = الرصيد حتى نهايتها - الرصيد قبل بدايتها
+        closing = AccountBalanceLedger.totals_as_of(db, currency_id, to_date)
+        opening = AccountBalanceLedger.totals_as_of(db, currency_id, from_date, inclusive=False)
         
-        # المصروفات
-        expenses = db.query(Account).join(ChartOfAccounts).filter(
-            Account.currency_id == currency_id,
-            ChartOfAccounts.account_type == AccountTypeEnum.EXPENSE,
-            Account.is_active == True
-        ).all()
-        
-        # بناء التقرير
-        revenue_items = []
-        expense_items = []
-        
-        total_revenue = Decimal(0)
-        total_expenses = Decimal(0)
-        
-        for account in revenues:
-            if account.balance != 0:
-                revenue_item = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "account_type": account.chart_account.account_type,
-                    "amount": account.balance,
-                    "currency_code": currency.code
-                }
-                revenue_items.append(revenue_item)
-                total_revenue += account.balance
-        
-        for account in expenses:
-            if account.balance != 0:
-                expense_item = {
-                    "account_code": account.chart_account.code,
-                    "account_name_ar": account.chart_account.name_ar,
-                    "account_name_en": account.chart_account.name_en,
-                    "account_type": account.chart_account.account_type,
-                    "amount": account.balance,
+        sections = {AccountTypeEnum.REVENUE: [], AccountTypeEnum.EXPENSE: []}
+        section_totals = {account_type: Decimal(0) for account_type in sections}
+        
+        for account in AccountBalanceLedger.accounts(db, currency_id, list(sections)):
+            closing_debit, closing_credit = closing.get(account.id, (Decimal(0), Decimal(0)))
+            opening_debit, opening_credit = opening.get(account.id, (Decimal(0), Decimal(0)))
+            amount = AccountBalanceLedger.signed_balance(
+                account.account_type, closing_debit - opening_debit, closing_credit - opening_credit
+            )
+            if amount != 0:
+                sections[account.account_type].append({
+                    "account_code": account.code,
+                    "account_name_ar": account.name_ar,
+                    "account_name_en": account.name_en,
+                    "account_type": account.account_type,
+                    "amount": amount,
                     "currency_code": currency.code
-                }
-                expense_items.append(expense_item)
-                total_expenses += account.balance
+                })
+                section_totals[account.account_type] += amount
         
-        net_income = total_revenue - total_expenses
+        total_revenue = section_totals[AccountTypeEnum.REVENUE]
+        total_expenses = section_totals[AccountTypeEnum.EXPENSE]
         
         return IncomeStatement(
             from_date=from_date,
             to_date=to_date,
             currency_code=currency.code,
-            revenues=revenue_items,
-            expenses=expense_items,
+            revenues=sections[AccountTypeEnum.REVENUE],
+            expenses=sections[AccountTypeEnum.EXPENSE],
             total_revenue=total_revenue,
             total_expenses=total_expenses,
-            net_income=net_income
+            net_income=total_revenue - total_expenses
         )
 
 
@@ -644,20 +720,9 @@ class AccountingService:
             query = query.filter(JournalEntry.entry_date <= end_date)
         return query.all()
     
-    def create_journal_entry(self, entry: JournalEntryCreate):
-        db_entry = JournalEntry(**entry.dict(exclude={'lines'}))
-        self.db.add(db_entry)
-        self.db.commit()
-        self.db.refresh(db_entry)
-        
-        # Add journal lines
-        for line_data in entry.lines:
-            line_data.journal_entry_id = db_entry.id
-            db_line = JournalLine(**line_data.dict())
-            self.db.add(db_line)
-        
-        self.db.commit()
-        return db_entry
+    def create_journal_entry(self, entry: JournalEntryCreate, user_id: int):
+        # Same path as JournalService: a POSTED entry reaches the balance ledger
+        return self.journal_service.create_journal_entry(self.db, entry, user_id)
     
     def get_journal_entry(self, entry_id: int):
         return self.db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
@@ -667,6 +732,7 @@ class AccountingService:
         if entry and entry.status == "DRAFT":
             entry.status = "POSTED"
             entry.posted_at = datetime.utcnow()
+            AccountBalanceLedger.apply_entry(self.db, entry)
             self.db.commit()
             return True
         return False
@@ -708,6 +774,7 @@ class AccountingService:
             )
             self.db.add(reverse_line)
         
+        AccountBalanceLedger.apply_entry(self.db, reverse_entry)
         self.db.commit()
         return reverse_entry
     
@@ -744,11 +811,30 @@ class AccountingService:
         return False
     
     # Reporting methods
+    def _report_period(self, period_id: int) -> Tuple[datetime, datetime]:
+        """Period bounds; a date-only end covers its whole last day"""
+        period = self.db.query(AccountingPeriod).filter(AccountingPeriod.id == period_id).first()
+        if not period:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Accounting period not found"
+            )
+        end_date = period.end_date
+        if end_date.time() == time.min:
+            end_date = datetime.combine(end_date.date(), time.max)
+        return period.start_date, end_date
+    
     def generate_trial_balance(self, period_id: int, chart_id: int = None):
-        return self.reporting_service.generate_trial_balance(self.db, period_id, chart_id)
+        _, end_date = self._report_period(period_id)
+        currency = self.currency_service.get_base_currency(self.db)
+        return self.reporting_service.get_trial_balance(self.db, currency.id, end_date)
     
     def generate_balance_sheet(self, period_id: int, chart_id: int = None):
-        return self.reporting_service.generate_balance_sheet(self.db, period_id, chart_id)
+        _, end_date = self._report_period(period_id)
+        currency = self.currency_service.get_base_currency(self.db)
+        return self.reporting_service.get_balance_sheet(self.db, currency.id, end_date)
     
     def generate_income_statement(self, period_id: int, chart_id: int = None):
-        return self.reporting_service.generate_income_statement(self.db, period_id, chart_id)
+        start_date, end_date = self._report_period(period_id)
+        currency = self.currency_service.get_base_currency(self.db)
+        return self.reporting_service.get_income_statement(self.db, currency.id, start_date, end_date)
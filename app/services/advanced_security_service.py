@@ -22,553 +22,81 @@ import secrets
 import pyotp
 import geoip2.database
 import geoip2.errors
-from dataclasses import dataclass
 import re
 from enum import Enum
-import ipaddress
 
 from app.models.advanced_security import *
 from app.models.user import User
 from app.db.database import get_db
+from app.services.security_decision_cache import SecurityDecisionCache
+from app.services.security_policy_compiler import (
+    HIGH_RISK_ACTIONS, SENSITIVE_RESOURCES, AccessContext, AccessDecision, UserSecurityProfile, requires_mfa
+)
 
-@dataclass
-class AccessContext:
-    """Context for access control decisions"""
-    user_id: int
-    resource_type: str
-    resource_id: Optional[str] = None
-    action: str = "read"
-    ip_address: Optional[str] = None
-    location: Optional[Dict] = None
-    device_id: Optional[str] = None
-    session_id: Optional[str] = None
-    user_agent: Optional[str] = None
-    branch_id: Optional[int] = None
-    tenant_id: Optional[int] = None
-    timestamp: datetime = None
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
-
-@dataclass
-class AccessDecision:
-    """Result of access control evaluation"""
-    granted: bool
-    reason: str
-    conditions: Optional[Dict] = None
-    requires_mfa: bool = False
-    risk_score: float = 0.0
-    applicable_policies: List[str] = None
-    
-    def __post_init__(self):
-        if self.applicable_policies is None:
-            self.applicable_policies = []
 
 class AdvancedSecurityService:
     """Hyper-Advanced Security Service"""
     
+    _geoip_reader = None
+    _geoip_loaded = False
+    
     def __init__(self, db: Session):
         self.db = db
-        self.geoip_reader = None
-        self._init_geoip()
-    
-    def _init_geoip(self):
-        """Initialize GeoIP database for location services"""
-        try:
-            # You'll need to download GeoLite2-City.mmdb from MaxMind
-            self.geoip_reader = geoip2.database.Reader('/path/to/GeoLite2-City.mmdb')
-        except Exception:
-            # Fallback to None if GeoIP database not available
-            self.geoip_reader = None
+        self.geoip_reader = self._init_geoip()
+    
+    @classmethod
+    def _init_geoip(cls):
+        """Open the GeoIP database for location services once per process"""
+        if not cls._geoip_loaded:
+            try:
+                # You'll need to download GeoLite2-City.mmdb from MaxMind
+                cls._geoip_reader = geoip2.database.Reader('/path/to/GeoLite2-City.mmdb')
+            except Exception:
+                # Fallback to None if GeoIP database not available
+                cls._geoip_reader = None
+            cls._geoip_loaded = True
+        return cls._geoip_reader
     
     # === MAIN ACCESS CONTROL ===
     
     def check_access(self, context: AccessContext) -> AccessDecision:
         """
         Main access control method - evaluates all security layers
+        
+        Policies (PBAC), role permissions over the role hierarchy (RBAC), user
+        overrides and restriction groups are compiled per security policy
+        version (SecurityDecisionCache); only time, location, IP and risk are
+        evaluated per call.
         """
-        # 1. Basic authentication check
-        user = self.db.query(User).filter(User.id == context.user_id).first()
-        if not user or not user.is_active:
+        profile = SecurityDecisionCache.profile(self.db, context.user_id)
+        if not profile.active:
             return AccessDecision(False, "User not found or inactive")
         
-        # 2. Risk assessment
-        risk_score = self._calculate_risk_score(context)
-        
-        # 3. Check policies (PBAC)
-        policy_decision = self._evaluate_policies(context)
-        if policy_decision.granted is False:
-            return policy_decision
-        
-        # 4. Check role permissions (RBAC)
-        rbac_decision = self._check_rbac_permissions(context)
-        if rbac_decision.granted is False and policy_decision.granted is not True:
-            return rbac_decision
-        
-        # 5. Check user permission overrides
-        user_override = self._check_user_permission_overrides(context)
-        if user_override is not None:
-            return user_override
-        
-        # 6. Check attribute-based conditions (ABAC)
-        abac_decision = self._evaluate_abac_conditions(context)
-        if abac_decision.granted is False:
-            return abac_decision
-        
-        # 7. Apply restriction groups
-        restriction_decision = self._check_restriction_groups(context)
-        if restriction_decision.granted is False:
-            return restriction_decision
-        
-        # 8. Determine if MFA is required
-        requires_mfa = self._requires_mfa(context, risk_score)
-        
-        # 9. Final decision
-        return AccessDecision(
-            granted=True,
-            reason="Access granted",
-            requires_mfa=requires_mfa,
-            risk_score=risk_score,
-            applicable_policies=policy_decision.applicable_policies
-        )
-    
-    # === POLICY-BASED ACCESS CONTROL (PBAC) ===
-    
-    def _evaluate_policies(self, context: AccessContext) -> AccessDecision:
-        """Evaluate security policies"""
-        applicable_policies = []
-        
-        # Get all active policies that might apply
-        policies = self.db.query(SecurityPolicy).filter(
-            SecurityPolicy.is_active == True
-        ).order_by(SecurityPolicy.priority.desc()).all()
-        
-        for policy in policies:
-            if self._policy_applies_to_context(policy, context):
-                applicable_policies.append(policy.name)
-                
-                # Evaluate policy conditions
-                if self._evaluate_policy_conditions(policy, context):
-                    if policy.effect == PolicyEffect.DENY:
-                        return AccessDecision(
-                            False, 
-                            f"Access denied by policy: {policy.name}",
-                            applicable_policies=applicable_policies
-                        )
-                    elif policy.effect == PolicyEffect.ALLOW:
-                        return AccessDecision(
-                            True, 
-                            f"Access allowed by policy: {policy.name}",
-                            applicable_policies=applicable_policies
-                        )
-        
-        # No explicit policy decision - continue with other checks
-        return AccessDecision(None, "No applicable policies", applicable_policies=applicable_policies)
-    
-    def _policy_applies_to_context(self, policy: SecurityPolicy, context: AccessContext) -> bool:
-        """Check if policy applies to the current context"""
-        # Check resource types
-        if policy.applies_to_resources:
-            if context.resource_type not in policy.applies_to_resources:
-                return False
-        
-        # Check actions
-        if policy.applies_to_actions:
-            if context.action not in policy.applies_to_actions:
-                return False
-        
-        # Check subjects (users/roles)
-        if policy.applies_to_subjects:
-            user = self.db.query(User).filter(User.id == context.user_id).first()
-            if user:
-                # Check user ID
-                if context.user_id not in policy.applies_to_subjects.get('users', []):
-                    # Check role
-                    if user.role_id not in policy.applies_to_subjects.get('roles', []):
-                        return False
-        
-        return True
-    
-    def _evaluate_policy_conditions(self, policy: SecurityPolicy, context: AccessContext) -> bool:
-        """Evaluate policy conditions"""
-        if not policy.conditions:
-            return True
-        
-        return self._evaluate_conditions(policy.conditions, context)
-    
-    # === ROLE-BASED ACCESS CONTROL (RBAC) ===
-    
-    def _check_rbac_permissions(self, context: AccessContext) -> AccessDecision:
-        """Check role-based permissions"""
-        user = self.db.query(User).filter(User.id == context.user_id).first()
-        if not user or not user.role:
-            return AccessDecision(False, "User has no role assigned")
-        
-        # Check role hierarchy - user inherits permissions from parent roles
-        role_ids = self._get_role_hierarchy(user.role_id)
-        
-        # Find applicable permissions
-        permission_mappings = self.db.query(RolePermissionMapping).join(AdvancedPermission).filter(
-            and_(
-                RolePermissionMapping.role_id.in_(role_ids),
-                AdvancedPermission.resource_type == context.resource_type,
-                AdvancedPermission.action == context.action,
-                AdvancedPermission.is_active == True,
-                or_(
-                    RolePermissionMapping.expires_at.is_(None),
-                    RolePermissionMapping.expires_at > datetime.utcnow()
-                )
-            )
-        ).all()
-        
-        for mapping in permission_mappings:
-            # Check mapping conditions
-            if mapping.conditions and not self._evaluate_conditions(mapping.conditions, context):
-                continue
-            
-            # Check mapping constraints
-            if mapping.constraints and not self._evaluate_constraints(mapping.constraints, context):
-                continue
-            
-            return AccessDecision(True, f"Access granted by role permission: {mapping.permission.name}")
-        
-        return AccessDecision(False, "No matching role permissions found")
-    
-    def _get_role_hierarchy(self, role_id: int) -> List[int]:
-        """Get role hierarchy including parent roles"""
-        role_ids = [role_id]
-        
-        # Get current role
-        role = self.db.query(Role).filter(Role.id == role_id).first()
-        
-        # Traverse up the hierarchy
-        while role and role.parent_role_id:
-            role_ids.append(role.parent_role_id)
-            role = self.db.query(Role).filter(Role.id == role.parent_role_id).first()
-        
-        return role_ids
-    
-    # === USER PERMISSION OVERRIDES ===
-    
-    def _check_user_permission_overrides(self, context: AccessContext) -> Optional[AccessDecision]:
-        """Check user-specific permission overrides"""
-        overrides = self.db.query(UserPermissionOverride).join(AdvancedPermission).filter(
-            and_(
-                UserPermissionOverride.user_id == context.user_id,
-                AdvancedPermission.resource_type == context.resource_type,
-                AdvancedPermission.action == context.action,
-                AdvancedPermission.is_active == True,
-                or_(
-                    UserPermissionOverride.expires_at.is_(None),
-                    UserPermissionOverride.expires_at > datetime.utcnow()
-                )
-            )
-        ).order_by(UserPermissionOverride.granted_at.desc()).all()
-        
-        for override in overrides:
-            # Check conditions
-            if override.conditions and not self._evaluate_conditions(override.conditions, context):
-                continue
-            
-            # Check constraints
-            if override.constraints and not self._evaluate_constraints(override.constraints, context):
-                continue
-            
-            # Check if requires approval and is approved
-            if override.requires_approval and not override.approved_at:
-                continue
-            
-            return AccessDecision(
-                override.is_granted,
-                f"Access {'granted' if override.is_granted else 'denied'} by user permission override"
-            )
-        
-        return None
-    
-    # === ATTRIBUTE-BASED ACCESS CONTROL (ABAC) ===
-    
-    def _evaluate_abac_conditions(self, context: AccessContext) -> AccessDecision:
-        """Evaluate attribute-based conditions"""
-        # Get user attributes
-        user = self.db.query(User).filter(User.id == context.user_id).first()
-        if not user:
-            return AccessDecision(False, "User not found")
-        
-        # Create attribute context
-        attributes = {
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'role_id': user.role_id,
-                'branch_id': user.branch_id,
-                'is_active': user.is_active,
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            },
-            'context': {
-                'timestamp': context.timestamp.isoformat(),
-                'ip_address': context.ip_address,
-                'location': context.location,
-                'device_id': context.device_id,
-                'session_id': context.session_id,
-                'resource_type': context.resource_type,
-                'resource_id': context.resource_id,
-                'action': context.action
-            },
-            'environment': {
-                'hour': context.timestamp.hour,
-                'day_of_week': context.timestamp.weekday(),
-                'is_weekend': context.timestamp.weekday() >= 5
-            }
-        }
-        
-        # Add role attributes if available
-        if user.role:
-            role_attrs = user.role.attributes or {}
-            attributes['role'] = role_attrs
-        
-        # For ABAC, we assume conditions pass unless explicitly denied
-        return AccessDecision(True, "ABAC conditions satisfied")
-    
-    # === RESTRICTION GROUPS ===
-    
-    def _check_restriction_groups(self, context: AccessContext) -> AccessDecision:
-        """Check restriction groups"""
-        # Check user-specific restrictions
-        user_restrictions = self.db.query(UserRestrictionGroup).join(RestrictionGroup).filter(
-            and_(
-                UserRestrictionGroup.user_id == context.user_id,
-                RestrictionGroup.is_active == True,
-                or_(
-                    UserRestrictionGroup.expires_at.is_(None),
-                    UserRestrictionGroup.expires_at > datetime.utcnow()
-                )
-            )
-        ).all()
-        
-        for restriction in user_restrictions:
-            if self._restriction_applies(restriction.restriction_group, context):
-                return AccessDecision(False, f"Access restricted by group: {restriction.restriction_group.name}")
-        
-        # Check role-based restrictions
-        user = self.db.query(User).filter(User.id == context.user_id).first()
-        if user and user.role:
-            role_restrictions = self.db.query(RoleRestrictionGroup).join(RestrictionGroup).filter(
-                and_(
-                    RoleRestrictionGroup.role_id == user.role_id,
-                    RestrictionGroup.is_active == True
-                )
-            ).all()
-            
-            for restriction in role_restrictions:
-                if self._restriction_applies(restriction.restriction_group, context):
-                    return AccessDecision(False, f"Access restricted by role group: {restriction.restriction_group.name}")
-        
-        return AccessDecision(True, "No applicable restrictions")
-    
-    def _restriction_applies(self, restriction_group: RestrictionGroup, context: AccessContext) -> bool:
-        """Check if restriction group applies to context"""
-        restrictions = restriction_group.restrictions or {}
-        
-        # Time-based restrictions
-        if 'time' in restrictions:
-            time_restrictions = restrictions['time']
-            current_hour = context.timestamp.hour
-            
-            if 'allowed_hours' in time_restrictions:
-                if current_hour not in time_restrictions['allowed_hours']:
-                    return True
-            
-            if 'blocked_hours' in time_restrictions:
-                if current_hour in time_restrictions['blocked_hours']:
-                    return True
-        
-        # Location-based restrictions
-        if 'location' in restrictions and context.location:
-            location_restrictions = restrictions['location']
-            
-            if 'allowed_countries' in location_restrictions:
-                user_country = context.location.get('country')
-                if user_country not in location_restrictions['allowed_countries']:
-                    return True
-        
-        # IP-based restrictions
-        if 'ip' in restrictions and context.ip_address:
-            ip_restrictions = restrictions['ip']
-            
-            if 'blocked_ips' in ip_restrictions:
-                if context.ip_address in ip_restrictions['blocked_ips']:
-                    return True
-            
-            if 'allowed_networks' in ip_restrictions:
-                ip_allowed = False
-                for network in ip_restrictions['allowed_networks']:
-                    try:
-                        if ipaddress.ip_address(context.ip_address) in ipaddress.ip_network(network):
-                            ip_allowed = True
-                            break
-                    except ValueError:
-                        continue
-                if not ip_allowed:
-                    return True
-        
-        return False
+        risk_score = self._calculate_risk_score(context, profile)
+        return SecurityDecisionCache.policies(self.db).decide(profile, context, risk_score)
     
     # === ROW-LEVEL SECURITY (RLS) ===
     
     def apply_row_level_security(self, query, table_name: str, context: AccessContext):
-        """Apply row-level security filters to query"""
-        # Get applicable RLS rules
-        rules = self.db.query(RowLevelSecurityRule).filter(
-            and_(
-                RowLevelSecurityRule.table_name == table_name,
-                RowLevelSecurityRule.is_active == True
-            )
-        ).all()
-        
-        for rule in rules:
-            if self._rls_rule_applies(rule, context):
-                # Apply the rule expression as a filter
-                filter_expression = self._process_rls_expression(rule.rule_expression, context)
-                query = query.filter(text(filter_expression))
-        
+        """Apply row-level security filters to query (context values are bound parameters)"""
+        profile = SecurityDecisionCache.profile(self.db, context.user_id)
+        for clause in SecurityDecisionCache.policies(self.db).row_filters(table_name, profile, context):
+            query = query.filter(clause)
         return query
     
-    def _rls_rule_applies(self, rule: RowLevelSecurityRule, context: AccessContext) -> bool:
-        """Check if RLS rule applies to current context"""
-        # Check actions
-        if rule.applies_to_actions:
-            if context.action not in rule.applies_to_actions:
-                return False
-        
-        # Check roles
-        if rule.applies_to_roles:
-            user = self.db.query(User).filter(User.id == context.user_id).first()
-            if user and user.role_id not in rule.applies_to_roles:
-                return False
-        
-        # Check users
-        if rule.applies_to_users:
-            if context.user_id not in rule.applies_to_users:
-                return False
-        
-        return True
-    
-    def _process_rls_expression(self, expression: str, context: AccessContext) -> str:
-        """Process RLS expression by substituting context variables"""
-        # Replace context variables in the expression
-        replacements = {
-            '{user_id}': str(context.user_id),
-            '{branch_id}': str(context.branch_id) if context.branch_id else 'NULL',
-            '{tenant_id}': str(context.tenant_id) if context.tenant_id else 'NULL'
-        }
-        
-        for placeholder, value in replacements.items():
-            expression = expression.replace(placeholder, value)
-        
-        return expression
-    
     # === FIELD-LEVEL SECURITY (FLS) ===
     
     def apply_field_level_security(self, data: Dict, table_name: str, context: AccessContext) -> Dict:
         """Apply field-level security to data"""
-        # Get applicable FLS rules
-        rules = self.db.query(FieldLevelSecurityRule).filter(
-            and_(
-                FieldLevelSecurityRule.table_name == table_name,
-                FieldLevelSecurityRule.is_active == True
-            )
-        ).all()
-        
-        filtered_data = data.copy()
-        
-        for rule in rules:
-            if self._fls_rule_applies(rule, context):
-                column_name = rule.column_name
-                
-                if column_name in filtered_data:
-                    if not rule.is_visible:
-                        # Remove field completely
-                        filtered_data.pop(column_name, None)
-                    elif not rule.is_readable:
-                        # Replace with placeholder
-                        filtered_data[column_name] = "[RESTRICTED]"
-                    elif rule.masking_pattern:
-                        # Apply masking
-                        filtered_data[column_name] = self._apply_masking(
-                            filtered_data[column_name], 
-                            rule.masking_pattern
-                        )
-        
-        return filtered_data
-    
-    def _fls_rule_applies(self, rule: FieldLevelSecurityRule, context: AccessContext) -> bool:
-        """Check if FLS rule applies to current context"""
-        # Check conditions
-        if rule.conditions and not self._evaluate_conditions(rule.conditions, context):
-            return False
-        
-        # Check roles
-        if rule.applies_to_roles:
-            user = self.db.query(User).filter(User.id == context.user_id).first()
-            if user and user.role_id not in rule.applies_to_roles:
-                return False
-        
-        # Check users
-        if rule.applies_to_users:
-            if context.user_id not in rule.applies_to_users:
-                return False
-        
-        return True
-    
-    def _apply_masking(self, value: Any, pattern: str) -> str:
-        """Apply masking pattern to value"""
-        if value is None:
-            return None
-        
-        value_str = str(value)
-        
-        if pattern == "***":
-            return "***"
-        elif pattern.startswith("show_last_"):
-            num_chars = int(pattern.split("_")[-1])
-            return "*" * (len(value_str) - num_chars) + value_str[-num_chars:]
-        elif pattern.startswith("show_first_"):
-            num_chars = int(pattern.split("_")[-1])
-            return value_str[:num_chars] + "*" * (len(value_str) - num_chars)
-        else:
-            return pattern
+        profile = SecurityDecisionCache.profile(self.db, context.user_id)
+        return SecurityDecisionCache.policies(self.db).mask_fields(data, table_name, profile, context)
     
     # === MULTI-FACTOR AUTHENTICATION ===
     
     def _requires_mfa(self, context: AccessContext, risk_score: float) -> bool:
         """Determine if MFA is required"""
-        # High risk always requires MFA
-        if risk_score >= 0.7:
-            return True
-        
-        # Check if user has MFA configured
-        mfa_methods = self.db.query(MFAMethod).filter(
-            and_(
-                MFAMethod.user_id == context.user_id,
-                MFAMethod.is_enabled == True
-            )
-        ).count()
-        
-        if mfa_methods == 0:
-            return False
-        
-        # Check if action requires MFA
-        high_risk_actions = ['delete', 'approve', 'export', 'manage']
-        if context.action in high_risk_actions:
-            return True
-        
-        # Check if resource type requires MFA
-        sensitive_resources = ['financial', 'hr', 'system']
-        if context.resource_type in sensitive_resources:
-            return True
-        
-        return False
+        profile = SecurityDecisionCache.profile(self.db, context.user_id)
+        return requires_mfa(context, profile.has_mfa, risk_score)
     
     def create_mfa_challenge(self, user_id: int, method_type: AuthFactor, context: AccessContext) -> str:
         """Create MFA challenge"""
@@ -788,7 +316,8 @@ class AdvancedSecurityService:
     
     # === RISK ASSESSMENT ===
     
-    def _calculate_risk_score(self, context: AccessContext) -> float:
+    def _calculate_risk_score(self, context: AccessContext,
+                              profile: Optional[UserSecurityProfile] = None) -> float:
         """Calculate risk score for access attempt"""
         risk_score = 0.0
         
@@ -802,13 +331,11 @@ class AdvancedSecurityService:
             risk_score += 0.1
         
         # High-risk actions
-        high_risk_actions = ['delete', 'export', 'approve', 'manage']
-        if context.action in high_risk_actions:
+        if context.action in HIGH_RISK_ACTIONS:
             risk_score += 0.3
         
         # Sensitive resources
-        sensitive_resources = ['financial', 'hr', 'system']
-        if context.resource_type in sensitive_resources:
+        if context.resource_type in SENSITIVE_RESOURCES:
             risk_score += 0.2
         
         # Location-based risk
@@ -823,10 +350,10 @@ class AdvancedSecurityService:
             if self._is_suspicious_ip(context.ip_address):
                 risk_score += 0.4
         
-        # Device-based risk
+        # Device-based risk: only the user's own trusted devices count
         if context.device_id:
-            device = self.db.query(UserDevice).filter(UserDevice.id == context.device_id).first()
-            if not device or not device.is_trusted:
+            profile = profile or SecurityDecisionCache.profile(self.db, context.user_id)
+            if context.device_id not in profile.trusted_devices:
                 risk_score += 0.2
         
         return min(1.0, risk_score)
@@ -887,63 +414,6 @@ class AdvancedSecurityService:
     
     # === HELPER METHODS ===
     
-    def _evaluate_conditions(self, conditions: Dict, context: AccessContext) -> bool:
-        """Evaluate complex conditions"""
-        if not conditions:
-            return True
-        
-        # This is a simplified implementation
-        # In a real system, you might use a rule engine like RETE
-        
-        for condition_type, condition_value in conditions.items():
-            if condition_type == 'time':
-                if not self._evaluate_time_condition(condition_value, context):
-                    return False
-            elif condition_type == 'location':
-                if not self._evaluate_location_condition(condition_value, context):
-                    return False
-            elif condition_type == 'user':
-                if not self._evaluate_user_condition(condition_value, context):
-                    return False
-        
-        return True
-    
-    def _evaluate_constraints(self, constraints: Dict, context: AccessContext) -> bool:
-        """Evaluate constraints (similar to conditions but different semantics)"""
-        return self._evaluate_conditions(constraints, context)
-    
-    def _evaluate_time_condition(self, condition: Dict, context: AccessContext) -> bool:
-        """Evaluate time-based condition"""
-        current_hour = context.timestamp.hour
-        
-        if 'allowed_hours' in condition:
-            return current_hour in condition['allowed_hours']
-        
-        if 'blocked_hours' in condition:
-            return current_hour not in condition['blocked_hours']
-        
-        return True
-    
-    def _evaluate_location_condition(self, condition: Dict, context: AccessContext) -> bool:
-        """Evaluate location-based condition"""
-        if not context.location:
-            return True
-        
-        if 'allowed_countries' in condition:
-            return context.location.get('country') in condition['allowed_countries']
-        
-        if 'blocked_countries' in condition:
-            return context.location.get('country') not in condition['blocked_countries']
-        
-        return True
-    
-    def _evaluate_user_condition(self, condition: Dict, context: AccessContext) -> bool:
-        """Evaluate user-based condition"""
-        if 'user_ids' in condition:
-            return context.user_id in condition['user_ids']
-        
-        return True
-    
     def _get_location_from_ip(self, ip_address: str) -> Optional[Dict]:
         """Get location from IP address"""
         if not self.geoip_reader or not ip_address:
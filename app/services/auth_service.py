@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.models.user import User
 import os
 import re
+import secrets
 
 # Security configuration from environment variables
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -64,6 +65,15 @@ class AuthService:
         """Hash a password"""
         return pwd_context.hash(password)
     
+    @staticmethod
+    def unusable_password_hash() -> str:
+        """
+        Hash of a random secret that is never kept: no password matches it,
+        so the account cannot sign in until a password is set for it
+        """
+        # The secret is 256 random bits, so key stretching adds nothing here
+        return pwd_context.handler("bcrypt").using(rounds=4).hash(secrets.token_urlsafe(32))
+
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         """Authenticate a user with email and password"""
@@ -0,0 +1,829 @@
+"""
+Database Backups - Non-blocking, streaming pg_dump / pg_restore jobs
+
+Backups used to run `pg_dump` / `psql` with subprocess.run inside async
+handlers, freezing the worker's event loop for the whole dump, and wrote
+plain uncompressed SQL. Now:
+- pg_dump runs as an asyncio subprocess writing the custom format
+  (compressed, restorable in parallel with pg_restore --jobs) to stdout;
+  the stream is hashed (SHA-256) and written to disk chunk by chunk, and
+  only renamed into place once pg_dump has exited cleanly
+- every backup gets a manifest (<name>.dump.manifest.json): checksum, size,
+  options and the exact row count of every table, taken in the snapshot the
+  dump was made from
+- restore checks the checksum first, then runs pg_restore --jobs
+- verify restores into a scratch database and compares its row counts with
+  the manifest, then drops the scratch database
+- a retention policy (keep the newest N, prune the rest by age) runs after
+  each successful backup
+
+BackupJobRunner runs these as background jobs queued in the backup_jobs
+table, one at a time across all worker processes, so the HTTP request
+returns immediately with a job any worker can report on.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import select, text, update
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.exceptions import BusinessLogicError, EntityNotFoundError, ExternalServiceError, ValidationError
+from app.models.backup_job import BackupJob, BackupJobKind, BackupJobStatus
+
+logger = logging.getLogger(__name__)
+
+BACKUP_EXTENSION = ".dump"
+MANIFEST_EXTENSION = ".manifest.json"
+PARTIAL_EXTENSION = ".partial"
+MANIFEST_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+
+# Backup file names are generated here; anything else is rejected (no paths)
+BACKUP_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_\-]*\.dump$")
+
+# Every user table, already quoted for use in SQL
+USER_TABLES_SQL = (
+    "SELECT quote_ident(schemaname) || '.' || quote_ident(tablename) "
+    "FROM pg_catalog.pg_tables "
+    "WHERE schemaname NOT IN ('pg_catalog', 'information_schema') "
+    "ORDER BY 1"
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class BackupCommandError(Exception):
+    """A pg_dump / pg_restore run exited with an error"""
+
+    def __init__(self, command: str, returncode: int, stderr: str):
+        self.command = command
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"{command} exited with {returncode}: {stderr.strip()[-2000:]}")
+
+
+# ============================================================================
+# Connection target
+# ============================================================================
+
+@dataclass(frozen=True)
+class PgTarget:
+    """A PostgreSQL database, as libpq command-line tools and asyncpg see it"""
+    url: URL
+
+    @classmethod
+    def from_url(cls, url) -> "PgTarget":
+        url = make_url(url)
+        if not url.drivername.startswith("postgresql"):
+            raise ValidationError(f"Backups need a PostgreSQL database, not {url.drivername}")
+        return cls(url)
+
+    @classmethod
+    def default(cls) -> "PgTarget":
+        """The application database (DATABASE_URL)"""
+        from app.db.database import db_url
+        return cls.from_url(db_url)
+
+    @property
+    def database(self) -> str:
+        return self.url.database
+
+    def for_database(self, database: str) -> "PgTarget":
+        return PgTarget(self.url.set(database=database))
+
+    def command_args(self) -> List[str]:
+        """Connection options for pg_dump / pg_restore (password goes in the environment)"""
+        args = []
+        if self.url.host:
+            args += ["--host", self.url.host]
+        if self.url.port:
+            args += ["--port", str(self.url.port)]
+        if self.url.username:
+            args += ["--username", self.url.username]
+        return args + ["--no-password", "--dbname", self.database]
+
+    def command_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        if self.url.password:
+            env["PGPASSWORD"] = self.url.password
+        return env
+
+    def connect(self, **options):
+        """Async engine on this database (one connection, not pooled)"""
+        return create_async_engine(
+            self.url.set(drivername="postgresql+asyncpg"), poolclass=NullPool, **options
+        )
+
+
+# ============================================================================
+# Streaming helpers
+# ============================================================================
+
+def _write_chunk(handle, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def _finish_file(handle) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+async def stream_to_file(stream: asyncio.StreamReader, destination: Path) -> Tuple[int, str]:
+    """
+    Copy a subprocess stream to a file, hashing it on the way
+
+    Disk writes and hashing run in a worker thread chunk by chunk, so the
+    event loop only ever waits on the pipe. Returns (size, sha256 hex).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, destination, "wb")
+    try:
+        while chunk := await stream.read(CHUNK_SIZE):
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+            size += len(chunk)
+        await asyncio.to_thread(_finish_file, handle)
+    finally:
+        if not handle.closed:
+            await asyncio.to_thread(handle.close)
+    return size, digest.hexdigest()
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def file_sha256(path: Path) -> str:
+    return await asyncio.to_thread(_sha256_file, path)
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+
+
+async def count_rows(connection: AsyncConnection) -> Dict[str, int]:
+    """Exact row count of every user table, in one statement"""
+    tables = (await connection.exec_driver_sql(USER_TABLES_SQL)).scalars().all()
+    if not tables:
+        return {}
+    counts = " UNION ALL ".join(f"SELECT {i}, count(*) FROM {table}" for i, table in enumerate(tables))
+    return {tables[i]: count for i, count in (await connection.exec_driver_sql(counts)).all()}
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# ============================================================================
+# Backup service
+# ============================================================================
+
+class BackupService:
+    """Creates, restores, verifies and prunes backups in one directory"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        target: Optional[PgTarget] = None,
+        pg_bin_dir: Optional[str] = None,
+        compress_level: Optional[int] = None,
+        restore_jobs: Optional[int] = None,
+        keep_last: Optional[int] = None,
+        max_age_days: Optional[int] = None,
+        record_row_counts: Optional[bool] = None
+    ):
+        """
+        Args:
+            directory: Backup directory (defaults to settings.backup_dir)
+            target: Database to back up / restore (defaults to DATABASE_URL)
+            pg_bin_dir: Directory holding pg_dump/pg_restore (defaults to PATH)
+            compress_level: pg_dump --compress level
+            restore_jobs: pg_restore --jobs
+            keep_last: Retention: newest backups never pruned
+            max_age_days: Retention: older backups beyond keep_last are pruned
+            record_row_counts: Count every table in the dump's snapshot
+        """
+        self.directory = Path(directory or settings.backup_dir)
+        self._target = target
+        self.pg_bin_dir = pg_bin_dir if pg_bin_dir is not None else settings.backup_pg_bin_dir
+        self.compress_level = settings.backup_compress_level if compress_level is None else compress_level
+        self.restore_jobs = restore_jobs or settings.backup_restore_jobs
+        self.keep_last = keep_last or settings.backup_keep_last
+        self.max_age = timedelta(days=max_age_days or settings.backup_max_age_days)
+        self.record_row_counts = (
+            settings.backup_record_row_counts if record_row_counts is None else record_row_counts
+        )
+
+    @property
+    def target(self) -> PgTarget:
+        if self._target is None:
+            self._target = PgTarget.default()
+        return self._target
+
+    def _tool(self, name: str) -> str:
+        path = os.path.join(self.pg_bin_dir, name) if self.pg_bin_dir else shutil.which(name)
+        if not path or not os.access(path, os.X_OK):
+            raise ExternalServiceError(name, "PostgreSQL client tools are not installed")
+        return path
+
+    # ------------------------------------------------------------------------
+    # Files and manifests
+    # ------------------------------------------------------------------------
+
+    def backup_path(self, filename: str) -> Path:
+        """Path of an existing backup; rejects anything but a bare backup name"""
+        if not BACKUP_NAME_PATTERN.match(filename):
+            raise ValidationError(f"Invalid backup name: {filename}")
+        path = self.directory / filename
+        if not path.is_file():
+            raise EntityNotFoundError("Backup", filename)
+        return path
+
+    def manifest_path(self, filename: str) -> Path:
+        return self.directory / f"{filename}{MANIFEST_EXTENSION}"
+
+    def read_manifest(self, filename: str) -> Dict[str, Any]:
+        self.backup_path(filename)
+        try:
+            return json.loads(self.manifest_path(filename).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise EntityNotFoundError("Backup manifest", filename)
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = self.manifest_path(manifest["filename"])
+        partial = path.with_name(path.name + PARTIAL_EXTENSION)
+        partial.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(partial, path)
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Manifests of complete backups, newest first (a failed dump has none)"""
+        backups = []
+        if self.directory.is_dir():
+            for path in self.directory.glob(f"*{BACKUP_EXTENSION}{MANIFEST_EXTENSION}"):
+                try:
+                    manifest = json.loads(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Unreadable backup manifest {path.name}: {e}")
+                    continue
+                if (self.directory / manifest.get("filename", "")).is_file():
+                    backups.append(manifest)
+        backups.sort(key=lambda manifest: manifest["created_at"], reverse=True)
+        return backups
+
+    def delete_backup(self, filename: str) -> None:
+        self.backup_path(filename).unlink()
+        self.manifest_path(filename).unlink(missing_ok=True)
+        logger.info(f"Backup {filename} deleted")
+
+    # ------------------------------------------------------------------------
+    # Backup
+    # ------------------------------------------------------------------------
+
+    async def create_backup(
+        self,
+        name: str,
+        include_schema: bool = True,
+        include_data: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Dump the database to <name>_<timestamp>.dump and write its manifest
+
+        With record_row_counts the dump runs in a snapshot exported by a
+        REPEATABLE READ transaction that counts every table meanwhile, so
+        the manifest's counts are exactly what the dump contains.
+        """
+        if not (include_schema or include_data):
+            raise ValidationError("Must include either schema, data, or both")
+        safe_name = re.sub(r"[^A-Za-z0-9_\-]+", "_", name).strip("_-") or "backup"
+        started = _utcnow()
+        filename = f"{safe_name}_{started:%Y%m%d_%H%M%S}{BACKUP_EXTENSION}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / filename
+        if path.exists():
+            raise BusinessLogicError(f"Backup {filename} already exists")
+
+        options = ["--format=custom", f"--compress={self.compress_level}"]
+        if not include_data:
+            options.append("--schema-only")
+        elif not include_schema:
+            options.append("--data-only")
+
+        clock = time.monotonic()
+        try:
+            if self.record_row_counts:
+                size, sha256, row_counts = await self._dump_in_snapshot(options, path)
+                if not include_data:
+                    row_counts = dict.fromkeys(row_counts, 0)
+            else:
+                (size, sha256), row_counts = await self._dump(options, path), None
+            pg_dump_version = await self._tool_version("pg_dump")
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        manifest = {
+            "manifest_version": MANIFEST_VERSION,
+            "filename": filename,
+            "database": self.target.database,
+            "created_at": started.isoformat(),
+            "duration_seconds": round(time.monotonic() - clock, 3),
+            "format": "custom",
+            "compress_level": self.compress_level,
+            "include_schema": include_schema,
+            "include_data": include_data,
+            "size_bytes": size,
+            "sha256": sha256,
+            "pg_dump_version": pg_dump_version,
+            "row_counts": row_counts,
+        }
+        self._write_manifest(manifest)
+        logger.info(f"Backup {filename} created: {size} bytes in {manifest['duration_seconds']}s")
+
+        self.apply_retention()
+        return manifest
+
+    async def _dump_in_snapshot(self, options: List[str], path: Path) -> Tuple[int, str, Dict[str, int]]:
+        """Dump and count rows concurrently, both in one exported snapshot"""
+        engine = self.target.connect(isolation_level="REPEATABLE READ")
+        try:
+            async with engine.connect() as connection:
+                snapshot = (await connection.exec_driver_sql("SELECT pg_export_snapshot()")).scalar()
+                counting = asyncio.create_task(count_rows(connection))
+                try:
+                    size, sha256 = await self._dump(options + [f"--snapshot={snapshot}"], path)
+                except BaseException:
+                    counting.cancel()
+                    await asyncio.gather(counting, return_exceptions=True)
+                    raise
+                # The exporting transaction stays open until both are done
+                row_counts = await counting
+                await connection.rollback()
+        finally:
+            await engine.dispose()
+        return size, sha256, row_counts
+
+    async def _dump(self, options: List[str], path: Path) -> Tuple[int, str]:
+        """Run pg_dump into path (via a .partial file), returning (size, sha256)"""
+        partial = path.with_name(path.name + PARTIAL_EXTENSION)
+        process = await asyncio.create_subprocess_exec(
+            self._tool("pg_dump"), *options, *self.target.command_args(),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self.target.command_env()
+        )
+        stderr = asyncio.create_task(process.stderr.read())
+        try:
+            size, sha256 = await stream_to_file(process.stdout, partial)
+            returncode = await process.wait()
+            if returncode != 0:
+                raise BackupCommandError("pg_dump", returncode, (await stderr).decode(errors="replace"))
+            os.replace(partial, path)
+            return size, sha256
+        except BaseException:
+            await _kill(process)
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            await asyncio.gather(stderr, return_exceptions=True)
+
+    async def _tool_version(self, name: str) -> Optional[str]:
+        process = await asyncio.create_subprocess_exec(
+            self._tool(name), "--version", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        output, _ = await process.communicate()
+        return output.decode(errors="replace").strip() or None
+
+    # ------------------------------------------------------------------------
+    # Restore and verify
+    # ------------------------------------------------------------------------
+
+    async def check_integrity(self, filename: str) -> Dict[str, Any]:
+        """The backup's manifest, after checking the file still matches it"""
+        manifest = self.read_manifest(filename)
+        if await file_sha256(self.backup_path(filename)) != manifest["sha256"]:
+            raise BusinessLogicError(f"Backup {filename} does not match its SHA-256 checksum")
+        return manifest
+
+    async def restore_backup(
+        self,
+        filename: str,
+        restore_schema: bool = True,
+        restore_data: bool = True,
+        target: Optional[PgTarget] = None,
+        clean: bool = True
+    ) -> Dict[str, Any]:
+        """Restore a backup (checksum first) with pg_restore --jobs"""
+        if not (restore_schema or restore_data):
+            raise ValidationError("Must restore either schema, data, or both")
+        manifest = await self.check_integrity(filename)
+        target = target or self.target
+
+        options = ["--exit-on-error", "--no-owner", f"--jobs={self.restore_jobs}"]
+        if not restore_data:
+            options.append("--schema-only")
+        elif not restore_schema:
+            options.append("--data-only")
+        if clean and restore_schema:
+            options += ["--clean", "--if-exists"]
+
+        clock = time.monotonic()
+        await self._run("pg_restore", options + [str(self.backup_path(filename))], target)
+        duration = round(time.monotonic() - clock, 3)
+        logger.info(f"Backup {filename} restored into {target.database} in {duration}s")
+        return {
+            "filename": filename,
+            "database": target.database,
+            "restored_schema": restore_schema,
+            "restored_data": restore_data,
+            "duration_seconds": duration,
+            "sha256": manifest["sha256"],
+        }
+
+    async def _run(self, tool: str, options: List[str], target: PgTarget) -> None:
+        process = await asyncio.create_subprocess_exec(
+            self._tool(tool), *options, *target.command_args(),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            env=target.command_env()
+        )
+        try:
+            _, stderr = await process.communicate()
+        except BaseException:
+            await _kill(process)
+            raise
+        if process.returncode != 0:
+            raise BackupCommandError(tool, process.returncode, stderr.decode(errors="replace"))
+
+    async def verify_backup(self, filename: str) -> Dict[str, Any]:
+        """
+        Restore into a scratch database and compare row counts with the manifest
+
+        The scratch database is created next to the target and always
+        dropped. The result is also stored in the manifest.
+        """
+        manifest = await self.check_integrity(filename)
+        if not manifest.get("include_schema"):
+            raise ValidationError("A data-only backup cannot be verified on its own")
+        if manifest.get("row_counts") is None:
+            raise ValidationError("Backup was made without row counts and cannot be verified")
+
+        scratch = self.target.for_database(f"{self.target.database[:40]}_verify_{uuid4().hex[:12]}")
+        admin = self.target.connect(isolation_level="AUTOCOMMIT")
+        try:
+            async with admin.connect() as connection:
+                await connection.exec_driver_sql(
+                    f"CREATE DATABASE {_quote_identifier(scratch.database)} TEMPLATE template0"
+                )
+            try:
+                await self.restore_backup(filename, target=scratch, clean=False)
+                engine = scratch.connect()
+                try:
+                    async with engine.connect() as connection:
+                        restored = await count_rows(connection)
+                finally:
+                    await engine.dispose()
+            finally:
+                async with admin.connect() as connection:
+                    await connection.exec_driver_sql(
+                        f"DROP DATABASE IF EXISTS {_quote_identifier(scratch.database)}"
+                    )
+        finally:
+            await admin.dispose()
+
+        expected = manifest["row_counts"]
+        mismatches = [
+            {"table": table, "expected": expected.get(table), "restored": restored.get(table)}
+            for table in sorted(set(expected) | set(restored))
+            if expected.get(table) != restored.get(table)
+        ]
+        verification = {
+            "verified_at": _utcnow().isoformat(),
+            "passed": not mismatches,
+            "tables": len(restored),
+            "rows": sum(restored.values()),
+            "mismatches": mismatches,
+        }
+        manifest["verification"] = verification
+        self._write_manifest(manifest)
+        log = logger.info if verification["passed"] else logger.error
+        log(f"Backup {filename} verification {'passed' if verification['passed'] else 'FAILED'}: "
+            f"{verification['tables']} tables, {verification['rows']} rows, {len(mismatches)} mismatches")
+        return {"filename": filename, **verification}
+
+    # ------------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------------
+
+    def apply_retention(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Prune backups: the newest keep_last always stay, older ones go once
+        they are max_age old. Leftover .partial files from a killed dump are
+        removed after a day. Returns the deleted backup names.
+        """
+        now = now or _utcnow()
+        deleted = []
+        for manifest in self.list_backups()[self.keep_last:]:
+            if now - datetime.fromisoformat(manifest["created_at"]) > self.max_age:
+                self.delete_backup(manifest["filename"])
+                deleted.append(manifest["filename"])
+
+        for partial in self.directory.glob(f"*{PARTIAL_EXTENSION}"):
+            if now.timestamp() - partial.stat().st_mtime > 86400:
+                partial.unlink(missing_ok=True)
+
+        if deleted:
+            logger.info(f"Backup retention pruned {len(deleted)} backups: {', '.join(deleted)}")
+        return deleted
+
+
+# ============================================================================
+# Background jobs
+# ============================================================================
+
+# Held by the worker running a job, so jobs never overlap across processes
+BACKUP_LOCK_KEY = 734_047
+
+
+class BackupJobRunner:
+    """
+    Runs backup, restore and verify jobs queued in the backup_jobs table
+
+    Every worker runs one. A runner claims the oldest queued job only while
+    it holds a session-level PostgreSQL advisory lock on a dedicated
+    connection, so jobs run one at a time across all processes (a restore
+    must never overlap a dump) and any worker can report on any job. The
+    lock dies with its connection, so a job still marked running when the
+    lock is next taken was interrupted and is failed. Without PostgreSQL the
+    lock only covers this process: run a single worker.
+    """
+
+    _local_lock = threading.Lock()
+
+    def __init__(
+        self,
+        service: Optional[BackupService] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        runner_id: Optional[str] = None,
+        poll_interval_ms: Optional[int] = None
+    ):
+        """
+        Args:
+            service: Does the work (defaults to the configured BackupService)
+            session_factory: Creates database sessions
+            runner_id: Recorded on claimed jobs (defaults to host:pid:random)
+            poll_interval_ms: Idle wait between claim attempts
+        """
+        self.service = service or BackupService()
+        self.session_factory = session_factory
+        self.runner_id = runner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.poll_interval = (poll_interval_ms or settings.backup_job_poll_interval_ms) / 1000
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------------
+
+    def submit(self, kind: BackupJobKind, requested_by: Optional[int] = None, **options) -> BackupJob:
+        """Queue a job; returns at once"""
+        with self.session_factory() as db:
+            job = BackupJob(
+                kind=BackupJobKind(kind), options=options, requested_by=requested_by,
+                status=BackupJobStatus.QUEUED
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        logger.info(f"Backup job {job.id} queued: {job.kind.value} {options}")
+        self.start()
+        self._wake.set()
+        return job
+
+    def get_job(self, job_id: int) -> BackupJob:
+        with self.session_factory() as db:
+            job = db.get(BackupJob, job_id)
+            if job is None:
+                raise EntityNotFoundError("Backup job", job_id)
+            db.expunge(job)
+            return job
+
+    def list_jobs(self, limit: int = 100) -> List[BackupJob]:
+        """Most recent jobs first"""
+        with self.session_factory() as db:
+            jobs = db.execute(select(BackupJob).order_by(BackupJob.id.desc()).limit(limit)).scalars().all()
+            db.expunge_all()
+            return list(jobs)
+
+    async def wait(self, job_id: int) -> BackupJob:
+        """Poll until the job has finished (whichever worker runs it)"""
+        while True:
+            job = self.get_job(job_id)
+            if job.finished_at is not None:
+                return job
+            await asyncio.sleep(min(self.poll_interval, 0.1))
+
+    # ------------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------------
+
+    def start(self) -> asyncio.Task:
+        """Run the claim loop as a background task"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"Backup job runner {self.runner_id} started")
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel the running job (its subprocess is killed, partial files removed)"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                if await self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Error in backup job runner loop: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_once(self) -> bool:
+        """Claim and run one job; False when there was none or another worker is running one"""
+        with self._exclusive() as acquired:
+            if not acquired:
+                return False
+            job = self._claim_next()
+            if job is None:
+                return False
+            await self._run(job)
+            return True
+
+    # ------------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------------
+
+    def _engine(self):
+        with self.session_factory() as db:
+            return db.get_bind()
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[bool]:
+        """Hold the job lock for the block; yields False when it is taken"""
+        if not self._local_lock.acquire(blocking=False):
+            yield False
+            return
+        connection = None
+        try:
+            engine = self._engine()
+            if engine.dialect.name != "postgresql":
+                yield True
+                return
+            # Session-level lock on a connection of its own: held for the whole
+            # job, and released by PostgreSQL if this worker dies
+            connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            if not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BACKUP_LOCK_KEY}).scalar():
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BACKUP_LOCK_KEY})
+        finally:
+            if connection is not None:
+                connection.close()
+            self._local_lock.release()
+
+    def _claim_next(self) -> Optional[BackupJob]:
+        """With the lock held: fail interrupted jobs, then take the oldest queued one"""
+        now = _utcnow()
+        with self.session_factory() as db:
+            interrupted = db.execute(
+                update(BackupJob)
+                .where(BackupJob.status == BackupJobStatus.RUNNING)
+                .values(status=BackupJobStatus.FAILED, error="Interrupted: the worker running it stopped",
+                        finished_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if interrupted:
+                logger.warning(f"Backup job runner {self.runner_id} failed {interrupted} interrupted jobs")
+
+            job = db.execute(
+                select(BackupJob).where(BackupJob.status == BackupJobStatus.QUEUED)
+                .order_by(BackupJob.id).limit(1)
+            ).scalar_one_or_none()
+            if job is not None:
+                job.status, job.runner_id, job.started_at = BackupJobStatus.RUNNING, self.runner_id, now
+            db.commit()
+            if job is not None:
+                db.refresh(job)
+                db.expunge(job)
+            return job
+
+    # ------------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------------
+
+    async def _run(self, job: BackupJob) -> None:
+        logger.info(f"Backup job runner {self.runner_id} running job {job.id} ({job.kind.value})")
+        try:
+            if job.kind is BackupJobKind.BACKUP:
+                result = await self.service.create_backup(**job.options)
+            elif job.kind is BackupJobKind.RESTORE:
+                result = await self.service.restore_backup(**job.options)
+            else:
+                result = await self.service.verify_backup(**job.options)
+        except asyncio.CancelledError:
+            self._finish(job, BackupJobStatus.FAILED, error="Cancelled at shutdown")
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            logger.error(f"Backup job {job.id} ({job.kind.value}) failed: {error}")
+            self._finish(job, BackupJobStatus.FAILED, error=error)
+        else:
+            self._finish(job, BackupJobStatus.COMPLETED, result=result)
+
+    def _finish(
+        self,
+        job: BackupJob,
+        status: BackupJobStatus,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        job.status, job.result, job.error, job.finished_at = status, result, error, _utcnow()
+        with self.session_factory() as db:
+            # A restore may have replaced the table under the job: write it back
+            db.merge(job)
+            db.flush()
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('backup_jobs', 'id'), "
+                    "GREATEST((SELECT max(id) FROM backup_jobs), 1))"
+                ))
+            db.commit()
+
+
+# ============================================================================
+# Application runner
+# ============================================================================
+
+backup_job_runner: Optional[BackupJobRunner] = None
+
+
+def get_backup_runner() -> BackupJobRunner:
+    global backup_job_runner
+    if backup_job_runner is None:
+        backup_job_runner = BackupJobRunner()
+    return backup_job_runner
+
+
+async def start_backup_runner() -> None:
+    """Start the process's backup job runner (application startup)"""
+    get_backup_runner().start()
+
+
+async def stop_backup_runner() -> None:
+    """Cancel the in-flight backup job (application shutdown)"""
+    if backup_job_runner is not None:
+        await backup_job_runner.stop()
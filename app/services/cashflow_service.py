@@ -6,7 +6,7 @@ Business logic for cash flow operations, transfers, and dashboard data.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc, asc, case
+from sqlalchemy import and_, or_, func, desc, asc, case, text, bindparam, DateTime, Numeric
 from typing import List, Optional, Dict, Tuple
 from decimal import Decimal
 from datetime import datetime, date, timedelta
@@ -18,6 +18,7 @@ from app.models.cashflow import (
 )
 from app.models.branch import Branch
 from app.models.user import User
+from app.services.document_sequence_service import DocumentSequenceService
 from app.schemas.cashflow import (
     CashBoxCreate, CashBoxUpdate, SalespersonRegionCreate, SalespersonRegionUpdate,
     CashTransactionCreate, CashTransactionUpdate, CashTransferCreate, CashTransferUpdate,
@@ -250,6 +251,9 @@ class CashTransactionService:
         db.add(db_transaction)
         db.flush()  # للحصول على ID المعاملة
         
+        # تحديث الملخص اليومي للفرع
+        CashFlowRollupService.apply_transaction(db, db_transaction, cash_box.branch_id)
+        
         # تحديث رصيد صندوق النقد
         is_debit = transaction.transaction_type in ['RECEIPT', 'TRANSFER_IN']
         is_digital = transaction.payment_method in [CashPaymentMethodEnum.DIGITAL, CashPaymentMethodEnum.BANK_TRANSFER]
@@ -275,16 +279,8 @@ class CashTransactionService:
         }
         prefix = prefix_map.get(transaction_type, 'TXN')
         
-        # البحث عن آخر رقم في نفس اليوم
-        last_transaction = db.query(CashTransaction).filter(
-            CashTransaction.transaction_number.like(f"{prefix}-{today}-%")
-        ).order_by(desc(CashTransaction.transaction_number)).first()
-        
-        if last_transaction:
-            last_number = int(last_transaction.transaction_number.split('-')[-1])
-            next_number = last_number + 1
-        else:
-            next_number = 1
+        # رقم تسلسلي يومي لكل نوع معاملة
+        next_number = DocumentSequenceService(db).next_value(f"cash_{prefix.lower()}", period=today)
         
         return f"{prefix}-{today}-{next_number:04d}"
 
@@ -374,16 +370,7 @@ class CashTransferService:
         """إنشاء رقم تحويل فريد"""
         today = datetime.now().strftime("%Y%m%d")
         
-        # البحث عن آخر رقم في نفس اليوم
-        last_transfer = db.query(CashTransfer).filter(
-            CashTransfer.transfer_number.like(f"TRF-{today}-%")
-        ).order_by(desc(CashTransfer.transfer_number)).first()
-        
-        if last_transfer:
-            last_number = int(last_transfer.transfer_number.split('-')[-1])
-            next_number = last_number + 1
-        else:
-            next_number = 1
+        next_number = DocumentSequenceService(db).next_value("cash_transfer", period=today)
         
         return f"TRF-{today}-{next_number:04d}"
 
@@ -545,6 +532,222 @@ class CashTransferService:
         return transfer
 
 
+class CashFlowRollupService:
+    """
+    خدمة الملخص اليومي للفروع - Branch daily cash-flow rollup
+
+    Keeps one CashFlowSummary row (DAILY, user_id NULL) per branch per day.
+    Cash transactions created through CashTransactionService are added in the
+    same DB transaction and flagged rolled_up; rows written by other paths stay
+    pending until fold_pending() or rebuild() picks them up.
+    """
+
+    SUMMARY_TYPE = 'DAILY'
+    CURRENCIES = ('iqd', 'usd', 'rmb')
+    RECEIPT_TYPES = ('RECEIPT', 'TRANSFER_IN')
+    PAYMENT_TYPES = ('PAYMENT', 'TRANSFER_OUT')
+
+    AMOUNT_COLUMNS = tuple(
+        f"{kind}_{currency}"
+        for currency in CURRENCIES
+        for kind in ('total_receipts', 'total_payments', 'net_flow')
+    )
+    COUNT_COLUMNS = ('total_transactions', 'total_transfers_sent', 'total_transfers_received')
+    COUNTER_COLUMNS = AMOUNT_COLUMNS + COUNT_COLUMNS
+
+    UPSERT_SQL = text(f"""
+        INSERT INTO cash_flow_summaries
+            (branch_id, user_id, summary_date, summary_type, {', '.join(COUNTER_COLUMNS)}, created_at, updated_at)
+        VALUES
+            (:branch_id, NULL, :summary_date, 'DAILY', {', '.join(':' + c for c in COUNTER_COLUMNS)}, :now, :now)
+        ON CONFLICT (branch_id, summary_date, summary_type) WHERE user_id IS NULL
+        DO UPDATE SET
+            {', '.join(f"{c} = COALESCE(cash_flow_summaries.{c}, 0) + excluded.{c}" for c in COUNTER_COLUMNS)},
+            updated_at = excluded.updated_at
+    """).bindparams(
+        *(bindparam(column, type_=Numeric(15, 3)) for column in AMOUNT_COLUMNS),
+        bindparam('summary_date', type_=DateTime()),
+        bindparam('now', type_=DateTime())
+    )
+
+    @staticmethod
+    def empty_counters() -> Dict[str, Decimal]:
+        counters = {column: Decimal(0) for column in CashFlowRollupService.AMOUNT_COLUMNS}
+        counters.update({column: 0 for column in CashFlowRollupService.COUNT_COLUMNS})
+        return counters
+
+    @staticmethod
+    def add_to_counters(counters: Dict, transaction_type: str, currency_code: str,
+                        amount: Decimal, count: int = 1):
+        """إضافة معاملة (أو مجموعة) إلى العدادات"""
+        currency = (currency_code or '').lower()
+        amount = Decimal(amount or 0)
+        if currency in CashFlowRollupService.CURRENCIES:
+            if transaction_type in CashFlowRollupService.RECEIPT_TYPES:
+                counters[f'total_receipts_{currency}'] += amount
+                counters[f'net_flow_{currency}'] += amount
+            elif transaction_type in CashFlowRollupService.PAYMENT_TYPES:
+                counters[f'total_payments_{currency}'] += amount
+                counters[f'net_flow_{currency}'] -= amount
+        counters['total_transactions'] += count
+        if transaction_type == 'TRANSFER_OUT':
+            counters['total_transfers_sent'] += count
+        elif transaction_type == 'TRANSFER_IN':
+            counters['total_transfers_received'] += count
+
+    @staticmethod
+    def _day_start(value) -> datetime:
+        if isinstance(value, str):  # func.date() on SQLite
+            value = date.fromisoformat(value)
+        if isinstance(value, datetime):
+            value = value.date()
+        return datetime.combine(value, datetime.min.time())
+
+    @staticmethod
+    def _upsert(db: Session, deltas: Dict[Tuple[int, datetime], Dict]):
+        if not deltas:
+            return
+        now = datetime.utcnow()
+        db.execute(CashFlowRollupService.UPSERT_SQL, [
+            {'branch_id': branch_id, 'summary_date': day, 'now': now, **counters}
+            for (branch_id, day), counters in deltas.items()
+        ])
+
+    @staticmethod
+    def apply_transaction(db: Session, transaction: CashTransaction, branch_id: int):
+        """إضافة معاملة جديدة إلى ملخص الفرع اليومي (ضمن نفس المعاملة)"""
+        counters = CashFlowRollupService.empty_counters()
+        CashFlowRollupService.add_to_counters(
+            counters, transaction.transaction_type, transaction.currency_code, transaction.amount
+        )
+        day = CashFlowRollupService._day_start(transaction.transaction_date or datetime.utcnow())
+        CashFlowRollupService._upsert(db, {(branch_id, day): counters})
+        transaction.rolled_up = True
+
+    @staticmethod
+    def _aggregate(db: Session, filters: List) -> Dict[Tuple[int, datetime], Dict]:
+        """تجميع المعاملات حسب الفرع واليوم والنوع والعملة (استعلام واحد)"""
+        rows = db.query(
+            CashBox.branch_id,
+            func.date(CashTransaction.transaction_date).label('day'),
+            CashTransaction.transaction_type,
+            CashTransaction.currency_code,
+            func.sum(CashTransaction.amount).label('amount'),
+            func.count(CashTransaction.id).label('count')
+        ).join(CashBox, CashTransaction.cash_box_id == CashBox.id).filter(*filters).group_by(
+            CashBox.branch_id,
+            func.date(CashTransaction.transaction_date),
+            CashTransaction.transaction_type,
+            CashTransaction.currency_code
+        ).all()
+
+        deltas: Dict[Tuple[int, datetime], Dict] = {}
+        for row in rows:
+            key = (row.branch_id, CashFlowRollupService._day_start(row.day))
+            counters = deltas.setdefault(key, CashFlowRollupService.empty_counters())
+            CashFlowRollupService.add_to_counters(
+                counters, row.transaction_type, row.currency_code, row.amount, row.count
+            )
+        return deltas
+
+    @staticmethod
+    def fold_pending(db: Session) -> int:
+        """إضافة المعاملات غير المجمّعة إلى الملخص"""
+        pending_ids = [row.id for row in db.query(CashTransaction.id).filter(
+            CashTransaction.rolled_up == False
+        ).with_for_update(skip_locked=True)]
+        if not pending_ids:
+            return 0
+
+        CashFlowRollupService._upsert(
+            db, CashFlowRollupService._aggregate(db, [CashTransaction.id.in_(pending_ids)])
+        )
+        db.query(CashTransaction).filter(CashTransaction.id.in_(pending_ids)).update(
+            {CashTransaction.rolled_up: True}, synchronize_session=False
+        )
+        return len(pending_ids)
+
+    @staticmethod
+    def rebuild(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """
+        إعادة بناء الملخص من السجل - Rebuild the rollup from transaction history
+
+        Replaces DAILY branch rows in [start_date, end_date] (all history when
+        omitted). Caller commits. On PostgreSQL cash transaction inserts are
+        blocked until the rebuild commits so no increment is lost.
+
+        Returns:
+            Number of branch-day rows written
+        """
+        if db.get_bind().dialect.name == 'postgresql':
+            db.execute(text("LOCK TABLE cash_transactions IN SHARE MODE"))
+
+        transaction_filters = []
+        summary_filters = [
+            CashFlowSummary.summary_type == CashFlowRollupService.SUMMARY_TYPE,
+            CashFlowSummary.user_id.is_(None)
+        ]
+        if start_date:
+            start = datetime.combine(start_date, datetime.min.time())
+            transaction_filters.append(CashTransaction.transaction_date >= start)
+            summary_filters.append(CashFlowSummary.summary_date >= start)
+        if end_date:
+            end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+            transaction_filters.append(CashTransaction.transaction_date < end)
+            summary_filters.append(CashFlowSummary.summary_date < end)
+
+        db.query(CashFlowSummary).filter(*summary_filters).delete(synchronize_session=False)
+
+        deltas = CashFlowRollupService._aggregate(db, transaction_filters)
+        CashFlowRollupService._upsert(db, deltas)
+
+        db.query(CashTransaction).filter(
+            CashTransaction.rolled_up == False, *transaction_filters
+        ).update({CashTransaction.rolled_up: True}, synchronize_session=False)
+
+        return len(deltas)
+
+    @staticmethod
+    def get_daily_activity(db: Session, day: date,
+                           branch_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+        """
+        نشاط اليوم لكل فرع - Rollup row plus today's not-yet-rolled rows
+
+        One indexed read of the rollup and one grouped query over pending rows.
+        """
+        day_start = datetime.combine(day, datetime.min.time())
+
+        query = db.query(CashFlowSummary).filter(
+            CashFlowSummary.summary_type == CashFlowRollupService.SUMMARY_TYPE,
+            CashFlowSummary.user_id.is_(None),
+            CashFlowSummary.summary_date == day_start
+        )
+        if branch_ids is not None:
+            query = query.filter(CashFlowSummary.branch_id.in_(branch_ids))
+
+        activity: Dict[int, Dict] = {}
+        for summary in query:
+            activity[summary.branch_id] = {
+                column: getattr(summary, column) or 0
+                for column in CashFlowRollupService.COUNTER_COLUMNS
+            }
+
+        pending_filters = [
+            CashTransaction.rolled_up == False,
+            CashTransaction.transaction_date >= day_start,
+            CashTransaction.transaction_date < day_start + timedelta(days=1)
+        ]
+        if branch_ids is not None:
+            pending_filters.append(CashBox.branch_id.in_(branch_ids))
+
+        for (branch_id, _), counters in CashFlowRollupService._aggregate(db, pending_filters).items():
+            totals = activity.setdefault(branch_id, CashFlowRollupService.empty_counters())
+            for column, value in counters.items():
+                totals[column] += value
+
+        return activity
+
+
 class CashFlowDashboardService:
     """خدمة لوحة معلومات التدفق النقدي"""
 
@@ -558,17 +761,24 @@ class CashFlowDashboardService:
                 detail="Branch not found - الفرع غير موجود"
             )
         
-        # إحصائيات الصناديق والمندوبين
-        total_cash_boxes = db.query(CashBox).filter(
-            and_(CashBox.branch_id == branch_id, CashBox.is_active == True)
-        ).count()
-        
-        active_salespeople = db.query(User).filter(
-            and_(User.branch_id == branch_id, User.is_salesperson == True, User.is_active == True)
-        ).count()
-        
-        # الأرصدة الإجمالية
-        balances = db.query(
+        return CashFlowDashboardService.get_branch_dashboards(db, [branch])[0]
+
+    @staticmethod
+    def get_branch_dashboards(db: Session, branches: List[Branch]) -> List[BranchCashFlowDashboard]:
+        """
+        لوحات معلومات عدة فروع - Dashboards for several branches at once
+
+        A fixed number of grouped queries regardless of the branch count;
+        today's activity comes from the daily rollup.
+        """
+        branch_ids = [branch.id for branch in branches]
+        if not branch_ids:
+            return []
+        
+        # الصناديق والأرصدة الإجمالية
+        balances = {row.branch_id: row for row in db.query(
+            CashBox.branch_id,
+            func.count(CashBox.id).label('total_cash_boxes'),
             func.sum(CashBox.balance_iqd_cash).label('total_iqd_cash'),
             func.sum(CashBox.balance_iqd_digital).label('total_iqd_digital'),
             func.sum(CashBox.balance_usd_cash).label('total_usd_cash'),
@@ -576,64 +786,56 @@ class CashFlowDashboardService:
             func.sum(CashBox.balance_rmb_cash).label('total_rmb_cash'),
             func.sum(CashBox.balance_rmb_digital).label('total_rmb_digital')
         ).filter(
-            and_(CashBox.branch_id == branch_id, CashBox.is_active == True)
-        ).first()
+            and_(CashBox.branch_id.in_(branch_ids), CashBox.is_active == True)
+        ).group_by(CashBox.branch_id)}
         
-        # نشاط اليوم
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
+        # المندوبين النشطين
+        salespeople = dict(db.query(User.branch_id, func.count(User.id)).filter(
+            and_(User.branch_id.in_(branch_ids), User.is_salesperson == True, User.is_active == True)
+        ).group_by(User.branch_id).all())
         
-        today_activity = db.query(
-            func.sum(case((CashTransaction.transaction_type.in_(['RECEIPT', 'TRANSFER_IN']), 
-                          CashTransaction.amount), else_=0)).label('receipts_iqd'),
-            func.sum(case((CashTransaction.transaction_type.in_(['PAYMENT', 'TRANSFER_OUT']), 
-                          CashTransaction.amount), else_=0)).label('payments_iqd'),
-            func.count(CashTransaction.id).label('transactions_count')
-        ).join(CashBox).filter(
-            and_(CashBox.branch_id == branch_id,
-                 CashTransaction.transaction_date >= today_start,
-                 CashTransaction.transaction_date <= today_end,
-                 CashTransaction.currency_code == 'IQD')
-        ).first()
+        # نشاط اليوم من الملخص اليومي
+        activity = CashFlowRollupService.get_daily_activity(db, date.today(), branch_ids)
         
         # التحويلات المعلقة
-        pending_transfers_in = db.query(CashTransfer).join(
-            CashBox, CashTransfer.to_cash_box_id == CashBox.id
-        ).filter(
-            and_(CashBox.branch_id == branch_id,
-                 CashTransfer.status == TransferStatusEnum.PENDING)
-        ).count()
-        
-        pending_transfers_out = db.query(CashTransfer).join(
-            CashBox, CashTransfer.from_cash_box_id == CashBox.id
-        ).filter(
-            and_(CashBox.branch_id == branch_id,
-                 CashTransfer.status == TransferStatusEnum.PENDING)
-        ).count()
+        pending = {}
+        for direction, box_column in (('in', CashTransfer.to_cash_box_id), ('out', CashTransfer.from_cash_box_id)):
+            pending[direction] = dict(db.query(CashBox.branch_id, func.count(CashTransfer.id)).join(
+                CashBox, box_column == CashBox.id
+            ).filter(
+                and_(CashBox.branch_id.in_(branch_ids),
+                     CashTransfer.status == TransferStatusEnum.PENDING)
+            ).group_by(CashBox.branch_id).all())
         
-        return BranchCashFlowDashboard(
-            branch_id=branch_id,
-            branch_name=branch.name,
-            branch_type=getattr(branch, 'branch_type', ''),
-            total_cash_boxes=total_cash_boxes,
-            active_salespeople=active_salespeople,
-            total_iqd_cash=balances.total_iqd_cash or 0,
-            total_iqd_digital=balances.total_iqd_digital or 0,
-            total_usd_cash=balances.total_usd_cash or 0,
-            total_usd_digital=balances.total_usd_digital or 0,
-            total_rmb_cash=balances.total_rmb_cash or 0,
-            total_rmb_digital=balances.total_rmb_digital or 0,
-            today_receipts_iqd=today_activity.receipts_iqd or 0,
-            today_payments_iqd=today_activity.payments_iqd or 0,
-            today_receipts_usd=0,  # TODO: Calculate USD separately
-            today_payments_usd=0,  # TODO: Calculate USD separately
-            today_transactions_count=today_activity.transactions_count or 0,
-            pending_transfers_in=pending_transfers_in,
-            pending_transfers_out=pending_transfers_out,
-            pending_transfers_amount_iqd=0,  # TODO: Calculate pending amounts
-            pending_transfers_amount_usd=0   # TODO: Calculate pending amounts
-        )
+        dashboards = []
+        for branch in branches:
+            box = balances.get(branch.id)
+            today = activity.get(branch.id) or CashFlowRollupService.empty_counters()
+            
+            dashboards.append(BranchCashFlowDashboard(
+                branch_id=branch.id,
+                branch_name=branch.name,
+                branch_type=getattr(branch, 'branch_type', ''),
+                total_cash_boxes=box.total_cash_boxes if box else 0,
+                active_salespeople=salespeople.get(branch.id, 0),
+                total_iqd_cash=(box.total_iqd_cash if box else None) or 0,
+                total_iqd_digital=(box.total_iqd_digital if box else None) or 0,
+                total_usd_cash=(box.total_usd_cash if box else None) or 0,
+                total_usd_digital=(box.total_usd_digital if box else None) or 0,
+                total_rmb_cash=(box.total_rmb_cash if box else None) or 0,
+                total_rmb_digital=(box.total_rmb_digital if box else None) or 0,
+                today_receipts_iqd=today['total_receipts_iqd'],
+                today_payments_iqd=today['total_payments_iqd'],
+                today_receipts_usd=today['total_receipts_usd'],
+                today_payments_usd=today['total_payments_usd'],
+                today_transactions_count=today['total_transactions'],
+                pending_transfers_in=pending['in'].get(branch.id, 0),
+                pending_transfers_out=pending['out'].get(branch.id, 0),
+                pending_transfers_amount_iqd=0,  # TODO: Calculate pending amounts
+                pending_transfers_amount_usd=0   # TODO: Calculate pending amounts
+            ))
+        
+        return dashboards
 
     @staticmethod
     def get_salesperson_dashboard(db: Session, user_id: int) -> SalespersonCashFlowDashboard:
@@ -730,11 +932,7 @@ class CashFlowDashboardService:
         """الحصول على بيانات لوحة معلومات النظام الكاملة"""
         # بيانات الفروع
         branches = db.query(Branch).filter(Branch.is_active == True).all()
-        branch_dashboards = []
-        
-        for branch in branches:
-            branch_dashboard = CashFlowDashboardService.get_branch_dashboard(db, branch.id)
-            branch_dashboards.append(branch_dashboard)
+        branch_dashboards = CashFlowDashboardService.get_branch_dashboards(db, branches)
         
         # بيانات مندوبي المبيعات
         salespeople = db.query(User).filter(
@@ -753,15 +951,11 @@ class CashFlowDashboardService:
             func.sum(CashBox.balance_rmb_cash + CashBox.balance_rmb_digital).label('total_rmb')
         ).filter(CashBox.is_active == True).first()
         
-        # نشاط اليوم
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        
-        today_transactions = db.query(CashTransaction).filter(
-            and_(CashTransaction.transaction_date >= today_start,
-                 CashTransaction.transaction_date <= today_end)
-        ).count()
+        # نشاط اليوم لكل الفروع من الملخص اليومي
+        today_transactions = sum(
+            counters['total_transactions']
+            for counters in CashFlowRollupService.get_daily_activity(db, date.today()).values()
+        )
         
         pending_transfers = db.query(CashTransfer).filter(
             CashTransfer.status == TransferStatusEnum.PENDING
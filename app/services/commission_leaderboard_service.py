@@ -0,0 +1,296 @@
+"""
+Commission Leaderboard Service - Materialized salesperson rankings
+
+The leaderboard is shown on every salesperson's home screen. Instead of
+querying commissions and targets per salesperson and sorting in Python, a
+single INSERT ... SELECT ranks every salesperson of one or more periods
+with window functions and stores the result in salesperson_leaderboard_ranks:
+- RANK() OVER (PARTITION BY period ORDER BY sales, orders) - ties share a rank
+- COUNT(*) / SUM(sales) OVER (PARTITION BY period) for participants and team total
+- Rows are re-ranked when a target changes and otherwise lazily, on the
+  first read after they are older than MAX_AGE. Commissions are written
+  outside this app, so freshness for new commissions is time-based: a
+  leaderboard may lag them by up to MAX_AGE, and that read does the write
+- Reads are one page by (rank, salesperson_id) keyset plus the caller's row
+
+Commission statistics are aggregated in one conditional-aggregate query.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, DateTime, and_, case, delete, func, insert, literal, or_, select, text, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from app.exceptions import ValidationError
+from app.models.salesperson import SalespersonCommission, SalespersonLeaderboardRank, SalespersonTarget
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+Period = Tuple[date, date]
+
+
+class CommissionLeaderboardService:
+    """Ranks salespersons per period and serves keyset-paginated leaderboards"""
+
+    # Rows older than this are re-ranked on read (new commissions, new
+    # salespersons, etc.); the bound on how stale a leaderboard can be
+    MAX_AGE = timedelta(minutes=10)
+
+    # Serializes concurrent refreshes of the table on PostgreSQL
+    REFRESH_LOCK_KEY = 734_037
+
+    # ========================================================================
+    # Materialization
+    # ========================================================================
+
+    @staticmethod
+    def ranking_select(periods: Sequence[Period]):
+        """
+        One SELECT ranking every salesperson within each requested period
+
+        Commission totals are matched on the exact period bounds; the target
+        is the lowest-id active target overlapping the period.
+        """
+        period_rows = union_all(*[
+            select(literal(start, Date).label("period_start"), literal(end, Date).label("period_end"))
+            for start, end in periods
+        ]).subquery("periods")
+
+        commission = SalespersonCommission
+        commissions = select(
+            period_rows.c.period_start, period_rows.c.period_end,
+            commission.salesperson_id,
+            func.sum(commission.total_sales_amount).label("total_sales"),
+            func.sum(commission.calculated_commission).label("total_commission"),
+            func.sum(commission.total_orders).label("total_orders"),
+            func.sum(commission.total_customers).label("total_customers"),
+        ).join(commission, and_(
+            commission.period_start == period_rows.c.period_start,
+            commission.period_end == period_rows.c.period_end
+        )).group_by(
+            period_rows.c.period_start, period_rows.c.period_end, commission.salesperson_id
+        ).subquery("commissions")
+
+        target = SalespersonTarget
+        target_ids = select(
+            period_rows.c.period_start, period_rows.c.period_end,
+            target.salesperson_id,
+            func.min(target.id).label("target_id"),
+        ).join(target, and_(
+            target.period_start <= period_rows.c.period_end,
+            target.period_end >= period_rows.c.period_start,
+            target.is_active == True
+        )).group_by(
+            period_rows.c.period_start, period_rows.c.period_end, target.salesperson_id
+        ).subquery("target_ids")
+
+        same_period = lambda sub: and_(  # noqa: E731
+            sub.c.period_start == period_rows.c.period_start,
+            sub.c.period_end == period_rows.c.period_end,
+            sub.c.salesperson_id == User.id
+        )
+
+        sales = func.coalesce(commissions.c.total_sales, 0)
+        orders = func.coalesce(commissions.c.total_orders, 0)
+        partition = (period_rows.c.period_start, period_rows.c.period_end)
+
+        return select(
+            period_rows.c.period_start,
+            period_rows.c.period_end,
+            User.id,
+            User.name,
+            func.rank().over(partition_by=partition, order_by=(sales.desc(), orders.desc())),
+            func.count().over(partition_by=partition),
+            func.sum(sales).over(partition_by=partition),
+            sales,
+            func.coalesce(commissions.c.total_commission, 0),
+            orders,
+            func.coalesce(commissions.c.total_customers, 0),
+            case(
+                (target.target_revenue_iqd > 0, sales * 100 / target.target_revenue_iqd),
+                else_=None
+            ),
+            literal(datetime.utcnow(), DateTime),
+        ).select_from(
+            period_rows.join(User, User.is_salesperson == True)
+        ).outerjoin(
+            commissions, same_period(commissions)
+        ).outerjoin(
+            target_ids, same_period(target_ids)
+        ).outerjoin(
+            target, target.id == target_ids.c.target_id
+        )
+
+    @staticmethod
+    def refresh_periods(db: Session, periods: Iterable[Period]) -> int:
+        """Re-rank the given periods in one statement; does not commit"""
+        periods = sorted(set(periods))
+        if not periods:
+            return 0
+
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                       {"key": CommissionLeaderboardService.REFRESH_LOCK_KEY})
+
+        rank = SalespersonLeaderboardRank
+        db.execute(delete(rank).where(or_(*[
+            and_(rank.period_start == start, rank.period_end == end) for start, end in periods
+        ])))
+        result = db.execute(insert(rank).from_select([
+            "period_start", "period_end", "salesperson_id", "salesperson_name",
+            "rank", "total_participants", "team_total_sales",
+            "total_sales", "total_commission", "total_orders", "total_customers",
+            "target_achievement_percentage", "refreshed_at",
+        ], CommissionLeaderboardService.ranking_select(periods)))
+        return result.rowcount
+
+    @staticmethod
+    def refresh_overlapping(db: Session, start: date, end: date) -> int:
+        """Re-rank every materialized period overlapping [start, end] (e.g. after a target change)"""
+        rank = SalespersonLeaderboardRank
+        periods = db.execute(
+            select(rank.period_start, rank.period_end).where(
+                rank.period_start <= end, rank.period_end >= start
+            ).distinct()
+        ).all()
+        return CommissionLeaderboardService.refresh_periods(db, [tuple(period) for period in periods])
+
+    @staticmethod
+    def ensure_fresh(db: Session, period_start: date, period_end: date) -> bool:
+        """
+        Rank the period if it has never been ranked or is older than MAX_AGE
+
+        Called on read; returns True when it re-ranked, so the caller commits.
+        """
+        rank = SalespersonLeaderboardRank
+        refreshed_at = db.execute(
+            select(func.min(rank.refreshed_at)).where(
+                rank.period_start == period_start, rank.period_end == period_end
+            )
+        ).scalar()
+        if refreshed_at is not None and datetime.utcnow() - refreshed_at < CommissionLeaderboardService.MAX_AGE:
+            return False
+        CommissionLeaderboardService.refresh_periods(db, [(period_start, period_end)])
+        return True
+
+    # ========================================================================
+    # Reads
+    # ========================================================================
+
+    @staticmethod
+    def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Decode a "rank:salesperson_id" cursor"""
+        if not cursor:
+            return None
+        try:
+            rank, salesperson_id = cursor.split(":")
+            return int(rank), int(salesperson_id)
+        except ValueError:
+            raise ValidationError(
+                detail=f"Invalid leaderboard cursor: {cursor}",
+                detail_ar=f"مؤشر ترتيب غير صالح: {cursor}"
+            )
+
+    @staticmethod
+    def get_page(
+        db: Session,
+        period_start: date,
+        period_end: date,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SalespersonLeaderboardRank], Optional[str]]:
+        """
+        One leaderboard page ordered by (rank, salesperson_id)
+
+        Returns:
+            (rows, next_cursor) - next_cursor is None on the last page
+        """
+        after = CommissionLeaderboardService.parse_cursor(cursor)
+        rank = SalespersonLeaderboardRank
+
+        query = db.query(rank).filter(rank.period_start == period_start, rank.period_end == period_end)
+        if after:
+            query = query.filter(tuple_(rank.rank, rank.salesperson_id) > after)
+        rows = query.order_by(rank.rank, rank.salesperson_id).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1].rank}:{rows[-1].salesperson_id}"
+        return rows, next_cursor
+
+    @staticmethod
+    def get_entry(db: Session, period_start: date, period_end: date,
+                  salesperson_id: int) -> Optional[SalespersonLeaderboardRank]:
+        """A single salesperson's ranking row"""
+        rank = SalespersonLeaderboardRank
+        return db.query(rank).filter(
+            rank.period_start == period_start,
+            rank.period_end == period_end,
+            rank.salesperson_id == salesperson_id
+        ).first()
+
+    # ========================================================================
+    # Statistics
+    # ========================================================================
+
+    @staticmethod
+    def get_statistics(db: Session, salesperson_id: int, today: Optional[date] = None) -> Dict:
+        """
+        Commission statistics in one query
+
+        Earnings are the approved amount (falling back to the calculated one)
+        of paid commissions, as the statistics endpoint has always counted them.
+        """
+        today = today or datetime.utcnow().date()
+        ytd_start = today.replace(month=1, day=1)
+        mtd_start = today.replace(day=1)
+        last_3_months = today - timedelta(days=90)
+        previous_3_months = today - timedelta(days=180)
+
+        commission = SalespersonCommission
+        earning = func.coalesce(func.nullif(commission.approved_commission, 0), commission.calculated_commission)
+        paid = commission.is_paid == True
+        monthly = and_(paid, commission.period_type == "monthly")
+
+        row = db.execute(select(
+            func.sum(earning).filter(paid),
+            func.sum(earning).filter(paid, commission.period_start >= ytd_start),
+            func.sum(earning).filter(paid, commission.period_start >= mtd_start),
+            func.sum(earning).filter(monthly),
+            func.count().filter(monthly),
+            func.max(earning).filter(monthly),
+            func.sum(commission.total_orders),
+            func.sum(earning).filter(paid, commission.period_start >= last_3_months),
+            func.sum(earning).filter(
+                paid, commission.period_start >= previous_3_months, commission.period_start < last_3_months
+            ),
+        ).where(commission.salesperson_id == salesperson_id)).one()
+
+        as_decimal = lambda value: Decimal(str(value)) if value is not None else Decimal(0)  # noqa: E731
+        lifetime, ytd, mtd, monthly_total, _, highest, _, recent, previous = map(as_decimal, row)
+        monthly_count = row[4] or 0
+        total_orders = int(row[6] or 0)
+
+        trend = "stable"
+        if previous > 0:
+            change = (recent - previous) / previous
+            if change > Decimal("0.1"):
+                trend = "increasing"
+            elif change < Decimal("-0.1"):
+                trend = "decreasing"
+
+        return {
+            "lifetime_earnings": lifetime,
+            "ytd_earnings": ytd,
+            "mtd_earnings": mtd,
+            "avg_monthly_commission": monthly_total / monthly_count if monthly_count else Decimal(0),
+            "highest_monthly_commission": highest,
+            "total_orders_all_time": total_orders,
+            "avg_commission_per_order": lifetime / total_orders if total_orders > 0 else Decimal(0),
+            "commission_trend": trend,
+        }
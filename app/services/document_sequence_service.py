@@ -0,0 +1,150 @@
+"""
+Document Sequence Service - Contention-free document numbering
+
+Hands out invoice, POS, cash transaction and order numbers from the
+document_sequences counter table instead of reading the latest document and
+adding one (which races under concurrent creation).
+
+Two modes:
+- Block mode (default): reserves a block of numbers in a short transaction of
+  its own and serves them from a per-process cache. The counter row is locked
+  for one statement only; numbers are unique but may have gaps and are not
+  strictly ordered across workers. The cache keeps the most recently used
+  sequences only, so daily and per-session scopes don't accumulate.
+- Gap-free mode: increments the counter inside the caller's transaction, so a
+  rollback returns the number. Concurrent creators of the same document type
+  queue on the counter row until the holder commits.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALL_BRANCHES = 0
+
+# Sequence scopes kept in the block cache (unused numbers of evicted blocks become gaps)
+MAX_CACHED_BLOCKS = 256
+
+# Reserve `count` numbers; returns the first one. Portable to PostgreSQL and SQLite.
+ALLOCATE_SQL = text("""
+    INSERT INTO document_sequences (document_type, branch_id, period, next_value, updated_at)
+    VALUES (:document_type, :branch_id, :period, 1 + :count, CURRENT_TIMESTAMP)
+    ON CONFLICT (document_type, branch_id, period)
+    DO UPDATE SET
+        next_value = document_sequences.next_value + :count,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING next_value - :count AS first_value
+""")
+
+SequenceKey = Tuple[str, str, int, str]
+
+
+class DocumentSequenceService:
+    """
+    Service for allocating document numbers.
+
+    Reserved blocks are cached per process and shared by all sessions bound
+    to the same database.
+    """
+
+    _blocks: "OrderedDict[SequenceKey, List[int]]" = OrderedDict()  # key -> [next, end), LRU order
+    _blocks_lock = threading.Lock()
+
+    def __init__(self, db: Session, block_size: Optional[int] = None):
+        """
+        Initialize document sequence service.
+
+        Args:
+            db: Database session
+            block_size: Numbers reserved per round trip in block mode
+        """
+        self.db = db
+        self.block_size = block_size or settings.document_sequence_block_size
+
+    def next_value(
+        self,
+        document_type: str,
+        branch_id: Optional[int] = None,
+        period: str = "",
+        gap_free: bool = False
+    ) -> int:
+        """
+        Allocate the next number of a sequence.
+
+        Args:
+            document_type: Sequence name, e.g. "sales_invoice"
+            branch_id: Branch scope (None = shared by all branches)
+            period: Reset scope, e.g. "20260319" for daily numbering
+            gap_free: Allocate inside the caller's transaction (no gaps)
+
+        Returns:
+            Allocated number (starts at 1 for a new sequence)
+        """
+        params = {
+            "document_type": document_type,
+            "branch_id": branch_id or ALL_BRANCHES,
+            "period": period,
+        }
+
+        if gap_free:
+            return self.db.execute(ALLOCATE_SQL, {**params, "count": 1}).scalar_one()
+
+        engine = self.db.get_bind().engine
+        key = (str(engine.url), document_type, params["branch_id"], period)
+
+        value = self._take_cached(key)
+        if value is not None:
+            return value
+
+        # Own transaction, outside the lock: the counter row is released as soon
+        # as the block is reserved, and no caller waits on another's round trip
+        # (under run_sync the round trip yields to the event loop)
+        with engine.connect() as connection:
+            first = connection.execute(ALLOCATE_SQL, {**params, "count": self.block_size}).scalar_one()
+            connection.commit()
+
+        self._publish(key, [first + 1, first + self.block_size])
+        return first
+
+    @classmethod
+    def _take_cached(cls, key: SequenceKey) -> Optional[int]:
+        with cls._blocks_lock:
+            block = cls._blocks.get(key)
+            if block and block[0] < block[1]:
+                value = block[0]
+                block[0] += 1
+                cls._blocks.move_to_end(key)
+                return value
+        return None
+
+    @classmethod
+    def _publish(cls, key: SequenceKey, block: List[int]):
+        """Cache a reserved block; a concurrent refill that still has numbers wins"""
+        with cls._blocks_lock:
+            current = cls._blocks.get(key)
+            if not current or current[0] >= current[1]:
+                cls._blocks[key] = block
+            cls._blocks.move_to_end(key)
+            # Per-day and per-session sequences go idle; drop the least recently used
+            while len(cls._blocks) > MAX_CACHED_BLOCKS:
+                cls._blocks.popitem(last=False)
+
+    async def next_value_async(self, *args, **kwargs) -> int:
+        """next_value for an AsyncSession (self.db); same arguments"""
+        return await self.db.run_sync(
+            lambda session: DocumentSequenceService(session, self.block_size).next_value(*args, **kwargs)
+        )
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget reserved blocks (unused numbers become gaps)"""
+        with cls._blocks_lock:
+            cls._blocks.clear()
@@ -0,0 +1,471 @@
+"""
+GPS Summary Service - Incremental daily route summaries
+
+Keeps the GPS columns of SalespersonDailySummary current as points arrive so
+daily/weekly views read one row per day instead of recomputing every point:
+- Distances with NumPy-vectorized haversine over the whole track
+- Routes simplified with Douglas-Peucker (customer visits always kept);
+  the kept point IDs are stored on the summary for the map view
+- Batches that append to the end of a day's track extend the summary;
+  out-of-order uploads rebuild that day from a timestamp range scan
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.salesperson import SalespersonDailySummary, SalespersonGPSLocation
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+
+# ============================================================================
+# Vectorized geometry
+# ============================================================================
+
+def segment_distances_m(latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+    """Haversine distance in meters between each pair of consecutive points"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    if lat.size < 2:
+        return np.zeros(0)
+
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_distance_km(latitudes: Sequence[float], longitudes: Sequence[float]) -> float:
+    """Total length of a track in kilometers"""
+    return float(segment_distances_m(latitudes, longitudes).sum()) / 1000
+
+
+def simplify_route(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    tolerance_m: float,
+    always_keep: Optional[Sequence[bool]] = None
+) -> np.ndarray:
+    """
+    Douglas-Peucker simplification
+
+    Points are projected to local meters (equirectangular around the track's
+    mean latitude), which is accurate at city scale.
+
+    Args:
+        latitudes, longitudes: Track in time order
+        tolerance_m: Maximum deviation of a dropped point from the simplified line
+        always_keep: Optional mask of points that must survive (e.g. visits)
+
+    Returns:
+        Sorted indices of the kept points (first and last always included)
+    """
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    n = lat.size
+    if n <= 2:
+        return np.arange(n)
+
+    lat0 = np.radians(lat.mean())
+    x = np.radians(lon) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lat) * EARTH_RADIUS_M
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    if always_keep is not None:
+        keep |= np.asarray(always_keep, dtype=bool)
+
+    # Simplify independently between forced points
+    anchors = np.flatnonzero(keep)
+    stack = list(zip(anchors[:-1], anchors[1:]))
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        px = x[start + 1:end] - x[start]
+        py = y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+
+        if length == 0:
+            deviations = np.hypot(px, py)
+        else:
+            deviations = np.abs(dy * px - dx * py) / length
+
+        farthest = int(np.argmax(deviations))
+        if deviations[farthest] > tolerance_m:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return np.flatnonzero(keep)
+
+
+# ============================================================================
+# Route statistics
+# ============================================================================
+
+@dataclass
+class TrackPoints:
+    """Column arrays of GPS points in time order"""
+    ids: List[int] = field(default_factory=list)
+    latitudes: List[float] = field(default_factory=list)
+    longitudes: List[float] = field(default_factory=list)
+    timestamps: List[datetime] = field(default_factory=list)
+    visits: List[bool] = field(default_factory=list)
+    verified: List[bool] = field(default_factory=list)
+
+    def append(self, row):
+        self.ids.append(row.id)
+        self.latitudes.append(float(row.latitude))
+        self.longitudes.append(float(row.longitude))
+        self.timestamps.append(row.timestamp)
+        self.visits.append(bool(row.is_customer_visit))
+        self.verified.append(bool(row.is_customer_visit and row.visit_verified))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class RouteStats:
+    """GPS portion of a daily summary"""
+    points: int = 0
+    distance_km: float = 0.0
+    customer_visits: int = 0
+    verified_visits: int = 0
+    start_at: Optional[datetime] = None
+    end_at: Optional[datetime] = None
+    last_latitude: Optional[float] = None
+    last_longitude: Optional[float] = None
+    route_point_ids: List[int] = field(default_factory=list)
+
+    @property
+    def hours(self) -> float:
+        if self.start_at is None or self.end_at is None:
+            return 0.0
+        return (self.end_at - self.start_at).total_seconds() / 3600
+
+
+def compute_route_stats(track: TrackPoints, tolerance_m: float) -> RouteStats:
+    """Summarize a full day's track"""
+    if not track:
+        return RouteStats()
+
+    kept = simplify_route(track.latitudes, track.longitudes, tolerance_m, track.visits)
+
+    return RouteStats(
+        points=len(track),
+        distance_km=path_distance_km(track.latitudes, track.longitudes),
+        customer_visits=sum(track.visits),
+        verified_visits=sum(track.verified),
+        start_at=track.timestamps[0],
+        end_at=track.timestamps[-1],
+        last_latitude=track.latitudes[-1],
+        last_longitude=track.longitudes[-1],
+        route_point_ids=[track.ids[i] for i in kept],
+    )
+
+
+def extend_route_stats(stats: RouteStats, track: TrackPoints, tolerance_m: float) -> RouteStats:
+    """
+    Append points recorded after stats.end_at
+
+    The new segment is simplified from the previous end point, so the stored
+    route stays within tolerance without revisiting earlier points.
+    """
+    if not track:
+        return stats
+    if not stats.points:
+        return compute_route_stats(track, tolerance_m)
+
+    latitudes = [stats.last_latitude] + track.latitudes
+    longitudes = [stats.last_longitude] + track.longitudes
+    visits = [False] + track.visits  # Previous end point is already stored
+
+    kept = simplify_route(latitudes, longitudes, tolerance_m, visits)
+
+    return RouteStats(
+        points=stats.points + len(track),
+        distance_km=stats.distance_km + path_distance_km(latitudes, longitudes),
+        customer_visits=stats.customer_visits + sum(track.visits),
+        verified_visits=stats.verified_visits + sum(track.verified),
+        start_at=stats.start_at,
+        end_at=track.timestamps[-1],
+        last_latitude=track.latitudes[-1],
+        last_longitude=track.longitudes[-1],
+        route_point_ids=stats.route_point_ids + [track.ids[i - 1] for i in kept if i > 0],
+    )
+
+
+def day_bounds(day: date):
+    """[start, end) of a UTC day, for index-friendly timestamp predicates"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+# ============================================================================
+# Summarizer
+# ============================================================================
+
+class GPSDailySummarizer:
+    """
+    Service maintaining GPS columns of SalespersonDailySummary.
+
+    Only GPS columns are written; sales/commission columns on the same row
+    are left to their own jobs.
+    """
+
+    def __init__(self, db: Session, tolerance_m: Optional[float] = None):
+        """
+        Initialize GPS summarizer.
+
+        Args:
+            db: Database session (caller commits)
+            tolerance_m: Douglas-Peucker tolerance, defaults to settings
+        """
+        self.db = db
+        self.tolerance_m = tolerance_m if tolerance_m is not None else settings.gps_route_simplify_tolerance_m
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _load_track(
+        self,
+        salesperson_id: int,
+        start: datetime,
+        end: datetime,
+        after: Optional[datetime] = None
+    ) -> Dict[date, TrackPoints]:
+        """Load points in [start, end) grouped by day, columns only"""
+        filters = [
+            SalespersonGPSLocation.salesperson_id == salesperson_id,
+            SalespersonGPSLocation.timestamp >= start,
+            SalespersonGPSLocation.timestamp < end,
+        ]
+        if after is not None:
+            filters.append(SalespersonGPSLocation.timestamp > after)
+
+        rows = self.db.query(
+            SalespersonGPSLocation.id,
+            SalespersonGPSLocation.latitude,
+            SalespersonGPSLocation.longitude,
+            SalespersonGPSLocation.timestamp,
+            SalespersonGPSLocation.is_customer_visit,
+            SalespersonGPSLocation.visit_verified,
+        ).filter(and_(*filters)).order_by(
+            SalespersonGPSLocation.timestamp, SalespersonGPSLocation.id
+        )
+
+        tracks: Dict[date, TrackPoints] = {}
+        for row in rows:
+            tracks.setdefault(row.timestamp.date(), TrackPoints()).append(row)
+        return tracks
+
+    def _lock_days(self, salesperson_id: int, days: Iterable[date]):
+        """
+        Serialize summary writes per salesperson and day.
+
+        Row locks can't cover a day whose summary row doesn't exist yet, so two
+        first uploads would both rebuild and the later upsert would drop the
+        other's points. A transaction-scoped advisory lock covers that case;
+        days are locked in order so overlapping batches can't deadlock.
+        """
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        for day in sorted(set(days)):
+            self.db.execute(
+                text("SELECT pg_advisory_xact_lock(:salesperson_id, :day)"),
+                {"salesperson_id": salesperson_id, "day": day.toordinal()}
+            )
+
+    def _stored(self, salesperson_id: int, days: Iterable[date], lock: bool = False) -> Dict[date, SalespersonDailySummary]:
+        query = self.db.query(SalespersonDailySummary).filter(
+            SalespersonDailySummary.salesperson_id == salesperson_id,
+            SalespersonDailySummary.summary_date.in_(list(days))
+        )
+        if lock:
+            query = query.with_for_update()
+        return {summary.summary_date: summary for summary in query}
+
+    @staticmethod
+    def stats_from_summary(summary: SalespersonDailySummary) -> RouteStats:
+        return RouteStats(
+            points=summary.gps_points_count or 0,
+            distance_km=float(summary.total_distance_km or 0),
+            customer_visits=summary.customer_visits or 0,
+            verified_visits=summary.verified_visits or 0,
+            start_at=summary.route_start_at,
+            end_at=summary.route_end_at,
+            last_latitude=float(summary.last_latitude) if summary.last_latitude is not None else None,
+            last_longitude=float(summary.last_longitude) if summary.last_longitude is not None else None,
+            route_point_ids=list(summary.route_point_ids or []),
+        )
+
+    def get_days(self, salesperson_id: int, days: Sequence[date]) -> Dict[date, RouteStats]:
+        """
+        Route stats for several days, building any summary not yet stored.
+
+        Missing days are computed from a single range scan and persisted.
+        """
+        stored = self._stored(salesperson_id, days)
+        result = {
+            day: self.stats_from_summary(summary)
+            for day, summary in stored.items()
+            if summary.route_point_ids is not None
+        }
+
+        missing = sorted(set(days) - set(result))
+        if missing:
+            self._lock_days(salesperson_id, missing)
+            # Never overwrite a summary an upload built in the meantime
+            result.update(self.rebuild_days(salesperson_id, missing, only_unbuilt=True))
+
+        return result
+
+    def load_routes(
+        self,
+        salesperson_id: int,
+        stats_by_day: Dict[date, RouteStats]
+    ) -> Dict[date, List[SalespersonGPSLocation]]:
+        """Simplified route points for each day, in one query"""
+        ids = [point_id for stats in stats_by_day.values() for point_id in stats.route_point_ids]
+        if not ids:
+            return {}
+
+        start, _ = day_bounds(min(stats_by_day))
+        _, end = day_bounds(max(stats_by_day))
+        points = self.db.query(SalespersonGPSLocation).filter(
+            SalespersonGPSLocation.salesperson_id == salesperson_id,
+            SalespersonGPSLocation.timestamp >= start,
+            SalespersonGPSLocation.timestamp < end,
+            SalespersonGPSLocation.id.in_(ids)
+        ).order_by(SalespersonGPSLocation.timestamp, SalespersonGPSLocation.id).all()
+
+        routes: Dict[date, List[SalespersonGPSLocation]] = {}
+        for point in points:
+            routes.setdefault(point.timestamp.date(), []).append(point)
+        return routes
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def refresh(self, salesperson_id: int, timestamps: Iterable[datetime]):
+        """
+        Update summaries after points were inserted.
+
+        Args:
+            salesperson_id: Owner of the new points
+            timestamps: Timestamps of the inserted points
+        """
+        earliest: Dict[date, datetime] = {}
+        for ts in timestamps:
+            day = ts.date()
+            if day not in earliest or ts < earliest[day]:
+                earliest[day] = ts
+
+        if not earliest:
+            return
+
+        self._lock_days(salesperson_id, earliest)
+        stored = self._stored(salesperson_id, earliest, lock=True)
+        to_rebuild = []
+
+        for day, first_new in sorted(earliest.items()):
+            summary = stored.get(day)
+            if (
+                summary is None
+                or summary.route_point_ids is None
+                or summary.route_end_at is None
+                or first_new <= summary.route_end_at
+            ):
+                to_rebuild.append(day)
+                continue
+
+            start, end = day_bounds(day)
+            new_points = self._load_track(salesperson_id, start, end, after=summary.route_end_at).get(day)
+            if new_points:
+                stats = extend_route_stats(self.stats_from_summary(summary), new_points, self.tolerance_m)
+                self._save(salesperson_id, day, stats)
+
+        if to_rebuild:
+            self.rebuild_days(salesperson_id, to_rebuild)
+
+    def rebuild_days(
+        self,
+        salesperson_id: int,
+        days: Sequence[date],
+        only_unbuilt: bool = False
+    ) -> Dict[date, RouteStats]:
+        """Recompute days from their points (one range scan for all days)"""
+        days = sorted(set(days))
+        start, _ = day_bounds(days[0])
+        _, end = day_bounds(days[-1])
+        tracks = self._load_track(salesperson_id, start, end)
+
+        result = {}
+        for day in days:
+            track = tracks.get(day)
+            stats = compute_route_stats(track, self.tolerance_m) if track else RouteStats()
+            if track or day < datetime.utcnow().date():
+                # Past empty days are final; today stays unstored until points arrive
+                self._save(salesperson_id, day, stats, only_unbuilt)
+            result[day] = stats
+        return result
+
+    def _save(self, salesperson_id: int, day: date, stats: RouteStats, only_unbuilt: bool = False):
+        values = {
+            # Meter precision so repeated extensions don't accumulate rounding
+            "total_distance_km": Decimal(str(round(stats.distance_km, 3))),
+            "total_time_hours": Decimal(str(round(stats.hours, 2))),
+            "gps_points_count": stats.points,
+            "customer_visits": stats.customer_visits,
+            "verified_visits": stats.verified_visits,
+            "route_start_at": stats.start_at,
+            "route_end_at": stats.end_at,
+            "last_latitude": stats.last_latitude,
+            "last_longitude": stats.last_longitude,
+            "route_point_ids": stats.route_point_ids,
+            "calculated_at": datetime.utcnow(),
+        }
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            stmt = pg_insert(SalespersonDailySummary).values(
+                salesperson_id=salesperson_id, summary_date=day, **values
+            )
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["salesperson_id", "summary_date"],
+                set_=values,
+                where=SalespersonDailySummary.route_point_ids.is_(None) if only_unbuilt else None
+            ))
+            return
+
+        summary = self.db.query(SalespersonDailySummary).filter(
+            SalespersonDailySummary.salesperson_id == salesperson_id,
+            SalespersonDailySummary.summary_date == day
+        ).first()
+        if summary is None:
+            summary = SalespersonDailySummary(salesperson_id=salesperson_id, summary_date=day)
+            self.db.add(summary)
+        elif only_unbuilt and summary.route_point_ids is not None:
+            return
+        for key, value in values.items():
+            setattr(summary, key, value)
+        self.db.flush()
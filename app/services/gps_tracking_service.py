@@ -0,0 +1,376 @@
+"""
+GPS Tracking Service - High-throughput location ingestion
+
+Handles offline-sync uploads from the field sales app:
+- Batch ingestion with COPY into a staging table (multi-row INSERT fallback)
+- De-duplication on (salesperson_id, device_id, timestamp) so re-sent
+  offline batches are idempotent
+- Monthly range partitions on `timestamp`, created on demand
+- Retention by dropping whole monthly partitions
+"""
+
+import csv
+import io
+import logging
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.salesperson import SalespersonGPSLocation
+from app.schemas.salesperson import GPSLocationCreate
+
+logger = logging.getLogger(__name__)
+
+GPS_TABLE = "salesperson_gps_locations"
+
+# Monthly partitions created here; any other child (default partition, ad-hoc
+# tables) is never a retention candidate
+PARTITION_NAME_PATTERN = re.compile(rf"^{GPS_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Session.info key for partitions created in the open transaction
+PENDING_PARTITIONS_KEY = "gps_pending_partitions"
+
+# Columns written by ingestion, in COPY order
+INGEST_COLUMNS = (
+    "location_uuid", "salesperson_id", "latitude", "longitude", "accuracy",
+    "altitude", "speed", "heading", "timestamp", "recorded_at", "activity_type",
+    "battery_level", "is_charging", "device_id", "is_synced", "synced_at",
+    "created_at",
+)
+
+
+@dataclass
+class GPSIngestResult:
+    """Outcome of one batch upload"""
+    total: int
+    inserted_ids: List[int] = field(default_factory=list)
+    inserted_timestamps: List[datetime] = field(default_factory=list)
+    duplicates: int = 0
+
+    @property
+    def inserted(self) -> int:
+        return len(self.inserted_ids)
+
+
+def month_start(value: datetime) -> date:
+    """First day of the month containing value"""
+    return date(value.year, value.month, 1)
+
+
+def next_month(value: date) -> date:
+    """First day of the following month"""
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the monthly partition holding month"""
+    return f"{GPS_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month held by a monthly partition, or None for any other table name"""
+    match = PARTITION_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, 1)
+
+
+def retention_cutoff(retention_months: int, today: Optional[date] = None) -> date:
+    """Oldest month kept when retaining retention_months before the current one"""
+    cutoff = month_start(today or datetime.utcnow().date())
+    for _ in range(retention_months):
+        cutoff = date(cutoff.year - 1, 12, 1) if cutoff.month == 1 else date(cutoff.year, cutoff.month - 1, 1)
+    return cutoff
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Device timestamps may carry an offset; storage is naive UTC"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def build_rows(
+    salesperson_id: int,
+    locations: Sequence[GPSLocationCreate],
+    now: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Convert uploaded points to insert rows, dropping in-batch duplicates
+
+    Points with the same (device_id, timestamp) in one upload keep the first
+    occurrence; duplicates against stored rows are resolved by the database.
+    """
+    now = now or datetime.utcnow()
+    rows: List[Dict] = []
+    seen: Set[Tuple[str, datetime]] = set()
+
+    for location in locations:
+        device_id = location.device_id or ""
+        timestamp = to_utc_naive(location.timestamp)
+        key = (device_id, timestamp)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        rows.append({
+            "location_uuid": str(uuid.uuid4()),
+            "salesperson_id": salesperson_id,
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "accuracy": location.accuracy,
+            "altitude": location.altitude,
+            "speed": location.speed,
+            "heading": location.heading,
+            "timestamp": timestamp,
+            "recorded_at": now,
+            "activity_type": location.activity_type,
+            "battery_level": location.battery_level,
+            "is_charging": location.is_charging,
+            "device_id": device_id,
+            "is_synced": True,
+            "synced_at": now,
+            "created_at": now,
+        })
+
+    return rows
+
+
+class GPSIngestionService:
+    """
+    Service for GPS location ingestion and partition maintenance.
+
+    Partitions already known to exist are cached per process so the common
+    case (points for the current month) costs no extra round trip. A month
+    enters the cache only once the transaction that created it commits.
+    """
+
+    _known_partitions: Set[date] = set()
+
+    def __init__(self, db: Session):
+        """
+        Initialize GPS ingestion service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest(
+        self,
+        salesperson_id: int,
+        locations: Sequence[GPSLocationCreate]
+    ) -> GPSIngestResult:
+        """
+        Insert a batch of GPS points for a salesperson.
+
+        Uses COPY into a staging table when the connection supports it,
+        otherwise one multi-row INSERT. Either way the rows land with a single
+        INSERT ... ON CONFLICT DO NOTHING, so duplicates are skipped.
+        The caller owns the transaction (commit/rollback).
+
+        Args:
+            salesperson_id: Owner of the points
+            locations: Uploaded points
+
+        Returns:
+            GPSIngestResult with inserted IDs and duplicate count
+        """
+        rows = build_rows(salesperson_id, locations)
+        result = GPSIngestResult(total=len(locations))
+
+        if not rows:
+            return result
+
+        self.ensure_partitions(month_start(row["timestamp"]) for row in rows)
+
+        # COPY costs several round trips; a single point goes straight in
+        if len(rows) > 1 and self._supports_copy():
+            inserted = self._insert_via_copy(rows)
+        else:
+            inserted = self._insert_multi_row(rows)
+
+        result.inserted_ids = [row.id for row in inserted]
+        result.inserted_timestamps = [row.timestamp for row in inserted]
+
+        result.duplicates = result.total - result.inserted
+        return result
+
+    def _dbapi_connection(self):
+        return self.db.connection().connection.dbapi_connection
+
+    def _supports_copy(self) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        try:
+            cursor = self._dbapi_connection().cursor()
+        except Exception:
+            return False
+        supported = hasattr(cursor, "copy_expert")
+        cursor.close()
+        return supported
+
+    def _insert_via_copy(self, rows: List[Dict]):
+        columns = ", ".join(f'"{column}"' for column in INGEST_COLUMNS)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                "" if row[column] is None else row[column]
+                for column in INGEST_COLUMNS
+            ])
+        buffer.seek(0)
+
+        self.db.execute(text(f"""
+            CREATE TEMP TABLE IF NOT EXISTS gps_ingest_staging
+            (LIKE {GPS_TABLE} INCLUDING DEFAULTS)
+            ON COMMIT DELETE ROWS
+        """))
+        self.db.execute(text("TRUNCATE gps_ingest_staging"))
+
+        cursor = self._dbapi_connection().cursor()
+        try:
+            # Empty CSV fields load as NULL, except device_id ('' = unknown device)
+            cursor.copy_expert(
+                f"COPY gps_ingest_staging ({columns}) FROM STDIN "
+                f"WITH (FORMAT csv, FORCE_NOT_NULL (device_id))",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+        inserted = self.db.execute(text(f"""
+            INSERT INTO {GPS_TABLE} ({columns})
+            SELECT {columns} FROM gps_ingest_staging
+            ON CONFLICT (salesperson_id, device_id, "timestamp") DO NOTHING
+            RETURNING id, "timestamp"
+        """))
+        return inserted.fetchall()
+
+    def _insert_multi_row(self, rows: List[Dict]):
+        stmt = (
+            pg_insert(SalespersonGPSLocation)
+            .values(rows)
+            .on_conflict_do_nothing(
+                index_elements=["salesperson_id", "device_id", "timestamp"]
+            )
+            .returning(SalespersonGPSLocation.id, SalespersonGPSLocation.timestamp)
+        )
+        return self.db.execute(stmt).fetchall()
+
+    # ------------------------------------------------------------------
+    # Partition maintenance
+    # ------------------------------------------------------------------
+
+    def ensure_partitions(self, months: Iterable[date]):
+        """
+        Create monthly partitions that don't exist yet.
+
+        Args:
+            months: First-of-month dates that must be writable
+        """
+        missing = set(months) - self._known_partitions
+        if not missing or self.db.get_bind().dialect.name != "postgresql":
+            return
+
+        for month in sorted(missing):
+            self.db.execute(
+                text("SELECT create_gps_location_partition(:month)"),
+                {"month": month}
+            )
+
+        # A rollback takes the partition with it, so cache on commit only
+        self.db.info.setdefault(PENDING_PARTITIONS_KEY, set()).update(missing)
+
+    @classmethod
+    def remember_partitions(cls, months: Iterable[date]):
+        """Record months whose partitions are committed"""
+        cls._known_partitions.update(months)
+
+    def premake_partitions(self, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        """
+        Create partitions for the current month and the next months_ahead.
+
+        Returns:
+            Names of the partitions ensured
+        """
+        month = month_start(today or datetime.utcnow().date())
+        months = []
+        for _ in range(months_ahead + 1):
+            months.append(month)
+            month = next_month(month)
+
+        self.ensure_partitions(months)
+        return [partition_name(month) for month in months]
+
+    def list_partitions(self) -> List[str]:
+        """Names of all attached monthly partitions"""
+        result = self.db.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            ORDER BY child.relname
+        """), {"table": GPS_TABLE})
+        return [row.relname for row in result]
+
+    def expired_partitions(self, retention_months: int, today: Optional[date] = None) -> List[str]:
+        """Monthly partitions entirely older than the retention window"""
+        cutoff = retention_cutoff(retention_months, today)
+        expired = []
+        for name in self.list_partitions():
+            month = partition_month(name)
+            if month is not None and month < cutoff:
+                expired.append(name)
+        return expired
+
+    def apply_retention(self, retention_months: int, today: Optional[date] = None) -> List[str]:
+        """
+        Drop monthly partitions entirely older than the retention window.
+
+        Args:
+            retention_months: Number of whole months to keep before the current one
+
+        Returns:
+            Names of the dropped partitions
+        """
+        cutoff = retention_cutoff(retention_months, today)
+        dropped = self.expired_partitions(retention_months, today)
+
+        for name in dropped:
+            self.db.execute(text(f'ALTER TABLE {GPS_TABLE} DETACH PARTITION "{name}"'))
+            self.db.execute(text(f'DROP TABLE "{name}"'))
+
+        if dropped:
+            logger.info(f"GPS retention dropped {len(dropped)} partitions older than {cutoff}")
+
+        return dropped
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed_partitions(session):
+    months = session.info.pop(PENDING_PARTITIONS_KEY, None)
+    if months:
+        GPSIngestionService.remember_partitions(months)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_partitions(session):
+    session.info.pop(PENDING_PARTITIONS_KEY, None)
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy import and_, case, func, insert, update
+from typing import Dict, List, Optional, Sequence, Tuple
 from decimal import Decimal
 from app.models.inventory import InventoryItem, StockMovement
 from app.models.product import Product
@@ -105,6 +105,108 @@ class InventoryService:
         db.refresh(db_movement)
         return db_movement
 
+    @staticmethod
+    def lock_inventory_items(db: Session, warehouse_id: int,
+                             product_ids: Sequence[int]) -> Dict[int, InventoryItem]:
+        """
+        قفل عناصر المخزون لعدة منتجات باستعلام واحد
+
+        يتم القفل بترتيب معرف المنتج حتى لا تتقاطع أقفال عمليتين متزامنتين (تجنب الجمود)
+        """
+        items = db.query(InventoryItem).filter(
+            and_(
+                InventoryItem.warehouse_id == warehouse_id,
+                InventoryItem.product_id.in_(sorted(set(product_ids)))
+            )
+        ).order_by(InventoryItem.product_id).with_for_update().populate_existing().all()
+
+        return {item.product_id: item for item in items}
+
+    @staticmethod
+    def post_stock_movements(db: Session, warehouse_id: int,
+                             lines: Sequence[Tuple[int, Decimal]],
+                             reference_type: str, created_by: int,
+                             reference_id: Optional[int] = None,
+                             notes: Optional[str] = None) -> Dict[int, Decimal]:
+        """
+        تسجيل حركات مخزون لسلة كاملة دفعة واحدة (بدون commit)
+
+        Args:
+            lines: (product_id, quantity_change) لكل سطر؛ سالبة للخروج وموجبة للدخول
+        
+        Returns:
+            صافي التغيير لكل منتج
+
+        يتم قفل جميع العناصر باستعلام واحد والتحقق من السلة كاملة في الذاكرة، ثم
+        تُكتب الحركات بعبارة INSERT واحدة والكميات بعبارة UPDATE واحدة.
+        """
+        changes: Dict[int, Decimal] = {}
+        for product_id, quantity_change in lines:
+            changes[product_id] = changes.get(product_id, Decimal(0)) + Decimal(quantity_change)
+
+        if not changes:
+            return changes
+
+        items = InventoryService.lock_inventory_items(db, warehouse_id, list(changes))
+
+        # التحقق من السلة كاملة قبل أي كتابة
+        shortages = [
+            product_id for product_id, change in sorted(changes.items())
+            if change < 0 and (
+                product_id not in items
+                or items[product_id].available_quantity < -change
+            )
+        ]
+        if shortages:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Insufficient stock for product {', '.join(map(str, shortages))}"
+            )
+
+        # الإرجاع إلى منتج لا يملك عنصر مخزون في هذا المستودع
+        missing = [product_id for product_id in changes if product_id not in items]
+        if missing:
+            for product_id in missing:
+                db.add(InventoryItem(
+                    product_id=product_id,
+                    warehouse_id=warehouse_id,
+                    quantity_on_hand=0,
+                    quantity_reserved=0,
+                    quantity_ordered=0
+                ))
+            db.flush()
+            items = InventoryService.lock_inventory_items(db, warehouse_id, list(changes))
+
+        db.execute(insert(StockMovement), [
+            {
+                "inventory_item_id": items[product_id].id,
+                "movement_type": "OUT" if quantity_change < 0 else "IN",
+                "reference_type": reference_type,
+                "reference_id": reference_id,
+                "quantity": abs(Decimal(quantity_change)),
+                "notes": notes,
+                "created_by": created_by,
+            }
+            for product_id, quantity_change in lines
+        ])
+
+        deltas = {items[product_id].id: change for product_id, change in changes.items() if change}
+        if deltas:
+            db.execute(
+                update(InventoryItem)
+                .where(InventoryItem.id.in_(list(deltas)))
+                .values(
+                    quantity_on_hand=InventoryItem.quantity_on_hand + case(deltas, value=InventoryItem.id),
+                    updated_at=func.now()
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        for item in items.values():
+            db.expire(item, ["quantity_on_hand", "updated_at"])
+
+        return changes
+
     @staticmethod
     def adjust_stock(db: Session, adjustment: StockAdjustment, user_id: int) -> StockMovement:
         """تعديل المخزون"""
@@ -1,22 +1,52 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
-from typing import List, Optional, Dict, Any
-from datetime import date, datetime
+from sqlalchemy import (
+    and_, or_, func, desc, case, literal, select, union_all, tuple_, text, bindparam, Date, Numeric
+)
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
+from app.exceptions import ValidationError
 from app.models.invoice import (
     SalesInvoice, PurchaseInvoice, SalesInvoiceItem, 
-    PurchaseInvoiceItem, InvoicePayment, InvoiceStatusEnum, InvoiceTypeEnum
+    PurchaseInvoiceItem, InvoicePayment, InvoiceStatusEnum, InvoiceTypeEnum,
+    InvoiceAging
 )
 from app.models.customer import Customer, Supplier
 from app.models.sales import SalesOrder
 from app.models.purchase import PurchaseOrder
+from app.services.document_sequence_service import DocumentSequenceService
 from app.schemas.invoice import (
     SalesInvoiceCreate, SalesInvoiceUpdate, PurchaseInvoiceCreate, 
     PurchaseInvoiceUpdate, InvoicePaymentCreate, InvoicePaymentUpdate,
-    InvoiceSummary, InvoiceFilter
+    InvoiceSummary, InvoiceFilter, InvoiceAgingBucket
+)
+
+
+# Statuses that carry an outstanding balance in invoice_aging
+OPEN_STATUSES = (
+    InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID, InvoiceStatusEnum.OVERDUE
+)
+
+# (bucket, max days overdue); the last bucket is open-ended
+AGING_BUCKETS = (("current", 0), ("1-30", 30), ("31-60", 60), ("61-90", 90), ("90+", None))
+
+# Additive upsert of open balance deltas. Portable to PostgreSQL and SQLite.
+AGING_UPSERT_SQL = text("""
+    INSERT INTO invoice_aging (invoice_type, branch_id, due_date, open_count, open_amount, updated_at)
+    VALUES (:invoice_type, :branch_id, :due_date, :open_count, :open_amount, CURRENT_TIMESTAMP)
+    ON CONFLICT (invoice_type, branch_id, due_date)
+    DO UPDATE SET
+        open_count = invoice_aging.open_count + excluded.open_count,
+        open_amount = invoice_aging.open_amount + excluded.open_amount,
+        updated_at = CURRENT_TIMESTAMP
+""").bindparams(
+    bindparam('due_date', type_=Date()),
+    bindparam('open_amount', type_=Numeric(15, 2))
 )
 
+AgingKey = Tuple[str, int, date]
+
 
 class InvoiceService:
     """خدمة إدارة الفواتير - Invoice Management Service"""
@@ -34,28 +64,16 @@ class InvoiceService:
 
     # Converted from @staticmethod to instance method
     def generate_invoice_number(self, invoice_type: str = "SALES") -> str:
-        """توليد رقم فاتورة جديد - Generate new invoice number"""
+        """توليد رقم فاتورة جديد - Generate new invoice number
+
+        Gap-free: the counter is incremented inside the caller's transaction,
+        so a failed invoice does not consume a number.
+        """
         prefix = "INV-S" if invoice_type == "SALES" else "INV-P"
-        
-        # Get the latest invoice number for this type
-        if invoice_type == "SALES":
-            latest = self.db.query(SalesInvoice).filter(
-                SalesInvoice.invoice_number.startswith(prefix)
-            ).order_by(desc(SalesInvoice.id)).first()
-        else:
-            latest = self.db.query(PurchaseInvoice).filter(
-                PurchaseInvoice.invoice_number.startswith(prefix)
-            ).order_by(desc(PurchaseInvoice.id)).first()
-        
-        if latest:
-            try:
-                last_number = int(latest.invoice_number.split('-')[-1])
-                new_number = last_number + 1
-            except (ValueError, IndexError):
-                new_number = 1
-        else:
-            new_number = 1
-        
+        document_type = "sales_invoice" if invoice_type == "SALES" else "purchase_invoice"
+
+        new_number = DocumentSequenceService(self.db).next_value(document_type, gap_free=True)
+
         return f"{prefix}-{new_number:06d}"
 
     # Sales Invoice Operations
@@ -77,6 +95,7 @@ class InvoiceService:
             db_item = SalesInvoiceItem(invoice_id=db_invoice.id, **item_data.dict())
             self.db.add(db_item)
         
+        self._track_aging(None, self._aging_entry(db_invoice))
         self.db.commit()
         self.db.refresh(db_invoice)
         return db_invoice
@@ -130,10 +149,12 @@ class InvoiceService:
         if not db_invoice:
             return None
         
+        before = self._aging_entry(db_invoice)
         update_data = invoice_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_invoice, field, value)
         
+        self._track_aging(before, self._aging_entry(db_invoice))
         self.db.commit()
         self.db.refresh(db_invoice)
         return db_invoice
@@ -145,6 +166,7 @@ class InvoiceService:
         if not db_invoice:
             return False
         
+        self._track_aging(self._aging_entry(db_invoice), None)
         self.db.delete(db_invoice)
         self.db.commit()
         return True
@@ -168,6 +190,7 @@ class InvoiceService:
             db_item = PurchaseInvoiceItem(invoice_id=db_invoice.id, **item_data.dict())
             self.db.add(db_item)
         
+        self._track_aging(None, self._aging_entry(db_invoice))
         self.db.commit()
         self.db.refresh(db_invoice)
         return db_invoice
@@ -222,10 +245,12 @@ class InvoiceService:
         if not db_invoice:
             return None
         
+        before = self._aging_entry(db_invoice)
         update_data = invoice_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_invoice, field, value)
         
+        self._track_aging(before, self._aging_entry(db_invoice))
         self.db.commit()
         self.db.refresh(db_invoice)
         return db_invoice
@@ -237,6 +262,7 @@ class InvoiceService:
         if not db_invoice:
             return False
         
+        self._track_aging(self._aging_entry(db_invoice), None)
         self.db.delete(db_invoice)
         self.db.commit()
         return True
@@ -259,24 +285,28 @@ class InvoiceService:
                 SalesInvoice.id == payment_data.sales_invoice_id
             ).first()
             if invoice:
+                before = self._aging_entry(invoice)
                 invoice.paid_amount = (invoice.paid_amount or 0) + payment_data.amount
                 # Update status based on payment
                 if invoice.paid_amount >= invoice.total_amount:
                     invoice.status = InvoiceStatusEnum.PAID
                 elif invoice.paid_amount > 0:
                     invoice.status = InvoiceStatusEnum.PARTIALLY_PAID
+                self._track_aging(before, self._aging_entry(invoice))
         
         elif payment_data.purchase_invoice_id:
             invoice = self.db.query(PurchaseInvoice).filter(
                 PurchaseInvoice.id == payment_data.purchase_invoice_id
             ).first()
             if invoice:
+                before = self._aging_entry(invoice)
                 invoice.paid_amount = (invoice.paid_amount or 0) + payment_data.amount
                 # Update status based on payment
                 if invoice.paid_amount >= invoice.total_amount:
                     invoice.status = InvoiceStatusEnum.PAID
                 elif invoice.paid_amount > 0:
                     invoice.status = InvoiceStatusEnum.PARTIALLY_PAID
+                self._track_aging(before, self._aging_entry(invoice))
         
         self.db.commit()
         self.db.refresh(db_payment)
@@ -341,8 +371,10 @@ class InvoiceService:
         if not invoice:
             return False
         
+        before = self._aging_entry(invoice)
         invoice.status = InvoiceStatusEnum.PENDING
         invoice.issued_at = datetime.now()
+        self._track_aging(before, self._aging_entry(invoice))
         self.db.commit()
         return True
 
@@ -357,101 +389,193 @@ class InvoiceService:
         if not invoice:
             return False
         
+        before = self._aging_entry(invoice)
         invoice.status = InvoiceStatusEnum.CANCELLED
         invoice.cancelled_at = datetime.now()
+        self._track_aging(before, self._aging_entry(invoice))
         self.db.commit()
         return True
 
     # Dashboard and Reports
     # Converted from @staticmethod to instance method
     def get_invoice_summary(self, branch_id: Optional[int] = None) -> InvoiceSummary:
-        """الحصول على ملخص الفواتير - Get invoice summary"""
-        
-        # Base queries
-        sales_query = self.db.query(SalesInvoice)
-        purchase_query = self.db.query(PurchaseInvoice)
-        
-        if branch_id:
-            sales_query = sales_query.filter(SalesInvoice.branch_id == branch_id)
-            purchase_query = purchase_query.filter(PurchaseInvoice.branch_id == branch_id)
-        
-        # Sales statistics
-        total_sales_invoices = sales_query.count()
-        total_sales_amount = sales_query.with_entities(
-            func.coalesce(func.sum(SalesInvoice.total_amount), 0)
-        ).scalar() or Decimal('0')
-        
-        pending_sales_amount = sales_query.filter(
-            SalesInvoice.status.in_([InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID])
-        ).with_entities(
-            func.coalesce(func.sum(SalesInvoice.total_amount - SalesInvoice.paid_amount), 0)
-        ).scalar() or Decimal('0')
-        
-        overdue_sales_count = sales_query.filter(
-            and_(
-                SalesInvoice.due_date < date.today(),
-                SalesInvoice.status != InvoiceStatusEnum.PAID
-            )
-        ).count()
-        
-        # Purchase statistics
-        total_purchase_invoices = purchase_query.count()
-        total_purchase_amount = purchase_query.with_entities(
-            func.coalesce(func.sum(PurchaseInvoice.total_amount), 0)
-        ).scalar() or Decimal('0')
-        
-        pending_purchase_amount = purchase_query.filter(
-            PurchaseInvoice.status.in_([InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID])
-        ).with_entities(
-            func.coalesce(func.sum(PurchaseInvoice.total_amount - PurchaseInvoice.paid_amount), 0)
-        ).scalar() or Decimal('0')
+        """الحصول على ملخص الفواتير - Get invoice summary
+
+        One statement: a conditional-aggregate row per invoice table.
+        """
         
-        overdue_purchase_count = purchase_query.filter(
-            and_(
-                PurchaseInvoice.due_date < date.today(),
-                PurchaseInvoice.status != InvoiceStatusEnum.PAID
+        def aggregates(model, kind: str):
+            query = select(
+                literal(kind).label("kind"),
+                func.count(model.id).label("invoice_count"),
+                func.coalesce(func.sum(model.total_amount), 0).label("total_amount"),
+                func.coalesce(func.sum(model.total_amount - model.paid_amount).filter(
+                    model.status.in_([InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID])
+                ), 0).label("pending_amount"),
+                func.count(model.id).filter(and_(
+                    model.due_date < date.today(),
+                    model.status != InvoiceStatusEnum.PAID
+                )).label("overdue_count")
             )
-        ).count()
+            if branch_id:
+                query = query.where(model.branch_id == branch_id)
+            return query
+        
+        rows = {
+            row.kind: row
+            for row in self.db.execute(union_all(
+                aggregates(SalesInvoice, "SALES"),
+                aggregates(PurchaseInvoice, "PURCHASE")
+            ))
+        }
+        sales, purchase = rows["SALES"], rows["PURCHASE"]
         
         return InvoiceSummary(
-            total_sales_invoices=total_sales_invoices,
-            total_purchase_invoices=total_purchase_invoices,
-            total_sales_amount=total_sales_amount,
-            total_purchase_amount=total_purchase_amount,
-            pending_sales_amount=pending_sales_amount,
-            pending_purchase_amount=pending_purchase_amount,
-            overdue_sales_count=overdue_sales_count,
-            overdue_purchase_count=overdue_purchase_count
+            total_sales_invoices=sales.invoice_count,
+            total_purchase_invoices=purchase.invoice_count,
+            total_sales_amount=Decimal(sales.total_amount),
+            total_purchase_amount=Decimal(purchase.total_amount),
+            pending_sales_amount=Decimal(sales.pending_amount),
+            pending_purchase_amount=Decimal(purchase.pending_amount),
+            overdue_sales_count=sales.overdue_count,
+            overdue_purchase_count=purchase.overdue_count
         )
 
     # Converted from @staticmethod to instance method
-    def get_overdue_invoices(self, branch_id: Optional[int] = None) -> Dict[str, List]:
-        """الحصول على الفواتير المتأخرة - Get overdue invoices"""
+    def get_overdue_invoices(
+        self,
+        branch_id: Optional[int] = None,
+        limit: int = 100,
+        sales_cursor: Optional[str] = None,
+        purchase_cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """الحصول على الفواتير المتأخرة - Get overdue invoices
+
+        Keyset pagination on (due_date, id): pass back *_next_cursor to get
+        the next page of each list (None when exhausted).
+        """
+        sales, sales_next = self._overdue_page(SalesInvoice, branch_id, limit, sales_cursor)
+        purchase, purchase_next = self._overdue_page(PurchaseInvoice, branch_id, limit, purchase_cursor)
         
-        # Sales overdue
-        sales_query = self.db.query(SalesInvoice).filter(
+        return {
+            "sales": sales,
+            "purchase": purchase,
+            "sales_next_cursor": sales_next,
+            "purchase_next_cursor": purchase_next
+        }
+
+    def _overdue_page(self, model, branch_id: Optional[int], limit: int,
+                      cursor: Optional[str]) -> Tuple[List, Optional[str]]:
+        query = self.db.query(model).filter(
             and_(
-                SalesInvoice.due_date < date.today(),
-                SalesInvoice.status != InvoiceStatusEnum.PAID
+                model.due_date < date.today(),
+                model.status != InvoiceStatusEnum.PAID
             )
         )
-        
-        # Purchase overdue
-        purchase_query = self.db.query(PurchaseInvoice).filter(
-            and_(
-                PurchaseInvoice.due_date < date.today(),
-                PurchaseInvoice.status != InvoiceStatusEnum.PAID
-            )
+        if branch_id:
+            query = query.filter(model.branch_id == branch_id)
+        if cursor:
+            query = query.filter(tuple_(model.due_date, model.id) > self._parse_cursor(cursor))
+        
+        rows = query.order_by(model.due_date, model.id).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], f"{last.due_date.isoformat()}:{last.id}"
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[date, int]:
+        try:
+            due_date, invoice_id = cursor.split(":")
+            return date.fromisoformat(due_date), int(invoice_id)
+        except ValueError:
+            raise ValidationError("Invalid cursor", "مؤشر الصفحة غير صالح")
+
+    # Invoice Aging
+    def get_aging_buckets(
+        self,
+        invoice_type: str = "SALES",
+        branch_id: Optional[int] = None
+    ) -> List[InvoiceAgingBucket]:
+        """أعمار الفواتير المفتوحة - Open balances by aging bucket"""
+        today = date.today()
+        bucket = case(
+            *[
+                (InvoiceAging.due_date >= today - timedelta(days=max_days), name)
+                for name, max_days in AGING_BUCKETS if max_days is not None
+            ],
+            else_=AGING_BUCKETS[-1][0]
         )
         
+        query = self.db.query(
+            bucket.label("bucket"),
+            func.sum(InvoiceAging.open_count),
+            func.sum(InvoiceAging.open_amount)
+        ).filter(InvoiceAging.invoice_type == invoice_type.upper())
         if branch_id:
-            sales_query = sales_query.filter(SalesInvoice.branch_id == branch_id)
-            purchase_query = purchase_query.filter(PurchaseInvoice.branch_id == branch_id)
-        
-        return {
-            "sales": sales_query.order_by(SalesInvoice.due_date).all(),
-            "purchase": purchase_query.order_by(PurchaseInvoice.due_date).all()
-        }
+            query = query.filter(InvoiceAging.branch_id == branch_id)
+        totals = {name: (count, amount) for name, count, amount in query.group_by(bucket)}
+        
+        return [
+            InvoiceAgingBucket(
+                bucket=name,
+                invoice_count=totals.get(name, (0, 0))[0] or 0,
+                amount=Decimal(totals.get(name, (0, 0))[1] or 0)
+            )
+            for name, _ in AGING_BUCKETS
+        ]
+
+    def rebuild_invoice_aging(self):
+        """إعادة بناء جدول الأعمار من الفواتير - Rebuild invoice_aging (no commit)"""
+        self.db.query(InvoiceAging).delete(synchronize_session=False)
+        
+        deltas: Dict[AgingKey, List] = {}
+        for model, kind in ((SalesInvoice, "SALES"), (PurchaseInvoice, "PURCHASE")):
+            rows = self.db.query(
+                model.branch_id,
+                model.due_date,
+                func.count(model.id),
+                func.sum(model.total_amount - func.coalesce(model.paid_amount, 0))
+            ).filter(model.status.in_(OPEN_STATUSES)).group_by(model.branch_id, model.due_date)
+            for branch_id, due_date, count, amount in rows:
+                deltas[(kind, branch_id, due_date)] = [count, Decimal(amount or 0)]
+        
+        self._apply_aging(deltas)
+
+    def _aging_entry(self, invoice) -> Optional[Tuple[AgingKey, Decimal]]:
+        """Contribution of one invoice to invoice_aging (None when settled/draft)"""
+        if invoice is None or invoice.status not in OPEN_STATUSES:
+            return None
+        kind = "PURCHASE" if isinstance(invoice, PurchaseInvoice) else "SALES"
+        outstanding = Decimal(invoice.total_amount or 0) - Decimal(invoice.paid_amount or 0)
+        return (kind, invoice.branch_id, invoice.due_date), outstanding
+
+    def _track_aging(self, before: Optional[Tuple[AgingKey, Decimal]],
+                     after: Optional[Tuple[AgingKey, Decimal]]):
+        """Apply the difference between two contributions of the same invoice"""
+        deltas: Dict[AgingKey, List] = {}
+        for entry, sign in ((before, -1), (after, 1)):
+            if entry:
+                key, amount = entry
+                delta = deltas.setdefault(key, [0, Decimal(0)])
+                delta[0] += sign
+                delta[1] += sign * amount
+        
+        self._apply_aging({key: delta for key, delta in deltas.items() if delta[0] or delta[1]})
+
+    def _apply_aging(self, deltas: Dict[AgingKey, List]):
+        if not deltas:
+            return
+        self.db.execute(AGING_UPSERT_SQL, [
+            {
+                "invoice_type": kind,
+                "branch_id": branch_id,
+                "due_date": due_date,
+                "open_count": count,
+                "open_amount": amount,
+            }
+            for (kind, branch_id, due_date), (count, amount) in deltas.items()
+        ])
 
     # Converted from @staticmethod to instance method
     def create_invoice_from_order(
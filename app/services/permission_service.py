@@ -10,6 +10,7 @@ from app.models.permissions import ActionType, ModuleType
 from app.models.user import User
 from app.models.role import Role
 from app.db.database import get_db
+from app.services.permission_snapshot_service import PermissionSnapshotCache
 
 class PermissionService:
     """Advanced permission management service with RBAC and ABAC support"""
@@ -22,115 +23,11 @@ class PermissionService:
                         context: Optional[Dict[str, Any]] = None) -> bool:
         """
         Check if user has permission with optional attribute-based conditions
-        """
-        # Get user with roles
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
-            return False
-        
-        # Check direct user permissions first (highest priority)
-        user_permission = self._check_user_permission(user_id, permission_name, context)
-        if user_permission is not None:
-            return user_permission
-        
-        # Check role-based permissions
-        return self._check_role_permissions(user.role_id, permission_name, context)
-    
-    def _check_user_permission(self, user_id: int, permission_code: str,
-                              context: Optional[Dict[str, Any]] = None) -> Optional[bool]:
-        """Check direct user permissions"""
-        query = self.db.query(UserPermission).join(Permission).filter(
-            and_(
-                UserPermission.user_id == user_id,
-                Permission.code == permission_code,
-                Permission.is_active == True,
-                or_(
-                    UserPermission.expires_at.is_(None),
-                    UserPermission.expires_at > datetime.utcnow()
-                )
-            )
-        ).order_by(UserPermission.granted_at.desc())
 
-        user_permission = query.first()
-        if not user_permission:
-            return None
-
-        # Check conditions if present
-        if user_permission.conditions:
-            return self._evaluate_conditions(user_permission.conditions, context)
-
-        return user_permission.is_granted
-    
-    def _check_role_permissions(self, role_id: int, permission_name: str,
-                               context: Optional[Dict[str, Any]] = None) -> bool:
-        """Check role-based permissions"""
-        role_permission = self.db.query(RolePermission).join(Permission).filter(
-            and_(
-                RolePermission.role_id == role_id,
-                Permission.name == permission_name,
-                Permission.is_active == True
-            )
-        ).first()
-        
-        if not role_permission:
-            return False
-        
-        # Check conditions if present
-        if role_permission.conditions:
-            return self._evaluate_conditions(role_permission.conditions, context)
-        
-        return True
-    
-    def _evaluate_conditions(self, conditions_json: str, 
-                           context: Optional[Dict[str, Any]] = None) -> bool:
-        """Evaluate attribute-based conditions"""
-        if not conditions_json or not context:
-            return True
-        
-        try:
-            conditions = json.loads(conditions_json)
-            return self._evaluate_condition_tree(conditions, context)
-        except (json.JSONDecodeError, Exception):
-            return False
-    
-    def _evaluate_condition_tree(self, condition: Dict[str, Any], 
-                               context: Dict[str, Any]) -> bool:
-        """Recursively evaluate condition tree"""
-        if "and" in condition:
-            return all(self._evaluate_condition_tree(c, context) for c in condition["and"])
-        elif "or" in condition:
-            return any(self._evaluate_condition_tree(c, context) for c in condition["or"])
-        elif "not" in condition:
-            return not self._evaluate_condition_tree(condition["not"], context)
-        else:
-            # Simple condition: {"field": "branch_id", "operator": "eq", "value": 1}
-            field = condition.get("field")
-            operator = condition.get("operator")
-            expected_value = condition.get("value")
-            
-            if field not in context:
-                return False
-            
-            actual_value = context[field]
-            
-            if operator == "eq":
-                return actual_value == expected_value
-            elif operator == "ne":
-                return actual_value != expected_value
-            elif operator == "in":
-                return actual_value in expected_value
-            elif operator == "not_in":
-                return actual_value not in expected_value
-            elif operator == "gt":
-                return actual_value > expected_value
-            elif operator == "gte":
-                return actual_value >= expected_value
-            elif operator == "lt":
-                return actual_value < expected_value
-            elif operator == "lte":
-                return actual_value <= expected_value
-            
-            return False
+        Uses the user's compiled permission snapshot; the database is read
+        only when permissions changed since the snapshot was built.
+        """
+        return PermissionSnapshotCache.get(self.db, user_id).allows(permission_name, context)
     
     def grant_permission(self, granter_id: int, user_id: int, permission_name: str,
                         conditions: Optional[Dict[str, Any]] = None,
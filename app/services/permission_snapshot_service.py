@@ -0,0 +1,320 @@
+"""
+Permission Snapshot Service - Compiled per-user permissions
+
+PermissionService.check_permission used to load the user, the user's direct
+overrides and the role's permission on every call and re-parse JSON
+conditions each time. A list page performs dozens of checks, so each user's
+effective permissions are compiled once into a PermissionSnapshot:
+- A frozenset of unconditional role permission names (a check is a set lookup)
+- Role and override conditions parsed once into predicates
+- Direct overrides (newest first, with expiry) keyed by permission code
+
+Snapshots are cached per process and in Redis under a global version number.
+Any committed change to roles, role permissions, user overrides, permissions
+or a user's role/active flag bumps the version (ORM session hooks below), so
+the database is only read on a version miss.
+"""
+
+import json
+import logging
+import operator
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, event, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.permissions import Permission, RolePermission, UserPermission
+from app.models.role import Role
+from app.models.user import User
+from app.services.versioned_cache import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+Predicate = Callable[[Optional[Dict[str, Any]]], bool]
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "in": lambda actual, expected: actual in expected,
+    "not_in": lambda actual, expected: actual not in expected,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+# ============================================================================
+# Condition compilation
+# ============================================================================
+
+def _raising(error: Exception) -> Predicate:
+    def node(context):
+        raise error
+    return node
+
+
+def _compile_node(condition: Any) -> Predicate:
+    """
+    Compile one node of a condition tree
+
+    Mirrors the evaluation order of the interpreted version: structural
+    errors surface when the node is evaluated, so short-circuited branches
+    behave the same.
+    """
+    try:
+        if "and" in condition:
+            children = [_compile_node(child) for child in condition["and"]]
+            return lambda context: all(child(context) for child in children)
+        if "or" in condition:
+            children = [_compile_node(child) for child in condition["or"]]
+            return lambda context: any(child(context) for child in children)
+        if "not" in condition:
+            child = _compile_node(condition["not"])
+            return lambda context: not child(context)
+
+        # Simple condition: {"field": "branch_id", "operator": "eq", "value": 1}
+        name = condition.get("field")
+        compare = OPERATORS.get(condition.get("operator"))
+        expected = condition.get("value")
+
+        def leaf(context):
+            if name not in context:
+                return False
+            return compare(context[name], expected) if compare else False
+        return leaf
+    except Exception as error:
+        return _raising(error)
+
+
+def compile_conditions(conditions_json: Optional[str]) -> Predicate:
+    """
+    Parse a JSON condition tree once into a predicate over the check context
+
+    Empty conditions or an empty context allow; invalid JSON or an evaluation
+    error denies.
+    """
+    if not conditions_json:
+        return lambda context: True
+
+    try:
+        root = _compile_node(json.loads(conditions_json))
+    except Exception as error:
+        root = _raising(error)
+
+    def predicate(context):
+        if not context:
+            return True
+        try:
+            return bool(root(context))
+        except Exception:
+            return False
+    return predicate
+
+
+# ============================================================================
+# Snapshot
+# ============================================================================
+
+class Override(NamedTuple):
+    is_granted: bool
+    predicate: Optional[Predicate]
+    expires_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class PermissionSnapshot:
+    """A user's effective permissions at one permission version"""
+    user_id: int
+    version: int
+    active: bool
+    granted: FrozenSet[str]
+    conditional: Mapping[str, Tuple[Predicate, ...]]
+    overrides: Mapping[str, Tuple[Override, ...]]
+    built_at: float = field(default_factory=time.monotonic)
+
+    def allows(self, permission_name: str, context: Optional[Dict[str, Any]] = None,
+               now: Optional[datetime] = None) -> bool:
+        """Direct overrides (by code) win over role permissions (by name)"""
+        if not self.active:
+            return False
+
+        overrides = self.overrides.get(permission_name)
+        if overrides:
+            now = now or datetime.utcnow()
+            for override in overrides:
+                if override.expires_at is None or override.expires_at > now:
+                    if override.predicate:
+                        return override.predicate(context)
+                    return bool(override.is_granted)
+
+        if permission_name in self.granted:
+            return True
+        predicates = self.conditional.get(permission_name)
+        return any(predicate(context) for predicate in predicates) if predicates else False
+
+    @classmethod
+    def compile(cls, user_id: int, version: int, raw: Dict[str, Any]) -> "PermissionSnapshot":
+        """Build a snapshot from its raw (JSON-serializable) form"""
+        granted = set()
+        conditional: Dict[str, List[Predicate]] = {}
+        for name, conditions in raw["role"]:
+            if conditions:
+                conditional.setdefault(name, []).append(compile_conditions(conditions))
+            else:
+                granted.add(name)
+
+        overrides: Dict[str, List[Override]] = {}
+        for code, is_granted, conditions, expires_at in raw["overrides"]:
+            overrides.setdefault(code, []).append(Override(
+                is_granted,
+                compile_conditions(conditions) if conditions else None,
+                datetime.fromisoformat(expires_at) if expires_at else None
+            ))
+
+        # One unconditional grant of a name outweighs conditional ones
+        return cls(
+            user_id=user_id,
+            version=version,
+            active=raw["active"],
+            granted=frozenset(granted),
+            conditional={name: tuple(predicates) for name, predicates in conditional.items() if name not in granted},
+            overrides={code: tuple(items) for code, items in overrides.items()},
+        )
+
+
+def load_raw_snapshot(db: Session, user_id: int) -> Dict[str, Any]:
+    """Read a user's role permissions and live overrides (two queries)"""
+    rows = db.execute(
+        select(User.is_active, Permission.name, RolePermission.conditions)
+        .select_from(User)
+        .outerjoin(RolePermission, RolePermission.role_id == User.role_id)
+        .outerjoin(Permission, and_(Permission.id == RolePermission.permission_id, Permission.is_active == True))
+        .where(User.id == user_id)
+    ).all()
+    if not rows or not rows[0].is_active:
+        return {"active": False, "role": [], "overrides": []}
+
+    now = datetime.utcnow()
+    overrides = db.execute(
+        select(Permission.code, UserPermission.is_granted, UserPermission.conditions, UserPermission.expires_at)
+        .join(Permission, Permission.id == UserPermission.permission_id)
+        .where(
+            UserPermission.user_id == user_id,
+            Permission.is_active == True,
+            or_(UserPermission.expires_at.is_(None), UserPermission.expires_at > now)
+        )
+        .order_by(UserPermission.granted_at.desc(), UserPermission.id.desc())
+    ).all()
+
+    return {
+        "active": True,
+        "role": [[row.name, row.conditions] for row in rows if row.name is not None],
+        "overrides": [
+            [row.code, row.is_granted, row.conditions, row.expires_at.isoformat() if row.expires_at else None]
+            for row in overrides
+        ],
+    }
+
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+class PermissionSnapshotCache(VersionedCache):
+    """
+    Process-wide snapshot cache shared across workers through Redis
+
+    Without Redis the version is process-local, so snapshots are also
+    rebuilt once older than permission_version_poll_seconds to pick up
+    changes committed by other workers.
+    """
+
+    VERSION_KEY = "permissions:version"
+    SNAPSHOT_KEY = "permissions:snapshot:{version}:{user_id}"
+
+    _snapshots: Dict[int, PermissionSnapshot] = {}
+
+    @classmethod
+    def _clear(cls) -> None:
+        cls._snapshots = {}
+
+    @classmethod
+    def get(cls, db: Session, user_id: int) -> PermissionSnapshot:
+        """The user's snapshot at the current version; reads the database only on a miss"""
+        version = cls.current_version()
+        snapshot = cls._snapshots.get(user_id)
+        if snapshot is not None and snapshot.version == version and cls.is_fresh(snapshot.built_at):
+            return snapshot
+
+        client = cls._client()
+        key = cls.SNAPSHOT_KEY.format(version=version, user_id=user_id)
+        raw = None
+        if client is not None:
+            try:
+                cached = client.get(key)
+                raw = json.loads(cached) if cached else None
+            except Exception as e:
+                logger.warning(f"Could not read permission snapshot: {e}")
+
+        if raw is None:
+            raw = load_raw_snapshot(db, user_id)
+            if client is not None:
+                try:
+                    client.setex(key, settings.permission_snapshot_ttl_seconds, json.dumps(raw))
+                except Exception as e:
+                    logger.warning(f"Could not store permission snapshot: {e}")
+
+        snapshot = PermissionSnapshot.compile(user_id, version, raw)
+        cls._snapshots[user_id] = snapshot
+        return snapshot
+
+
+# ============================================================================
+# Invalidation hooks
+# ============================================================================
+
+PERMISSION_MODELS = (Role, Permission, RolePermission, UserPermission)
+USER_PERMISSION_FIELDS = ("role_id", "is_active")
+CHANGED_FLAG = "permissions_changed"
+
+
+def _changes_permissions(instance: Any, dirty: bool) -> bool:
+    if isinstance(instance, PERMISSION_MODELS):
+        return True
+    if isinstance(instance, User):
+        if not dirty:
+            return True
+        state = inspect(instance)
+        return any(state.attrs[name].history.has_changes() for name in USER_PERMISSION_FIELDS)
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _track_permission_changes(session, flush_context):
+    if any(_changes_permissions(instance, False) for instance in (*session.new, *session.deleted)) or \
+            any(_changes_permissions(instance, True) for instance in session.dirty):
+        session.info[CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_permission_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and (issubclass(mapper.class_, PERMISSION_MODELS) or mapper.class_ is User):
+            orm_execute_state.session.info[CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    if session.info.pop(CHANGED_FLAG, False):
+        PermissionSnapshotCache.bump_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop(CHANGED_FLAG, None)
@@ -1,14 +1,18 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, or_, func, desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional, Dict
 from decimal import Decimal
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from app.models.pos import (
     POSTerminal, POSSession, POSTransaction, POSTransactionItem, POSPayment,
-    POSDiscount, POSPromotion, POSSessionStatusEnum, POSTransactionTypeEnum
+    POSDiscount, POSPromotion, POSDailySales, POSSessionStatusEnum, POSTransactionTypeEnum,
+    PaymentMethodEnum
 )
 from app.models.product import Product
 from app.models.inventory import InventoryItem
+from app.services.inventory_service import InventoryService
+from app.services.document_sequence_service import DocumentSequenceService
 from app.schemas.pos import (
     POSTerminalCreate, POSTerminalUpdate,
     POSSessionCreate, POSSessionUpdate,
@@ -198,10 +202,12 @@ class POSTransactionService:
             )
         
         # إنشاء رقم المعاملة
-        transaction_count = db.query(POSTransaction).filter(
-            POSTransaction.session_id == transaction.session_id
-        ).count()
-        transaction_number = f"TXN-{session.session_number}-{transaction_count + 1:06d}"
+        sequence = DocumentSequenceService(db).next_value(
+            "pos_transaction",
+            branch_id=session.terminal.branch_id,
+            period=session.session_number
+        )
+        transaction_number = f"TXN-{session.session_number}-{sequence:06d}"
         
         # حساب الإجماليات
         subtotal = sum(item.line_total for item in transaction.items)
@@ -219,7 +225,7 @@ class POSTransactionService:
         
         # إنشاء المعاملة
         db_transaction = POSTransaction(
-            **transaction.dict(exclude={'items', 'payments'}),
+            **transaction.dict(exclude={'items', 'payments', 'subtotal', 'total_amount', 'amount_paid', 'change_amount'}),
             transaction_number=transaction_number,
             subtotal=subtotal,
             total_amount=total_amount,
@@ -229,28 +235,24 @@ class POSTransactionService:
         db.add(db_transaction)
         db.flush()  # للحصول على ID المعاملة
         
+        # قفل المخزون والتحقق من السلة كاملة ثم تسجيل الحركات دفعة واحدة
+        InventoryService.post_stock_movements(
+            db, session.terminal.warehouse_id,
+            [(item_data.product_id, -item_data.quantity) for item_data in transaction.items],
+            reference_type="POS",
+            reference_id=db_transaction.id,
+            created_by=transaction.cashier_id,
+            notes=f"POS Transaction: {transaction_number}"
+        )
+        
         # إنشاء عناصر المعاملة
-        for item_data in transaction.items:
-            # التحقق من توفر المنتج في المخزون
-            if not POSTransactionService._check_stock_availability(
-                db, item_data.product_id, session.terminal.warehouse_id, item_data.quantity
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock for product {item_data.product_id}"
-                )
-            
-            db_item = POSTransactionItem(
+        db.add_all([
+            POSTransactionItem(
                 **item_data.dict(),
                 transaction_id=db_transaction.id
             )
-            db.add(db_item)
-            
-            # تحديث المخزون
-            POSTransactionService._update_inventory(
-                db, item_data.product_id, session.terminal.warehouse_id, 
-                -item_data.quantity, transaction_number
-            )
+            for item_data in transaction.items
+        ])
         
         # إنشاء المدفوعات
         for payment_data in transaction.payments:
@@ -260,6 +262,9 @@ class POSTransactionService:
             )
             db.add(db_payment)
         
+        # معاملة بتاريخ يوم مغلق تعيد احتساب ملخصه اليومي
+        POSReportService.refresh_days(db, [db_transaction.transaction_date.date()])
+        
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
@@ -281,118 +286,255 @@ class POSTransactionService:
             )
         
         # إعادة المخزون
-        for item in transaction.pos_transaction_items:
-            POSTransactionService._update_inventory(
-                db, item.product_id, transaction.terminal.warehouse_id,
-                item.quantity, f"VOID-{transaction.transaction_number}"
-            )
+        InventoryService.post_stock_movements(
+            db, transaction.terminal.warehouse_id,
+            [(item.product_id, item.quantity) for item in transaction.pos_transaction_items],
+            reference_type="POS",
+            reference_id=transaction.id,
+            created_by=user_id,
+            notes=f"POS Transaction: VOID-{transaction.transaction_number}"
+        )
         
         # تحديث المعاملة
         transaction.transaction_type = POSTransactionTypeEnum.VOID
         transaction.void_reason = void_reason
         transaction.voided_at = datetime.utcnow()
         transaction.voided_by = user_id
+        POSReportService.refresh_days(db, [transaction.transaction_date.date()])
         
         db.commit()
         db.refresh(transaction)
         return transaction
 
-    @staticmethod
-    def _check_stock_availability(db: Session, product_id: int, warehouse_id: int, 
-                                 required_quantity: Decimal) -> bool:
-        """التحقق من توفر المخزون"""
-        inventory_item = db.query(InventoryItem).filter(
-            and_(
-                InventoryItem.product_id == product_id,
-                InventoryItem.warehouse_id == warehouse_id
-            )
-        ).first()
-        
-        if not inventory_item:
-            return False
-        
-        available_quantity = inventory_item.quantity_on_hand - inventory_item.quantity_reserved
-        return available_quantity >= required_quantity
-
-    @staticmethod
-    def _update_inventory(db: Session, product_id: int, warehouse_id: int, 
-                         quantity_change: Decimal, reference: str):
-        """تحديث المخزون"""
-        from app.services.inventory_service import InventoryService
-        from app.schemas.inventory import StockMovementCreate
-        
-        inventory_item = InventoryService.get_or_create_inventory_item(
-            db, product_id, warehouse_id
-        )
-        
-        movement_type = "OUT" if quantity_change < 0 else "IN"
-        stock_movement = StockMovementCreate(
-            inventory_item_id=inventory_item.id,
-            movement_type=movement_type,
-            reference_type="POS",
-            quantity=abs(quantity_change),
-            notes=f"POS Transaction: {reference}"
-        )
-        
-        InventoryService.record_stock_movement(db, stock_movement)
-
 
 class POSReportService:
     """خدمة تقارير نقاط البيع"""
 
+    METRIC_COLUMNS = (
+        "sale_count", "refund_count", "total_sales", "total_refunds", "total_discounts", "total_tax",
+    )
+    PAYMENT_COLUMNS = {
+        PaymentMethodEnum.CASH: "cash_amount",
+        PaymentMethodEnum.CARD: "card_amount",
+        PaymentMethodEnum.MOBILE: "mobile_amount",
+        PaymentMethodEnum.CREDIT: "credit_amount",
+        PaymentMethodEnum.VOUCHER: "voucher_amount",
+    }
+
     @staticmethod
     def get_sales_report(db: Session, from_date: datetime, to_date: datetime,
-                        terminal_id: Optional[int] = None) -> POSSalesReport:
-        """تقرير مبيعات نقاط البيع"""
-        query = db.query(POSTransaction).filter(
-            and_(
-                POSTransaction.transaction_date >= from_date,
-                POSTransaction.transaction_date <= to_date,
-                POSTransaction.transaction_type == POSTransactionTypeEnum.SALE
-            )
-        )
-        
+                        terminal_id: Optional[int] = None,
+                        cashier_id: Optional[int] = None) -> POSSalesReport:
+        """
+        تقرير مبيعات نقاط البيع
+
+        الأيام المغلقة بالكامل داخل الفترة تُقرأ من pos_daily_sales، وما تبقى
+        (أطراف الفترة واليوم الحالي) يُجمع مباشرة في SQL.
+        """
+        ts = POSTransaction.transaction_date
+        first_full = from_date.date() if from_date.time() == time.min else from_date.date() + timedelta(days=1)
+        last_full = to_date.date() if to_date.time() == time.max else to_date.date() - timedelta(days=1)
+        last_closed = min(last_full, datetime.utcnow().date() - timedelta(days=1))
+
+        filters = []
         if terminal_id:
-            query = query.filter(POSTransaction.terminal_id == terminal_id)
-        
-        transactions = query.all()
-        
-        # حساب الإجماليات
-        total_transactions = len(transactions)
-        total_sales = sum(t.total_amount for t in transactions)
-        total_refunds = sum(t.total_amount for t in transactions 
-                           if t.transaction_type == POSTransactionTypeEnum.REFUND)
-        total_discounts = sum(t.discount_amount for t in transactions)
-        total_tax = sum(t.tax_amount for t in transactions)
-        net_sales = total_sales - total_refunds
-        
-        # تجميع المدفوعات حسب الطريقة
-        payment_methods = {}
-        for transaction in transactions:
-            for payment in transaction.pos_payments:
-                method = payment.payment_method.value
-                if method not in payment_methods:
-                    payment_methods[method] = Decimal(0)
-                payment_methods[method] += payment.amount
-        
-        payment_breakdown = [
-            {"method": method, "amount": amount}
-            for method, amount in payment_methods.items()
-        ]
-        
+            filters.append(POSTransaction.terminal_id == terminal_id)
+        if cashier_id:
+            filters.append(POSTransaction.cashier_id == cashier_id)
+
+        if first_full <= last_closed:
+            POSReportService.ensure_rollup(db, first_full, last_closed)
+            rows = POSReportService._load_rollup(db, first_full, last_closed, terminal_id, cashier_id)
+            rows.update(POSReportService._aggregate(db, filters + [or_(
+                and_(ts >= from_date, ts < datetime.combine(first_full, time.min)),
+                and_(ts > datetime.combine(last_closed, time.max), ts <= to_date)
+            )]))
+        else:
+            rows = POSReportService._aggregate(db, filters + [ts >= from_date, ts <= to_date])
+
+        totals = POSReportService._sum_rows(rows.values())
         return POSSalesReport(
             from_date=from_date,
             to_date=to_date,
             terminal_id=terminal_id,
-            total_transactions=total_transactions,
-            total_sales=total_sales,
-            total_refunds=total_refunds,
-            total_discounts=total_discounts,
-            total_tax=total_tax,
-            net_sales=net_sales,
-            payment_methods=payment_breakdown
+            total_transactions=totals["transactions"],
+            total_sales=totals["total_sales"],
+            total_refunds=totals["total_refunds"],
+            total_discounts=totals["total_discounts"],
+            total_tax=totals["total_tax"],
+            net_sales=totals["net_sales"],
+            payment_methods=[
+                {"method": method.value, "amount": totals[column]}
+                for method, column in POSReportService.PAYMENT_COLUMNS.items()
+                if totals[column]
+            ],
+            daily=POSReportService._breakdown(rows, 0, "date"),
+            cashiers=POSReportService._breakdown(rows, 2, "cashier_id"),
+            terminals=POSReportService._breakdown(rows, 1, "terminal_id")
         )
 
+    @staticmethod
+    def ensure_rollup(db: Session, from_day: date, to_day: date):
+        """تعبئة أيام الملخص اليومي الناقصة (أيام مغلقة فقط)"""
+        existing = {
+            POSReportService._as_date(day)
+            for (day,) in db.query(POSDailySales.summary_date).filter(
+                POSDailySales.summary_date.between(from_day, to_day)
+            ).distinct()
+        }
+        missing = [
+            from_day + timedelta(days=offset)
+            for offset in range((to_day - from_day).days + 1)
+            if from_day + timedelta(days=offset) not in existing
+        ]
+        if missing and POSReportService._store_days(db, missing):
+            db.commit()
+
+    @staticmethod
+    def refresh_days(db: Session, days: List[date]):
+        """إعادة احتساب أيام مغلقة بعد تعديل معاملاتها (إلغاء أو تاريخ سابق) - بدون commit"""
+        closed = sorted({day for day in days if day < datetime.utcnow().date()})
+        if not closed:
+            return
+        db.flush()
+        db.query(POSDailySales).filter(
+            POSDailySales.summary_date.in_(closed)
+        ).delete(synchronize_session=False)
+        POSReportService._store_days(db, closed)
+
+    @staticmethod
+    def _store_days(db: Session, days: List[date]) -> int:
+        """احتساب أيام كاملة من المعاملات وحفظها في الملخص اليومي"""
+        ts = POSTransaction.transaction_date
+        # Consecutive days become one range so empty days cost one index probe
+        ranges, start = [], days[0]
+        for previous, day in zip(days, days[1:] + [None]):
+            if day != previous + timedelta(days=1):
+                ranges.append(and_(
+                    ts >= datetime.combine(start, time.min),
+                    ts < datetime.combine(previous + timedelta(days=1), time.min)
+                ))
+                start = day
+
+        rows = [
+            {"summary_date": day, "terminal_id": terminal, "cashier_id": cashier,
+             **values, "calculated_at": datetime.utcnow()}
+            for (day, terminal, cashier), values in POSReportService._aggregate(db, [or_(*ranges)]).items()
+        ]
+        if not rows:
+            return 0
+
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(pg_insert(POSDailySales).on_conflict_do_nothing(
+                index_elements=["summary_date", "terminal_id", "cashier_id"]
+            ), rows)
+        else:
+            db.add_all([POSDailySales(**row) for row in rows])
+            db.flush()
+        return len(rows)
+
+    @staticmethod
+    def _aggregate(db: Session, filters: list) -> Dict[tuple, Dict]:
+        """تجميع المبيعات والمرتجعات والمدفوعات حسب اليوم والجهاز والكاشير"""
+        day = func.date(POSTransaction.transaction_date)
+        is_sale = POSTransaction.transaction_type == POSTransactionTypeEnum.SALE
+        is_refund = POSTransaction.transaction_type == POSTransactionTypeEnum.REFUND
+        scope = and_(
+            POSTransaction.transaction_type.in_([POSTransactionTypeEnum.SALE, POSTransactionTypeEnum.REFUND]),
+            *filters
+        )
+        group = (day, POSTransaction.terminal_id, POSTransaction.cashier_id)
+
+        totals = db.query(
+            *group,
+            func.count(POSTransaction.id).filter(is_sale),
+            func.count(POSTransaction.id).filter(is_refund),
+            func.sum(POSTransaction.total_amount).filter(is_sale),
+            func.sum(POSTransaction.total_amount).filter(is_refund),
+            func.sum(POSTransaction.discount_amount).filter(is_sale),
+            func.sum(POSTransaction.tax_amount).filter(is_sale)
+        ).filter(scope).group_by(*group).all()
+
+        payments = db.query(
+            *group,
+            POSPayment.payment_method,
+            func.sum(POSPayment.amount).filter(is_sale),
+            func.sum(POSPayment.amount).filter(is_refund)
+        ).join(POSTransaction, POSPayment.transaction_id == POSTransaction.id).filter(
+            scope
+        ).group_by(*group, POSPayment.payment_method).all()
+
+        rows = {}
+        for row in totals:
+            key = (POSReportService._as_date(row[0]), row[1], row[2])
+            rows[key] = POSReportService._empty_row()
+            for column, value in zip(POSReportService.METRIC_COLUMNS, row[3:]):
+                rows[key][column] = (value or 0) if column.endswith("_count") else Decimal(value or 0)
+
+        for day_value, terminal, cashier, method, paid, refunded in payments:
+            key = (POSReportService._as_date(day_value), terminal, cashier)
+            column = POSReportService.PAYMENT_COLUMNS[PaymentMethodEnum(method)]
+            rows[key][column] += Decimal(paid or 0) - Decimal(refunded or 0)
+
+        return rows
+
+    @staticmethod
+    def _load_rollup(db: Session, from_day: date, to_day: date,
+                     terminal_id: Optional[int], cashier_id: Optional[int]) -> Dict[tuple, Dict]:
+        query = db.query(POSDailySales).filter(POSDailySales.summary_date.between(from_day, to_day))
+        if terminal_id:
+            query = query.filter(POSDailySales.terminal_id == terminal_id)
+        if cashier_id:
+            query = query.filter(POSDailySales.cashier_id == cashier_id)
+
+        columns = POSReportService.METRIC_COLUMNS + tuple(POSReportService.PAYMENT_COLUMNS.values())
+        return {
+            (POSReportService._as_date(summary.summary_date), summary.terminal_id, summary.cashier_id): {
+                column: getattr(summary, column) if column.endswith("_count") else Decimal(getattr(summary, column))
+                for column in columns
+            }
+            for summary in query
+        }
+
+    @staticmethod
+    def _empty_row() -> Dict:
+        row = {column: 0 if column.endswith("_count") else Decimal(0) for column in POSReportService.METRIC_COLUMNS}
+        row.update({column: Decimal(0) for column in POSReportService.PAYMENT_COLUMNS.values()})
+        return row
+
+    @staticmethod
+    def _sum_rows(rows) -> Dict:
+        totals = POSReportService._empty_row()
+        for row in rows:
+            for column, value in row.items():
+                totals[column] += value
+        totals["transactions"] = totals["sale_count"] + totals["refund_count"]
+        totals["net_sales"] = totals["total_sales"] - totals["total_refunds"]
+        return totals
+
+    @staticmethod
+    def _breakdown(rows: Dict[tuple, Dict], key_index: int, label: str) -> List[dict]:
+        groups: Dict = {}
+        for key, row in rows.items():
+            groups.setdefault(key[key_index], []).append(row)
+
+        breakdown = []
+        for group_key in sorted(groups):
+            totals = POSReportService._sum_rows(groups[group_key])
+            breakdown.append({
+                label: group_key.isoformat() if isinstance(group_key, date) else group_key,
+                "transactions": totals["transactions"],
+                "sales": totals["total_sales"],
+                "refunds": totals["total_refunds"],
+                "net_sales": totals["net_sales"],
+            })
+        return breakdown
+
+    @staticmethod
+    def _as_date(value) -> date:
+        """func.date() returns a string on SQLite"""
+        return date.fromisoformat(value) if isinstance(value, str) else value
+
     @staticmethod
     def get_session_report(db: Session, session_id: int) -> POSSessionReport:
         """تقرير جلسة نقاط البيع"""
@@ -658,30 +800,12 @@ class POSService:
     
     # Reports
     def generate_sales_report(self, date_from: date, date_to: date, terminal_id: int = None, cashier_id: int = None):
-        query = self.db.query(POSTransaction).filter(
-            POSTransaction.transaction_time >= date_from,
-            POSTransaction.transaction_time <= date_to,
-            POSTransaction.status == "COMPLETED"
-        )
-        
-        if terminal_id:
-            query = query.join(POSSession).filter(POSSession.terminal_id == terminal_id)
-        if cashier_id:
-            query = query.join(POSSession).filter(POSSession.cashier_id == cashier_id)
-        
-        transactions = query.all()
-        
-        total_sales = sum(t.total_amount for t in transactions)
-        total_transactions = len(transactions)
-        average_sale = total_sales / total_transactions if total_transactions > 0 else 0
-        
-        return POSSalesReport(
-            period_start=date_from,
-            period_end=date_to,
-            total_sales=total_sales,
-            total_transactions=total_transactions,
-            average_sale_amount=average_sale,
-            transactions=transactions
+        return self.report_service.get_sales_report(
+            self.db,
+            datetime.combine(date_from, time.min),
+            datetime.combine(date_to, time.max),
+            terminal_id,
+            cashier_id
         )
     
     def generate_session_reports(self, date_from: date, date_to: date, terminal_id: int = None):
@@ -0,0 +1,279 @@
+"""
+Security Decision Cache - Compiled security policies and user profiles
+
+Loads the advanced security tables into a CompiledSecurityPolicies (once per
+security policy version) and each user's UserSecurityProfile (once per user
+and version). Any committed change to those tables, to a user's role/active
+flag, MFA enrolment or device trust bumps the version through the ORM session
+hooks below, shared across workers through Redis.
+
+The role hierarchy is kept as a closure table (security_role_closure),
+rewritten in the same flush whenever a role is added, removed or re-parented.
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.advanced_security import (
+    AdvancedPermission, FieldLevelSecurityRule, MFAMethod, PolicyPermissionMapping,
+    RestrictionGroup, Role, RolePermissionMapping, RoleRestrictionGroup,
+    RowLevelSecurityRule, SecurityPolicy, SecurityRoleClosure, UserDevice,
+    UserPermissionOverride, UserRestrictionGroup
+)
+from app.models.user import User
+from app.services.security_policy_compiler import (
+    CompiledSecurityPolicies, FlsRuleRow, OverrideRow, PolicyRow, RestrictionRow,
+    RlsRuleRow, RolePermissionRow, UserSecurityProfile, compute_role_closure
+)
+from app.services.versioned_cache import VersionedCache
+
+
+# ============================================================================
+# Loading
+# ============================================================================
+
+def rebuild_role_closure(connection) -> int:
+    """Rewrite security_role_closure from security_roles.parent_role_id"""
+    parents = dict(connection.execute(select(Role.id, Role.parent_role_id)).all())
+    rows = compute_role_closure(parents)
+    connection.execute(delete(SecurityRoleClosure))
+    if rows:
+        connection.execute(insert(SecurityRoleClosure), [
+            {"ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": depth}
+            for ancestor_id, descendant_id, depth in rows
+        ])
+    return len(rows)
+
+
+def load_security_policies(db: Session, version: int) -> CompiledSecurityPolicies:
+    """Read every active policy, mapping, restriction group and RLS/FLS rule (six queries)"""
+    policies = db.execute(
+        select(SecurityPolicy.name, SecurityPolicy.effect, SecurityPolicy.applies_to_resources,
+               SecurityPolicy.applies_to_actions, SecurityPolicy.applies_to_subjects, SecurityPolicy.conditions)
+        .where(SecurityPolicy.is_active == True)
+        .order_by(SecurityPolicy.priority.desc(), SecurityPolicy.id)
+    ).all()
+
+    closure = db.execute(
+        select(SecurityRoleClosure.ancestor_id, SecurityRoleClosure.descendant_id, SecurityRoleClosure.depth)
+    ).all()
+
+    role_permissions = db.execute(
+        select(RolePermissionMapping.role_id, AdvancedPermission.name, AdvancedPermission.resource_type,
+               AdvancedPermission.action, RolePermissionMapping.conditions, RolePermissionMapping.constraints,
+               RolePermissionMapping.expires_at)
+        .join(AdvancedPermission, AdvancedPermission.id == RolePermissionMapping.permission_id)
+        .where(AdvancedPermission.is_active == True)
+        .order_by(RolePermissionMapping.id)
+    ).all()
+
+    role_restrictions = db.execute(
+        select(RoleRestrictionGroup.role_id, RestrictionGroup.name, RestrictionGroup.restrictions)
+        .join(RestrictionGroup, RestrictionGroup.id == RoleRestrictionGroup.restriction_group_id)
+        .where(RestrictionGroup.is_active == True)
+        .order_by(RoleRestrictionGroup.id)
+    ).all()
+
+    rls_rules = db.execute(
+        select(RowLevelSecurityRule.table_name, RowLevelSecurityRule.rule_expression,
+               RowLevelSecurityRule.applies_to_actions, RowLevelSecurityRule.applies_to_roles,
+               RowLevelSecurityRule.applies_to_users)
+        .where(RowLevelSecurityRule.is_active == True)
+        .order_by(RowLevelSecurityRule.id)
+    ).all()
+
+    fls_rules = db.execute(
+        select(FieldLevelSecurityRule.table_name, FieldLevelSecurityRule.column_name,
+               FieldLevelSecurityRule.is_visible, FieldLevelSecurityRule.is_readable,
+               FieldLevelSecurityRule.masking_pattern, FieldLevelSecurityRule.applies_to_roles,
+               FieldLevelSecurityRule.applies_to_users, FieldLevelSecurityRule.conditions)
+        .where(FieldLevelSecurityRule.is_active == True)
+        .order_by(FieldLevelSecurityRule.id)
+    ).all()
+
+    return CompiledSecurityPolicies(
+        version,
+        policies=[PolicyRow(*row) for row in policies],
+        closure=[tuple(row) for row in closure],
+        role_permissions=[RolePermissionRow(*row) for row in role_permissions],
+        role_restrictions=[RestrictionRow(*row) for row in role_restrictions],
+        rls_rules=[RlsRuleRow(*row) for row in rls_rules],
+        fls_rules=[FlsRuleRow(*row) for row in fls_rules],
+    )
+
+
+def load_user_profile(db: Session, user_id: int, version: int) -> UserSecurityProfile:
+    """Read a user's overrides, restriction groups, trusted devices and MFA enrolment"""
+    user = db.execute(select(User.is_active, User.role_id).where(User.id == user_id)).first()
+    if user is None or not user.is_active:
+        return UserSecurityProfile.compile(user_id, version, exists=user is not None, active=False, role_id=None)
+
+    now = datetime.utcnow()
+    overrides = db.execute(
+        select(AdvancedPermission.resource_type, AdvancedPermission.action, UserPermissionOverride.is_granted,
+               UserPermissionOverride.conditions, UserPermissionOverride.constraints,
+               UserPermissionOverride.expires_at,
+               and_(UserPermissionOverride.requires_approval == True,
+                    UserPermissionOverride.approved_at.is_(None)))
+        .join(AdvancedPermission, AdvancedPermission.id == UserPermissionOverride.permission_id)
+        .where(
+            UserPermissionOverride.user_id == user_id,
+            AdvancedPermission.is_active == True,
+            or_(UserPermissionOverride.expires_at.is_(None), UserPermissionOverride.expires_at > now)
+        )
+        .order_by(UserPermissionOverride.granted_at.desc(), UserPermissionOverride.id.desc())
+    ).all()
+
+    restrictions = db.execute(
+        select(UserRestrictionGroup.user_id, RestrictionGroup.name, RestrictionGroup.restrictions,
+               UserRestrictionGroup.expires_at)
+        .join(RestrictionGroup, RestrictionGroup.id == UserRestrictionGroup.restriction_group_id)
+        .where(
+            UserRestrictionGroup.user_id == user_id,
+            RestrictionGroup.is_active == True,
+            or_(UserRestrictionGroup.expires_at.is_(None), UserRestrictionGroup.expires_at > now)
+        )
+        .order_by(UserRestrictionGroup.id)
+    ).all()
+
+    trusted_devices = db.execute(
+        select(UserDevice.id).where(UserDevice.user_id == user_id, UserDevice.is_trusted == True)
+    ).scalars().all()
+
+    has_mfa = db.execute(
+        select(MFAMethod.id).where(MFAMethod.user_id == user_id, MFAMethod.is_enabled == True).limit(1)
+    ).first() is not None
+
+    return UserSecurityProfile.compile(
+        user_id, version, exists=True, active=True, role_id=user.role_id,
+        overrides=[OverrideRow(*row) for row in overrides],
+        restrictions=[RestrictionRow(*row) for row in restrictions],
+        trusted_devices=trusted_devices,
+        has_mfa=has_mfa,
+    )
+
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+class SecurityDecisionCache(VersionedCache):
+    """Compiled policies and user profiles for the current security policy version"""
+
+    VERSION_KEY = "security:policy_version"
+
+    _policies: Optional[CompiledSecurityPolicies] = None
+    _profiles: Dict[int, UserSecurityProfile] = {}
+    _compile_lock = threading.Lock()
+
+    @classmethod
+    def _clear(cls) -> None:
+        cls._policies = None
+        cls._profiles = {}
+
+    @classmethod
+    def policies(cls, db: Session) -> CompiledSecurityPolicies:
+        """The compiled static rules; one worker thread compiles, the others wait"""
+        version = cls.current_version()
+        policies = cls._policies
+        if policies is not None and policies.version == version and cls.is_fresh(policies.built_at):
+            return policies
+
+        with cls._compile_lock:
+            policies = cls._policies
+            if policies is None or policies.version != version or not cls.is_fresh(policies.built_at):
+                policies = load_security_policies(db, version)
+                cls._policies = policies
+        return policies
+
+    @classmethod
+    def profile(cls, db: Session, user_id: int) -> UserSecurityProfile:
+        """The user's profile at the current version; reads the database only on a miss"""
+        version = cls.current_version()
+        profile = cls._profiles.get(user_id)
+        if profile is not None and profile.version == version and cls.is_fresh(profile.built_at):
+            return profile
+
+        profile = load_user_profile(db, user_id, version)
+        cls._profiles[user_id] = profile
+        return profile
+
+
+# ============================================================================
+# Invalidation hooks
+# ============================================================================
+
+SECURITY_MODELS = (
+    AdvancedPermission, Role, RolePermissionMapping, UserPermissionOverride, SecurityPolicy,
+    PolicyPermissionMapping, RowLevelSecurityRule, FieldLevelSecurityRule, RestrictionGroup,
+    RoleRestrictionGroup, UserRestrictionGroup
+)
+USER_FIELDS = ("role_id", "is_active")
+DEVICE_FIELDS = ("is_trusted", "user_id")
+# Every MFA check writes last_used / use_count; only these change a profile
+MFA_FIELDS = ("is_enabled", "user_id")
+CHANGED_FLAG = "security_policies_changed"
+
+
+def _has_changes(instance: Any, names) -> bool:
+    state = inspect(instance)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _changes_policies(instance: Any, dirty: bool) -> bool:
+    if isinstance(instance, SECURITY_MODELS):
+        return True
+    if isinstance(instance, User):
+        return not dirty or _has_changes(instance, USER_FIELDS)
+    if isinstance(instance, UserDevice):
+        # Newly registered devices are untrusted until approved
+        return _has_changes(instance, DEVICE_FIELDS) if dirty else bool(instance.is_trusted)
+    if isinstance(instance, MFAMethod):
+        return _has_changes(instance, MFA_FIELDS) if dirty else instance.is_enabled is not False
+    return False
+
+
+def _changes_hierarchy(instance: Any, dirty: bool) -> bool:
+    return isinstance(instance, Role) and (not dirty or _has_changes(instance, ("parent_role_id",)))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_policy_changes(session, flush_context):
+    created_or_deleted = (*session.new, *session.deleted)
+    if any(_changes_hierarchy(instance, False) for instance in created_or_deleted) or \
+            any(_changes_hierarchy(instance, True) for instance in session.dirty):
+        rebuild_role_closure(session.connection())
+        session.info[CHANGED_FLAG] = True
+    elif any(_changes_policies(instance, False) for instance in created_or_deleted) or \
+            any(_changes_policies(instance, True) for instance in session.dirty):
+        session.info[CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_policy_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None:
+            return None
+        if issubclass(mapper.class_, SECURITY_MODELS) or mapper.class_ in (User, UserDevice, MFAMethod):
+            orm_execute_state.session.info[CHANGED_FLAG] = True
+        if mapper.class_ is Role:
+            result = orm_execute_state.invoke_statement()
+            rebuild_role_closure(orm_execute_state.session.connection())
+            return result
+    return None
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    if session.info.pop(CHANGED_FLAG, False):
+        SecurityDecisionCache.bump_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop(CHANGED_FLAG, None)
@@ -0,0 +1,662 @@
+"""
+Security Policy Compiler - Precompiled access decisions for AdvancedSecurityService
+
+check_access used to query the user, every active policy, the role chain (one
+query per ancestor), permission mappings, overrides and restriction groups on
+every call, and RLS/FLS re-parsed rule expressions and masking patterns per
+row. Decisions are now split in two:
+- Static part, compiled once per security policy version: policies indexed
+  by (resource_type, action) in priority order, role ancestors from the
+  security_role_closure table, role permission mappings, restriction groups,
+  RLS clauses with bound parameters and FLS masks per table
+- Dynamic part, evaluated per check: clock, location, IP address and risk
+  of the AccessContext, against prebuilt hour/country sets and parsed
+  networks
+
+Per-user data (active flag, role, overrides, restriction groups, trusted
+devices, MFA enrolment) is compiled into a UserSecurityProfile. Rules are
+passed in as plain rows (the *Row tuples) and SecurityDecisionCache in
+security_decision_cache.py loads and caches them.
+"""
+
+import enum
+import ipaddress
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import (
+    Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+)
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+
+@dataclass
+class AccessContext:
+    """Context for access control decisions"""
+    user_id: int
+    resource_type: str
+    resource_id: Optional[str] = None
+    action: str = "read"
+    ip_address: Optional[str] = None
+    location: Optional[Dict] = None
+    device_id: Optional[str] = None
+    session_id: Optional[str] = None
+    user_agent: Optional[str] = None
+    branch_id: Optional[int] = None
+    tenant_id: Optional[int] = None
+    timestamp: datetime = None
+
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = datetime.utcnow()
+
+
+@dataclass
+class AccessDecision:
+    """Result of access control evaluation"""
+    granted: bool
+    reason: str
+    conditions: Optional[Dict] = None
+    requires_mfa: bool = False
+    risk_score: float = 0.0
+    applicable_policies: List[str] = None
+
+    def __post_init__(self):
+        if self.applicable_policies is None:
+            self.applicable_policies = []
+
+
+ContextPredicate = Callable[[AccessContext], bool]
+
+HIGH_RISK_ACTIONS = frozenset({"delete", "export", "approve", "manage"})
+SENSITIVE_RESOURCES = frozenset({"financial", "hr", "system"})
+RESTRICTED_PLACEHOLDER = "[RESTRICTED]"
+MAX_INDEXED_KEYS = 1024  # (resource_type, action) pairs come from requests
+
+
+# ============================================================================
+# Input rows
+# ============================================================================
+
+class PolicyRow(NamedTuple):
+    name: str
+    effect: Any
+    resources: Optional[Sequence]
+    actions: Optional[Sequence]
+    subjects: Optional[Dict]
+    conditions: Optional[Dict]
+
+
+class RolePermissionRow(NamedTuple):
+    role_id: int
+    permission_name: str
+    resource_type: Any
+    action: Any
+    conditions: Optional[Dict]
+    constraints: Optional[Dict]
+    expires_at: Optional[datetime]
+
+
+class RestrictionRow(NamedTuple):
+    owner_id: int  # role id or user id
+    name: str
+    restrictions: Optional[Dict]
+    expires_at: Optional[datetime] = None
+
+
+class OverrideRow(NamedTuple):
+    resource_type: Any
+    action: Any
+    is_granted: bool
+    conditions: Optional[Dict]
+    constraints: Optional[Dict]
+    expires_at: Optional[datetime]
+    pending_approval: bool
+
+
+class RlsRuleRow(NamedTuple):
+    table_name: str
+    rule_expression: str
+    actions: Optional[Sequence]
+    roles: Optional[Sequence]
+    users: Optional[Sequence]
+
+
+class FlsRuleRow(NamedTuple):
+    table_name: str
+    column_name: str
+    is_visible: bool
+    is_readable: bool
+    masking_pattern: Optional[str]
+    roles: Optional[Sequence]
+    users: Optional[Sequence]
+    conditions: Optional[Dict]
+
+
+def _key(value: Any) -> Any:
+    """Enum columns compare by value, as AccessContext carries them"""
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _as_set(values: Iterable) -> Any:
+    try:
+        return frozenset(values)
+    except TypeError:
+        return tuple(values)
+
+
+@lru_cache(maxsize=4096)
+def _parse_ip(address: str):
+    try:
+        return ipaddress.ip_address(address)
+    except ValueError:
+        return None
+
+
+# ============================================================================
+# Conditions, restrictions and masks
+# ============================================================================
+
+def _all(checks: List[ContextPredicate]) -> Optional[ContextPredicate]:
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda context: all(check(context) for check in checks)
+
+
+def _any(checks: List[ContextPredicate]) -> Optional[ContextPredicate]:
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda context: any(check(context) for check in checks)
+
+
+def compile_conditions(conditions: Optional[Dict]) -> Optional[ContextPredicate]:
+    """
+    Compile time/location/user conditions into a predicate (None = always true)
+
+    Within each condition type the first present key decides, as before.
+    """
+    if not conditions:
+        return None
+
+    checks: List[ContextPredicate] = []
+    for condition_type, condition in conditions.items():
+        if condition_type == "time":
+            if "allowed_hours" in condition:
+                allowed = _as_set(condition["allowed_hours"])
+                checks.append(lambda context, allowed=allowed: context.timestamp.hour in allowed)
+            elif "blocked_hours" in condition:
+                blocked = _as_set(condition["blocked_hours"])
+                checks.append(lambda context, blocked=blocked: context.timestamp.hour not in blocked)
+        elif condition_type == "location":
+            if "allowed_countries" in condition:
+                allowed = _as_set(condition["allowed_countries"])
+                checks.append(lambda context, allowed=allowed:
+                              not context.location or context.location.get("country") in allowed)
+            elif "blocked_countries" in condition:
+                blocked = _as_set(condition["blocked_countries"])
+                checks.append(lambda context, blocked=blocked:
+                              not context.location or context.location.get("country") not in blocked)
+        elif condition_type == "user":
+            if "user_ids" in condition:
+                user_ids = _as_set(condition["user_ids"])
+                checks.append(lambda context, user_ids=user_ids: context.user_id in user_ids)
+    return _all(checks)
+
+
+def compile_restrictions(restrictions: Optional[Dict]) -> Optional[ContextPredicate]:
+    """Compile a restriction group into a predicate that is true when access is restricted"""
+    restrictions = restrictions or {}
+    checks: List[ContextPredicate] = []
+
+    time_restrictions = restrictions.get("time")
+    if time_restrictions:
+        if "allowed_hours" in time_restrictions:
+            allowed = _as_set(time_restrictions["allowed_hours"])
+            checks.append(lambda context, allowed=allowed: context.timestamp.hour not in allowed)
+        if "blocked_hours" in time_restrictions:
+            blocked = _as_set(time_restrictions["blocked_hours"])
+            checks.append(lambda context, blocked=blocked: context.timestamp.hour in blocked)
+
+    location_restrictions = restrictions.get("location")
+    if location_restrictions and "allowed_countries" in location_restrictions:
+        allowed = _as_set(location_restrictions["allowed_countries"])
+        checks.append(lambda context, allowed=allowed:
+                      bool(context.location) and context.location.get("country") not in allowed)
+
+    ip_restrictions = restrictions.get("ip")
+    if ip_restrictions:
+        if "blocked_ips" in ip_restrictions:
+            blocked = _as_set(ip_restrictions["blocked_ips"])
+            checks.append(lambda context, blocked=blocked:
+                          bool(context.ip_address) and context.ip_address in blocked)
+        if "allowed_networks" in ip_restrictions:
+            networks = []
+            for network in ip_restrictions["allowed_networks"]:
+                try:
+                    networks.append(ipaddress.ip_network(network))
+                except ValueError:
+                    continue
+            networks = tuple(networks)
+
+            def outside_networks(context, networks=networks):
+                if not context.ip_address:
+                    return False
+                address = _parse_ip(context.ip_address)
+                return address is None or not any(address in network for network in networks)
+            checks.append(outside_networks)
+
+    return _any(checks)
+
+
+def compile_mask(pattern: str) -> Callable[[Any], Any]:
+    """Parse a masking pattern once: "***", "show_last_N", "show_first_N" or a literal replacement"""
+    if pattern == "***":
+        return lambda value: None if value is None else "***"
+
+    for prefix in ("show_last_", "show_first_"):
+        if pattern.startswith(prefix):
+            try:
+                count = int(pattern.split("_")[-1])
+            except ValueError as error:
+                def invalid(value, error=error):
+                    if value is None:
+                        return None
+                    raise error
+                return invalid
+            if prefix == "show_last_":
+                def show_last(value):
+                    if value is None:
+                        return None
+                    value = str(value)
+                    return "*" * (len(value) - count) + value[-count:]
+                return show_last
+
+            def show_first(value):
+                if value is None:
+                    return None
+                value = str(value)
+                return value[:count] + "*" * (len(value) - count)
+            return show_first
+
+    return lambda value: None if value is None else pattern
+
+
+RLS_PLACEHOLDERS = {
+    "{user_id}": "rls_user_id",
+    "{branch_id}": "rls_branch_id",
+    "{tenant_id}": "rls_tenant_id",
+}
+
+
+class CompiledRlsClause(NamedTuple):
+    clause: TextClause
+    parameters: Tuple[str, ...]
+
+    def bind(self, context: AccessContext) -> TextClause:
+        """Context placeholders are bound parameters, not substituted text"""
+        if not self.parameters:
+            return self.clause
+        values = {
+            "rls_user_id": context.user_id,
+            "rls_branch_id": context.branch_id or None,
+            "rls_tenant_id": context.tenant_id or None,
+        }
+        return self.clause.bindparams(**{name: values[name] for name in self.parameters})
+
+
+def compile_rls_expression(expression: str) -> CompiledRlsClause:
+    parameters = []
+    for placeholder, name in RLS_PLACEHOLDERS.items():
+        if placeholder in expression:
+            expression = expression.replace(placeholder, f":{name}")
+            parameters.append(name)
+    return CompiledRlsClause(text(expression), tuple(parameters))
+
+
+# ============================================================================
+# Role hierarchy
+# ============================================================================
+
+def compute_role_closure(parents: Mapping[int, Optional[int]]) -> List[Tuple[int, int, int]]:
+    """(ancestor_id, descendant_id, depth) rows, including each role at depth 0; stops at cycles"""
+    rows = []
+    for role_id in parents:
+        seen = {role_id}
+        rows.append((role_id, role_id, 0))
+        parent, depth = parents.get(role_id), 1
+        while parent is not None and parent not in seen:
+            rows.append((parent, role_id, depth))
+            seen.add(parent)
+            parent, depth = parents.get(parent), depth + 1
+    return rows
+
+
+# ============================================================================
+# Compiled policies
+# ============================================================================
+
+class CompiledPolicy(NamedTuple):
+    name: str
+    effect: Any
+    resources: Optional[Any]
+    actions: Optional[Any]
+    has_subjects: bool
+    subject_users: Any
+    subject_roles: Any
+    condition: Optional[ContextPredicate]
+
+    def applies_to_subject(self, profile: "UserSecurityProfile") -> bool:
+        return (not self.has_subjects or profile.user_id in self.subject_users
+                or profile.role_id in self.subject_roles)
+
+
+class CompiledGrant(NamedTuple):
+    id: int
+    permission_name: str
+    condition: Optional[ContextPredicate]
+    expires_at: Optional[datetime]
+
+
+class CompiledOverride(NamedTuple):
+    is_granted: bool
+    condition: Optional[ContextPredicate]
+    expires_at: Optional[datetime]
+
+
+class CompiledRestriction(NamedTuple):
+    name: str
+    restricts: Optional[ContextPredicate]
+    expires_at: Optional[datetime]
+
+
+class CompiledRlsRule(NamedTuple):
+    actions: Optional[Any]
+    roles: Optional[Any]
+    users: Optional[Any]
+    clause: CompiledRlsClause
+
+
+class CompiledFlsRule(NamedTuple):
+    column_name: str
+    is_visible: bool
+    is_readable: bool
+    mask: Optional[Callable[[Any], Any]]
+    roles: Optional[Any]
+    users: Optional[Any]
+    condition: Optional[ContextPredicate]
+
+
+def _optional_set(values: Optional[Sequence]) -> Optional[Any]:
+    return _as_set(values) if values else None
+
+
+def _both(first: Optional[ContextPredicate], second: Optional[ContextPredicate]) -> Optional[ContextPredicate]:
+    return _all([check for check in (first, second) if check is not None])
+
+
+def _rule_applies(rule, profile: "UserSecurityProfile") -> bool:
+    # An unknown user is not excluded by role lists, as before
+    if rule.roles is not None and profile.exists and profile.role_id not in rule.roles:
+        return False
+    if rule.users is not None and profile.user_id not in rule.users:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class UserSecurityProfile:
+    """A user's security attributes at one policy version"""
+    user_id: int
+    version: int
+    exists: bool
+    active: bool
+    role_id: Optional[int]
+    overrides: Mapping[Tuple[Any, Any], Tuple[CompiledOverride, ...]]
+    restrictions: Tuple[CompiledRestriction, ...]
+    trusted_devices: FrozenSet[str]
+    has_mfa: bool
+    built_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def compile(cls, user_id: int, version: int, exists: bool, active: bool, role_id: Optional[int],
+                overrides: Iterable[OverrideRow] = (), restrictions: Iterable[RestrictionRow] = (),
+                trusted_devices: Iterable[str] = (), has_mfa: bool = False) -> "UserSecurityProfile":
+        """Overrides are expected newest first; unapproved ones never apply and are dropped"""
+        compiled: Dict[Tuple[Any, Any], List[CompiledOverride]] = {}
+        for row in overrides:
+            if row.pending_approval:
+                continue
+            compiled.setdefault((_key(row.resource_type), _key(row.action)), []).append(CompiledOverride(
+                row.is_granted,
+                _both(compile_conditions(row.conditions), compile_conditions(row.constraints)),
+                row.expires_at
+            ))
+        return cls(
+            user_id=user_id,
+            version=version,
+            exists=exists,
+            active=exists and bool(active),
+            role_id=role_id,
+            overrides={key: tuple(items) for key, items in compiled.items()},
+            restrictions=tuple(
+                CompiledRestriction(row.name, compile_restrictions(row.restrictions), row.expires_at)
+                for row in restrictions
+            ),
+            trusted_devices=frozenset(trusted_devices),
+            has_mfa=has_mfa,
+        )
+
+
+def requires_mfa(context: AccessContext, has_mfa: bool, risk_score: float) -> bool:
+    """High risk always; otherwise only enrolled users on high-risk actions or sensitive resources"""
+    if risk_score >= 0.7:
+        return True
+    if not has_mfa:
+        return False
+    return context.action in HIGH_RISK_ACTIONS or context.resource_type in SENSITIVE_RESOURCES
+
+
+class CompiledSecurityPolicies:
+    """The static part of every access decision at one policy version"""
+
+    def __init__(self, version: int, policies: Iterable[PolicyRow] = (),
+                 closure: Iterable[Tuple[int, int, int]] = (),
+                 role_permissions: Iterable[RolePermissionRow] = (),
+                 role_restrictions: Iterable[RestrictionRow] = (),
+                 rls_rules: Iterable[RlsRuleRow] = (), fls_rules: Iterable[FlsRuleRow] = ()):
+        self.version = version
+        self.built_at = time.monotonic()
+
+        # Policies, in priority order
+        self.policies = tuple(
+            CompiledPolicy(
+                name=row.name,
+                effect=_key(row.effect),
+                resources=_optional_set(row.resources),
+                actions=_optional_set(row.actions),
+                has_subjects=bool(row.subjects),
+                subject_users=_as_set((row.subjects or {}).get("users", [])),
+                subject_roles=_as_set((row.subjects or {}).get("roles", [])),
+                condition=compile_conditions(row.conditions),
+            )
+            for row in policies
+        )
+        self._policy_index: Dict[Tuple[Any, Any], Tuple[CompiledPolicy, ...]] = {}
+
+        # Role hierarchy: nearest ancestor first, the role itself at depth 0
+        ancestors: Dict[int, List[Tuple[int, int]]] = {}
+        for ancestor_id, descendant_id, depth in closure:
+            ancestors.setdefault(descendant_id, []).append((depth, ancestor_id))
+        self.role_ancestors: Dict[int, Tuple[int, ...]] = {
+            role_id: tuple(ancestor for _, ancestor in sorted(items)) for role_id, items in ancestors.items()
+        }
+
+        # Role permission mappings per (role, resource_type, action)
+        self._grants: Dict[Tuple[int, Any, Any], List[CompiledGrant]] = {}
+        for position, row in enumerate(role_permissions):
+            self._grants.setdefault((row.role_id, _key(row.resource_type), _key(row.action)), []).append(
+                CompiledGrant(
+                    position,
+                    row.permission_name,
+                    _both(compile_conditions(row.conditions), compile_conditions(row.constraints)),
+                    row.expires_at
+                )
+            )
+        self._grant_index: Dict[Tuple[Optional[int], Any, Any], Tuple[CompiledGrant, ...]] = {}
+
+        self.role_restrictions: Dict[int, Tuple[CompiledRestriction, ...]] = {}
+        for row in role_restrictions:
+            self.role_restrictions[row.owner_id] = self.role_restrictions.get(row.owner_id, ()) + (
+                CompiledRestriction(row.name, compile_restrictions(row.restrictions), None),
+            )
+
+        # RLS and FLS per table
+        self.rls_rules: Dict[str, Tuple[CompiledRlsRule, ...]] = {}
+        for row in rls_rules:
+            self.rls_rules[row.table_name] = self.rls_rules.get(row.table_name, ()) + (CompiledRlsRule(
+                _optional_set(row.actions), _optional_set(row.roles), _optional_set(row.users),
+                compile_rls_expression(row.rule_expression)
+            ),)
+
+        self.fls_rules: Dict[str, Tuple[CompiledFlsRule, ...]] = {}
+        for row in fls_rules:
+            self.fls_rules[row.table_name] = self.fls_rules.get(row.table_name, ()) + (CompiledFlsRule(
+                row.column_name, row.is_visible, row.is_readable,
+                compile_mask(row.masking_pattern) if row.masking_pattern else None,
+                _optional_set(row.roles), _optional_set(row.users), compile_conditions(row.conditions)
+            ),)
+
+    # --- Indexes ---
+
+    def _remember(self, index: Dict, key: Any, value: Tuple) -> Tuple:
+        if len(index) < MAX_INDEXED_KEYS:
+            index[key] = value
+        return value
+
+    def policies_for(self, resource_type: Any, action: Any) -> Tuple[CompiledPolicy, ...]:
+        key = (resource_type, action)
+        policies = self._policy_index.get(key)
+        if policies is None:
+            policies = self._remember(self._policy_index, key, tuple(
+                policy for policy in self.policies
+                if (policy.resources is None or resource_type in policy.resources)
+                and (policy.actions is None or action in policy.actions)
+            ))
+        return policies
+
+    def ancestors_of(self, role_id: int) -> Tuple[int, ...]:
+        return self.role_ancestors.get(role_id, (role_id,))
+
+    def grants_for(self, role_id: Optional[int], resource_type: Any, action: Any) -> Tuple[CompiledGrant, ...]:
+        """Mappings of the role and all its ancestors, in load order"""
+        key = (role_id, resource_type, action)
+        grants = self._grant_index.get(key)
+        if grants is None:
+            merged = []
+            for ancestor_id in self.ancestors_of(role_id):
+                merged.extend(self._grants.get((ancestor_id, resource_type, action), ()))
+            grants = self._remember(self._grant_index, key, tuple(sorted(merged, key=lambda grant: grant.id)))
+        return grants
+
+    # --- Decisions ---
+
+    def decide(self, profile: UserSecurityProfile, context: AccessContext, risk_score: float,
+               now: Optional[datetime] = None) -> AccessDecision:
+        """
+        Evaluate policies, role permissions, user overrides and restriction
+        groups in the order check_access always has
+        """
+        if not profile.active:
+            return AccessDecision(False, "User not found or inactive")
+        now = now or datetime.utcnow()
+
+        # PBAC
+        applicable_policies = []
+        allowed_by_policy = False
+        for policy in self.policies_for(context.resource_type, context.action):
+            if not policy.applies_to_subject(profile):
+                continue
+            applicable_policies.append(policy.name)
+            if policy.condition is None or policy.condition(context):
+                if policy.effect == "deny":
+                    return AccessDecision(False, f"Access denied by policy: {policy.name}",
+                                          applicable_policies=applicable_policies)
+                if policy.effect == "allow":
+                    allowed_by_policy = True
+                    break
+
+        # RBAC (an allowing policy makes it optional)
+        if not allowed_by_policy:
+            if profile.role_id is None:
+                return AccessDecision(False, "User has no role assigned")
+            if not any(
+                (grant.expires_at is None or grant.expires_at > now)
+                and (grant.condition is None or grant.condition(context))
+                for grant in self.grants_for(profile.role_id, context.resource_type, context.action)
+            ):
+                return AccessDecision(False, "No matching role permissions found")
+
+        # User overrides (newest first) decide on their own
+        for override in profile.overrides.get((context.resource_type, context.action), ()):
+            if override.expires_at is not None and override.expires_at <= now:
+                continue
+            if override.condition is not None and not override.condition(context):
+                continue
+            return AccessDecision(
+                override.is_granted,
+                f"Access {'granted' if override.is_granted else 'denied'} by user permission override"
+            )
+
+        # Restriction groups
+        for restriction in profile.restrictions:
+            if restriction.expires_at is not None and restriction.expires_at <= now:
+                continue
+            if restriction.restricts is not None and restriction.restricts(context):
+                return AccessDecision(False, f"Access restricted by group: {restriction.name}")
+        if profile.role_id is not None:
+            for restriction in self.role_restrictions.get(profile.role_id, ()):
+                if restriction.restricts is not None and restriction.restricts(context):
+                    return AccessDecision(False, f"Access restricted by role group: {restriction.name}")
+
+        return AccessDecision(
+            granted=True,
+            reason="Access granted",
+            requires_mfa=requires_mfa(context, profile.has_mfa, risk_score),
+            risk_score=risk_score,
+            applicable_policies=applicable_policies
+        )
+
+    def row_filters(self, table_name: str, profile: UserSecurityProfile,
+                    context: AccessContext) -> List[TextClause]:
+        """Bound RLS clauses applying to this user and action"""
+        return [
+            rule.clause.bind(context)
+            for rule in self.rls_rules.get(table_name, ())
+            if (rule.actions is None or context.action in rule.actions) and _rule_applies(rule, profile)
+        ]
+
+    def mask_fields(self, data: Dict, table_name: str, profile: UserSecurityProfile,
+                    context: AccessContext) -> Dict:
+        """Hide, restrict or mask columns per the applicable FLS rules"""
+        filtered = data.copy()
+        for rule in self.fls_rules.get(table_name, ()):
+            if rule.column_name not in filtered:
+                continue
+            if rule.condition is not None and not rule.condition(context):
+                continue
+            if not _rule_applies(rule, profile):
+                continue
+            if not rule.is_visible:
+                filtered.pop(rule.column_name, None)
+            elif not rule.is_readable:
+                filtered[rule.column_name] = RESTRICTED_PLACEHOLDER
+            elif rule.mask is not None:
+                filtered[rule.column_name] = rule.mask(filtered[rule.column_name])
+        return filtered
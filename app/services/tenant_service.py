@@ -3,9 +3,12 @@ from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, T
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import text
+from dataclasses import replace
 from datetime import datetime
 from typing import Optional
 
+from app.db.rls_context import RLSIdentity, bind_rls_context, get_rls_identity, set_rls_identity
+
 Base = declarative_base()
 
 class Tenant(Base):
@@ -106,35 +109,37 @@ class User(Base, TenantMixin):
 
 # Multi-tenant service for context management
 class TenantContext:
-    """Thread-local tenant context for row-level security"""
-    _tenant_id: Optional[int] = None
-    _user_id: Optional[int] = None
-    _branch_id: Optional[int] = None
+    """
+    Request-scoped tenant context for row-level security
+    Backed by the RLS identity ContextVar (app.db.rls_context), so each
+    request (asyncio task, or threadpool call copying its context) sees only
+    its own tenant, and sessions apply it as transaction-local settings.
+    """
     
     @classmethod
     def set_context(cls, tenant_id: int, user_id: Optional[int] = None, 
                    branch_id: Optional[int] = None):
-        cls._tenant_id = tenant_id
-        cls._user_id = user_id
-        cls._branch_id = branch_id
+        identity = get_rls_identity() or RLSIdentity()
+        set_rls_identity(replace(identity, tenant_id=tenant_id, user_id=user_id, branch_id=branch_id))
     
     @classmethod
     def get_tenant_id(cls) -> Optional[int]:
-        return cls._tenant_id
+        identity = get_rls_identity()
+        return identity.tenant_id if identity else None
     
     @classmethod
     def get_user_id(cls) -> Optional[int]:
-        return cls._user_id
+        identity = get_rls_identity()
+        return identity.user_id if identity else None
     
     @classmethod
     def get_branch_id(cls) -> Optional[int]:
-        return cls._branch_id
+        identity = get_rls_identity()
+        return identity.branch_id if identity else None
     
     @classmethod
     def clear_context(cls):
-        cls._tenant_id = None
-        cls._user_id = None
-        cls._branch_id = None
+        set_rls_identity(None)
 
 # Enhanced database service with row-level security
 class TenantAwareSession:
@@ -146,10 +151,11 @@ class TenantAwareSession:
     
     def _setup_row_level_security(self):
         """Setup row-level security policies"""
-        tenant_id = TenantContext.get_tenant_id()
-        if tenant_id:
-            # Set session variable for PostgreSQL RLS
-            self.db.execute(text(f"SET app.current_tenant_id = {tenant_id}"))
+        identity = get_rls_identity()
+        if identity and identity.tenant_id:
+            # Transaction-local app.current_tenant_id (and the rest of the
+            # identity), re-applied at every transaction start
+            bind_rls_context(self.db, identity)
     
     def query(self, model):
         """Override query to automatically filter by tenant"""
@@ -0,0 +1,108 @@
+"""
+Versioned Cache - Process-local caches invalidated through a shared version
+
+Caches of compiled authorization data (permission snapshots, security
+policies) keep their entries per process and tag them with a version number.
+Bumping the version, in Redis when available, invalidates every worker's
+entries at once; workers re-read it at most every
+permission_version_poll_seconds.
+"""
+
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    Base for class-level caches keyed by a shared version
+
+    Subclasses set VERSION_KEY and implement _clear() to drop their entries.
+    Without Redis the version is process-local, so entries should also be
+    treated as stale once older than the poll interval (is_fresh).
+    """
+
+    VERSION_KEY = ""
+
+    _lock = threading.Lock()
+    _version = 0
+    _version_read_at = float("-inf")
+    _redis = None
+    _redis_resolved = False
+
+    @classmethod
+    def _clear(cls) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def configure(cls, redis_client=None) -> None:
+        """Use the given Redis client (None = process-local only) and drop cached state"""
+        with cls._lock:
+            cls._redis = redis_client
+            cls._redis_resolved = True
+            cls._version = 0
+            cls._version_read_at = float("-inf")
+            cls._clear()
+
+    @classmethod
+    def _client(cls):
+        if not cls._redis_resolved:
+            with cls._lock:
+                if not cls._redis_resolved:
+                    cls._redis = None
+                    if settings.REDIS_ENABLED:
+                        try:
+                            import redis
+                            client = redis.from_url(
+                                settings.REDIS_URL, decode_responses=True,
+                                socket_connect_timeout=2, socket_timeout=2
+                            )
+                            client.ping()
+                            cls._redis = client
+                        except Exception as e:
+                            logger.warning(f"{cls.__name__} uses process-local cache only: {e}")
+                    cls._redis_resolved = True
+        return cls._redis
+
+    @classmethod
+    def current_version(cls) -> int:
+        """The shared version, re-read from Redis at most every poll interval"""
+        client = cls._client()
+        if client is None:
+            return cls._version
+
+        now = time.monotonic()
+        if now - cls._version_read_at >= settings.permission_version_poll_seconds:
+            try:
+                cls._version = int(client.get(cls.VERSION_KEY) or 0)
+            except Exception as e:
+                logger.warning(f"Could not read {cls.VERSION_KEY}: {e}")
+            cls._version_read_at = now
+        return cls._version
+
+    @classmethod
+    def bump_version(cls) -> int:
+        """Invalidate every entry in every worker"""
+        client = cls._client()
+        version = None
+        if client is not None:
+            try:
+                version = int(client.incr(cls.VERSION_KEY))
+            except Exception as e:
+                logger.warning(f"Could not bump {cls.VERSION_KEY}: {e}")
+        with cls._lock:
+            cls._version = version if version is not None else cls._version + 1
+            cls._version_read_at = time.monotonic()
+            cls._clear()
+        return cls._version
+
+    @classmethod
+    def is_fresh(cls, built_at: float) -> bool:
+        """Entries built at the current version are fresh; without Redis only for one poll interval"""
+        if cls._redis is not None:
+            return True
+        return time.monotonic() - built_at < settings.permission_version_poll_seconds
@@ -0,0 +1,760 @@
+"""
+WhatsApp Broadcasts - Queued, rate-limited template delivery
+
+A broadcast is a whatsapp_broadcasts row plus one whatsapp_broadcast_recipients
+row per phone number, inserted in one statement when the request is accepted.
+BroadcastDispatcher sends them in the background:
+- recipients are claimed in batches under a lease; a dispatcher that dies
+  mid-batch only loses its lease, and the rows are claimed again once it
+  expires (a message sent just before the crash may go out twice)
+- every send waits on a token bucket set to the phone number's throughput
+  (WHATSAPP_MESSAGES_PER_SECOND), and claiming stops while the messaging
+  tier's unique recipients for the last 24 hours are used up
+- transient failures (HTTP 429/5xx, network errors, Cloud API throttling and
+  temporary error codes) are retried with exponential backoff and jitter up
+  to max_attempts; anything else fails the recipient
+- delivery statuses from the webhook move recipients forward (never back)
+  and refresh the broadcast's counters
+
+Every worker process starts a dispatcher, but only the one holding a
+PostgreSQL advisory lock sends, so its token bucket sees all of the traffic;
+the others retry the lock every poll interval and take over if the sender
+dies. Without PostgreSQL every dispatcher sends: run a single worker.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import and_, bindparam, func, insert, or_, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.exceptions import BusinessLogicError, EntityNotFoundError, ValidationError
+from app.models.whatsapp import (
+    BroadcastRecipientStatus, WhatsAppBroadcast, WhatsAppBroadcastRecipient, WhatsAppMessage
+)
+
+logger = logging.getLogger(__name__)
+
+Recipient = WhatsAppBroadcastRecipient
+Status = BroadcastRecipientStatus
+
+# Cloud API error codes worth retrying: throttling (4, 80007, 130429, 131048,
+# 131056) and temporary errors (1, 2, 131000, 131016, 133004)
+TRANSIENT_ERROR_CODES = {1, 2, 4, 80007, 130429, 131000, 131016, 131048, 131056, 133004}
+# Codes that mean the whole phone number is over its limit: every sender waits
+THROTTLING_ERROR_CODES = {4, 80007, 130429}
+
+# Webhook status -> recipient statuses it may replace
+ADVANCES_FROM = {
+    Status.SENT.value: {Status.SENDING.value},
+    Status.DELIVERED.value: {Status.SENDING.value, Status.SENT.value},
+    Status.READ.value: {Status.SENDING.value, Status.SENT.value, Status.DELIVERED.value},
+    Status.FAILED.value: {Status.SENDING.value, Status.SENT.value, Status.DELIVERED.value},
+}
+OPEN_STATUSES = (Status.QUEUED.value, Status.SENDING.value)
+
+# Held by the one dispatcher (across all processes) that sends
+BROADCAST_LOCK_KEY = 734_050
+
+
+# ============================================================================
+# Rate limiting
+# ============================================================================
+
+class TokenBucket:
+    """
+    `rate` acquisitions per second with bursts of up to `burst`
+
+    pause() holds every caller until the provider's back-off has passed.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = self.clock()
+            if now < self.paused_until:
+                await self.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await self.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.tokens = 0.0
+
+
+# ============================================================================
+# Cloud API client
+# ============================================================================
+
+class WhatsAppSendError(Exception):
+    """A send the Cloud API did not accept"""
+
+    def __init__(self, message: str, code: Optional[int] = None, transient: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.transient = transient
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        return self.code in THROTTLING_ERROR_CODES
+
+
+class WhatsAppCloudClient:
+    """Sends template messages through the WhatsApp Cloud API"""
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        phone_number_id: Optional[str] = None,
+        api_base: Optional[str] = None,
+        timeout: float = 15.0
+    ):
+        self.phone_number_id = phone_number_id or settings.whatsapp_phone_number_id
+        self._client = httpx.AsyncClient(
+            base_url=api_base or settings.whatsapp_api_base,
+            headers={"Authorization": f"Bearer {access_token or settings.whatsapp_access_token}"},
+            timeout=timeout
+        )
+
+    async def send_template(
+        self,
+        phone_number: str,
+        template_name: str,
+        language: str,
+        parameters: Optional[Sequence[Any]] = None
+    ) -> str:
+        """Send one template message; returns the wamid, raises WhatsAppSendError"""
+        template: Dict[str, Any] = {"name": template_name, "language": {"code": language}}
+        if parameters:
+            template["components"] = [{
+                "type": "body",
+                "parameters": [{"type": "text", "text": str(value)} for value in parameters]
+            }]
+        try:
+            response = await self._client.post(f"/{self.phone_number_id}/messages", json={
+                "messaging_product": "whatsapp",
+                "to": phone_number,
+                "type": "template",
+                "template": template
+            })
+        except httpx.TransportError as e:
+            raise WhatsAppSendError(f"{type(e).__name__}: {e}", transient=True)
+
+        if response.is_success:
+            return response.json()["messages"][0]["id"]
+        try:
+            error = response.json().get("error", {})
+        except ValueError:
+            error = {}
+        code = error.get("code")
+        retry_after = response.headers.get("Retry-After")
+        raise WhatsAppSendError(
+            error.get("message") or f"HTTP {response.status_code}",
+            code=code,
+            transient=response.status_code == 429 or response.status_code >= 500 or code in TRANSIENT_ERROR_CODES,
+            retry_after=float(retry_after) if retry_after else None
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# ============================================================================
+# Broadcast management
+# ============================================================================
+
+class BroadcastService:
+    """Queues, inspects and cancels broadcasts; folds webhook statuses into them"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_broadcast(
+        self,
+        phone_numbers: Iterable[str],
+        template_name: str,
+        language: str = "ar",
+        parameters: Optional[Dict[str, Any]] = None,
+        requested_by: Optional[int] = None
+    ) -> WhatsAppBroadcast:
+        """Queue a broadcast; recipients (deduplicated, in order) are inserted in one statement"""
+        recipients = list(dict.fromkeys(phone for phone in phone_numbers if phone))
+        if not recipients:
+            raise ValidationError("A broadcast needs at least one phone number")
+
+        now = datetime.now()
+        broadcast = WhatsAppBroadcast(
+            broadcast_id=f"bc_{uuid4().hex[:8]}",
+            template_name=template_name,
+            language=language,
+            parameters=parameters or None,
+            requested_by=requested_by,
+            total_recipients=len(recipients),
+            sent_count=0,
+            delivered_count=0,
+            read_count=0,
+            failed_count=0,
+            status="pending",
+            created_at=now
+        )
+        self.db.add(broadcast)
+        self.db.flush()
+        self.db.execute(insert(Recipient), [
+            {
+                "broadcast_id": broadcast.id,
+                "phone_number": phone,
+                "status": Status.QUEUED.value,
+                "attempts": 0,
+                "next_attempt_at": now,
+            }
+            for phone in recipients
+        ])
+        self.db.commit()
+        self.db.refresh(broadcast)
+        logger.info(f"WhatsApp broadcast {broadcast.broadcast_id} queued for {len(recipients)} recipients")
+        return broadcast
+
+    def get_broadcast(self, broadcast_id: str) -> WhatsAppBroadcast:
+        broadcast = self.db.execute(
+            select(WhatsAppBroadcast).where(WhatsAppBroadcast.broadcast_id == broadcast_id)
+        ).scalar_one_or_none()
+        if broadcast is None:
+            raise EntityNotFoundError("WhatsApp broadcast", broadcast_id)
+        return broadcast
+
+    def recipient_counts(self, broadcast: WhatsAppBroadcast) -> Dict[str, int]:
+        """Recipients per delivery status"""
+        return dict(self.db.execute(
+            select(Recipient.status, func.count(Recipient.id))
+            .where(Recipient.broadcast_id == broadcast.id)
+            .group_by(Recipient.status)
+        ).all())
+
+    def cancel_broadcast(self, broadcast_id: str) -> WhatsAppBroadcast:
+        """Cancel the recipients not yet sent; a batch already in flight still goes out"""
+        broadcast = self.get_broadcast(broadcast_id)
+        if broadcast.status in ("completed", "cancelled"):
+            raise BusinessLogicError(f"WhatsApp broadcast {broadcast_id} already {broadcast.status}")
+
+        self.db.execute(
+            update(Recipient)
+            .where(Recipient.broadcast_id == broadcast.id, Recipient.status == Status.QUEUED.value)
+            .values(status=Status.CANCELLED.value, lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.execute(
+            update(WhatsAppBroadcast)
+            .where(WhatsAppBroadcast.id == broadcast.id)
+            .values(status="cancelled", completed_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        self.refresh_counts([broadcast.id])
+        self.db.commit()
+        self.db.refresh(broadcast)
+        return broadcast
+
+    def apply_status_updates(self, statuses: Sequence[Dict[str, Any]]) -> int:
+        """
+        Fold webhook `statuses` entries into recipients and logged messages
+
+        One UPDATE per status kind (failures carry their own error, so they
+        go as one executemany); rows only move forward, so a late
+        "delivered" does not undo "read". Returns the recipients updated.
+        """
+        by_status: Dict[str, List[str]] = {}
+        failures = []
+        for entry in statuses:
+            wamid, status = entry.get("id"), entry.get("status")
+            if not wamid or status not in ADVANCES_FROM:
+                continue
+            by_status.setdefault(status, []).append(wamid)
+            if status == Status.FAILED.value:
+                error = (entry.get("errors") or [{}])[0]
+                failures.append({
+                    "wamid": wamid,
+                    "code": error.get("code"),
+                    "message": error.get("title") or error.get("message")
+                })
+        if not by_status:
+            return 0
+
+        now = datetime.now()
+        updated = 0
+        # In delivery order, so a payload holding both "delivered" and "read" ends at read
+        for status in (Status.SENT.value, Status.DELIVERED.value, Status.READ.value):
+            wamids = by_status.get(status)
+            if not wamids:
+                continue
+            values = {"status": status}
+            if status != Status.SENT.value:
+                values[f"{status}_at"] = now
+            updated += self.db.execute(
+                update(Recipient)
+                .where(Recipient.whatsapp_message_id.in_(wamids), Recipient.status.in_(ADVANCES_FROM[status]))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        if failures:
+            table = Recipient.__table__
+            updated += self.db.execute(
+                table.update()
+                .where(table.c.whatsapp_message_id == bindparam("wamid"),
+                       table.c.status.in_(ADVANCES_FROM[Status.FAILED.value]))
+                .values(status=Status.FAILED.value, failed_at=now,
+                        error_code=bindparam("code"), error_message=bindparam("message")),
+                failures
+            ).rowcount
+
+        for status, wamids in by_status.items():
+            self.db.execute(
+                update(WhatsAppMessage)
+                .where(
+                    WhatsAppMessage.whatsapp_message_id.in_(wamids),
+                    or_(WhatsAppMessage.delivery_status.is_(None),
+                        WhatsAppMessage.delivery_status.in_(ADVANCES_FROM[status]))
+                )
+                .values(delivery_status=status, status_updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        all_wamids = [wamid for wamids in by_status.values() for wamid in wamids]
+        self.refresh_counts(self.db.execute(
+            select(Recipient.broadcast_id).where(Recipient.whatsapp_message_id.in_(all_wamids)).distinct()
+        ).scalars().all())
+        self.db.commit()
+        return updated
+
+    def refresh_counts(self, broadcast_ids: Iterable[int]) -> None:
+        """Recount broadcasts from their recipients and complete those with nothing left to send"""
+        broadcast_ids = sorted(set(broadcast_ids))
+        if not broadcast_ids:
+            return
+        counts: Dict[int, Dict[str, int]] = {broadcast_id: {} for broadcast_id in broadcast_ids}
+        for broadcast_id, status, count in self.db.execute(
+            select(Recipient.broadcast_id, Recipient.status, func.count(Recipient.id))
+            .where(Recipient.broadcast_id.in_(broadcast_ids))
+            .group_by(Recipient.broadcast_id, Recipient.status)
+        ):
+            counts[broadcast_id][status] = count
+
+        now = datetime.now()
+        for broadcast_id, by_status in counts.items():
+            read = by_status.get(Status.READ.value, 0)
+            delivered = by_status.get(Status.DELIVERED.value, 0) + read
+            self.db.execute(
+                update(WhatsAppBroadcast)
+                .where(WhatsAppBroadcast.id == broadcast_id)
+                .values(
+                    sent_count=by_status.get(Status.SENT.value, 0) + delivered,
+                    delivered_count=delivered,
+                    read_count=read,
+                    failed_count=by_status.get(Status.FAILED.value, 0)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if not any(by_status.get(status) for status in OPEN_STATUSES):
+                self.db.execute(
+                    update(WhatsAppBroadcast)
+                    .where(WhatsAppBroadcast.id == broadcast_id,
+                           WhatsAppBroadcast.status.in_(["pending", "sending"]))
+                    .values(status="completed", completed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+
+
+# ============================================================================
+# Dispatcher
+# ============================================================================
+
+@dataclass
+class ClaimedRecipient:
+    id: int
+    broadcast_id: int
+    phone_number: str
+    attempts: int
+    template_name: str
+    language: str
+    parameters: Optional[Dict[str, Any]]
+
+
+class BroadcastDispatcher:
+    """
+    Claims due recipients and sends them through a worker pool
+
+    Each batch is claimed with one UPDATE under a lease sized to what the
+    token bucket lets through in half the lease; each outcome is written as
+    soon as the API answers, so a webhook status finds its wamid. The
+    dispatcher shares the API worker's event loop, so every database call
+    runs in a thread (asyncio.to_thread) and never blocks request handling.
+    """
+
+    def __init__(
+        self,
+        client: Optional[WhatsAppCloudClient] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        limiter: Optional[TokenBucket] = None,
+        workers: Optional[int] = None,
+        batch_size: int = 500,
+        max_attempts: Optional[int] = None,
+        messaging_tier: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval_ms: Optional[int] = None,
+        backoff_base_seconds: float = 2.0,
+        backoff_max_seconds: float = 300.0,
+        dispatcher_id: Optional[str] = None
+    ):
+        """
+        Args:
+            client: Cloud API client (defaults to one built from settings, closed on stop)
+            session_factory: Creates database sessions
+            limiter: Shared send limiter (defaults to WHATSAPP_MESSAGES_PER_SECOND)
+            workers: Concurrent sends
+            batch_size: Most recipients claimed at once
+            max_attempts: Sends per recipient before it fails
+            messaging_tier: Unique recipients per rolling 24h (0: unlimited)
+            lease_seconds: How long a claimed batch is owned
+            poll_interval_ms: Idle wait between claim attempts
+            backoff_base_seconds: First retry delay, doubled per attempt
+            backoff_max_seconds: Longest retry delay
+            dispatcher_id: Lease owner name (defaults to host:pid:random)
+        """
+        self._owns_client = client is None
+        self.client = client
+        self.session_factory = session_factory
+        self.limiter = limiter or TokenBucket(settings.whatsapp_messages_per_second)
+        self.workers = workers or settings.whatsapp_broadcast_workers
+        self.max_attempts = max_attempts or settings.whatsapp_broadcast_max_attempts
+        self.messaging_tier = settings.whatsapp_messaging_tier if messaging_tier is None else messaging_tier
+        self.lease = timedelta(seconds=lease_seconds or settings.whatsapp_broadcast_lease_seconds)
+        self.batch_size = max(1, min(batch_size, int(self.limiter.rate * self.lease.total_seconds() / 2)))
+        self.poll_interval = (poll_interval_ms or settings.whatsapp_broadcast_poll_interval_ms) / 1000
+        self.backoff_base = backoff_base_seconds
+        self.backoff_max = backoff_max_seconds
+        self.dispatcher_id = dispatcher_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock_connection: Optional[Connection] = None
+
+    # ------------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------------
+
+    def start(self) -> asyncio.Task:
+        """Run the claim loop as a background task"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            if self.client is None:
+                self.client = WhatsAppCloudClient()
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"WhatsApp broadcast dispatcher {self.dispatcher_id} started")
+        return self._task
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop after the sends in flight; unsent rows of the batch are handed back
+
+        If the sends do not finish within timeout the task is cancelled and
+        the batch is claimed again when its lease expires.
+        """
+        self._stopping = True
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+        if self._owns_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+        logger.info(f"WhatsApp broadcast dispatcher {self.dispatcher_id} stopped")
+
+    async def _loop(self) -> None:
+        try:
+            while not self._stopping:
+                try:
+                    if not await asyncio.to_thread(self.lead) or not await self.run_once():
+                        await asyncio.sleep(self.poll_interval)
+                except Exception as e:
+                    logger.error(f"Error in WhatsApp broadcast dispatcher loop: {e}", exc_info=True)
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await asyncio.to_thread(self.resign)
+
+    async def run_once(self) -> bool:
+        """Claim and send one batch; False when nothing was due"""
+        lease_owner, batch = await asyncio.to_thread(self.claim_batch)
+        if not batch:
+            return False
+        await self.send_batch(lease_owner, batch)
+        return True
+
+    # ------------------------------------------------------------------------
+    # Leadership
+    # ------------------------------------------------------------------------
+
+    def lead(self) -> bool:
+        """
+        True while this dispatcher is the one that sends
+
+        The session-level advisory lock lives on a connection of its own and
+        dies with it, so a crashed sender's lock is freed by PostgreSQL and
+        the next dispatcher to ask takes over.
+        """
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                logger.warning(f"WhatsApp broadcast dispatcher {self.dispatcher_id} lost its lock: {e}")
+                self.resign()
+
+        with self.session_factory() as db:
+            engine = db.get_bind()
+        if engine.dialect.name != "postgresql":
+            return True
+
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": BROADCAST_LOCK_KEY}
+            ).scalar()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._lock_connection = connection
+        logger.info(f"WhatsApp broadcast dispatcher {self.dispatcher_id} is now the sender")
+        return True
+
+    def resign(self) -> None:
+        """Give up sending; the connection is discarded, which frees the lock"""
+        if self._lock_connection is not None:
+            connection, self._lock_connection = self._lock_connection, None
+            connection.invalidate()
+            connection.close()
+
+    # ------------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(Recipient.status == Status.QUEUED.value, Recipient.next_attempt_at <= now),
+            and_(Recipient.status == Status.SENDING.value, Recipient.lease_expires_at < now)
+        )
+
+    def _tier_remaining(self, db: Session, now: datetime) -> Optional[int]:
+        """Unique recipients the messaging tier still allows in the rolling 24h window"""
+        if not self.messaging_tier:
+            return None
+        used = db.execute(
+            select(func.count(func.distinct(Recipient.phone_number)))
+            .where(Recipient.sent_at >= now - timedelta(hours=24))
+        ).scalar() or 0
+        return max(0, self.messaging_tier - used)
+
+    def claim_batch(self) -> "tuple[str, List[ClaimedRecipient]]":
+        """Lease the next due recipients of active broadcasts, oldest first"""
+        now = datetime.now()
+        lease_owner = f"{self.dispatcher_id}:{uuid4().hex[:8]}"
+        with self.session_factory() as db:
+            limit = self.batch_size
+            remaining = self._tier_remaining(db, now)
+            if remaining is not None:
+                limit = min(limit, remaining)
+            if limit <= 0:
+                return lease_owner, []
+
+            candidates = db.execute(
+                select(Recipient.id)
+                .join(WhatsAppBroadcast, WhatsAppBroadcast.id == Recipient.broadcast_id)
+                .where(self._claimable(now), WhatsAppBroadcast.status.in_(["pending", "sending"]))
+                .order_by(Recipient.id)
+                .limit(limit)
+            ).scalars().all()
+            if not candidates:
+                return lease_owner, []
+
+            db.execute(
+                update(Recipient)
+                .where(Recipient.id.in_(candidates), self._claimable(now))
+                .values(
+                    status=Status.SENDING.value,
+                    lease_owner=lease_owner,
+                    lease_expires_at=now + self.lease,
+                    attempts=Recipient.attempts + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            batch = [
+                ClaimedRecipient(*row) for row in db.execute(
+                    select(
+                        Recipient.id, Recipient.broadcast_id, Recipient.phone_number, Recipient.attempts,
+                        WhatsAppBroadcast.template_name, WhatsAppBroadcast.language, WhatsAppBroadcast.parameters
+                    )
+                    .join(WhatsAppBroadcast, WhatsAppBroadcast.id == Recipient.broadcast_id)
+                    .where(Recipient.lease_owner == lease_owner, Recipient.status == Status.SENDING.value)
+                    .order_by(Recipient.id)
+                )
+            ]
+            db.execute(
+                update(WhatsAppBroadcast)
+                .where(WhatsAppBroadcast.id.in_({recipient.broadcast_id for recipient in batch}),
+                       WhatsAppBroadcast.status == "pending")
+                .values(status="sending", started_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        return lease_owner, batch
+
+    # ------------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------------
+
+    async def send_batch(self, lease_owner: str, batch: List[ClaimedRecipient]) -> None:
+        """Send a claimed batch; rows left when the lease runs out belong to the next claimer"""
+        lease_deadline = time.monotonic() + self.lease.total_seconds()
+        pending: asyncio.Queue = asyncio.Queue()
+        for recipient in batch:
+            pending.put_nowait(recipient)
+
+        async def worker():
+            while not self._stopping and time.monotonic() < lease_deadline:
+                try:
+                    recipient = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.limiter.acquire()
+                await self._send(lease_owner, recipient)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(batch)))))
+        await asyncio.to_thread(self._finish_batch, lease_owner, {recipient.broadcast_id for recipient in batch})
+
+    def _finish_batch(self, lease_owner: str, broadcast_ids: Iterable[int]) -> None:
+        """Hand back what a stop left unsent and refresh the broadcasts' counters"""
+        with self.session_factory() as db:
+            if self._stopping:
+                self._release(db, lease_owner)
+            BroadcastService(db).refresh_counts(broadcast_ids)
+            db.commit()
+
+    async def _send(self, lease_owner: str, recipient: ClaimedRecipient) -> None:
+        parameters = list(recipient.parameters.values()) if recipient.parameters else None
+        try:
+            wamid = await self.client.send_template(
+                recipient.phone_number, recipient.template_name, recipient.language, parameters
+            )
+        except WhatsAppSendError as e:
+            if e.throttled or e.retry_after:
+                self.limiter.pause(e.retry_after or 1.0)
+            if e.transient and recipient.attempts < self.max_attempts:
+                delay = self._backoff(recipient.attempts, e.retry_after)
+                logger.info(f"WhatsApp send to {recipient.phone_number} failed ({e.code}: {e}); retry in {delay:.1f}s")
+                await self._record(lease_owner, recipient.id, status=Status.QUEUED.value,
+                                   next_attempt_at=datetime.now() + timedelta(seconds=delay),
+                                   error_code=e.code, error_message=str(e))
+            else:
+                logger.warning(f"WhatsApp send to {recipient.phone_number} failed for good ({e.code}: {e})")
+                await self._record(lease_owner, recipient.id, status=Status.FAILED.value, failed_at=datetime.now(),
+                                   error_code=e.code, error_message=str(e))
+            return
+        except Exception as e:
+            logger.error(f"Unexpected error sending WhatsApp message to {recipient.phone_number}: {e}", exc_info=True)
+            await self._record(lease_owner, recipient.id, status=Status.FAILED.value, failed_at=datetime.now(),
+                               error_message=str(e))
+            return
+
+        await self._record(lease_owner, recipient.id, status=Status.SENT.value, whatsapp_message_id=wamid,
+                           sent_at=datetime.now(), error_code=None, error_message=None)
+
+    def _backoff(self, attempts: int, retry_after: Optional[float]) -> float:
+        """Exponential backoff with jitter, never shorter than the provider's Retry-After"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return max(random.uniform(delay / 2, delay), retry_after or 0)
+
+    async def _record(self, lease_owner: str, recipient_id: int, **values) -> None:
+        """Write one outcome, only while this dispatcher still holds the row"""
+        await asyncio.to_thread(self._write_outcome, lease_owner, recipient_id, values)
+
+    def _write_outcome(self, lease_owner: str, recipient_id: int, values: dict) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(Recipient)
+                .where(Recipient.id == recipient_id, Recipient.lease_owner == lease_owner,
+                       Recipient.status == Status.SENDING.value)
+                .values(lease_owner=None, lease_expires_at=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+    def _release(self, db: Session, lease_owner: str) -> None:
+        """Hand unsent rows of a batch back to the queue (graceful stop)"""
+        released = db.execute(
+            update(Recipient)
+            .where(Recipient.lease_owner == lease_owner, Recipient.status == Status.SENDING.value)
+            .values(status=Status.QUEUED.value, lease_owner=None, lease_expires_at=None,
+                    attempts=Recipient.attempts - 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if released:
+            logger.info(f"WhatsApp broadcast dispatcher {self.dispatcher_id} released {released} recipients")
+
+
+# ============================================================================
+# Application dispatcher
+# ============================================================================
+
+broadcast_dispatcher: Optional[BroadcastDispatcher] = None
+
+
+async def start_broadcast_dispatcher() -> None:
+    """Start the process's broadcast dispatcher; it sends once it holds the lock (application startup)"""
+    global broadcast_dispatcher
+    if not (settings.whatsapp_access_token and settings.whatsapp_phone_number_id):
+        logger.warning("WhatsApp Cloud API credentials are not configured; broadcasts stay queued")
+        return
+    if broadcast_dispatcher is None:
+        broadcast_dispatcher = BroadcastDispatcher()
+    broadcast_dispatcher.start()
+
+
+async def stop_broadcast_dispatcher() -> None:
+    """Stop the dispatcher and close its HTTP client (application shutdown)"""
+    if broadcast_dispatcher is not None:
+        await broadcast_dispatcher.stop()
@@ -0,0 +1,555 @@
+"""
+Zoho Bulk Sync Jobs - Durable, resumable bulk imports from Zoho
+
+A bulk sync is a row in tds_bulk_sync_jobs instead of a 5-15 minute HTTP
+request. BulkSyncRunner claims queued jobs (or running jobs whose lease has
+expired) and imports them one Zoho page at a time:
+- each page is written and the job's next_page/counters are checkpointed in
+  the same transaction; the checkpoint only applies while the runner still
+  holds the lease, and renews it
+- a runner that crashes or is killed mid-page loses only that page; the
+  next runner resumes at next_page once the lease expires, and a graceful
+  stop (deploy) hands the job back immediately
+- cancellation is a flag checked after every committed page
+- started/progress/completed/failed/cancelled events go on the event bus
+
+All runners in a process share one UnifiedZohoClient.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.events.base_event import BaseEvent
+from app.core.events.event_bus import EventBus, event_bus as default_event_bus
+from app.db.database import SessionLocal
+from app.exceptions import BusinessLogicError, ConfigurationError, EntityNotFoundError, ValidationError
+from app.models.zoho_sync import BulkSyncJobStatus, TDSBulkSyncJob
+from app.tds.integrations.zoho import (
+    EntityType, SyncConfig, SyncMode, SyncResult, SyncStatus,
+    UnifiedZohoClient, ZohoAuthManager, ZohoCredentials, ZohoSyncOrchestrator
+)
+
+logger = logging.getLogger(__name__)
+
+EVENT_MODULE = "tds.zoho.bulk_sync"
+JOB_STARTED = "tds.zoho.bulk_sync.started"
+JOB_PROGRESS = "tds.zoho.bulk_sync.progress"
+JOB_COMPLETED = "tds.zoho.bulk_sync.completed"
+JOB_FAILED = "tds.zoho.bulk_sync.failed"
+JOB_CANCELLED = "tds.zoho.bulk_sync.cancelled"
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ============================================================================
+# Page writers
+# ============================================================================
+
+@dataclass
+class PageCounts:
+    """Outcome of writing one page"""
+    processed: int = 0
+    success: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+# (session, job, entities) -> counts. Writes made through the session are
+# committed atomically with the page checkpoint.
+PageWriter = Callable[[Session, TDSBulkSyncJob, List[Dict[str, Any]]], Awaitable[PageCounts]]
+
+
+class OrchestratorPageWriter:
+    """
+    Runs a page through ZohoSyncOrchestrator's validate/transform/save pipeline
+
+    The orchestrator's savers commit on their own connection and upsert by
+    Zoho id, so replaying the page after a crash does not duplicate rows.
+    """
+
+    def __init__(self, orchestrator: ZohoSyncOrchestrator):
+        self.orchestrator = orchestrator
+
+    async def __call__(self, db: Session, job: TDSBulkSyncJob, entities: List[Dict[str, Any]]) -> PageCounts:
+        config = SyncConfig(
+            entity_type=EntityType(job.entity_type),
+            mode=SyncMode(job.mode),
+            batch_size=len(entities),
+            max_concurrent=1,
+            filter_params=job.params
+        )
+        result = SyncResult(
+            sync_id=f"bulk_job_{job.id}_page_{job.next_page}",
+            entity_type=config.entity_type,
+            status=SyncStatus.IN_PROGRESS,
+            mode=config.mode
+        )
+        await self.orchestrator._process_entities_batch(entities=entities, config=config, result=result)
+        return PageCounts(result.total_processed, result.total_success, result.total_failed, result.total_skipped)
+
+
+# ============================================================================
+# Shared Zoho client
+# ============================================================================
+
+_shared_client: Optional[UnifiedZohoClient] = None
+_shared_client_lock = asyncio.Lock()
+
+
+async def get_shared_zoho_client() -> UnifiedZohoClient:
+    """The process-wide Zoho client, created on first use"""
+    global _shared_client
+    async with _shared_client_lock:
+        if _shared_client is None:
+            credentials = ZohoCredentials(
+                client_id=settings.zoho_client_id or os.getenv('ZOHO_CLIENT_ID'),
+                client_secret=settings.zoho_client_secret or os.getenv('ZOHO_CLIENT_SECRET'),
+                refresh_token=settings.zoho_refresh_token or os.getenv('ZOHO_REFRESH_TOKEN'),
+                organization_id=settings.zoho_organization_id or os.getenv('ZOHO_ORGANIZATION_ID')
+            )
+            if not all([credentials.client_id, credentials.client_secret,
+                        credentials.refresh_token, credentials.organization_id]):
+                raise ConfigurationError("Missing Zoho credentials in environment")
+
+            # Tokens are refreshed on demand by get_valid_token
+            auth_manager = ZohoAuthManager(credentials, auto_refresh=False)
+            await auth_manager.start()
+            client = UnifiedZohoClient(
+                auth_manager=auth_manager,
+                organization_id=credentials.organization_id,
+                rate_limit=100
+            )
+            await client.start_session()
+            _shared_client = client
+        return _shared_client
+
+
+async def close_shared_zoho_client() -> None:
+    """Close the shared client's HTTP session (application shutdown)"""
+    global _shared_client
+    async with _shared_client_lock:
+        if _shared_client is not None:
+            await _shared_client.close_session()
+            await _shared_client.auth_manager.stop()
+            _shared_client = None
+
+
+# ============================================================================
+# Job management
+# ============================================================================
+
+class BulkSyncJobService:
+    """Creates, lists, cancels and resumes bulk sync jobs"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+        self,
+        entity_type: EntityType,
+        mode: SyncMode = SyncMode.FULL,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = 200,
+        requested_by: Optional[int] = None
+    ) -> TDSBulkSyncJob:
+        """Queue a bulk import; the runner picks it up on its next poll"""
+        entity_type = EntityType(entity_type)
+        if entity_type not in ZohoSyncOrchestrator.ENTITY_ENDPOINTS:
+            raise ValidationError(f"Bulk sync is not supported for {entity_type.value}")
+        if mode not in (SyncMode.FULL, SyncMode.INCREMENTAL):
+            raise ValidationError(f"Bulk sync mode must be full or incremental, got {mode}")
+
+        job = TDSBulkSyncJob(
+            entity_type=entity_type.value,
+            mode=SyncMode(mode).value,
+            params=dict(params or {}),
+            page_size=page_size,
+            requested_by=requested_by,
+            status=BulkSyncJobStatus.QUEUED,
+            cancel_requested=False,
+            next_page=1,
+            pages_completed=0,
+            total_processed=0,
+            total_success=0,
+            total_failed=0,
+            total_skipped=0,
+            attempts=0
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        logger.info(f"Bulk sync job {job.id} queued for {job.entity_type} ({job.mode})")
+        return job
+
+    def get_job(self, job_id: int) -> TDSBulkSyncJob:
+        job = self.db.get(TDSBulkSyncJob, job_id)
+        if job is None:
+            raise EntityNotFoundError("Bulk sync job", job_id)
+        return job
+
+    def list_jobs(
+        self,
+        status: Optional[BulkSyncJobStatus] = None,
+        entity_type: Optional[str] = None,
+        limit: int = 50
+    ) -> List[TDSBulkSyncJob]:
+        """Most recent jobs first"""
+        query = select(TDSBulkSyncJob).order_by(TDSBulkSyncJob.id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(TDSBulkSyncJob.status == status)
+        if entity_type is not None:
+            query = query.where(TDSBulkSyncJob.entity_type == entity_type)
+        return list(self.db.execute(query).scalars().all())
+
+    def cancel_job(self, job_id: int) -> TDSBulkSyncJob:
+        """
+        Cancel a job
+
+        A queued job is cancelled at once; a running job is flagged and its
+        runner stops after the page in flight is committed.
+        """
+        job = self.get_job(job_id)
+        if job.status in (BulkSyncJobStatus.COMPLETED, BulkSyncJobStatus.FAILED):
+            raise BusinessLogicError(f"Bulk sync job {job_id} already {job.status.value}")
+
+        cancelled = self.db.execute(
+            update(TDSBulkSyncJob)
+            .where(TDSBulkSyncJob.id == job_id, TDSBulkSyncJob.status == BulkSyncJobStatus.QUEUED)
+            .values(status=BulkSyncJobStatus.CANCELLED, cancel_requested=True, completed_at=_utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not cancelled:
+            self.db.execute(
+                update(TDSBulkSyncJob)
+                .where(TDSBulkSyncJob.id == job_id, TDSBulkSyncJob.status == BulkSyncJobStatus.RUNNING)
+                .values(cancel_requested=True)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def resume_job(self, job_id: int) -> TDSBulkSyncJob:
+        """Re-queue a failed or cancelled job; it continues from its checkpoint"""
+        job = self.get_job(job_id)
+        resumed = self.db.execute(
+            update(TDSBulkSyncJob)
+            .where(
+                TDSBulkSyncJob.id == job_id,
+                TDSBulkSyncJob.status.in_([BulkSyncJobStatus.FAILED, BulkSyncJobStatus.CANCELLED])
+            )
+            .values(status=BulkSyncJobStatus.QUEUED, cancel_requested=False, error_message=None,
+                    completed_at=None, lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not resumed:
+            raise BusinessLogicError(f"Only failed or cancelled jobs can be resumed (job {job_id} is {job.status.value})")
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+class BulkSyncRunner:
+    """
+    Claims bulk sync jobs and imports them page by page
+
+    Runs one job at a time; start several processes (or runners) for more
+    throughput. A job is owned only while lease_expires_at is in the future.
+    """
+
+    def __init__(
+        self,
+        client: Optional[UnifiedZohoClient] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        writer: Optional[PageWriter] = None,
+        event_bus: Optional[EventBus] = None,
+        runner_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval_ms: Optional[int] = None
+    ):
+        """
+        Args:
+            client: Zoho client (defaults to the shared process-wide client)
+            session_factory: Creates database sessions
+            writer: Writes one page (defaults to the sync orchestrator pipeline)
+            event_bus: Bus for progress events (defaults to the global bus)
+            runner_id: Lease owner name (defaults to host:pid:random)
+            lease_seconds: Lease length, renewed at every checkpoint
+            poll_interval_ms: Idle wait between claim attempts
+        """
+        self.client = client
+        self.session_factory = session_factory
+        self.writer = writer
+        self.event_bus = event_bus or default_event_bus
+        self.runner_id = runner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.lease = timedelta(seconds=lease_seconds or settings.tds_bulk_sync_lease_seconds)
+        self.poll_interval = (poll_interval_ms or settings.tds_bulk_sync_poll_interval_ms) / 1000
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------------
+
+    def start(self) -> asyncio.Task:
+        """Run the claim loop as a background task"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Bulk sync runner {self.runner_id} started")
+        return self._task
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop after the page in flight; the current job is handed back
+
+        If the page does not finish within timeout the task is cancelled and
+        the job is resumed by another runner when the lease expires.
+        """
+        self._stopping = True
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        logger.info(f"Bulk sync runner {self.runner_id} stopped")
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                if not await self.run_once():
+                    await asyncio.sleep(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Error in bulk sync runner loop: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> bool:
+        """Claim and run one job; False when there was nothing to claim"""
+        job_id = self.claim_next()
+        if job_id is None:
+            return False
+        await self.run_job(job_id)
+        return True
+
+    # ------------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            TDSBulkSyncJob.status == BulkSyncJobStatus.QUEUED,
+            and_(TDSBulkSyncJob.status == BulkSyncJobStatus.RUNNING, TDSBulkSyncJob.lease_expires_at < now)
+        )
+
+    def claim_next(self) -> Optional[int]:
+        """Take the oldest queued job, or a running job whose runner died"""
+        now = _utcnow()
+        with self.session_factory() as db:
+            candidates = db.execute(
+                select(TDSBulkSyncJob.id).where(self._claimable(now)).order_by(TDSBulkSyncJob.id).limit(10)
+            ).scalars().all()
+            for job_id in candidates:
+                claimed = db.execute(
+                    update(TDSBulkSyncJob)
+                    .where(TDSBulkSyncJob.id == job_id, self._claimable(now))
+                    .values(
+                        status=BulkSyncJobStatus.RUNNING,
+                        lease_owner=self.runner_id,
+                        lease_expires_at=now + self.lease,
+                        attempts=TDSBulkSyncJob.attempts + 1,
+                        started_at=func.coalesce(TDSBulkSyncJob.started_at, now)
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    logger.info(f"Bulk sync runner {self.runner_id} claimed job {job_id}")
+                    return job_id
+        return None
+
+    def _owned(self, job_id: int):
+        return and_(
+            TDSBulkSyncJob.id == job_id,
+            TDSBulkSyncJob.lease_owner == self.runner_id,
+            TDSBulkSyncJob.status == BulkSyncJobStatus.RUNNING
+        )
+
+    def _update_owned(self, db: Session, job_id: int, **values) -> bool:
+        return db.execute(
+            update(TDSBulkSyncJob).where(self._owned(job_id)).values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+
+    # ------------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------------
+
+    def _writer(self, client: UnifiedZohoClient) -> PageWriter:
+        if self.writer is None:
+            self.writer = OrchestratorPageWriter(ZohoSyncOrchestrator(zoho_client=client))
+        return self.writer
+
+    async def run_job(self, job_id: int) -> Optional[BulkSyncJobStatus]:
+        """
+        Import a claimed job from its checkpoint
+
+        Returns the job's final status, or None when the job was handed back
+        (graceful stop) or another runner took it over.
+        """
+        with self.session_factory() as db:
+            job = db.get(TDSBulkSyncJob, job_id)
+            if job.cancel_requested:
+                return await self._finish(db, job, BulkSyncJobStatus.CANCELLED, JOB_CANCELLED)
+
+            try:
+                client = self.client or await get_shared_zoho_client()
+                writer = self._writer(client)
+                api_type, endpoint = ZohoSyncOrchestrator.ENTITY_ENDPOINTS[EntityType(job.entity_type)]
+            except Exception as e:
+                logger.error(f"Bulk sync job {job_id} could not start: {e}", exc_info=True)
+                return await self._finish(db, job, BulkSyncJobStatus.FAILED, JOB_FAILED, error=str(e))
+
+            await self._publish(JOB_STARTED, job)
+
+            while True:
+                page = job.next_page
+                try:
+                    entities, has_more = await client.fetch_page(
+                        api_type, endpoint, page, job.params, job.page_size
+                    )
+                    counts = await writer(db, job, entities) if entities else PageCounts()
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Bulk sync job {job_id} failed on page {page}: {e}", exc_info=True)
+                    return await self._finish(db, job, BulkSyncJobStatus.FAILED, JOB_FAILED, error=str(e))
+
+                finished = not entities or not has_more
+                if not self._checkpoint(db, job_id, counts, finished):
+                    db.rollback()
+                    logger.warning(f"Bulk sync runner {self.runner_id} lost the lease on job {job_id}")
+                    return None
+                db.commit()
+                db.refresh(job)
+
+                await self._publish(JOB_PROGRESS, job, page=page, page_items=len(entities))
+                logger.info(
+                    f"Bulk sync job {job_id}: page {page} committed "
+                    f"({job.total_processed} processed, {job.total_failed} failed)"
+                )
+
+                if finished:
+                    await self._publish(JOB_COMPLETED, job)
+                    return job.status
+                if job.cancel_requested:
+                    return await self._finish(db, job, BulkSyncJobStatus.CANCELLED, JOB_CANCELLED)
+                if self._stopping:
+                    self._release(db, job_id)
+                    return None
+
+    def _checkpoint(self, db: Session, job_id: int, counts: PageCounts, finished: bool) -> bool:
+        """Advance the cursor and counters, renewing the lease; False if the lease was lost"""
+        now = _utcnow()
+        values = dict(
+            next_page=TDSBulkSyncJob.next_page + 1,
+            pages_completed=TDSBulkSyncJob.pages_completed + 1,
+            total_processed=TDSBulkSyncJob.total_processed + counts.processed,
+            total_success=TDSBulkSyncJob.total_success + counts.success,
+            total_failed=TDSBulkSyncJob.total_failed + counts.failed,
+            total_skipped=TDSBulkSyncJob.total_skipped + counts.skipped,
+            checkpointed_at=now,
+            lease_expires_at=now + self.lease
+        )
+        if finished:
+            values.update(status=BulkSyncJobStatus.COMPLETED, completed_at=now,
+                          lease_owner=None, lease_expires_at=None)
+        return self._update_owned(db, job_id, **values)
+
+    def _release(self, db: Session, job_id: int) -> None:
+        """Hand a job back to the queue (graceful stop)"""
+        if self._update_owned(db, job_id, status=BulkSyncJobStatus.QUEUED,
+                              lease_owner=None, lease_expires_at=None):
+            logger.info(f"Bulk sync runner {self.runner_id} released job {job_id}")
+        db.commit()
+
+    async def _finish(
+        self,
+        db: Session,
+        job: TDSBulkSyncJob,
+        status: BulkSyncJobStatus,
+        event_type: str,
+        error: Optional[str] = None
+    ) -> Optional[BulkSyncJobStatus]:
+        finished = self._update_owned(
+            db, job.id, status=status, error_message=error, completed_at=_utcnow(),
+            lease_owner=None, lease_expires_at=None
+        )
+        db.commit()
+        if not finished:
+            return None
+        db.refresh(job)
+        await self._publish(event_type, job)
+        return status
+
+    async def _publish(self, event_type: str, job: TDSBulkSyncJob, **extra) -> None:
+        try:
+            await self.event_bus.publish(BaseEvent(
+                event_type=event_type,
+                module=EVENT_MODULE,
+                user_id=job.requested_by,
+                data={
+                    "job_id": job.id,
+                    "entity_type": job.entity_type,
+                    "status": job.status.value,
+                    "next_page": job.next_page,
+                    "pages_completed": job.pages_completed,
+                    "total_processed": job.total_processed,
+                    "total_success": job.total_success,
+                    "total_failed": job.total_failed,
+                    "total_skipped": job.total_skipped,
+                    "attempts": job.attempts,
+                    "error": job.error_message,
+                    **extra
+                }
+            ))
+        except Exception as e:
+            logger.warning(f"Failed to publish event {event_type}: {e}")
+
+
+# ============================================================================
+# Application runner
+# ============================================================================
+
+bulk_sync_runner: Optional[BulkSyncRunner] = None
+
+
+async def start_bulk_sync_runner() -> None:
+    """Start the process's bulk sync runner (application startup)"""
+    global bulk_sync_runner
+    if bulk_sync_runner is None:
+        bulk_sync_runner = BulkSyncRunner()
+    bulk_sync_runner.start()
+
+
+async def stop_bulk_sync_runner() -> None:
+    """Stop the runner and close the shared Zoho client (application shutdown)"""
+    if bulk_sync_runner is not None:
+        await bulk_sync_runner.stop()
+    await close_shared_zoho_client()
@@ -0,0 +1,702 @@
+"""
+Zoho Sync Planner
+Streaming dry-run diff between Zoho and the local tables, applied verbatim
+
+Records are read one page at a time, either from a Zoho export file
+(a top-level JSON array, parsed incrementally) or from the Zoho list API.
+Each record is projected through the entity's field mapping and hashed;
+one batched SELECT per page fetches the local rows by Zoho id together
+with their stored zoho_content_hash and mapped columns. Rows whose hash
+matches are unchanged without comparing a single column; the rest are
+compared field by field. Every decision is written to
+tds_sync_plan_entries as the page is processed, so memory does not grow
+with the catalog. Local rows with a Zoho id the source no longer returns
+are found afterwards with one anti-join.
+
+execute_plan applies exactly the stored entries: inserts skip ids that
+appeared since planning, updates only land where the local hash is still
+the one seen at planning time (anything else is counted as a conflict),
+and orphans are deactivated only when the mapping enables delete_sync.
+"""
+import hashlib
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio.from_thread
+
+from sqlalchemy import Boolean, Enum, Integer, Numeric, and_, bindparam, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.exceptions import BusinessLogicError, EntityNotFoundError, ValidationError
+from app.models.customer import Customer
+from app.models.migration import MigrationVendor
+from app.models.product import Category, Product
+from app.models.zoho_sync import TDSSyncPlan, TDSSyncPlanEntry
+from app.tds.integrations.zoho import ZohoAPI
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+UNCHANGED = "unchanged"
+ORPHANED = "orphaned"
+INVALID = "invalid"
+
+DEFAULT_PAGE_SIZE = 500
+_READ_CHUNK = 64 * 1024
+
+# Zoho list endpoint per entity type: (api, endpoint, filters)
+API_SOURCES: Dict[str, Tuple[ZohoAPI, str, Dict[str, Any]]] = {
+    "item": (ZohoAPI.INVENTORY, "items", {}),
+    "customer": (ZohoAPI.BOOKS, "contacts", {"contact_type": "customer"}),
+    "vendor": (ZohoAPI.BOOKS, "contacts", {"contact_type": "vendor"}),
+}
+
+
+# ============================================================================
+# INCREMENTAL JSON ARRAY READER
+# ============================================================================
+
+def iter_json_array(stream, chunk_size: int = _READ_CHUNK) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time
+
+    Only the current read chunk plus the element being decoded are held in
+    memory; the buffer is compacted when more input is needed, never per
+    element.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("utf-8")
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+
+    if not skip_whitespace() or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    expect_value = True
+    while True:
+        if not skip_whitespace():
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+        if not expect_value:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {buffer[pos]!r}")
+            pos += 1
+            expect_value = True
+            continue
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(buffer) and not eof and fill():
+                continue
+            break
+        pos = end
+        expect_value = False
+        yield value
+
+
+def iter_export_pages(path: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Pages of records from a Zoho export file"""
+    with open(path, "r", encoding="utf-8") as stream:
+        page = []
+        for record in iter_json_array(stream):
+            page.append(record)
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+
+async def iter_api_pages(client, api_type, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                         page_size: int = 200) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Pages of records from a Zoho list endpoint (UnifiedZohoClient.fetch_page)"""
+    page = 1
+    while True:
+        items, has_more = await client.fetch_page(api_type, endpoint, page, params=params, page_size=page_size)
+        if items:
+            yield items
+        if not items or not has_more:
+            return
+        page += 1
+
+
+async def _next_page(pages: AsyncIterator[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+    try:
+        return await pages.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def iter_from_async(pages: AsyncIterator[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Pages of an async source for a planner running in a worker thread
+
+    Each page is fetched on the event loop (anyio.from_thread), so the Zoho
+    client stays on its loop while parsing and database work stay off it.
+    """
+    while True:
+        page = anyio.from_thread.run(_next_page, pages)
+        if page is None:
+            return
+        yield page
+
+
+# ============================================================================
+# TARGETS AND FIELD RULES
+# ============================================================================
+
+@dataclass(frozen=True)
+class SyncTarget:
+    """Local table an entity type syncs into"""
+    entity_type: str
+    model: Any
+    key_column: str  # column holding the Zoho id
+    aliases: Dict[str, str] = field(default_factory=dict)  # mapping tsh_field -> actual column
+    # (db, zoho_id, values, cache) -> columns required on insert that the mapping may not supply
+    insert_defaults: Optional[Callable[[Session, str, Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None
+
+
+def _general_category_id(db: Session) -> int:
+    category_id = db.execute(select(Category.id).where(Category.name == "General").limit(1)).scalar()
+    if category_id is None:
+        category_id = db.execute(insert(Category).values(name="General", name_ar="عام", is_active=True)).inserted_primary_key[0]
+    return category_id
+
+
+def _item_defaults(db: Session, zoho_id: str, values: Dict[str, Any], cache: Dict[str, Any]) -> Dict[str, Any]:
+    if "category_id" not in cache:
+        cache["category_id"] = _general_category_id(db)
+    return {
+        "sku": f"ZOHO-{zoho_id}",
+        "name": f"Zoho item {zoho_id}",
+        "unit_price": Decimal("0"),
+        "unit_of_measure": "piece",
+        "category_id": cache["category_id"],
+    }
+
+
+def _customer_defaults(db: Session, zoho_id: str, values: Dict[str, Any], cache: Dict[str, Any]) -> Dict[str, Any]:
+    name = values.get("name") or f"Zoho customer {zoho_id}"
+    return {"customer_code": f"ZC-{zoho_id}", "name": name, "name_ar": name}
+
+
+def _vendor_defaults(db: Session, zoho_id: str, values: Dict[str, Any], cache: Dict[str, Any]) -> Dict[str, Any]:
+    name = values.get("name_en") or f"Zoho vendor {zoho_id}"
+    return {"code": f"ZV-{zoho_id}", "name_en": name, "name_ar": name}
+
+
+SYNC_TARGETS: Dict[str, SyncTarget] = {
+    "item": SyncTarget("item", Product, "zoho_item_id", insert_defaults=_item_defaults),
+    "customer": SyncTarget("customer", Customer, "zoho_contact_id",
+                           aliases={"zoho_customer_id": "zoho_contact_id"}, insert_defaults=_customer_defaults),
+    "vendor": SyncTarget("vendor", MigrationVendor, "zoho_vendor_id",
+                         aliases={"name": "name_en", "address": "address_en"}, insert_defaults=_vendor_defaults),
+}
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """One mapped column: where the value comes from and how it is coerced"""
+    zoho_field: str
+    column: str
+    kind: str  # text, number, integer, boolean, enum
+    required: bool
+    default: Optional[str]
+    transform: Optional[str]
+    length: Optional[int] = None
+    choices: Tuple[str, ...] = ()
+
+
+def _column_kind(column) -> Tuple[str, Optional[int], Tuple[str, ...]]:
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return "boolean", None, ()
+    if isinstance(column_type, Enum):
+        return "enum", None, tuple(column_type.enums)
+    if isinstance(column_type, Integer):
+        return "integer", None, ()
+    if isinstance(column_type, Numeric):
+        return "number", None, ()
+    return "text", getattr(column_type, "length", None), ()
+
+
+def compile_rules(target: SyncTarget, field_mappings: List[Dict[str, Any]]) -> Tuple[str, List[FieldRule], List[str]]:
+    """
+    Resolve a mapping against the target table
+
+    Returns the Zoho field holding the id, the rules for mapped columns (the
+    first mapping wins when a column is listed twice) and the tsh_fields
+    that have no column on the target.
+    """
+    columns = target.model.__table__.columns
+    key_field = None
+    rules: List[FieldRule] = []
+    seen = set()
+    unmapped = []
+    for mapping in field_mappings:
+        column_name = target.aliases.get(mapping["tsh_field"], mapping["tsh_field"])
+        if column_name == target.key_column:
+            key_field = key_field or mapping["zoho_field"]
+            continue
+        if column_name not in columns or column_name in ("id", "zoho_content_hash"):
+            unmapped.append(mapping["tsh_field"])
+            continue
+        if column_name in seen:
+            continue
+        seen.add(column_name)
+        kind, length, choices = _column_kind(columns[column_name])
+        rules.append(FieldRule(
+            zoho_field=mapping["zoho_field"], column=column_name, kind=kind,
+            required=bool(mapping.get("is_required")), default=mapping.get("default_value"),
+            transform=mapping.get("transformation_rule"), length=length, choices=choices,
+        ))
+    if key_field is None:
+        raise ValidationError(f"Mapping for {target.entity_type} does not map the Zoho id to {target.key_column}")
+    return key_field, rules, unmapped
+
+
+def mapping_hash(field_mappings: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(field_mappings, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def coerce(rule: FieldRule, raw: Any) -> Any:
+    """Zoho (or stored) value -> the Python value written to the column"""
+    if raw is None or raw == "":
+        raw = rule.default
+        if raw is None or raw == "":
+            return None
+    if rule.kind == "boolean":
+        if isinstance(raw, bool):
+            return raw
+        return str(raw).strip().lower() in ("true", "1", "yes", "active", "y")
+    if rule.kind == "number":
+        try:
+            return Decimal(str(raw))
+        except InvalidOperation:
+            raise ValueError(f"{rule.zoho_field}: {raw!r} is not a number")
+    if rule.kind == "integer":
+        try:
+            return int(Decimal(str(raw)))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"{rule.zoho_field}: {raw!r} is not an integer")
+    if rule.kind == "enum":
+        for candidate in (raw, rule.default):
+            value = str(candidate or "").strip().upper()
+            if value in rule.choices:
+                return value
+        return None
+
+    value = str(raw)
+    if rule.transform == "uppercase":
+        value = value.upper()
+    elif rule.transform == "lowercase":
+        value = value.lower()
+    if rule.length:
+        value = value[:rule.length]
+    return value
+
+
+def _local_value(rule: FieldRule, value: Any) -> Any:
+    """A stored column value in the form coerce() produces, without re-transforming it"""
+    if value is None or value == "":
+        return None
+    if rule.kind == "number":
+        return Decimal(str(value))
+    if rule.kind == "enum":
+        return getattr(value, "name", value)
+    return value
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return value
+
+
+def content_hash(values: Dict[str, Any]) -> str:
+    """SHA-256 over the mapped column values, order independent"""
+    payload = repr(sorted((column, _canonical(value)) for column, value in values.items()))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+
+class ZohoSyncPlanner:
+    """Builds a stored TDSSyncPlan for one entity type"""
+
+    def __init__(self, db: Session, entity_type: str, field_mappings: List[Dict[str, Any]]):
+        if entity_type not in SYNC_TARGETS:
+            raise ValidationError(f"Invalid entity type: {entity_type}")
+        self.db = db
+        self.target = SYNC_TARGETS[entity_type]
+        self.field_mappings = field_mappings
+        self.key_field, self.rules, self.unmapped = compile_rules(self.target, field_mappings)
+        self.table = self.target.model.__table__
+        self.key = self.table.c[self.target.key_column]
+
+    def project(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Mapped column values for one Zoho record; raises ValueError if invalid"""
+        values = {}
+        for rule in self.rules:
+            value = coerce(rule, record.get(rule.zoho_field))
+            if value is None and rule.required:
+                raise ValueError(f"Missing required field {rule.zoho_field}")
+            values[rule.column] = value
+        return values
+
+    def plan(self, pages: Iterable[List[Dict[str, Any]]], source: str, source_ref: Optional[str] = None) -> TDSSyncPlan:
+        """Stream the source and store the exact plan (blocking; run it off the event loop)"""
+        plan = TDSSyncPlan(
+            entity_type=self.target.entity_type, source=source, source_ref=source_ref,
+            field_mappings=self.field_mappings, mapping_hash=mapping_hash(self.field_mappings),
+            status="planned", field_changes={},
+        )
+        self.db.add(plan)
+        self.db.flush()
+        plan_id = plan.id
+
+        total = 0
+        field_changes: Counter = Counter()
+        for page in pages:
+            total += len(page)
+            entries = self._plan_page(plan_id, page, field_changes)
+            if entries:
+                self.db.execute(insert(TDSSyncPlanEntry.__table__), entries)
+
+        self._mark_duplicates(plan_id, field_changes)
+        self._add_orphans(plan_id)
+
+        counts = dict(self.db.execute(
+            select(TDSSyncPlanEntry.action, func.count())
+            .where(TDSSyncPlanEntry.plan_id == plan_id)
+            .group_by(TDSSyncPlanEntry.action)
+        ).all())
+        plan = self.db.get(TDSSyncPlan, plan_id)
+        plan.total_records = total
+        plan.insert_count = counts.get(INSERT, 0)
+        plan.update_count = counts.get(UPDATE, 0)
+        plan.unchanged_count = counts.get(UNCHANGED, 0)
+        plan.orphaned_count = counts.get(ORPHANED, 0)
+        plan.invalid_count = counts.get(INVALID, 0)
+        plan.field_changes = {column: count for column, count in sorted(field_changes.items()) if count}
+        self.db.commit()
+        self.db.refresh(plan)
+        logger.info(
+            f"Sync plan {plan.id} for {plan.entity_type}: {plan.insert_count} insert, {plan.update_count} update, "
+            f"{plan.unchanged_count} unchanged, {plan.orphaned_count} orphaned, {plan.invalid_count} invalid"
+        )
+        return plan
+
+    def _plan_page(self, plan_id: int, page: List[Dict[str, Any]], field_changes: Counter) -> List[Dict[str, Any]]:
+        entries = []
+        projected = []
+        for record in page:
+            zoho_id = record.get(self.key_field) if isinstance(record, dict) else None
+            if zoho_id in (None, ""):
+                entries.append(_entry(plan_id, None, INVALID, error=f"Missing {self.key_field}"))
+                continue
+            zoho_id = str(zoho_id)
+            try:
+                values = self.project(record)
+            except ValueError as exc:
+                entries.append(_entry(plan_id, zoho_id, INVALID, error=str(exc)))
+                continue
+            projected.append((zoho_id, values))
+
+        if not projected:
+            return entries
+
+        columns = [self.table.c[rule.column] for rule in self.rules]
+        local = {
+            row[0]: row
+            for row in self.db.execute(
+                select(self.key, self.table.c.id, self.table.c.zoho_content_hash, *columns)
+                .where(self.key.in_({zoho_id for zoho_id, _ in projected}))
+            )
+        }
+
+        for zoho_id, values in projected:
+            digest = content_hash(values)
+            row = local.get(zoho_id)
+            if row is None:
+                entries.append(_entry(plan_id, zoho_id, INSERT, content_hash=digest, values=_jsonable(values)))
+                continue
+            local_id, local_hash = row[1], row[2]
+            if local_hash == digest:
+                entries.append(_entry(plan_id, zoho_id, UNCHANGED, local_id=local_id,
+                                      content_hash=digest, previous_hash=local_hash))
+                continue
+            changed = [
+                rule.column for index, rule in enumerate(self.rules)
+                if _canonical(_local_value(rule, row[3 + index])) != _canonical(values[rule.column])
+            ]
+            if changed:
+                field_changes.update(changed)
+                entries.append(_entry(plan_id, zoho_id, UPDATE, local_id=local_id, content_hash=digest,
+                                      previous_hash=local_hash, changed_fields=changed,
+                                      values=_jsonable({column: values[column] for column in changed})))
+            else:
+                # Same content, hash missing or stale: execution only records the hash
+                entries.append(_entry(plan_id, zoho_id, UNCHANGED, local_id=local_id,
+                                      content_hash=digest, previous_hash=local_hash))
+        return entries
+
+    def _mark_duplicates(self, plan_id: int, field_changes: Counter) -> None:
+        """Ids repeated in the source: the first occurrence stands, the rest are invalid"""
+        entries = TDSSyncPlanEntry.__table__
+        first = (
+            select(func.min(entries.c.id))
+            .where(entries.c.plan_id == plan_id, entries.c.zoho_id.isnot(None))
+            .group_by(entries.c.zoho_id)
+        )
+        duplicate = and_(entries.c.plan_id == plan_id, entries.c.zoho_id.isnot(None), entries.c.id.notin_(first))
+        for changed in self.db.execute(
+            select(entries.c.changed_fields).where(duplicate, entries.c.action == UPDATE)
+        ).scalars():
+            field_changes.subtract(changed or [])
+        self.db.execute(
+            update(entries).where(duplicate)
+            .values(action=INVALID, values=None, changed_fields=None, error="Duplicate record in source")
+        )
+
+    def _add_orphans(self, plan_id: int) -> None:
+        """Local rows with a Zoho id the source did not return (active rows only)"""
+        entries = TDSSyncPlanEntry.__table__
+        condition = [
+            self.key.isnot(None),
+            ~exists().where(entries.c.plan_id == plan_id, entries.c.zoho_id == self.key),
+        ]
+        if "is_active" in self.table.c:
+            condition.append(self.table.c.is_active.is_(True))
+        self.db.execute(
+            insert(entries).from_select(
+                ["plan_id", "zoho_id", "action", "local_id", "previous_hash"],
+                select(literal(plan_id), self.key, literal(ORPHANED), self.table.c.id, self.table.c.zoho_content_hash)
+                .where(*condition)
+            )
+        )
+
+
+def _entry(plan_id, zoho_id, action, local_id=None, content_hash=None, previous_hash=None,
+           changed_fields=None, values=None, error=None) -> Dict[str, Any]:
+    return {
+        "plan_id": plan_id, "zoho_id": zoho_id, "action": action, "local_id": local_id,
+        "content_hash": content_hash, "previous_hash": previous_hash,
+        "changed_fields": changed_fields, "values": values, "error": error,
+    }
+
+
+def _jsonable(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {column: _canonical(value) for column, value in values.items()}
+
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+def get_plan(db: Session, plan_id: int) -> TDSSyncPlan:
+    plan = db.get(TDSSyncPlan, plan_id)
+    if plan is None:
+        raise EntityNotFoundError("Sync plan", plan_id)
+    return plan
+
+
+def execute_plan(db: Session, plan_id: int, field_mappings: Optional[List[Dict[str, Any]]] = None,
+                 delete_sync: bool = False, force: bool = False,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, int]:
+    """
+    Apply a stored plan in one transaction, page by page over its entries
+
+    field_mappings is the current mapping; a plan built with a different one
+    is refused unless force is set (the plan's own snapshot is what gets
+    applied either way).
+    """
+    plan = get_plan(db, plan_id)
+    if plan.status != "planned":
+        raise BusinessLogicError(f"Sync plan {plan_id} is {plan.status}; analyze again to build a new plan")
+    if field_mappings is not None and mapping_hash(field_mappings) != plan.mapping_hash and not force:
+        raise BusinessLogicError(f"Field mapping changed since sync plan {plan_id} was built; analyze again")
+
+    # Claim the plan: of two concurrent executes only one moves it out of planned
+    claimed = db.execute(
+        update(TDSSyncPlan.__table__)
+        .where(TDSSyncPlan.__table__.c.id == plan_id, TDSSyncPlan.__table__.c.status == "planned")
+        .values(status="executing")
+    ).rowcount
+    db.commit()
+    if not claimed:
+        db.refresh(plan)
+        raise BusinessLogicError(f"Sync plan {plan_id} is {plan.status}; analyze again to build a new plan")
+
+    target = SYNC_TARGETS[plan.entity_type]
+    _, rules, _ = compile_rules(target, plan.field_mappings)
+    applier = _PlanApplier(db, target, rules, delete_sync)
+    entries = TDSSyncPlanEntry.__table__
+    try:
+        for action in (INSERT, UPDATE, UNCHANGED, ORPHANED):
+            last_id = 0
+            while True:
+                page = db.execute(
+                    select(entries.c.id, entries.c.zoho_id, entries.c.local_id, entries.c.content_hash,
+                           entries.c.previous_hash, entries.c["values"].label("stored"))
+                    .where(entries.c.plan_id == plan_id, entries.c.action == action, entries.c.id > last_id)
+                    .order_by(entries.c.id)
+                    .limit(page_size)
+                ).all()
+                if not page:
+                    break
+                applier.apply(action, page)
+                last_id = page[-1].id
+    except Exception as exc:
+        db.rollback()
+        plan = get_plan(db, plan_id)
+        plan.status = "failed"
+        plan.error_message = str(exc)
+        db.commit()
+        raise
+
+    plan = get_plan(db, plan_id)
+    plan.status = "executed"
+    plan.executed_at = datetime.now(timezone.utc)
+    plan.execution_stats = dict(applier.stats)
+    db.commit()
+    logger.info(f"Sync plan {plan_id} executed: {dict(applier.stats)}")
+    return dict(applier.stats)
+
+
+class _PlanApplier:
+    def __init__(self, db: Session, target: SyncTarget, rules: List[FieldRule], delete_sync: bool):
+        self.db = db
+        self.target = target
+        self.rules = {rule.column: rule for rule in rules}
+        self.delete_sync = delete_sync
+        self.table = target.model.__table__
+        self.key = self.table.c[target.key_column]
+        self.stats = Counter(inserted=0, updated=0, hashes_recorded=0, deactivated=0, conflicts=0, failed=0)
+        self._defaults_cache: Dict[str, Any] = {}
+
+    def apply(self, action: str, page) -> None:
+        getattr(self, f"_apply_{action}")(page)
+
+    def _stamp(self) -> Dict[str, Any]:
+        return {"zoho_last_sync": datetime.now(timezone.utc)} if "zoho_last_sync" in self.table.c else {}
+
+    def _values(self, stored: Dict[str, Any]) -> Dict[str, Any]:
+        return {column: coerce(self.rules[column], value) for column, value in (stored or {}).items()}
+
+    def _apply_insert(self, page) -> None:
+        present = set(self.db.execute(select(self.key).where(self.key.in_([e.zoho_id for e in page]))).scalars())
+        rows = []
+        for entry in page:
+            if entry.zoho_id in present:
+                self.stats["conflicts"] += 1
+                continue
+            values = self._values(entry.stored)
+            row = {**self._insert_defaults(entry.zoho_id, values)}
+            row.update({column: value for column, value in values.items() if value is not None})
+            row.update({self.target.key_column: entry.zoho_id, "zoho_content_hash": entry.content_hash, **self._stamp()})
+            rows.append(row)
+        if not rows:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(self.table), rows)
+            self.stats["inserted"] += len(rows)
+        except IntegrityError:
+            # Unique clash with a row created outside the sync (sku, code...): isolate it
+            for row in rows:
+                try:
+                    with self.db.begin_nested():
+                        self.db.execute(insert(self.table).values(**row))
+                    self.stats["inserted"] += 1
+                except IntegrityError as exc:
+                    self.stats["failed"] += 1
+                    logger.warning(f"Insert of Zoho {self.target.entity_type} {row[self.target.key_column]} failed: {exc.orig}")
+
+    def _insert_defaults(self, zoho_id: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        if self.target.insert_defaults is None:
+            return {}
+        return self.target.insert_defaults(self.db, zoho_id, values, self._defaults_cache)
+
+    def _guarded_update(self, rows: List[Dict[str, Any]], columns: Tuple[str, ...]) -> int:
+        statement = (
+            update(self.table)
+            .where(self.key == bindparam("b_key"),
+                   func.coalesce(self.table.c.zoho_content_hash, "") == bindparam("b_previous"))
+            .values(zoho_content_hash=bindparam("b_hash"),
+                    **{column: bindparam(f"b_{column}") for column in columns}, **self._stamp())
+        )
+        return self.db.execute(statement, rows).rowcount
+
+    def _apply_update(self, page) -> None:
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for entry in page:
+            values = self._values(entry.stored)
+            columns = tuple(sorted(values))
+            groups.setdefault(columns, []).append({
+                "b_key": entry.zoho_id, "b_previous": entry.previous_hash or "", "b_hash": entry.content_hash,
+                **{f"b_{column}": values[column] for column in columns},
+            })
+        for columns, rows in groups.items():
+            updated = self._guarded_update(rows, columns)
+            self.stats["updated"] += updated
+            self.stats["conflicts"] += len(rows) - updated
+
+    def _apply_unchanged(self, page) -> None:
+        rows = [
+            {"b_key": entry.zoho_id, "b_previous": entry.previous_hash or "", "b_hash": entry.content_hash}
+            for entry in page if entry.previous_hash != entry.content_hash
+        ]
+        if rows:
+            self.stats["hashes_recorded"] += self._guarded_update(rows, ())
+
+    def _apply_orphaned(self, page) -> None:
+        if not self.delete_sync or "is_active" not in self.table.c:
+            return
+        result = self.db.execute(
+            update(self.table)
+            .where(self.table.c.id.in_([entry.local_id for entry in page]), self.table.c.is_active.is_(True))
+            .values(is_active=False)
+        )
+        self.stats["deactivated"] += result.rowcount
@@ -2,7 +2,7 @@
 TDS Events - Domain Events for Data Synchronization
 Integrates with the main event bus for decoupled communication
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -62,6 +62,7 @@ class TDSSyncCompletedEvent(TDSEvent):
         - successful: Number of successful syncs
         - failed: Number of failed syncs
         - duration_seconds: Time taken
+        - product_ids: Local ids of the products synced (product runs only)
     """
 
     def __init__(
@@ -72,6 +73,7 @@ class TDSSyncCompletedEvent(TDSEvent):
         successful: int,
         failed: int,
         duration_seconds: float,
+        product_ids: Optional[List[int]] = None,
         **kwargs
     ):
         super().__init__(
@@ -85,6 +87,7 @@ class TDSSyncCompletedEvent(TDSEvent):
                 "successful": successful,
                 "failed": failed,
                 "duration_seconds": duration_seconds,
+                "product_ids": product_ids,
             },
             **kwargs
         )
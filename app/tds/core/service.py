@@ -32,6 +32,7 @@ from app.models.zoho_sync import (
     OperationType,
     AlertSeverity,
 )
+from app.models.product import Product
 from sqlalchemy import select, update, delete, func, and_, or_
 import time
 
@@ -130,6 +131,7 @@ class TDSService:
         duration = None
         if sync_run.started_at:
             duration = int((datetime.utcnow() - sync_run.started_at).total_seconds())
+        entity_type = sync_run.entity_type
 
         # Update sync run
         await self.db.execute(
@@ -147,14 +149,29 @@ class TDSService:
         )
         await self.db.commit()
 
+        # Products whose stock may have changed, for targeted low-stock scans
+        product_ids = None
+        if entity_type == EntityType.PRODUCT and successful:
+            result = await self.db.execute(
+                select(Product.id)
+                .join(TDSSyncQueue, TDSSyncQueue.source_entity_id == Product.zoho_item_id)
+                .where(
+                    TDSSyncQueue.sync_run_id == sync_run_id,
+                    TDSSyncQueue.status == EventStatus.COMPLETED,
+                )
+                .distinct()
+            )
+            product_ids = sorted(result.scalars().all())
+
         # Publish event
         event = TDSSyncCompletedEvent(
             sync_run_id=sync_run_id,
-            entity_type=str(sync_run.entity_type) if sync_run.entity_type else "all",
+            entity_type=entity_type.value if entity_type else "all",
             total_processed=total_processed,
             successful=successful,
             failed=failed,
             duration_seconds=duration or 0,
+            product_ids=product_ids,
         )
         await self.event_bus.publish(event)
 
@@ -191,6 +208,7 @@ class TDSService:
         duration = None
         if sync_run.started_at:
             duration = int((datetime.utcnow() - sync_run.started_at).total_seconds())
+        entity_type = sync_run.entity_type
 
         # Update sync run
         await self.db.execute(
@@ -208,7 +226,7 @@ class TDSService:
         # Publish event
         event = TDSSyncFailedEvent(
             sync_run_id=sync_run_id,
-            entity_type=str(sync_run.entity_type) if sync_run.entity_type else "all",
+            entity_type=entity_type.value if entity_type else "all",
             error_message=error_message,
             error_code=error_code,
         )
@@ -70,6 +70,16 @@ async def handle_sync_completed(event: TDSSyncCompletedEvent):
             duration=data['duration_seconds']
         )
 
+        # Stock changed: let NeuroLink re-evaluate low-stock alerts for the
+        # synced products (all products when the run does not carry ids)
+        if data['entity_type'] in ['product', 'stock_adjustment', 'inventory', 'stock', 'products', 'items'] \
+                and data['successful'] > 0:
+            await neurolink_emitter.emit_stock_changed(
+                change_id=data['sync_run_id'],
+                product_ids=data.get('product_ids') or None,
+                entity_type=data['entity_type']
+            )
+
         # Special handling for price list updates
         if data['entity_type'] in ['price_list', 'price_list_items', 'pricelists']:
             await neurolink_emitter.emit_price_list_updated(
@@ -20,8 +20,9 @@ Date: November 6, 2025
 Version: 2.0.0
 """
 
-from .client import UnifiedZohoClient, ZohoAPI, ZohoAPIError
+from .client import UnifiedZohoClient, ZohoAPI, ZohoAPIError, ZohoServerError
 from .auth import ZohoAuthManager, ZohoCredentials, ZohoAuthError
+from .token_broker import ZohoTokenBroker, RedisTokenStore, DatabaseTokenStore
 from .sync import ZohoSyncOrchestrator, SyncConfig, SyncResult, SyncMode, EntityType, SyncStatus
 from .webhooks import ZohoWebhookManager, WebhookEvent, WebhookStatus, WebhookPayload
 from .processors import ProductProcessor, InventoryProcessor, CustomerProcessor
@@ -38,10 +39,14 @@ __all__ = [
     # Client
     'ZohoAPI',
     'ZohoAPIError',
+    'ZohoServerError',
 
     # Auth
     'ZohoCredentials',
     'ZohoAuthError',
+    'ZohoTokenBroker',
+    'RedisTokenStore',
+    'DatabaseTokenStore',
 
     # Sync
     'SyncConfig',
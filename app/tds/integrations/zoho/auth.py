@@ -15,6 +15,7 @@ Features:
 - Secure credential storage
 - Multi-organization support
 - Background token refresh scheduling
+- Token shared across processes (ZohoTokenBroker)
 
 Author: TSH ERP Team
 Date: November 6, 2025
@@ -24,12 +25,13 @@ import asyncio
 import aiohttp
 import time
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import json
 
 from ....core.events.event_bus import EventBus
+from .token_broker import ZohoTokenBroker, credentials_key, get_token_broker
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +67,8 @@ class ZohoAuthManager:
         self,
         credentials: ZohoCredentials,
         event_bus: Optional[EventBus] = None,
-        auto_refresh: bool = True
+        auto_refresh: bool = True,
+        token_broker: Optional[ZohoTokenBroker] = None
     ):
         """
         Initialize Zoho Auth Manager
@@ -74,6 +77,8 @@ class ZohoAuthManager:
             credentials: Zoho API credentials
             event_bus: Event bus for publishing auth events
             auto_refresh: Enable automatic token refresh
+            token_broker: Shares the token across processes (default: the
+                process-wide broker from get_token_broker)
         """
         self.credentials = credentials
         self.event_bus = event_bus
@@ -83,10 +88,13 @@ class ZohoAuthManager:
         self._token_expires_at: Optional[datetime] = credentials.token_expires_at
         self._refresh_lock = asyncio.Lock()
         self._refresh_task: Optional[asyncio.Task] = None
+        self._token_broker = token_broker
+        self._broker_resolved = token_broker is not None
 
         # Statistics
         self.stats = {
             "tokens_refreshed": 0,
+            "tokens_shared": 0,
             "refresh_failures": 0,
             "last_refresh": None,
             "last_error": None
@@ -150,6 +158,10 @@ class ZohoAuthManager:
         """
         Refresh access token using refresh token
 
+        With a token broker the token is shared by every process using these
+        credentials: only the holder of the refresh lease calls Zoho, the
+        others pick up the token it publishes.
+
         Returns:
             str: New access token
 
@@ -161,100 +173,137 @@ class ZohoAuthManager:
             if not self._needs_refresh():
                 return self._access_token
 
-            logger.info("Refreshing Zoho access token...")
-
+            broker = await self._broker()
+            if broker is not None:
+                try:
+                    token, refreshed = await broker.get_token(
+                        self.client_key, self._request_access_token, self.TOKEN_REFRESH_MARGIN
+                    )
+                    return await self._apply_token(token.access_token, token.expires_at_datetime, refreshed)
+                except ZohoAuthError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Zoho token broker failed, refreshing in this process: {e}")
+
+            access_token, expires_in = await self._request_access_token()
+            return await self._apply_token(
+                access_token, datetime.utcnow() + timedelta(seconds=expires_in), refreshed=True
+            )
+
+    @property
+    def client_key(self) -> str:
+        """Token broker key for these credentials"""
+        return credentials_key(self.credentials.client_id, self.credentials.refresh_token)
+
+    async def _broker(self) -> Optional[ZohoTokenBroker]:
+        if not self._broker_resolved:
+            self._token_broker = await get_token_broker()
+            self._broker_resolved = True
+        return self._token_broker
+
+    async def _apply_token(self, access_token: str, expires_at: datetime, refreshed: bool) -> str:
+        """Adopt a token, refreshed here or shared by another process"""
+        self._access_token = access_token
+        self._token_expires_at = expires_at
+        self.credentials.access_token = access_token
+        self.credentials.token_expires_at = expires_at
+
+        if not refreshed:
+            self.stats["tokens_shared"] += 1
+            logger.debug(f"Using shared Zoho access token. Expires at: {expires_at}")
+            return access_token
+
+        self.stats["tokens_refreshed"] += 1
+        self.stats["last_refresh"] = datetime.utcnow().isoformat()
+        logger.info(f"Access token refreshed successfully. Expires at: {expires_at}")
+
+        # Publish success event
+        if self.event_bus:
             try:
-                # Prepare refresh request
-                data = {
-                    'refresh_token': self.credentials.refresh_token,
-                    'client_id': self.credentials.client_id,
-                    'client_secret': self.credentials.client_secret,
-                    'grant_type': 'refresh_token'
-                }
-
-                # Make refresh request
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        self.TOKEN_URL,
-                        data=data,
-                        timeout=aiohttp.ClientTimeout(total=30)
-                    ) as response:
-                        response_data = await response.json()
-
-                        if response.status != 200:
-                            error_msg = response_data.get(
-                                'error',
-                                'Unknown error during token refresh'
-                            )
-                            raise ZohoAuthError(f"Token refresh failed: {error_msg}")
-
-                        # Extract new token
-                        new_access_token = response_data.get('access_token')
-                        expires_in = response_data.get('expires_in', 3600)
-
-                        if not new_access_token:
-                            raise ZohoAuthError("No access token in refresh response")
-
-                        # Update token and expiry
-                        self._access_token = new_access_token
-                        self._token_expires_at = datetime.utcnow() + timedelta(
-                            seconds=expires_in
-                        )
+                await self.event_bus.publish({
+                    "event_type": "tds.zoho.token.refreshed",
+                    "data": {
+                        "expires_at": expires_at.isoformat(),
+                        "expires_in": int((expires_at - datetime.utcnow()).total_seconds())
+                    }
+                })
+            except Exception as e:
+                logger.warning(f"Failed to publish token refresh event: {e}")
+
+        return access_token
+
+    async def _request_access_token(self) -> Tuple[str, int]:
+        """
+        Call Zoho's token endpoint
+
+        Returns:
+            (access_token, expires_in seconds)
 
-                        # Update credentials
-                        self.credentials.access_token = new_access_token
-                        self.credentials.token_expires_at = self._token_expires_at
+        Raises:
+            ZohoAuthError: If refresh fails
+        """
+        logger.info("Refreshing Zoho access token...")
 
-                        # Update stats
-                        self.stats["tokens_refreshed"] += 1
-                        self.stats["last_refresh"] = datetime.utcnow().isoformat()
+        try:
+            # Prepare refresh request
+            data = {
+                'refresh_token': self.credentials.refresh_token,
+                'client_id': self.credentials.client_id,
+                'client_secret': self.credentials.client_secret,
+                'grant_type': 'refresh_token'
+            }
+
+            # Make refresh request
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    self.TOKEN_URL,
+                    data=data,
+                    timeout=aiohttp.ClientTimeout(total=30)
+                ) as response:
+                    response_data = await response.json()
 
-                        logger.info(
-                            f"Access token refreshed successfully. "
-                            f"Expires at: {self._token_expires_at}"
+                    if response.status != 200:
+                        error_msg = response_data.get(
+                            'error',
+                            'Unknown error during token refresh'
                         )
+                        raise ZohoAuthError(f"Token refresh failed: {error_msg}")
 
-                        # Publish success event
-                        if self.event_bus:
-                            try:
-                                await self.event_bus.publish({
-                                    "event_type": "tds.zoho.token.refreshed",
-                                    "data": {
-                                        "expires_at": self._token_expires_at.isoformat(),
-                                        "expires_in": expires_in
-                                    }
-                                })
-                            except Exception as e:
-                                logger.warning(f"Failed to publish token refresh event: {e}")
-
-                        return self._access_token
-
-            except aiohttp.ClientError as e:
-                self.stats["refresh_failures"] += 1
-                self.stats["last_error"] = str(e)
-                error_msg = f"Network error during token refresh: {str(e)}"
-                logger.error(error_msg)
-
-                # Publish failure event
-                if self.event_bus:
-                    try:
-                        await self.event_bus.publish({
-                            "event_type": "tds.zoho.token.refresh_failed",
-                            "data": {
-                                "error": error_msg
-                            }
-                        })
-                    except Exception as e:
-                        logger.warning(f"Failed to publish token refresh failure event: {e}")
-
-                raise ZohoAuthError(error_msg) from e
+                    # Extract new token
+                    new_access_token = response_data.get('access_token')
+                    expires_in = response_data.get('expires_in', 3600)
 
-            except Exception as e:
-                self.stats["refresh_failures"] += 1
-                self.stats["last_error"] = str(e)
-                error_msg = f"Unexpected error during token refresh: {str(e)}"
-                logger.error(error_msg)
-                raise ZohoAuthError(error_msg) from e
+                    if not new_access_token:
+                        raise ZohoAuthError("No access token in refresh response")
+
+                    return new_access_token, expires_in
+
+        except aiohttp.ClientError as e:
+            self.stats["refresh_failures"] += 1
+            self.stats["last_error"] = str(e)
+            error_msg = f"Network error during token refresh: {str(e)}"
+            logger.error(error_msg)
+
+            # Publish failure event
+            if self.event_bus:
+                try:
+                    await self.event_bus.publish({
+                        "event_type": "tds.zoho.token.refresh_failed",
+                        "data": {
+                            "error": error_msg
+                        }
+                    })
+                except Exception as e:
+                    logger.warning(f"Failed to publish token refresh failure event: {e}")
+
+            raise ZohoAuthError(error_msg) from e
+
+        except Exception as e:
+            self.stats["refresh_failures"] += 1
+            self.stats["last_error"] = str(e)
+            error_msg = f"Unexpected error during token refresh: {str(e)}"
+            logger.error(error_msg)
+            raise ZohoAuthError(error_msg) from e
 
     async def _background_refresh(self):
         """
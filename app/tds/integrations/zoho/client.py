@@ -11,6 +11,8 @@ Features:
 - Async HTTP client with connection pooling
 - Automatic token refresh
 - Built-in rate limiting
+- Adaptive (AIMD) concurrency driven by 429s, Retry-After and latency
+- Circuit breaker shared across processes (Redis) for outages
 - Retry logic with exponential backoff
 - Request/response logging
 - Error handling and recovery
@@ -25,14 +27,18 @@ import asyncio
 import aiohttp
 import time
 import logging
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime, timedelta
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Any, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from urllib.parse import urlencode
 from enum import Enum
 
 from .auth import ZohoAuthManager
+from .utils.concurrency import AdaptiveConcurrencyLimiter
 from .utils.rate_limiter import RateLimiter
 from .utils.retry import RetryStrategy
+from ...utils.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError, circuit_breaker_registry
 from ....core.events.event_bus import EventBus
 
 logger = logging.getLogger(__name__)
@@ -71,6 +77,31 @@ class ZohoAPIError(Exception):
         }
 
 
+class ZohoServerError(ZohoAPIError):
+    """Zoho answered with a 5xx (counts toward the circuit breaker)"""
+    pass
+
+
+def is_zoho_outage(exception: Exception) -> bool:
+    """Failures that mean Zoho is unreachable or down, as opposed to a bad request"""
+    return isinstance(exception, (aiohttp.ClientError, asyncio.TimeoutError, ZohoServerError))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (delay seconds or HTTP date) as seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
 class UnifiedZohoClient:
     """
     Unified Zoho API Client
@@ -96,7 +127,9 @@ class UnifiedZohoClient:
         rate_limit: int = 100,  # requests per minute
         max_retries: int = 3,
         timeout: int = 30,
-        event_bus: Optional[EventBus] = None
+        event_bus: Optional[EventBus] = None,
+        concurrency: Optional[AdaptiveConcurrencyLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
     ):
         """
         Initialize Unified Zoho Client
@@ -108,11 +141,16 @@ class UnifiedZohoClient:
             max_retries: Maximum retry attempts for failed requests
             timeout: Request timeout in seconds
             event_bus: Event bus for publishing events
+            concurrency: Limiter for in-flight requests (default: AIMD, 1-20)
+            circuit_breaker: Breaker for outages (default: the registry's
+                "zoho_api" breaker, shared through Redis when available)
         """
         self.auth_manager = auth_manager
         self.organization_id = organization_id
         self.rate_limiter = RateLimiter(rate_limit)
         self.retry_strategy = RetryStrategy(max_retries)
+        self.concurrency = concurrency or AdaptiveConcurrencyLimiter()
+        self.circuit_breaker = circuit_breaker
         self.timeout = timeout
         self.event_bus = event_bus
         self.session: Optional[aiohttp.ClientSession] = None
@@ -122,7 +160,9 @@ class UnifiedZohoClient:
             "requests_made": 0,
             "requests_failed": 0,
             "tokens_refreshed": 0,
-            "rate_limit_hits": 0
+            "rate_limit_hits": 0,
+            "server_errors": 0,
+            "circuit_rejections": 0
         }
 
     async def __aenter__(self):
@@ -179,6 +219,54 @@ class UnifiedZohoClient:
 
         return url
 
+    async def _get_circuit_breaker(self) -> CircuitBreaker:
+        if self.circuit_breaker is None:
+            self.circuit_breaker = await circuit_breaker_registry.get_or_create(
+                "zoho_api", failure_predicate=is_zoho_outage
+            )
+        return self.circuit_breaker
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        json_data: Optional[Dict[str, Any]],
+        api_type: ZohoAPI
+    ) -> Tuple[int, Dict[str, Any], Optional[float]]:
+        """
+        One HTTP exchange inside a concurrency slot
+
+        Returns:
+            tuple: (status, response data, Retry-After seconds)
+
+        Raises:
+            ZohoServerError: On a 5xx, so the circuit breaker counts it
+        """
+        async with self.concurrency.slot():
+            started = time.monotonic()
+            async with self.session.request(
+                method=method,
+                url=url,
+                headers=headers,
+                json=json_data
+            ) as response:
+                if response.status >= 500:
+                    self.stats["server_errors"] += 1
+                    raise ZohoServerError(
+                        message=f"Zoho API unavailable [{response.status}]",
+                        status_code=response.status,
+                        api_type=api_type
+                    )
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response_data = await response.json()
+
+            if response.status == 429:
+                self.concurrency.on_throttle(retry_after)
+            else:
+                self.concurrency.on_success(time.monotonic() - started)
+            return response.status, response_data, retry_after
+
     async def _make_request(
         self,
         method: str,
@@ -191,6 +279,11 @@ class UnifiedZohoClient:
         """
         Make HTTP request to Zoho API with retry logic
 
+        Each attempt goes through the circuit breaker and holds an adaptive
+        concurrency slot only while the request is in flight. 429s honour
+        Retry-After; timeouts, connection errors and 5xx are retried with
+        backoff until the breaker opens, after which calls fail fast.
+
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
             api_type: Type of Zoho API
@@ -219,6 +312,7 @@ class UnifiedZohoClient:
         }
 
         url = self._get_api_url(api_type, endpoint, params)
+        breaker = await self._get_circuit_breaker()
 
         attempt = 0
         last_error = None
@@ -227,68 +321,70 @@ class UnifiedZohoClient:
             try:
                 self.stats["requests_made"] += 1
 
-                async with self.session.request(
-                    method=method,
-                    url=url,
-                    headers=headers,
-                    json=json_data
-                ) as response:
-                    response_data = await response.json()
-
-                    # Success
-                    if response.status in [200, 201]:
-                        logger.debug(
-                            f"Zoho API success: {method} {endpoint} "
-                            f"[{response.status}]"
-                        )
-
-                        # Publish success event
-                        if self.event_bus:
-                            try:
-                                await self.event_bus.publish({
-                                    "event_type": "tds.zoho.api.success",
-                                    "data": {
-                                        "method": method,
-                                        "endpoint": endpoint,
-                                        "api_type": api_type,
-                                        "status_code": response.status
-                                    }
-                                })
-                            except Exception as e:
-                                logger.warning(f"Failed to publish API success event: {e}")
-
-                        return response_data
-
-                    # Token expired - refresh and retry
-                    if response.status == 401:
-                        logger.warning("Access token expired, refreshing...")
-                        await self.auth_manager.refresh_access_token()
-                        self.stats["tokens_refreshed"] += 1
-                        access_token = await self.auth_manager.get_valid_token()
-                        headers['Authorization'] = f'Zoho-oauthtoken {access_token}'
-                        continue
-
-                    # Rate limit - wait and retry
-                    if response.status == 429:
-                        self.stats["rate_limit_hits"] += 1
-                        wait_time = self.retry_strategy.get_wait_time(attempt)
-                        logger.warning(
-                            f"Rate limit hit, waiting {wait_time}s before retry"
-                        )
-                        await asyncio.sleep(wait_time)
-                        attempt += 1
-                        continue
-
-                    # Other errors
-                    error_msg = response_data.get('message', 'Unknown error')
-                    raise ZohoAPIError(
-                        message=error_msg,
-                        status_code=response.status,
-                        response_data=response_data,
-                        api_type=api_type
+                status, response_data, retry_after = await breaker.call(
+                    self._send, method, url, headers, json_data, api_type
+                )
+
+                # Success
+                if status in [200, 201]:
+                    logger.debug(
+                        f"Zoho API success: {method} {endpoint} "
+                        f"[{status}]"
                     )
 
-            except aiohttp.ClientError as e:
+                    # Publish success event
+                    if self.event_bus:
+                        try:
+                            await self.event_bus.publish({
+                                "event_type": "tds.zoho.api.success",
+                                "data": {
+                                    "method": method,
+                                    "endpoint": endpoint,
+                                    "api_type": api_type,
+                                    "status_code": status
+                                }
+                            })
+                        except Exception as e:
+                            logger.warning(f"Failed to publish API success event: {e}")
+
+                    return response_data
+
+                # Token expired - refresh and retry
+                if status == 401:
+                    logger.warning("Access token expired, refreshing...")
+                    await self.auth_manager.refresh_access_token()
+                    self.stats["tokens_refreshed"] += 1
+                    access_token = await self.auth_manager.get_valid_token()
+                    headers['Authorization'] = f'Zoho-oauthtoken {access_token}'
+                    continue
+
+                # Rate limit - wait (at least Retry-After) and retry
+                if status == 429:
+                    self.stats["rate_limit_hits"] += 1
+                    wait_time = max(retry_after or 0.0, self.retry_strategy.get_wait_time(attempt))
+                    logger.warning(
+                        f"Rate limit hit, waiting {wait_time:.2f}s before retry"
+                    )
+                    await asyncio.sleep(wait_time)
+                    attempt += 1
+                    continue
+
+                # Other errors
+                error_msg = response_data.get('message', 'Unknown error')
+                raise ZohoAPIError(
+                    message=error_msg,
+                    status_code=status,
+                    response_data=response_data,
+                    api_type=api_type
+                )
+
+            except CircuitBreakerOpenError as e:
+                # Zoho is down for the whole fleet: fail fast, no retry
+                self.stats["circuit_rejections"] += 1
+                last_error = e
+                break
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ZohoServerError) as e:
                 last_error = e
                 if retry:
                     wait_time = self.retry_strategy.get_wait_time(attempt)
@@ -398,9 +494,6 @@ class UnifiedZohoClient:
         Returns:
             list: All items from all pages
         """
-        params = params or {}
-        params['per_page'] = page_size
-
         all_items = []
         page = 1
 
@@ -408,11 +501,7 @@ class UnifiedZohoClient:
             if max_pages and page > max_pages:
                 break
 
-            params['page'] = page
-            response = await self.get(api_type, endpoint, params)
-
-            # Extract items (different APIs have different response structures)
-            items = self._extract_items_from_response(response, api_type)
+            items, has_more = await self.fetch_page(api_type, endpoint, page, params, page_size)
 
             if not items:
                 break
@@ -420,7 +509,6 @@ class UnifiedZohoClient:
             all_items.extend(items)
 
             # Check if there are more pages
-            has_more = self._has_more_pages(response, api_type)
             if not has_more:
                 break
 
@@ -433,6 +521,34 @@ class UnifiedZohoClient:
 
         return all_items
 
+    async def fetch_page(
+        self,
+        api_type: ZohoAPI,
+        endpoint: str,
+        page: int,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = 200
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Fetch a single page of a paginated endpoint
+
+        Args:
+            api_type: Type of Zoho API
+            endpoint: API endpoint
+            page: 1-based page number
+            params: Query parameters (not modified)
+            page_size: Items per page
+
+        Returns:
+            tuple: (items on the page, whether more pages follow)
+        """
+        page_params = {**(params or {}), 'per_page': page_size, 'page': page}
+        response = await self.get(api_type, endpoint, page_params)
+
+        # Extract items (different APIs have different response structures)
+        items = self._extract_items_from_response(response, api_type)
+        return items, self._has_more_pages(response, api_type)
+
     def _extract_items_from_response(
         self,
         response: Dict[str, Any],
@@ -441,7 +557,7 @@ class UnifiedZohoClient:
         """Extract items from API response based on API type"""
         if api_type == ZohoAPI.BOOKS:
             # Books API structure varies by endpoint
-            for key in ['items', 'invoices', 'bills', 'customers', 'contacts']:
+            for key in ['items', 'invoices', 'bills', 'customers', 'contacts', 'users']:
                 if key in response:
                     return response[key]
 
@@ -468,22 +584,25 @@ class UnifiedZohoClient:
     async def batch_request(
         self,
         requests: List[Dict[str, Any]],
-        max_concurrent: int = 5
+        max_concurrent: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Execute multiple requests concurrently with concurrency limit
+        Execute multiple requests concurrently
+
+        In-flight requests are bounded by the client's adaptive concurrency
+        limiter, which every other call on this client shares.
 
         Args:
             requests: List of request definitions
-            max_concurrent: Maximum concurrent requests
+            max_concurrent: Optional extra cap for this batch
 
         Returns:
             list: Results from all requests
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
+        semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
 
         async def execute_request(request_def):
-            async with semaphore:
+            async with semaphore or nullcontext():
                 return await self._make_request(
                     method=request_def['method'],
                     api_type=request_def['api_type'],
@@ -544,5 +663,7 @@ class UnifiedZohoClient:
         return {
             **self.stats,
             "rate_limiter": self.rate_limiter.get_stats(),
+            "concurrency": self.concurrency.get_stats(),
+            "circuit_breaker": self.circuit_breaker.get_stats() if self.circuit_breaker else None,
             "session_active": self.session and not self.session.closed
         }
@@ -0,0 +1,290 @@
+"""
+Zoho OAuth Token Broker
+=======================
+
+One Zoho access token per set of credentials, shared by every process.
+
+Each uvicorn worker, sync worker and script builds its own ZohoAuthManager;
+refreshing independently burns through Zoho's refresh-token quota. The
+broker keeps the current token and its expiry in a shared store (Redis, or
+the tds_zoho_oauth_tokens row when Redis is not available). A process that
+finds no usable token takes a short refresh lease; only the lease holder
+calls Zoho and publishes the new token, everyone else polls the store until
+it appears. If the holder dies its lease lapses and the next caller
+refreshes.
+
+وسيط رموز OAuth المشترك بين جميع العمليات
+
+Author: TSH ERP Team
+Date: October 19, 2026
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ....models.zoho_sync import TDSZohoOAuthToken
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-delete: only the lease holder may release the lease
+RELEASE_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+TokenFetcher = Callable[[], Awaitable[Tuple[str, int]]]  # -> (access_token, expires_in seconds)
+
+
+@dataclass(frozen=True)
+class SharedToken:
+    """An access token and its expiry (epoch seconds)"""
+    access_token: str
+    expires_at: float
+
+    @property
+    def expires_at_datetime(self) -> datetime:
+        """Naive UTC, as ZohoAuthManager tracks expiry"""
+        return datetime.utcfromtimestamp(self.expires_at)
+
+
+def credentials_key(client_id: str, refresh_token: str) -> str:
+    """Store key for one set of credentials (the refresh token never leaves the process)"""
+    return hashlib.sha256(f"{client_id}:{refresh_token}".encode()).hexdigest()
+
+
+class RedisTokenStore:
+    """
+    Token and lease as two Redis keys
+    The token key expires with the token; the lease is SET NX PX and
+    released with a compare-and-delete script.
+    """
+
+    def __init__(self, redis_client, key_prefix: str = "zoho:oauth"):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+
+    def _token_key(self, client_key: str) -> str:
+        return f"{self.key_prefix}:{client_key}:token"
+
+    def _lease_key(self, client_key: str) -> str:
+        return f"{self.key_prefix}:{client_key}:lease"
+
+    async def load(self, client_key: str) -> Optional[SharedToken]:
+        raw = await self.redis.get(self._token_key(client_key))
+        if not raw:
+            return None
+        data = json.loads(raw)
+        return SharedToken(data["access_token"], float(data["expires_at"]))
+
+    async def try_lease(self, client_key: str, owner: str, seconds: float) -> bool:
+        return bool(await self.redis.set(self._lease_key(client_key), owner, nx=True, px=int(seconds * 1000)))
+
+    async def save(self, client_key: str, token: SharedToken, owner: str, now: float) -> None:
+        ttl_ms = max(int((token.expires_at - now) * 1000), 1)
+        payload = json.dumps({"access_token": token.access_token, "expires_at": token.expires_at})
+        await self.redis.set(self._token_key(client_key), payload, px=ttl_ms)
+        await self.release(client_key, owner)
+
+    async def release(self, client_key: str, owner: str) -> None:
+        await self.redis.eval(RELEASE_LEASE_LUA, 1, self._lease_key(client_key), owner)
+
+
+class DatabaseTokenStore:
+    """
+    Token and lease on one tds_zoho_oauth_tokens row
+    The lease is taken with a conditional UPDATE (free or lapsed), so two
+    processes can never both hold it; no row lock is held while Zoho is called.
+    """
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _epoch(value: datetime) -> float:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    @staticmethod
+    def _datetime(epoch: float) -> datetime:
+        return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+    async def load(self, client_key: str) -> Optional[SharedToken]:
+        with self.session_factory() as db:
+            row = db.execute(
+                select(TDSZohoOAuthToken.access_token, TDSZohoOAuthToken.expires_at)
+                .where(TDSZohoOAuthToken.client_key == client_key)
+            ).first()
+        if row is None or not row.access_token or row.expires_at is None:
+            return None
+        return SharedToken(row.access_token, self._epoch(row.expires_at))
+
+    async def try_lease(self, client_key: str, owner: str, seconds: float) -> bool:
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            if db.get(TDSZohoOAuthToken, client_key) is None:
+                try:
+                    db.execute(insert(TDSZohoOAuthToken).values(client_key=client_key, refresh_count=0))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()  # created concurrently
+            result = db.execute(
+                update(TDSZohoOAuthToken)
+                .where(
+                    TDSZohoOAuthToken.client_key == client_key,
+                    or_(TDSZohoOAuthToken.lease_owner.is_(None), TDSZohoOAuthToken.lease_expires_at < now)
+                )
+                .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=seconds))
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    async def save(self, client_key: str, token: SharedToken, owner: str, now: float) -> None:
+        with self.session_factory() as db:
+            result = db.execute(
+                update(TDSZohoOAuthToken)
+                .where(TDSZohoOAuthToken.client_key == client_key, TDSZohoOAuthToken.lease_owner == owner)
+                .values(
+                    access_token=token.access_token,
+                    expires_at=self._datetime(token.expires_at),
+                    refreshed_at=self._datetime(now),
+                    refresh_count=TDSZohoOAuthToken.refresh_count + 1,
+                    lease_owner=None,
+                    lease_expires_at=None
+                )
+            )
+            db.commit()
+        if result.rowcount == 0:
+            logger.warning("Zoho token refresh lease lapsed before the new token was published")
+
+    async def release(self, client_key: str, owner: str) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(TDSZohoOAuthToken)
+                .where(TDSZohoOAuthToken.client_key == client_key, TDSZohoOAuthToken.lease_owner == owner)
+                .values(lease_owner=None, lease_expires_at=None)
+            )
+            db.commit()
+
+
+class ZohoTokenBroker:
+    """
+    Hands out the shared token, refreshing it in at most one process at a time
+
+    Args:
+        store: RedisTokenStore or DatabaseTokenStore
+        owner: Lease owner id (unique per broker instance)
+        lease_seconds: How long a refresh may take before another process
+            may take over
+        poll_interval: How often processes without the lease re-read the store
+    """
+
+    def __init__(
+        self,
+        store,
+        owner: Optional[str] = None,
+        lease_seconds: float = 30,
+        poll_interval: float = 0.1,
+        clock: Callable[[], float] = time.time
+    ):
+        self.store = store
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.clock = clock
+
+    async def get_token(self, client_key: str, fetch: TokenFetcher, margin: float) -> Tuple[SharedToken, bool]:
+        """
+        A token valid for more than `margin` seconds
+
+        Returns:
+            (token, refreshed): refreshed is True only in the process that
+            called `fetch`
+        """
+        while True:
+            token = await self.store.load(client_key)
+            if token and token.expires_at - self.clock() > margin:
+                return token, False
+
+            if await self.store.try_lease(client_key, self.owner, self.lease_seconds):
+                published = False
+                try:
+                    # Another process may have published between our read and the lease
+                    token = await self.store.load(client_key)
+                    if token and token.expires_at - self.clock() > margin:
+                        return token, False
+
+                    access_token, expires_in = await fetch()
+                    now = self.clock()
+                    token = SharedToken(access_token, now + expires_in)
+                    await self.store.save(client_key, token, self.owner, now)
+                    published = True
+                    return token, True
+                finally:
+                    if not published:
+                        await self.store.release(client_key, self.owner)
+
+            # Someone else is refreshing: wait for their token (or for their lease to lapse)
+            await asyncio.sleep(self.poll_interval)
+
+
+_default_broker: Optional[ZohoTokenBroker] = None
+_default_resolved = False
+_default_lock = asyncio.Lock()
+
+
+def configure_token_broker(broker: Optional[ZohoTokenBroker]) -> None:
+    """Use `broker` for managers created without one (None = refresh per process)"""
+    global _default_broker, _default_resolved
+    _default_broker = broker
+    _default_resolved = True
+
+
+async def get_token_broker() -> Optional[ZohoTokenBroker]:
+    """The process-wide broker: Redis when enabled and reachable, else the database"""
+    global _default_broker, _default_resolved
+    if _default_resolved:
+        return _default_broker
+    async with _default_lock:
+        if _default_resolved:
+            return _default_broker
+
+        from app.core.config import settings
+
+        store = None
+        if settings.REDIS_ENABLED:
+            try:
+                import redis.asyncio as redis
+                client = redis.from_url(
+                    settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2, socket_timeout=2
+                )
+                await client.ping()
+                store = RedisTokenStore(client)
+            except Exception as e:
+                logger.warning(f"Redis unavailable for the Zoho token broker, using the database: {e}")
+        if store is None:
+            try:
+                from app.db.database import SessionLocal
+                store = DatabaseTokenStore(SessionLocal)
+                await store.load("probe")
+            except Exception as e:
+                logger.warning(f"Zoho token broker disabled, tokens are refreshed per process: {e}")
+                store = None
+
+        _default_broker = ZohoTokenBroker(store, lease_seconds=settings.zoho_token_lease_seconds) if store else None
+        _default_resolved = True
+        return _default_broker
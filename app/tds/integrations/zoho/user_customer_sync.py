@@ -10,6 +10,11 @@ Key Features:
 - Assign customers to salespersons based on Zoho owner_id
 - Handle user role mapping (Zoho roles → TSH ERP roles)
 
+Both reconciliations are set-based: users are staged once and upserted with
+a few statements, and customers are assigned with one UPDATE ... FROM users,
+so a run is a handful of queries and one short transaction regardless of
+the number of customers.
+
 Author: TSH ERP Team
 Date: November 16, 2025
 """
@@ -18,7 +23,9 @@ import logging
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import (
+    Boolean, Column, Integer, MetaData, String, Table, exists, func, insert, or_, select, update
+)
 
 from app.models.user import User
 from app.models.customer import Customer
@@ -29,6 +36,21 @@ from .processors.customers import CustomerProcessor
 
 logger = logging.getLogger(__name__)
 
+# Zoho users of one sync run; a temporary table, created and dropped inside
+# the sync transaction
+ZOHO_USER_STAGING = Table(
+    "tmp_zoho_user_staging",
+    MetaData(),
+    Column("zoho_user_id", String(100), primary_key=True),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("name", String(100), nullable=False),
+    Column("phone", String(20)),
+    Column("is_active", Boolean, nullable=False),
+    Column("role_id", Integer),
+    Column("is_salesperson", Boolean, nullable=False),
+    prefixes=["TEMPORARY"]
+)
+
 
 class UserCustomerSyncService:
     """
@@ -56,8 +78,12 @@ class UserCustomerSyncService:
         """
         Sync users from Zoho Books to TSH ERP
 
+        All fetched users are staged once and applied with two set-based
+        statements in a single short transaction (see upsert_users).
+
         Args:
-            full_sync: If True, sync all users. If False, only sync updated users.
+            full_sync: If True, refresh every matched user. If False, only
+                users whose Zoho data changed.
 
         Returns:
             dict: Sync results with counts and errors
@@ -76,107 +102,164 @@ class UserCustomerSyncService:
         try:
             # Fetch users from Zoho Books
             logger.info("Fetching users from Zoho Books API")
-            zoho_users = await self.zoho.get_all(
+            zoho_users = await self.zoho.paginated_fetch(
                 api_type=ZohoAPI.BOOKS,
-                endpoint="users",
-                params={}
+                endpoint="users"
             )
 
             result["total_fetched"] = len(zoho_users)
             logger.info(f"Fetched {len(zoho_users)} users from Zoho Books")
 
-            # Process each user
-            for zoho_user in zoho_users:
-                try:
-                    # Validate user data
-                    if not self.user_processor.validate(zoho_user):
-                        logger.warning(f"Invalid user data: {zoho_user.get('user_id')}")
-                        result["skipped"] += 1
-                        continue
-
-                    # Transform user data
-                    transformed_data = self.user_processor.transform(zoho_user)
-                    zoho_user_id = transformed_data['zoho_user_id']
-
-                    # Check if user exists (by zoho_user_id or email)
-                    existing_user = self.db.query(User).filter(
-                        (User.zoho_user_id == zoho_user_id) |
-                        (User.email == transformed_data['email'])
-                    ).first()
-
-                    if existing_user:
-                        # Update existing user
-                        if not full_sync and existing_user.zoho_last_sync:
-                            # Check if update is needed
-                            if not self.user_processor.needs_update(
-                                existing_user.__dict__,
-                                zoho_user
-                            ):
-                                result["skipped"] += 1
-                                continue
-
-                        # Update user fields
-                        existing_user.name = transformed_data['name']
-                        existing_user.phone = transformed_data.get('phone') or transformed_data.get('mobile')
-                        existing_user.zoho_user_id = zoho_user_id
-                        existing_user.zoho_last_sync = datetime.utcnow()
-
-                        # Update is_active based on Zoho status
-                        existing_user.is_active = transformed_data['is_active']
-
-                        self.db.commit()
-                        result["updated"] += 1
-                        logger.info(f"Updated user: {existing_user.email}")
-
-                    else:
-                        # Create new user (with default password - user must reset)
-                        from app.utils.security import get_password_hash
-
-                        # Map Zoho role to TSH ERP role
-                        role_name = self.user_processor.map_to_erp_role(
-                            transformed_data.get('role_name', 'employee')
-                        )
-
-                        # Get or create role
-                        role = self.db.query(Role).filter(Role.name == role_name).first()
-                        if not role:
-                            # Create default employee role if not exists
-                            role = self.db.query(Role).filter(Role.name == 'employee').first()
-
-                        new_user = User(
-                            name=transformed_data['name'],
-                            email=transformed_data['email'],
-                            phone=transformed_data.get('phone') or transformed_data.get('mobile'),
-                            password=get_password_hash("ChangeMe123!"),  # Default password
-                            role_id=role.id if role else None,
-                            is_active=transformed_data['is_active'],
-                            is_salesperson=role_name == 'salesperson' if role_name else False,
-                            zoho_user_id=zoho_user_id,
-                            zoho_last_sync=datetime.utcnow(),
-                        )
-
-                        self.db.add(new_user)
-                        self.db.commit()
-                        result["created"] += 1
-                        logger.info(f"Created new user: {new_user.email}")
-
-                except Exception as e:
-                    logger.error(f"Error processing user {zoho_user.get('user_id')}: {str(e)}")
-                    result["errors"].append({
-                        "zoho_user_id": zoho_user.get('user_id'),
-                        "error": str(e)
-                    })
-                    self.db.rollback()
+            result.update(self.upsert_users(zoho_users, full_sync=full_sync))
+            self.db.commit()
 
         except Exception as e:
             logger.error(f"Error during user sync: {str(e)}")
             result["errors"].append({"general_error": str(e)})
+            self.db.rollback()
 
         result["completed_at"] = datetime.utcnow()
         logger.info(f"User sync completed: {result}")
 
         return result
 
+    def upsert_users(
+        self,
+        zoho_users: List[Dict[str, Any]],
+        full_sync: bool = False
+    ) -> Dict[str, int]:
+        """
+        Upsert Zoho users through a staging table (caller commits)
+
+        Valid users are loaded into a temporary table, then:
+        1. users already linked by zoho_user_id are updated,
+        2. users matched by email (and not yet linked) are linked and updated,
+        3. the rest are inserted with the mapped role and an unusable password.
+
+        Args:
+            zoho_users: Users as returned by the Zoho Books API
+            full_sync: Update matched users even when nothing changed
+
+        Returns:
+            dict: created, updated and skipped (invalid, duplicate or
+            unchanged) counts
+        """
+        staged = self._stage_rows(zoho_users)
+
+        connection = self.db.connection()
+        ZOHO_USER_STAGING.create(connection)
+        if staged:
+            self.db.execute(insert(ZOHO_USER_STAGING), staged)
+
+        updated = self._update_users_from_staging(full_sync)
+        created = self._insert_users_from_staging() if staged else 0
+        ZOHO_USER_STAGING.drop(connection)
+
+        logger.info(f"Users upserted: {created} created, {updated} updated")
+        return {
+            "created": created,
+            "updated": updated,
+            "skipped": len(zoho_users) - created - updated,
+        }
+
+    def _stage_rows(self, zoho_users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validated staging rows, unique by Zoho ID and by email (last one wins)"""
+        by_zoho_id: Dict[str, Dict[str, Any]] = {}
+        for zoho_user in zoho_users:
+            if not self.user_processor.validate(zoho_user):
+                logger.warning(f"Invalid user data: {zoho_user.get('user_id')}")
+                continue
+            data = self.user_processor.transform(zoho_user)
+            by_zoho_id[data['zoho_user_id']] = data
+        by_email = {data['email']: data for data in by_zoho_id.values()}
+
+        # Map Zoho roles to TSH ERP roles (falling back to employee)
+        role_names = {
+            email: self.user_processor.map_to_erp_role(data.get('role_name') or 'employee')
+            for email, data in by_email.items()
+        }
+        role_ids = dict(self.db.execute(
+            select(Role.name, Role.id).where(Role.name.in_(set(role_names.values()) | {'employee'}))
+        ).all())
+
+        staged = []
+        for email, data in by_email.items():
+            phone = data.get('phone') or data.get('mobile')
+            staged.append({
+                "zoho_user_id": data['zoho_user_id'],
+                "email": email,
+                "name": data['name'][:100],
+                "phone": phone[:20] if phone else None,
+                "is_active": data['is_active'],
+                "role_id": role_ids.get(role_names[email], role_ids.get('employee')),
+                "is_salesperson": role_names[email] == 'salesperson',
+            })
+        return staged
+
+    def _update_users_from_staging(self, full_sync: bool) -> int:
+        users = User.__table__
+        linked = users.alias("linked")
+        staging = ZOHO_USER_STAGING.c
+        now = datetime.utcnow()
+
+        changed = or_(
+            users.c.name.is_distinct_from(staging.name),
+            users.c.phone.is_distinct_from(staging.phone),
+            users.c.is_active.is_distinct_from(staging.is_active),
+            users.c.zoho_user_id.is_distinct_from(staging.zoho_user_id),
+        )
+        values = dict(
+            name=staging.name,
+            phone=staging.phone,
+            is_active=staging.is_active,
+            zoho_user_id=staging.zoho_user_id,
+            zoho_last_sync=now,
+            updated_at=now,
+        )
+
+        matches = [
+            # Already linked
+            [users.c.zoho_user_id == staging.zoho_user_id],
+            # Same email, and no other user holds this Zoho ID
+            [
+                users.c.email == staging.email,
+                users.c.zoho_user_id.is_distinct_from(staging.zoho_user_id),
+                ~exists().where(linked.c.zoho_user_id == staging.zoho_user_id),
+            ],
+        ]
+        updated = 0
+        for conditions in matches:
+            if not full_sync:
+                conditions = conditions + [changed]
+            updated += self.db.execute(update(users).where(*conditions).values(**values)).rowcount
+        return updated
+
+    def _insert_users_from_staging(self) -> int:
+        from app.services.auth_service import AuthService
+
+        users = User.__table__
+        staging = ZOHO_USER_STAGING.c
+        now = datetime.utcnow()
+
+        new_users = self.db.execute(select(
+            staging.name, staging.email, staging.phone, staging.role_id, staging.is_active,
+            staging.is_salesperson, staging.zoho_user_id,
+        ).where(
+            ~exists().where(users.c.zoho_user_id == staging.zoho_user_id),
+            ~exists().where(users.c.email == staging.email),
+        )).mappings().all()
+        if not new_users:
+            return 0
+
+        # Each new user gets its own unusable password: no one can sign in
+        # as a synced user until a password is set through a reset
+        self.db.execute(insert(users), [
+            {**row, "password": AuthService.unusable_password_hash(), "zoho_last_sync": now,
+             "created_at": now, "updated_at": now, "is_verified": False}
+            for row in new_users
+        ])
+        return len(new_users)
+
     def map_owner_to_salesperson(
         self,
         zoho_owner_id: Optional[str]
@@ -215,56 +298,22 @@ class UserCustomerSyncService:
             resync_all: If True, update all customers. If False, only update customers with zoho_owner_id but no salesperson_id.
 
         Returns:
-            dict: Update results with counts
+            dict: Update results with counts and the unmapped Zoho owners
         """
         logger.info("Updating customer salesperson assignments")
 
         result = {
             "total_checked": 0,
             "updated": 0,
+            "unchanged": 0,
             "skipped": 0,
+            "unmapped_owners": [],
             "errors": [],
             "started_at": datetime.utcnow(),
         }
 
         try:
-            # Query customers that need salesperson assignment
-            if resync_all:
-                customers = self.db.query(Customer).filter(
-                    Customer.zoho_owner_id.isnot(None)
-                ).all()
-            else:
-                customers = self.db.query(Customer).filter(
-                    and_(
-                        Customer.zoho_owner_id.isnot(None),
-                        Customer.salesperson_id.is_(None)
-                    )
-                ).all()
-
-            result["total_checked"] = len(customers)
-            logger.info(f"Found {len(customers)} customers to process")
-
-            for customer in customers:
-                try:
-                    # Map Zoho owner_id to local salesperson_id
-                    salesperson_id = self.map_owner_to_salesperson(customer.zoho_owner_id)
-
-                    if salesperson_id:
-                        customer.salesperson_id = salesperson_id
-                        customer.zoho_last_sync = datetime.utcnow()
-                        result["updated"] += 1
-                        logger.info(f"Assigned salesperson {salesperson_id} to customer {customer.name}")
-                    else:
-                        result["skipped"] += 1
-                        logger.warning(f"Could not map owner for customer {customer.name}")
-
-                except Exception as e:
-                    logger.error(f"Error updating customer {customer.id}: {str(e)}")
-                    result["errors"].append({
-                        "customer_id": customer.id,
-                        "error": str(e)
-                    })
-
+            result.update(self.reconcile_salesperson_assignments(resync_all=resync_all))
             self.db.commit()
 
         except Exception as e:
@@ -277,6 +326,63 @@ class UserCustomerSyncService:
 
         return result
 
+    def reconcile_salesperson_assignments(self, resync_all: bool = False) -> Dict[str, Any]:
+        """
+        Assign salespersons with one UPDATE ... FROM users (caller commits)
+
+        Customers whose zoho_owner_id matches a user's zoho_user_id get that
+        user as salesperson; owners with no matching user are reported from
+        an anti-join instead of being looked up one customer at a time.
+
+        Args:
+            resync_all: Re-check customers that already have a salesperson
+
+        Returns:
+            dict: total_checked, updated, unchanged, skipped (unmapped
+            customers) and unmapped_owners
+        """
+        customers = Customer.__table__
+        users = User.__table__
+
+        scope = [customers.c.zoho_owner_id.isnot(None)]
+        if not resync_all:
+            scope.append(customers.c.salesperson_id.is_(None))
+
+        total = self.db.execute(select(func.count()).select_from(customers).where(*scope)).scalar()
+
+        customer_count = func.count().label("customer_count")
+        unmapped = self.db.execute(
+            select(customers.c.zoho_owner_id, customer_count)
+            .where(*scope, ~exists().where(users.c.zoho_user_id == customers.c.zoho_owner_id))
+            .group_by(customers.c.zoho_owner_id)
+            .order_by(customer_count.desc(), customers.c.zoho_owner_id)
+        ).all()
+
+        updated = self.db.execute(
+            update(customers)
+            .where(
+                *scope,
+                users.c.zoho_user_id == customers.c.zoho_owner_id,
+                customers.c.salesperson_id.is_distinct_from(users.c.id)
+            )
+            .values(salesperson_id=users.c.id, zoho_last_sync=datetime.utcnow())
+        ).rowcount
+
+        skipped = sum(count for _, count in unmapped)
+        if unmapped:
+            logger.warning(
+                f"No TSH ERP user for {len(unmapped)} Zoho owner(s), {skipped} customer(s) left unassigned"
+            )
+        return {
+            "total_checked": total,
+            "updated": updated,
+            "unchanged": total - updated - skipped,
+            "skipped": skipped,
+            "unmapped_owners": [
+                {"zoho_owner_id": owner_id, "customers": count} for owner_id, count in unmapped
+            ],
+        }
+
     async def get_user_mapping(self) -> Dict[str, int]:
         """
         Get a mapping of Zoho user IDs to TSH ERP user IDs
@@ -7,5 +7,6 @@ Helper utilities for Zoho integration.
 
 from .rate_limiter import RateLimiter
 from .retry import RetryStrategy
+from .concurrency import AdaptiveConcurrencyLimiter
 
-__all__ = ['RateLimiter', 'RetryStrategy']
+__all__ = ['RateLimiter', 'RetryStrategy', 'AdaptiveConcurrencyLimiter']
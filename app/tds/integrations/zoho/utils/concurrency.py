@@ -0,0 +1,192 @@
+"""
+Adaptive Concurrency for Zoho API
+=================================
+
+AIMD (additive increase, multiplicative decrease) limit on in-flight Zoho
+requests, replacing a fixed semaphore.
+
+- Every successful response raises the limit by 1/limit (about +1 per
+  round of `limit` requests), up to max_limit.
+- A 429, or a p90 latency well above the best p50 seen, halves it - at
+  most once per decrease_cooldown, so one burst of 429s counts once.
+- A Retry-After header pauses new requests until it has passed, so
+  throttled callers wait together instead of retrying into the limit.
+
+التحكم التكيفي في عدد الطلبات المتزامنة
+
+Author: TSH ERP Team
+Date: October 19, 2026
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter
+    محدد التزامن التكيفي
+
+    Callers hold a slot for the duration of one HTTP exchange and report its
+    outcome with on_success(latency) or on_throttle(retry_after). Waiters are
+    served in FIFO order.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 20,
+        backoff_ratio: float = 0.5,
+        latency_window: int = 50,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 1.0
+    ):
+        """
+        Initialize limiter
+
+        Args:
+            initial_limit: Starting concurrency
+            min_limit: Floor for the limit
+            max_limit: Ceiling for the limit
+            backoff_ratio: Multiplier applied on a decrease
+            latency_window: Responses per latency percentile sample
+            latency_tolerance: p90 / baseline p50 ratio treated as congestion
+            decrease_cooldown: Minimum seconds between two decreases
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.latency_window = latency_window
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self._latencies = []
+        self._waiters = deque()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+
+        # Statistics
+        self.stats = {
+            "requests_admitted": 0,
+            "throttled_responses": 0,
+            "throttle_decreases": 0,
+            "latency_decreases": 0,
+            "max_in_flight": 0,
+            "last_p50": None,
+            "last_p90": None
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot (and for any Retry-After pause to pass)"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter  # release() hands its slot over
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        try:
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+        self.stats["requests_admitted"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+
+    def release(self) -> None:
+        """Give a slot back, handing it to the next waiter if the limit allows"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self, latency: float) -> None:
+        """A non-throttled response: additive increase, and latency sampling"""
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+        self._latencies.append(latency)
+        if len(self._latencies) >= self.latency_window:
+            ordered = sorted(self._latencies)
+            self._latencies.clear()
+            p50 = ordered[len(ordered) // 2]
+            p90 = ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)]
+            self.stats["last_p50"], self.stats["last_p90"] = p50, p90
+
+            # Baseline is the best p50 seen, allowed to drift up slowly so a
+            # lasting slowdown does not pin the limit at the floor
+            if self.baseline_latency is None:
+                self.baseline_latency = p50
+            else:
+                self.baseline_latency = min(p50, self.baseline_latency * 1.05)
+
+            if p90 > self.baseline_latency * self.latency_tolerance and self._decrease():
+                self.stats["latency_decreases"] += 1
+                logger.info(
+                    f"Zoho concurrency reduced to {int(self.limit)}: p90 {p90 * 1000:.0f}ms "
+                    f"vs baseline p50 {self.baseline_latency * 1000:.0f}ms"
+                )
+
+        self._wake()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """A 429: multiplicative decrease, and pause new requests for Retry-After"""
+        self.stats["throttled_responses"] += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        if self._decrease():
+            self.stats["throttle_decreases"] += 1
+            logger.warning(f"Zoho throttled the client, concurrency reduced to {int(self.limit)}")
+
+    def _decrease(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return False
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        return True
+
+    def get_stats(self) -> dict:
+        """Get limiter statistics"""
+        return {
+            **self.stats,
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_latency": self.baseline_latency
+        }
+
+    def __repr__(self) -> str:
+        return f"AdaptiveConcurrencyLimiter(limit={int(self.limit)}, in_flight={self.in_flight})"
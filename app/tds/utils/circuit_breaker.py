@@ -12,13 +12,20 @@ States:
 - OPEN: Service failing, calls fail fast
 - HALF_OPEN: Testing if service recovered
 
+With Redis enabled the state is shared, so one worker tripping the circuit
+stops the whole fleet.
+
 Author: TSH ERP Team
 Date: November 9, 2025
 """
 
 import asyncio
 import logging
+import os
+import socket
+import time
 from typing import Callable, Any, Optional, Dict
+from uuid import uuid4
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
@@ -50,16 +57,59 @@ class CircuitBreakerOpenError(Exception):
     pass
 
 
+class RedisCircuitStore:
+    """
+    Breaker state shared by every process through Redis
+    مخزن حالة قاطع الدائرة المشترك
+
+    `{prefix}:{name}` holds the epoch until which the circuit is open; no key
+    means closed. Once that time passes, one process takes the half-open
+    probe lease (SET NX PX) and tests recovery for the whole fleet, then
+    deletes both keys (closed) or writes a new open-until (still failing).
+    """
+
+    def __init__(self, redis_client, key_prefix: str = "circuit"):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+
+    def _key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}"
+
+    def _probe_key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}:probe"
+
+    async def load(self, name: str) -> Optional[float]:
+        """Open-until epoch, or None when the circuit is closed"""
+        raw = await self.redis.get(self._key(name))
+        return float(raw) if raw else None
+
+    async def open(self, name: str, until: float, ttl_seconds: float) -> None:
+        await self.redis.set(self._key(name), f"{until:.3f}", px=int(ttl_seconds * 1000))
+        await self.redis.delete(self._probe_key(name))
+
+    async def try_probe(self, name: str, owner: str, seconds: float) -> bool:
+        return bool(await self.redis.set(self._probe_key(name), owner, nx=True, px=int(seconds * 1000)))
+
+    async def close(self, name: str) -> None:
+        await self.redis.delete(self._key(name), self._probe_key(name))
+
+
 class CircuitBreaker:
     """
     Circuit Breaker Pattern Implementation
     قاطع الدائرة
 
     Prevents cascading failures by:
-    - Monitoring failure rate
+    - Monitoring consecutive failures
     - Opening circuit when threshold exceeded
     - Testing recovery periodically
     - Closing circuit when service recovers
+
+    With a shared store, one process opening the circuit opens it for every
+    process (each re-reads the store at most once per `sync_interval`), and
+    only one process probes recovery. The closed path takes no lock and makes
+    no store round trip: all state changes happen synchronously on the event
+    loop, so there is nothing to guard.
     """
 
     def __init__(
@@ -67,20 +117,28 @@ class CircuitBreaker:
         name: str,
         failure_threshold: int = 5,
         success_threshold: int = 2,
-        timeout_seconds: int = 60,
+        timeout_seconds: float = 60,
         half_open_max_calls: int = 3,
-        excluded_exceptions: Optional[list] = None
+        excluded_exceptions: Optional[list] = None,
+        failure_predicate: Optional[Callable[[Exception], bool]] = None,
+        store: Optional[RedisCircuitStore] = None,
+        sync_interval: float = 1.0
     ):
         """
         Initialize circuit breaker
 
         Args:
             name: Circuit breaker name
-            failure_threshold: Failures before opening circuit
+            failure_threshold: Consecutive failures before opening circuit
             success_threshold: Successes in half-open before closing
             timeout_seconds: Seconds to wait before half-open
             half_open_max_calls: Max concurrent calls in half-open state
             excluded_exceptions: Exceptions that don't count as failures
+            failure_predicate: Decides which other exceptions count as
+                failures (default: all of them)
+            store: Shared state (RedisCircuitStore); None keeps state in
+                this process
+            sync_interval: Seconds between reads of the shared state
         """
         self.name = name
         self.failure_threshold = failure_threshold
@@ -88,20 +146,25 @@ class CircuitBreaker:
         self.timeout = timedelta(seconds=timeout_seconds)
         self.half_open_max_calls = half_open_max_calls
         self.excluded_exceptions = tuple(excluded_exceptions or [])
+        self.failure_predicate = failure_predicate
+        self.store = store
+        self.sync_interval = sync_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
 
         # State
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.success_count = 0
         self.last_failure_time: Optional[datetime] = None
+        self.open_until = 0.0  # epoch seconds
         self.half_open_calls = 0
+        self._holds_probe = False
+        self._next_sync = 0.0
+        self._syncing = False
 
         # Statistics
         self.stats = CircuitBreakerStats()
 
-        # Lock for thread-safe state changes
-        self._lock = asyncio.Lock()
-
     async def call(self, func: Callable, *args, **kwargs) -> Any:
         """
         Execute function through circuit breaker
@@ -118,114 +181,159 @@ class CircuitBreaker:
             CircuitBreakerOpenError: If circuit is open
             Exception: Original exception if call fails
         """
-        async with self._lock:
-            # Check if we should attempt the call
-            await self._check_state()
+        if self.store is not None and time.monotonic() >= self._next_sync:
+            await self._sync()
 
-            # Increment half-open call counter
-            if self.state == CircuitState.HALF_OPEN:
-                self.half_open_calls += 1
+        # Closed: straight through
+        probing = False
+        if self.state != CircuitState.CLOSED:
+            probing = await self._admit()
 
         # Track call
         self.stats.total_calls += 1
 
         try:
-            # Execute the function
             result = await func(*args, **kwargs)
-
-            # Call succeeded
-            await self._on_success()
-
-            return result
-
         except Exception as e:
-            # Check if exception should be ignored
-            if isinstance(e, self.excluded_exceptions):
-                raise
-
-            # Call failed
-            await self._on_failure(e)
-
+            if self._counts_as_failure(e):
+                await self._on_failure(e, probing)
             raise
-
+        else:
+            await self._on_success(probing)
+            return result
         finally:
-            # Decrement half-open call counter
-            if self.state == CircuitState.HALF_OPEN:
-                async with self._lock:
-                    self.half_open_calls -= 1
+            if probing:
+                self.half_open_calls -= 1
 
-    async def _check_state(self):
-        """Check current state and transition if needed"""
+    def _counts_as_failure(self, exception: Exception) -> bool:
+        if isinstance(exception, self.excluded_exceptions):
+            return False
+        return self.failure_predicate is None or self.failure_predicate(exception)
+
+    def _reject(self, reason: str):
+        self.stats.rejected_calls += 1
+        raise CircuitBreakerOpenError(f"Circuit breaker '{self.name}' is {reason}")
+
+    async def _admit(self) -> bool:
+        """Admit a call while the circuit is not closed (returns True: it is a probe)"""
         if self.state == CircuitState.OPEN:
-            # Check if timeout has passed
-            if self.last_failure_time:
-                time_since_open = datetime.utcnow() - self.last_failure_time
-                if time_since_open >= self.timeout:
-                    # Transition to half-open
-                    await self._transition_to(CircuitState.HALF_OPEN)
-                else:
-                    # Still open, reject call
-                    self.stats.rejected_calls += 1
-                    raise CircuitBreakerOpenError(
-                        f"Circuit breaker '{self.name}' is OPEN. "
-                        f"Service unavailable. Try again in "
-                        f"{(self.timeout - time_since_open).total_seconds():.0f} seconds."
-                    )
-
-        elif self.state == CircuitState.HALF_OPEN:
-            # Limit concurrent calls in half-open state
-            if self.half_open_calls >= self.half_open_max_calls:
-                self.stats.rejected_calls += 1
-                raise CircuitBreakerOpenError(
-                    f"Circuit breaker '{self.name}' is HALF_OPEN. "
-                    f"Max concurrent test calls reached ({self.half_open_max_calls}). "
-                    f"Please wait."
-                )
-
-    async def _on_success(self):
+            remaining = self.open_until - time.time()
+            if remaining > 0:
+                self._reject(f"OPEN. Service unavailable. Try again in {remaining:.0f} seconds.")
+            self._transition_to(CircuitState.HALF_OPEN)
+
+        # One process probes for the fleet
+        if self.store is not None and not self._holds_probe:
+            acquired = await self._store_call(
+                self.store.try_probe, self.name, self.owner, self.timeout.total_seconds(), default=True
+            )
+            self._holds_probe = self._holds_probe or bool(acquired)
+            if not self._holds_probe:
+                self._reject("HALF_OPEN. Another instance is testing recovery.")
+
+        # Limit concurrent calls in half-open state
+        if self.half_open_calls >= self.half_open_max_calls:
+            self._reject(
+                f"HALF_OPEN. Max concurrent test calls reached ({self.half_open_max_calls}). Please wait."
+            )
+        self.half_open_calls += 1
+        return True
+
+    async def _on_success(self, probing: bool):
         """Handle successful call"""
-        async with self._lock:
-            self.stats.successful_calls += 1
-            self.stats.last_success_time = datetime.utcnow()
+        self.stats.successful_calls += 1
+        self.stats.last_success_time = datetime.utcnow()
 
-            if self.state == CircuitState.HALF_OPEN:
-                self.success_count += 1
-                logger.info(
-                    f"Circuit breaker '{self.name}': Success in HALF_OPEN "
-                    f"({self.success_count}/{self.success_threshold})"
-                )
+        if self.state == CircuitState.CLOSED:
+            self.failure_count = 0
 
-                # Check if we should close
-                if self.success_count >= self.success_threshold:
-                    await self._transition_to(CircuitState.CLOSED)
+        elif probing and self.state == CircuitState.HALF_OPEN:
+            self.success_count += 1
+            logger.info(
+                f"Circuit breaker '{self.name}': Success in HALF_OPEN "
+                f"({self.success_count}/{self.success_threshold})"
+            )
+
+            # Check if we should close
+            if self.success_count >= self.success_threshold:
+                await self._close()
 
-    async def _on_failure(self, exception: Exception):
+    async def _on_failure(self, exception: Exception, probing: bool):
         """Handle failed call"""
-        async with self._lock:
-            self.stats.failed_calls += 1
-            self.stats.last_failure_time = datetime.utcnow()
-            self.last_failure_time = datetime.utcnow()
-
-            if self.state == CircuitState.CLOSED:
-                self.failure_count += 1
-                logger.warning(
-                    f"Circuit breaker '{self.name}': Failure in CLOSED "
-                    f"({self.failure_count}/{self.failure_threshold}) - {str(exception)}"
-                )
-
-                # Check if we should open
-                if self.failure_count >= self.failure_threshold:
-                    await self._transition_to(CircuitState.OPEN)
-
-            elif self.state == CircuitState.HALF_OPEN:
-                # Any failure in half-open immediately opens circuit
-                logger.warning(
-                    f"Circuit breaker '{self.name}': Failure in HALF_OPEN "
-                    f"- reopening circuit. Error: {str(exception)}"
-                )
-                await self._transition_to(CircuitState.OPEN)
-
-    async def _transition_to(self, new_state: CircuitState):
+        self.stats.failed_calls += 1
+        self.stats.last_failure_time = datetime.utcnow()
+        self.last_failure_time = datetime.utcnow()
+
+        if self.state == CircuitState.CLOSED:
+            self.failure_count += 1
+            logger.warning(
+                f"Circuit breaker '{self.name}': Failure in CLOSED "
+                f"({self.failure_count}/{self.failure_threshold}) - {str(exception)}"
+            )
+
+            # Check if we should open
+            if self.failure_count >= self.failure_threshold:
+                await self._open()
+
+        elif probing and self.state == CircuitState.HALF_OPEN:
+            # Any failure in half-open immediately opens circuit
+            logger.warning(
+                f"Circuit breaker '{self.name}': Failure in HALF_OPEN "
+                f"- reopening circuit. Error: {str(exception)}"
+            )
+            await self._open()
+
+    async def _open(self):
+        """Open the circuit here, then for every process sharing the store"""
+        self.open_until = time.time() + self.timeout.total_seconds()
+        self._holds_probe = False
+        self._transition_to(CircuitState.OPEN)
+        if self.store is not None:
+            await self._store_call(
+                self.store.open, self.name, self.open_until, self.timeout.total_seconds() * 3
+            )
+
+    async def _close(self):
+        self._holds_probe = False
+        self._transition_to(CircuitState.CLOSED)
+        if self.store is not None:
+            await self._store_call(self.store.close, self.name)
+
+    async def _sync(self):
+        """Adopt the shared state (one read per sync_interval, whoever gets there first)"""
+        if self._syncing:
+            return
+        self._syncing = True
+        try:
+            open_until = await self.store.load(self.name)
+        except Exception as e:
+            logger.warning(f"Circuit breaker '{self.name}': shared state unavailable - {e}")
+            return
+        finally:
+            self._syncing = False
+            self._next_sync = time.monotonic() + self.sync_interval
+
+        if open_until is None:
+            # Closed by the prober, or never opened; an open we have not
+            # finished publishing yet is kept until it times out
+            if self.state != CircuitState.CLOSED and self.open_until <= time.time():
+                self._holds_probe = False
+                self._transition_to(CircuitState.CLOSED)
+        elif open_until > self.open_until + 0.001:
+            # Opened (or re-opened) by another process
+            self.open_until = open_until
+            self._holds_probe = False
+            self._transition_to(CircuitState.OPEN)
+
+    async def _store_call(self, method: Callable, *args, default: Any = None) -> Any:
+        """Shared-store operation; failures leave this process on its local state"""
+        try:
+            return await method(*args)
+        except Exception as e:
+            logger.warning(f"Circuit breaker '{self.name}': shared state unavailable - {e}")
+            return default
+
+    def _transition_to(self, new_state: CircuitState):
         """
         Transition to a new state
 
@@ -233,6 +341,8 @@ class CircuitBreaker:
             new_state: Target state
         """
         old_state = self.state
+        if old_state == new_state:
+            return
         self.state = new_state
         self.stats.state_changes += 1
 
@@ -261,11 +371,11 @@ class CircuitBreaker:
 
     async def reset(self):
         """Manually reset circuit breaker to closed state"""
-        async with self._lock:
-            await self._transition_to(CircuitState.CLOSED)
-            self.failure_count = 0
-            self.success_count = 0
-            logger.info(f"Circuit breaker '{self.name}' manually reset")
+        self.open_until = 0.0
+        await self._close()
+        self.failure_count = 0
+        self.success_count = 0
+        logger.info(f"Circuit breaker '{self.name}' manually reset")
 
     def get_state(self) -> str:
         """Get current state"""
@@ -280,6 +390,8 @@ class CircuitBreaker:
         return {
             "name": self.name,
             "state": self.state.value,
+            "shared": self.store is not None,
+            "open_until": datetime.utcfromtimestamp(self.open_until).isoformat() if self.open_until else None,
             "failure_count": self.failure_count,
             "success_count": self.success_count,
             "half_open_calls": self.half_open_calls,
@@ -295,7 +407,7 @@ class CircuitBreaker:
             "configuration": {
                 "failure_threshold": self.failure_threshold,
                 "success_threshold": self.success_threshold,
-                "timeout_seconds": int(self.timeout.total_seconds()),
+                "timeout_seconds": self.timeout.total_seconds(),
                 "half_open_max_calls": self.half_open_max_calls,
             },
             "success_rate": (
@@ -326,13 +438,16 @@ class CircuitBreakerRegistry:
 
         Args:
             name: Circuit breaker name
-            **kwargs: CircuitBreaker constructor arguments
+            **kwargs: CircuitBreaker constructor arguments (store defaults
+                to the shared Redis store when Redis is available)
 
         Returns:
             CircuitBreaker instance
         """
         async with self._lock:
             if name not in self._breakers:
+                if "store" not in kwargs:
+                    kwargs["store"] = await get_circuit_store()
                 self._breakers[name] = CircuitBreaker(name=name, **kwargs)
                 logger.info(f"Created circuit breaker: {name}")
 
@@ -364,5 +479,31 @@ class CircuitBreakerRegistry:
         ]
 
 
+_shared_store: Optional[RedisCircuitStore] = None
+_shared_store_resolved = False
+
+
+async def get_circuit_store() -> Optional[RedisCircuitStore]:
+    """The Redis breaker store when Redis is enabled and reachable, else None (per-process state)"""
+    global _shared_store, _shared_store_resolved
+    if _shared_store_resolved:
+        return _shared_store
+    _shared_store_resolved = True
+
+    from app.core.config import settings
+
+    if settings.REDIS_ENABLED:
+        try:
+            import redis.asyncio as redis
+            client = redis.from_url(
+                settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2, socket_timeout=2
+            )
+            await client.ping()
+            _shared_store = RedisCircuitStore(client)
+        except Exception as e:
+            logger.warning(f"Redis unavailable, circuit breakers keep per-process state: {e}")
+    return _shared_store
+
+
 # Global registry instance
 circuit_breaker_registry = CircuitBreakerRegistry()
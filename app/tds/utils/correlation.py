@@ -24,14 +24,11 @@ import time
 import json
 from typing import Optional, Dict, Any
 from datetime import datetime
-from contextvars import ContextVar
 from functools import wraps
 
-# Context variable for correlation ID
-correlation_id_var: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
-
-# Context variable for request metadata
-request_context_var: ContextVar[Dict[str, Any]] = ContextVar('request_context', default={})
+# Context variables for correlation ID and request metadata (shared with the
+# logging pipeline, which stamps them on every record)
+from app.utils.log_pipeline import correlation_id_var, request_context_var
 
 
 class CorrelationIDFilter(logging.Filter):
@@ -0,0 +1,336 @@
+"""
+Asynchronous Logging Pipeline for TSH ERP System
+Log calls only enqueue a record; a QueueListener thread formats it as JSON
+and does the stdout / file I/O, so the event loop never waits on a disk.
+
+- CorrelationQueueHandler captures the correlation id and request context
+  on the calling task before handing off. The ContextVars live here so
+  logging does not import app.tds; app.tds.utils.correlation (CorrelationContext,
+  with_correlation) sets these same variables
+- LogSampler, on the calling side, drops what would be noise: per-logger
+  rate limits for chatty loggers, and sampling of repetitive messages
+  (records that differ only in ids and numbers) from the loggers it is
+  given; warnings and errors always pass, and the next record that passes
+  reports what was dropped
+- the file handler reopens the file after an external rotation (logrotate),
+  or rotates it itself by size or by time
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Correlation ID and request metadata of the current task (re-exported by
+# app.tds.utils.correlation)
+correlation_id_var: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
+request_context_var: ContextVar[Dict[str, Any]] = ContextVar('request_context', default={})
+
+# LogRecord attributes that are not user fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "correlation_id", "request_context", "fields", "extra_data", "sampling"
+}
+
+# Ids, hashes and numbers, so f-string messages about different entities
+# count as the same message
+_VARIABLE_TOKENS = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+")
+
+
+def _matches(name: str, prefix: str) -> bool:
+    return name == prefix or name.startswith(prefix + ".")
+
+
+def message_key(record: logging.LogRecord) -> Tuple[str, int, str]:
+    """What makes two records 'the same message'"""
+    template = record.msg if isinstance(record.msg, str) else str(record.msg)
+    if not record.args:
+        template = _VARIABLE_TOKENS.sub("#", template)
+    return record.name, record.levelno, template
+
+
+class LogSampler(logging.Filter):
+    """
+    Rate limiting and repeat sampling for records below WARNING
+
+    rate_limits maps a logger name prefix to records per second (the most
+    specific prefix wins; each logger gets its own token bucket with one
+    second of burst). A message repeated within repeat_window seconds is
+    passed repeat_burst times, then one in repeat_sample_rate; only loggers
+    under a sampled_loggers prefix are sampled (all of them when None).
+    structlog events share one message per event name, so their loggers
+    should not be sampled unless listed on purpose.
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, float]] = None,
+        repeat_burst: int = 10,
+        repeat_sample_rate: int = 100,
+        repeat_window: float = 10.0,
+        max_level: int = logging.INFO,
+        max_keys: int = 10000,
+        sampled_loggers: Optional[Iterable[str]] = None
+    ):
+        super().__init__()
+        self.rate_limits = sorted((rate_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.repeat_burst = repeat_burst
+        self.repeat_sample_rate = max(1, repeat_sample_rate)
+        self.repeat_window = repeat_window
+        self.max_level = max_level
+        self.max_keys = max_keys
+        self.sampled_loggers = None if sampled_loggers is None else tuple(sampled_loggers)
+        self._buckets: Dict[str, List[float]] = {}   # logger -> [tokens, updated, rate]
+        self._repeats: Dict[tuple, List[float]] = {}  # key -> [window start, seen]
+        self._dropped: Dict[str, int] = {}            # logger -> records dropped since last pass
+        self._lock = threading.Lock()
+        self.stats = {"passed": 0, "rate_limited": 0, "sampled_out": 0}
+
+    def _rate_for(self, name: str) -> Optional[float]:
+        for prefix, rate in self.rate_limits:
+            if _matches(name, prefix):
+                return rate
+        return None
+
+    def _is_sampled(self, name: str) -> bool:
+        return self.sampled_loggers is None or any(_matches(name, prefix) for prefix in self.sampled_loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return self._passed(record)
+        now = time.monotonic()
+        with self._lock:
+            if self._is_sampled(record.name) and not self._sample(message_key(record), now):
+                self.stats["sampled_out"] += 1
+            elif not self._take_token(record.name, now):
+                self.stats["rate_limited"] += 1
+            else:
+                return self._passed(record)
+            self._dropped[record.name] = self._dropped.get(record.name, 0) + 1
+            return False
+
+    def _passed(self, record: logging.LogRecord) -> bool:
+        dropped = self._dropped.pop(record.name, 0)
+        if dropped:
+            record.sampling = {"dropped_since_last": dropped}
+        self.stats["passed"] += 1
+        return True
+
+    def _take_token(self, name: str, now: float) -> bool:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            rate = self._rate_for(name)
+            if rate is None:
+                return True
+            bucket = self._buckets[name] = [rate, now, rate]
+        tokens, updated, rate = bucket
+        tokens = min(rate, tokens + (now - updated) * rate)
+        if tokens < 1:
+            bucket[0], bucket[1] = tokens, now
+            return False
+        bucket[0], bucket[1] = tokens - 1, now
+        return True
+
+    def _sample(self, key: tuple, now: float) -> bool:
+        entry = self._repeats.get(key)
+        if entry is None or now - entry[0] > self.repeat_window:
+            if entry is None and len(self._repeats) >= self.max_keys:
+                self._repeats.clear()
+            self._repeats[key] = [now, 1]
+            return True
+        entry[1] += 1
+        seen = entry[1]
+        return seen <= self.repeat_burst or (seen - self.repeat_burst) % self.repeat_sample_rate == 0
+
+
+class CorrelationQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without blocking
+
+    prepare() runs on the calling thread/task: it renders the message,
+    formats any exception and captures the correlation id and request
+    context, which the listener thread cannot see. A full queue drops the
+    record (counted) instead of stalling the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.correlation_id = correlation_id_var.get()
+        context = request_context_var.get()
+        if context:
+            record.request_context = {key: value for key, value in context.items() if value is not None}
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line (runs in the listener thread)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        correlation_id = getattr(record, "correlation_id", None) or correlation_id_var.get()
+        if correlation_id:
+            entry["correlation_id"] = correlation_id
+        fields = {
+            **(getattr(record, "request_context", None) or {}),
+            **(getattr(record, "extra_data", None) or {}),
+            **(getattr(record, "fields", None) or {}),
+            **{key: value for key, value in vars(record).items()
+               if key not in _RECORD_ATTRIBUTES and not key.startswith("_")},
+        }
+        # A field named like a core key (structlog's message=...) is nested, not lost
+        clashing = {key: fields.pop(key) for key in list(fields) if key in entry}
+        entry.update(fields)
+        if clashing:
+            entry["fields"] = clashing
+        if getattr(record, "sampling", None):
+            entry["sampling"] = record.sampling
+        if record.levelno >= logging.WARNING:
+            entry.update(module=record.module, function=record.funcName, line=record.lineno)
+        exc_text = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exc_text:
+            entry["exception"] = exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleLogFormatter(logging.Formatter):
+    """Readable single-line output for an interactive terminal"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {**(getattr(record, "fields", None) or {}), **(getattr(record, "extra_data", None) or {})}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        correlation_id = getattr(record, "correlation_id", None)
+        return f"{line} [{correlation_id}]" if correlation_id else line
+
+
+def rotating_file_handler(
+    path: str,
+    max_bytes: int = 50 * 1024 * 1024,
+    backup_count: int = 14,
+    when: Optional[str] = None
+) -> logging.Handler:
+    """Time-based rotation when `when` is given (e.g. "midnight"), else size-based"""
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8", utc=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+
+
+class LogPipeline:
+    """The queue, its listener thread and the handler installed on a logger"""
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        sampler: Optional[LogSampler] = None,
+        queue_size: int = 10000
+    ):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = CorrelationQueueHandler(self.queue)
+        if sampler is not None:
+            self.handler.addFilter(sampler)
+        self.sampler = sampler
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self._started = False
+
+    def start(self) -> "LogPipeline":
+        if not self._started:
+            self.listener.start()
+            self._started = True
+        return self
+
+    def stop(self) -> None:
+        """Drain the queue and stop the listener thread"""
+        if self._started:
+            self._started = False
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                try:
+                    handler.flush()
+                except (OSError, ValueError):
+                    pass  # stream already closed at interpreter exit, as logging.shutdown allows
+
+    def install(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> "LogPipeline":
+        """Make the queue handler the logger's (root by default) only handler"""
+        logger = logger or logging.getLogger()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            if not isinstance(handler, CorrelationQueueHandler):
+                handler.close()
+        logger.addHandler(self.handler)
+        logger.setLevel(level)
+        return self.start()
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_full_dropped": self.handler.dropped,
+            **(self.sampler.stats if self.sampler else {})
+        }
+
+
+def build_pipeline(
+    log_file: Optional[str],
+    console: bool = True,
+    max_bytes: int = 0,
+    backup_count: int = 14,
+    when: Optional[str] = None,
+    sampler: Optional[LogSampler] = None,
+    queue_size: int = 10000
+) -> LogPipeline:
+    """
+    JSON to stdout (readable text on a terminal) and to a log file
+
+    The file is rotated in process when max_bytes or when is set; that
+    handler must be the file's only writer. Otherwise it is a
+    WatchedFileHandler, which any number of processes can append to and
+    which reopens the file once logrotate has moved it.
+    """
+    handlers = []
+    if console:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(ConsoleLogFormatter() if sys.stdout.isatty() else JsonLogFormatter())
+        handlers.append(stream)
+    if log_file:
+        if max_bytes or when:
+            file_handler = rotating_file_handler(log_file, max_bytes, backup_count, when)
+        else:
+            file_handler = logging.handlers.WatchedFileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonLogFormatter())
+        handlers.append(file_handler)
+    return LogPipeline(handlers, sampler=sampler, queue_size=queue_size)
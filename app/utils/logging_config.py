@@ -2,59 +2,129 @@
 Structured Logging Configuration for TSH ERP System
 Provides JSON-formatted logs with contextual information for better debugging
 """
+import atexit
+import os
 import structlog
 import logging
-import sys
 from pathlib import Path
-from datetime import datetime
+from typing import Dict, Optional
 
+from app.utils.log_pipeline import LogPipeline, LogSampler, build_pipeline
 
-def setup_logging(log_level: str = "INFO", log_file: str = None):
+# Hot paths (sync workers, Zoho orchestrator, webhook processing) log per
+# entity; each of their loggers is capped at this many INFO records/second,
+# and only these loggers have repeated messages sampled
+DEFAULT_RATE_LIMITS = {
+    "app.background": 100.0,
+    "app.tds.integrations.zoho": 100.0,
+    "app.services.zoho_processor": 100.0,
+}
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def _parse_rate_limits(value: str) -> Dict[str, float]:
+    """Parse LOG_RATE_LIMITS, e.g. app.background=50,app.tds=20"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+def render_to_record_fields(logger, method_name, event_dict):
+    """Last structlog processor: the event becomes the message, the rest JSON fields"""
+    kwargs = {key: event_dict.pop(key) for key in ("exc_info", "stack_info") if key in event_dict}
+    return {"msg": event_dict.pop("event", ""), "extra": {"fields": event_dict}, **kwargs}
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    log_file: str = None,
+    console: bool = True,
+    rate_limits: Optional[Dict[str, float]] = None
+):
     """
     Configure structured logging for the application
 
+    Log calls (stdlib and structlog) only enqueue; a listener thread writes
+    JSON lines to stdout and to a log file. Every worker process appends to
+    the same tsh_erp.log, rotated externally (logrotate). With LOG_MAX_BYTES
+    or LOG_ROTATE_WHEN (e.g. "midnight") each process rotates its own
+    tsh_erp.<pid>.log instead, since a rotating handler must be the only
+    writer of its file. Queue size and sampling come from LOG_DIR,
+    LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_RATE_LIMITS
+    ("logger=records_per_second,..."), LOG_REPEAT_BURST and
+    LOG_REPEAT_SAMPLE_RATE; repeat sampling covers the rate-limited loggers only.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Optional file path for log output
+        console: Also write to stdout
+        rate_limits: Per-logger INFO records/second (defaults to the hot paths)
     """
+    global _pipeline
+
     # Create logs directory if it doesn't exist
-    log_dir = Path("app/logs")
+    log_dir = Path(os.getenv("LOG_DIR", "app/logs"))
     log_dir.mkdir(parents=True, exist_ok=True)
 
-    # Default log file with timestamp
+    max_bytes = int(os.getenv("LOG_MAX_BYTES", "0"))
+    when = os.getenv("LOG_ROTATE_WHEN") or None
     if log_file is None:
-        timestamp = datetime.now().strftime("%Y%m%d")
-        log_file = log_dir / f"tsh_erp_{timestamp}.log"
-
-    # Configure standard logging
-    logging.basicConfig(
-        format="%(message)s",
-        level=getattr(logging, log_level.upper()),
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(log_file, encoding='utf-8')
-        ]
+        log_file = log_dir / (f"tsh_erp.{os.getpid()}.log" if max_bytes or when else "tsh_erp.log")
+
+    if rate_limits is None:
+        rate_limits = _parse_rate_limits(os.getenv("LOG_RATE_LIMITS", "")) or DEFAULT_RATE_LIMITS
+    sampler = LogSampler(
+        rate_limits=rate_limits,
+        repeat_burst=int(os.getenv("LOG_REPEAT_BURST", "10")),
+        repeat_sample_rate=int(os.getenv("LOG_REPEAT_SAMPLE_RATE", "100")),
+        sampled_loggers=rate_limits
     )
 
-    # Configure structlog
+    if _pipeline is not None:
+        _pipeline.stop()
+    _pipeline = build_pipeline(
+        str(log_file),
+        console=console,
+        max_bytes=max_bytes,
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "14")),
+        when=when,
+        sampler=sampler,
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    ).install(level=getattr(logging, log_level.upper()))
+
+    # Configure structlog: events go through the same stdlib queue pipeline
     structlog.configure(
         processors=[
             structlog.contextvars.merge_contextvars,
-            structlog.processors.add_log_level,
+            structlog.stdlib.filter_by_level,
             structlog.processors.StackInfoRenderer(),
             structlog.dev.set_exc_info,
-            structlog.processors.TimeStamper(fmt="iso", utc=False),
-            structlog.dev.ConsoleRenderer() if sys.stdout.isatty() else structlog.processors.JSONRenderer(),
+            render_to_record_fields,
         ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        wrapper_class=structlog.stdlib.BoundLogger,
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
 
     return structlog.get_logger()
 
 
+def get_log_pipeline() -> Optional[LogPipeline]:
+    """The running pipeline (queue depth and sampling statistics)"""
+    return _pipeline
+
+
+@atexit.register
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
 def get_logger(name: str = None):
     """
     Get a configured logger instance
@@ -163,7 +233,6 @@ def log_security_event(logger, event_type: str, severity: str, **extra):
 # This ensures logging is set up before any other imports
 try:
     # Try to get log level from environment
-    import os
     log_level = os.getenv("LOG_LEVEL", "INFO")
     setup_logging(log_level=log_level)
 except Exception as e:
@@ -5,7 +5,7 @@ Allows TSH ERP modules to emit events to NeuroLink notification system
 
 import logging
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.core.config import settings
 
@@ -269,6 +269,41 @@ class NeuroLinkEmitter:
             severity=severity
         )
 
+    async def emit_stock_changed(
+        self,
+        change_id: str,
+        product_ids: Optional[List[int]] = None,
+        entity_type: str = "inventory"
+    ) -> bool:
+        """
+        Emit stock changed event
+
+        NeuroLink re-evaluates low-stock alerts for the given products (or
+        all products when no ids are given) and only notifies on products that
+        newly crossed their minimum quantity.
+
+        Args:
+            change_id: Unique id of the change (e.g. sync run id), used for idempotency
+            product_ids: Local product IDs whose stock changed
+            entity_type: Synced entity type that triggered the change
+
+        Returns:
+            bool: Success status
+        """
+        payload = {
+            "id": change_id,
+            "entity_type": entity_type,
+            "product_ids": product_ids,
+            "changed_at": datetime.utcnow().isoformat()
+        }
+
+        return await self.emit_event(
+            source_module="tds",
+            event_type="stock.changed",
+            payload=payload,
+            severity="info"
+        )
+
     async def emit_image_sync_completed(
         self,
         products_processed: int,
@@ -0,0 +1,63 @@
+"""Monthly account balance ledger
+
+Revision ID: account_period_balances
+Revises: invoice_aging
+Create Date: 2026-10-19 18:00:00.000000
+
+- account_period_balances: posted debit/credit totals per account and
+  entry_date month, maintained when journal entries are posted
+- Backfilled from existing posted journal lines
+- (status, entry_date) index on journal_entries for the open-month query
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'account_period_balances'
+down_revision = 'invoice_aging'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create and backfill the balance ledger"""
+    op.create_table(
+        'account_period_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('debit_total', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('credit_total', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'period_start', name='uq_account_period_balance')
+    )
+    op.create_index(op.f('ix_account_period_balances_id'), 'account_period_balances', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_account_period_balances_period_start'), 'account_period_balances', ['period_start'], unique=False
+    )
+    op.create_index('idx_journal_entries_status_entry_date', 'journal_entries', ['status', 'entry_date'])
+    op.create_index('idx_journal_lines_entry_account', 'journal_lines', ['journal_entry_id', 'account_id'])
+
+    op.execute("""
+        INSERT INTO account_period_balances (account_id, period_start, debit_total, credit_total, updated_at)
+        SELECT jl.account_id,
+               date_trunc('month', je.entry_date)::date,
+               SUM(jl.debit_amount),
+               SUM(jl.credit_amount),
+               now()
+        FROM journal_lines jl
+        JOIN journal_entries je ON je.id = jl.journal_entry_id
+        WHERE je.status = 'POSTED'
+        GROUP BY jl.account_id, date_trunc('month', je.entry_date)
+    """)
+
+
+def downgrade():
+    """Drop the balance ledger"""
+    op.drop_index('idx_journal_lines_entry_account', table_name='journal_lines')
+    op.drop_index('idx_journal_entries_status_entry_date', table_name='journal_entries')
+    op.drop_index(op.f('ix_account_period_balances_period_start'), table_name='account_period_balances')
+    op.drop_index(op.f('ix_account_period_balances_id'), table_name='account_period_balances')
+    op.drop_table('account_period_balances')
@@ -0,0 +1,96 @@
+"""Add document_sequences counter table
+
+Revision ID: add_document_sequences
+Revises: gps_daily_summary_routes
+Create Date: 2026-10-19 13:00:00.000000
+
+Counters used by DocumentSequenceService for invoice, cash transaction,
+cash transfer, POS transaction and sales order numbers. Counters are seeded
+from the highest number already issued so new numbers never collide with
+existing documents.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_document_sequences'
+down_revision = 'gps_daily_summary_routes'
+branch_labels = None
+depends_on = None
+
+
+SEED_QUERIES = [
+    # Invoices: INV-S-000123 / INV-P-000123 (one counter per type)
+    """
+    SELECT 'sales_invoice', 0, '', MAX(substring(invoice_number FROM '(\\d+)$')::bigint)
+    FROM sales_invoices WHERE invoice_number ~ '^INV-S-\\d+$'
+    """,
+    """
+    SELECT 'purchase_invoice', 0, '', MAX(substring(invoice_number FROM '(\\d+)$')::bigint)
+    FROM purchase_invoices WHERE invoice_number ~ '^INV-P-\\d+$'
+    """,
+    # Cash transactions: RCP-20261019-0001 (per prefix per day)
+    """
+    SELECT 'cash_' || lower(split_part(transaction_number, '-', 1)), 0,
+           split_part(transaction_number, '-', 2),
+           MAX(split_part(transaction_number, '-', 3)::bigint)
+    FROM cash_transactions WHERE transaction_number ~ '^[A-Z]+-\\d{8}-\\d+$'
+    GROUP BY 1, 3
+    """,
+    # Cash transfers: TRF-20261019-0001 (per day)
+    """
+    SELECT 'cash_transfer', 0, split_part(transfer_number, '-', 2),
+           MAX(split_part(transfer_number, '-', 3)::bigint)
+    FROM cash_transfers WHERE transfer_number ~ '^TRF-\\d{8}-\\d+$'
+    GROUP BY 3
+    """,
+    # POS: TXN-{session_number}-000001 (per branch per session)
+    """
+    SELECT 'pos_transaction', t.branch_id, s.session_number,
+           MAX(substring(x.transaction_number FROM '(\\d+)$')::bigint)
+    FROM pos_transactions x
+    JOIN pos_sessions s ON s.id = x.session_id
+    JOIN pos_terminals t ON t.id = s.terminal_id
+    WHERE x.transaction_number ~ '-\\d+$'
+    GROUP BY 2, 3
+    """,
+    # Sales orders: ORD-20261019-0001 (per day)
+    """
+    SELECT 'sales_order', 0, split_part(order_number, '-', 2),
+           MAX(split_part(order_number, '-', 3)::bigint)
+    FROM sales_orders WHERE order_number ~ '^ORD-\\d{8}-\\d+$'
+    GROUP BY 3
+    """,
+]
+
+
+def upgrade():
+    """Create and seed document_sequences"""
+    op.create_table(
+        'document_sequences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_type', sa.String(50), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('period', sa.String(50), nullable=False, server_default=''),
+        sa.Column('next_value', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_type', 'branch_id', 'period', name='uq_document_sequence_scope')
+    )
+    op.create_index('ix_document_sequences_id', 'document_sequences', ['id'])
+
+    for query in SEED_QUERIES:
+        op.execute(f"""
+            INSERT INTO document_sequences (document_type, branch_id, period, next_value, updated_at)
+            SELECT document_type, branch_id, period, last_value + 1, now()
+            FROM ({query}) AS seed(document_type, branch_id, period, last_value)
+            WHERE last_value IS NOT NULL
+            ON CONFLICT (document_type, branch_id, period)
+            DO UPDATE SET next_value = GREATEST(document_sequences.next_value, EXCLUDED.next_value)
+        """)
+
+
+def downgrade():
+    """Drop document_sequences"""
+    op.drop_index('ix_document_sequences_id', table_name='document_sequences')
+    op.drop_table('document_sequences')
@@ -0,0 +1,54 @@
+"""Database backup jobs shared by all workers
+
+Revision ID: backup_jobs
+Revises: whatsapp_broadcast_recipients
+Create Date: 2026-10-20 09:00:00.000000
+
+- backup_jobs: one row per backup, restore or verification, queued by the
+  settings API and claimed by BackupJobRunner, so every worker can report
+  on every job; runs are serialized with a PostgreSQL advisory lock
+- (status, id) index for claiming
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'backup_jobs'
+down_revision = 'whatsapp_broadcast_recipients'
+branch_labels = None
+depends_on = None
+
+job_kind = sa.Enum('backup', 'restore', 'verify', name='backup_job_kind')
+job_status = sa.Enum('queued', 'running', 'completed', 'failed', name='backup_job_status')
+
+
+def upgrade():
+    """Create the backup jobs table"""
+    op.create_table(
+        'backup_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', job_kind, nullable=False),
+        sa.Column('options', sa.JSON(), nullable=False),
+        sa.Column('requested_by', sa.Integer(), nullable=True),
+        sa.Column('status', job_status, nullable=False, server_default='queued'),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('runner_id', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_backup_jobs_id'), 'backup_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_backup_jobs_status'), 'backup_jobs', ['status'], unique=False)
+    op.create_index('idx_backup_jobs_claim', 'backup_jobs', ['status', 'id'])
+
+
+def downgrade():
+    """Drop the backup jobs table"""
+    op.drop_index('idx_backup_jobs_claim', table_name='backup_jobs')
+    op.drop_index(op.f('ix_backup_jobs_status'), table_name='backup_jobs')
+    op.drop_index(op.f('ix_backup_jobs_id'), table_name='backup_jobs')
+    op.drop_table('backup_jobs')
+    job_status.drop(op.get_bind(), checkfirst=True)
+    job_kind.drop(op.get_bind(), checkfirst=True)
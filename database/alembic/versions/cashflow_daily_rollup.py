@@ -0,0 +1,45 @@
+"""Branch daily cash-flow rollup
+
+Revision ID: cashflow_daily_rollup
+Revises: add_document_sequences
+Create Date: 2026-10-19 15:00:00.000000
+
+- cash_flow_summaries: unique (branch_id, summary_date, summary_type) for
+  branch rows (user_id IS NULL) so the rollup can be upserted
+- cash_transactions.rolled_up + partial index on pending rows
+
+Existing transactions start as pending; backfill the rollup with
+scripts/rebuild_cashflow_rollup.py after upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'cashflow_daily_rollup'
+down_revision = 'add_document_sequences'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add rollup keys and pending flag"""
+    op.add_column(
+        'cash_transactions',
+        sa.Column('rolled_up', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+    op.create_index(
+        'idx_cash_transactions_pending_rollup', 'cash_transactions', ['transaction_date'],
+        postgresql_where=sa.text('NOT rolled_up')
+    )
+    op.create_index(
+        'uq_cash_flow_summary_branch_period', 'cash_flow_summaries',
+        ['branch_id', 'summary_date', 'summary_type'],
+        unique=True, postgresql_where=sa.text('user_id IS NULL')
+    )
+
+
+def downgrade():
+    """Remove rollup keys and pending flag"""
+    op.drop_index('uq_cash_flow_summary_branch_period', table_name='cash_flow_summaries')
+    op.drop_index('idx_cash_transactions_pending_rollup', table_name='cash_transactions')
+    op.drop_column('cash_transactions', 'rolled_up')
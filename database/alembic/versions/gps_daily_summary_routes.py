@@ -0,0 +1,52 @@
+"""Incremental GPS route state on daily summaries
+
+Revision ID: gps_daily_summary_routes
+Revises: gps_partitioned_locations
+Create Date: 2026-10-19 11:00:00.000000
+
+Adds the columns GPSDailySummarizer needs to extend a day's summary as
+points arrive instead of recomputing it on every read:
+- route_start_at / route_end_at: first and last point of the day
+- last_latitude / last_longitude: end point, for extending the distance
+- route_point_ids: Douglas-Peucker simplified route (NULL = not built)
+
+total_distance_km is widened to meter precision so incremental updates do
+not accumulate rounding.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import NUMERIC, JSONB
+
+# revision identifiers
+revision = 'gps_daily_summary_routes'
+down_revision = 'gps_partitioned_locations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add route state columns to salesperson_daily_summaries"""
+    op.add_column('salesperson_daily_summaries', sa.Column('route_start_at', sa.DateTime(), nullable=True))
+    op.add_column('salesperson_daily_summaries', sa.Column('route_end_at', sa.DateTime(), nullable=True))
+    op.add_column('salesperson_daily_summaries', sa.Column('last_latitude', NUMERIC(10, 8), nullable=True))
+    op.add_column('salesperson_daily_summaries', sa.Column('last_longitude', NUMERIC(11, 8), nullable=True))
+    op.add_column('salesperson_daily_summaries', sa.Column('route_point_ids', JSONB(), nullable=True))
+
+    op.alter_column(
+        'salesperson_daily_summaries', 'total_distance_km',
+        type_=NUMERIC(10, 3), existing_type=NUMERIC(8, 2)
+    )
+
+
+def downgrade():
+    """Remove route state columns"""
+    op.alter_column(
+        'salesperson_daily_summaries', 'total_distance_km',
+        type_=NUMERIC(8, 2), existing_type=NUMERIC(10, 3)
+    )
+
+    op.drop_column('salesperson_daily_summaries', 'route_point_ids')
+    op.drop_column('salesperson_daily_summaries', 'last_longitude')
+    op.drop_column('salesperson_daily_summaries', 'last_latitude')
+    op.drop_column('salesperson_daily_summaries', 'route_end_at')
+    op.drop_column('salesperson_daily_summaries', 'route_start_at')
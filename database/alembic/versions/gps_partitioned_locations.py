@@ -0,0 +1,183 @@
+"""Partition salesperson GPS locations by month and de-duplicate uploads
+
+Revision ID: gps_partitioned_locations
+Revises: add_salesperson_field_sales
+Create Date: 2026-10-19 09:00:00.000000
+
+Converts salesperson_gps_locations into a table range-partitioned by month on
+`timestamp`:
+- create_gps_location_partition(date) creates a month's partition on demand
+  (called by GPSIngestionService before inserting)
+- device_id becomes NOT NULL DEFAULT '' so (salesperson_id, device_id,
+  timestamp) can be a real unique key for ON CONFLICT DO NOTHING
+- Primary key becomes (id, timestamp), as partitioning requires
+- Composite (salesperson_id, timestamp) index for route/summary queries
+
+Retention is applied by dropping whole monthly partitions
+(scripts/gps_partition_maintenance.py).
+"""
+from alembic import op
+
+# revision identifiers
+revision = 'gps_partitioned_locations'
+down_revision = 'add_salesperson_field_sales'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = """
+    id, location_uuid, salesperson_id, latitude, longitude, accuracy, altitude,
+    speed, heading, "timestamp", recorded_at, activity_type, is_customer_visit,
+    customer_id, visit_verified, distance_from_customer, battery_level,
+    is_charging, device_id, is_synced, synced_at, created_at
+"""
+
+LEGACY_INDEXES = (
+    'idx_gps_salesperson', 'idx_gps_timestamp', 'idx_gps_customer_visit',
+    'idx_gps_sync_status', 'idx_gps_created_at', 'idx_gps_location_uuid',
+)
+
+
+def upgrade():
+    """Move GPS history into a monthly partitioned table"""
+
+    # ========================================================================
+    # Partition helper
+    # ========================================================================
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_gps_location_partition(month_start date)
+        RETURNS text AS $$
+        DECLARE
+            start_date date := date_trunc('month', month_start)::date;
+            end_date date := (date_trunc('month', month_start) + interval '1 month')::date;
+            part_name text := format(
+                'salesperson_gps_locations_y%sm%s',
+                to_char(start_date, 'YYYY'),
+                to_char(start_date, 'MM')
+            );
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF salesperson_gps_locations '
+                'FOR VALUES FROM (%L) TO (%L)',
+                part_name, start_date, end_date
+            );
+            RETURN part_name;
+        EXCEPTION WHEN duplicate_table THEN
+            -- Another session created it concurrently
+            RETURN part_name;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # ========================================================================
+    # Swap in the partitioned table
+    # ========================================================================
+    for index_name in LEGACY_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    op.execute("ALTER TABLE salesperson_gps_locations RENAME TO salesperson_gps_locations_legacy")
+
+    op.execute("""
+        CREATE TABLE salesperson_gps_locations (
+            id INTEGER NOT NULL DEFAULT nextval('salesperson_gps_locations_id_seq'),
+            location_uuid VARCHAR(36),
+            salesperson_id INTEGER NOT NULL REFERENCES users(id),
+            latitude NUMERIC(10, 8) NOT NULL,
+            longitude NUMERIC(11, 8) NOT NULL,
+            accuracy DOUBLE PRECISION,
+            altitude DOUBLE PRECISION,
+            speed DOUBLE PRECISION,
+            heading DOUBLE PRECISION,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            recorded_at TIMESTAMP WITHOUT TIME ZONE,
+            activity_type VARCHAR(50),
+            is_customer_visit BOOLEAN,
+            customer_id INTEGER REFERENCES customers(id),
+            visit_verified BOOLEAN,
+            distance_from_customer DOUBLE PRECISION,
+            battery_level INTEGER,
+            is_charging BOOLEAN,
+            device_id VARCHAR(100) NOT NULL DEFAULT '',
+            is_synced BOOLEAN,
+            synced_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id, "timestamp"),
+            CONSTRAINT uq_gps_salesperson_device_timestamp
+                UNIQUE (salesperson_id, device_id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+
+    # Keep the id sequence alive when the legacy table is dropped
+    op.execute("ALTER SEQUENCE salesperson_gps_locations_id_seq OWNED BY salesperson_gps_locations.id")
+
+    # Partitions for existing history plus the current and next two months
+    op.execute("""
+        SELECT create_gps_location_partition(month_start)
+        FROM (
+            SELECT DISTINCT date_trunc('month', "timestamp")::date AS month_start
+            FROM salesperson_gps_locations_legacy
+            UNION
+            SELECT (date_trunc('month', CURRENT_DATE) + make_interval(months => n))::date
+            FROM generate_series(0, 2) AS n
+        ) months
+    """)
+
+    op.execute(f"""
+        INSERT INTO salesperson_gps_locations ({COLUMNS})
+        SELECT
+            id, location_uuid, salesperson_id, latitude, longitude, accuracy, altitude,
+            speed, heading, "timestamp", recorded_at, activity_type, is_customer_visit,
+            customer_id, visit_verified, distance_from_customer, battery_level,
+            is_charging, COALESCE(device_id, ''), is_synced, synced_at, created_at
+        FROM salesperson_gps_locations_legacy
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.execute("DROP TABLE salesperson_gps_locations_legacy")
+
+    # ========================================================================
+    # Indexes (created on the parent, inherited by every partition)
+    # ========================================================================
+    op.create_index('idx_gps_salesperson_timestamp', 'salesperson_gps_locations', ['salesperson_id', 'timestamp'])
+    op.create_index('idx_gps_timestamp', 'salesperson_gps_locations', ['timestamp'])
+    op.create_index('idx_gps_customer_visit', 'salesperson_gps_locations', ['is_customer_visit'])
+    op.create_index('idx_gps_sync_status', 'salesperson_gps_locations', ['is_synced'])
+    op.create_index('idx_gps_created_at', 'salesperson_gps_locations', ['created_at'])
+    op.create_index('idx_gps_location_uuid', 'salesperson_gps_locations', ['location_uuid'])
+
+
+def downgrade():
+    """Collapse partitions back into a single table"""
+    op.execute("ALTER TABLE salesperson_gps_locations RENAME TO salesperson_gps_locations_partitioned")
+
+    for index_name in ('idx_gps_salesperson_timestamp',) + LEGACY_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    op.execute("""
+        CREATE TABLE salesperson_gps_locations (
+            LIKE salesperson_gps_locations_partitioned INCLUDING DEFAULTS
+        )
+    """)
+    op.execute("ALTER TABLE salesperson_gps_locations ALTER COLUMN device_id DROP NOT NULL")
+    op.execute("ALTER TABLE salesperson_gps_locations ALTER COLUMN device_id DROP DEFAULT")
+    op.execute("ALTER TABLE salesperson_gps_locations ADD PRIMARY KEY (id)")
+    op.execute("ALTER SEQUENCE salesperson_gps_locations_id_seq OWNED BY salesperson_gps_locations.id")
+
+    op.execute(f"""
+        INSERT INTO salesperson_gps_locations ({COLUMNS})
+        SELECT {COLUMNS} FROM salesperson_gps_locations_partitioned
+    """)
+    op.execute("UPDATE salesperson_gps_locations SET device_id = NULL WHERE device_id = ''")
+
+    op.execute("DROP TABLE salesperson_gps_locations_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS create_gps_location_partition(date)")
+
+    op.create_foreign_key(None, 'salesperson_gps_locations', 'users', ['salesperson_id'], ['id'])
+    op.create_foreign_key(None, 'salesperson_gps_locations', 'customers', ['customer_id'], ['id'])
+    op.create_unique_constraint(None, 'salesperson_gps_locations', ['location_uuid'])
+    op.create_index('idx_gps_salesperson', 'salesperson_gps_locations', ['salesperson_id'])
+    op.create_index('idx_gps_timestamp', 'salesperson_gps_locations', ['timestamp'])
+    op.create_index('idx_gps_customer_visit', 'salesperson_gps_locations', ['is_customer_visit'])
+    op.create_index('idx_gps_sync_status', 'salesperson_gps_locations', ['is_synced'])
+    op.create_index('idx_gps_created_at', 'salesperson_gps_locations', ['created_at'])
+    op.create_index('idx_gps_location_uuid', 'salesperson_gps_locations', ['location_uuid'])
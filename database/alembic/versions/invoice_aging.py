@@ -0,0 +1,58 @@
+"""Invoice aging balances and overdue keyset indexes
+
+Revision ID: invoice_aging
+Revises: pos_daily_sales_rollup
+Create Date: 2026-10-19 17:00:00.000000
+
+- invoice_aging: open invoice count/balance per (type, branch, due date),
+  maintained by InvoiceService; aging buckets are computed from it
+- (due_date, id) indexes on sales_invoices and purchase_invoices for the
+  keyset-paginated overdue listing
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'invoice_aging'
+down_revision = 'pos_daily_sales_rollup'
+branch_labels = None
+depends_on = None
+
+OPEN_STATUSES = "('PENDING', 'PARTIALLY_PAID', 'OVERDUE')"
+
+
+def upgrade():
+    """Create invoice_aging and backfill it from open invoices"""
+    op.create_table(
+        'invoice_aging',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('invoice_type', sa.String(length=20), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('open_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('open_amount', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invoice_type', 'branch_id', 'due_date', name='uq_invoice_aging_scope')
+    )
+    op.create_index(op.f('ix_invoice_aging_id'), 'invoice_aging', ['id'], unique=False)
+
+    for invoice_type, table in (('SALES', 'sales_invoices'), ('PURCHASE', 'purchase_invoices')):
+        op.create_index(f'idx_{table}_due_date_id', table, ['due_date', 'id'])
+        op.execute(f"""
+            INSERT INTO invoice_aging (invoice_type, branch_id, due_date, open_count, open_amount)
+            SELECT '{invoice_type}', branch_id, due_date, COUNT(*),
+                   SUM(total_amount - COALESCE(paid_amount, 0))
+            FROM {table}
+            WHERE status IN {OPEN_STATUSES}
+            GROUP BY branch_id, due_date
+        """)
+
+
+def downgrade():
+    """Drop invoice_aging and the overdue indexes"""
+    op.drop_index('idx_purchase_invoices_due_date_id', table_name='purchase_invoices')
+    op.drop_index('idx_sales_invoices_due_date_id', table_name='sales_invoices')
+    op.drop_index(op.f('ix_invoice_aging_id'), table_name='invoice_aging')
+    op.drop_table('invoice_aging')
@@ -0,0 +1,62 @@
+"""POS daily sales rollup
+
+Revision ID: pos_daily_sales_rollup
+Revises: cashflow_daily_rollup
+Create Date: 2026-10-19 16:00:00.000000
+
+- pos_daily_sales: one row per closed day, terminal and cashier
+- (transaction_date, terminal_id) index on pos_transactions for the
+  open-day aggregation
+
+The rollup fills itself the first time a report covers a closed day.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'pos_daily_sales_rollup'
+down_revision = 'cashflow_daily_rollup'
+branch_labels = None
+depends_on = None
+
+AMOUNT_COLUMNS = (
+    'total_sales', 'total_refunds', 'total_discounts', 'total_tax',
+    'cash_amount', 'card_amount', 'mobile_amount', 'credit_amount', 'voucher_amount',
+)
+
+
+def upgrade():
+    """Create the daily sales rollup"""
+    op.create_table(
+        'pos_daily_sales',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('summary_date', sa.Date(), nullable=False),
+        sa.Column('terminal_id', sa.Integer(), nullable=False),
+        sa.Column('cashier_id', sa.Integer(), nullable=False),
+        sa.Column('sale_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refund_count', sa.Integer(), nullable=False, server_default='0'),
+        *[
+            sa.Column(column, sa.Numeric(15, 2), nullable=False, server_default='0')
+            for column in AMOUNT_COLUMNS
+        ],
+        sa.Column('calculated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['terminal_id'], ['pos_terminals.id']),
+        sa.ForeignKeyConstraint(['cashier_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('summary_date', 'terminal_id', 'cashier_id', name='uq_pos_daily_sales_scope')
+    )
+    op.create_index(op.f('ix_pos_daily_sales_id'), 'pos_daily_sales', ['id'], unique=False)
+    op.create_index(op.f('ix_pos_daily_sales_summary_date'), 'pos_daily_sales', ['summary_date'], unique=False)
+
+    op.create_index(
+        'idx_pos_transactions_date_terminal', 'pos_transactions',
+        ['transaction_date', 'terminal_id']
+    )
+
+
+def downgrade():
+    """Drop the daily sales rollup"""
+    op.drop_index('idx_pos_transactions_date_terminal', table_name='pos_transactions')
+    op.drop_index(op.f('ix_pos_daily_sales_summary_date'), table_name='pos_daily_sales')
+    op.drop_index(op.f('ix_pos_daily_sales_id'), table_name='pos_daily_sales')
+    op.drop_table('pos_daily_sales')
@@ -0,0 +1,61 @@
+"""Materialized commission leaderboard
+
+Revision ID: salesperson_leaderboard_ranks
+Revises: account_period_balances
+Create Date: 2026-10-19 19:00:00.000000
+
+- salesperson_leaderboard_ranks: per-period salesperson rankings written by
+  CommissionLeaderboardService with window functions
+- (period_start, period_end, rank, salesperson_id) index for keyset pages
+
+Periods are ranked lazily on first read; no backfill is needed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'salesperson_leaderboard_ranks'
+down_revision = 'account_period_balances'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the leaderboard table"""
+    op.create_table(
+        'salesperson_leaderboard_ranks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('period_end', sa.Date(), nullable=False),
+        sa.Column('salesperson_id', sa.Integer(), nullable=False),
+        sa.Column('salesperson_name', sa.String(length=100), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('total_participants', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('team_total_sales', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('total_sales', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('total_commission', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('total_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_customers', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('target_achievement_percentage', sa.Numeric(9, 2), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['salesperson_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period_start', 'period_end', 'salesperson_id', name='uq_leaderboard_period_salesperson')
+    )
+    op.create_index(op.f('ix_salesperson_leaderboard_ranks_id'), 'salesperson_leaderboard_ranks', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_salesperson_leaderboard_ranks_salesperson_id'), 'salesperson_leaderboard_ranks',
+        ['salesperson_id'], unique=False
+    )
+    op.create_index(
+        'idx_leaderboard_period_rank', 'salesperson_leaderboard_ranks',
+        ['period_start', 'period_end', 'rank', 'salesperson_id']
+    )
+
+
+def downgrade():
+    """Drop the leaderboard table"""
+    op.drop_index('idx_leaderboard_period_rank', table_name='salesperson_leaderboard_ranks')
+    op.drop_index(op.f('ix_salesperson_leaderboard_ranks_salesperson_id'), table_name='salesperson_leaderboard_ranks')
+    op.drop_index(op.f('ix_salesperson_leaderboard_ranks_id'), table_name='salesperson_leaderboard_ranks')
+    op.drop_table('salesperson_leaderboard_ranks')
@@ -0,0 +1,65 @@
+"""Resumable Zoho bulk sync jobs
+
+Revision ID: tds_bulk_sync_jobs
+Revises: salesperson_leaderboard_ranks
+Create Date: 2026-10-19 20:00:00.000000
+
+- tds_bulk_sync_jobs: one row per bulk import with its page cursor
+  (next_page) and counters, checkpointed by BulkSyncRunner after every
+  committed page, plus the runner lease used to resume crashed jobs
+- (status, lease_expires_at, id) index for claiming
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'tds_bulk_sync_jobs'
+down_revision = 'salesperson_leaderboard_ranks'
+branch_labels = None
+depends_on = None
+
+job_status = sa.Enum('queued', 'running', 'completed', 'failed', 'cancelled', name='tds_bulk_sync_job_status')
+
+
+def upgrade():
+    """Create the bulk sync jobs table"""
+    op.create_table(
+        'tds_bulk_sync_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('mode', sa.String(length=20), nullable=False, server_default='full'),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('page_size', sa.Integer(), nullable=False, server_default='200'),
+        sa.Column('requested_by', sa.Integer(), nullable=True),
+        sa.Column('status', job_status, nullable=False, server_default='queued'),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('next_page', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('pages_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_success', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_skipped', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('lease_owner', sa.Text(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('checkpointed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tds_bulk_sync_jobs_id'), 'tds_bulk_sync_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_tds_bulk_sync_jobs_entity_type'), 'tds_bulk_sync_jobs', ['entity_type'], unique=False)
+    op.create_index(op.f('ix_tds_bulk_sync_jobs_status'), 'tds_bulk_sync_jobs', ['status'], unique=False)
+    op.create_index('idx_bulk_sync_jobs_claim', 'tds_bulk_sync_jobs', ['status', 'lease_expires_at', 'id'])
+
+
+def downgrade():
+    """Drop the bulk sync jobs table"""
+    op.drop_index('idx_bulk_sync_jobs_claim', table_name='tds_bulk_sync_jobs')
+    op.drop_index(op.f('ix_tds_bulk_sync_jobs_status'), table_name='tds_bulk_sync_jobs')
+    op.drop_index(op.f('ix_tds_bulk_sync_jobs_entity_type'), table_name='tds_bulk_sync_jobs')
+    op.drop_index(op.f('ix_tds_bulk_sync_jobs_id'), table_name='tds_bulk_sync_jobs')
+    op.drop_table('tds_bulk_sync_jobs')
+    job_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,86 @@
+"""Stored Zoho sync plans and content hashes
+
+Revision ID: tds_sync_plans
+Revises: tds_bulk_sync_jobs
+Create Date: 2026-10-19 21:00:00.000000
+
+- zoho_content_hash on products, customers and migration_vendors: SHA-256
+  of the mapped Zoho content last applied, so the planner can skip
+  unchanged rows without comparing columns
+- tds_sync_plans / tds_sync_plan_entries: the exact diff built by
+  ZohoSyncPlanner and applied verbatim by execute_sync
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'tds_sync_plans'
+down_revision = 'tds_bulk_sync_jobs'
+branch_labels = None
+depends_on = None
+
+HASHED_TABLES = ('products', 'customers', 'migration_vendors')
+
+
+def upgrade():
+    """Add content hashes and create the sync plan tables"""
+    for table in HASHED_TABLES:
+        op.add_column(table, sa.Column('zoho_content_hash', sa.String(length=64), nullable=True))
+
+    op.create_table(
+        'tds_sync_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('source_ref', sa.Text(), nullable=True),
+        sa.Column('field_mappings', sa.JSON(), nullable=False),
+        sa.Column('mapping_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='planned'),
+        sa.Column('total_records', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('insert_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('update_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('unchanged_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('orphaned_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('invalid_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('field_changes', sa.JSON(), nullable=False),
+        sa.Column('execution_stats', sa.JSON(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('executed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tds_sync_plans_id'), 'tds_sync_plans', ['id'], unique=False)
+    op.create_index(op.f('ix_tds_sync_plans_entity_type'), 'tds_sync_plans', ['entity_type'], unique=False)
+    op.create_index(op.f('ix_tds_sync_plans_status'), 'tds_sync_plans', ['status'], unique=False)
+
+    op.create_table(
+        'tds_sync_plan_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('zoho_id', sa.String(length=100), nullable=True),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('local_id', sa.Integer(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('previous_hash', sa.String(length=64), nullable=True),
+        sa.Column('changed_fields', sa.JSON(), nullable=True),
+        sa.Column('values', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['plan_id'], ['tds_sync_plans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_sync_plan_entries_action', 'tds_sync_plan_entries', ['plan_id', 'action', 'id'])
+    op.create_index('idx_sync_plan_entries_zoho_id', 'tds_sync_plan_entries', ['plan_id', 'zoho_id'])
+
+
+def downgrade():
+    """Drop the sync plan tables and content hashes"""
+    op.drop_index('idx_sync_plan_entries_zoho_id', table_name='tds_sync_plan_entries')
+    op.drop_index('idx_sync_plan_entries_action', table_name='tds_sync_plan_entries')
+    op.drop_table('tds_sync_plan_entries')
+    op.drop_index(op.f('ix_tds_sync_plans_status'), table_name='tds_sync_plans')
+    op.drop_index(op.f('ix_tds_sync_plans_entity_type'), table_name='tds_sync_plans')
+    op.drop_index(op.f('ix_tds_sync_plans_id'), table_name='tds_sync_plans')
+    op.drop_table('tds_sync_plans')
+
+    for table in HASHED_TABLES:
+        op.drop_column(table, 'zoho_content_hash')
@@ -0,0 +1,38 @@
+"""Shared Zoho OAuth token
+
+Revision ID: tds_zoho_oauth_tokens
+Revises: tds_sync_plans
+Create Date: 2026-10-19 22:00:00.000000
+
+- tds_zoho_oauth_tokens: the current access token and expiry per set of
+  Zoho credentials plus the refresh lease, used by ZohoTokenBroker when
+  Redis is not available so that only one process refreshes
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'tds_zoho_oauth_tokens'
+down_revision = 'tds_sync_plans'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the shared token table"""
+    op.create_table(
+        'tds_zoho_oauth_tokens',
+        sa.Column('client_key', sa.String(length=64), nullable=False),
+        sa.Column('access_token', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('lease_owner', sa.String(length=100), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('refresh_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('client_key')
+    )
+
+
+def downgrade():
+    """Drop the shared token table"""
+    op.drop_table('tds_zoho_oauth_tokens')
@@ -0,0 +1,79 @@
+"""Queued WhatsApp broadcasts with per-recipient delivery rows
+
+Revision ID: whatsapp_broadcast_recipients
+Revises: tds_zoho_oauth_tokens
+Create Date: 2026-10-19 23:00:00.000000
+
+- whatsapp_broadcast_recipients: one row per recipient, inserted in bulk
+  when the broadcast is queued, claimed by BroadcastDispatcher under a
+  lease, retried with backoff (next_attempt_at) and moved forward by
+  webhook statuses (whatsapp_message_id)
+- (broadcast_id, phone_number) unique index; (status, next_attempt_at, id)
+  index for claiming
+- whatsapp_broadcasts: delivered/read counters, template parameters,
+  requested_by and started_at
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'whatsapp_broadcast_recipients'
+down_revision = 'tds_zoho_oauth_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the recipients table and extend broadcasts"""
+    op.add_column('whatsapp_broadcasts', sa.Column('delivered_count', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('whatsapp_broadcasts', sa.Column('read_count', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('whatsapp_broadcasts', sa.Column('parameters', sa.JSON(), nullable=True))
+    op.add_column('whatsapp_broadcasts', sa.Column('requested_by', sa.Integer(), nullable=True))
+    op.add_column('whatsapp_broadcasts', sa.Column('started_at', sa.DateTime(), nullable=True))
+
+    op.create_table(
+        'whatsapp_broadcast_recipients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('broadcast_id', sa.Integer(), nullable=False),
+        sa.Column('phone_number', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('whatsapp_message_id', sa.String(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('error_code', sa.Integer(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('lease_owner', sa.String(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['broadcast_id'], ['whatsapp_broadcasts.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_whatsapp_broadcast_recipients_id'), 'whatsapp_broadcast_recipients', ['id'], unique=False)
+    op.create_index(op.f('ix_whatsapp_broadcast_recipients_broadcast_id'), 'whatsapp_broadcast_recipients',
+                    ['broadcast_id'], unique=False)
+    op.create_index(op.f('ix_whatsapp_broadcast_recipients_whatsapp_message_id'), 'whatsapp_broadcast_recipients',
+                    ['whatsapp_message_id'], unique=True)
+    op.create_index('idx_whatsapp_broadcast_recipients_phone', 'whatsapp_broadcast_recipients',
+                    ['broadcast_id', 'phone_number'], unique=True)
+    op.create_index('idx_whatsapp_broadcast_recipients_claim', 'whatsapp_broadcast_recipients',
+                    ['status', 'next_attempt_at', 'id'])
+
+
+def downgrade():
+    """Drop the recipients table and the broadcast columns"""
+    op.drop_index('idx_whatsapp_broadcast_recipients_claim', table_name='whatsapp_broadcast_recipients')
+    op.drop_index('idx_whatsapp_broadcast_recipients_phone', table_name='whatsapp_broadcast_recipients')
+    op.drop_index(op.f('ix_whatsapp_broadcast_recipients_whatsapp_message_id'),
+                  table_name='whatsapp_broadcast_recipients')
+    op.drop_index(op.f('ix_whatsapp_broadcast_recipients_broadcast_id'), table_name='whatsapp_broadcast_recipients')
+    op.drop_index(op.f('ix_whatsapp_broadcast_recipients_id'), table_name='whatsapp_broadcast_recipients')
+    op.drop_table('whatsapp_broadcast_recipients')
+
+    op.drop_column('whatsapp_broadcasts', 'started_at')
+    op.drop_column('whatsapp_broadcasts', 'requested_by')
+    op.drop_column('whatsapp_broadcasts', 'parameters')
+    op.drop_column('whatsapp_broadcasts', 'read_count')
+    op.drop_column('whatsapp_broadcasts', 'delivered_count')
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+GPS Batch Upload Benchmark
+Compares the legacy per-point add/flush loop with GPSIngestionService (COPY +
+ON CONFLICT DO NOTHING) for one offline-sync batch
+
+Usage:
+    python scripts/benchmarks/benchmark_gps_batch_upload.py [--points 1000] [--salesperson-id ID]
+
+Requires a PostgreSQL database (DATABASE_URL) migrated to the partitioned GPS
+table and an existing salesperson user. All writes are rolled back.
+"""
+import sys
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.database import SessionLocal
+from app.models.salesperson import SalespersonGPSLocation
+from app.schemas.salesperson import GPSLocationCreate
+from app.services.gps_tracking_service import GPSIngestionService, month_start
+
+
+def make_points(count: int, start: datetime):
+    lat, lon = 33.3152, 44.3661  # Baghdad
+    points = []
+    for i in range(count):
+        lat += random.uniform(-0.0005, 0.0005)
+        lon += random.uniform(-0.0005, 0.0005)
+        points.append(GPSLocationCreate(
+            latitude=round(lat, 8),
+            longitude=round(lon, 8),
+            timestamp=start + timedelta(seconds=30 * i),
+            accuracy=5.0,
+            speed=8.0,
+            battery_level=80,
+            device_id="benchmark-device"
+        ))
+    return points
+
+
+def run_legacy(db, salesperson_id, points):
+    GPSIngestionService(db).ensure_partitions({month_start(p.timestamp) for p in points})
+    started = time.perf_counter()
+    for location in points:
+        gps_location = SalespersonGPSLocation(
+            salesperson_id=salesperson_id,
+            latitude=location.latitude,
+            longitude=location.longitude,
+            timestamp=location.timestamp,
+            accuracy=location.accuracy,
+            speed=location.speed,
+            battery_level=location.battery_level,
+            device_id=location.device_id,
+            is_synced=True,
+            synced_at=datetime.utcnow()
+        )
+        db.add(gps_location)
+        db.flush()
+    return time.perf_counter() - started
+
+
+def run_ingest(db, salesperson_id, points):
+    started = time.perf_counter()
+    result = GPSIngestionService(db).ingest(salesperson_id, points)
+    elapsed = time.perf_counter() - started
+    assert result.inserted == len(points), result
+    return elapsed
+
+
+def run_retry(db, salesperson_id, points):
+    """Re-upload of an already stored batch: everything is a duplicate"""
+    service = GPSIngestionService(db)
+    service.ingest(salesperson_id, points)
+    started = time.perf_counter()
+    result = service.ingest(salesperson_id, points)
+    elapsed = time.perf_counter() - started
+    assert result.duplicates == len(points), result
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GPS batch upload")
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--salesperson-id", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # Far-past timestamps so the benchmark never collides with real data
+    start = datetime(2000, 1, 1, 8, 0, 0)
+    points = make_points(args.points, start)
+
+    for name, runner in (("legacy add/flush", run_legacy),
+                         ("COPY ingest", run_ingest),
+                         ("duplicate retry", run_retry)):
+        timings = []
+        for _ in range(args.rounds):
+            db = SessionLocal()
+            try:
+                timings.append(runner(db, args.salesperson_id, points))
+            finally:
+                db.rollback()
+                db.close()
+        best = min(timings)
+        print(f"{name:<18} {args.points} points: best {best * 1000:8.1f} ms "
+              f"({args.points / best:,.0f} points/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Logging Event-Loop Lag Benchmark
+Runs a synthetic sync load (1000 events/s on the event loop, each logging
+like the Zoho sync workers do) and measures how late a 5 ms ticker wakes up,
+with the legacy handlers (FileHandler + StreamHandler written inline) and
+with the queued pipeline (LogPipeline: the listener thread does the I/O)
+
+Usage:
+    python scripts/benchmarks/benchmark_logging_loop_lag.py [--events-per-second 1000] [--seconds 5] [--disk-latency-ms 0.5]
+
+Requires nothing beyond the application dependencies; logs go to a
+temporary directory. --disk-latency-ms adds a sleep to every write to stand
+in for a slow disk or a blocked stdout pipe.
+"""
+import sys
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.utils.log_pipeline import (
+    JsonLogFormatter, LogPipeline, LogSampler, correlation_id_var, rotating_file_handler
+)
+
+TICK = 0.005
+
+
+def slow_down(handler: logging.Handler, latency: float) -> logging.Handler:
+    """Make every write of the handler take `latency` seconds longer"""
+    if latency:
+        emit = handler.emit
+
+        def slow_emit(record):
+            time.sleep(latency)
+            emit(record)
+
+        handler.emit = slow_emit
+    return handler
+
+
+def legacy_handlers(directory: Path, latency: float):
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(directory / "legacy.log")
+    stream_handler = logging.StreamHandler(open(directory / "legacy.stdout", "w"))
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        slow_down(handler, latency)
+    return [file_handler, stream_handler]
+
+
+def pipeline_handlers(directory: Path, latency: float):
+    file_handler = rotating_file_handler(str(directory / "pipeline.log"))
+    stream_handler = logging.StreamHandler(open(directory / "pipeline.stdout", "w"))
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(JsonLogFormatter())
+        slow_down(handler, latency)
+    return [file_handler, stream_handler]
+
+
+async def sync_load(logger: logging.Logger, events_per_second: int, seconds: float):
+    """Batches of events every 10 ms, each logged like a synced product"""
+    per_batch = max(1, events_per_second // 100)
+    deadline = time.monotonic() + seconds
+    item = 2646610000000
+    batch = 0
+    while time.monotonic() < deadline:
+        batch += 1
+        token = correlation_id_var.set(f"sync-batch-{batch}")
+        for _ in range(per_batch):
+            item += 1
+            logger.info(f"Processing product {item}")
+            logger.info(f"Product synced successfully: {item} -> local ID {item % 100000}")
+        correlation_id_var.reset(token)
+        await asyncio.sleep(0.01)
+
+
+async def measure(logger: logging.Logger, events_per_second: int, seconds: float):
+    lags = []
+
+    async def ticker():
+        while True:
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    ticking = asyncio.create_task(ticker())
+    await sync_load(logger, events_per_second, seconds)
+    ticking.cancel()
+    return lags
+
+
+def report(name: str, lags, seconds: float):
+    ordered = sorted(lags)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"{name:<24} p50 {statistics.median(ordered) * 1000:7.2f} ms  "
+          f"p99 {p99 * 1000:7.2f} ms  max {ordered[-1] * 1000:7.2f} ms  "
+          f"({len(ordered) / seconds:,.0f} ticks/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event-loop lag caused by logging")
+    parser.add_argument("--events-per-second", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--disk-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    latency = args.disk_latency_ms / 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        logger = logging.getLogger("app.background.benchmark")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        for handler in legacy_handlers(directory, latency):
+            logger.addHandler(handler)
+        lags = asyncio.run(measure(logger, args.events_per_second, args.seconds))
+        report("inline handlers", lags, args.seconds)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+        for name, sampler in (("pipeline", None),
+                              ("pipeline + sampling", LogSampler(rate_limits={"app.background": 100.0}))):
+            pipeline = LogPipeline(pipeline_handlers(directory, latency), sampler=sampler).install(logger)
+            lags = asyncio.run(measure(logger, args.events_per_second, args.seconds))
+            report(name, lags, args.seconds)
+            drain_started = time.perf_counter()
+            pipeline.stop()
+            print(f"{'':<24} {pipeline.get_stats()} drained in "
+                  f"{(time.perf_counter() - drain_started) * 1000:.0f} ms")
+            for handler in pipeline.listener.handlers:
+                handler.close()
+
+
+if __name__ == "__main__":
+    main()
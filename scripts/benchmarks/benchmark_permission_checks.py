@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Permission Check Benchmark
+Compares checks per second of the previous query-per-check implementation
+(user, override and role-permission queries plus JSON parsing) with
+PermissionService.check_permission on compiled snapshots
+
+Usage:
+    python scripts/benchmarks/benchmark_permission_checks.py [--user-id ID] [--checks 2000]
+
+Requires a database (DATABASE_URL) with the user, its role permissions and
+the permissions table populated. Read-only.
+"""
+import sys
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import and_, or_
+
+from app.db.database import SessionLocal
+from app.models.permissions import Permission, RolePermission, UserPermission
+from app.models.user import User
+from app.services.permission_service import PermissionService
+from app.services.permission_snapshot_service import PermissionSnapshotCache
+
+
+def legacy_check(db, user_id, permission_name, context):
+    """Previous check_permission: three queries, conditions parsed per call"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user or not user.is_active:
+        return False
+    user_permission = db.query(UserPermission).join(Permission).filter(and_(
+        UserPermission.user_id == user_id,
+        Permission.code == permission_name,
+        Permission.is_active == True,
+        or_(UserPermission.expires_at.is_(None), UserPermission.expires_at > datetime.utcnow())
+    )).order_by(UserPermission.granted_at.desc()).first()
+    if user_permission:
+        if user_permission.conditions:
+            json.loads(user_permission.conditions)
+        return user_permission.is_granted
+    role_permission = db.query(RolePermission).join(Permission).filter(and_(
+        RolePermission.role_id == user.role_id,
+        Permission.name == permission_name,
+        Permission.is_active == True
+    )).first()
+    if role_permission and role_permission.conditions:
+        json.loads(role_permission.conditions)
+    return role_permission is not None
+
+
+def measure(check, names, checks):
+    started = time.perf_counter()
+    for i in range(checks):
+        check(names[i % len(names)])
+    return checks / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark permission checks per second")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--checks", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        names = [name for (name,) in db.query(Permission.name).filter(Permission.is_active == True).limit(50)]
+        if not names:
+            raise SystemExit("No active permissions found")
+        context = {"branch_id": 1}
+
+        legacy = measure(lambda name: legacy_check(db, args.user_id, name, context), names, args.checks)
+
+        service = PermissionService(db)
+        PermissionSnapshotCache.bump_version()  # start from a cold snapshot
+        snapshot = measure(lambda name: service.check_permission(args.user_id, name, context=context),
+                           names, args.checks)
+    finally:
+        db.rollback()
+        db.close()
+
+    print(f"legacy queries   : {legacy:12,.0f} checks/s")
+    print(f"compiled snapshot: {snapshot:12,.0f} checks/s  ({snapshot / legacy:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
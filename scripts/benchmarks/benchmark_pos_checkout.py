@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+POS Checkout Stock Benchmark
+Compares the legacy per-line stock check + movement loop with
+InventoryService.post_stock_movements (one locking SELECT, one INSERT, one
+UPDATE) for 5-, 40- and 200-line baskets
+
+Usage:
+    python scripts/benchmarks/benchmark_pos_checkout.py [--warehouse-id ID] [--user-id ID] [--sizes 5,40,200]
+
+Requires a PostgreSQL database (DATABASE_URL) with at least as many stocked
+inventory items in the warehouse as the largest basket. All writes are
+rolled back.
+"""
+import sys
+import argparse
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import and_
+
+from app.db.database import SessionLocal
+from app.models.inventory import InventoryItem, StockMovement
+from app.services.inventory_service import InventoryService
+
+
+def load_basket(db, warehouse_id, size):
+    items = db.query(InventoryItem).filter(
+        and_(
+            InventoryItem.warehouse_id == warehouse_id,
+            InventoryItem.quantity_on_hand - InventoryItem.quantity_reserved >= 1
+        )
+    ).order_by(InventoryItem.product_id).limit(size).all()
+    if len(items) < size:
+        raise SystemExit(f"Warehouse {warehouse_id} has only {len(items)} stocked items, need {size}")
+    # Reverse order so the legacy loop does not lock in product id order either
+    return [(item.product_id, Decimal("-1")) for item in reversed(items)]
+
+
+def run_legacy(db, warehouse_id, user_id, lines):
+    """Previous POS flow: availability query, item lookup, movement and update per line"""
+    started = time.perf_counter()
+    for product_id, quantity_change in lines:
+        item = db.query(InventoryItem).filter(
+            and_(InventoryItem.product_id == product_id, InventoryItem.warehouse_id == warehouse_id)
+        ).first()
+        assert item.quantity_on_hand - item.quantity_reserved >= -quantity_change
+
+        item = db.query(InventoryItem).filter(
+            and_(InventoryItem.product_id == product_id, InventoryItem.warehouse_id == warehouse_id)
+        ).first()
+        db.add(StockMovement(
+            inventory_item_id=item.id, movement_type="OUT", reference_type="POS",
+            quantity=abs(quantity_change), notes="POS benchmark", created_by=user_id
+        ))
+        item.quantity_on_hand += quantity_change
+        db.flush()
+    return time.perf_counter() - started
+
+
+def run_batch(db, warehouse_id, user_id, lines):
+    started = time.perf_counter()
+    InventoryService.post_stock_movements(
+        db, warehouse_id, lines, reference_type="POS", created_by=user_id, notes="POS benchmark"
+    )
+    db.flush()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark POS checkout stock posting")
+    parser.add_argument("--warehouse-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--sizes", default="5,40,200")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        db = SessionLocal()
+        try:
+            lines = load_basket(db, args.warehouse_id, size)
+        finally:
+            db.close()
+
+        for name, runner in (("legacy per-line", run_legacy), ("batch", run_batch)):
+            timings = []
+            for _ in range(args.rounds):
+                db = SessionLocal()
+                try:
+                    timings.append(runner(db, args.warehouse_id, args.user_id, lines))
+                finally:
+                    db.rollback()
+                    db.close()
+            best = min(timings)
+            print(f"{name:<16} {size:>4} lines: best {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Salesperson Reconciliation Benchmark
+Compares the legacy per-customer owner lookup (one User query per customer)
+with UserCustomerSyncService.reconcile_salesperson_assignments (one
+UPDATE ... FROM users plus an anti-join report) on synthetic customers
+
+Usage:
+    python scripts/benchmarks/benchmark_salesperson_reconciliation.py [--customers 20000] [--owners 40]
+
+Requires a database (DATABASE_URL) migrated to the current schema. Synthetic
+users and customers are inserted in the benchmark transaction; all writes are
+rolled back. Existing customers with an unassigned Zoho owner are included in
+both runs.
+"""
+import sys
+import argparse
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import insert
+
+from app.db.database import SessionLocal
+from app.models.customer import Customer
+from app.models.user import User
+from app.tds.integrations.zoho.user_customer_sync import UserCustomerSyncService
+
+
+def seed(db, customers, owners):
+    """Owners bench-owner-0..N-1 exist locally; every tenth customer has an unknown owner"""
+    db.execute(insert(User.__table__), [
+        {"name": f"Benchmark Rep {i}", "email": f"bench-rep-{i}@benchmark.invalid", "password": "x",
+         "zoho_user_id": f"bench-owner-{i}", "is_salesperson": True, "is_active": True}
+        for i in range(owners)
+    ])
+    db.execute(insert(Customer.__table__), [
+        {"customer_code": f"BENCH-{i:06d}", "name": f"Benchmark Customer {i}", "name_ar": f"عميل {i}",
+         "zoho_owner_id": f"bench-missing-{i % 7}" if i % 10 == 0 else f"bench-owner-{i % owners}"}
+        for i in range(customers)
+    ])
+    db.flush()
+
+
+def run_legacy(db):
+    """Previous update_customer_salesperson_assignments loop"""
+    started = time.perf_counter()
+    customers = db.query(Customer).filter(
+        Customer.zoho_owner_id.isnot(None),
+        Customer.salesperson_id.is_(None)
+    ).all()
+    for customer in customers:
+        user = db.query(User).filter(User.zoho_user_id == customer.zoho_owner_id).first()
+        if user:
+            customer.salesperson_id = user.id
+    db.flush()
+    return time.perf_counter() - started, len(customers)
+
+
+def run_set_based(db):
+    started = time.perf_counter()
+    result = UserCustomerSyncService(db, None).reconcile_salesperson_assignments(resync_all=False)
+    return time.perf_counter() - started, result["total_checked"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark customer salesperson reconciliation")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--owners", type=int, default=40)
+    args = parser.parse_args()
+
+    timings = {}
+    for name, runner in (("legacy per-customer", run_legacy), ("UPDATE ... FROM", run_set_based)):
+        db = SessionLocal()
+        try:
+            seed(db, args.customers, args.owners)
+            timings[name], checked = runner(db)
+        finally:
+            db.rollback()
+            db.close()
+        print(f"{name:<20} {checked} customers: {timings[name]:8.2f} s")
+
+    legacy, set_based = timings.values()
+    print(f"speedup: {legacy / set_based:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+GPS Partition Maintenance Script
+Creates upcoming monthly partitions for salesperson GPS locations and drops
+partitions older than the retention window
+
+Usage:
+    python scripts/gps_partition_maintenance.py [options]
+
+Options:
+    --premake-months N      Months ahead to create (default: GPS_PARTITION_PREMAKE_MONTHS)
+    --retention-months N    Whole months to keep before the current one (default: GPS_RETENTION_MONTHS)
+    --skip-retention        Only create partitions, never drop
+    --dry-run               Show what would be dropped without making changes
+
+Examples:
+    # Nightly cron job
+    python scripts/gps_partition_maintenance.py
+
+    # Preview retention with a 6 month window
+    python scripts/gps_partition_maintenance.py --retention-months 6 --dry-run
+"""
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.services.gps_tracking_service import GPSIngestionService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain GPS location partitions")
+    parser.add_argument("--premake-months", type=int, default=settings.gps_partition_premake_months)
+    parser.add_argument("--retention-months", type=int, default=settings.gps_retention_months)
+    parser.add_argument("--skip-retention", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = GPSIngestionService(db)
+
+        if args.dry_run:
+            expired = service.expired_partitions(args.retention_months)
+            logger.info(f"Existing partitions: {', '.join(service.list_partitions()) or 'none'}")
+            logger.info(f"Would drop: {', '.join(expired) or 'none'}")
+            db.rollback()
+            return 0
+
+        created = service.premake_partitions(args.premake_months)
+        logger.info(f"Ensured partitions: {', '.join(created)}")
+
+        if not args.skip_retention:
+            dropped = service.apply_retention(args.retention_months)
+            logger.info(f"Dropped partitions: {', '.join(dropped) or 'none'}")
+
+        db.commit()
+        return 0
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"GPS partition maintenance failed: {e}")
+        return 1
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
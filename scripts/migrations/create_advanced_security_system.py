@@ -70,7 +70,30 @@ def create_advanced_security_tables():
             CREATE INDEX IF NOT EXISTS idx_security_roles_name ON security_roles(name);
             CREATE INDEX IF NOT EXISTS idx_security_roles_parent ON security_roles(parent_role_id);
         """))
-        
+
+        # 2a. Role hierarchy closure (kept current by SecurityDecisionCache on role changes)
+        session.execute(text("""
+            CREATE TABLE IF NOT EXISTS security_role_closure (
+                ancestor_id INTEGER NOT NULL REFERENCES security_roles(id) ON DELETE CASCADE,
+                descendant_id INTEGER NOT NULL REFERENCES security_roles(id) ON DELETE CASCADE,
+                depth INTEGER NOT NULL,
+                PRIMARY KEY (ancestor_id, descendant_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_security_role_closure_descendant ON security_role_closure(descendant_id);
+
+            DELETE FROM security_role_closure;
+            INSERT INTO security_role_closure (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE chain (ancestor_id, descendant_id, depth, path) AS (
+                SELECT id, id, 0, ARRAY[id] FROM security_roles
+                UNION ALL
+                SELECT r.parent_role_id, c.descendant_id, c.depth + 1, c.path || r.parent_role_id
+                FROM chain c
+                JOIN security_roles r ON r.id = c.ancestor_id
+                WHERE r.parent_role_id IS NOT NULL AND NOT r.parent_role_id = ANY(c.path)
+            )
+            SELECT ancestor_id, descendant_id, depth FROM chain;
+        """))
+
         # 3. Role Permission Mappings
         session.execute(text("""
             CREATE TABLE IF NOT EXISTS role_permission_mappings (
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Cash Flow Rollup Rebuild Script
+Backfills the branch daily cash-flow rollup (cash_flow_summaries, DAILY) from
+cash transaction history
+
+Usage:
+    python scripts/rebuild_cashflow_rollup.py [options]
+
+Options:
+    --from YYYY-MM-DD       First day to rebuild (default: all history)
+    --to YYYY-MM-DD         Last day to rebuild (default: all history)
+    --fold-pending          Only add transactions not yet in the rollup
+
+Examples:
+    # Initial backfill after deploying the rollup
+    python scripts/rebuild_cashflow_rollup.py
+
+    # Repair one month
+    python scripts/rebuild_cashflow_rollup.py --from 2026-09-01 --to 2026-09-30
+
+    # Periodic catch-up for rows written outside CashTransactionService
+    python scripts/rebuild_cashflow_rollup.py --fold-pending
+"""
+import sys
+import argparse
+import logging
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.database import SessionLocal
+from app.services.cashflow_service import CashFlowRollupService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the branch daily cash-flow rollup")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat)
+    parser.add_argument("--fold-pending", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.fold_pending:
+            folded = CashFlowRollupService.fold_pending(db)
+            logger.info(f"Folded {folded} pending transactions into the rollup")
+        else:
+            rows = CashFlowRollupService.rebuild(db, args.start_date, args.end_date)
+            logger.info(f"Rebuilt {rows} branch-day rollup rows")
+
+        db.commit()
+        return 0
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rollup rebuild failed: {e}")
+        return 1
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Unit Tests for Account Balance Ledger
+
+Property-style tests over randomly generated journals: after any mix of
+posted, draft-then-posted and unposted entries, account_period_balances must
+equal a full recomputation from journal lines, and point-in-time statements
+must equal sums over the lines up to that moment. Entries created through
+POST /journal-entries go through the same ledger.
+"""
+
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base, get_db
+from app.models.accounting import (
+    Account, AccountPeriodBalance, AccountTypeEnum, ChartOfAccounts, Currency,
+    Journal, JournalEntry, JournalLine, JournalTypeEnum, TransactionStatusEnum
+)
+from app.routers import accounting as accounting_router
+from app.schemas.accounting import JournalEntryCreate, JournalLineCreate
+from app.services.auth_service import AuthService
+from app.services.accounting_service import (
+    AccountBalanceLedger, AccountingReportService, JournalService
+)
+
+
+TABLES = [
+    "currencies", "chart_of_accounts", "accounts", "journals",
+    "journal_entries", "journal_lines", "account_period_balances",
+]
+ACCOUNT_TYPES = [
+    AccountTypeEnum.ASSET, AccountTypeEnum.ASSET, AccountTypeEnum.LIABILITY,
+    AccountTypeEnum.EQUITY, AccountTypeEnum.REVENUE, AccountTypeEnum.EXPENSE,
+]
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    session = sessionmaker(bind=engine)()
+
+    session.add(Currency(id=1, code="IQD", name_ar="دينار", name_en="Dinar", symbol="IQD", is_base_currency=True))
+    session.add(Journal(id=1, code="GEN", name_ar="عام", name_en="General", journal_type=JournalTypeEnum.GENERAL))
+    for account_id, account_type in enumerate(ACCOUNT_TYPES, 1):
+        session.add(ChartOfAccounts(
+            id=account_id, code=f"{account_id}000", name_ar=f"حساب {account_id}",
+            name_en=f"Account {account_id}", account_type=account_type
+        ))
+        session.add(Account(id=account_id, chart_account_id=account_id, currency_id=1))
+    session.commit()
+
+    yield session
+    session.close()
+
+
+def random_journal(db, rng, count=60):
+    """Balanced entries over ~6 months; returns nothing, state lives in the db"""
+    for number in range(count):
+        amount = Decimal(rng.randint(1, 100000)) / 100
+        debit_account, credit_account = rng.sample(range(1, len(ACCOUNT_TYPES) + 1), 2)
+        mode = rng.choice(["posted", "post_later", "draft"])
+        entry = JournalService.create_journal_entry(db, JournalEntryCreate(
+            journal_id=1, currency_id=1, entry_number=f"JE-{number:04d}",
+            entry_date=START + timedelta(days=rng.randint(0, 180), hours=rng.randint(0, 23)),
+            status=TransactionStatusEnum.POSTED if mode == "posted" else TransactionStatusEnum.DRAFT,
+            journal_lines=[
+                JournalLineCreate(account_id=debit_account, line_number=1, debit_amount=amount, credit_amount=0),
+                JournalLineCreate(account_id=credit_account, line_number=2, debit_amount=0, credit_amount=amount),
+            ]
+        ), user_id=1)
+        if mode == "post_later":
+            JournalService.post_journal_entry(db, entry.id, user_id=1)
+
+
+def recomputed_ledger(db):
+    ledger = {}
+    for line, entry in db.query(JournalLine, JournalEntry).join(JournalEntry).filter(
+        JournalEntry.status == TransactionStatusEnum.POSTED
+    ):
+        key = (line.account_id, AccountBalanceLedger.period_start(entry.entry_date))
+        debit, credit = ledger.get(key, (Decimal(0), Decimal(0)))
+        ledger[key] = (debit + line.debit_amount, credit + line.credit_amount)
+    return ledger
+
+
+def stored_ledger(db):
+    return {
+        (row.account_id, row.period_start): (Decimal(row.debit_total), Decimal(row.credit_total))
+        for row in db.query(AccountPeriodBalance)
+    }
+
+
+def line_totals_as_of(db, as_of):
+    totals = {}
+    for line, entry in db.query(JournalLine, JournalEntry).join(JournalEntry).filter(
+        JournalEntry.status == TransactionStatusEnum.POSTED, JournalEntry.entry_date <= as_of
+    ):
+        debit, credit = totals.get(line.account_id, (Decimal(0), Decimal(0)))
+        totals[line.account_id] = (debit + line.debit_amount, credit + line.credit_amount)
+    return totals
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_ledger_equals_full_recomputation(db, seed):
+    random_journal(db, random.Random(seed))
+
+    assert stored_ledger(db) == recomputed_ledger(db)
+
+    AccountBalanceLedger.rebuild(db)
+    db.commit()
+    assert stored_ledger(db) == recomputed_ledger(db)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_point_in_time_totals(db, seed):
+    rng = random.Random(seed)
+    random_journal(db, rng)
+
+    for _ in range(5):
+        as_of = START + timedelta(days=rng.randint(0, 200), hours=rng.randint(0, 23))
+        assert AccountBalanceLedger.totals_as_of(db, 1, as_of) == line_totals_as_of(db, as_of)
+
+
+def test_statements_as_of_date(db):
+    random_journal(db, random.Random(99))
+    as_of = START + timedelta(days=100)
+    expected = line_totals_as_of(db, as_of)
+
+    trial_balance = AccountingReportService.get_trial_balance(db, 1, as_of)
+    assert trial_balance.total_debit == trial_balance.total_credit
+    assert trial_balance.total_debit == sum(debit for debit, _ in expected.values())
+
+    balance_sheet = AccountingReportService.get_balance_sheet(db, 1, as_of)
+    asset_total = sum(
+        expected.get(account_id, (0, 0))[0] - expected.get(account_id, (0, 0))[1]
+        for account_id, account_type in enumerate(ACCOUNT_TYPES, 1) if account_type == AccountTypeEnum.ASSET
+    )
+    assert balance_sheet.total_assets == asset_total
+
+    # Income statement over a range equals the change between two points in time
+    from_date = START + timedelta(days=30)
+    statement = AccountingReportService.get_income_statement(db, 1, from_date, as_of)
+    opening = line_totals_as_of(db, from_date - timedelta(microseconds=1))
+    revenue_id = ACCOUNT_TYPES.index(AccountTypeEnum.REVENUE) + 1
+    revenue = (
+        (expected.get(revenue_id, (0, 0))[1] - opening.get(revenue_id, (0, 0))[1])
+        - (expected.get(revenue_id, (0, 0))[0] - opening.get(revenue_id, (0, 0))[0])
+    )
+    assert statement.total_revenue == revenue
+
+
+def test_posted_entry_created_through_the_api_reaches_the_ledger(db):
+    """POST /journal-entries with status POSTED lands in the trial balance"""
+    app = FastAPI()
+    app.state.limiter = accounting_router.limiter
+    app.include_router(accounting_router.router, prefix="/api/accounting")
+    app.dependency_overrides[get_db] = lambda: db
+    token = AuthService.create_access_token({
+        "sub": "accountant@tsh.sale", "role": "accountant", "user_id": 7, "permissions": ["accounting.create"]
+    })
+
+    def entry(number, status):
+        return {
+            "journal_id": 1, "currency_id": 1, "entry_number": number,
+            "entry_date": "2026-03-10T09:00:00", "status": status,
+            "journal_lines": [
+                {"account_id": 1, "line_number": 1, "debit_amount": "250.00", "credit_amount": "0"},
+                {"account_id": 5, "line_number": 2, "debit_amount": "0", "credit_amount": "250.00"},
+            ]
+        }
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = "/api/accounting/journal-entries"
+            assert (await client.post(url, json=entry("JE-API-0", "POSTED"))).status_code == 403
+            headers = {"Authorization": f"Bearer {token}"}
+            return (
+                await client.post(url, json=entry("JE-API-1", "POSTED"), headers=headers),
+                await client.post(url, json=entry("JE-API-2", "DRAFT"), headers=headers),
+            )
+
+    posted, draft = asyncio.new_event_loop().run_until_complete(scenario())
+
+    assert posted.status_code == 200, posted.text
+    assert draft.status_code == 200, draft.text
+    assert (posted.json()["created_by"], posted.json()["posted_by"]) == (7, 7)
+    assert stored_ledger(db) == recomputed_ledger(db) == {
+        (1, date(2026, 3, 1)): (Decimal("250.00"), Decimal(0)),
+        (5, date(2026, 3, 1)): (Decimal(0), Decimal("250.00")),
+    }
+    trial_balance = AccountingReportService.get_trial_balance(db, 1, datetime(2026, 3, 31))
+    assert trial_balance.total_debit == trial_balance.total_credit == Decimal("250.00")
@@ -0,0 +1,308 @@
+"""
+Unit Tests for Resumable Zoho Bulk Sync Jobs
+
+A local aiohttp server stands in for the Zoho Inventory items API and a
+file-backed SQLite database holds the jobs and the imported rows (the page
+writer inserts through the runner's session, so rows and checkpoints commit
+together). Runners are killed mid-page, stopped, cancelled and robbed of
+their lease; every item must end up imported exactly once.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import FastAPI
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.events.event_bus import EventBus
+from app.db.database import get_db
+from app.exceptions import BusinessLogicError
+from app.models.zoho_sync import BulkSyncJobStatus, TDSBulkSyncJob
+from app.routers.zoho_bulk_sync import router
+from app.services.auth_service import AuthService
+from app.services.zoho_bulk_sync_service import (
+    JOB_COMPLETED, JOB_PROGRESS, JOB_STARTED, BulkSyncJobService, BulkSyncRunner, PageCounts
+)
+from app.tds.integrations.zoho import EntityType, UnifiedZohoClient, ZohoAPI
+
+synced_items = Table(
+    "synced_items", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("zoho_item_id", String(20), nullable=False),
+    Column("page", Integer, nullable=False),
+)
+
+
+class FakeZoho:
+    """GET /inventory/v1/items with Zoho's page/per_page/has_more_page contract"""
+
+    def __init__(self, total):
+        self.items = [{"item_id": str(i), "name": f"Item {i}"} for i in range(1, total + 1)]
+        self.requests = []
+        self.hang_on_page = None
+        self.fail_on_page = None
+        self.reached = asyncio.Event()
+        self.release = asyncio.Event()
+
+    def hang_on(self, page):
+        self.release.set()
+        self.hang_on_page = page
+        self.reached = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def list_items(self, request):
+        assert request.headers["Authorization"] == "Zoho-oauthtoken test-token"
+        assert request.query["organization_id"] == "org-1"
+        assert request.query["filter_by"] == "Status.Active"
+        page, per_page = int(request.query["page"]), int(request.query["per_page"])
+        self.requests.append(page)
+
+        if page == self.hang_on_page:
+            self.reached.set()
+            await self.release.wait()
+        if page == self.fail_on_page:
+            return web.json_response({"code": 57, "message": "Zoho is down"}, status=400)
+
+        chunk = self.items[(page - 1) * per_page:page * per_page]
+        return web.json_response({
+            "code": 0,
+            "items": chunk,
+            "page_context": {"page": page, "per_page": per_page, "has_more_page": page * per_page < len(self.items)},
+        })
+
+
+class FakeAuth:
+    async def get_valid_token(self):
+        return "test-token"
+
+
+async def write_items(db, job, entities):
+    db.execute(insert(synced_items), [{"zoho_item_id": e["item_id"], "page": job.next_page} for e in entities])
+    return PageCounts(processed=len(entities), success=len(entities))
+
+
+class Harness:
+    def __init__(self, tmp_path, total):
+        self.engine = create_engine(f"sqlite:///{tmp_path / 'bulk_sync.db'}")
+        TDSBulkSyncJob.__table__.create(self.engine)
+        synced_items.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.zoho = FakeZoho(total)
+        self.bus = EventBus()
+        self.events = []
+        self.bus.subscribe("*", self.events.append)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/inventory/v1/items", self.zoho.list_items)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+        self.client = UnifiedZohoClient(FakeAuth(), "org-1", rate_limit=100000)
+        self.client.API_BASES = {ZohoAPI.INVENTORY: str(self.server.make_url("/inventory/v1"))}
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.zoho.release.set()
+        await self.client.close_session()
+        await self.server.close()
+
+    def runner(self, name, **kwargs):
+        return BulkSyncRunner(self.client, self.Session, write_items, self.bus, runner_id=name, **kwargs)
+
+    def create_job(self, page_size=100):
+        with self.Session() as db:
+            return BulkSyncJobService(db).create_job(
+                EntityType.PRODUCTS, params={"filter_by": "Status.Active"}, page_size=page_size
+            ).id
+
+    def job(self, job_id):
+        with self.Session() as db:
+            return db.get(TDSBulkSyncJob, job_id)
+
+    def expire_lease(self, job_id):
+        with self.Session() as db:
+            db.execute(update(TDSBulkSyncJob).where(TDSBulkSyncJob.id == job_id)
+                       .values(lease_expires_at=TDSBulkSyncJob.created_at))
+            db.commit()
+
+    def imported(self):
+        with self.Session() as db:
+            return db.execute(select(func.count(), func.count(synced_items.c.zoho_item_id.distinct()))).one()
+
+    def progress(self, event_type=JOB_PROGRESS):
+        return [event.data for event in self.events if event.event_type == event_type]
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_killed_runner_resumes_from_last_checkpoint(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path, total=950) as h:
+            job_id = h.create_job()
+            h.zoho.hang_on(4)
+            killed = asyncio.create_task(h.runner("a", lease_seconds=60).run_once())
+            await h.zoho.reached.wait()
+            killed.cancel()
+            await asyncio.gather(killed, return_exceptions=True)
+
+            job = h.job(job_id)
+            assert (job.status, job.next_page, job.pages_completed, job.lease_owner) == \
+                (BulkSyncJobStatus.RUNNING, 4, 3, "a")
+            assert h.imported() == (300, 300)
+
+            survivor = h.runner("b")
+            assert survivor.claim_next() is None  # lease still current
+            h.expire_lease(job_id)
+            h.zoho.hang_on(None)
+            assert await survivor.run_once()
+
+            job = h.job(job_id)
+            assert job.status == BulkSyncJobStatus.COMPLETED
+            assert (job.next_page, job.pages_completed, job.total_processed, job.attempts) == (11, 10, 950, 2)
+            assert job.lease_owner is None and job.completed_at is not None
+            assert h.imported() == (950, 950)
+            assert h.zoho.requests == [1, 2, 3, 4, 4, 5, 6, 7, 8, 9, 10]
+            assert [event["pages_completed"] for event in h.progress()] == list(range(1, 11))
+            assert len(h.progress(JOB_STARTED)) == 2 and len(h.progress(JOB_COMPLETED)) == 1
+
+    run(scenario())
+
+
+def test_graceful_stop_hands_job_back_and_lost_lease_discards_page(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path, total=1000) as h:
+            job_id = h.create_job()
+            h.zoho.hang_on(3)
+            deploying = h.runner("old", poll_interval_ms=100)
+            deploying.start()
+            await h.zoho.reached.wait()
+            stopping = asyncio.create_task(deploying.stop())
+            await asyncio.sleep(0)
+            h.zoho.release.set()
+            await stopping
+
+            job = h.job(job_id)
+            assert (job.status, job.next_page, job.lease_owner) == (BulkSyncJobStatus.QUEUED, 4, None)
+            assert h.imported() == (300, 300)
+
+            # The new runner claims at once; while it hangs on page 5 its lease
+            # is taken over, so the page it then writes must be discarded
+            h.zoho.hang_on(5)
+            slow = h.runner("slow")
+            slow_run = asyncio.create_task(slow.run_once())
+            await h.zoho.reached.wait()
+            h.expire_lease(job_id)
+            thief = h.runner("thief")
+            assert thief.claim_next() == job_id
+            h.zoho.release.set()
+            assert await slow_run is True
+            assert h.job(job_id).lease_owner == "thief"
+            assert h.imported() == (400, 400)
+
+            h.zoho.hang_on(None)
+            assert await thief.run_job(job_id) == BulkSyncJobStatus.COMPLETED
+            assert h.imported() == (1000, 1000)
+            assert h.job(job_id).attempts == 3
+
+    run(scenario())
+
+
+def test_cancel_resume_and_failure(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path, total=1000) as h:
+            job_id = h.create_job()
+            h.zoho.hang_on(3)
+            running = asyncio.create_task(h.runner("a").run_once())
+            await h.zoho.reached.wait()
+            with h.Session() as db:
+                job = BulkSyncJobService(db).cancel_job(job_id)
+                assert (job.status, job.cancel_requested) == (BulkSyncJobStatus.RUNNING, True)
+            h.zoho.release.set()
+            await running
+
+            job = h.job(job_id)
+            assert (job.status, job.next_page, job.lease_owner) == (BulkSyncJobStatus.CANCELLED, 4, None)
+            assert h.zoho.requests == [1, 2, 3]
+            assert h.imported() == (300, 300)
+
+            queued_id = h.create_job()
+            with h.Session() as db:
+                service = BulkSyncJobService(db)
+                assert service.cancel_job(queued_id).status == BulkSyncJobStatus.CANCELLED
+                assert service.cancel_job(queued_id).status == BulkSyncJobStatus.CANCELLED
+                assert service.resume_job(job_id).status == BulkSyncJobStatus.QUEUED
+
+            h.zoho.hang_on(None)
+            h.zoho.fail_on_page = 6
+            runner = h.runner("b")
+            assert await runner.run_once()
+            job = h.job(job_id)
+            assert job.status == BulkSyncJobStatus.FAILED and "Zoho is down" in job.error_message
+            assert (job.next_page, h.imported()) == (6, (500, 500))
+            assert not await runner.run_once()  # the cancelled queued job is never claimed
+
+            h.zoho.fail_on_page = None
+            with h.Session() as db:
+                BulkSyncJobService(db).resume_job(job_id)
+            assert await runner.run_once()
+            job = h.job(job_id)
+            assert (job.status, job.total_processed, job.attempts) == (BulkSyncJobStatus.COMPLETED, 1000, 3)
+            assert h.imported() == (1000, 1000)
+            assert h.zoho.requests == [1, 2, 3, 4, 5, 6, 6, 7, 8, 9, 10]
+
+            with h.Session() as db:
+                with pytest.raises(BusinessLogicError):
+                    BulkSyncJobService(db).cancel_job(job_id)
+
+    run(scenario())
+
+
+def test_endpoints_queue_jobs_and_return_immediately(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    TDSBulkSyncJob.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+
+    def override_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/zoho/bulk-sync")
+    app.dependency_overrides[get_db] = override_db
+
+    def bearer(role):
+        token = AuthService.create_access_token({"sub": f"{role}@tsh.sale", "role": role, "user_id": 1})
+        return {"Authorization": f"Bearer {token}"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as anonymous:
+            assert (await anonymous.post("/api/zoho/bulk-sync/sync-all")).status_code == 403
+            response = await anonymous.post("/api/zoho/bulk-sync/sync-all", headers=bearer("salesperson"))
+            assert response.status_code == 403
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=bearer("admin")) as client:
+            response = await client.post("/api/zoho/bulk-sync/products",
+                                         json={"batch_size": 50, "modified_since": "2026-10-01"})
+            assert response.status_code == 202
+            job = response.json()
+            assert (job["entity_type"], job["status"], job["page_size"], job["next_page"]) == \
+                ("products", "queued", 50, 1)
+            assert job["params"] == {"filter_by": "Status.Active", "last_modified_time": "2026-10-01"}
+
+            response = await client.post("/api/zoho/bulk-sync/sync-all")
+            assert [j["entity_type"] for j in response.json()["jobs"]] == ["products", "customers"]
+
+            response = await client.post(f"/api/zoho/bulk-sync/jobs/{job['id']}/cancel")
+            assert response.json()["status"] == "cancelled"
+            response = await client.get("/api/zoho/bulk-sync/jobs", params={"status": "queued"})
+            assert [j["entity_type"] for j in response.json()] == ["customers", "products"]
+            assert (await client.get("/api/zoho/bulk-sync/jobs/999")).status_code == 404
+
+    run(scenario())
@@ -0,0 +1,185 @@
+"""
+Unit Tests for Cash Flow Daily Rollup
+
+Checks that dashboards built from the branch daily rollup match the
+query-by-query aggregation over cash transactions, for rows added through
+CashTransactionService, rows written directly (pending), fold_pending and a
+full rebuild.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import and_, case, create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.branch import Branch
+from app.models.cashflow import (
+    CashBox, CashBoxTypeEnum, CashFlowSummary, CashPaymentMethodEnum, CashTransaction
+)
+from app.schemas.cashflow import CashTransactionCreate
+from app.services.cashflow_service import (
+    CashFlowDashboardService, CashFlowRollupService, CashTransactionService
+)
+from app.services.document_sequence_service import DocumentSequenceService
+
+
+TABLES = [
+    "branches", "roles", "users", "cash_boxes", "cash_transactions",
+    "cash_transfers", "cash_flow_summaries", "document_sequences",
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    DocumentSequenceService.clear_cache()
+    session = sessionmaker(bind=engine)()
+
+    for branch_id in (1, 2):
+        session.add(Branch(id=branch_id, name=f"Branch {branch_id}", name_ar=f"فرع {branch_id}", code=f"B{branch_id}"))
+        session.add(CashBox(
+            id=branch_id, code=f"BOX-{branch_id}", name_ar="صندوق", name_en="Box",
+            box_type=CashBoxTypeEnum.BRANCH, branch_id=branch_id,
+            balance_iqd_cash=Decimal("1000000"), balance_usd_cash=Decimal("10000")
+        ))
+    session.commit()
+
+    yield session
+    session.close()
+    DocumentSequenceService.clear_cache()
+
+
+def legacy_activity(db, branch_id, day):
+    """The previous per-branch COUNT/SUM queries, one per currency"""
+    start = datetime.combine(day, datetime.min.time())
+    end = datetime.combine(day, datetime.max.time())
+    result = {"total_transactions": 0}
+    for currency in ("IQD", "USD"):
+        row = db.query(
+            func.sum(case((CashTransaction.transaction_type.in_(['RECEIPT', 'TRANSFER_IN']),
+                           CashTransaction.amount), else_=0)).label('receipts'),
+            func.sum(case((CashTransaction.transaction_type.in_(['PAYMENT', 'TRANSFER_OUT']),
+                           CashTransaction.amount), else_=0)).label('payments'),
+            func.count(CashTransaction.id).label('transactions_count')
+        ).join(CashBox).filter(
+            and_(CashBox.branch_id == branch_id,
+                 CashTransaction.transaction_date >= start,
+                 CashTransaction.transaction_date <= end,
+                 CashTransaction.currency_code == currency)
+        ).first()
+        result[f"receipts_{currency.lower()}"] = Decimal(row.receipts or 0)
+        result[f"payments_{currency.lower()}"] = Decimal(row.payments or 0)
+        result["total_transactions"] += row.transactions_count
+    return result
+
+
+def dashboard_activity(dashboard):
+    return {
+        "receipts_iqd": Decimal(dashboard.today_receipts_iqd),
+        "payments_iqd": Decimal(dashboard.today_payments_iqd),
+        "receipts_usd": Decimal(dashboard.today_receipts_usd),
+        "payments_usd": Decimal(dashboard.today_payments_usd),
+        "total_transactions": dashboard.today_transactions_count,
+    }
+
+
+def create_via_service(db, box_id, transaction_type, currency, amount, when):
+    CashTransactionService.create_transaction(db, CashTransactionCreate(
+        cash_box_id=box_id,
+        transaction_type=transaction_type,
+        payment_method="CASH",
+        currency_code=currency,
+        amount=Decimal(amount),
+        transaction_date=when
+    ), created_by=None)
+
+
+def insert_directly(db, box_id, transaction_type, currency, amount, when, number):
+    """A row written outside CashTransactionService (not rolled up)"""
+    db.add(CashTransaction(
+        transaction_number=number, cash_box_id=box_id, transaction_type=transaction_type,
+        payment_method=CashPaymentMethodEnum.CASH, currency_code=currency,
+        amount=Decimal(amount), transaction_date=when
+    ))
+    db.commit()
+
+
+@pytest.fixture
+def history(db):
+    today = datetime.combine(date.today(), datetime.min.time())
+    yesterday = today - timedelta(days=1)
+
+    create_via_service(db, 1, "RECEIPT", "IQD", "250000", today + timedelta(hours=9))
+    create_via_service(db, 1, "PAYMENT", "IQD", "40000", today + timedelta(hours=10))
+    create_via_service(db, 1, "RECEIPT", "USD", "300", today + timedelta(hours=11))
+    create_via_service(db, 2, "TRANSFER_IN", "IQD", "90000", today + timedelta(hours=12))
+    create_via_service(db, 2, "TRANSFER_OUT", "USD", "125.5", today + timedelta(hours=13))
+    create_via_service(db, 2, "RECEIPT", "IQD", "10000", yesterday + timedelta(hours=15))
+
+    insert_directly(db, 1, "RECEIPT", "IQD", "5000", today + timedelta(hours=14), "EXT-1")
+    insert_directly(db, 2, "PAYMENT", "USD", "20", today + timedelta(hours=15), "EXT-2")
+    insert_directly(db, 2, "RECEIPT", "IQD", "7000", yesterday + timedelta(hours=16), "EXT-3")
+    return db
+
+
+def assert_dashboards_match_legacy(db):
+    branches = db.query(Branch).order_by(Branch.id).all()
+    for dashboard in CashFlowDashboardService.get_branch_dashboards(db, branches):
+        assert dashboard_activity(dashboard) == legacy_activity(db, dashboard.branch_id, date.today())
+
+
+class TestCashFlowRollup:
+    """Test suite for rollup vs query-by-query equivalence"""
+
+    def test_service_inserts_are_rolled_up(self, history):
+        pending = history.query(CashTransaction).filter(CashTransaction.rolled_up == False).count()
+        assert pending == 3  # Only the direct inserts
+
+    def test_dashboard_includes_pending_rows(self, history):
+        """Rollup + grouped pending query equals the per-branch queries"""
+        assert_dashboards_match_legacy(history)
+
+    def test_fold_pending(self, history):
+        assert CashFlowRollupService.fold_pending(history) == 3
+        history.commit()
+
+        assert history.query(CashTransaction).filter(CashTransaction.rolled_up == False).count() == 0
+        assert_dashboards_match_legacy(history)
+
+    def test_rebuild_matches_incremental(self, history):
+        CashFlowRollupService.fold_pending(history)
+        history.commit()
+
+        def snapshot():
+            return {
+                (row.branch_id, row.summary_date): {
+                    column: Decimal(getattr(row, column) or 0)
+                    for column in CashFlowRollupService.COUNTER_COLUMNS
+                }
+                for row in history.query(CashFlowSummary)
+            }
+
+        incremental = snapshot()
+        assert len(incremental) == 3  # Two branches today, branch 2 yesterday
+
+        assert CashFlowRollupService.rebuild(history) == 3
+        history.commit()
+
+        assert snapshot() == incremental
+        assert_dashboards_match_legacy(history)
+
+    def test_rollup_counters(self, history):
+        CashFlowRollupService.rebuild(history)
+        history.commit()
+
+        activity = CashFlowRollupService.get_daily_activity(history, date.today())
+
+        assert activity[1]["net_flow_iqd"] == Decimal("215000")
+        assert activity[2]["total_transfers_sent"] == 1
+        assert activity[2]["total_transfers_received"] == 1
+        assert activity[2]["net_flow_usd"] == Decimal("-145.5")
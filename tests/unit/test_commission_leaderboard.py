@@ -0,0 +1,221 @@
+"""
+Unit Tests for Commission Leaderboard
+
+Compares the materialized window-function ranking with the previous
+per-salesperson (N+1) leaderboard on seeded data, pages it by keyset, and
+checks the single-query commission statistics against the Python version.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import and_, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.exceptions import ValidationError
+from app.models.salesperson import SalespersonCommission, SalespersonLeaderboardRank, SalespersonTarget
+from app.models.user import User
+from app.services.commission_leaderboard_service import CommissionLeaderboardService
+
+
+TABLES = ["users", "salesperson_commissions", "salesperson_targets", "salesperson_leaderboard_ranks"]
+PERIOD = (date(2026, 10, 1), date(2026, 10, 31))
+OTHER_PERIOD = (date(2026, 9, 1), date(2026, 9, 30))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def commission(salesperson, period, sales, orders, **extra):
+    return SalespersonCommission(
+        salesperson_id=salesperson.id, salesperson_name=salesperson.name, period_type="monthly",
+        period_start=period[0], period_end=period[1], total_sales_amount=Decimal(sales),
+        calculated_commission=Decimal(sales) * Decimal("0.0225"), total_orders=orders,
+        total_customers=orders // 2, **extra
+    )
+
+
+def seed(db, count=40, seed_value=3):
+    rng = random.Random(seed_value)
+    salespersons = []
+    for i in range(count):
+        user = User(name=f"Salesperson {i}", email=f"sp{i}@tsh.test", password="x", is_salesperson=True)
+        db.add(user)
+        salespersons.append(user)
+    db.add(User(name="Office", email="office@tsh.test", password="x", is_salesperson=False))
+    db.flush()
+
+    sales_values = rng.sample(range(1000, 900000), count)
+    for user, sales in zip(salespersons, sales_values):
+        if rng.random() < 0.8:
+            db.add(commission(user, PERIOD, sales, rng.randint(1, 60)))
+        db.add(commission(user, OTHER_PERIOD, rng.randint(1000, 900000), rng.randint(1, 60)))
+        if rng.random() < 0.6:
+            db.add(SalespersonTarget(
+                salesperson_id=user.id, salesperson_name=user.name, period_type="monthly",
+                period_start=PERIOD[0], period_end=PERIOD[1],
+                target_revenue_iqd=Decimal(rng.choice([0, rng.randint(100000, 500000)])), is_active=True
+            ))
+    db.commit()
+    return salespersons
+
+
+def legacy_leaderboard(db, period_start, period_end):
+    """The previous per-salesperson implementation"""
+    leaderboard_data = []
+    for salesperson in db.query(User).filter(User.is_salesperson == True).all():
+        found = db.query(SalespersonCommission).filter(and_(
+            SalespersonCommission.salesperson_id == salesperson.id,
+            SalespersonCommission.period_start == period_start,
+            SalespersonCommission.period_end == period_end
+        )).first()
+        total_sales = found.total_sales_amount if found else Decimal(0)
+        total_orders = found.total_orders if found else 0
+
+        target = db.query(SalespersonTarget).filter(and_(
+            SalespersonTarget.salesperson_id == salesperson.id,
+            SalespersonTarget.period_start <= period_end,
+            SalespersonTarget.period_end >= period_start,
+            SalespersonTarget.is_active == True
+        )).first()
+        achievement = None
+        if target and target.target_revenue_iqd:
+            achievement = (total_sales / target.target_revenue_iqd * 100)
+
+        leaderboard_data.append({
+            "salesperson_id": salesperson.id,
+            "total_sales": total_sales,
+            "total_commission": found.calculated_commission if found else Decimal(0),
+            "total_orders": total_orders,
+            "target_achievement_percentage": achievement,
+        })
+
+    leaderboard_data.sort(key=lambda x: (x["total_sales"], x["total_orders"]), reverse=True)
+    return leaderboard_data
+
+
+def materialized(db, period):
+    CommissionLeaderboardService.ensure_fresh(db, *period)
+    return db.query(SalespersonLeaderboardRank).filter_by(
+        period_start=period[0], period_end=period[1]
+    ).order_by(SalespersonLeaderboardRank.rank, SalespersonLeaderboardRank.salesperson_id).all()
+
+
+def test_ranking_matches_n_plus_one_version(db):
+    seed(db)
+    rows = materialized(db, PERIOD)
+    legacy = legacy_leaderboard(db, *PERIOD)
+
+    # Distinct sales rank 1..n exactly like the sorted list; the zero-sales
+    # tail ties and shares a rank (the old loop numbered it arbitrarily)
+    assert [row.salesperson_id for row in rows if row.total_sales] == \
+        [data["salesperson_id"] for data in legacy if data["total_sales"]]
+    for position, (row, data) in enumerate(zip(rows, legacy), start=1):
+        assert Decimal(row.total_sales) == data["total_sales"]
+        assert Decimal(row.total_commission) == data["total_commission"].quantize(Decimal("0.01"))
+        if data["total_sales"]:
+            assert row.rank == position
+        if data["target_achievement_percentage"] is None:
+            assert row.target_achievement_percentage is None
+        else:
+            assert abs(Decimal(row.target_achievement_percentage) - data["target_achievement_percentage"]) < Decimal("0.01")
+
+    zero_ranks = {row.rank for row in rows if not row.total_sales}
+    assert len(zero_ranks) == 1
+    assert zero_ranks == {sum(1 for data in legacy if data["total_sales"]) + 1}
+    assert {row.total_participants for row in rows} == {len(legacy)}
+    assert Decimal(rows[0].team_total_sales) == sum(data["total_sales"] for data in legacy)
+
+
+def test_keyset_pages_cover_everything_once(db):
+    seed(db)
+    expected = [row.salesperson_id for row in materialized(db, PERIOD)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = CommissionLeaderboardService.get_page(db, *PERIOD, limit=7, cursor=cursor)
+        assert len(page) <= 7
+        seen.extend(row.salesperson_id for row in page)
+        if cursor is None:
+            break
+    assert seen == expected
+
+    with pytest.raises(ValidationError):
+        CommissionLeaderboardService.get_page(db, *PERIOD, cursor="nope")
+
+
+def test_refreshing_a_period_reranks_only_that_period(db):
+    salespersons = seed(db)
+    last = materialized(db, PERIOD)[-1]
+    other_period_before = [(row.salesperson_id, row.rank) for row in materialized(db, OTHER_PERIOD)]
+
+    user = db.get(User, last.salesperson_id)
+    db.query(SalespersonCommission).filter_by(
+        salesperson_id=user.id, period_start=PERIOD[0]
+    ).delete()
+    db.add(commission(user, PERIOD, 5_000_000, 1))
+    db.flush()
+    CommissionLeaderboardService.refresh_periods(db, [PERIOD])
+    db.commit()
+
+    entry = CommissionLeaderboardService.get_entry(db, *PERIOD, user.id)
+    assert entry.rank == 1
+    assert Decimal(entry.total_sales) == Decimal(5_000_000)
+    assert [(row.salesperson_id, row.rank) for row in materialized(db, OTHER_PERIOD)] == other_period_before
+    assert len(salespersons) == entry.total_participants
+
+
+def test_stale_rows_are_reranked_on_read(db):
+    seed(db)
+    materialized(db, PERIOD)
+    assert CommissionLeaderboardService.ensure_fresh(db, *PERIOD) is False
+
+    db.query(SalespersonLeaderboardRank).update(
+        {"refreshed_at": datetime.utcnow() - CommissionLeaderboardService.MAX_AGE - timedelta(seconds=1)}
+    )
+    assert CommissionLeaderboardService.ensure_fresh(db, *PERIOD) is True
+
+
+def test_statistics_match_python_aggregation(db):
+    rng = random.Random(11)
+    user = User(name="Salesperson", email="sp@tsh.test", password="x", is_salesperson=True)
+    db.add(user)
+    db.flush()
+    today = date(2026, 10, 19)
+    for i in range(30):
+        start = today - timedelta(days=rng.randint(0, 400))
+        db.add(SalespersonCommission(
+            salesperson_id=user.id, salesperson_name=user.name,
+            period_type=rng.choice(["monthly", "weekly"]), period_start=start, period_end=start,
+            total_sales_amount=Decimal(rng.randint(1000, 90000)),
+            calculated_commission=Decimal(rng.randint(10, 2000)),
+            approved_commission=rng.choice([None, Decimal(0), Decimal(rng.randint(10, 2000))]),
+            total_orders=rng.randint(0, 40), is_paid=rng.random() < 0.7
+        ))
+    db.commit()
+
+    commissions = db.query(SalespersonCommission).all()
+    earning = lambda c: c.approved_commission or c.calculated_commission  # noqa: E731
+    paid = [c for c in commissions if c.is_paid]
+    monthly = [c for c in paid if c.period_type == "monthly"]
+    lifetime = sum(earning(c) for c in paid)
+    total_orders = sum(c.total_orders for c in commissions)
+
+    stats = CommissionLeaderboardService.get_statistics(db, user.id, today)
+    assert stats["lifetime_earnings"] == lifetime
+    assert stats["ytd_earnings"] == sum(earning(c) for c in paid if c.period_start >= date(2026, 1, 1))
+    assert stats["mtd_earnings"] == sum(earning(c) for c in paid if c.period_start >= date(2026, 10, 1))
+    assert stats["avg_monthly_commission"] == sum(earning(c) for c in monthly) / len(monthly)
+    assert stats["highest_monthly_commission"] == max(earning(c) for c in monthly)
+    assert stats["total_orders_all_time"] == total_orders
+    assert stats["avg_commission_per_order"] == lifetime / total_orders
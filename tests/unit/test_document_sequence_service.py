@@ -0,0 +1,220 @@
+"""
+Unit Tests for Document Sequence Service
+
+Runs hundreds of parallel invoice (gap-free) and POS (block mode) number
+allocations against a real database file and checks that numbers are
+unique without any unique-constraint retries, both for bare allocations and
+for invoices and POS transactions created through their services.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.document_sequence import DocumentSequence
+from app.models.inventory import InventoryItem
+from app.models.invoice import SalesInvoice
+from app.models.pos import POSSession, POSTerminal, POSTransaction
+from app.schemas.invoice import SalesInvoiceCreate
+from app.schemas.pos import POSPaymentCreate, POSTransactionCreate, POSTransactionItemCreate
+from app.services import document_sequence_service
+from app.services.document_sequence_service import DocumentSequenceService
+from app.services.invoice_service import InvoiceService
+from app.services.pos_service import POSTransactionService
+
+
+metadata = MetaData()
+documents = Table(
+    "documents", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("number", String(100), unique=True, nullable=False),
+)
+
+
+SERVICE_TABLES = [
+    "document_sequences", "sales_invoices", "sales_invoice_items", "invoice_aging",
+    "pos_terminals", "pos_sessions", "pos_transactions", "pos_transaction_items", "pos_payments",
+    "pos_daily_sales", "inventory_items", "stock_movements",
+]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sequences.db'}",
+        connect_args={"timeout": 60, "check_same_thread": False},
+        pool_size=32
+    )
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in SERVICE_TABLES])
+    metadata.create_all(engine)
+    DocumentSequenceService.clear_cache()
+    yield sessionmaker(bind=engine)
+    DocumentSequenceService.clear_cache()
+    engine.dispose()
+
+
+def create_invoice(factory):
+    """Gap-free number allocated and used in the same transaction"""
+    db = factory()
+    try:
+        number = DocumentSequenceService(db).next_value("sales_invoice", gap_free=True)
+        db.execute(insert(documents).values(number=f"INV-S-{number:06d}"))
+        db.commit()
+        return number
+    finally:
+        db.close()
+
+
+def create_pos_transaction(factory, branch_id):
+    db = factory()
+    try:
+        number = DocumentSequenceService(db, block_size=5).next_value(
+            "pos_transaction", branch_id=branch_id, period="SES-001"
+        )
+        db.execute(insert(documents).values(number=f"TXN-{branch_id}-SES-001-{number:06d}"))
+        db.commit()
+        return branch_id, number
+    finally:
+        db.close()
+
+
+class TestDocumentSequenceConcurrency:
+    """Test suite for parallel document creation"""
+
+    def test_parallel_invoice_and_pos_numbers_are_unique(self, session_factory):
+        """300 concurrent creations: no duplicates, no IntegrityError"""
+        with ThreadPoolExecutor(max_workers=24) as pool:
+            invoices = [pool.submit(create_invoice, session_factory) for _ in range(150)]
+            pos = [pool.submit(create_pos_transaction, session_factory, 1 + i % 3) for i in range(150)]
+            invoice_numbers = [future.result() for future in invoices]
+            pos_numbers = [future.result() for future in pos]
+
+        # Gap-free: exactly 1..N
+        assert sorted(invoice_numbers) == list(range(1, 151))
+
+        # Block mode: unique per branch scope
+        assert len(set(pos_numbers)) == 150
+
+        db = session_factory()
+        assert len(db.execute(select(documents.c.number)).all()) == 300
+        db.close()
+
+    def test_gap_free_rollback_returns_number(self, session_factory):
+        db = session_factory()
+        assert DocumentSequenceService(db).next_value("sales_invoice", gap_free=True) == 1
+        db.rollback()
+        assert DocumentSequenceService(db).next_value("sales_invoice", gap_free=True) == 1
+        db.commit()
+        db.close()
+
+    def test_scopes_are_independent(self, session_factory):
+        db = session_factory()
+        service = DocumentSequenceService(db)
+
+        assert service.next_value("cash_rcp", period="20261019", gap_free=True) == 1
+        assert service.next_value("cash_rcp", period="20261020", gap_free=True) == 1
+        assert service.next_value("cash_rcp", branch_id=2, period="20261019", gap_free=True) == 1
+        assert service.next_value("cash_rcp", period="20261019", gap_free=True) == 2
+        db.close()
+
+    def test_block_mode_reserves_once_per_block(self, session_factory):
+        db = session_factory()
+        service = DocumentSequenceService(db, block_size=10)
+
+        assert [service.next_value("sales_order", period="20261019") for _ in range(12)] == list(range(1, 13))
+
+        stored = db.execute(select(DocumentSequence.next_value)).scalar_one()
+        assert stored == 21  # Two blocks of ten reserved
+        db.close()
+
+    def test_block_reservation_does_not_hold_the_cache_lock(self, session_factory):
+        """Async callers run next_value on the loop thread; a lock held across I/O would hang them"""
+        db = session_factory()
+        held = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda *args: held.append(DocumentSequenceService._blocks_lock.locked()))
+
+        DocumentSequenceService(db, block_size=2).next_value("sales_order")
+        assert held == [False]
+        db.close()
+
+    def test_cache_keeps_recent_scopes_only(self, session_factory, monkeypatch):
+        """Daily scopes are evicted least recently used first"""
+        monkeypatch.setattr(document_sequence_service, "MAX_CACHED_BLOCKS", 2)
+        db = session_factory()
+        service = DocumentSequenceService(db, block_size=10)
+
+        service.next_value("cash_rcp", period="20261017")
+        service.next_value("cash_rcp", period="20261018")
+        service.next_value("cash_rcp", period="20261017")
+        service.next_value("cash_rcp", period="20261019")
+
+        assert [key[3] for key in DocumentSequenceService._blocks] == ["20261017", "20261019"]
+        db.close()
+
+
+def seed_pos(factory, branches=3):
+    db = factory()
+    for branch_id in range(1, branches + 1):
+        db.add(POSTerminal(id=branch_id, terminal_code=f"T-{branch_id}", name_ar="نقطة", name_en="Till",
+                           branch_id=branch_id, warehouse_id=branch_id))
+        db.add(POSSession(id=branch_id, session_number=f"SES-{branch_id:03d}", terminal_id=branch_id,
+                          currency_id=1, user_id=1))
+        db.add(InventoryItem(product_id=1, warehouse_id=branch_id, quantity_on_hand=Decimal("1000"),
+                             quantity_reserved=0, quantity_ordered=0))
+    db.commit()
+    db.close()
+
+
+def create_sales_invoice(factory):
+    db = factory()
+    try:
+        today = date.today()
+        return InvoiceService(db).create_sales_invoice(SalesInvoiceCreate(
+            invoice_number="", customer_id=1, branch_id=1, invoice_date=today,
+            due_date=today + timedelta(days=30), currency_id=1,
+            subtotal=Decimal("100"), total_amount=Decimal("100"), created_by=1
+        )).invoice_number
+    finally:
+        db.close()
+
+
+def checkout(factory, session_id):
+    db = factory()
+    try:
+        return POSTransactionService.create_transaction(db, POSTransactionCreate(
+            terminal_id=session_id, session_id=session_id, cashier_id=1,
+            items=[POSTransactionItemCreate(product_id=1, line_number=1, quantity=Decimal("1"),
+                                            unit_price=Decimal("5"), line_total=Decimal("5"))],
+            payments=[POSPaymentCreate(payment_method="CASH", amount=Decimal("5"))]
+        )).transaction_number
+    finally:
+        db.close()
+
+
+class TestServiceNumbering:
+    """Test suite for numbers assigned by InvoiceService and POSTransactionService"""
+
+    def test_parallel_invoices_and_checkouts_are_numbered_uniquely(self, session_factory):
+        seed_pos(session_factory)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            invoices = [pool.submit(create_sales_invoice, session_factory) for _ in range(60)]
+            sales = [pool.submit(checkout, session_factory, 1 + i % 3) for i in range(60)]
+            invoice_numbers = [future.result() for future in invoices]
+            transaction_numbers = [future.result() for future in sales]
+
+        assert sorted(invoice_numbers) == [f"INV-S-{number:06d}" for number in range(1, 61)]
+        assert len(set(transaction_numbers)) == 60
+        assert all(number.startswith(("TXN-SES-001-", "TXN-SES-002-", "TXN-SES-003-"))
+                   for number in transaction_numbers)
+
+        db = session_factory()
+        assert db.query(SalesInvoice).count() == 60
+        assert db.query(POSTransaction).count() == 60
+        db.close()
@@ -0,0 +1,177 @@
+"""
+Unit Tests for GPS Summary Service
+
+Tests vectorized distances, Douglas-Peucker simplification and incremental
+route statistics against the full recomputation.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.bff.routers.salesperson_gps import calculate_distance
+from app.services.gps_summary_service import (
+    GPSDailySummarizer,
+    TrackPoints,
+    compute_route_stats,
+    extend_route_stats,
+    path_distance_km,
+    segment_distances_m,
+    simplify_route,
+)
+
+
+def make_track(count, start_id=1, start=None, seed=42, visit_every=None):
+    rng = random.Random(seed)
+    start = start or datetime(2026, 3, 1, 8, 0, 0)
+    lat, lon = 33.3152, 44.3661
+    track = TrackPoints()
+    for i in range(count):
+        lat += rng.uniform(-0.001, 0.001)
+        lon += rng.uniform(-0.001, 0.001)
+        is_visit = bool(visit_every and i % visit_every == 0)
+        track.append(SimpleNamespace(
+            id=start_id + i,
+            latitude=lat,
+            longitude=lon,
+            timestamp=start + timedelta(seconds=30 * i),
+            is_customer_visit=is_visit,
+            visit_verified=is_visit and i % 2 == 0,
+        ))
+    return track
+
+
+def split_track(track, at):
+    head, tail = TrackPoints(), TrackPoints()
+    for name in ("ids", "latitudes", "longitudes", "timestamps", "visits", "verified"):
+        values = getattr(track, name)
+        getattr(head, name).extend(values[:at])
+        getattr(tail, name).extend(values[at:])
+    return head, tail
+
+
+class TestVectorizedDistance:
+    """Test suite for NumPy haversine"""
+
+    def test_matches_scalar_haversine(self):
+        """Vectorized segments equal the pairwise calculate_distance loop"""
+        track = make_track(500)
+        expected = [
+            calculate_distance(track.latitudes[i - 1], track.longitudes[i - 1],
+                               track.latitudes[i], track.longitudes[i])
+            for i in range(1, len(track))
+        ]
+
+        assert segment_distances_m(track.latitudes, track.longitudes) == pytest.approx(expected, rel=1e-9)
+
+    def test_short_tracks_have_no_distance(self):
+        assert path_distance_km([], []) == 0
+        assert path_distance_km([33.3], [44.3]) == 0
+
+
+class TestSimplifyRoute:
+    """Test suite for Douglas-Peucker simplification"""
+
+    def test_straight_line_keeps_endpoints_only(self):
+        latitudes = [33.30 + 0.001 * i for i in range(50)]
+        longitudes = [44.30] * 50
+
+        assert list(simplify_route(latitudes, longitudes, tolerance_m=1)) == [0, 49]
+
+    def test_keeps_corner(self):
+        latitudes = [33.30, 33.305, 33.31, 33.31, 33.31]
+        longitudes = [44.30, 44.30, 44.30, 44.305, 44.31]
+
+        assert list(simplify_route(latitudes, longitudes, tolerance_m=5)) == [0, 2, 4]
+
+    def test_forced_points_survive(self):
+        latitudes = [33.30 + 0.001 * i for i in range(10)]
+        longitudes = [44.30] * 10
+        always_keep = [i == 4 for i in range(10)]
+
+        assert list(simplify_route(latitudes, longitudes, 1, always_keep)) == [0, 4, 9]
+
+    def test_zero_tolerance_keeps_every_turning_point(self):
+        track = make_track(100)
+        kept = simplify_route(track.latitudes, track.longitudes, tolerance_m=0)
+
+        assert len(kept) == 100
+
+
+class TestRouteStats:
+    """Test suite for full and incremental route statistics"""
+
+    def test_compute_route_stats(self):
+        track = make_track(120, visit_every=40)
+        stats = compute_route_stats(track, tolerance_m=15)
+
+        assert stats.points == 120
+        assert stats.customer_visits == 3
+        assert stats.verified_visits == 3  # Visits at 0, 40, 80 are all verified
+        assert stats.hours == pytest.approx(119 * 30 / 3600)
+        assert stats.route_point_ids[0] == 1
+        assert stats.route_point_ids[-1] == 120
+        assert {1, 41, 81} <= set(stats.route_point_ids)
+
+    def test_incremental_extension_matches_full_rebuild(self):
+        """Extending with later batches gives the same totals as recomputing"""
+        track = make_track(300, visit_every=50)
+        full = compute_route_stats(track, tolerance_m=15)
+
+        first, rest = split_track(track, 100)
+        second, third = split_track(rest, 120)
+        stats = compute_route_stats(first, tolerance_m=15)
+        stats = extend_route_stats(stats, second, tolerance_m=15)
+        stats = extend_route_stats(stats, third, tolerance_m=15)
+
+        assert stats.points == full.points
+        assert stats.distance_km == pytest.approx(full.distance_km, rel=1e-9)
+        assert stats.customer_visits == full.customer_visits
+        assert stats.verified_visits == full.verified_visits
+        assert (stats.start_at, stats.end_at) == (full.start_at, full.end_at)
+        assert stats.route_point_ids == sorted(set(stats.route_point_ids))
+        assert stats.route_point_ids[-1] == 300
+
+    def test_extend_empty_summary_computes(self):
+        track = make_track(10)
+        empty = compute_route_stats(TrackPoints(), tolerance_m=15)
+
+        assert extend_route_stats(empty, track, 15) == compute_route_stats(track, 15)
+
+
+class TestRefreshLocking:
+    """Test suite for serializing concurrent summary rebuilds"""
+
+    def test_days_are_locked_in_order_before_reading(self):
+        """First uploads for a day have no row to lock, so the advisory lock comes first"""
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "postgresql"
+        summarizer = GPSDailySummarizer(mock_db, tolerance_m=5)
+        calls = []
+        mock_db.execute.side_effect = lambda statement, params=None: calls.append(params)
+        summarizer._stored = Mock(side_effect=lambda *args, **kwargs: calls.append("read") or {})
+        summarizer.rebuild_days = Mock()
+
+        summarizer.refresh(7, [datetime(2026, 3, 2, 9, 0), datetime(2026, 3, 1, 18, 0), datetime(2026, 3, 2, 8, 0)])
+
+        assert calls == [
+            {"salesperson_id": 7, "day": date(2026, 3, 1).toordinal()},
+            {"salesperson_id": 7, "day": date(2026, 3, 2).toordinal()},
+            "read",
+        ]
+        summarizer.rebuild_days.assert_called_once_with(7, [date(2026, 3, 1), date(2026, 3, 2)])
+
+    def test_no_advisory_lock_outside_postgres(self):
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "sqlite"
+        summarizer = GPSDailySummarizer(mock_db, tolerance_m=5)
+        summarizer._stored = Mock(return_value={})
+        summarizer.rebuild_days = Mock()
+
+        summarizer.refresh(7, [datetime(2026, 3, 1, 9, 0)])
+
+        mock_db.execute.assert_not_called()
@@ -0,0 +1,200 @@
+"""
+Unit Tests for GPS Tracking Service
+
+Tests batch row building, partition naming and retention selection.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from sqlalchemy.orm import Session
+
+from app.schemas.salesperson import GPSLocationCreate
+from app.services.gps_tracking_service import (
+    GPSIngestionService,
+    _forget_rolled_back_partitions,
+    _remember_committed_partitions,
+    build_rows,
+    next_month,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+)
+
+
+def make_location(timestamp, device_id="phone-1", **kwargs):
+    return GPSLocationCreate(
+        latitude=33.3152,
+        longitude=44.3661,
+        timestamp=timestamp,
+        device_id=device_id,
+        **kwargs
+    )
+
+
+class TestBuildRows:
+    """Test suite for converting uploads to insert rows"""
+
+    def test_drops_in_batch_duplicates(self):
+        """Same device and timestamp twice in one upload keeps the first"""
+        ts = datetime(2026, 3, 1, 9, 0, 0)
+        rows = build_rows(7, [
+            make_location(ts, speed=1.0),
+            make_location(ts, speed=2.0),
+            make_location(ts, device_id="phone-2"),
+            make_location(ts + timedelta(seconds=30)),
+        ])
+
+        assert len(rows) == 3
+        assert rows[0]["speed"] == 1.0
+        assert all(row["salesperson_id"] == 7 for row in rows)
+
+    def test_missing_device_id_is_empty_string(self):
+        """Unknown devices share the '' key so the unique constraint applies"""
+        ts = datetime(2026, 3, 1, 9, 0, 0)
+        rows = build_rows(7, [make_location(ts, device_id=None), make_location(ts, device_id=None)])
+
+        assert len(rows) == 1
+        assert rows[0]["device_id"] == ""
+
+    def test_offset_timestamps_are_normalized_to_naive_utc(self):
+        """Aware timestamps are stored as naive UTC and dedupe with UTC points"""
+        baghdad = timezone(timedelta(hours=3))
+        rows = build_rows(7, [
+            make_location(datetime(2026, 3, 1, 12, 0, 0, tzinfo=baghdad)),
+            make_location(datetime(2026, 3, 1, 9, 0, 0)),
+        ])
+
+        assert len(rows) == 1
+        assert rows[0]["timestamp"] == datetime(2026, 3, 1, 9, 0, 0)
+        assert rows[0]["timestamp"].tzinfo is None
+
+
+class TestPartitionHelpers:
+    """Test suite for monthly partition helpers"""
+
+    def test_partition_name(self):
+        assert partition_name(date(2026, 3, 1)) == "salesperson_gps_locations_y2026m03"
+
+    def test_next_month_rolls_over_year(self):
+        assert next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+        assert next_month(date(2026, 3, 1)) == date(2026, 4, 1)
+
+    def test_retention_cutoff(self):
+        assert retention_cutoff(3, today=date(2026, 2, 15)) == date(2025, 11, 1)
+        assert retention_cutoff(0, today=date(2026, 2, 15)) == date(2026, 2, 1)
+
+    def test_expired_partitions(self):
+        """Only partitions wholly before the cutoff month are expired"""
+        service = GPSIngestionService(Mock(spec=Session))
+        service.list_partitions = Mock(return_value=[
+            "salesperson_gps_locations_y2025m10",
+            "salesperson_gps_locations_y2025m11",
+            "salesperson_gps_locations_y2026m02",
+        ])
+
+        expired = service.expired_partitions(3, today=date(2026, 2, 15))
+
+        assert expired == ["salesperson_gps_locations_y2025m10"]
+
+    def test_expired_partitions_ignores_other_children(self):
+        """A default partition or ad-hoc child sorts before y2025 but is never dropped"""
+        service = GPSIngestionService(Mock(spec=Session))
+        service.list_partitions = Mock(return_value=[
+            "salesperson_gps_locations_default",
+            "salesperson_gps_locations_archive",
+            "salesperson_gps_locations_y2025m10_old",
+            "salesperson_gps_locations_y2025m13",
+            "salesperson_gps_locations_y2025m09",
+            "salesperson_gps_locations_y2026m01",
+        ])
+
+        expired = service.expired_partitions(3, today=date(2026, 2, 15))
+
+        assert expired == ["salesperson_gps_locations_y2025m09"]
+
+    def test_partition_month(self):
+        assert partition_month("salesperson_gps_locations_y2026m02") == date(2026, 2, 1)
+        assert partition_month(partition_name(date(2025, 12, 1))) == date(2025, 12, 1)
+        assert partition_month("salesperson_gps_locations_default") is None
+
+
+class TestIngest:
+    """Test suite for batch ingestion paths"""
+
+    def test_empty_batch_touches_nothing(self):
+        mock_db = Mock(spec=Session)
+        result = GPSIngestionService(mock_db).ingest(7, [])
+
+        assert result.total == 0
+        assert result.inserted == 0
+        mock_db.execute.assert_not_called()
+
+    def test_multi_row_fallback_reports_duplicates(self):
+        """Without COPY support one INSERT is issued and skipped rows count as duplicates"""
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "sqlite"
+        mock_db.execute.return_value.fetchall.return_value = [Mock(id=101, timestamp=datetime(2026, 3, 1, 9, 0, 30))]
+
+        ts = datetime(2026, 3, 1, 9, 0, 0)
+        with patch.object(GPSIngestionService, "_known_partitions", set()):
+            result = GPSIngestionService(mock_db).ingest(7, [
+                make_location(ts),
+                make_location(ts + timedelta(seconds=30)),
+                make_location(ts),
+            ])
+
+        assert mock_db.execute.call_count == 1
+        assert result.total == 3
+        assert result.inserted_ids == [101]
+        assert result.inserted_timestamps == [datetime(2026, 3, 1, 9, 0, 30)]
+        assert result.duplicates == 2
+
+    def test_single_point_skips_copy(self):
+        """One point uses the multi-row INSERT even when COPY is available"""
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "sqlite"
+        mock_db.execute.return_value.fetchall.return_value = []
+
+        service = GPSIngestionService(mock_db)
+        service._supports_copy = Mock(return_value=True)
+        service._insert_via_copy = Mock()
+        result = service.ingest(7, [make_location(datetime(2026, 3, 1, 9, 0, 0))])
+
+        service._insert_via_copy.assert_not_called()
+        assert result.inserted == 0
+        assert result.duplicates == 1
+
+
+class TestPartitionCache:
+    """Test suite for the per-process partition cache"""
+
+    def postgres_session(self):
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "postgresql"
+        mock_db.info = {}
+        return mock_db
+
+    def test_created_partition_is_cached_after_commit(self):
+        mock_db = self.postgres_session()
+        with patch.object(GPSIngestionService, "_known_partitions", set()):
+            GPSIngestionService(mock_db).ensure_partitions([date(2026, 3, 1)])
+            assert GPSIngestionService._known_partitions == set()
+
+            _remember_committed_partitions(mock_db)
+            assert GPSIngestionService._known_partitions == {date(2026, 3, 1)}
+
+            GPSIngestionService(mock_db).ensure_partitions([date(2026, 3, 1)])
+            assert mock_db.execute.call_count == 1
+
+    def test_rolled_back_partition_is_created_again(self):
+        """A rollback undoes the DDL, so the next insert must not trust the cache"""
+        mock_db = self.postgres_session()
+        with patch.object(GPSIngestionService, "_known_partitions", set()):
+            GPSIngestionService(mock_db).ensure_partitions([date(2026, 3, 1)])
+            _forget_rolled_back_partitions(mock_db)
+            _remember_committed_partitions(mock_db)
+
+            assert GPSIngestionService._known_partitions == set()
+            GPSIngestionService(mock_db).ensure_partitions([date(2026, 3, 1)])
+            assert mock_db.execute.call_count == 2
@@ -0,0 +1,107 @@
+"""
+Unit Tests for Batch Stock Movements
+
+Covers InventoryService.post_stock_movements, used by POS checkout and void:
+the whole basket is validated before anything is written, repeated products
+are netted, and every line still gets its own movement row.
+"""
+
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.inventory import InventoryItem, StockMovement
+from app.services.inventory_service import InventoryService
+
+
+WAREHOUSE_ID = 1
+CASHIER_ID = 7
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[
+        Base.metadata.tables["inventory_items"], Base.metadata.tables["stock_movements"]
+    ])
+    session = sessionmaker(bind=engine)()
+
+    for product_id, on_hand, reserved in ((1, "10", "0"), (2, "5", "2"), (3, "100", "0")):
+        session.add(InventoryItem(
+            product_id=product_id, warehouse_id=WAREHOUSE_ID,
+            quantity_on_hand=Decimal(on_hand), quantity_reserved=Decimal(reserved),
+            quantity_ordered=0
+        ))
+    # Same product in another warehouse must not be touched
+    session.add(InventoryItem(product_id=1, warehouse_id=2, quantity_on_hand=Decimal("50"), quantity_reserved=0))
+    session.commit()
+
+    yield session
+    session.close()
+
+
+def on_hand(db, product_id, warehouse_id=WAREHOUSE_ID):
+    item = db.query(InventoryItem).filter_by(product_id=product_id, warehouse_id=warehouse_id).one()
+    return Decimal(item.quantity_on_hand)
+
+
+def test_basket_is_posted_with_one_movement_per_line(db):
+    changes = InventoryService.post_stock_movements(
+        db, WAREHOUSE_ID,
+        [(1, Decimal("-2")), (3, Decimal("-40")), (1, Decimal("-3"))],
+        reference_type="POS", reference_id=99, created_by=CASHIER_ID, notes="POS Transaction: TXN-1"
+    )
+    db.commit()
+
+    assert changes == {1: Decimal("-5"), 3: Decimal("-40")}
+    assert on_hand(db, 1) == Decimal("5")
+    assert on_hand(db, 3) == Decimal("60")
+    assert on_hand(db, 1, warehouse_id=2) == Decimal("50")
+
+    movements = db.query(StockMovement).order_by(StockMovement.id).all()
+    assert [(m.movement_type, Decimal(m.quantity)) for m in movements] == [
+        ("OUT", Decimal("2")), ("OUT", Decimal("40")), ("OUT", Decimal("3"))
+    ]
+    assert {(m.reference_type, m.reference_id, m.created_by) for m in movements} == {("POS", 99, CASHIER_ID)}
+
+
+def test_shortage_rejects_whole_basket(db):
+    # Product 2 has 5 on hand but 2 reserved; product 4 has no inventory row
+    with pytest.raises(HTTPException) as exc_info:
+        InventoryService.post_stock_movements(
+            db, WAREHOUSE_ID,
+            [(1, Decimal("-1")), (2, Decimal("-4")), (4, Decimal("-1"))],
+            reference_type="POS", created_by=CASHIER_ID
+        )
+    db.rollback()
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Insufficient stock for product 2, 4"
+    assert on_hand(db, 1) == Decimal("10")
+    assert db.query(StockMovement).count() == 0
+
+
+def test_repeated_lines_are_validated_together(db):
+    # Each line alone fits in the 3 available units, together they do not
+    with pytest.raises(HTTPException):
+        InventoryService.post_stock_movements(
+            db, WAREHOUSE_ID, [(2, Decimal("-2")), (2, Decimal("-2"))],
+            reference_type="POS", created_by=CASHIER_ID
+        )
+
+
+def test_returns_restock_and_create_missing_items(db):
+    InventoryService.post_stock_movements(
+        db, WAREHOUSE_ID, [(1, Decimal("4")), (4, Decimal("2"))],
+        reference_type="POS", created_by=CASHIER_ID, notes="POS Transaction: VOID-TXN-1"
+    )
+    db.commit()
+
+    assert on_hand(db, 1) == Decimal("14")
+    assert on_hand(db, 4) == Decimal("2")
+    assert {m.movement_type for m in db.query(StockMovement)} == {"IN"}
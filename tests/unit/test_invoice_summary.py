@@ -0,0 +1,190 @@
+"""
+Unit Tests for Invoice Summary, Aging and Overdue Listing
+
+Compares the single-statement summary with the previous eight-query
+implementation on seeded invoices, checks that invoice_aging maintained by
+InvoiceService matches a full rebuild, and pages the overdue listing by
+keyset.
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import and_, create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.exceptions import ValidationError
+from app.models.invoice import InvoiceAging, InvoiceStatusEnum, PurchaseInvoice, SalesInvoice
+from app.schemas.invoice import InvoicePaymentCreate, SalesInvoiceCreate
+from app.services.invoice_service import InvoiceService
+
+
+TABLES = ["sales_invoices", "purchase_invoices", "invoice_payments", "invoice_aging"]
+STATUSES = list(InvoiceStatusEnum)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def seed(db, count=120, seed_value=7):
+    rng = random.Random(seed_value)
+    today = date.today()
+    for i in range(count):
+        common = dict(
+            branch_id=rng.choice([1, 2, 3]),
+            invoice_date=today - timedelta(days=rng.randint(0, 200)),
+            due_date=today + timedelta(days=rng.randint(-150, 40)),
+            currency_id=1,
+            status=rng.choice(STATUSES),
+            subtotal=Decimal(rng.randint(10, 5000)),
+            total_amount=Decimal(rng.randint(10, 5000)),
+            paid_amount=rng.choice([None, Decimal(0), Decimal(rng.randint(0, 500))]),
+            created_by=1,
+        )
+        db.add(SalesInvoice(invoice_number=f"S-{i}", customer_id=1, **common))
+        db.add(PurchaseInvoice(invoice_number=f"P-{i}", supplier_id=1, **common))
+    db.commit()
+
+
+def legacy_summary(db, branch_id=None):
+    """The previous eight-query implementation"""
+    sales_query = db.query(SalesInvoice)
+    purchase_query = db.query(PurchaseInvoice)
+    if branch_id:
+        sales_query = sales_query.filter(SalesInvoice.branch_id == branch_id)
+        purchase_query = purchase_query.filter(PurchaseInvoice.branch_id == branch_id)
+
+    result = {}
+    for prefix, model, query in (("sales", SalesInvoice, sales_query), ("purchase", PurchaseInvoice, purchase_query)):
+        result[f"total_{prefix}_invoices"] = query.count()
+        result[f"total_{prefix}_amount"] = Decimal(query.with_entities(
+            func.coalesce(func.sum(model.total_amount), 0)
+        ).scalar() or 0)
+        result[f"pending_{prefix}_amount"] = Decimal(query.filter(
+            model.status.in_([InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID])
+        ).with_entities(
+            func.coalesce(func.sum(model.total_amount - model.paid_amount), 0)
+        ).scalar() or 0)
+        result[f"overdue_{prefix}_count"] = query.filter(
+            and_(model.due_date < date.today(), model.status != InvoiceStatusEnum.PAID)
+        ).count()
+    return result
+
+
+def aging_rows(db):
+    return {
+        (row.invoice_type, row.branch_id, row.due_date): (row.open_count, Decimal(row.open_amount))
+        for row in db.query(InvoiceAging) if row.open_count or row.open_amount
+    }
+
+
+@pytest.mark.parametrize("branch_id", [None, 2])
+def test_summary_matches_legacy_queries(db, branch_id):
+    seed(db)
+    summary = InvoiceService(db).get_invoice_summary(branch_id)
+    assert summary.model_dump() == legacy_summary(db, branch_id)
+
+
+def test_summary_on_empty_tables(db):
+    summary = InvoiceService(db).get_invoice_summary()
+    assert summary.total_sales_invoices == 0
+    assert summary.pending_purchase_amount == Decimal(0)
+
+
+def test_aging_follows_invoice_lifecycle(db):
+    service = InvoiceService(db)
+    today = date.today()
+
+    def create(number, due_days, total, status=InvoiceStatusEnum.PENDING, branch_id=1):
+        return service.create_sales_invoice(SalesInvoiceCreate(
+            invoice_number=number, customer_id=1, branch_id=branch_id, invoice_date=today,
+            due_date=today + timedelta(days=due_days), currency_id=1, status=status,
+            subtotal=Decimal(total), total_amount=Decimal(total), created_by=1
+        ))
+
+    def pay(invoice, amount, number):
+        service.create_payment(InvoicePaymentCreate(
+            payment_number=number, sales_invoice_id=invoice.id, payment_date=today,
+            amount=Decimal(amount), currency_id=1, payment_method="CASH", created_by=1
+        ))
+
+    current = create("S-1", 10, "100")
+    late = create("S-2", -45, "300")
+    very_late = create("S-3", -120, "80", branch_id=2)
+    draft = create("S-4", -5, "999", status=InvoiceStatusEnum.DRAFT)
+    cancelled = create("S-5", -10, "50")
+
+    pay(late, "120", "PAY-1")           # partially paid
+    pay(current, "100", "PAY-2")        # fully paid, leaves aging
+    service.mark_invoice_as_sent(draft.id, "SALES")
+    service.cancel_invoice(cancelled.id, "SALES")
+
+    buckets = {bucket.bucket: (bucket.invoice_count, bucket.amount) for bucket in service.get_aging_buckets()}
+    assert buckets == {
+        "current": (0, Decimal(0)),
+        "1-30": (1, Decimal("999")),
+        "31-60": (1, Decimal("180")),
+        "61-90": (0, Decimal(0)),
+        "90+": (1, Decimal("80")),
+    }
+    assert service.get_aging_buckets(branch_id=2)[-1].amount == Decimal("80")
+
+    incremental = aging_rows(db)
+    service.rebuild_invoice_aging()
+    db.commit()
+    assert aging_rows(db) == incremental
+
+
+def test_aging_rebuild_matches_open_invoices(db):
+    seed(db)
+    service = InvoiceService(db)
+    service.rebuild_invoice_aging()
+    db.commit()
+
+    expected = {}
+    for invoice in db.query(SalesInvoice).filter(SalesInvoice.status.in_(
+        [InvoiceStatusEnum.PENDING, InvoiceStatusEnum.PARTIALLY_PAID, InvoiceStatusEnum.OVERDUE]
+    )):
+        overdue_days = (date.today() - invoice.due_date).days
+        name = ("current" if overdue_days <= 0 else "1-30" if overdue_days <= 30
+                else "31-60" if overdue_days <= 60 else "61-90" if overdue_days <= 90 else "90+")
+        count, amount = expected.get(name, (0, Decimal(0)))
+        expected[name] = (count + 1, amount + invoice.total_amount - (invoice.paid_amount or 0))
+
+    buckets = {bucket.bucket: (bucket.invoice_count, bucket.amount) for bucket in service.get_aging_buckets()}
+    assert {name: value for name, value in buckets.items() if value[0]} == expected
+
+
+def test_overdue_keyset_pages_cover_everything_once(db):
+    seed(db)
+    service = InvoiceService(db)
+    expected = [
+        invoice.id for invoice in db.query(SalesInvoice).filter(
+            SalesInvoice.due_date < date.today(), SalesInvoice.status != InvoiceStatusEnum.PAID
+        ).order_by(SalesInvoice.due_date, SalesInvoice.id)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        page = service.get_overdue_invoices(limit=7, sales_cursor=cursor)
+        assert len(page["sales"]) <= 7
+        seen.extend(invoice.id for invoice in page["sales"])
+        cursor = page["sales_next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(expected) > 7
+
+    with pytest.raises(ValidationError):
+        service.get_overdue_invoices(sales_cursor="not-a-cursor")
@@ -0,0 +1,253 @@
+"""
+Unit Tests for the Asynchronous, Sampled Logging Pipeline
+
+Records are captured from the listener side (a slow handler, a StringIO
+stream, rotating files) to check that the caller never waits on I/O, that
+every record keeps the correlation id of the task that logged it, and that
+rate limiting and repeat sampling drop only what they should.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+
+import structlog
+
+from app.tds.utils.correlation import CorrelationContext
+from app.utils import logging_config
+from app.utils.log_pipeline import (
+    JsonLogFormatter, LogPipeline, LogSampler, build_pipeline, rotating_file_handler
+)
+
+
+class SlowHandler(logging.Handler):
+    """A disk that takes 20 ms per write"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        time.sleep(0.02)
+        self.records.append(record)
+
+
+def json_pipeline(sampler=None, queue_size=10000):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLogFormatter())
+    return LogPipeline([handler], sampler=sampler, queue_size=queue_size), stream
+
+
+def isolated_logger(name, pipeline):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    pipeline.install(logger, level=logging.DEBUG)
+    return logger
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_logging_call_does_not_wait_for_the_handler():
+    slow = SlowHandler()
+    pipeline = LogPipeline([slow])
+    logger = isolated_logger("test.pipeline.slow", pipeline)
+
+    started = time.perf_counter()
+    for i in range(50):
+        logger.info("synced item %s", i)
+    elapsed = time.perf_counter() - started
+
+    pipeline.stop()  # drains the queue
+    assert elapsed < 0.05  # 50 writes take a second on the handler
+    assert [r.getMessage() for r in slow.records] == [f"synced item {i}" for i in range(50)]
+
+
+def test_each_record_keeps_its_tasks_correlation_id():
+    pipeline, stream = json_pipeline()
+    logger = isolated_logger("test.pipeline.correlation", pipeline)
+
+    async def request(number):
+        async with CorrelationContext(correlation_id=f"req-{number}", user_id=number):
+            for step in range(5):
+                logger.info(f"request {number} step {step}")
+                await asyncio.sleep(0)
+            try:
+                raise ValueError(f"request {number} failed")
+            except ValueError:
+                logger.exception(f"request {number} error")
+
+    async def scenario():
+        await asyncio.gather(*(request(n) for n in range(20)))
+
+    run(scenario())
+    logger.info("outside any request")
+    pipeline.stop()
+
+    entries = lines(stream)
+    assert len(entries) == 20 * 6 + 1
+    for entry in entries[:-1]:
+        number = int(entry["message"].split()[1])
+        assert (entry["correlation_id"], entry["user_id"]) == (f"req-{number}", number)
+        assert "operation" not in entry  # unset context fields are left out
+    errors = [e for e in entries if e["level"] == "ERROR"]
+    assert len(errors) == 20 and all("ValueError" in e["exception"] for e in errors)
+    assert "correlation_id" not in entries[-1]
+
+
+def test_repetitive_messages_are_sampled_and_counted():
+    sampler = LogSampler(repeat_burst=5, repeat_sample_rate=50, repeat_window=60)
+    pipeline, stream = json_pipeline(sampler)
+    logger = isolated_logger("test.pipeline.sampling", pipeline)
+
+    for i in range(1005):
+        logger.info(f"Product synced successfully: {2646610000000 + i} -> local ID {i}")
+    logger.info("Sync batch finished")
+    logger.warning(f"Product {42} has no price")
+    for _ in range(20):
+        logger.warning("Zoho returned 429")
+    pipeline.stop()
+
+    entries = lines(stream)
+    synced = [e for e in entries if e["message"].startswith("Product synced")]
+    assert len(synced) == 5 + 1000 // 50
+    assert sampler.stats["sampled_out"] == 1005 - len(synced)
+    # The next record that passes reports what was dropped before it
+    assert synced[-1]["sampling"] == {"dropped_since_last": 49}
+    assert sum(e.get("sampling", {}).get("dropped_since_last", 0) for e in entries) == sampler.stats["sampled_out"]
+    assert sum(e["message"] == "Zoho returned 429" for e in entries) == 20  # warnings are never sampled
+
+
+def test_per_logger_rate_limit():
+    sampler = LogSampler(rate_limits={"test.pipeline.hot": 50, "test.pipeline.hot.quiet": 5}, repeat_burst=10**6)
+    pipeline, stream = json_pipeline(sampler)
+    hot = isolated_logger("test.pipeline.hot.worker", pipeline)
+    quiet = isolated_logger("test.pipeline.hot.quiet", pipeline)
+    other = isolated_logger("test.pipeline.cold", pipeline)
+
+    for i in range(500):
+        hot.info(f"event {i}")
+        quiet.info(f"event {i}")
+        other.info(f"event {i}")
+    time.sleep(0.2)  # refills ~10 tokens at 50/s
+    for i in range(500):
+        hot.info(f"late event {i}")
+    pipeline.stop()
+
+    counts = {}
+    for entry in lines(stream):
+        counts[entry["logger"]] = counts.get(entry["logger"], 0) + 1
+    assert counts["test.pipeline.cold"] == 500
+    assert counts["test.pipeline.hot.quiet"] == 5
+    assert 50 + 8 <= counts["test.pipeline.hot.worker"] <= 50 + 14
+
+
+def test_full_queue_drops_instead_of_blocking():
+    pipeline, _ = json_pipeline(queue_size=10)
+    logger = logging.getLogger("test.pipeline.full")
+    logger.propagate = False
+    logger.addHandler(pipeline.handler)  # listener not started: nothing drains
+    for i in range(25):
+        logger.info("record %s", i)
+    assert pipeline.get_stats()["queue_full_dropped"] == 15
+    logger.removeHandler(pipeline.handler)
+
+
+def test_size_rotation_keeps_complete_json_lines(tmp_path):
+    handler = rotating_file_handler(str(tmp_path / "app.log"), max_bytes=2000, backup_count=3)
+    handler.setFormatter(JsonLogFormatter())
+    pipeline = LogPipeline([handler])
+    logger = isolated_logger("test.pipeline.rotation", pipeline)
+    for i in range(100):
+        logger.info("order %s created", i)
+    pipeline.stop()
+    handler.close()
+
+    files = sorted(tmp_path.glob("app.log*"))
+    assert [f.name for f in files] == ["app.log", "app.log.1", "app.log.2", "app.log.3"]
+    for path in files:
+        assert path.stat().st_size <= 2000
+        assert all(json.loads(line)["logger"] == "test.pipeline.rotation" for line in path.read_text().splitlines())
+    assert isinstance(rotating_file_handler(str(tmp_path / "daily.log"), when="midnight"),
+                      logging.handlers.TimedRotatingFileHandler)
+
+
+def test_structlog_events_go_through_the_pipeline(tmp_path):
+    log_file = tmp_path / "tsh_erp.log"
+    try:
+        logging_config.setup_logging(log_level="INFO", log_file=str(log_file), console=False)
+        logger = structlog.get_logger("test.pipeline.structlog")
+        with CorrelationContext(correlation_id="req-structlog"):
+            logger.info("api_response_sent", path="/api/items", status_code=200, message="done")
+        logger.debug("not at INFO")
+        logging_config.get_log_pipeline().stop()
+    finally:
+        logging_config.setup_logging(log_level="INFO")
+
+    [entry] = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert entry["message"] == "api_response_sent" and entry["logger"] == "test.pipeline.structlog"
+    assert (entry["path"], entry["status_code"], entry["correlation_id"]) == ("/api/items", 200, "req-structlog")
+    assert entry["fields"] == {"message": "done"}
+
+
+def test_only_hot_path_loggers_are_sampled(tmp_path):
+    log_file = tmp_path / "tsh_erp.log"
+    try:
+        logging_config.setup_logging(log_level="INFO", log_file=str(log_file), console=False,
+                                     rate_limits={"test.pipeline.hot": 10**6})
+        requests = structlog.get_logger("test.pipeline.requests")
+        hot = logging.getLogger("test.pipeline.hot.sync")
+        for i in range(500):
+            requests.info("api_request_received", method="GET", path=f"/api/items/{i}")
+            hot.info(f"Product synced: {i}")
+        logging_config.get_log_pipeline().stop()
+    finally:
+        logging_config.setup_logging(log_level="INFO")
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    # Every request line is kept; the hot path's repeats are sampled
+    assert sum(e["message"] == "api_request_received" for e in entries) == 500
+    assert sum(e["logger"] == "test.pipeline.hot.sync" for e in entries) == 10 + 490 // 100
+
+
+def test_worker_processes_share_a_watched_file_or_rotate_their_own(tmp_path, monkeypatch):
+    path = tmp_path / "shared.log"
+    pipeline = build_pipeline(str(path), console=False)
+    logger = isolated_logger("test.pipeline.watched", pipeline)
+    logger.info("before rotation")
+    time.sleep(0.1)
+    os.rename(path, tmp_path / "shared.log.1")  # logrotate moves the file
+    logger.info("after rotation")
+    pipeline.stop()
+    assert isinstance(pipeline.listener.handlers[0], logging.handlers.WatchedFileHandler)
+    assert [json.loads(line)["message"] for line in path.read_text().splitlines()] == ["after rotation"]
+
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("LOG_MAX_BYTES", "100000")
+    try:
+        logging_config.setup_logging(log_level="INFO", console=False)
+        logging.getLogger("test.pipeline.rotating").warning("own file")
+        logging_config.get_log_pipeline().stop()
+    finally:
+        monkeypatch.undo()
+        logging_config.setup_logging(log_level="INFO")
+    own = tmp_path / f"tsh_erp.{os.getpid()}.log"
+    assert json.loads(own.read_text().splitlines()[-1])["message"] == "own file"
+
+
+def test_build_pipeline_writes_json_to_file(tmp_path):
+    pipeline = build_pipeline(str(tmp_path / "out.log"), console=False)
+    logger = isolated_logger("test.pipeline.build", pipeline)
+    logger.info("hello", extra={"extra_data": {"entity": "item"}})
+    pipeline.stop()
+    [entry] = [json.loads(line) for line in (tmp_path / "out.log").read_text().splitlines()]
+    assert (entry["message"], entry["entity"]) == ("hello", "item")
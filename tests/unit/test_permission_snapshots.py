@@ -0,0 +1,253 @@
+"""
+Unit Tests for Permission Snapshots
+
+Checks PermissionService.check_permission (compiled snapshots) against the
+previous query-per-check implementation on random roles, overrides and
+conditions, and verifies version-based invalidation through a fake Redis.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, create_engine, event, or_
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.permissions import Permission, RolePermission, UserPermission
+from app.models.role import Role
+from app.models.user import User
+from app.services.permission_service import PermissionService
+from app.services.permission_snapshot_service import PermissionSnapshotCache, compile_conditions
+
+
+TABLES = ["roles", "users", "permissions", "role_permissions", "user_permissions"]
+
+CONDITIONS = [
+    None,
+    {"field": "branch_id", "operator": "eq", "value": 1},
+    {"field": "branch_id", "operator": "in", "value": [1, 2]},
+    {"or": [{"field": "amount", "operator": "lt", "value": 100}, {"field": "branch_id", "operator": "eq", "value": 3}]},
+    {"and": [{"field": "amount", "operator": "gte", "value": 50}, {"not": {"field": "branch_id", "operator": "eq", "value": 2}}]},
+    {"field": "amount", "operator": "gt", "value": "text"},   # TypeError at evaluation -> deny
+    {"field": "branch_id", "operator": "between", "value": 1},  # unknown operator -> deny
+]
+CONTEXTS = [None, {}, {"branch_id": 1}, {"branch_id": 2, "amount": 75}, {"branch_id": 3, "amount": 500}, {"amount": 10}]
+
+
+class FakeRedis:
+    """The subset of redis.Redis the snapshot cache uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+class LegacyPermissionService:
+    """The previous check_permission: three queries and JSON parsing per call"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def check_permission(self, user_id, permission_name, context=None):
+        user = self.db.query(User).filter(User.id == user_id).first()
+        if not user or not user.is_active:
+            return False
+        user_permission = self.db.query(UserPermission).join(Permission).filter(and_(
+            UserPermission.user_id == user_id,
+            Permission.code == permission_name,
+            Permission.is_active == True,
+            or_(UserPermission.expires_at.is_(None), UserPermission.expires_at > datetime.utcnow())
+        )).order_by(UserPermission.granted_at.desc()).first()
+        if user_permission:
+            if user_permission.conditions:
+                return self._evaluate_conditions(user_permission.conditions, context)
+            return user_permission.is_granted
+        role_permission = self.db.query(RolePermission).join(Permission).filter(and_(
+            RolePermission.role_id == user.role_id,
+            Permission.name == permission_name,
+            Permission.is_active == True
+        )).first()
+        if not role_permission:
+            return False
+        if role_permission.conditions:
+            return self._evaluate_conditions(role_permission.conditions, context)
+        return True
+
+    def _evaluate_conditions(self, conditions_json, context=None):
+        if not conditions_json or not context:
+            return True
+        try:
+            return self._tree(json.loads(conditions_json), context)
+        except Exception:
+            return False
+
+    def _tree(self, condition, context):
+        if "and" in condition:
+            return all(self._tree(c, context) for c in condition["and"])
+        if "or" in condition:
+            return any(self._tree(c, context) for c in condition["or"])
+        if "not" in condition:
+            return not self._tree(condition["not"], context)
+        field, op, expected = condition.get("field"), condition.get("operator"), condition.get("value")
+        if field not in context:
+            return False
+        actual = context[field]
+        return {
+            "eq": lambda: actual == expected, "ne": lambda: actual != expected,
+            "in": lambda: actual in expected, "not_in": lambda: actual not in expected,
+            "gt": lambda: actual > expected, "gte": lambda: actual >= expected,
+            "lt": lambda: actual < expected, "lte": lambda: actual <= expected,
+        }.get(op, lambda: False)()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    PermissionSnapshotCache.configure(FakeRedis())
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    PermissionSnapshotCache.configure(None)
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def seed(db, seed_value):
+    rng = random.Random(seed_value)
+    roles = [Role(name=f"role-{i}") for i in range(3)]
+    db.add_all(roles)
+    # Name and code coincide so role permissions and overrides address the same check
+    permissions = [
+        Permission(code=f"perm_{i}", name=f"perm_{i}", module="sales", action="view", is_active=rng.random() < 0.85)
+        for i in range(10)
+    ]
+    db.add_all(permissions)
+    db.flush()
+
+    for role in roles:
+        for permission in rng.sample(permissions, 5):
+            condition = rng.choice(CONDITIONS)
+            db.add(RolePermission(role_id=role.id, permission_id=permission.id,
+                                  conditions=json.dumps(condition) if condition else None))
+
+    users = []
+    for i in range(6):
+        user = User(name=f"user {i}", email=f"u{i}@tsh.test", password="x",
+                    role_id=rng.choice(roles).id, is_active=rng.random() < 0.85)
+        db.add(user)
+        users.append(user)
+    db.flush()
+
+    now = datetime.utcnow()
+    for user in users:
+        for permission in rng.sample(permissions, 3):
+            condition = rng.choice(CONDITIONS)
+            db.add(UserPermission(
+                user_id=user.id, permission_id=permission.id, is_granted=rng.random() < 0.5,
+                granted_at=now - timedelta(minutes=rng.randint(0, 1000)),
+                expires_at=rng.choice([None, now + timedelta(days=1), now - timedelta(days=1)]),
+                conditions=json.dumps(condition) if condition else None
+            ))
+    db.commit()
+    return users, permissions
+
+
+@pytest.mark.parametrize("seed_value", range(6))
+def test_snapshot_matches_legacy_checks(db, seed_value):
+    users, permissions = seed(db, seed_value)
+    service, legacy = PermissionService(db), LegacyPermissionService(db)
+
+    for user in users + [User(id=999)]:
+        for permission in permissions:
+            for context in CONTEXTS:
+                assert service.check_permission(user.id, permission.name, context=context) == \
+                    bool(legacy.check_permission(user.id, permission.name, context)), (user.id, permission.name, context)
+
+
+def test_compiled_conditions_short_circuit_like_interpreter():
+    legacy = LegacyPermissionService(None)
+    for raw in ['not json', '{"or": [{"field": "a", "operator": "eq", "value": 1}, 5]}', '{"and": 3}', '[]']:
+        for context in [None, {"a": 1}, {"a": 2}]:
+            assert compile_conditions(raw)(context) == legacy._evaluate_conditions(raw, context)
+
+
+def test_checks_hit_database_only_on_version_miss(db, engine):
+    users, permissions = seed(db, 1)
+    user_id, names = users[0].id, [permission.name for permission in permissions]
+    service = PermissionService(db)
+    statements = count_queries(engine)
+
+    service.check_permission(user_id, names[0])
+    assert len(statements) == 2
+
+    for name in names * 5:
+        service.check_permission(user_id, name, context={"branch_id": 1})
+    assert len(statements) == 2
+
+
+def test_committed_changes_bump_the_version(db):
+    users, permissions = seed(db, 2)
+    user = next(u for u in users if u.is_active)
+    service = PermissionService(db)
+    target = next(p for p in permissions if p.is_active)
+
+    db.query(UserPermission).filter_by(user_id=user.id).delete()
+    db.query(RolePermission).filter_by(role_id=user.role_id, permission_id=target.id).delete()
+    db.commit()
+    assert service.check_permission(user.id, target.name) is False
+
+    version = PermissionSnapshotCache.current_version()
+    db.add(UserPermission(user_id=user.id, permission_id=target.id, is_granted=True))
+    db.commit()
+    assert PermissionSnapshotCache.current_version() == version + 1
+    assert service.check_permission(user.id, target.name) is True
+
+    # Deactivating the user is a permission change too; unrelated edits are not
+    user.phone = "0770"
+    db.commit()
+    assert PermissionSnapshotCache.current_version() == version + 1
+    user.is_active = False
+    db.commit()
+    assert service.check_permission(user.id, target.name) is False
+
+    # Rolled back changes do not bump
+    db.add(Role(name="temporary"))
+    db.flush()
+    db.rollback()
+    assert PermissionSnapshotCache.current_version() == version + 2
+
+
+def test_other_workers_reuse_the_redis_snapshot(db, engine):
+    users, permissions = seed(db, 3)
+    redis = PermissionSnapshotCache._redis
+    PermissionService(db).check_permission(users[0].id, permissions[0].name)
+
+    # A second worker: empty process cache, same Redis
+    PermissionSnapshotCache.configure(redis)
+    statements = count_queries(engine)
+    expected = LegacyPermissionService(db).check_permission(users[0].id, permissions[1].name, {"branch_id": 1})
+    statements.clear()
+    assert PermissionService(db).check_permission(users[0].id, permissions[1].name, context={"branch_id": 1}) == bool(expected)
+    assert statements == []
@@ -0,0 +1,157 @@
+"""
+Unit Tests for POS Sales Report
+
+Builds a fixture of sales, refunds and a voided sale across closed days and
+today, then checks the SQL-aggregated report (rollup for closed days, raw
+aggregation for the rest) against totals computed by hand.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.pos import (
+    PaymentMethodEnum, POSDailySales, POSPayment, POSTransaction, POSTransactionTypeEnum
+)
+from app.services.pos_service import POSReportService
+
+
+SALE = POSTransactionTypeEnum.SALE
+REFUND = POSTransactionTypeEnum.REFUND
+VOID = POSTransactionTypeEnum.VOID
+CASH = PaymentMethodEnum.CASH
+CARD = PaymentMethodEnum.CARD
+
+TODAY = datetime.utcnow().date()
+DAY_3 = TODAY - timedelta(days=3)
+DAY_1 = TODAY - timedelta(days=1)
+
+# (day, hour, terminal, cashier, type, total, discount, tax, payments)
+FIXTURE = [
+    (DAY_3, 9, 1, 10, SALE, "100.00", "5.00", "10.00", [(CASH, "100.00")]),
+    (DAY_3, 11, 1, 10, SALE, "250.00", "0", "25.00", [(CASH, "50.00"), (CARD, "200.00")]),
+    (DAY_3, 15, 2, 11, REFUND, "40.00", "0", "0", [(CASH, "40.00")]),
+    (DAY_3, 17, 2, 11, VOID, "999.00", "0", "0", [(CARD, "999.00")]),
+    (DAY_1, 10, 2, 11, SALE, "80.00", "0", "8.00", [(CARD, "80.00")]),
+    (DAY_1, 23, 1, 11, REFUND, "30.00", "0", "0", [(CARD, "30.00")]),
+    (TODAY, 0, 1, 10, SALE, "60.00", "2.00", "6.00", [(CASH, "60.00")]),
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[
+        Base.metadata.tables[name] for name in ("pos_transactions", "pos_payments", "pos_daily_sales")
+    ])
+    session = sessionmaker(bind=engine)()
+
+    for number, (day, hour, terminal, cashier, kind, total, discount, tax, payments) in enumerate(FIXTURE, 1):
+        transaction = POSTransaction(
+            transaction_number=f"TXN-{number:04d}", terminal_id=terminal, session_id=1,
+            cashier_id=cashier, transaction_type=kind,
+            transaction_date=datetime.combine(day, time(hour, 30)),
+            subtotal=Decimal(total), total_amount=Decimal(total),
+            discount_amount=Decimal(discount), tax_amount=Decimal(tax),
+            amount_paid=Decimal(total)
+        )
+        session.add(transaction)
+        session.flush()
+        for method, amount in payments:
+            session.add(POSPayment(transaction_id=transaction.id, payment_method=method, amount=Decimal(amount)))
+    session.commit()
+
+    yield session
+    session.close()
+
+
+def report(db, start_day=DAY_3, end_day=TODAY, **filters):
+    return POSReportService.get_sales_report(
+        db, datetime.combine(start_day, time.min), datetime.combine(end_day, time.max), **filters
+    )
+
+
+def test_totals_include_refunds_and_skip_voids(db):
+    result = report(db)
+
+    assert result.total_transactions == 6
+    assert result.total_sales == Decimal("490.00")
+    assert result.total_refunds == Decimal("70.00")
+    assert result.net_sales == Decimal("420.00")
+    assert result.total_discounts == Decimal("7.00")
+    assert result.total_tax == Decimal("49.00")
+    assert result.payment_methods == [
+        {"method": "CASH", "amount": Decimal("170.00")},
+        {"method": "CARD", "amount": Decimal("250.00")},
+    ]
+
+
+def test_closed_days_come_from_rollup(db):
+    first = report(db)
+
+    rolled_days = {row.summary_date for row in db.query(POSDailySales)}
+    assert rolled_days == {DAY_3, DAY_1}
+    day_3_terminal_1 = db.query(POSDailySales).filter_by(summary_date=DAY_3, terminal_id=1).one()
+    assert Decimal(day_3_terminal_1.total_sales) == Decimal("350.00")
+    assert Decimal(day_3_terminal_1.card_amount) == Decimal("200.00")
+
+    # A second report reads the stored rows and agrees with the first
+    assert report(db) == first
+
+
+def test_breakdowns(db):
+    result = report(db)
+
+    assert result.daily == [
+        {"date": DAY_3.isoformat(), "transactions": 3, "sales": Decimal("350.00"),
+         "refunds": Decimal("40.00"), "net_sales": Decimal("310.00")},
+        {"date": DAY_1.isoformat(), "transactions": 2, "sales": Decimal("80.00"),
+         "refunds": Decimal("30.00"), "net_sales": Decimal("50.00")},
+        {"date": TODAY.isoformat(), "transactions": 1, "sales": Decimal("60.00"),
+         "refunds": Decimal("0"), "net_sales": Decimal("60.00")},
+    ]
+    assert [(row["cashier_id"], row["net_sales"]) for row in result.cashiers] == [
+        (10, Decimal("410.00")), (11, Decimal("10.00"))
+    ]
+    assert [(row["terminal_id"], row["net_sales"]) for row in result.terminals] == [
+        (1, Decimal("380.00")), (2, Decimal("40.00"))
+    ]
+
+
+def test_filters_and_partial_days(db):
+    # Starting mid-day aggregates the partial day directly; no full closed day, no rollup
+    partial = POSReportService.get_sales_report(
+        db, datetime.combine(DAY_3, time(12, 0)), datetime.combine(DAY_1, time(12, 0))
+    )
+    assert partial.total_sales == Decimal("80.00")
+    assert partial.total_refunds == Decimal("40.00")
+    assert db.query(POSDailySales).count() == 0
+
+    by_terminal = report(db, terminal_id=2)
+    assert by_terminal.total_sales == Decimal("80.00")
+    assert by_terminal.total_refunds == Decimal("40.00")
+
+    by_cashier = report(db, cashier_id=11)
+    assert by_cashier.total_transactions == 3
+    assert by_cashier.net_sales == Decimal("10.00")
+
+
+def test_void_on_closed_day_refreshes_rollup(db):
+    report(db)
+
+    sale = db.query(POSTransaction).filter_by(transaction_number="TXN-0002").one()
+    sale.transaction_type = VOID
+    POSReportService.refresh_days(db, [sale.transaction_date.date()])
+    db.commit()
+
+    result = report(db)
+    assert result.total_sales == Decimal("240.00")
+    assert result.payment_methods == [
+        {"method": "CASH", "amount": Decimal("120.00")},
+        {"method": "CARD", "amount": Decimal("50.00")},
+    ]
@@ -0,0 +1,167 @@
+"""
+Unit Tests for the Security Middleware Rate Limiter
+
+Simulated uvicorn workers (separate RateLimiter instances) share a fake
+Redis and a fake clock. The fake runs the GCRA step atomically in place of
+the Lua script, as Redis would.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from redis.exceptions import NoScriptError
+
+from app.middleware.security_middleware import (
+    DEFAULT_POLICIES, RateLimitMiddleware, RateLimitPolicy, RateLimiter, gcra
+)
+from app.services.auth_service import AuthService
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """EVALSHA of the GCRA script against an in-memory keyspace"""
+
+    def __init__(self):
+        self.values = {}
+        self.scripts = set()
+        self.calls = 0
+
+    async def script_load(self, script):
+        sha = f"sha-{len(script)}"
+        self.scripts.add(sha)
+        return sha
+
+    async def evalsha(self, sha, numkeys, key, now, interval, period):
+        if sha not in self.scripts:
+            raise NoScriptError("NOSCRIPT")
+        self.calls += 1
+        stored = self.values.get(key)
+        allowed, tat, retry_after, remaining = gcra(
+            float(stored) if stored is not None else None, float(now), float(interval), float(period)
+        )
+        if allowed:
+            self.values[key] = repr(tat)
+        return [int(allowed), repr(retry_after), remaining]
+
+
+class BrokenRedis:
+    async def script_load(self, script):
+        raise ConnectionError("redis down")
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+POLICY = RateLimitPolicy("test", limit=10, period_seconds=60)
+
+
+def test_limit_is_shared_across_workers():
+    redis, clock = FakeRedis(), FakeClock()
+    workers = [RateLimiter([POLICY], redis_client=redis, clock=clock) for _ in range(4)]
+
+    decisions = [run(workers[i % 4].hit("user:a", POLICY)) for i in range(40)]
+    assert sum(decision.allowed for decision in decisions) == 10
+    assert [decision.remaining for decision in decisions[:10]] == list(range(9, -1, -1))
+    assert decisions[10].retry_after == pytest.approx(6.0)
+
+    # One emission interval later exactly one more request fits, on any worker
+    clock.advance(6)
+    assert run(workers[3].hit("user:a", POLICY)).allowed
+    assert not run(workers[0].hit("user:a", POLICY)).allowed
+
+    # A full period refills the whole allowance; other principals are independent
+    clock.advance(60)
+    assert sum(run(workers[i % 4].hit("user:a", POLICY)).allowed for i in range(12)) == 10
+    assert run(workers[1].hit("user:b", POLICY)).allowed
+
+
+def test_burst_then_steady_rate():
+    redis, clock = FakeRedis(), FakeClock()
+    workers = [RateLimiter([POLICY], redis_client=redis, clock=clock) for _ in range(4)]
+
+    allowed_at = []
+    for step in range(600):  # one request every 0.5 s for 5 minutes
+        if run(workers[step % 4].hit("ip:1.2.3.4", POLICY)).allowed:
+            allowed_at.append(clock())
+        clock.advance(0.5)
+
+    # Never more than the burst plus what refilled in between
+    for first in range(len(allowed_at)):
+        for last in range(first, len(allowed_at)):
+            elapsed = allowed_at[last] - allowed_at[first]
+            assert last - first + 1 <= POLICY.limit + elapsed / POLICY.interval + 1e-6
+    assert len(allowed_at) == POLICY.limit + int(299.5 / POLICY.interval)
+
+
+def test_script_is_reloaded_after_redis_restart():
+    redis, clock = FakeRedis(), FakeClock()
+    limiter = RateLimiter([POLICY], redis_client=redis, clock=clock)
+    run(limiter.hit("user:a", POLICY))
+    redis.scripts.clear()
+    assert run(limiter.hit("user:a", POLICY)).remaining == 8
+
+
+def test_fallback_is_bounded_and_per_worker():
+    clock = FakeClock()
+    limiter = RateLimiter([POLICY], clock=clock, max_local_keys=50)
+    limiter._redis_resolved = True  # no Redis configured
+
+    assert sum(run(limiter.hit("user:a", POLICY)).allowed for _ in range(15)) == 10
+    for i in range(500):
+        run(limiter.hit(f"ip:10.0.{i // 256}.{i % 256}", POLICY))
+        run(limiter.hit("user:a", POLICY))  # recently used, never evicted
+    assert len(limiter._local) == 50
+    assert "ratelimit:test:user:a" in limiter._local
+    assert "ratelimit:test:ip:10.0.0.0" not in limiter._local
+
+
+def test_unreachable_redis_falls_back_to_local_limits():
+    limiter = RateLimiter([POLICY], redis_client=BrokenRedis(), clock=FakeClock())
+    assert sum(run(limiter.hit("user:a", POLICY)).allowed for _ in range(12)) == 10
+
+
+def test_middleware_policies_and_principals():
+    redis, clock = FakeRedis(), FakeClock()
+    limiter = RateLimiter(DEFAULT_POLICIES, redis_client=redis, clock=clock)
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post("/api/auth/login")
+    def login():
+        return {}
+
+    @app.get("/api/items")
+    def items():
+        return {}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app, client=("10.0.0.7", 5000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://erp") as client:
+            statuses = [(await client.post("/api/auth/login")).status_code for _ in range(6)]
+            assert statuses == [200] * 5 + [429]
+            refused = await client.post("/api/auth/login")
+            assert refused.headers["Retry-After"] == "12"
+            assert refused.headers["X-RateLimit-Limit"] == "5"
+
+            # API calls are keyed by the authenticated user, not the shared client IP
+            token = AuthService.create_access_token({"sub": "sales@tsh.test"})
+            response = await client.get("/api/items", headers={"Authorization": f"Bearer {token}"})
+            assert response.headers["X-RateLimit-Remaining"] == "999"
+            assert "ratelimit:api:user:sales@tsh.test" in redis.values
+            assert (await client.get("/api/items")).headers["X-RateLimit-Remaining"] == "999"
+            assert "ratelimit:api:ip:10.0.0.7" in redis.values
+
+    run(scenario())
@@ -0,0 +1,316 @@
+"""
+Unit Tests for Returns Listing and Reporting
+
+Seeds a month of returns (reasons, refunds, processing times, items across
+products, one product missing from the catalogue) and checks that the
+grouped-SQL report matches the per-return Python computation it replaced,
+that the keyset listing walks every row exactly once with a fixed number of
+statements per page, and that approvals and exchanges post stock in one batch.
+"""
+
+import asyncio
+import random
+import statistics
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models import Customer, InventoryItem, Product, StockMovement
+from app.models.pos import POSTerminal, POSTransaction, POSTransactionTypeEnum
+from app.routers.returns_exchange import (
+    ExchangeRequest, ReturnApproval, ReturnExchange, ReturnExchangeItem, ReturnPhoto, ReturnStatus,
+    _percentile_cont, approve_return, build_returns_report, get_returns, process_exchange
+)
+
+
+TABLES = (
+    "customers", "products", "pos_terminals", "pos_transactions", "inventory_items", "stock_movements",
+    "return_exchanges", "return_exchange_items", "return_photos", "refund_transactions",
+    "product_exchanges", "exchange_items",
+)
+PERIOD_START = date(2025, 3, 1)
+PERIOD_END = date(2025, 3, 31)
+WAREHOUSE_ID = 5
+REASONS = ("defective", "wrong_item", "damage", "size_issue", "other")
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(49)
+
+    for product_id in range(1, 9):
+        session.add(Product(id=product_id, sku=f"SKU-{product_id}", name=f"Product {product_id}",
+                            category_id=1, unit_price=Decimal("10.00"), unit_of_measure="piece"))
+        session.add(InventoryItem(product_id=product_id, warehouse_id=WAREHOUSE_ID,
+                                  quantity_on_hand=Decimal("20"), quantity_reserved=0, quantity_ordered=0))
+    session.add(Customer(id=1, customer_code="C-1", name="Ali", name_ar="علي", phone="0770"))
+    session.add(POSTerminal(id=1, terminal_code="T-1", name_ar="نقطة 1", name_en="Till 1",
+                            branch_id=1, warehouse_id=WAREHOUSE_ID))
+    for number in range(1, 41):
+        session.add(POSTransaction(
+            id=number, transaction_number=f"TXN-{number}", terminal_id=1, session_id=1, cashier_id=1,
+            transaction_type=POSTransactionTypeEnum.VOID if number % 10 == 0 else POSTransactionTypeEnum.SALE,
+            transaction_date=datetime(2025, 2, 20) + timedelta(days=number)
+        ))
+
+    # 80 returns from mid-February to mid-April; product 9 is not in the catalogue
+    for number in range(1, 81):
+        created_at = datetime(2025, 2, 15, 9) + timedelta(hours=number * 13 + rng.randint(0, 600) / 60)
+        processed = rng.random() < 0.7
+        record = ReturnExchange(
+            return_number=f"RET-{number:03d}",
+            transaction_id=rng.randint(1, 40),
+            customer_id=1 if number % 3 else None,
+            return_reason=rng.choice(REASONS),
+            total_amount=Decimal("0"),
+            refund_amount=Decimal(rng.randint(0, 500)) if number % 4 else None,
+            status=ReturnStatus.PROCESSED.value if processed else ReturnStatus.PENDING.value,
+            created_at=created_at,
+            processed_at=created_at + timedelta(minutes=rng.randint(30, 7 * 24 * 60)) if processed else None
+        )
+        session.add(record)
+        session.flush()
+        for product_id in rng.sample(range(1, 10), rng.randint(1, 3)):
+            quantity = rng.randint(1, 5)
+            session.add(ReturnExchangeItem(
+                return_id=record.id, product_id=product_id, quantity=quantity,
+                original_price=Decimal("10.00"), return_amount=Decimal(quantity * 10), condition="good"
+            ))
+        for order in range(number % 3):
+            session.add(ReturnPhoto(return_id=record.id, photo_data="data", photo_order=order + 1))
+    session.commit()
+
+    yield session
+    session.close()
+
+
+def python_report(db, date_from, date_to):
+    """The previous implementation: load every return, then loop in Python"""
+    start_date = datetime.combine(date_from, datetime.min.time())
+    end_date = datetime.combine(date_to, datetime.max.time())
+    returns = db.query(ReturnExchange).filter(
+        ReturnExchange.created_at >= start_date, ReturnExchange.created_at <= end_date
+    ).all()
+
+    return_reasons = {}
+    product_returns = {}
+    for return_record in returns:
+        return_reasons[return_record.return_reason] = return_reasons.get(return_record.return_reason, 0) + 1
+        for item in return_record.items:
+            entry = product_returns.setdefault(item.product_id, {
+                "product_id": item.product_id,
+                "product_name": item.product.name if item.product else "Unknown",
+                "quantity": 0,
+                "amount": 0.0
+            })
+            entry["quantity"] += item.quantity
+            entry["amount"] += float(item.return_amount)
+
+    total_sales = db.query(POSTransaction).filter(
+        POSTransaction.transaction_date >= start_date,
+        POSTransaction.transaction_date <= end_date,
+        POSTransaction.transaction_type == POSTransactionTypeEnum.SALE
+    ).count()
+    processing_times = sorted(
+        (r.processed_at - r.created_at).total_seconds() / 3600 for r in returns if r.processed_at
+    )
+    deciles = statistics.quantiles(processing_times, n=10, method="inclusive")
+
+    return {
+        "total_returns": len(returns),
+        "total_refund_amount": sum(float(r.refund_amount or 0) for r in returns),
+        "return_reasons": return_reasons,
+        "top_returned_products": sorted(
+            product_returns.values(), key=lambda x: (-x["quantity"], x["product_id"])
+        )[:10],
+        "return_rate": len(returns) / total_sales * 100 if total_sales else 0,
+        "processing_time_avg": statistics.fmean(processing_times),
+        "processing_time_median": deciles[4],
+        "processing_time_p90": deciles[8],
+    }
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.mark.parametrize("date_from,date_to", [
+    (PERIOD_START, PERIOD_END),
+    (date(2025, 2, 1), date(2025, 4, 30)),
+    (date(2025, 3, 10), date(2025, 3, 16)),
+])
+def test_sql_report_matches_python_report(db, engine, date_from, date_to):
+    expected = python_report(db, date_from, date_to)
+    statements = count_statements(engine)
+
+    report = build_returns_report(db, date_from, date_to)
+
+    assert len(statements) == 5  # summary, processing times, reasons, top products, sales
+    assert report.total_returns == expected["total_returns"]
+    assert report.return_reasons == expected["return_reasons"]
+    assert report.total_refund_amount == pytest.approx(expected["total_refund_amount"])
+    assert report.return_rate == pytest.approx(expected["return_rate"])
+    assert report.top_returned_products == [
+        {**row, "amount": pytest.approx(row["amount"])} for row in expected["top_returned_products"]
+    ]
+    for field in ("processing_time_avg", "processing_time_median", "processing_time_p90"):
+        assert getattr(report, field) == pytest.approx(expected[field], abs=1e-6), field
+
+
+def test_empty_period_and_percentile_interpolation(db):
+    report = build_returns_report(db, date(2030, 1, 1), date(2030, 1, 31))
+    assert (report.total_returns, report.return_reasons, report.top_returned_products) == (0, {}, [])
+    assert (report.processing_time_avg, report.processing_time_median, report.return_rate) == (0, 0, 0)
+
+    assert _percentile_cont([1.0, 2.0, 4.0, 8.0], 0.5) == 3.0
+    assert _percentile_cont([1.0, 2.0, 4.0, 8.0], 0.9) == pytest.approx(6.8)
+    assert _percentile_cont([5.0], 0.9) == 5.0
+
+
+def test_keyset_listing_walks_every_return_once(db, engine):
+    statements = count_statements(engine)
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        page = run(get_returns(response, status=None, customer_id=None, date_from=PERIOD_START,
+                               date_to=PERIOD_END, return_reason=None, limit=7, cursor=cursor,
+                               offset=0, db=db))
+        pages += 1
+        seen.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(statements) <= pages * 3  # page + items + products, whatever the page holds
+    expected = db.query(ReturnExchange).filter(
+        ReturnExchange.created_at >= datetime.combine(PERIOD_START, datetime.min.time()),
+        ReturnExchange.created_at <= datetime.combine(PERIOD_END, datetime.max.time())
+    ).order_by(ReturnExchange.created_at.desc(), ReturnExchange.id.desc()).all()
+    assert [row["id"] for row in seen] == [record.id for record in expected]
+
+    first = next(row for row in seen if row["id"] == expected[0].id)
+    assert first["items"] == [
+        {
+            "product_id": item.product_id,
+            "product_name": item.product.name if item.product else "Unknown",
+            "quantity": item.quantity,
+            "original_price": 10.0,
+            "return_amount": float(item.return_amount),
+            "condition": "good"
+        } for item in expected[0].items
+    ]
+    assert first["photos_count"] == len(expected[0].photos)
+    assert first["customer"]["name"] == ("Ali" if expected[0].customer_id else "Walk-in Customer")
+
+    with pytest.raises(HTTPException) as exc_info:
+        run(get_returns(Response(), status=None, customer_id=None, date_from=None, date_to=None,
+                        return_reason=None, limit=7, cursor="yesterday", offset=0, db=db))
+    assert exc_info.value.status_code == 400
+
+
+def on_hand(db, product_id):
+    item = db.query(InventoryItem).filter_by(product_id=product_id, warehouse_id=WAREHOUSE_ID).one()
+    db.refresh(item)
+    return Decimal(item.quantity_on_hand)
+
+
+def test_approval_and_exchange_post_stock_in_one_batch(db, engine):
+    record = db.query(ReturnExchange).filter(ReturnExchange.status == ReturnStatus.PENDING.value).first()
+    record_items = {item.product_id: item for item in record.items}
+    before = {product_id: on_hand(db, product_id) for product_id in range(1, 9)}
+    approved = [
+        {"product_id": product_id, "quantity": 1, "amount": 10.0,
+         "condition": "good" if index == 0 else "poor"}
+        for index, product_id in enumerate(record_items)
+    ]
+    statements = count_statements(engine)
+
+    run(approve_return(record.id, ReturnApproval(
+        return_id=record.id, approved=True, approved_items=approved, refund_amount=10.0
+    ), db))
+
+    restocked = approved[0]["product_id"]
+    assert sum(sql.startswith("UPDATE inventory_items") for sql in statements) == 1
+    movements = db.query(StockMovement).filter_by(reference_type="RETURN", reference_id=record.id).all()
+    assert [(m.movement_type, Decimal(m.quantity)) for m in movements] == [("IN", Decimal("1"))]
+    assert on_hand(db, restocked) == before.get(restocked, 0) + 1
+    assert all(item.approved for item in db.query(ReturnExchangeItem).filter_by(return_id=record.id))
+
+    statements.clear()
+    run(process_exchange(record.id, ExchangeRequest(return_id=record.id, exchange_items=[
+        {"product_id": 1, "quantity": 2, "price": 10.0},
+        {"product_id": 2, "quantity": 3, "price": 10.0},
+        {"product_id": 1, "quantity": 1, "price": 10.0},
+    ]), db))
+
+    assert sum(sql.startswith("UPDATE inventory_items") for sql in statements) == 1
+    assert sum(sql.startswith("INSERT INTO stock_movements") for sql in statements) == 1
+    assert on_hand(db, 1) == before[1] - 3 + (1 if restocked == 1 else 0)
+    assert on_hand(db, 2) == before[2] - 3 + (1 if restocked == 2 else 0)
+    assert db.get(ReturnExchange, record.id).status == ReturnStatus.EXCHANGED.value
+
+    # Not enough stock: the whole exchange is rejected with a 400, nothing is written
+    record.status = ReturnStatus.APPROVED.value
+    db.commit()
+    with pytest.raises(HTTPException) as exc_info:
+        run(process_exchange(record.id, ExchangeRequest(return_id=record.id, exchange_items=[
+            {"product_id": 3, "quantity": 1, "price": 10.0},
+            {"product_id": 4, "quantity": 500, "price": 10.0},
+        ]), db))
+    assert exc_info.value.status_code == 400
+    assert on_hand(db, 3) == before[3] + (1 if restocked == 3 else 0)
+
+
+def test_stock_lines_without_a_warehouse_are_rejected(db):
+    # Not a POS return and no warehouse in the request: nowhere to post the stock
+    record = db.query(ReturnExchange).filter(ReturnExchange.status == ReturnStatus.PENDING.value).first()
+    record.transaction_id = None
+    db.commit()
+    product_id = record.items[0].product_id
+    approved = [{"product_id": product_id, "quantity": 1, "amount": 10.0, "condition": "good"}]
+
+    with pytest.raises(HTTPException) as exc_info:
+        run(approve_return(record.id, ReturnApproval(
+            return_id=record.id, approved=True, approved_items=approved, refund_amount=10.0
+        ), db))
+    assert (exc_info.value.status_code, exc_info.value.detail) == (400, "warehouse_id required")
+    assert db.get(ReturnExchange, record.id).status == ReturnStatus.PENDING.value
+
+    # Nothing goes back on the shelf: no warehouse needed
+    run(approve_return(record.id, ReturnApproval(
+        return_id=record.id, approved=True, approved_items=[{**approved[0], "condition": "poor"}], refund_amount=10.0
+    ), db))
+    assert db.get(ReturnExchange, record.id).status == ReturnStatus.APPROVED.value
+
+    with pytest.raises(HTTPException) as exc_info:
+        run(process_exchange(record.id, ExchangeRequest(return_id=record.id, exchange_items=[
+            {"product_id": 1, "quantity": 1, "price": 10.0},
+        ]), db))
+    assert (exc_info.value.status_code, exc_info.value.detail) == (400, "warehouse_id required")
+    assert db.get(ReturnExchange, record.id).status == ReturnStatus.APPROVED.value
+
+    before = on_hand(db, 1)
+    run(process_exchange(record.id, ExchangeRequest(return_id=record.id, warehouse_id=WAREHOUSE_ID, exchange_items=[
+        {"product_id": 1, "quantity": 1, "price": 10.0},
+    ]), db))
+    assert on_hand(db, 1) == before - 1
@@ -0,0 +1,152 @@
+"""
+Unit Tests for Request-scoped RLS Context
+
+SQLite stands in for PostgreSQL: set_config()/current_setting() are
+registered per connection and keep transaction-local settings until that
+connection's COMMIT/ROLLBACK, the way PostgreSQL does. A two-connection pool
+is shared by many interleaved requests, some of which fail half-way; each
+must only ever see its own tenant, and an anonymous request none at all.
+"""
+
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.db import rls_context
+from app.db.rls_context import RLSContext, RLSIdentity, get_rls_identity, rls_scope, set_rls_context
+from app.services.tenant_service import TenantAwareSession, TenantContext
+
+
+CURRENT_TENANT = text("SELECT current_setting('app.current_tenant_id', 1)")
+CURRENT_USER = text("SELECT current_setting('app.current_user_id', 1)")
+
+
+def emulate_settings(engine):
+    """set_config(name, value, is_local) / current_setting(name, missing_ok) on SQLite"""
+    state = {}
+
+    @event.listens_for(engine, "connect")
+    def register(dbapi_connection, record):
+        settings = state[id(dbapi_connection)] = {"session": {}, "local": {}}
+
+        def set_config(name, value, is_local):
+            settings["local" if is_local else "session"][name] = value
+            return value
+
+        def current_setting(name, missing_ok):
+            return settings["local"].get(name, settings["session"].get(name))
+
+        dbapi_connection.create_function("set_config", 3, set_config)
+        dbapi_connection.create_function("current_setting", 2, current_setting)
+
+    def end_transaction(connection):
+        state[id(connection.connection.dbapi_connection)]["local"].clear()
+
+    event.listen(engine, "commit", end_transaction)
+    event.listen(engine, "rollback", end_transaction)
+
+    @event.listens_for(engine, "reset")
+    def reset(dbapi_connection, record, reset_state):
+        state[id(dbapi_connection)]["local"].clear()
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(rls_context, "RLS_DIALECTS", {"postgresql", "sqlite"})
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'rls.db'}", poolclass=QueuePool, pool_size=2, max_overflow=0,
+        connect_args={"check_same_thread": False}
+    )
+    emulate_settings(engine)
+    engine.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: engine.statements.append(args[2]))
+    yield sessionmaker(bind=engine)
+    rls_context.set_rls_identity(None)
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_interleaved_requests_never_see_another_tenant(session_factory):
+    seen = []
+
+    def handle(tenant_id, fail):
+        """The threadpool part of a request: two transactions on a pooled connection"""
+        db = session_factory()
+        try:
+            TenantAwareSession(db)  # pins the request's identity to the session
+            seen.append((tenant_id, db.execute(CURRENT_TENANT).scalar()))
+            if fail:
+                raise RuntimeError("request failed half-way")
+            db.commit()
+            seen.append((tenant_id, db.execute(CURRENT_TENANT).scalar()))
+        finally:
+            db.close()
+
+    async def request(tenant_id, rng):
+        await asyncio.sleep(rng.random() * 0.01)
+        if tenant_id is not None:
+            TenantContext.set_context(tenant_id, user_id=tenant_id * 10)
+        await asyncio.sleep(rng.random() * 0.01)
+        assert TenantContext.get_tenant_id() == tenant_id
+        try:
+            await asyncio.to_thread(handle, tenant_id, fail=rng.random() < 0.3)
+        except RuntimeError:
+            pass
+        assert TenantContext.get_tenant_id() == tenant_id
+
+    async def scenario():
+        rng = random.Random(11)
+        tenants = [rng.choice([None, 1, 2, 3, 4]) for _ in range(120)]
+        await asyncio.gather(*(request(tenant_id, rng) for tenant_id in tenants))
+        # The event loop's own context was never touched
+        assert get_rls_identity() is None
+
+    run(scenario())
+    assert len(seen) > 120
+    for tenant_id, setting in seen:
+        assert setting == (None if tenant_id is None else str(tenant_id))
+
+
+def test_one_statement_per_transaction(session_factory):
+    engine = session_factory.kw["bind"]
+    db = session_factory()
+    with rls_scope(RLSIdentity(user_id=5, role_name="admin", tenant_id=2, branch_id=3, warehouse_id=4)):
+        for _ in range(3):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+            db.commit()
+    db.close()
+
+    set_config_calls = [s for s in engine.statements if "set_config" in s]
+    assert len(set_config_calls) == 3
+    assert all(s.count("set_config") == 5 and "true" in s for s in set_config_calls)
+    assert not any(s.lstrip().upper().startswith("SET ") for s in engine.statements)
+
+
+def test_rls_context_nests_and_applies_mid_transaction(session_factory):
+    db = session_factory()
+    set_rls_context(db, user_id=1, tenant_id=1)
+    assert db.execute(CURRENT_TENANT).scalar() == "1"
+
+    with RLSContext(db, user_id=2, role_name="auditor", tenant_id=2):
+        # Applied to the transaction already open
+        assert (db.execute(CURRENT_USER).scalar(), db.execute(CURRENT_TENANT).scalar()) == ("2", "2")
+        db.commit()
+        assert db.execute(CURRENT_TENANT).scalar() == "2"
+        assert get_rls_identity().role_name == "auditor"
+
+    assert (db.execute(CURRENT_USER).scalar(), db.execute(CURRENT_TENANT).scalar()) == ("1", "1")
+    assert get_rls_identity().tenant_id == 1
+    db.close()
+
+    # A fresh session on the same pooled connections starts from the request context only
+    TenantContext.clear_context()
+    other = session_factory()
+    assert other.execute(CURRENT_TENANT).scalar() is None
+    other.close()
@@ -0,0 +1,420 @@
+"""
+Unit Tests for Compiled Security Decisions
+
+Checks CompiledSecurityPolicies (check_access, RLS and FLS) against the
+previous per-call evaluation on random policy sets, role hierarchies,
+restriction groups and contexts.
+"""
+
+import ipaddress
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, text
+
+from app.services.security_policy_compiler import (
+    AccessContext, CompiledSecurityPolicies, FlsRuleRow, OverrideRow, PolicyRow, RestrictionRow,
+    RlsRuleRow, RolePermissionRow, UserSecurityProfile, compile_mask, compute_role_closure
+)
+
+
+RESOURCES = ["sales", "financial", "inventory", "hr"]
+ACTIONS = ["read", "create", "delete", "export"]
+CONDITIONS = [
+    None,
+    {},
+    {"time": {"allowed_hours": list(range(8, 18))}},
+    {"time": {"blocked_hours": [0, 1, 2, 3]}},
+    {"location": {"allowed_countries": ["IQ", "AE"]}},
+    {"location": {"blocked_countries": ["XX"]}},
+    {"user": {"user_ids": [1, 2]}},
+    {"time": {"allowed_hours": list(range(6, 23))}, "location": {"blocked_countries": ["AE"]}},
+]
+RESTRICTIONS = [
+    {},
+    {"time": {"blocked_hours": [22, 23, 0]}},
+    {"time": {"allowed_hours": list(range(7, 20)), "blocked_hours": [12]}},
+    {"location": {"allowed_countries": ["IQ"]}},
+    {"ip": {"blocked_ips": ["10.0.0.66"]}},
+    {"ip": {"allowed_networks": ["10.0.0.0/24", "not a network", "192.168.1.0/24"]}},
+]
+IPS = [None, "10.0.0.5", "10.0.0.66", "192.168.1.20", "172.16.0.1", "garbage"]
+LOCATIONS = [None, {}, {"country": "IQ"}, {"country": "AE"}, {"country": "XX"}]
+
+
+class LegacySecurity:
+    """The previous check_access, RLS and FLS evaluation over the same rows"""
+
+    def __init__(self, users, parents, policies, role_permissions, overrides, user_restrictions,
+                 role_restrictions, devices, mfa_users, rls_rules=(), fls_rules=()):
+        self.users, self.parents, self.policies = users, parents, policies
+        self.role_permissions, self.overrides = role_permissions, overrides
+        self.user_restrictions, self.role_restrictions = user_restrictions, role_restrictions
+        self.devices, self.mfa_users = devices, mfa_users
+        self.rls_rules, self.fls_rules = rls_rules, fls_rules
+
+    def check_access(self, context, now):
+        user = self.users.get(context.user_id)
+        if not user or not user["active"]:
+            return (False, "User not found or inactive", [], False)
+        risk = self.risk(context)
+
+        applicable, policy_granted = [], None
+        for policy in self.policies:
+            if policy.resources and context.resource_type not in policy.resources:
+                continue
+            if policy.actions and context.action not in policy.actions:
+                continue
+            if policy.subjects:
+                if context.user_id not in policy.subjects.get("users", []) and \
+                        user["role_id"] not in policy.subjects.get("roles", []):
+                    continue
+            applicable.append(policy.name)
+            if self.conditions(policy.conditions, context):
+                if policy.effect == "deny":
+                    return (False, f"Access denied by policy: {policy.name}", applicable, False)
+                policy_granted = True
+                break
+
+        rbac = self.rbac(user, context, now)
+        if rbac is not None and policy_granted is not True:
+            return (False, rbac, [], False)
+
+        for row in self.overrides.get(context.user_id, []):
+            if (row.resource_type, row.action) != (context.resource_type, context.action):
+                continue
+            if row.expires_at is not None and row.expires_at <= now:
+                continue
+            if not self.conditions(row.conditions, context) or not self.conditions(row.constraints, context):
+                continue
+            if row.pending_approval:
+                continue
+            return (row.is_granted, f"Access {'granted' if row.is_granted else 'denied'} by user permission override", [], False)
+
+        for row in self.user_restrictions.get(context.user_id, []):
+            if (row.expires_at is None or row.expires_at > now) and self.restricted(row.restrictions, context):
+                return (False, f"Access restricted by group: {row.name}", [], False)
+        if user["role_id"] is not None:
+            for row in self.role_restrictions:
+                if row.owner_id == user["role_id"] and self.restricted(row.restrictions, context):
+                    return (False, f"Access restricted by role group: {row.name}", [], False)
+
+        return (True, "Access granted", applicable, self.requires_mfa(context, risk))
+
+    def hierarchy(self, role_id):
+        role_ids, seen = [role_id], {role_id}
+        parent = self.parents.get(role_id)
+        while parent is not None and parent not in seen:
+            role_ids.append(parent)
+            seen.add(parent)
+            parent = self.parents.get(parent)
+        return role_ids
+
+    def rbac(self, user, context, now):
+        if user["role_id"] is None:
+            return "User has no role assigned"
+        role_ids = self.hierarchy(user["role_id"])
+        for row in self.role_permissions:
+            if row.role_id in role_ids and row.resource_type == context.resource_type \
+                    and row.action == context.action and (row.expires_at is None or row.expires_at > now):
+                if self.conditions(row.conditions, context) and self.conditions(row.constraints, context):
+                    return None
+        return "No matching role permissions found"
+
+    def conditions(self, conditions, context):
+        for condition_type, condition in (conditions or {}).items():
+            if condition_type == "time":
+                if "allowed_hours" in condition:
+                    if context.timestamp.hour not in condition["allowed_hours"]:
+                        return False
+                elif "blocked_hours" in condition and context.timestamp.hour in condition["blocked_hours"]:
+                    return False
+            elif condition_type == "location" and context.location:
+                if "allowed_countries" in condition:
+                    if context.location.get("country") not in condition["allowed_countries"]:
+                        return False
+                elif "blocked_countries" in condition and context.location.get("country") in condition["blocked_countries"]:
+                    return False
+            elif condition_type == "user" and "user_ids" in condition:
+                if context.user_id not in condition["user_ids"]:
+                    return False
+        return True
+
+    def restricted(self, restrictions, context):
+        restrictions = restrictions or {}
+        if "time" in restrictions:
+            hour = context.timestamp.hour
+            if "allowed_hours" in restrictions["time"] and hour not in restrictions["time"]["allowed_hours"]:
+                return True
+            if "blocked_hours" in restrictions["time"] and hour in restrictions["time"]["blocked_hours"]:
+                return True
+        if "location" in restrictions and context.location:
+            if "allowed_countries" in restrictions["location"]:
+                if context.location.get("country") not in restrictions["location"]["allowed_countries"]:
+                    return True
+        if "ip" in restrictions and context.ip_address:
+            if context.ip_address in restrictions["ip"].get("blocked_ips", []):
+                return True
+            if "allowed_networks" in restrictions["ip"]:
+                allowed = False
+                for network in restrictions["ip"]["allowed_networks"]:
+                    try:
+                        if ipaddress.ip_address(context.ip_address) in ipaddress.ip_network(network):
+                            allowed = True
+                            break
+                    except ValueError:
+                        continue
+                if not allowed:
+                    return True
+        return False
+
+    def risk(self, context):
+        score = 0.0
+        if context.timestamp.hour < 6 or context.timestamp.hour > 22:
+            score += 0.2
+        if context.timestamp.weekday() >= 5:
+            score += 0.1
+        if context.action in ["delete", "export", "approve", "manage"]:
+            score += 0.3
+        if context.resource_type in ["financial", "hr", "system"]:
+            score += 0.2
+        if context.device_id and context.device_id not in self.devices.get(context.user_id, ()):
+            score += 0.2
+        return min(1.0, score)
+
+    def requires_mfa(self, context, risk):
+        if risk >= 0.7:
+            return True
+        if context.user_id not in self.mfa_users:
+            return False
+        return context.action in ["delete", "approve", "export", "manage"] or \
+            context.resource_type in ["financial", "hr", "system"]
+
+    def row_filter(self, table_name, context):
+        user = self.users.get(context.user_id)
+        clauses = []
+        for rule in self.rls_rules:
+            if rule.table_name != table_name:
+                continue
+            if rule.actions and context.action not in rule.actions:
+                continue
+            if rule.roles and user and user["role_id"] not in rule.roles:
+                continue
+            if rule.users and context.user_id not in rule.users:
+                continue
+            expression = rule.rule_expression
+            for placeholder, value in {
+                "{user_id}": str(context.user_id),
+                "{branch_id}": str(context.branch_id) if context.branch_id else "NULL",
+                "{tenant_id}": str(context.tenant_id) if context.tenant_id else "NULL",
+            }.items():
+                expression = expression.replace(placeholder, value)
+            clauses.append(text(expression))
+        return clauses
+
+    def mask_fields(self, data, table_name, context):
+        user = self.users.get(context.user_id)
+        filtered = data.copy()
+        for rule in self.fls_rules:
+            if rule.table_name != table_name or not self.conditions(rule.conditions, context):
+                continue
+            if rule.roles and user and user["role_id"] not in rule.roles:
+                continue
+            if rule.users and context.user_id not in rule.users:
+                continue
+            if rule.column_name in filtered:
+                if not rule.is_visible:
+                    filtered.pop(rule.column_name, None)
+                elif not rule.is_readable:
+                    filtered[rule.column_name] = "[RESTRICTED]"
+                elif rule.masking_pattern:
+                    filtered[rule.column_name] = self.mask(filtered[rule.column_name], rule.masking_pattern)
+        return filtered
+
+    @staticmethod
+    def mask(value, pattern):
+        if value is None:
+            return None
+        value = str(value)
+        if pattern == "***":
+            return "***"
+        if pattern.startswith("show_last_"):
+            count = int(pattern.split("_")[-1])
+            return "*" * (len(value) - count) + value[-count:]
+        if pattern.startswith("show_first_"):
+            count = int(pattern.split("_")[-1])
+            return value[:count] + "*" * (len(value) - count)
+        return pattern
+
+
+def random_world(seed_value):
+    rng = random.Random(seed_value)
+    now = datetime(2026, 10, 19, 12, 0)
+
+    role_ids = list(range(1, 9))
+    parents = {role_id: (rng.choice(role_ids[:index]) if index and rng.random() < 0.7 else None)
+               for index, role_id in enumerate(role_ids)}
+    users = {user_id: {"active": rng.random() < 0.9, "role_id": rng.choice(role_ids + [None])}
+             for user_id in range(1, 9)}
+
+    policies = [
+        PolicyRow(
+            name=f"policy-{i}",
+            effect=rng.choice(["allow", "deny"]),
+            resources=rng.choice([None, [], rng.sample(RESOURCES, 2)]),
+            actions=rng.choice([None, rng.sample(ACTIONS, 2)]),
+            subjects=rng.choice([None, {}, {"users": [rng.randint(1, 8)], "roles": [rng.choice(role_ids)]}]),
+            conditions=rng.choice(CONDITIONS),
+        )
+        for i in range(rng.randint(0, 8))
+    ]
+    role_permissions = [
+        RolePermissionRow(
+            role_id=rng.choice(role_ids), permission_name=f"perm-{i}",
+            resource_type=rng.choice(RESOURCES), action=rng.choice(ACTIONS),
+            conditions=rng.choice(CONDITIONS), constraints=rng.choice(CONDITIONS[:3]),
+            expires_at=rng.choice([None, None, now + timedelta(days=1), now - timedelta(days=1)]),
+        )
+        for i in range(40)
+    ]
+    overrides = {
+        user_id: [
+            OverrideRow(rng.choice(RESOURCES), rng.choice(ACTIONS), rng.random() < 0.5,
+                        rng.choice(CONDITIONS), None,
+                        rng.choice([None, now + timedelta(hours=1), now - timedelta(hours=1)]),
+                        rng.random() < 0.2)
+            for _ in range(rng.randint(0, 4))
+        ]
+        for user_id in users
+    }
+    user_restrictions = {
+        user_id: [RestrictionRow(user_id, f"user-group-{i}", rng.choice(RESTRICTIONS),
+                                 rng.choice([None, now + timedelta(hours=1), now - timedelta(hours=1)]))
+                  for i in range(rng.randint(0, 2))]
+        for user_id in users
+    }
+    role_restrictions = [RestrictionRow(rng.choice(role_ids), f"role-group-{i}", rng.choice(RESTRICTIONS))
+                         for i in range(4)]
+    devices = {user_id: {f"device-{user_id}"} for user_id in users if rng.random() < 0.5}
+    mfa_users = {user_id for user_id in users if rng.random() < 0.5}
+
+    legacy = LegacySecurity(users, parents, policies, role_permissions, overrides, user_restrictions,
+                            role_restrictions, devices, mfa_users)
+    compiled = CompiledSecurityPolicies(
+        version=1, policies=policies, closure=compute_role_closure(parents),
+        role_permissions=role_permissions, role_restrictions=role_restrictions,
+    )
+    profiles = {
+        user_id: UserSecurityProfile.compile(
+            user_id, 1, exists=True, active=user["active"], role_id=user["role_id"],
+            overrides=overrides[user_id], restrictions=user_restrictions[user_id],
+            trusted_devices=devices.get(user_id, ()), has_mfa=user_id in mfa_users,
+        )
+        for user_id, user in users.items()
+    }
+    profiles[99] = UserSecurityProfile.compile(99, 1, exists=False, active=False, role_id=None)
+    return rng, now, legacy, compiled, profiles
+
+
+def random_context(rng, user_id):
+    return AccessContext(
+        user_id=user_id,
+        resource_type=rng.choice(RESOURCES),
+        action=rng.choice(ACTIONS),
+        ip_address=rng.choice(IPS),
+        location=rng.choice(LOCATIONS),
+        device_id=rng.choice([None, f"device-{user_id}", "device-other"]),
+        branch_id=rng.choice([None, 0, 1, 2]),
+        timestamp=datetime(2026, 10, rng.randint(12, 18), rng.randint(0, 23), 30),
+    )
+
+
+def test_decisions_match_per_call_evaluation():
+    for seed_value in range(40):
+        rng, now, legacy, compiled, profiles = random_world(seed_value)
+        for _ in range(300):
+            context = random_context(rng, rng.choice(list(profiles)))
+            risk = legacy.risk(context)
+            decision = compiled.decide(profiles[context.user_id], context, risk, now=now)
+            expected = legacy.check_access(context, now)
+            assert (decision.granted, decision.reason) == expected[:2], (seed_value, context)
+            if decision.reason == "Access granted":
+                assert decision.applicable_policies == expected[2]
+                assert decision.requires_mfa == expected[3]
+                assert decision.risk_score == risk
+
+
+def test_role_closure_matches_parent_walk():
+    rng = random.Random(7)
+    for _ in range(50):
+        role_ids = list(range(1, 30))
+        parents = {role_id: rng.choice([None, rng.randint(1, 29)]) for role_id in role_ids}  # cycles included
+        compiled = CompiledSecurityPolicies(version=1, closure=compute_role_closure(parents))
+        legacy = LegacySecurity({}, parents, [], [], {}, {}, [], {}, set())
+        for role_id in role_ids + [404]:
+            assert list(compiled.ancestors_of(role_id)) == legacy.hierarchy(role_id)
+
+
+def test_row_filters_bind_context_values():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE orders (id INTEGER, owner_id INTEGER, branch_id INTEGER)"))
+        connection.execute(text("INSERT INTO orders VALUES (:id, :owner, :branch)"), [
+            {"id": i, "owner": i % 4, "branch": (i % 3) or None} for i in range(1, 40)
+        ])
+
+    rules = [
+        RlsRuleRow("orders", "owner_id = {user_id} OR owner_id = 0", ["read"], None, None),
+        RlsRuleRow("orders", "branch_id = {branch_id} OR {user_id} = 3", None, [2, 3], None),
+        RlsRuleRow("orders", "id > 5", ["read", "update"], None, [1, 2]),
+        RlsRuleRow("customers", "1 = 0", None, None, None),
+    ]
+    users = {user_id: {"active": True, "role_id": user_id} for user_id in range(1, 4)}
+    legacy = LegacySecurity(users, {}, [], [], {}, {}, [], {}, set(), rls_rules=rules)
+    compiled = CompiledSecurityPolicies(version=1, rls_rules=rules)
+
+    with engine.connect() as connection:
+        for user_id in [1, 2, 3, 99]:
+            profile = UserSecurityProfile.compile(user_id, 1, exists=user_id in users, active=True,
+                                                  role_id=user_id if user_id in users else None)
+            for action in ["read", "update"]:
+                for branch_id in [None, 0, 1, 2]:
+                    context = AccessContext(user_id=user_id, resource_type="sales", action=action, branch_id=branch_id)
+                    query = select(text("id")).select_from(text("orders")).order_by(text("id"))
+                    expected, actual = query, query
+                    for clause in legacy.row_filter("orders", context):
+                        expected = expected.where(clause)
+                    for clause in compiled.row_filters("orders", profile, context):
+                        actual = actual.where(clause)
+                    assert connection.execute(actual).all() == connection.execute(expected).all()
+
+
+def test_field_masks_match_per_call_evaluation():
+    rules = [
+        FlsRuleRow("customers", "phone", True, True, "show_last_4", None, None, None),
+        FlsRuleRow("customers", "email", True, True, "show_first_2", [1], None, None),
+        FlsRuleRow("customers", "salary", False, True, None, None, [2], None),
+        FlsRuleRow("customers", "notes", True, False, None, None, None, {"time": {"blocked_hours": [3]}}),
+        FlsRuleRow("customers", "iban", True, True, "***", None, None, None),
+        FlsRuleRow("customers", "tax_id", True, True, "[hidden]", None, None, None),
+        FlsRuleRow("customers", "phone", True, True, "show_first_3", None, None, None),
+        FlsRuleRow("suppliers", "phone", False, True, None, None, None, None),
+    ]
+    users = {1: {"active": True, "role_id": 1}, 2: {"active": True, "role_id": 2}}
+    legacy = LegacySecurity(users, {}, [], [], {}, {}, [], {}, set(), fls_rules=rules)
+    compiled = CompiledSecurityPolicies(version=1, fls_rules=rules)
+    record = {"phone": "07701234567", "email": "a@tsh.sale", "salary": 900, "notes": None,
+              "iban": "IQ98", "tax_id": 42, "name": "Customer"}
+
+    for user_id in [1, 2, 3]:
+        profile = UserSecurityProfile.compile(user_id, 1, exists=user_id in users, active=True,
+                                              role_id=users.get(user_id, {}).get("role_id"))
+        for hour in [3, 12]:
+            context = AccessContext(user_id=user_id, resource_type="sales", timestamp=datetime(2026, 10, 19, hour))
+            assert compiled.mask_fields(record, "customers", profile, context) == \
+                legacy.mask_fields(record, "customers", context)
+            assert compiled.mask_fields(record, "orders", profile, context) == record
+
+    for pattern in ["***", "show_last_0", "show_last_20", "show_first_1", "literal"]:
+        for value in [None, "", "abc", 123456789]:
+            assert compile_mask(pattern)(value) == LegacySecurity.mask(value, pattern)
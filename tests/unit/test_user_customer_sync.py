@@ -0,0 +1,186 @@
+"""
+Unit Tests for Set-based Zoho User and Salesperson Reconciliation
+
+The staged user upsert and the UPDATE ... FROM users assignment are checked
+against the previous per-customer implementation on identical SQLite
+databases, and the number of statements is checked not to grow with the
+number of customers.
+"""
+
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.customer import Customer
+from app.models.role import Role
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.tds.integrations.zoho.user_customer_sync import UserCustomerSyncService
+
+
+TABLES = ["branches", "roles", "users", "customers"]
+OWNERS = ["Z1", "Z2", "Z3", "ZX", "ZY", None]  # ZX and ZY have no local user
+
+
+class FakeZohoClient:
+    def __init__(self, users):
+        self.users = users
+
+    async def paginated_fetch(self, api_type, endpoint, params=None, page_size=200, max_pages=None):
+        assert endpoint == "users"
+        return self.users
+
+
+def legacy_assign(db, resync_all):
+    """The previous update_customer_salesperson_assignments: one user query per customer"""
+    query = db.query(Customer).filter(Customer.zoho_owner_id.isnot(None))
+    if not resync_all:
+        query = query.filter(Customer.salesperson_id.is_(None))
+    for customer in query.all():
+        user = db.query(User).filter(User.zoho_user_id == customer.zoho_owner_id).first()
+        if user:
+            customer.salesperson_id = user.id
+    db.commit()
+
+
+def zoho_user(user_id, email, name, role_name="staff", status="active", **extra):
+    return {"user_id": user_id, "email": email, "name": name, "role_name": role_name, "status": status, **extra}
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    def factory(name, customers=0, seed=7):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(engine, tables=[Base.metadata.tables[t] for t in TABLES])
+        db = sessionmaker(bind=engine)()
+        db.add_all([Role(id=1, name="employee"), Role(id=2, name="salesperson")])
+        db.add_all([
+            User(id=1, name="Ali", email="ali@tsh.sale", password="x", zoho_user_id="Z1", is_salesperson=True),
+            User(id=2, name="Sara", email="sara@tsh.sale", password="x", zoho_user_id="Z2", is_salesperson=True),
+            User(id=3, name="Omar", email="omar@tsh.sale", password="x", zoho_user_id="Z3", is_salesperson=True),
+        ])
+        rng = random.Random(seed)
+        db.add_all([
+            Customer(
+                customer_code=f"C{i:05d}", name=f"Customer {i}", name_ar=f"عميل {i}",
+                zoho_owner_id=rng.choice(OWNERS), salesperson_id=rng.choice([None, None, 1, 2, 3])
+            )
+            for i in range(customers)
+        ])
+        db.commit()
+        return engine, db
+    return factory
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def assignments(db):
+    return db.execute(select(Customer.id, Customer.salesperson_id).order_by(Customer.id)).all()
+
+
+@pytest.mark.parametrize("resync_all", [False, True])
+def test_assignment_matches_legacy_loop(make_db, resync_all):
+    _, legacy_db = make_db("legacy", customers=300)
+    _, db = make_db("set_based", customers=300)
+    assert assignments(legacy_db) == assignments(db)
+
+    legacy_assign(legacy_db, resync_all)
+    result = run(UserCustomerSyncService(db, FakeZohoClient([])).update_customer_salesperson_assignments(
+        resync_all=resync_all
+    ))
+
+    assert result["errors"] == []
+    assert assignments(db) == assignments(legacy_db)
+    assert result["total_checked"] == result["updated"] + result["unchanged"] + result["skipped"]
+    assert {o["zoho_owner_id"] for o in result["unmapped_owners"]} == {"ZX", "ZY"}
+    assert result["skipped"] == sum(o["customers"] for o in result["unmapped_owners"])
+
+    # Nothing left to do on a second run
+    again = run(UserCustomerSyncService(db, FakeZohoClient([])).update_customer_salesperson_assignments(
+        resync_all=resync_all
+    ))
+    assert again["updated"] == 0
+
+
+def test_statement_count_does_not_grow_with_customers(make_db):
+    counts = []
+    for size in (50, 2000):
+        engine, db = make_db(f"size_{size}", customers=size)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        result = UserCustomerSyncService(db, None).reconcile_salesperson_assignments(resync_all=True)
+        db.commit()
+        counts.append(len(statements))
+        assert result["total_checked"] > 0
+    assert counts[0] == counts[1] <= 4
+
+
+def test_users_are_staged_and_upserted(make_db):
+    _, db = make_db("users")
+    db.add(User(id=4, name="Huda", email="huda@tsh.sale", password="x"))  # not linked to Zoho yet
+    db.commit()
+
+    zoho_users = [
+        zoho_user("Z1", "ali@tsh.sale", "Ali Hassan", phone="07701234567"),  # linked: renamed
+        zoho_user("Z4", "huda@tsh.sale", "Huda"),                             # linked by email
+        zoho_user("Z5", "new@tsh.sale", "Mustafa", role_name="Salesperson"),  # created
+        zoho_user("Z5", "new@tsh.sale", "Mustafa", role_name="Salesperson"),  # duplicate
+        zoho_user("Z6", "", "No Email"),                                      # invalid
+        zoho_user("Z2", "sara@tsh.sale", "Sara"),                             # unchanged
+    ]
+    service = UserCustomerSyncService(db, FakeZohoClient(zoho_users))
+
+    result = run(service.sync_users_from_zoho())
+    assert result["errors"] == []
+    assert (result["total_fetched"], result["created"], result["updated"], result["skipped"]) == (6, 1, 2, 3)
+
+    users = {u.email: u for u in db.query(User).all()}
+    assert (users["ali@tsh.sale"].name, users["ali@tsh.sale"].phone) == ("Ali Hassan", "07701234567")
+    assert users["huda@tsh.sale"].zoho_user_id == "Z4" and users["huda@tsh.sale"].id == 4
+    new_user = users["new@tsh.sale"]
+    assert (new_user.zoho_user_id, new_user.role_id, new_user.is_salesperson) == ("Z5", 2, True)
+    assert new_user.password and new_user.password != "ChangeMe123!" and new_user.created_at
+
+    # An unchanged re-run writes nothing; a full sync refreshes every match
+    assert run(service.sync_users_from_zoho())["updated"] == 0
+    full = run(service.sync_users_from_zoho(full_sync=True))
+    assert (full["created"], full["updated"]) == (0, 4)
+
+    # The staging table does not outlive the transaction
+    assert run(service.sync_users_from_zoho())["errors"] == []
+
+
+def test_full_pipeline_assigns_newly_synced_owner(make_db):
+    _, db = make_db("pipeline")
+    db.add(Customer(customer_code="C1", name="Shop", name_ar="متجر", zoho_owner_id="Z7"))
+    db.commit()
+
+    service = UserCustomerSyncService(db, FakeZohoClient([zoho_user("Z7", "rep@tsh.sale", "Rep")]))
+    result = run(service.full_sync_pipeline())
+
+    rep = db.query(User).filter(User.zoho_user_id == "Z7").one()
+    assert result["customer_assignment_update"]["updated"] == 1
+    assert db.query(Customer).filter(Customer.customer_code == "C1").one().salesperson_id == rep.id
+
+
+def test_synced_users_cannot_sign_in_until_a_password_is_set(make_db):
+    _, db = make_db("passwords")
+    service = UserCustomerSyncService(db, FakeZohoClient([
+        zoho_user("Z8", "rep1@tsh.sale", "Rep One"), zoho_user("Z9", "rep2@tsh.sale", "Rep Two"),
+    ]))
+    assert run(service.sync_users_from_zoho())["created"] == 2
+
+    first, second = (db.query(User).filter(User.email == email).one() for email in ("rep1@tsh.sale", "rep2@tsh.sale"))
+    assert first.password != second.password and first.is_verified is False
+    for password in ("ChangeMe123!", "", first.password):
+        assert AuthService.authenticate_user(db, "rep1@tsh.sale", password) is None
+
+    first.password = AuthService.get_password_hash("Reset-Passw0rd!")
+    db.commit()
+    assert AuthService.authenticate_user(db, "rep1@tsh.sale", "Reset-Passw0rd!").id == first.id
@@ -0,0 +1,489 @@
+"""
+Unit Tests for Queued, Rate-Limited WhatsApp Broadcasts
+
+A local aiohttp server stands in for the WhatsApp Cloud API messages
+endpoint (with scripted throttling and error responses) and a file-backed
+SQLite database holds broadcasts, recipients and logged messages. Sends must
+stay within the token bucket and the messaging tier, transient failures are
+retried with backoff, a dead dispatcher's batch is resumed after its lease,
+and webhook statuses only ever move a recipient forward.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import get_db
+from app.models.whatsapp import WhatsAppBroadcast, WhatsAppBroadcastRecipient, WhatsAppMessage
+from app.routers.whatsapp_integration import router
+from app.services.auth_service import AuthService
+from app.services.whatsapp_broadcast_service import (
+    BroadcastDispatcher, BroadcastService, TokenBucket, WhatsAppCloudClient
+)
+
+TABLES = [WhatsAppBroadcast.__table__, WhatsAppBroadcastRecipient.__table__, WhatsAppMessage.__table__]
+
+
+class FakeCloudAPI:
+    """POST /v20.0/{phone_number_id}/messages; `script` maps a phone to responses served in turn"""
+
+    def __init__(self):
+        self.sends = []
+        self.script = {}
+        self.hang_on = None
+        self.reached = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def messages(self, request):
+        assert request.match_info["phone_number_id"] == "1098765"
+        assert request.headers["Authorization"] == "Bearer test-token"
+        body = await request.json()
+        phone = body["to"]
+        self.sends.append((time.monotonic(), phone, body))
+
+        if phone == self.hang_on:
+            self.hang_on = None
+            self.reached.set()
+            await self.release.wait()
+        responses = self.script.get(phone)
+        if responses:
+            status, code = responses.pop(0)
+            return web.json_response(
+                {"error": {"message": f"error {code}", "type": "OAuthException", "code": code}}, status=status
+            )
+        return web.json_response({
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": phone, "wa_id": phone}],
+            "messages": [{"id": f"wamid.{phone}.{len(self.sends)}"}],
+        })
+
+    def attempts(self, phone):
+        return sum(1 for _, to, _ in self.sends if to == phone)
+
+
+class Harness:
+    def __init__(self, tmp_path):
+        self.engine = create_engine(f"sqlite:///{tmp_path / 'broadcasts.db'}")
+        for table in TABLES:
+            table.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.api = FakeCloudAPI()
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/v20.0/{phone_number_id}/messages", self.api.messages)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+        self.client = WhatsAppCloudClient("test-token", "1098765", api_base=str(self.server.make_url("/v20.0")))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.api.release.set()
+        await self.client.close()
+        await self.server.close()
+
+    def dispatcher(self, name="d1", rate=1000.0, burst=None, **kwargs):
+        kwargs.setdefault("messaging_tier", 0)
+        kwargs.setdefault("workers", 4)
+        return BroadcastDispatcher(self.client, self.Session, TokenBucket(rate, burst), dispatcher_id=name, **kwargs)
+
+    def create_broadcast(self, phones, **kwargs):
+        with self.Session() as db:
+            return BroadcastService(db).create_broadcast(phones, "order_update", **kwargs).broadcast_id
+
+    def broadcast(self, broadcast_id):
+        with self.Session() as db:
+            return BroadcastService(db).get_broadcast(broadcast_id)
+
+    def recipients(self):
+        with self.Session() as db:
+            return {r.phone_number: r for r in db.execute(select(WhatsAppBroadcastRecipient)).scalars()}
+
+    async def drain(self, dispatcher, broadcast_id, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while self.broadcast(broadcast_id).status != "completed":
+            assert time.monotonic() < deadline, "broadcast did not complete"
+            if not await dispatcher.run_once():
+                await asyncio.sleep(0.01)
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def phones(count, start=0):
+    return [f"96477000{i:05d}" for i in range(start, start + count)]
+
+
+def test_sends_stay_within_token_bucket_and_complete_broadcast(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            broadcast_id = h.create_broadcast(phones(40), language="en",
+                                              parameters={"name": "Ali", "order": 1042})
+            dispatcher = h.dispatcher(rate=100.0, burst=5, workers=8)
+            started = time.monotonic()
+            await h.drain(dispatcher, broadcast_id)
+            elapsed = time.monotonic() - started
+
+            assert sorted(to for _, to, _ in h.api.sends) == phones(40)
+            assert elapsed >= (40 - 5) / 100 * 0.9
+            # Any window holds at most the burst plus the refill (with 50 ms of
+            # slack for requests queued behind outcome writes)
+            times = sorted(sent_at for sent_at, _, _ in h.api.sends)
+            for i in range(len(times)):
+                for j in range(i + 1, len(times)):
+                    assert j - i + 1 <= 5 + 100 * (times[j] - times[i] + 0.05)
+
+            assert h.api.sends[0][2]["template"] == {
+                "name": "order_update",
+                "language": {"code": "en"},
+                "components": [{"type": "body", "parameters": [{"type": "text", "text": "Ali"},
+                                                               {"type": "text", "text": "1042"}]}],
+            }
+            broadcast = h.broadcast(broadcast_id)
+            assert (broadcast.sent_count, broadcast.failed_count) == (40, 0)
+            assert broadcast.started_at is not None and broadcast.completed_at is not None
+            assert all(r.status == "sent" and r.attempts == 1 and r.whatsapp_message_id
+                       for r in h.recipients().values())
+
+    run(scenario())
+
+
+def test_transient_failures_retry_with_backoff_permanent_ones_fail(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            recovers, rejected, down = phones(3)
+            h.api.script = {
+                recovers: [(429, 131056), (503, 131000)],
+                rejected: [(400, 131026)],
+                down: [(500, 1)] * 10,
+            }
+            broadcast_id = h.create_broadcast([recovers, rejected, down])
+            dispatcher = h.dispatcher(max_attempts=3, backoff_base_seconds=0.02)
+            await h.drain(dispatcher, broadcast_id)
+
+            rows = h.recipients()
+            assert (rows[recovers].status, rows[recovers].attempts, rows[recovers].error_code) == ("sent", 3, None)
+            assert (rows[rejected].status, rows[rejected].attempts, rows[rejected].error_code) == ("failed", 1, 131026)
+            assert (rows[down].status, rows[down].attempts, rows[down].error_code) == ("failed", 3, 1)
+            assert rows[rejected].failed_at is not None and rows[rejected].error_message == "error 131026"
+            assert [h.api.attempts(phone) for phone in (recovers, rejected, down)] == [3, 1, 3]
+
+            broadcast = h.broadcast(broadcast_id)
+            assert (broadcast.status, broadcast.sent_count, broadcast.failed_count) == ("completed", 1, 2)
+
+    run(scenario())
+
+
+def test_backoff_grows_exponentially_with_jitter_and_honours_retry_after():
+    dispatcher = BroadcastDispatcher(client=object(), limiter=TokenBucket(80), backoff_base_seconds=2.0,
+                                     backoff_max_seconds=300.0, dispatcher_id="d")
+    for attempts, low, high in ((1, 1.0, 2.0), (3, 4.0, 8.0), (12, 150.0, 300.0)):
+        delays = [dispatcher._backoff(attempts, None) for _ in range(50)]
+        assert all(low <= delay <= high for delay in delays)
+        assert len(set(delays)) > 1
+    assert dispatcher._backoff(1, 30.0) == 30.0
+
+
+def test_token_bucket_pause_holds_every_caller():
+    now = [0.0]
+
+    async def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(10.0, burst=2, clock=lambda: now[0], sleep=sleep)
+
+    async def scenario():
+        stamps = []
+        for _ in range(4):
+            await bucket.acquire()
+            stamps.append(now[0])
+        bucket.pause(5.0)
+        await bucket.acquire()
+        stamps.append(now[0])
+        return stamps
+
+    assert run(scenario()) == pytest.approx([0.0, 0.0, 0.1, 0.2, 5.2])
+
+
+def test_expired_lease_is_resumed_and_stale_outcomes_discarded(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            numbers = phones(6)
+            broadcast_id = h.create_broadcast(numbers)
+            h.api.hang_on = numbers[0]
+            stalled = h.dispatcher("stalled", workers=1, lease_seconds=0.3)
+            stalled_run = asyncio.create_task(stalled.run_once())
+            await h.api.reached.wait()
+
+            survivor = h.dispatcher("survivor")
+            assert not await survivor.run_once()  # lease still current
+            await asyncio.sleep(0.35)
+            await h.drain(survivor, broadcast_id)
+
+            # The stalled send finally returns: its outcome and the rest of its
+            # batch no longer belong to it
+            h.api.release.set()
+            await stalled_run
+
+            rows = h.recipients()
+            assert all(r.status == "sent" and r.lease_owner is None for r in rows.values())
+            assert all(r.attempts == 2 for r in rows.values())
+            assert rows[numbers[0]].whatsapp_message_id != f"wamid.{numbers[0]}.1"
+            assert [h.api.attempts(phone) for phone in numbers] == [2, 1, 1, 1, 1, 1]
+            assert h.broadcast(broadcast_id).sent_count == 6
+
+    run(scenario())
+
+
+def test_graceful_stop_hands_unsent_recipients_back(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            numbers = phones(5)
+            broadcast_id = h.create_broadcast(numbers)
+            h.api.hang_on = numbers[1]
+            dispatcher = h.dispatcher(workers=1, poll_interval_ms=10)
+            dispatcher.start()
+            await h.api.reached.wait()
+            stopping = asyncio.create_task(dispatcher.stop())
+            await asyncio.sleep(0)
+            h.api.release.set()
+            await stopping
+
+            rows = h.recipients()
+            assert [rows[phone].status for phone in numbers] == ["sent", "sent", "queued", "queued", "queued"]
+            assert [rows[phone].attempts for phone in numbers] == [1, 1, 0, 0, 0]
+            broadcast = h.broadcast(broadcast_id)
+            assert (broadcast.status, broadcast.sent_count) == ("sending", 2)
+
+            await h.drain(h.dispatcher("next"), broadcast_id)
+            assert sorted(to for _, to, _ in h.api.sends) == sorted(numbers)
+
+    run(scenario())
+
+
+def test_only_the_lock_holder_sends(tmp_path):
+    """Workers without the dispatcher lock stand by, and take over once they get it"""
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            broadcast_id = h.create_broadcast(phones(3))
+            standby = h.dispatcher("standby", poll_interval_ms=10)
+            leader = False
+            standby.lead = lambda: leader
+            standby.start()
+            await asyncio.sleep(0.1)
+            assert h.api.sends == []
+            assert h.broadcast(broadcast_id).status == "pending"
+
+            leader = True
+            deadline = time.monotonic() + 5
+            while h.broadcast(broadcast_id).status != "completed":
+                assert time.monotonic() < deadline, "standby never took over"
+                await asyncio.sleep(0.01)
+            await standby.stop()
+            assert len(h.api.sends) == 3
+
+    run(scenario())
+
+
+def test_dispatcher_database_work_stays_off_the_event_loop(tmp_path):
+    """The dispatcher shares the API worker's loop: claims, outcomes and counters run in threads"""
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            broadcast_id = h.create_broadcast(phones(12))
+            query_threads = set()
+            event.listen(h.engine, "before_cursor_execute",
+                         lambda *args: query_threads.add(threading.get_ident()))
+            dispatcher = h.dispatcher(poll_interval_ms=10)
+            dispatcher.start()
+            deadline = time.monotonic() + 5
+            while (await asyncio.to_thread(h.broadcast, broadcast_id)).status != "completed":
+                assert time.monotonic() < deadline, "broadcast did not complete"
+                await asyncio.sleep(0.01)
+            await dispatcher.stop()
+            assert len(h.api.sends) == 12
+            return query_threads, threading.get_ident()
+
+    query_threads, event_loop = run(scenario())
+    assert query_threads and event_loop not in query_threads
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="needs a local Postgres (TEST_POSTGRES_URL)")
+def test_one_dispatcher_holds_the_lock_across_processes():
+    engine = create_engine(TEST_POSTGRES_URL)
+    Session = sessionmaker(bind=engine)
+    first = BroadcastDispatcher(object(), Session, TokenBucket(80), dispatcher_id="first")
+    second = BroadcastDispatcher(object(), Session, TokenBucket(80), dispatcher_id="second")
+    try:
+        assert first.lead() and first.lead()
+        assert not second.lead()
+        first.resign()  # the sender stopped (or died): its lock is gone with its connection
+        assert second.lead()
+        assert not first.lead()
+    finally:
+        first.resign()
+        second.resign()
+        engine.dispose()
+
+
+def test_messaging_tier_caps_unique_recipients_per_day(tmp_path):
+    async def scenario():
+        async with Harness(tmp_path) as h:
+            h.create_broadcast(phones(3, start=100))
+            with h.Session() as db:
+                now = datetime.now()
+                for phone, sent_at in zip(phones(3, start=100),
+                                          (now - timedelta(hours=1), now - timedelta(hours=2), now - timedelta(hours=25))):
+                    db.execute(update(WhatsAppBroadcastRecipient)
+                               .where(WhatsAppBroadcastRecipient.phone_number == phone)
+                               .values(status="sent", sent_at=sent_at))
+                db.commit()
+
+            broadcast_id = h.create_broadcast(phones(8))
+            dispatcher = h.dispatcher(messaging_tier=5)
+            assert await dispatcher.run_once()
+            assert not await dispatcher.run_once()
+
+            assert sorted(to for _, to, _ in h.api.sends) == phones(3)
+            statuses = [r.status for phone, r in h.recipients().items() if phone in phones(8)]
+            assert statuses.count("sent") == 3 and statuses.count("queued") == 5
+            assert h.broadcast(broadcast_id).status == "sending"
+
+    run(scenario())
+
+
+def bearer(role, user_id=1):
+    token = AuthService.create_access_token({"sub": f"{role}@tsh.sale", "role": role, "user_id": user_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_webhook_statuses_move_recipients_forward_only(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webhook.db'}")
+    for table in TABLES:
+        table.create(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        broadcast_id = BroadcastService(db).create_broadcast(phones(4), "order_update").broadcast_id
+        db.execute(update(WhatsAppBroadcastRecipient).values(
+            status="sent", whatsapp_message_id="wamid.X" + WhatsAppBroadcastRecipient.phone_number, sent_at=datetime.now()
+        ))
+        db.execute(insert(WhatsAppMessage), [{"phone_number": phones(1)[0], "message_type": "template",
+                                              "direction": "outbound", "delivery_status": "sent",
+                                              "whatsapp_message_id": "wamid.X" + phones(1)[0]}])
+        db.commit()
+    w1, w2, w3, w4 = ("wamid.X" + phone for phone in phones(4))
+
+    def override_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = override_db
+
+    def webhook(*statuses):
+        return {"object": "whatsapp_business_account", "entry": [{"id": "1", "changes": [{
+            "field": "messages",
+            "value": {"messaging_product": "whatsapp", "statuses": [
+                dict(id=wamid, status=status, timestamp="1760900000", recipient_id="964", **extra)
+                for wamid, status, extra in statuses
+            ]},
+        }]}]}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/whatsapp/webhook", json=webhook(
+                (w1, "delivered", {}), (w1, "read", {}), (w2, "delivered", {}),
+                (w3, "failed", {"errors": [{"code": 131026, "title": "Message undeliverable"}]}),
+            ))
+            assert response.json() == {"status": "processed"}
+            # Late and repeated statuses never move a row back
+            await client.post("/whatsapp/webhook", json=webhook(
+                (w1, "delivered", {}), (w3, "delivered", {}), (w2, "sent", {}), ("wamid.unknown", "read", {}),
+            ))
+            return (await client.get(f"/whatsapp/broadcast/{broadcast_id}", headers=bearer("manager"))).json()
+
+    progress = run(scenario())
+    assert progress["recipients_by_status"] == {"read": 1, "delivered": 1, "failed": 1, "sent": 1}
+    assert (progress["sent"], progress["delivered"], progress["read"], progress["failed"]) == (3, 2, 1, 1)
+    assert progress["status"] == "completed"
+
+    with Session() as db:
+        rows = {r.whatsapp_message_id: r for r in db.execute(select(WhatsAppBroadcastRecipient)).scalars()}
+        assert rows[w1].read_at is not None and rows[w1].delivered_at is not None
+        assert (rows[w3].status, rows[w3].error_code, rows[w3].error_message) == \
+            ("failed", 131026, "Message undeliverable")
+        assert rows[w4].status == "sent"
+        message = db.execute(select(WhatsAppMessage)).scalar_one()
+        assert message.delivery_status == "read" and message.status_updated_at is not None
+
+
+def test_broadcast_endpoint_queues_recipients_in_one_insert(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    for table in TABLES:
+        table.create(engine)
+    Session = sessionmaker(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, params, context, executemany: statements.append(statement))
+
+    def override_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = override_db
+    numbers = ["07701234567", "+964 770 123 4567", "7709999999"] + [f"0780000{i:04d}" for i in range(500)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as anonymous:
+            body = {"phone_numbers": numbers, "template_name": "eid_offer"}
+            assert (await anonymous.post("/whatsapp/broadcast", json=body)).status_code == 403
+            assert (await anonymous.post("/whatsapp/broadcast", json=body,
+                                         headers=bearer("salesperson"))).status_code == 403
+            assert (await anonymous.get("/whatsapp/broadcast/bc_missing")).status_code == 403
+            assert (await anonymous.post("/whatsapp/broadcast/bc_missing/cancel")).status_code == 403
+            assert statements == []
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                     headers=bearer("admin", user_id=42)) as client:
+            response = await client.post("/whatsapp/broadcast", json={
+                "phone_numbers": numbers, "template_name": "eid_offer", "parameters": {"discount": "20%"}
+            })
+            queued = response.json()
+            assert (queued["status"], queued["total_recipients"], queued["sent"]) == ("pending", 502, 0)
+            assert sum("INSERT INTO whatsapp_broadcast_recipients" in s for s in statements) == 1
+
+            broadcast_id = queued["broadcast_id"]
+            progress = (await client.get(f"/whatsapp/broadcast/{broadcast_id}")).json()
+            assert progress["recipients_by_status"] == {"queued": 502}
+
+            cancelled = (await client.post(f"/whatsapp/broadcast/{broadcast_id}/cancel")).json()
+            assert (cancelled["status"], cancelled["recipients_by_status"]) == ("cancelled", {"cancelled": 502})
+            assert (await client.post(f"/whatsapp/broadcast/{broadcast_id}/cancel")).status_code == 422
+            assert (await client.get("/whatsapp/broadcast/bc_missing")).status_code == 404
+
+    run(scenario())
+
+    with Session() as db:
+        stored = db.execute(select(WhatsAppBroadcastRecipient.phone_number)
+                            .order_by(WhatsAppBroadcastRecipient.id)).scalars().all()
+        assert stored[:2] == ["9647701234567", "9647709999999"]
+        assert db.execute(select(WhatsAppBroadcast.parameters)).scalar_one() == {"discount": "20%"}
+        assert db.execute(select(WhatsAppBroadcast.requested_by)).scalar_one() == 42
@@ -0,0 +1,250 @@
+"""
+Unit Tests for the Shared Circuit Breaker and Adaptive Zoho Concurrency
+
+A local aiohttp server plays Zoho: it answers 429 with Retry-After once more
+than `capacity` requests are in flight, and 503 while an outage is on.
+UnifiedZohoClient must settle at the server's capacity without a retry
+storm, and an outage seen by one worker must stop every worker sharing the
+(fake) Redis breaker state.
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.tds.integrations.zoho.client import UnifiedZohoClient, ZohoAPI, ZohoAPIError, is_zoho_outage
+from app.tds.integrations.zoho.utils.concurrency import AdaptiveConcurrencyLimiter
+from app.tds.integrations.zoho.utils.retry import RetryStrategy
+from app.tds.utils.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError, RedisCircuitStore
+
+
+class FakeRedis:
+    """GET / SET NX PX / DEL with key expiry, counting commands"""
+
+    def __init__(self):
+        self.values = {}
+        self.commands = 0
+
+    def _live(self, key):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            self.values.pop(key, None)
+            return None
+        return value
+
+    async def get(self, key):
+        self.commands += 1
+        return self._live(key)
+
+    async def set(self, key, value, nx=False, px=None):
+        self.commands += 1
+        if nx and self._live(key) is not None:
+            return None
+        self.values[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    async def delete(self, *keys):
+        self.commands += 1
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+class FakeZoho:
+    def __init__(self, capacity=8, latency=0.01, retry_after="0.05"):
+        self.capacity = capacity
+        self.latency = latency
+        self.retry_after = retry_after
+        self.outage = False
+        self.in_flight = 0
+        self.hits = 0
+        self.throttled = 0
+
+    async def handle(self, request):
+        self.hits += 1
+        if self.outage:
+            return web.Response(status=503, text="Service Unavailable")
+        if self.in_flight >= self.capacity:
+            self.throttled += 1
+            return web.json_response(
+                {"code": 44, "message": "Too many requests"}, status=429, headers={"Retry-After": self.retry_after}
+            )
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency)
+            return web.json_response({"code": 0, "items": []})
+        finally:
+            self.in_flight -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/inventory/v1/{tail:.*}", self.handle)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+        return self
+
+    async def close(self):
+        await self.server.close()
+
+
+class FakeAuth:
+    async def get_valid_token(self):
+        return "token"
+
+
+def make_client(zoho, concurrency, breaker):
+    client = UnifiedZohoClient(
+        FakeAuth(), "org-1", rate_limit=1_000_000, concurrency=concurrency, circuit_breaker=breaker
+    )
+    client.API_BASES = {ZohoAPI.INVENTORY: str(zoho.server.make_url("/inventory/v1"))}
+    client.retry_strategy = RetryStrategy(max_retries=6, initial_delay=0.02, max_delay=0.2)
+    return client
+
+
+def item_requests(count):
+    return [{"method": "GET", "api_type": ZohoAPI.INVENTORY, "endpoint": f"items/{i}"} for i in range(count)]
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_aimd_converges_below_the_limit_without_a_retry_storm():
+    async def batch(limiter):
+        zoho = await FakeZoho(capacity=8).start()
+        client = make_client(zoho, limiter, CircuitBreaker("zoho_api", failure_predicate=is_zoho_outage))
+        try:
+            results = await client.batch_request(item_requests(600))
+            return zoho, client, results
+        finally:
+            await client.close_session()
+            await zoho.close()
+
+    async def scenario():
+        adaptive = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64, decrease_cooldown=0.05)
+        zoho, client, results = await batch(adaptive)
+        assert all(isinstance(r, dict) for r in results)
+        assert adaptive.limit <= zoho.capacity + 2
+        assert zoho.throttled < 0.1 * len(results)
+        assert zoho.hits < 1.1 * len(results)
+        assert adaptive.stats["throttle_decreases"] >= 1
+        assert client.circuit_breaker.get_state() == "closed"
+
+        # The same load through a fixed 32-wide gate keeps hammering the limit
+        fixed = AdaptiveConcurrencyLimiter(initial_limit=32, min_limit=32, max_limit=32)
+        fixed_zoho, _, fixed_results = await batch(fixed)
+        assert fixed_zoho.throttled > 5 * zoho.throttled
+        assert fixed_zoho.hits > 1.5 * len(fixed_results)
+
+    run(scenario())
+
+
+def test_outage_on_one_worker_opens_the_circuit_for_the_fleet():
+    async def scenario():
+        zoho = await FakeZoho().start()
+        store = RedisCircuitStore(FakeRedis())
+        workers = [
+            make_client(zoho, AdaptiveConcurrencyLimiter(), CircuitBreaker(
+                "zoho_api", failure_threshold=3, success_threshold=2, timeout_seconds=0.3,
+                failure_predicate=is_zoho_outage, store=store, sync_interval=0.02
+            ))
+            for _ in range(2)
+        ]
+        a, b = workers
+        try:
+            zoho.outage = True
+            with pytest.raises(ZohoAPIError, match="Circuit breaker 'zoho_api' is OPEN"):
+                await a.get(ZohoAPI.INVENTORY, "items")
+            assert zoho.hits == 3 and a.circuit_breaker.is_open()
+
+            # Worker B never saw a failure, but stops calling Zoho too
+            await asyncio.sleep(0.03)
+            for _ in range(5):
+                with pytest.raises(ZohoAPIError, match="OPEN"):
+                    await b.get(ZohoAPI.INVENTORY, "items")
+            assert zoho.hits == 3
+            assert b.stats["circuit_rejections"] == 5 and b.circuit_breaker.stats.failed_calls == 0
+
+            # After the timeout one worker probes; the other waits for its verdict
+            zoho.outage = False
+            await asyncio.sleep(0.3)
+            assert await b.get(ZohoAPI.INVENTORY, "items") == {"code": 0, "items": []}
+            with pytest.raises(ZohoAPIError, match="Another instance is testing recovery"):
+                await a.get(ZohoAPI.INVENTORY, "items")
+            await b.get(ZohoAPI.INVENTORY, "items")
+            assert b.circuit_breaker.get_state() == "closed" and zoho.hits == 5
+
+            await asyncio.sleep(0.03)
+            await a.get(ZohoAPI.INVENTORY, "items")
+            assert a.circuit_breaker.get_state() == "closed" and zoho.hits == 6
+        finally:
+            for worker in workers:
+                await worker.close_session()
+            await zoho.close()
+
+    run(scenario())
+
+
+def test_closed_path_does_not_touch_the_store_per_call():
+    redis = FakeRedis()
+    breaker = CircuitBreaker("zoho_api", store=RedisCircuitStore(redis), sync_interval=60)
+
+    async def ok():
+        await asyncio.sleep(0)
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(*(breaker.call(ok) for _ in range(500)))
+
+    assert run(scenario()) == ["ok"] * 500
+    assert redis.commands == 1
+    assert breaker.stats.successful_calls == 500
+
+
+def test_limiter_halves_once_per_burst_and_honours_retry_after():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=16, decrease_cooldown=10)
+        for _ in range(10):
+            limiter.on_throttle(retry_after=0.1)
+        assert int(limiter.limit) == 8 and limiter.stats["throttle_decreases"] == 1
+
+        started = time.monotonic()
+        async with limiter.slot():
+            assert time.monotonic() - started >= 0.09
+
+        # Slow responses (p90 far above the baseline p50) also back off
+        latency_limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8, latency_window=10)
+        for _ in range(10):
+            latency_limiter.on_success(0.01)
+        for latency in [0.01] * 5 + [0.1] * 5:
+            latency_limiter.on_success(latency)
+        assert int(latency_limiter.limit) == 4 and latency_limiter.stats["latency_decreases"] == 1
+
+    run(scenario())
+
+
+def test_breaker_without_store_keeps_local_semantics():
+    breaker = CircuitBreaker("local", failure_threshold=2, timeout_seconds=60, failure_predicate=is_zoho_outage)
+
+    async def fail():
+        raise ConnectionError("down")
+
+    async def scenario():
+        for _ in range(3):  # not an outage per the predicate
+            with pytest.raises(ConnectionError):
+                await breaker.call(fail)
+        assert breaker.get_state() == "closed"
+
+        async def server_error():
+            raise asyncio.TimeoutError()
+
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await breaker.call(server_error)
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(fail)
+        await breaker.reset()
+        assert breaker.get_state() == "closed"
+
+    run(scenario())
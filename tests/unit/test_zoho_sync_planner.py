@@ -0,0 +1,312 @@
+"""
+Unit Tests for the Streaming Zoho Sync Planner
+
+Plans are built against SQLite products/categories tables from export files
+read with the incremental JSON array reader. Checks that the plan is exact
+(insert/update/unchanged/orphaned/invalid and field-level counts), that
+execute applies exactly the stored plan and refuses stale ones, and that
+planning memory stays flat from a 10k to a 100k-item catalog.
+"""
+
+import asyncio
+import io
+import json
+import random
+import threading
+import tracemalloc
+
+import anyio.to_thread
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, get_db
+from app.exceptions import BusinessLogicError
+from app.models.product import Category, Product
+from app.models.zoho_sync import TDSSyncPlan, TDSSyncPlanEntry
+from app.routers.settings import zoho_integration
+from app.services.auth_service import AuthService
+from app.services.zoho_sync_planner import (
+    ZohoSyncPlanner, content_hash, execute_plan, iter_export_pages, iter_from_async, iter_json_array
+)
+
+FIELD_MAPPINGS = [
+    {"zoho_field": "item_id", "tsh_field": "zoho_item_id", "field_type": "text", "is_required": True},
+    {"zoho_field": "name", "tsh_field": "name", "field_type": "text", "is_required": True},
+    {"zoho_field": "sku", "tsh_field": "sku", "field_type": "text", "is_required": True,
+     "transformation_rule": "uppercase"},
+    {"zoho_field": "description", "tsh_field": "description", "field_type": "text", "default_value": ""},
+    {"zoho_field": "rate", "tsh_field": "unit_price", "field_type": "number", "is_required": True,
+     "default_value": "0.00"},
+    {"zoho_field": "stock_on_hand", "tsh_field": "quantity_on_hand", "field_type": "number"},
+    {"zoho_field": "unit", "tsh_field": "unit_of_measure", "field_type": "text", "default_value": "pcs"},
+    {"zoho_field": "status", "tsh_field": "is_active", "field_type": "boolean", "default_value": "true",
+     "transformation_rule": "status_to_boolean"},
+]
+
+TABLES = [Category.__table__, Product.__table__, TDSSyncPlan.__table__, TDSSyncPlanEntry.__table__]
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def make_session(tmp_path, name="planner.db"):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(engine, tables=TABLES)
+    return sessionmaker(bind=engine)
+
+
+def zoho_item(item_id, name=None, rate="10.00", status="active", **extra):
+    return {"item_id": item_id, "name": name or f"Item {item_id}", "sku": f"sku-{item_id}", "rate": rate,
+            "unit": "pcs", "status": status, "stock_on_hand": 5, **extra}
+
+
+def write_export(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=1)
+    return str(path)
+
+
+def seed_products(db, rows):
+    category_id = db.execute(insert(Category).values(name="Seed")).inserted_primary_key[0]
+    db.execute(insert(Product.__table__), [
+        {"sku": f"LOCAL-{i}", "name": f"Local {i}", "unit_price": 1, "unit_of_measure": "pcs",
+         "category_id": category_id, "is_active": True, "zoho_content_hash": None, **row}
+        for i, row in enumerate(rows)
+    ])
+    db.commit()
+
+
+def product(db, zoho_item_id):
+    return db.execute(select(Product.__table__).where(Product.zoho_item_id == zoho_item_id)).one()
+
+
+def test_json_array_reader_matches_json_loads():
+    rng = random.Random(7)
+    records = [
+        {"item_id": str(i), "name": f'Item "{i}" [x], {{y}}', "rate": rng.random() * 1000, "n": 10 ** rng.randint(0, 12),
+         "tags": ["a", {"b": None, "c": [True, False]}], "ar": "مصباح \\ تجريبي", "empty": {}}
+        for i in range(300)
+    ] + [[], 12345678901234567890, "tail", None]
+    text = json.dumps(records)
+    for chunk_size in (1, 7, 64, 4096):
+        assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == records
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+    assert list(iter_json_array(io.BytesIO(b'[1,\n 22 ,333]'), chunk_size=2)) == [1, 22, 333]
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"items": []}')))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[1, 2')))
+
+
+def test_plan_is_exact_and_execute_applies_exactly_it(tmp_path):
+    Session = make_session(tmp_path)
+    db = Session()
+    planner = ZohoSyncPlanner(db, "item", FIELD_MAPPINGS)
+    assert planner.unmapped == ["quantity_on_hand"]
+
+    same_hash = content_hash(planner.project(zoho_item("1")))
+    seed_products(db, [
+        {"zoho_item_id": "1", "name": "Item 1", "sku": "SKU-1", "unit_price": 10, "zoho_content_hash": same_hash},
+        {"zoho_item_id": "2", "name": "Item 2", "sku": "SKU-2", "unit_price": 10},          # same content, no hash
+        {"zoho_item_id": "3", "name": "Old name", "sku": "SKU-3", "unit_price": 10, "zoho_content_hash": "stale"},
+        {"zoho_item_id": "4", "name": "Item 4", "sku": "SKU-4", "unit_price": 9.5},         # price and status
+        {"zoho_item_id": "90", "name": "Gone from Zoho"},
+        {"zoho_item_id": "91", "name": "Already retired", "is_active": False},
+        {"zoho_item_id": None, "name": "Local only"},
+    ])
+    source = [
+        zoho_item("1"), zoho_item("2"), zoho_item("3"), zoho_item("4", status="inactive"),
+        zoho_item("5", sku="new-5"), zoho_item("6", rate=None), zoho_item("5", name="Duplicate"),
+        {"name": "No id"}, {**zoho_item("7"), "name": ""}, zoho_item("8", rate="abc"),
+    ]
+    export = write_export(tmp_path / "items.json", source)
+
+    plan = planner.plan(iter_export_pages(export, page_size=3), source="export", source_ref=export)
+
+    assert (plan.total_records, plan.insert_count, plan.update_count, plan.unchanged_count,
+            plan.orphaned_count, plan.invalid_count) == (10, 2, 2, 2, 1, 4)
+    assert plan.field_changes == {"is_active": 1, "name": 1, "unit_price": 1}
+    entries = {(e.zoho_id, e.action): e for e in db.execute(
+        select(TDSSyncPlanEntry).where(TDSSyncPlanEntry.plan_id == plan.id)).scalars()}
+    assert entries[("3", "update")].changed_fields == ["name"]
+    assert sorted(entries[("4", "update")].changed_fields) == ["is_active", "unit_price"]
+    assert entries[("4", "update")].values == {"is_active": False, "unit_price": "10"}
+    assert entries[("5", "invalid")].error == "Duplicate record in source"
+    assert entries[("7", "invalid")].error == "Missing required field name"
+    assert "not a number" in entries[("8", "invalid")].error
+    assert ("90", "orphaned") in entries and ("91", "orphaned") not in entries
+
+    # The plan, not a fresh diff, is what gets applied
+    stats = execute_plan(db, plan.id, field_mappings=FIELD_MAPPINGS, delete_sync=True)
+    assert stats == {"inserted": 2, "updated": 2, "hashes_recorded": 1, "deactivated": 1, "conflicts": 0, "failed": 0}
+    assert product(db, "3").name == "Item 3"
+    assert (product(db, "4").is_active, float(product(db, "4").unit_price)) == (False, 10.0)
+    new = product(db, "5")
+    assert (new.name, new.sku, float(new.unit_price), new.unit_of_measure) == ("Item 5", "NEW-5", 10.0, "pcs")
+    assert db.get(Category, new.category_id).name == "General"
+    assert float(product(db, "6").unit_price) == 0
+    assert product(db, "90").is_active is False
+    assert db.get(TDSSyncPlan, plan.id).status == "executed"
+    with pytest.raises(BusinessLogicError):
+        execute_plan(db, plan.id)
+
+    # Everything converged: the same source plans to nothing
+    again = ZohoSyncPlanner(db, "item", FIELD_MAPPINGS).plan(iter_export_pages(export), source="export")
+    assert (again.insert_count, again.update_count, again.unchanged_count, again.orphaned_count) == (0, 0, 6, 0)
+
+    # A row edited after planning is a conflict, not an overwrite
+    export = write_export(tmp_path / "items.json", source[:3] + [zoho_item("4", name="Renamed in Zoho", status="inactive")])
+    plan = ZohoSyncPlanner(db, "item", FIELD_MAPPINGS).plan(iter_export_pages(export), source="export")
+    assert (plan.update_count, plan.orphaned_count, plan.field_changes) == (1, 2, {"name": 1})
+    db.execute(update(Product).where(Product.zoho_item_id == "4").values(name="Edited locally", zoho_content_hash="x"))
+    db.commit()
+    with pytest.raises(BusinessLogicError):
+        execute_plan(db, plan.id, field_mappings=FIELD_MAPPINGS[:-1])
+    stats = execute_plan(db, plan.id, field_mappings=FIELD_MAPPINGS[:-1], force=True)
+    assert (stats["updated"], stats["conflicts"], stats["deactivated"]) == (0, 1, 0)
+    assert product(db, "4").name == "Edited locally"
+    db.close()
+
+
+def test_concurrent_executes_apply_the_plan_once(tmp_path):
+    Session = make_session(tmp_path)
+    first, second = Session(), Session()
+    export = write_export(tmp_path / "items.json", [zoho_item(str(i)) for i in range(5)])
+    plan = ZohoSyncPlanner(first, "item", FIELD_MAPPINGS).plan(iter_export_pages(export), source="export")
+
+    # The first session still holds the plan as planned when the second executes it
+    assert first.get(TDSSyncPlan, plan.id).status == "planned"
+    assert execute_plan(second, plan.id)["inserted"] == 5
+    with pytest.raises(BusinessLogicError, match="executed"):
+        execute_plan(first, plan.id)
+    assert first.query(Product).count() == 5
+    first.close()
+    second.close()
+
+
+def test_api_pages_are_planned_from_a_worker_thread(tmp_path):
+    Session = make_session(tmp_path)
+    db = Session()
+    loop_thread = []
+
+    async def api_pages():
+        for start in (0, 3, 6):
+            loop_thread.append(threading.get_ident())
+            yield [zoho_item(str(i)) for i in range(start, start + 3)]
+
+    async def scenario():
+        planner = ZohoSyncPlanner(db, "item", FIELD_MAPPINGS)
+        plan = await anyio.to_thread.run_sync(lambda: planner.plan(iter_from_async(api_pages()), source="zoho_api"))
+        return plan, threading.get_ident()
+
+    plan, event_loop = run(scenario())
+    assert (plan.total_records, plan.insert_count) == (9, 9)
+    assert set(loop_thread) == {event_loop}  # Pages are fetched on the loop, planned off it
+    db.close()
+
+
+def plan_peak_memory(tmp_path, total):
+    """Peak traced allocation while planning a catalog of `total` items"""
+    Session = make_session(tmp_path, f"catalog_{total}.db")
+    db = Session()
+    seed_products(db, [
+        {"zoho_item_id": str(i), "name": f"Item {i}" if i % 8 else "Renamed", "sku": f"SKU-{i}", "unit_price": 10}
+        for i in range(0, total, 4)
+    ])
+    path = tmp_path / f"catalog_{total}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(total):
+            f.write(("," if i else "") + json.dumps(zoho_item(str(i), description="x" * 200)))
+        f.write("]")
+
+    tracemalloc.start()
+    try:
+        plan = ZohoSyncPlanner(db, "item", FIELD_MAPPINGS).plan(
+            iter_export_pages(str(path), page_size=500), source="export")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert plan.total_records == total
+    assert plan.insert_count + plan.update_count + plan.unchanged_count == total
+    assert plan.update_count == total // 4  # description everywhere, name on every other seeded row
+    assert plan.field_changes["description"] == total // 4
+    assert plan.field_changes["name"] == total // 8
+    db.close()
+    return peak
+
+
+@pytest.mark.slow
+def test_planning_memory_stays_flat_for_100k_catalog(tmp_path):
+    Base.registry.configure()  # one-off mapper setup is not planning memory
+    small = plan_peak_memory(tmp_path, 10_000)
+    large = plan_peak_memory(tmp_path, 100_000)
+    # Ten times the catalog (a ~30 MB export) may not grow the heap with it
+    assert large < small * 1.5 + 1_000_000, (small, large)
+    assert large < 16_000_000, large
+
+
+def test_analyze_and_execute_endpoints(tmp_path, monkeypatch):
+    Session = make_session(tmp_path, "api.db")
+    settings_dir = tmp_path / "settings"
+    settings_dir.mkdir()
+    (settings_dir / "zoho_config.json").write_text(json.dumps({"enabled": True}))
+    mappings_path = settings_dir / "zoho_sync_mappings.json"
+    mappings_path.write_text(json.dumps({"item": {"enabled": True, "field_mappings": FIELD_MAPPINGS}}))
+    monkeypatch.setattr(zoho_integration, "SETTINGS_DIR", str(settings_dir))
+    monkeypatch.setattr(zoho_integration, "ZOHO_CONFIG_PATH", str(settings_dir / "zoho_config.json"))
+    monkeypatch.setattr(zoho_integration, "ZOHO_SYNC_MAPPINGS_PATH", str(mappings_path))
+    monkeypatch.chdir(tmp_path)
+    write_export(tmp_path / "all_zoho_inventory_items.json", [zoho_item(str(i)) for i in range(25)])
+
+    def override_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(zoho_integration.router, prefix="/api/settings")
+    app.dependency_overrides[get_db] = override_db
+
+    def bearer(permissions):
+        token = AuthService.create_access_token(
+            {"sub": "manager@tsh.sale", "role": "manager", "user_id": 2, "permissions": permissions}
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as viewer:
+            assert (await viewer.post("/api/settings/integrations/zoho/sync/item/execute",
+                                      params={"plan_id": 1})).status_code == 403
+            response = await viewer.post("/api/settings/integrations/zoho/sync/item/execute",
+                                         params={"plan_id": 1}, headers=bearer(["settings.view"]))
+            assert response.status_code == 403
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                     headers=bearer(["settings.view", "settings.update"])) as client:
+            response = await client.post("/api/settings/integrations/zoho/sync/item/analyze",
+                                         params={"page_size": 10})
+            analysis = response.json()["analysis"]
+            assert (analysis["total_records"], analysis["new_records"], analysis["matched_records"]) == (25, 25, 0)
+
+            response = await client.post("/api/settings/integrations/zoho/sync/item/execute",
+                                         params={"plan_id": analysis["plan_id"]})
+            assert response.json()["status"] == "success"
+            assert response.json()["statistics"]["inserted"] == 25
+            response = await client.post("/api/settings/integrations/zoho/sync/item/execute",
+                                         params={"plan_id": analysis["plan_id"]})
+            assert response.status_code == 422
+
+            response = await client.post("/api/settings/integrations/zoho/sync/item/analyze")
+            analysis = response.json()["analysis"]
+            assert (analysis["new_records"], analysis["matched_records"]) == (0, 25)
+            response = await client.get(f"/api/settings/integrations/zoho/sync/item/plans/{analysis['plan_id']}")
+            assert response.json()["status"] == "planned"
+            assert (await client.post("/api/settings/integrations/zoho/sync/vendor/analyze")).status_code == 404
+
+    run(scenario())
+    assert json.loads(mappings_path.read_text())["item"]["total_synced"] == 25
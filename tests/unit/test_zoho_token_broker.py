@@ -0,0 +1,188 @@
+"""
+Unit Tests for the Shared Zoho OAuth Token Broker
+
+Many ZohoAuthManagers, each with its own broker instance (as separate
+uvicorn workers and sync workers would have), share one store: a fake
+Redis or a file-backed SQLite tds_zoho_oauth_tokens table. A local aiohttp
+server stands in for Zoho's token endpoint and counts refreshes; every
+expiry must cost exactly one.
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.zoho_sync import TDSZohoOAuthToken
+from app.tds.integrations.zoho import ZohoAuthError, ZohoAuthManager, ZohoCredentials
+from app.tds.integrations.zoho.token_broker import (
+    DatabaseTokenStore, RedisTokenStore, ZohoTokenBroker, credentials_key
+)
+
+EXPIRES_IN = 1
+MARGIN = 0.5  # a token is usable for EXPIRES_IN - MARGIN seconds
+
+
+class FakeRedis:
+    """GET / SET NX PX / the compare-and-delete script, with key expiry"""
+
+    def __init__(self):
+        self.values = {}
+
+    def _live(self, key):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            self.values.pop(key, None)
+            return None
+        return value
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self._live(key)
+
+    async def set(self, key, value, nx=False, px=None):
+        await asyncio.sleep(0)
+        if nx and self._live(key) is not None:
+            return None
+        self.values[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    async def eval(self, script, numkeys, key, owner):
+        await asyncio.sleep(0)
+        if self._live(key) == owner:
+            del self.values[key]
+            return 1
+        return 0
+
+
+class FakeTokenEndpoint:
+    def __init__(self):
+        self.refreshes = 0
+        self.fail = False
+
+    async def token(self, request):
+        form = await request.post()
+        assert (form["grant_type"], form["refresh_token"]) == ("refresh_token", "refresh-1")
+        await asyncio.sleep(0.05)  # slow enough for every caller to pile up
+        if self.fail:
+            return web.json_response({"error": "Access Denied"}, status=400)
+        self.refreshes += 1
+        return web.json_response({"access_token": f"token-{self.refreshes}", "expires_in": EXPIRES_IN})
+
+
+class BrokenStore:
+    async def load(self, client_key):
+        raise ConnectionError("store down")
+
+
+def make_store(kind, tmp_path):
+    if kind == "redis":
+        return RedisTokenStore(FakeRedis())
+    engine = create_engine(f"sqlite:///{tmp_path / 'tokens.db'}")
+    TDSZohoOAuthToken.__table__.create(engine)
+    return DatabaseTokenStore(sessionmaker(bind=engine))
+
+
+class Harness:
+    def __init__(self, store):
+        self.store = store
+        self.endpoint = FakeTokenEndpoint()
+        self.credentials = dict(client_id="client-1", client_secret="secret", refresh_token="refresh-1",
+                                organization_id="org-1")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/oauth/v2/token", self.endpoint.token)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+    def manager(self, store=None, **broker_kwargs):
+        broker = ZohoTokenBroker(store or self.store, poll_interval=0.01, **{"lease_seconds": 5, **broker_kwargs})
+        manager = ZohoAuthManager(ZohoCredentials(**self.credentials), auto_refresh=False, token_broker=broker)
+        manager.TOKEN_URL = str(self.server.make_url("/oauth/v2/token"))
+        manager.TOKEN_REFRESH_MARGIN = MARGIN
+        return manager
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+@pytest.mark.parametrize("kind", ["redis", "database"])
+def test_concurrent_managers_refresh_once_per_expiry(kind, tmp_path):
+    async def scenario():
+        async with Harness(make_store(kind, tmp_path)) as h:
+            managers = [h.manager() for _ in range(25)]
+
+            for expiry in (1, 2, 3):
+                tokens = await asyncio.gather(*(m.get_valid_token() for m in managers for _ in range(3)))
+                assert h.endpoint.refreshes == expiry
+                assert set(tokens) == {f"token-{expiry}"}
+                # Within the token's life nobody goes back to Zoho or the store
+                assert {await m.get_valid_token() for m in managers} == {f"token-{expiry}"}
+                await asyncio.sleep(EXPIRES_IN - MARGIN + 0.05)
+
+            assert sum(m.stats["tokens_refreshed"] for m in managers) == 3
+            assert sum(m.stats["tokens_shared"] for m in managers) == 3 * 25 - 3
+
+    run(scenario())
+
+
+def test_database_row_records_the_refresh(tmp_path):
+    store = make_store("database", tmp_path)
+
+    async def scenario():
+        async with Harness(store) as h:
+            await asyncio.gather(*(h.manager().get_valid_token() for _ in range(10)))
+
+    run(scenario())
+    with store.session_factory() as db:
+        row = db.execute(select(TDSZohoOAuthToken)).scalar_one()
+    assert row.client_key == credentials_key("client-1", "refresh-1")
+    assert (row.access_token, row.refresh_count, row.lease_owner) == ("token-1", 1, None)
+
+
+@pytest.mark.parametrize("kind", ["redis", "database"])
+def test_lapsed_lease_of_a_dead_refresher_is_taken_over(kind, tmp_path):
+    async def scenario():
+        async with Harness(make_store(kind, tmp_path)) as h:
+            client_key = credentials_key("client-1", "refresh-1")
+            assert await h.store.try_lease(client_key, "crashed-worker", 0.3)
+
+            started = time.monotonic()
+            tokens = await asyncio.gather(*(h.manager().get_valid_token() for _ in range(10)))
+            assert time.monotonic() - started >= 0.25
+            assert set(tokens) == {"token-1"} and h.endpoint.refreshes == 1
+
+    run(scenario())
+
+
+def test_failed_refresh_releases_lease_and_broken_store_falls_back(tmp_path):
+    async def scenario():
+        async with Harness(make_store("redis", tmp_path)) as h:
+            h.endpoint.fail = True
+            manager = h.manager()
+            with pytest.raises(ZohoAuthError, match="Access Denied"):
+                await manager.get_valid_token()
+            assert manager.stats["refresh_failures"] == 1
+
+            # The lease was released: the next caller refreshes at once
+            h.endpoint.fail = False
+            started = time.monotonic()
+            assert await h.manager().get_valid_token() == "token-1"
+            assert time.monotonic() - started < 1
+
+            # An unreachable store degrades to a per-process refresh
+            isolated = h.manager(store=BrokenStore())
+            assert await isolated.get_valid_token() == "token-2"
+            assert isolated.stats["tokens_refreshed"] == 1
+
+    run(scenario())